@@ -8,6 +8,7 @@ ROOT = Path(__file__).resolve().parent.parent
 DATA_DIR = ROOT / "data"
 HISTORICAL_DIR = DATA_DIR / "historical"
 NEWS_DIR = DATA_DIR / "news_history_multi"
+SNAPSHOT_DIR = DATA_DIR / "tensorflow_training" / "snapshots"  # runtime market snapshots (Arrow, date partitions)
 ARTIFACT_DIR = ROOT / "ai_dev" / "artifacts"
 
 # Defaults for supervised labels
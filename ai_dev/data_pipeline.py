@@ -2,7 +2,9 @@
 Isolated data pipeline to build supervised features/labels for AI experiments.
  - Reads 1m BTCUSDT parquet (default: data/historical/BTCUSDT_1m.parquet)
  - Optional news ingestion (counts per hour per source); safe fallback if missing
+ - Optional runtime market snapshots (Arrow partitions written by the live trader)
  - Outputs a single Parquet with aligned features + labels to ai_dev/artifacts
+   (or, with --store, refreshes the per-day feature store in ai_dev/feature_store.py)
 Does not modify existing runtime code.
 """
 from __future__ import annotations
@@ -27,6 +29,25 @@ def load_price(path: Path, limit: Optional[int] = None) -> pd.DataFrame:
     return df
 
 
+def load_market_snapshots(
+    root: Path = config.SNAPSHOT_DIR,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Load live-trader market snapshots (one row per analysis tick) for a date range.
+    Reads the Arrow stream partitions directly; strategy probabilities arrive as prob_* columns.
+    """
+    from src.utils.snapshot_recorder import read_snapshots
+
+    table = read_snapshots(root, start=start, end=end, columns=columns)
+    df = table.to_pandas()
+    if "timestamp" in df:
+        df = df.sort_values("timestamp").reset_index(drop=True)
+    return df
+
+
 def _rolling_features(df: pd.DataFrame, col: str, windows: Iterable[int], prefix: str) -> pd.DataFrame:
     for w in windows:
         df[f"{prefix}_mean_{w}m"] = df[col].rolling(w, min_periods=max(1, w // 2)).mean()
@@ -34,13 +55,18 @@ def _rolling_features(df: pd.DataFrame, col: str, windows: Iterable[int], prefix
     return df
 
 
-def build_price_features(df: pd.DataFrame) -> pd.DataFrame:
+def build_price_features(
+    df: pd.DataFrame,
+    ret_windows: Optional[Iterable[int]] = None,
+    vol_windows: Optional[Iterable[int]] = None,
+) -> pd.DataFrame:
+    """Price/volume features; windows default to config.RET_WINDOWS / config.VOL_WINDOWS."""
     df = df.copy()
     df["ret_1m"] = df["close"].pct_change() * 100
-    for w in config.RET_WINDOWS:
+    for w in config.RET_WINDOWS if ret_windows is None else ret_windows:
         df[f"ret_{w}m"] = df["close"].pct_change(w) * 100
     # Rolling volatility on returns
-    df = _rolling_features(df, "ret_1m", config.VOL_WINDOWS, "ret")
+    df = _rolling_features(df, "ret_1m", config.VOL_WINDOWS if vol_windows is None else vol_windows, "ret")
     # Volume Z-score
     vol_mean = df["volume"].rolling(60, min_periods=30).mean()
     vol_std = df["volume"].rolling(60, min_periods=30).std()
@@ -122,12 +148,22 @@ def main():
     parser.add_argument("--output", type=Path, default=config.DEFAULT_OUTPUT, help="Output Parquet path.")
     parser.add_argument("--limit", type=int, default=None, help="Optional row limit for quick runs.")
     parser.add_argument("--with-news", action="store_true", help="Include hourly news counts (lightweight).")
+    parser.add_argument("--store", type=Path, default=None, help="Refresh the feature store at this root instead of writing --output.")
     args = parser.parse_args()
 
     print(f"Loading price: {args.price_file}")
     price_df = load_price(args.price_file, limit=args.limit)
     print(f"Price rows: {len(price_df):,}")
 
+    if args.store:
+        from ai_dev.feature_store import FeatureSpec, FeatureStore
+
+        news_df = ingest_news_counts(config.NEWS_DIR) if args.with_news else None
+        store = FeatureStore(args.store, FeatureSpec(with_news=args.with_news))
+        stats = store.build(price_df, news_df)
+        print(f"Feature store {store.root}: {stats['recomputed']} days recomputed, {stats['skipped']} unchanged")
+        return
+
     print("Building price features...")
     feat_df = build_price_features(price_df)
 
@@ -10,11 +10,11 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple
+from typing import Tuple
 
-import numpy as np
 import pandas as pd
 
+from ai_dev.feature_store import FeatureView, prepare_obs
 from ai_dev.hybrid_env import ActionSpec
 
 
@@ -24,22 +24,22 @@ class DatasetRunnerConfig:
     future_col: str = "future_ret_15m"
     fee_rate: float = 0.0005
     max_steps: int | None = None
+    feature_view: FeatureView | None = None  # memory-mapped feature store range; overrides dataset_path
 
 
 class DatasetRunner:
     def __init__(self, cfg: DatasetRunnerConfig):
         self.cfg = cfg
-        self.df = pd.read_parquet(cfg.dataset_path, engine="pyarrow")
-        self.features, self.feature_cols = self._prepare_obs(self.df)
-        self.future = self.df[cfg.future_col].values
+        if cfg.feature_view is not None:
+            self.df = None
+            self.features, self.feature_cols = cfg.feature_view.obs, list(cfg.feature_view.feature_cols)
+            self.future = cfg.feature_view.future_col(cfg.future_col)
+        else:
+            self.df = pd.read_parquet(cfg.dataset_path, engine="pyarrow")
+            self.features, self.feature_cols = prepare_obs(self.df)
+            self.future = self.df[cfg.future_col].values
         self.ptr = 0
-        self.max_steps = cfg.max_steps or len(self.df) - 1
-
-    def _prepare_obs(self, df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-        drop_cols = [c for c in numeric_cols if c.startswith("future_ret_")] + [c for c in numeric_cols if c.startswith("label_")]
-        feat_cols = [c for c in numeric_cols if c not in drop_cols]
-        return df[feat_cols].to_numpy(dtype=np.float32), feat_cols
+        self.max_steps = cfg.max_steps or len(self.features) - 1
 
     def reset(self) -> dict:
         self.ptr = 0
@@ -1,6 +1,13 @@
 """
-Export RL buffer using HybridTradingEnv + DatasetRunner (non-intrusive).
+Export RL buffer for offline RL/BC (non-intrusive): vectorized dataset env or HybridTradingEnv + BacktesterRunner.
 Creates a JSONL file with (obs, action, reward, done) for offline RL/BC.
+The dataset path steps --num-envs episodes in lockstep (ai_dev/vector_env.py) and writes
+straight from the rollout buffer; an .npz output skips the per-record JSON encoding.
+
+Dataset-path records differ from the old HybridTradingEnv + DatasetRunner export:
+ - obs is the observation the action was taken on (the old export stored the next obs)
+ - episodes start at a random offset drawn from --seed (--sequential-starts replays from row 0)
+ - LONG/SHORT pay the fee once (DatasetRunner subtracted it in pnl and again via info["fees"])
 """
 from __future__ import annotations
 
@@ -11,12 +18,40 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
-from ai_dev.dataset_runner import DatasetRunner, DatasetRunnerConfig
 from ai_dev.backtester_runner import BacktesterRunner, BacktesterRunnerConfig
 from ai_dev.hybrid_env import ActionSpec, HybridEnvConfig, HybridTradingEnv
+from ai_dev.vector_env import RandomPolicy, RolloutBuffer, VecEnvConfig, VectorTradingEnv, rollout, sharded_rollout
 from ai_dev import config
 
 
+def export_vectorized(args) -> None:
+    cfg = VecEnvConfig(
+        num_envs=args.num_envs,
+        future_col=args.future_col,
+        max_steps=args.steps,
+        seed=args.seed,
+        random_starts=not args.sequential_starts,
+    )
+    steps = -(-args.steps // args.num_envs)  # total transitions ~= --steps
+    if args.store:
+        buf = sharded_rollout(args.store, cfg, steps, RandomPolicy(args.seed), workers=args.workers)
+    else:
+        df = pd.read_parquet(args.dataset, engine="pyarrow")
+        buf = rollout(VectorTradingEnv.from_frame(df, cfg), RandomPolicy(args.seed), steps)
+    write_buffer(buf, args.output)
+    print(f"Exported buffer to {args.output} ({buf.rewards.size} steps, {args.num_envs} envs)")
+
+
+def write_buffer(buf: RolloutBuffer, path: Path) -> None:
+    if path.suffix == ".npz":
+        buf.save_npz(path)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as f:
+        for rec in buf.iter_records():
+            f.write(json.dumps(rec) + "\n")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Export RL buffer via HybridTradingEnv + runner (dataset/backtester).")
     parser.add_argument("--dataset", type=Path, default=config.DEFAULT_OUTPUT, help="Feature dataset for DatasetRunner.")
@@ -25,22 +60,26 @@ def main():
     parser.add_argument("--start-date", type=str, default="2024-11-10", help="Backtester start date.")
     parser.add_argument("--end-date", type=str, default="2024-11-10", help="Backtester end date.")
     parser.add_argument("--steps", type=int, default=5000, help="Max steps to export.")
-    parser.add_argument("--output", type=Path, default=config.ARTIFACT_DIR / "rl_buffer.jsonl", help="Output JSONL path.")
+    parser.add_argument("--output", type=Path, default=config.ARTIFACT_DIR / "rl_buffer.jsonl", help="Output JSONL path (.npz for arrays).")
+    parser.add_argument("--store", type=Path, default=None, help="Feature store root (memory-mapped) instead of --dataset.")
+    parser.add_argument("--num-envs", type=int, default=1, help="Parallel episodes for the dataset runner.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (with --store).")
+    parser.add_argument("--seed", type=int, default=0, help="Rollout seed.")
+    parser.add_argument("--sequential-starts", action="store_true", help="Env i replays the i-th contiguous segment (1 env: from row 0).")
     args = parser.parse_args()
 
-    if args.use_backtester:
-        runner = BacktesterRunner(
-            BacktesterRunnerConfig(
-                start_date=args.start_date,
-                end_date=args.end_date,
-                max_events=args.steps * 10,  # rough
-            )
+    if not args.use_backtester:
+        export_vectorized(args)
+        return
+
+    runner = BacktesterRunner(
+        BacktesterRunnerConfig(
+            start_date=args.start_date,
+            end_date=args.end_date,
+            max_events=args.steps * 10,  # rough
         )
-        obs_dim = len(runner.reset()["features"])
-    else:
-        df = pd.read_parquet(args.dataset, engine="pyarrow")
-        runner = DatasetRunner(DatasetRunnerConfig(dataset_path=args.dataset, future_col=args.future_col, max_steps=args.steps))
-        obs_dim = runner.features.shape[1]
+    )
+    obs_dim = len(runner.reset()["features"])
 
     # Build action specs for HOLD/LONG/SHORT
     action_specs = [
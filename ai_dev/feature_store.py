@@ -0,0 +1,258 @@
+"""
+Content-hashed feature store for supervised training and RL environments (isolated from runtime).
+ - Feature set id = hash of the feature/label parameters + store version
+ - One shard per UTC day: obs.npy (float32), future.npy (float32), labels.npy (int8), meta.json
+ - A day is recomputed only when the hash of its raw input window changes
+   (the window includes rolling lookback and label lookahead, so shards equal a full recompute)
+ - Readers memory-map shards; materialized ranges are plain .npy files that every worker
+   process maps read-only, so the OS shares one copy of the pages
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ai_dev import config
+
+STORE_VERSION = 1
+DEFAULT_STORE_DIR = config.ARTIFACT_DIR / "feature_store"
+_RAW_HASH_COLS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+def prepare_obs(df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
+    """Observation matrix: numeric columns minus future returns / labels."""
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    feature_cols = [c for c in numeric_cols if not c.startswith("future_ret_") and not c.startswith("label_")]
+    return df[feature_cols].to_numpy(dtype=np.float32), feature_cols
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    ret_windows: Tuple[int, ...] = tuple(config.RET_WINDOWS)
+    vol_windows: Tuple[int, ...] = tuple(config.VOL_WINDOWS)
+    horizons: Tuple[int, ...] = tuple(config.FUTURE_HORIZONS_MIN)
+    thresholds: Tuple[float, ...] = tuple(config.RET_THRESHOLDS)
+    with_news: bool = False
+
+    @property
+    def feature_set_id(self) -> str:
+        payload = json.dumps({"version": STORE_VERSION, **asdict(self)}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:12]
+
+    @property
+    def lookback(self) -> int:
+        # ret_{w}m needs w rows, rolling std of ret_1m needs w+1, volume z-score needs 60
+        return max(max(self.ret_windows), max(self.vol_windows) + 1, 60)
+
+    @property
+    def lookahead(self) -> int:
+        return max(self.horizons)
+
+
+@dataclass
+class FeatureView:
+    """Memory-mapped observations for a date range."""
+    obs: np.ndarray
+    future: np.ndarray
+    labels: np.ndarray
+    feature_cols: List[str]
+    future_cols: List[str]
+    label_cols: List[str]
+    days: List[str] = field(default_factory=list)
+
+    def future_col(self, name: str) -> np.ndarray:
+        return self.future[:, self.future_cols.index(name)]
+
+    def __len__(self) -> int:
+        return len(self.obs)
+
+
+class FeatureStore:
+    def __init__(self, root: Path = DEFAULT_STORE_DIR, spec: FeatureSpec | None = None):
+        self.spec = spec or FeatureSpec()
+        self.root = Path(root) / self.spec.feature_set_id
+
+    # ---------------- build ----------------
+    def _day_dir(self, day: str) -> Path:
+        return self.root / "days" / day
+
+    def _read_meta(self, day: str) -> Optional[dict]:
+        path = self._day_dir(day) / "meta.json"
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text())
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _hash_window(raw: pd.DataFrame, news: Optional[pd.DataFrame]) -> str:
+        h = hashlib.sha256()
+        cols = [c for c in _RAW_HASH_COLS if c in raw.columns]
+        h.update(pd.util.hash_pandas_object(raw[cols], index=False).values.tobytes())
+        if news is not None and not news.empty:
+            h.update(pd.util.hash_pandas_object(news, index=False).values.tobytes())
+        return h.hexdigest()
+
+    def build(self, price_df: pd.DataFrame, news_df: Optional[pd.DataFrame] = None, force: bool = False) -> Dict[str, int]:
+        """
+        Build or refresh day shards from raw 1m prices (sorted, UTC timestamps).
+        Returns counts: {"days", "recomputed", "skipped"}.
+        """
+        from ai_dev.data_pipeline import build_labels, build_price_features, merge_news
+
+        spec = self.spec
+        df = price_df.sort_values("timestamp").reset_index(drop=True)
+        days = df["timestamp"].dt.strftime("%Y-%m-%d").to_numpy()
+        bounds = np.flatnonzero(np.r_[True, days[1:] != days[:-1], True])
+        stats = {"days": len(bounds) - 1, "recomputed": 0, "skipped": 0}
+
+        for i in range(len(bounds) - 1):
+            lo, hi = int(bounds[i]), int(bounds[i + 1])
+            day = str(days[lo])
+            w_lo, w_hi = max(0, lo - spec.lookback), min(len(df), hi + spec.lookahead)
+            window = df.iloc[w_lo:w_hi]
+            news_window = None
+            if spec.with_news and news_df is not None and not news_df.empty:
+                t0 = window["timestamp"].iloc[0].floor("h")
+                t1 = window["timestamp"].iloc[-1]
+                news_window = news_df[(news_df["timestamp"] >= t0) & (news_df["timestamp"] <= t1)]
+            input_hash = self._hash_window(window, news_window)
+            meta = self._read_meta(day)
+            if not force and meta and meta.get("input_hash") == input_hash:
+                stats["skipped"] += 1
+                continue
+
+            feat = build_price_features(window.reset_index(drop=True), spec.ret_windows, spec.vol_windows)
+            feat = build_labels(feat, list(spec.horizons), list(spec.thresholds))
+            if spec.with_news:
+                feat = merge_news(feat, news_window if news_window is not None else pd.DataFrame(columns=["timestamp", "news_count"]))
+            else:
+                feat["news_count"] = 0
+            feat = feat.iloc[lo - w_lo:hi - w_lo].dropna().reset_index(drop=True)
+            self._write_day(day, feat, input_hash)
+            stats["recomputed"] += 1
+        return stats
+
+    def _write_day(self, day: str, feat: pd.DataFrame, input_hash: str) -> None:
+        out = self._day_dir(day)
+        out.mkdir(parents=True, exist_ok=True)
+        obs, feature_cols = prepare_obs(feat)
+        future_cols = [c for c in feat.columns if c.startswith("future_ret_")]
+        label_cols = [c for c in feat.columns if c.startswith("label_")]
+        arrays = {
+            "obs": obs,
+            "future": feat[future_cols].to_numpy(dtype=np.float32),
+            "labels": feat[label_cols].to_numpy(dtype=np.int8),
+            "ts": feat["timestamp"].astype("int64").to_numpy() if "timestamp" in feat else np.zeros(len(feat), np.int64),
+        }
+        for name, arr in arrays.items():
+            tmp = out / f"{name}.tmp.npy"
+            np.save(tmp, arr)
+            os.replace(tmp, out / f"{name}.npy")
+        meta = {
+            "day": day,
+            "rows": int(len(feat)),
+            "input_hash": input_hash,
+            "feature_cols": feature_cols,
+            "future_cols": future_cols,
+            "label_cols": label_cols,
+            "store_version": STORE_VERSION,
+        }
+        # meta is written last: a shard without matching meta is rebuilt next time
+        (out / "meta.json").write_text(json.dumps(meta, indent=2))
+
+    # ---------------- read ----------------
+    def days(self, start: str | None = None, end: str | None = None) -> List[str]:
+        day_root = self.root / "days"
+        if not day_root.exists():
+            return []
+        out = []
+        for d in sorted(p.name for p in day_root.iterdir() if (p / "meta.json").exists()):
+            if (start and d < start) or (end and d > end):
+                continue
+            out.append(d)
+        return out
+
+    def load(self, start: str | None = None, end: str | None = None) -> FeatureView:
+        """
+        Memory-mapped view over [start, end]. A single day maps its shard directly; a range
+        is materialized once into ranges/<key>/ (keyed by the day hashes) and mapped from there.
+        """
+        days = self.days(start, end)
+        if not days:
+            raise FileNotFoundError(f"no feature shards in {self.root} for {start}..{end}")
+        metas = [self._read_meta(d) for d in days]
+        src = self._day_dir(days[0]) if len(days) == 1 else self._materialize(days, metas)
+        meta = metas[0]
+        return FeatureView(
+            obs=np.load(src / "obs.npy", mmap_mode="r"),
+            future=np.load(src / "future.npy", mmap_mode="r"),
+            labels=np.load(src / "labels.npy", mmap_mode="r"),
+            feature_cols=meta["feature_cols"],
+            future_cols=meta["future_cols"],
+            label_cols=meta["label_cols"],
+            days=days,
+        )
+
+    def _materialize(self, days: Sequence[str], metas: Sequence[dict]) -> Path:
+        key = hashlib.sha256("|".join(f"{d}:{m['input_hash']}" for d, m in zip(days, metas)).encode()).hexdigest()[:16]
+        out = self.root / "ranges" / key
+        if (out / "done").exists():
+            return out
+        out.mkdir(parents=True, exist_ok=True)
+        total = sum(m["rows"] for m in metas)
+        for name in ("obs", "future", "labels", "ts"):
+            first = np.load(self._day_dir(days[0]) / f"{name}.npy", mmap_mode="r")
+            tmp = out / f"{name}.{os.getpid()}.tmp.npy"  # per-process: concurrent loaders may race on one range
+            dst = np.lib.format.open_memmap(tmp, mode="w+", dtype=first.dtype, shape=(total,) + first.shape[1:])
+            pos = 0
+            for d, m in zip(days, metas):
+                arr = np.load(self._day_dir(d) / f"{name}.npy", mmap_mode="r")
+                dst[pos:pos + len(arr)] = arr
+                pos += len(arr)
+            dst.flush()
+            del dst
+            os.replace(tmp, out / f"{name}.npy")
+        (out / "done").write_text(json.dumps({"days": list(days)}))
+        return out
+
+    def to_frame(self, start: str | None = None, end: str | None = None) -> pd.DataFrame:
+        """Flat DataFrame (same columns as data_pipeline output, minus timestamp)."""
+        view = self.load(start, end)
+        df = pd.DataFrame(np.asarray(view.obs), columns=view.feature_cols)
+        for i, c in enumerate(view.future_cols):
+            df[c] = view.future[:, i]
+        for i, c in enumerate(view.label_cols):
+            df[c] = view.labels[:, i]
+        return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build/refresh the content-hashed feature store.")
+    parser.add_argument("--price-file", type=Path, default=config.DEFAULT_PRICE_FILE, help="Parquet OHLCV (1m).")
+    parser.add_argument("--store-dir", type=Path, default=DEFAULT_STORE_DIR, help="Feature store root.")
+    parser.add_argument("--with-news", action="store_true", help="Include hourly news counts.")
+    parser.add_argument("--force", action="store_true", help="Recompute every day.")
+    args = parser.parse_args()
+
+    from ai_dev.data_pipeline import ingest_news_counts, load_price
+
+    price_df = load_price(args.price_file)
+    news_df = ingest_news_counts(config.NEWS_DIR) if args.with_news else None
+    store = FeatureStore(args.store_dir, FeatureSpec(with_news=args.with_news))
+    stats = store.build(price_df, news_df, force=args.force)
+    print(f"Feature set {store.spec.feature_set_id}: {stats['days']} days, "
+          f"{stats['recomputed']} recomputed, {stats['skipped']} unchanged -> {store.root}")
+
+
+if __name__ == "__main__":
+    main()
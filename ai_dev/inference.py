@@ -25,6 +25,9 @@ def select_features(df: pd.DataFrame, label_col: str) -> List[str]:
 def load_model(path: Path):
     with path.open("rb") as f:
         model = pickle.load(f)
+    # train_supervised saves {"model": ..., "features": [...], "labels": [...]}
+    if isinstance(model, dict) and "model" in model:
+        return model["model"]
     return model
 
 
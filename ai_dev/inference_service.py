@@ -0,0 +1,485 @@
+"""
+Long-lived local inference service for supervised models (isolated from runtime trading code).
+ - Loads the model once; a watcher reloads it when the artifact changes and swaps it atomically
+   (a failed load keeps serving the previous model)
+ - Clients talk newline-delimited JSON over a Unix socket; concurrent requests are micro-batched
+   into one predict call (max_batch rows or max_wait_ms, whichever first)
+ - Every request carries a latency budget; requests that miss it get {"error": "timeout"} and
+   the bots simply skip the model opinion for that tick
+ - Feature vectors can be sent directly or built server-side from recent 1m candles with the
+   same build_price_features() used by data_pipeline.py, so offline and online features match
+ - Optional ONNX export/runtime (skl2onnx / onnxmltools + onnxruntime) when installed
+
+Request:  {"features": [...]} | {"row": {"ret_1m": ...}} | {"candles": [[ts, o, h, l, c, v], ...]} | {"cmd": "stats"}
+Response: {"proba": [...], "direction": "LONG", "confidence": 0.61, "model_version": 3, "latency_ms": 1.2}
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import pickle
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from ai_dev import config
+from ai_dev.inference import predict
+from ai_dev.policy_adapter import direction_from_probs
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = config.ARTIFACT_DIR / "inference.sock"
+
+
+class ServiceTimeout(Exception):
+    pass
+
+
+# ---------------- model ----------------
+@dataclass
+class LoadedModel:
+    model: object
+    features: Optional[List[str]]
+    version: int
+    mtime: float
+    backend: str = "pickle"
+    labels: Optional[List[int]] = None  # original label (-1/0/1) of each probability column
+
+    @property
+    def n_features(self) -> Optional[int]:
+        """Expected input width, when the artifact records it (feature names, n_features_in_ or ONNX shape)."""
+        if self.features is not None:
+            return len(self.features)
+        if self.backend == "onnx":
+            width = self.model.get_inputs()[0].shape[-1]
+            return width if isinstance(width, int) else None
+        n = getattr(self.model, "n_features_in_", None)
+        return int(n) if n is not None else None
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if self.backend == "onnx":
+            sess = self.model
+            out = sess.run(None, {sess.get_inputs()[0].name: X.astype(np.float32)})
+            proba = out[-1]
+            if isinstance(proba, list):  # zipmap output: list of {class: prob}
+                proba = np.array([[d[k] for k in sorted(d)] for d in proba], dtype=np.float32)
+            return np.asarray(proba)
+        _, proba = predict(self.model, X)
+        if proba is None:
+            raise ValueError("Model does not provide probabilities.")
+        return np.asarray(proba)
+
+
+def _load_artifact(path: Path, version: int) -> LoadedModel:
+    mtime = path.stat().st_mtime
+    if path.suffix == ".onnx":
+        import onnxruntime as ort  # type: ignore
+
+        meta = path.with_suffix(".features.json")
+        features = json.loads(meta.read_text()) if meta.exists() else None
+        label_meta = path.with_suffix(".labels.json")
+        labels = json.loads(label_meta.read_text()) if label_meta.exists() else None
+        return LoadedModel(ort.InferenceSession(str(path)), features, version, mtime, backend="onnx", labels=labels)
+    with path.open("rb") as f:
+        obj = pickle.load(f)
+    features = labels = None
+    if isinstance(obj, dict) and "model" in obj:
+        features = obj.get("features")
+        labels = obj.get("labels")
+        obj = obj["model"]
+    names = getattr(obj, "feature_names_in_", None)
+    if features is None and names is not None:
+        features = [str(n) for n in names]
+    return LoadedModel(obj, features, version, mtime, labels=labels)
+
+
+class ModelRegistry:
+    """Holds the current model; maybe_reload() swaps the reference in one assignment."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._version = 0
+        self._failed_mtime: Optional[float] = None
+        self.current = self._load()
+
+    def _load(self) -> LoadedModel:
+        self._version += 1
+        return _load_artifact(self.path, self._version)
+
+    def maybe_reload(self) -> bool:
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return False
+        if mtime == self.current.mtime or mtime == self._failed_mtime:
+            return False
+        try:
+            self.current = self._load()
+        except Exception as e:
+            # half-written or broken artifact: keep serving the old model until the file changes again
+            self._failed_mtime = mtime
+            logger.warning(f"model reload failed, keeping v{self.current.version}: {e}")
+            return False
+        logger.info(f"model reloaded: v{self.current.version} ({self.path.name})")
+        return True
+
+
+# ---------------- features ----------------
+def features_from_candles(candles: Sequence[Sequence[float]], feature_cols: Sequence[str]) -> np.ndarray:
+    """Last-row feature vector from recent 1m candles, via the offline feature builder."""
+    from ai_dev.data_pipeline import build_price_features
+
+    df = pd.DataFrame(list(candles), columns=["timestamp", "open", "high", "low", "close", "volume"])
+    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms", utc=True)
+    feat = build_price_features(df)
+    feat["news_count"] = 0
+    missing = [c for c in feature_cols if c not in feat.columns]
+    if missing:
+        raise ValueError(f"features not available online: {missing[:5]}")
+    return feat[list(feature_cols)].iloc[-1].to_numpy(dtype=np.float32)
+
+
+def check_vector(vec: np.ndarray, model: LoadedModel) -> np.ndarray:
+    """Reject a vector the model cannot take, so it fails alone instead of breaking the batch."""
+    if vec.ndim != 1:
+        raise ValueError(f"features must be a flat vector, got shape {vec.shape}")
+    expected = model.n_features
+    if expected is not None and vec.shape[0] != expected:
+        raise ValueError(f"expected {expected} features, got {vec.shape[0]} (model v{model.version})")
+    return vec
+
+
+def request_vector(req: dict, model: LoadedModel) -> np.ndarray:
+    if "features" in req:
+        return check_vector(np.asarray(req["features"], dtype=np.float32), model)
+    if model.features is None:
+        raise ValueError("model has no feature names; send 'features' as a vector")
+    if "row" in req:
+        row = req["row"]
+        return np.array([row.get(c, np.nan) for c in model.features], dtype=np.float32)
+    if "candles" in req:
+        return features_from_candles(req["candles"], model.features)
+    raise ValueError("request needs 'features', 'row' or 'candles'")
+
+
+# ---------------- batching ----------------
+@dataclass
+class ServiceStats:
+    requests: int = 0
+    batches: int = 0
+    rows: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    reloads: int = 0
+    max_batch: int = 0
+    total_predict_ms: float = 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["avg_batch"] = round(self.rows / self.batches, 2) if self.batches else 0.0
+        data["avg_predict_ms"] = round(self.total_predict_ms / self.batches, 3) if self.batches else 0.0
+        return data
+
+
+class MicroBatcher:
+    def __init__(self, registry: ModelRegistry, max_batch: int = 64, max_wait_ms: float = 2.0, stats: Optional[ServiceStats] = None):
+        self.registry = registry
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.stats = stats or ServiceStats()
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, vec: np.ndarray, deadline: float) -> Future:
+        fut: Future = Future()
+        try:
+            vec = check_vector(np.asarray(vec, dtype=np.float32), self.registry.current)
+        except ValueError as e:
+            fut.set_exception(e)
+            return fut
+        self._queue.put((vec, deadline, fut))
+        return fut
+
+    def _collect(self) -> List[tuple]:
+        try:
+            first = self._queue.get(timeout=0.2)
+        except queue.Empty:
+            return []
+        batch = [first]
+        until = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_batch(self, batch: List[tuple]) -> None:
+        now = time.monotonic()
+        live = []
+        for vec, deadline, fut in batch:
+            if now > deadline:
+                fut.set_exception(ServiceTimeout())
+            else:
+                live.append((vec, fut))
+        if not live:
+            return
+        model = self.registry.current  # one model per batch, even if a swap lands mid-batch
+        # a reload between submit() and here can change the input width: stack only matching
+        # vectors, fail the rest individually
+        groups: Dict[int, list] = {}
+        for vec, fut in live:
+            try:
+                check_vector(vec, model)
+            except ValueError as e:
+                self.stats.errors += 1
+                fut.set_exception(e)
+                continue
+            groups.setdefault(vec.shape[0], []).append((vec, fut))
+        for rows in groups.values():
+            self._predict(model, rows)
+
+    def _predict(self, model: LoadedModel, rows: List[tuple]) -> None:
+        started = time.perf_counter()
+        try:
+            proba = model.predict_proba(np.vstack([v for v, _ in rows]))
+        except Exception as e:
+            self.stats.errors += 1
+            for _, fut in rows:
+                fut.set_exception(e)
+            return
+        self.stats.total_predict_ms += (time.perf_counter() - started) * 1000
+        self.stats.batches += 1
+        self.stats.rows += len(rows)
+        self.stats.max_batch = max(self.stats.max_batch, len(rows))
+        for i, (_, fut) in enumerate(rows):
+            fut.set_result((proba[i], model))
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._run_batch(batch)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="inference-batcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+
+# ---------------- service ----------------
+class InferenceService:
+    def __init__(
+        self,
+        model_path: Path,
+        socket_path: Path = DEFAULT_SOCKET,
+        budget_ms: float = 50.0,
+        max_batch: int = 64,
+        max_wait_ms: float = 2.0,
+        reload_interval: float = 2.0,
+    ):
+        self.registry = ModelRegistry(model_path)
+        self.stats = ServiceStats()
+        self.batcher = MicroBatcher(self.registry, max_batch, max_wait_ms, self.stats)
+        self.socket_path = Path(socket_path)
+        self.budget = budget_ms / 1000
+        self.reload_interval = reload_interval
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self._stop = threading.Event()
+
+    def handle(self, req: dict) -> dict:
+        """Serve one request (also usable in-process, without the socket)."""
+        if req.get("cmd") == "stats":
+            return {**self.stats.to_dict(), "model_version": self.registry.current.version}
+        started = time.monotonic()
+        budget = min(self.budget, float(req.get("budget_ms", 1e9)) / 1000)
+        self.stats.requests += 1
+        try:
+            vec = request_vector(req, self.registry.current)
+            fut = self.batcher.submit(vec, started + budget)
+            proba, model = fut.result(timeout=max(0.0, started + budget - time.monotonic()))
+        except (ServiceTimeout, TimeoutError):
+            self.stats.timeouts += 1
+            return {"error": "timeout"}
+        except Exception as e:
+            self.stats.errors += 1
+            return {"error": str(e)}
+        direction, conf = direction_from_probs(proba, model.labels)
+        return {
+            "proba": [round(float(p), 6) for p in proba],
+            "direction": direction,
+            "confidence": round(conf, 4),
+            "model_version": model.version,
+            "latency_ms": round((time.monotonic() - started) * 1000, 3),
+        }
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.reload_interval):
+            if self.registry.maybe_reload():
+                self.stats.reloads += 1
+
+    def start(self) -> None:
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        resp = service.handle(json.loads(line))
+                    except ValueError as e:
+                        resp = {"error": f"bad request: {e}"}
+                    self.wfile.write((json.dumps(resp) + "\n").encode())
+                    self.wfile.flush()
+
+        class Server(socketserver.ThreadingUnixStreamServer):
+            request_queue_size = 128  # every bot process connects at startup
+            daemon_threads = True
+
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self._server = Server(str(self.socket_path), Handler)
+        self.batcher.start()
+        threading.Thread(target=self._watch, name="inference-reload", daemon=True).start()
+        threading.Thread(target=self._server.serve_forever, name="inference-server", daemon=True).start()
+        logger.info(f"inference service on {self.socket_path} (model v{self.registry.current.version})")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.batcher.stop()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+class InferenceClient:
+    """Persistent client; predict() returns None on timeout/unavailable so callers can skip the tick."""
+
+    def __init__(self, socket_path: Path = DEFAULT_SOCKET, timeout_ms: float = 100.0, transport_grace_ms: float = 100.0):
+        self.socket_path = str(socket_path)
+        self.timeout = timeout_ms / 1000  # sent as the server-side budget
+        self.grace = transport_grace_ms / 1000
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+
+    def _connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # the server answers {"error": "timeout"} once the budget is spent; grace covers the round trip
+        sock.settimeout(self.timeout + self.grace)
+        sock.connect(self.socket_path)
+        self._sock, self._file = sock, sock.makefile("rb")
+
+    def request(self, req: dict) -> Optional[dict]:
+        try:
+            if self._sock is None:
+                self._connect()
+            self._sock.sendall((json.dumps(req) + "\n").encode())
+            line = self._file.readline()
+            if not line:
+                raise ConnectionError("service closed connection")
+            return json.loads(line)
+        except (OSError, ValueError) as e:
+            logger.debug(f"inference request failed: {e}")
+            self.close()
+            return None
+
+    def predict(self, features: Optional[Sequence[float]] = None, row: Optional[Dict[str, float]] = None,
+                candles: Optional[Sequence[Sequence[float]]] = None) -> Optional[dict]:
+        req: dict = {"budget_ms": self.timeout * 1000}
+        if features is not None:
+            req["features"] = [float(x) for x in features]
+        elif row is not None:
+            req["row"] = row
+        elif candles is not None:
+            req["candles"] = [list(c) for c in candles]
+        resp = self.request(req)
+        if resp is None or "error" in resp:
+            return None
+        return resp
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+
+# ---------------- optional compact export ----------------
+def export_onnx(model_path: Path, n_features: int, output: Optional[Path] = None) -> Path:
+    """Convert a pickled sklearn/LightGBM model to ONNX (needs skl2onnx or onnxmltools)."""
+    loaded = _load_artifact(model_path, 0)
+    output = output or model_path.with_suffix(".onnx")
+    model = loaded.model
+    if type(model).__module__.startswith("lightgbm"):
+        import onnxmltools  # type: ignore
+        from onnxmltools.convert.common.data_types import FloatTensorType  # type: ignore
+
+        onx = onnxmltools.convert_lightgbm(model, initial_types=[("input", FloatTensorType([None, n_features]))])
+    else:
+        from skl2onnx import to_onnx  # type: ignore
+
+        onx = to_onnx(model, np.zeros((1, n_features), dtype=np.float32), options={"zipmap": False})
+    output.write_bytes(onx.SerializeToString())
+    if loaded.features:
+        output.with_suffix(".features.json").write_text(json.dumps(loaded.features))
+    if loaded.labels:
+        output.with_suffix(".labels.json").write_text(json.dumps(loaded.labels))
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve model predictions over a local Unix socket.")
+    parser.add_argument("--model", type=Path, required=True, help="Model pickle (or .onnx) from train_supervised.py / train_rl.py.")
+    parser.add_argument("--socket", type=Path, default=DEFAULT_SOCKET, help="Unix socket path.")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="Per-request latency budget.")
+    parser.add_argument("--max-batch", type=int, default=64, help="Max rows per predict call.")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Max wait to fill a batch.")
+    parser.add_argument("--export-onnx", type=int, default=None, metavar="N_FEATURES", help="Export the model to ONNX and exit.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.export_onnx:
+        print(f"Exported {export_onnx(args.model, args.export_onnx)}")
+        return
+
+    service = InferenceService(args.model, args.socket, args.budget_ms, args.max_batch, args.max_wait_ms)
+    service.start()
+    try:
+        while True:
+            time.sleep(60)
+            logger.info(f"stats: {service.stats.to_dict()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,7 @@ import argparse
 import json
 import pickle
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
@@ -27,46 +27,51 @@ from ai_dev import config
 from ai_dev.inference import select_features, predict
 
 
-def load_model(path: Path):
+LABEL_DIRECTIONS = {-1: "SHORT", 0: "NEUTRAL", 1: "LONG"}
+TRAIN_LABELS = (-1, 0, 1)  # train_supervised shifts these by +1, so column i is label i - 1
+
+
+def load_artifact(path: Path) -> Tuple[object, Optional[List[int]]]:
+    """Return (model, labels); labels maps each probability column to its original label value."""
     with path.open("rb") as f:
         obj = pickle.load(f)
-    # Some saved objects may wrap model in dict
+    # train_supervised wraps the model in a dict with its features and labels
     if isinstance(obj, dict) and "model" in obj:
-        return obj["model"]
-    return obj
+        return obj["model"], obj.get("labels")
+    return obj, None
 
 
-def direction_from_probs(probs: np.ndarray) -> Tuple[str, float]:
+def load_model(path: Path):
+    return load_artifact(path)[0]
+
+
+def direction_from_probs(probs: np.ndarray, labels: Optional[Sequence[int]] = None) -> Tuple[str, float]:
     """
-    probs shape (num_classes,) for labels mapped to [-1,0,1] or shifted classes.
-    We infer direction by argmax: 0 -> NEUTRAL, 1 -> LONG, 2 -> SHORT (or if 3 classes).
+    probs shape (num_classes,). labels gives the original label (-1/0/1) of each column;
+    without it, binary models are 0=NEUTRAL/1=LONG and 3-class models follow
+    train_supervised's shift (0=SHORT, 1=NEUTRAL, 2=LONG).
     """
-    if probs.shape[0] == 2:
-        # binary case: class 0/1
-        idx = int(np.argmax(probs))
-        if idx == 0:
-            return "NEUTRAL", float(probs[idx])
-        else:
-            return "LONG", float(probs[idx])
+    if labels is None:
+        labels = (0, 1) if probs.shape[0] == 2 else TRAIN_LABELS
     idx = int(np.argmax(probs))
-    if idx == 0:
-        return "NEUTRAL", float(probs[idx])
-    if idx == 1:
-        return "LONG", float(probs[idx])
-    return "SHORT", float(probs[idx])
+    label = int(labels[idx]) if idx < len(labels) else 0
+    return LABEL_DIRECTIONS.get(label, "NEUTRAL"), float(probs[idx])
 
 
 def main():
     parser = argparse.ArgumentParser(description="Generate strategy bias JSON from model predictions (non-intrusive).")
     parser.add_argument("--dataset", type=Path, default=config.DEFAULT_OUTPUT, help="Feature dataset parquet.")
-    parser.add_argument("--model", type=Path, required=True, help="Model pickle.")
+    parser.add_argument("--model", type=Path, default=None, help="Model pickle (not needed with --service).")
     parser.add_argument("--label-col", type=str, default="label_15m_0.25", help="Label column for feature selection.")
     parser.add_argument("--rows", type=int, default=100, help="Number of latest rows to score.")
     parser.add_argument("--output", type=Path, default=config.ARTIFACT_DIR / "strategy_bias.json", help="Output JSON file.")
     parser.add_argument("--multiplier-long", type=float, default=1.2, help="Position size multiplier when long bias.")
     parser.add_argument("--multiplier-short", type=float, default=1.2, help="Position size multiplier when short bias.")
     parser.add_argument("--base-leverage", type=int, default=5, help="Base leverage for bias suggestion.")
+    parser.add_argument("--service", type=Path, default=None, help="Query a running inference_service socket instead of loading --model.")
     args = parser.parse_args()
+    if args.model is None and args.service is None:
+        parser.error("--model is required unless --service is given")
 
     df = pd.read_parquet(args.dataset, engine="pyarrow")
     if args.label_col not in df.columns:
@@ -75,14 +80,21 @@ def main():
     features = select_features(df, args.label_col)
     X = sample[features].values
 
-    model = load_model(args.model)
-    preds, proba = predict(model, X)
-    if proba is None:
-        raise ValueError("Model does not provide probabilities; cannot compute confidence.")
+    if args.service:
+        from ai_dev.inference_service import InferenceClient
 
-    # Use last row prediction as latest signal
-    last_prob = proba[-1]
-    direction, conf = direction_from_probs(last_prob)
+        resp = InferenceClient(args.service, timeout_ms=1000).predict(features=X[-1])
+        if resp is None:
+            raise RuntimeError(f"Inference service at {args.service} did not answer.")
+        # the service already decodes with the model's own label order
+        direction, conf = resp["direction"], float(resp["confidence"])
+    else:
+        model, labels = load_artifact(args.model)
+        preds, proba = predict(model, X)
+        if proba is None:
+            raise ValueError("Model does not provide probabilities; cannot compute confidence.")
+        # Use last row prediction as latest signal
+        direction, conf = direction_from_probs(proba[-1], labels)
     if direction == "LONG":
         mult = args.multiplier_long
         lev = args.base_leverage
@@ -8,12 +8,11 @@ from __future__ import annotations
 import argparse
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple
-
 import numpy as np
 import pandas as pd
 
 from ai_dev import config
+from ai_dev.feature_store import FeatureView, prepare_obs
 
 
 @dataclass
@@ -30,17 +29,24 @@ class DatasetTradingEnv:
     def __init__(self, df: pd.DataFrame, cfg: ReplayConfig):
         self.cfg = cfg
         self.df = df.reset_index(drop=True)
-        self.features, self.feature_cols = self._prepare_obs(df)
+        self.features, self.feature_cols = prepare_obs(df)
         self.returns = df[cfg.future_col].values
         self.ptr = 0
         self.steps = 0
         self.max_steps = cfg.max_steps or len(self.features)
 
-    def _prepare_obs(self, df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-        drop_cols = [c for c in numeric_cols if c.startswith("future_ret_")] + [c for c in numeric_cols if c.startswith("label_")]
-        feature_cols = [c for c in numeric_cols if c not in drop_cols]
-        return df[feature_cols].to_numpy(dtype=np.float32), feature_cols
+    @classmethod
+    def from_view(cls, view: FeatureView, cfg: ReplayConfig) -> "DatasetTradingEnv":
+        """Build over memory-mapped feature store arrays (no DataFrame copy per worker)."""
+        env = cls.__new__(cls)
+        env.cfg = cfg
+        env.df = None
+        env.features, env.feature_cols = view.obs, list(view.feature_cols)
+        env.returns = view.future_col(cfg.future_col)
+        env.ptr = 0
+        env.steps = 0
+        env.max_steps = cfg.max_steps or len(env.features)
+        return env
 
     def reset(self):
         self.ptr = 0
@@ -84,11 +90,19 @@ def main():
     parser.add_argument("--steps", type=int, default=200, help="Max steps per episode.")
     parser.add_argument("--leverage", type=int, default=5, help="Leverage for reward calc.")
     parser.add_argument("--position-size", type=float, default=1.0, help="Position size factor for reward.")
+    parser.add_argument("--store", type=Path, default=None, help="Read from feature store root instead of --dataset.")
+    parser.add_argument("--start", type=str, default=None, help="First day (YYYY-MM-DD) when using --store.")
+    parser.add_argument("--end", type=str, default=None, help="Last day (YYYY-MM-DD) when using --store.")
     args = parser.parse_args()
 
-    df = load_dataset(args.dataset, limit=args.limit)
     cfg = ReplayConfig(dataset=args.dataset, future_col=args.future_col, leverage=args.leverage, position_size=args.position_size, max_steps=args.steps)
-    env = DatasetTradingEnv(df, cfg)
+    if args.store:
+        from ai_dev.feature_store import FeatureStore
+
+        env = DatasetTradingEnv.from_view(FeatureStore(args.store).load(args.start, args.end), cfg)
+    else:
+        df = load_dataset(args.dataset, limit=args.limit)
+        env = DatasetTradingEnv(df, cfg)
 
     obs = env.reset()
     total_reward = 0.0
@@ -167,8 +167,15 @@ def main():
     out_path.parent.mkdir(parents=True, exist_ok=True)
     import pickle
 
+    # labels[i] is the original label of probability column i (undoes label_shift for decoding)
+    artifact = {
+        "model": model,
+        "features": features,
+        "labels": [int(c) - label_shift for c in np.unique(y_train)],
+        "label_col": args.label_col,
+    }
     with open(out_path, "wb") as f:
-        pickle.dump(model, f)
+        pickle.dump(artifact, f)
     print(f"Saved model to {out_path}")
 
 
@@ -8,12 +8,14 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
 
 from ai_dev import config
+from ai_dev.hybrid_env import ActionSpec
+from ai_dev.vector_env import RolloutBuffer, action_table, compute_rewards
 
 
 def select_features(df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
@@ -23,6 +25,36 @@ def select_features(df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
     return df[feat_cols].to_numpy(dtype=np.float32), feat_cols
 
 
+def build_trajectory_arrays(
+    df: pd.DataFrame,
+    label_col: str,
+    future_col: str,
+    fee_rate: float = 0.0005,
+    leverage: int = 5,
+    position_size: float = 1.0,
+) -> Dict[str, np.ndarray]:
+    """Label-policy trajectory as flat arrays (obs, action, reward, done, ret); one row per step."""
+    features, feat_cols = select_features(df)
+    labels = df[label_col].to_numpy()
+    future = df[future_col].to_numpy(dtype=np.float32)
+    n = len(df) - 1
+    table = action_table([
+        ActionSpec(mode="HOLD", position_size=0.0, leverage=1),
+        ActionSpec(mode="LONG", position_size=position_size, leverage=leverage),
+        ActionSpec(mode="SHORT", position_size=position_size, leverage=leverage),
+    ])
+    actions = np.where(labels[:n] == -1, 2, labels[:n]).astype(np.int8)
+    done = np.zeros(n, dtype=bool)
+    done[-1] = True
+    return {
+        "obs": features[:n],
+        "action": actions,
+        "reward": compute_rewards(actions, future[:n], table, fee_rate),
+        "done": done,
+        "ret": future[:n],
+    }
+
+
 def export_trajectories(
     df: pd.DataFrame,
     label_col: str,
@@ -31,28 +63,15 @@ def export_trajectories(
     leverage: int = 5,
     position_size: float = 1.0,
 ) -> List[dict]:
-    features, feat_cols = select_features(df)
-    labels = df[label_col].values
-    future = df[future_col].values
-    traj = []
-    for i in range(len(df) - 1):
-        obs = features[i].tolist()
-        label = labels[i]
-        if label == 1:
-            action = 1
-            reward = future[i] / 100 * leverage * position_size - fee_rate * leverage * position_size
-        elif label == -1:
-            action = 2
-            reward = -future[i] / 100 * leverage * position_size - fee_rate * leverage * position_size
-        else:
-            action = 0
-            reward = 0.0
-        done = False
-        info = {"ret": float(future[i])}
-        traj.append({"obs": obs, "action": int(action), "reward": float(reward), "done": done, "info": info})
-    # Mark last step done
-    traj[-1]["done"] = True
-    return traj
+    arrays = build_trajectory_arrays(df, label_col, future_col, fee_rate, leverage, position_size)
+    buf = RolloutBuffer(
+        obs=arrays["obs"][:, None, :],
+        actions=arrays["action"][:, None],
+        rewards=arrays["reward"][:, None],
+        dones=arrays["done"][:, None],
+        rets=arrays["ret"][:, None],
+    )
+    return list(buf.iter_records())
 
 
 def main():
@@ -60,7 +79,7 @@ def main():
     parser.add_argument("--dataset", type=Path, default=config.DEFAULT_OUTPUT, help="Feature dataset parquet.")
     parser.add_argument("--label-col", type=str, default="label_15m_0.25", help="Label column (-1/0/1).")
     parser.add_argument("--future-col", type=str, default="future_ret_15m", help="Future return column for reward.")
-    parser.add_argument("--output", type=Path, default=config.ARTIFACT_DIR / "trajectories.json", help="Output json.")
+    parser.add_argument("--output", type=Path, default=config.ARTIFACT_DIR / "trajectories.json", help="Output json (.npz writes the arrays directly).")
     parser.add_argument("--limit", type=int, default=200000, help="Row limit for faster export.")
     parser.add_argument("--leverage", type=int, default=5, help="Reward leverage factor.")
     parser.add_argument("--position-size", type=float, default=1.0, help="Reward position size factor.")
@@ -73,6 +92,20 @@ def main():
     if args.label_col not in df.columns or args.future_col not in df.columns:
         raise ValueError("Missing label or future return column in dataset.")
 
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    if args.output.suffix == ".npz":
+        arrays = build_trajectory_arrays(
+            df,
+            label_col=args.label_col,
+            future_col=args.future_col,
+            fee_rate=args.fee_rate,
+            leverage=args.leverage,
+            position_size=args.position_size,
+        )
+        np.savez(args.output, **arrays)
+        print(f"Saved trajectory arrays to {args.output} (steps {len(arrays['reward'])})")
+        return
+
     traj = export_trajectories(
         df,
         label_col=args.label_col,
@@ -81,7 +114,6 @@ def main():
         leverage=args.leverage,
         position_size=args.position_size,
     )
-    args.output.parent.mkdir(parents=True, exist_ok=True)
     with args.output.open("w") as f:
         json.dump(traj, f)
     print(f"Saved trajectories to {args.output} (steps {len(traj)}) using label {args.label_col} and future {args.future_col}")
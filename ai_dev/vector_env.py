@@ -0,0 +1,313 @@
+"""
+Vectorized dataset trading env (standalone, no runtime side effects).
+Steps N independent episodes in lockstep over one shared observation array:
+ - obs / future returns come from a feature store view (memory-mapped) or a DataFrame
+ - rewards, positions and episode PnL are array operations over the N envs
+ - same reward as DatasetTradingEnv: dir * ret / 100 * leverage * size - fee (fee on non-HOLD actions)
+ - finished envs reset automatically; starts are drawn from a seeded generator
+ - sharded_rollout() splits envs across worker processes that each map the same store files
+Actions follow HybridTradingEnv action specs (default 0=HOLD, 1=LONG, 2=SHORT).
+"""
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from ai_dev.feature_store import DEFAULT_STORE_DIR, FeatureSpec, FeatureStore, FeatureView, prepare_obs
+from ai_dev.hybrid_env import ActionSpec
+
+DEFAULT_ACTION_SPECS = (
+    ActionSpec(mode="HOLD", position_size=0.0, leverage=1),
+    ActionSpec(mode="LONG", position_size=1.0, leverage=5),
+    ActionSpec(mode="SHORT", position_size=1.0, leverage=5),
+)
+
+
+@dataclass
+class VecEnvConfig:
+    num_envs: int = 64
+    future_col: str = "future_ret_15m"
+    fee_rate: float = 0.0005
+    max_steps: int = 1440  # steps per episode
+    seed: int = 0
+    random_starts: bool = True  # False: env i replays the i-th contiguous segment
+    action_specs: Sequence[ActionSpec] = DEFAULT_ACTION_SPECS
+
+
+def action_table(specs: Sequence[ActionSpec]) -> np.ndarray:
+    """(n_actions, 2) float32: signed exposure (dir * size * leverage), fee multiplier (size * leverage)."""
+    table = np.zeros((len(specs), 2), dtype=np.float32)
+    for i, spec in enumerate(specs):
+        mode = spec.mode.upper()
+        direction = -1.0 if "SHORT" in mode else (1.0 if "LONG" in mode else 0.0)
+        table[i, 0] = direction * spec.position_size * spec.leverage
+        table[i, 1] = spec.position_size * spec.leverage if direction else 0.0
+    return table
+
+
+def compute_rewards(actions: np.ndarray, returns: np.ndarray, table: np.ndarray, fee_rate: float) -> np.ndarray:
+    """Vectorized reward for any shape of actions/returns (percent future returns)."""
+    exposure = table[actions, 0]
+    return (exposure * returns / 100 - fee_rate * table[actions, 1]).astype(np.float32)
+
+
+class VectorTradingEnv:
+    def __init__(
+        self,
+        obs: np.ndarray,
+        returns: np.ndarray,
+        cfg: VecEnvConfig,
+        feature_cols: Optional[List[str]] = None,
+        labels: Optional[np.ndarray] = None,
+        label_cols: Optional[List[str]] = None,
+    ):
+        if len(obs) < 2:
+            raise ValueError("need at least 2 rows to step")
+        self.cfg = cfg
+        self.obs = obs
+        self.returns = np.asarray(returns, dtype=np.float32)
+        self.feature_cols = feature_cols or []
+        self.labels = labels
+        self.label_cols = label_cols or []
+        self.table = action_table(cfg.action_specs)
+        self.rng = np.random.default_rng(cfg.seed)
+
+        n = cfg.num_envs
+        last = len(obs) - 1  # final row has no next observation
+        self.episode_len = max(1, min(cfg.max_steps, last))
+        if cfg.random_starts:
+            self.seg_lo = np.zeros(n, dtype=np.int64)
+            self.seg_hi = np.full(n, last, dtype=np.int64)
+        else:
+            edges = np.linspace(0, last, n + 1).astype(np.int64)
+            self.seg_lo, self.seg_hi = edges[:-1], np.maximum(edges[1:], edges[:-1] + 1)
+        self.ptr = np.zeros(n, dtype=np.int64)
+        self.end = np.zeros(n, dtype=np.int64)
+        self.position = np.zeros(n, dtype=np.float32)
+        self.episode_pnl = np.zeros(n, dtype=np.float32)
+        self.episode_steps = np.zeros(n, dtype=np.int64)
+
+    @classmethod
+    def from_view(cls, view: FeatureView, cfg: VecEnvConfig) -> "VectorTradingEnv":
+        return cls(view.obs, view.future_col(cfg.future_col), cfg, view.feature_cols, view.labels, view.label_cols)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, cfg: VecEnvConfig) -> "VectorTradingEnv":
+        obs, cols = prepare_obs(df)
+        label_cols = [c for c in df.columns if c.startswith("label_")]
+        labels = df[label_cols].to_numpy(dtype=np.int8) if label_cols else None
+        return cls(obs, df[cfg.future_col].to_numpy(), cfg, cols, labels, label_cols)
+
+    @property
+    def num_envs(self) -> int:
+        return self.cfg.num_envs
+
+    def _start(self, idx: np.ndarray) -> None:
+        lo, hi = self.seg_lo[idx], self.seg_hi[idx]
+        if self.cfg.random_starts:
+            span = np.maximum(hi - lo - self.episode_len, 0)
+            start = lo + (self.rng.random(len(idx)) * (span + 1)).astype(np.int64)
+        else:
+            start = lo
+        self.ptr[idx] = start
+        self.end[idx] = np.minimum(start + self.episode_len, hi)
+        self.position[idx] = 0.0
+        self.episode_pnl[idx] = 0.0
+        self.episode_steps[idx] = 0
+
+    def reset(self) -> np.ndarray:
+        self._start(np.arange(self.num_envs))
+        return np.asarray(self.obs[self.ptr])
+
+    def step(self, actions: np.ndarray):
+        """
+        actions: int array (num_envs,). Returns obs (N, D), rewards (N,), dones (N,), info dict of arrays.
+        Envs that finish are reset; their next obs is the first obs of the new episode.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        ret = self.returns[self.ptr]
+        rewards = compute_rewards(actions, ret, self.table, self.cfg.fee_rate)
+        self.position = self.table[actions, 0]
+        self.episode_pnl += rewards
+        self.episode_steps += 1
+        self.ptr += 1
+        dones = self.ptr >= self.end
+        info: Dict[str, np.ndarray] = {
+            "ret": ret,
+            "position": self.position.copy(),
+            "episode_pnl": self.episode_pnl.copy(),
+        }
+        if dones.any():
+            idx = np.flatnonzero(dones)
+            info["episode_return"] = np.where(dones, self.episode_pnl, np.nan).astype(np.float32)
+            self._start(idx)
+        return np.asarray(self.obs[self.ptr]), rewards, dones, info
+
+
+# ---------------- policies ----------------
+class RandomPolicy:
+    def __init__(self, seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, env: VectorTradingEnv, obs: np.ndarray) -> np.ndarray:
+        return self.rng.integers(0, len(env.table), size=env.num_envs)
+
+
+class LabelPolicy:
+    """Behaviour-cloning target: label -1/0/1 -> SHORT/HOLD/LONG (action 2/0/1)."""
+
+    def __init__(self, label_col: str):
+        self.label_col = label_col
+
+    def __call__(self, env: VectorTradingEnv, obs: np.ndarray) -> np.ndarray:
+        if env.labels is None or self.label_col not in env.label_cols:
+            raise ValueError(f"Label column {self.label_col} not found.")
+        label = np.asarray(env.labels[env.ptr, env.label_cols.index(self.label_col)])
+        return np.where(label == -1, 2, label).astype(np.int64)
+
+
+# ---------------- rollout buffers ----------------
+@dataclass
+class RolloutBuffer:
+    """Time-major (T, N, ...) arrays filled in place by rollout()."""
+    obs: np.ndarray
+    actions: np.ndarray
+    rewards: np.ndarray
+    dones: np.ndarray
+    rets: np.ndarray
+
+    @classmethod
+    def allocate(cls, steps: int, num_envs: int, obs_dim: int) -> "RolloutBuffer":
+        return cls(
+            obs=np.zeros((steps, num_envs, obs_dim), dtype=np.float32),
+            actions=np.zeros((steps, num_envs), dtype=np.int8),
+            rewards=np.zeros((steps, num_envs), dtype=np.float32),
+            dones=np.zeros((steps, num_envs), dtype=bool),
+            rets=np.zeros((steps, num_envs), dtype=np.float32),
+        )
+
+    @property
+    def steps(self) -> int:
+        return self.rewards.shape[0]
+
+    def flat(self) -> Dict[str, np.ndarray]:
+        """Env-major flattening: each env's steps stay contiguous (episodes end on done=True)."""
+        return {
+            "obs": self.obs.swapaxes(0, 1).reshape(-1, self.obs.shape[-1]),
+            "action": self.actions.T.reshape(-1),
+            "reward": self.rewards.T.reshape(-1),
+            "done": self.dones.T.reshape(-1),
+            "ret": self.rets.T.reshape(-1),
+        }
+
+    def save_npz(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, **self.flat())
+
+    def iter_records(self) -> Iterator[dict]:
+        flat = self.flat()
+        for i in range(len(flat["reward"])):
+            yield {
+                "obs": flat["obs"][i].tolist(),
+                "action": int(flat["action"][i]),
+                "reward": float(flat["reward"][i]),
+                "done": bool(flat["done"][i]),
+                "info": {"ret": float(flat["ret"][i])},
+            }
+
+    @staticmethod
+    def concat(buffers: Sequence["RolloutBuffer"]) -> "RolloutBuffer":
+        return RolloutBuffer(*(np.concatenate([getattr(b, f) for b in buffers], axis=1) for f in ("obs", "actions", "rewards", "dones", "rets")))
+
+
+def rollout(env: VectorTradingEnv, policy: Callable[[VectorTradingEnv, np.ndarray], np.ndarray], steps: int) -> RolloutBuffer:
+    buf = RolloutBuffer.allocate(steps, env.num_envs, env.obs.shape[1])
+    obs = env.reset()
+    for t in range(steps):
+        actions = policy(env, obs)
+        buf.obs[t] = obs
+        buf.actions[t] = actions
+        obs, buf.rewards[t], buf.dones[t], info = env.step(actions)
+        buf.rets[t] = info["ret"]
+    buf.dones[-1] = True  # truncate the open episodes at the buffer edge
+    return buf
+
+
+def _shard_worker(
+    store_root: Path,
+    start: Optional[str],
+    end: Optional[str],
+    cfg: VecEnvConfig,
+    steps: int,
+    policy,
+    spec: Optional[FeatureSpec] = None,
+) -> RolloutBuffer:
+    view = FeatureStore(store_root, spec).load(start, end)  # mmap: pages are shared with the other workers
+    env = VectorTradingEnv.from_view(view, cfg)
+    if isinstance(policy, RandomPolicy):
+        policy = RandomPolicy(cfg.seed)
+    return rollout(env, policy, steps)
+
+
+def sharded_rollout(
+    store_root: Path,
+    cfg: VecEnvConfig,
+    steps: int,
+    policy,
+    workers: int = 1,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    spec: Optional[FeatureSpec] = None,
+) -> RolloutBuffer:
+    """
+    Split cfg.num_envs across worker processes; each shard gets its own seed from
+    SeedSequence(cfg.seed), so the result depends only on (seed, workers).
+    Policies must be picklable (RandomPolicy / LabelPolicy are).
+    A multi-day range is materialized in the parent before the workers start.
+    `spec` selects the feature set (default FeatureSpec()); every worker maps the same one.
+    """
+    workers = max(1, min(workers, cfg.num_envs))
+    sizes = np.diff(np.linspace(0, cfg.num_envs, workers + 1).astype(int))
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(cfg.seed).spawn(workers)]
+    shard_cfgs = [replace(cfg, num_envs=int(n), seed=s) for n, s in zip(sizes, seeds)]
+    if workers == 1:
+        return _shard_worker(store_root, start, end, shard_cfgs[0], steps, policy, spec)
+    FeatureStore(store_root, spec).load(start, end)  # materialize the range once; workers only map it
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_shard_worker, store_root, start, end, c, steps, policy, spec) for c in shard_cfgs]
+        return RolloutBuffer.concat([f.result() for f in futures])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized rollout over the feature store (throughput check).")
+    parser.add_argument("--store", type=Path, default=DEFAULT_STORE_DIR, help="Feature store root.")
+    parser.add_argument("--start", type=str, default=None, help="First day (YYYY-MM-DD).")
+    parser.add_argument("--end", type=str, default=None, help="Last day (YYYY-MM-DD).")
+    parser.add_argument("--num-envs", type=int, default=64, help="Parallel episodes.")
+    parser.add_argument("--steps", type=int, default=1000, help="Lockstep steps.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes.")
+    parser.add_argument("--seed", type=int, default=0, help="Rollout seed.")
+    parser.add_argument("--output", type=Path, default=None, help="Optional .npz buffer output.")
+    args = parser.parse_args()
+
+    import time
+
+    cfg = VecEnvConfig(num_envs=args.num_envs, seed=args.seed)
+    t0 = time.perf_counter()
+    buf = sharded_rollout(args.store, cfg, args.steps, RandomPolicy(args.seed), args.workers, args.start, args.end)
+    elapsed = time.perf_counter() - t0
+    total = buf.rewards.size
+    print(f"{total:,} transitions in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} steps/s), mean reward {buf.rewards.mean():.6f}")
+    if args.output:
+        buf.save_npz(args.output)
+        print(f"Saved buffer to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,9 @@ from pathlib import Path
 from dotenv import load_dotenv
 from openai import OpenAI
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.bridge_channel import BridgeChannel
+
 # Load environment variables
 load_dotenv()
 
@@ -30,30 +33,28 @@ MEMORY_FILE = "ai_dragon2_memory.json"
 MARKET_MEMORY_FILE = "ai_dragon2_market_memory.json"
 TEAM_CONFIG_FILE = "config/ai_dragon2_config.json"
 BRIDGE_FILE = "ai_dragon2_bridge.json"
+BRIDGE_DEFAULTS = {
+    "ai_to_dragon2": {"command": "WAIT"},
+    "dragon2_to_ai": {"status": "IDLE"},
+    "feedback_loop": {"total_trades": 0}
+}
 
 # ================================================================
 # 檔案操作函數
 # ================================================================
 
+def _bridge_channel():
+    """橋接通道 (ai_*_bridge.json 僅保留為除錯鏡像)"""
+    return BridgeChannel.for_bridge_file(BRIDGE_FILE, defaults=BRIDGE_DEFAULTS)
+
 def load_bridge():
     """載入 AI-Dragon2 橋接資料"""
-    if os.path.exists(BRIDGE_FILE):
-        try:
-            with open(BRIDGE_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            pass
-    return {
-        "ai_to_dragon2": {"command": "WAIT"},
-        "dragon2_to_ai": {"status": "IDLE"},
-        "feedback_loop": {"total_trades": 0}
-    }
+    return _bridge_channel().load()
 
 def save_bridge(bridge):
     """儲存 AI-Dragon2 橋接資料"""
-    bridge['last_updated'] = datetime.now().isoformat()
-    with open(BRIDGE_FILE, 'w') as f:
-        json.dump(bridge, f, indent=2)
+    # 只發布有變動的 section，不會覆蓋交易端同時寫入的狀態
+    _bridge_channel().save(bridge)
 
 def load_team_config():
     """載入 AI 團隊配置"""
@@ -399,14 +400,7 @@ def run_council_meeting(trading_data, market_snapshot, signals_df, whale_flip_df
     
     # --- 從 Dragon Bridge 讀取即時數據 ---
     # 注意：Dragon2 讀取 Dragon 的 Bridge (因為共用 Kimi advisor)
-    dragon_bridge_file = "ai_dragon_bridge.json"
-    if os.path.exists(dragon_bridge_file):
-        with open(dragon_bridge_file, 'r') as f:
-            dragon_bridge = json.load(f)
-    else:
-        dragon_bridge = {}
-    
-    dragon_data = dragon_bridge.get('dragon_to_ai', {})
+    dragon_data = BridgeChannel.for_bridge_file("ai_dragon_bridge.json").get('dragon_to_ai', {}) or {}
     rt_whale = dragon_data.get('whale_status', {})
     rt_micro = dragon_data.get('market_microstructure', {})
     
@@ -710,16 +704,8 @@ REAL-TIME MICRO: {rt_micro}
         
         # 同時寫入 Dragon Bridge (因為 paper_trading 讀取的是 dragon bridge)
         # 這樣 M_DRAGON2 才能讀取到指令
-        dragon_bridge = {}
-        if os.path.exists("ai_dragon_bridge.json"):
-            with open("ai_dragon_bridge.json", 'r') as f:
-                dragon_bridge = json.load(f)
-        
-        dragon_bridge['ai_to_dragon2'] = bridge['ai_to_dragon2']
-        dragon_bridge['last_updated'] = datetime.now().isoformat()
-        
-        with open("ai_dragon_bridge.json", 'w') as f:
-            json.dump(dragon_bridge, f, indent=2)
+        # 只發布 ai_to_dragon2 這個 section，不覆寫 Dragon 交易員寫入的其他 section
+        BridgeChannel.for_bridge_file("ai_dragon_bridge.json").publish('ai_to_dragon2', bridge['ai_to_dragon2'])
         
         # 更新 Grand Strategy
         if 'grand_strategy_update' in result:
@@ -30,6 +30,9 @@ from pathlib import Path
 from dotenv import load_dotenv
 from openai import OpenAI
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.bridge_channel import BridgeChannel
+
 # Load environment variables
 load_dotenv()
 
@@ -126,6 +129,11 @@ MARKET_MEMORY_FILE = "ai_market_memory.json"
 TEAM_CONFIG_FILE = "config/ai_team_config.json"
 # 🆕 AI-Wolf 雙向溝通橋接檔案
 BRIDGE_FILE = "ai_wolf_bridge.json"
+BRIDGE_DEFAULTS = {
+    "ai_to_wolf": {"command": "WAIT"},
+    "wolf_to_ai": {"status": "IDLE"},
+    "feedback_loop": {"total_trades": 0}
+}
 
 # 🎯 高精準狙擊策略配置 
 # 🔧 v3.1: 「建議範圍」而非「強制目標」
@@ -357,19 +365,13 @@ def check_sniper_entry_conditions(bridge: dict, confidence: int) -> tuple:
     
     return (True, " | ".join(pass_reasons), leverage)
 
+def _bridge_channel():
+    """橋接通道 (ai_*_bridge.json 僅保留為除錯鏡像)"""
+    return BridgeChannel.for_bridge_file(BRIDGE_FILE, defaults=BRIDGE_DEFAULTS)
+
 def load_bridge():
     """載入 AI-Wolf 橋接資料"""
-    if os.path.exists(BRIDGE_FILE):
-        try:
-            with open(BRIDGE_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            pass
-    return {
-        "ai_to_wolf": {"command": "WAIT"},
-        "wolf_to_ai": {"status": "IDLE"},
-        "feedback_loop": {"total_trades": 0}
-    }
+    return _bridge_channel().load()
 
 
 def check_decision_stability(command: str, confidence: int) -> tuple:
@@ -508,9 +510,8 @@ def check_flip_cooldown(bridge: dict, new_command: str, new_confidence: int = 50
 
 def save_bridge(bridge):
     """儲存 AI-Wolf 橋接資料"""
-    bridge['last_updated'] = datetime.now().isoformat()
-    with open(BRIDGE_FILE, 'w') as f:
-        json.dump(bridge, f, indent=2)
+    # 只發布有變動的 section，不會覆蓋交易端同時寫入的狀態
+    _bridge_channel().save(bridge)
 
 def load_team_config():
     """載入 AI 團隊配置"""
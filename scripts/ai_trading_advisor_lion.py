@@ -31,6 +31,7 @@ from openai import OpenAI
 # 添加 src 目錄到路徑以導入 whale_strategy_detector
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from src.strategy.whale_strategy_detector import WhaleStrategyDetector, WhaleStrategy
+from src.bridge_channel import BridgeChannel
 
 # Load environment variables
 load_dotenv()
@@ -42,32 +43,31 @@ MEMORY_FILE = "ai_lion_memory.json"
 MARKET_MEMORY_FILE = "ai_lion_market_memory.json"
 TEAM_CONFIG_FILE = "config/ai_team_config.json"
 BRIDGE_FILE = "ai_lion_bridge.json"
+BRIDGE_DEFAULTS = {
+    "ai_to_wolf": {"command": "WAIT"},
+    "wolf_to_ai": {"status": "IDLE"},
+    "feedback_loop": {"total_trades": 0},
+    "v2_strategy_detection": {}  # 🆕 v2.0 策略檢測結果
+}
 
 # 🆕 v2.0 鯨魚策略檢測器實例 (全局)
 whale_detector = WhaleStrategyDetector()
 
 
+def _bridge_channel():
+    """橋接通道 (ai_*_bridge.json 僅保留為除錯鏡像)"""
+    return BridgeChannel.for_bridge_file(BRIDGE_FILE, defaults=BRIDGE_DEFAULTS)
+
+
 def load_bridge():
     """載入 AI-Lion 橋接資料"""
-    if os.path.exists(BRIDGE_FILE):
-        try:
-            with open(BRIDGE_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            pass
-    return {
-        "ai_to_wolf": {"command": "WAIT"},
-        "wolf_to_ai": {"status": "IDLE"},
-        "feedback_loop": {"total_trades": 0},
-        "v2_strategy_detection": {}  # 🆕 v2.0 策略檢測結果
-    }
+    return _bridge_channel().load()
 
 
 def save_bridge(bridge):
     """儲存 AI-Lion 橋接資料"""
-    bridge['last_updated'] = datetime.now().isoformat()
-    with open(BRIDGE_FILE, 'w') as f:
-        json.dump(bridge, f, indent=2)
+    # 只發布有變動的 section，不會覆蓋交易端同時寫入的狀態
+    _bridge_channel().save(bridge)
 
 
 def load_team_config():
@@ -4,28 +4,24 @@
 合併所有 trades_*.json 檔案
 """
 
-import json
-import os
+import sys
 from collections import defaultdict
+from pathlib import Path
+
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.trading.trade_analytics import get_trade_analytics, group_stats, stats_dict, trade_records  # noqa: E402
 
 def load_all_trades():
-    """載入所有交易記錄"""
+    """載入所有已關閉的交易記錄 (經由交易分析表，增量匯入新日誌)"""
     log_dir = 'logs/whale_paper_trader'
-    all_trades = []
-    
-    for f in sorted(os.listdir(log_dir)):
-        if f.startswith('trades_') and f.endswith('.json'):
-            try:
-                with open(os.path.join(log_dir, f)) as fp:
-                    data = json.load(fp)
-                    trades = data.get('trades', [])
-                    # 只取已關閉的交易
-                    closed = [t for t in trades if t.get('status', '').startswith('CLOSED')]
-                    all_trades.extend(closed)
-            except Exception as e:
-                print(f"讀取 {f} 失敗: {e}")
-    
-    return all_trades
+    analytics = get_trade_analytics(ROOT_DIR / 'data' / 'analytics')
+    analytics.ingest(log_dirs=[log_dir], journals=[])
+    return trade_records(analytics.trades(sources=[Path(log_dir).name]))
 
 
 def analyze_chaos_filter(trades, threshold=0.6, min_conflict_prob=0.5):
@@ -70,16 +66,13 @@ def calculate_stats(trades):
     if not trades:
         return {'count': 0, 'wins': 0, 'losses': 0, 'win_rate': 0, 'total_pnl': 0}
     
-    wins = [t for t in trades if t.get('net_pnl_usdt', 0) > 0]
-    losses = [t for t in trades if t.get('net_pnl_usdt', 0) <= 0]
-    total_pnl = sum(t.get('net_pnl_usdt', 0) for t in trades)
-    
+    stats = stats_dict(group_stats(pd.DataFrame(trades)))['all']
     return {
-        'count': len(trades),
-        'wins': len(wins),
-        'losses': len(losses),
-        'win_rate': len(wins) / len(trades) * 100 if trades else 0,
-        'total_pnl': total_pnl
+        'count': stats['trades'],
+        'wins': stats['wins'],
+        'losses': stats['losses'],
+        'win_rate': stats['win_rate'],
+        'total_pnl': stats['total_pnl_usdt']
     }
 
 
@@ -13,6 +13,9 @@ Important limitations:
 - Uses 1-minute candle closes (REST), not orderbook/VWAP. Live HALT diffs can be
   much larger due to expected_fill (slippage) and WS desync.
 - Ignores funding and execution latency. Optionally subtract fees.
+- With --binance-feed/--dydx-feed the minute series is sampled from feed
+  recordings instead, aligned as-of on exchange timestamps (same grid rules as
+  the live CrossVenueSpreadEngine).
 
 Output:
 - Summary stats (count/win-rate/avg pnl)
@@ -29,6 +32,7 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import requests
 
@@ -38,6 +42,7 @@ if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
 from scripts.backtest_realtime_24h import fetch_dydx_candles, process_candles  # noqa: E402
+from src.exchange.cross_venue_spread import aligned_spread_series, asof_align, load_top_of_book  # noqa: E402
 
 
 BINANCE_FAPI_KLINES = "https://fapi.binance.com/fapi/v1/klines"
@@ -110,6 +115,10 @@ def _parse_args() -> argparse.Namespace:
     p.add_argument("--cooldown-min", type=int, default=10, help="Min minutes between entries")
     p.add_argument("--show", type=int, default=15, help="Print top N events")
     p.add_argument("--sort", type=str, default="pnl", choices=["pnl", "spread", "binance_drop"], help="Sort output")
+
+    # Offline source
+    p.add_argument("--binance-feed", nargs="+", help="Binance feed recordings (replaces the REST klines)")
+    p.add_argument("--dydx-feed", nargs="+", help="dYdX feed recordings (replaces the REST candles)")
     return p.parse_args()
 
 
@@ -234,25 +243,60 @@ def simulate_dydx_trade(
     return exit_idx, reason, float(pnl_final), float(mae), float(mfe)
 
 
-def build_aligned_df(dydx_df: pd.DataFrame, binance_close: Dict[datetime, float]) -> pd.DataFrame:
-    rows = []
-    for _, r in dydx_df.iterrows():
-        t = to_minute(r["time"].to_pydatetime())
-        b = binance_close.get(t)
-        if b is None:
-            continue
-        d = float(r["close"])
-        spread_pct = (d - b) / b * 100.0 if b > 0 else 0.0
-        rows.append((t, float(b), float(d), float(spread_pct)))
+def _minute_ms(times: pd.Series) -> np.ndarray:
+    minutes = pd.to_datetime(times, utc=True).dt.floor("min")
+    return ((minutes - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.int64)
+
 
-    df = pd.DataFrame(rows, columns=["time", "binance_close", "dydx_close", "spread_pct"]).sort_values("time")
-    df = df.reset_index(drop=True)
+def _finish_aligned_df(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.sort_values("time", kind="stable").reset_index(drop=True)
 
     # Binance returns for trend
     df["binance_ret_1m_pct"] = df["binance_close"].pct_change(1) * 100.0
     return df
 
 
+def build_aligned_df(dydx_df: pd.DataFrame, binance_close: Dict[datetime, float]) -> pd.DataFrame:
+    """Join dYdX and Binance 1m closes on the same minute (minutes missing on Binance are dropped)."""
+    b_times = sorted(binance_close)
+    b_ts = np.array([int(t.timestamp() * 1000) for t in b_times], dtype=np.int64)
+    b_close = np.array([binance_close[t] for t in b_times], dtype=float)
+
+    d_ts = _minute_ms(dydx_df["time"])
+    b = asof_align(d_ts, b_ts, b_close, tolerance_ms=0)
+    keep = ~np.isnan(b)
+    b = b[keep]
+    d = dydx_df["close"].to_numpy(dtype=float)[keep]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spread_pct = np.where(b > 0, (d - b) / b * 100.0, 0.0)
+
+    df = pd.DataFrame({
+        "time": pd.to_datetime(d_ts[keep], unit="ms", utc=True),
+        "binance_close": b,
+        "dydx_close": d,
+        "spread_pct": spread_pct,
+    })
+    return _finish_aligned_df(df)
+
+
+def build_recorded_df(binance_paths: List[str], dydx_paths: List[str], hours: int) -> pd.DataFrame:
+    """Minute frame from feed recordings: both mids sampled as-of each minute on exchange timestamps."""
+    binance = load_top_of_book(binance_paths)
+    dydx = load_top_of_book(dydx_paths)
+    start_ms = None
+    if hours and len(binance[0]) and len(dydx[0]):
+        start_ms = int(min(binance[0][-1], dydx[0][-1])) - hours * 3_600_000
+
+    aligned = aligned_spread_series(binance, dydx, grid_ms=60_000, start_ms=start_ms)
+    df = pd.DataFrame({
+        "time": pd.to_datetime(aligned["time_ms"].to_numpy(dtype=np.int64), unit="ms", utc=True),
+        "binance_close": aligned["binance_mid"].to_numpy(dtype=float),
+        "dydx_close": aligned["dydx_mid"].to_numpy(dtype=float),
+        "spread_pct": aligned["spread_pct"].to_numpy(dtype=float),
+    })
+    return _finish_aligned_df(df)
+
+
 def find_events(
     df: pd.DataFrame,
     spread_entry_pct: float,
@@ -345,25 +389,31 @@ def summarize(events: List[EventResult]) -> Dict[str, float]:
 async def main() -> int:
     args = _parse_args()
 
-    candles = await fetch_dydx_candles(args.hours)
-    if len(candles) < 200:
-        print("❌ dYdX candles 不足")
-        return 2
+    if args.binance_feed or args.dydx_feed:
+        if not (args.binance_feed and args.dydx_feed):
+            print("❌ --binance-feed 與 --dydx-feed 需同時指定")
+            return 2
+        df = build_recorded_df(args.binance_feed, args.dydx_feed, args.hours)
+    else:
+        candles = await fetch_dydx_candles(args.hours)
+        if len(candles) < 200:
+            print("❌ dYdX candles 不足")
+            return 2
 
-    dydx_df = process_candles(candles)
-    start_utc = to_minute(dydx_df["time"].min().to_pydatetime())
-    end_utc = to_minute(dydx_df["time"].max().to_pydatetime())
+        dydx_df = process_candles(candles)
+        start_utc = to_minute(dydx_df["time"].min().to_pydatetime())
+        end_utc = to_minute(dydx_df["time"].max().to_pydatetime())
 
-    start_ms = int(start_utc.timestamp() * 1000)
-    end_ms = int(end_utc.timestamp() * 1000)
+        start_ms = int(start_utc.timestamp() * 1000)
+        end_ms = int(end_utc.timestamp() * 1000)
 
-    try:
-        binance_close = fetch_binance_1m_klines(args.symbol, start_ms, end_ms)
-    except Exception as e:
-        print(f"❌ Binance 1m K 線抓取失敗: {e}")
-        return 3
+        try:
+            binance_close = fetch_binance_1m_klines(args.symbol, start_ms, end_ms)
+        except Exception as e:
+            print(f"❌ Binance 1m K 線抓取失敗: {e}")
+            return 3
 
-    df = build_aligned_df(dydx_df, binance_close)
+        df = build_aligned_df(dydx_df, binance_close)
     if len(df) < 200:
         print("❌ 對齊後資料不足（交集太少）")
         return 4
@@ -14,40 +14,41 @@ dYdX 交易日誌分析工具
 """
 
 import json
+import sys
 import argparse
 from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
 from typing import List, Dict, Optional
 
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.trading.trade_analytics import JOURNAL_SOURCE, get_trade_analytics, group_stats, stats_dict  # noqa: E402
+
 
 JOURNAL_PATH = Path("logs/dydx_order_journal.jsonl")
+ANALYTICS_DIR = ROOT_DIR / "data" / "analytics"
+
+
+def _analytics():
+    """交易分析表 (先增量匯入 journal 新增的行)"""
+    analytics = get_trade_analytics(ANALYTICS_DIR)
+    analytics.ingest(log_dirs=[], journals=[JOURNAL_PATH])
+    return analytics
 
 
 def load_journal(date_filter: str = None) -> List[Dict]:
-    """載入 journal 記錄"""
+    """載入 journal 記錄 (fills 表保留原始事件)"""
     if not JOURNAL_PATH.exists():
         print(f"❌ 找不到 journal 檔案: {JOURNAL_PATH}")
         return []
     
-    events = []
-    with open(JOURNAL_PATH, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                event = json.loads(line)
-                # 日期過濾
-                if date_filter:
-                    ts = event.get('ts', '')
-                    if not ts.startswith(date_filter):
-                        continue
-                events.append(event)
-            except json.JSONDecodeError:
-                continue
-    
-    return events
+    fills = _analytics().fills(start=date_filter, end=date_filter)
+    return [json.loads(payload) for payload in fills['payload']]
 
 
 def analyze_events(events: List[Dict]) -> Dict:
@@ -85,31 +86,34 @@ def analyze_events(events: List[Dict]) -> Dict:
     return stats
 
 
-def analyze_trades(events: List[Dict]) -> List[Dict]:
-    """提取完整的交易記錄 (從 trade_closed 事件)"""
-    trades = []
-    for e in events:
-        if e.get('event') == 'trade_closed':
-            trades.append({
-                'timestamp': e.get('ts'),
-                'trade_id': e.get('trade_id'),
-                'direction': e.get('direction'),
-                'entry_price': e.get('entry_price'),
-                'exit_price': e.get('exit_price'),
-                'price_move_pct': e.get('price_move_pct'),
-                'pnl_pct': e.get('pnl_pct'),
-                'net_pnl_usdt': e.get('net_pnl_usdt'),
-                'hold_seconds': e.get('hold_seconds'),
-                'exit_reason': e.get('exit_reason'),
-                'is_win': e.get('is_win'),
-                'leverage': e.get('leverage'),
-                'position_size_usdt': e.get('position_size_usdt'),
-                # 進場時的市場狀態
-                'entry_obi': e.get('entry_obi'),
-                'entry_six_dim_long': e.get('entry_six_dim_long'),
-                'entry_six_dim_short': e.get('entry_six_dim_short'),
-            })
-    return trades
+def analyze_trades(date_filter: str = None) -> List[Dict]:
+    """完整的交易記錄 (trade_closed 事件，trades 表 source=dydx_journal)"""
+    if not JOURNAL_PATH.exists():
+        return []
+    df = _analytics().trades(start=date_filter, end=date_filter, sources=[JOURNAL_SOURCE])
+    return [
+        {
+            'timestamp': t.exit_time.isoformat() if pd.notna(t.exit_time) else '',
+            'trade_id': t.trade_id,
+            'direction': t.direction,
+            'entry_price': t.entry_price,
+            'exit_price': t.exit_price,
+            'price_move_pct': t.price_move_pct,
+            'pnl_pct': t.pnl_pct,
+            'net_pnl_usdt': t.net_pnl_usdt,
+            'roe_pct': t.roe_pct,
+            'hold_seconds': t.hold_seconds,
+            'exit_reason': t.exit_reason,
+            'is_win': bool(t.is_win),
+            'leverage': t.leverage,
+            'position_size_usdt': t.position_size_usdt,
+            # 進場時的市場狀態
+            'entry_obi': t.obi,
+            'entry_six_dim_long': t.six_dim_long,
+            'entry_six_dim_short': t.six_dim_short,
+        }
+        for t in df.itertuples(index=False)
+    ]
 
 
 def print_summary(stats: Dict, trades: List[Dict]):
@@ -132,22 +136,19 @@ def print_summary(stats: Dict, trades: List[Dict]):
     
     # 交易統計
     if trades:
-        wins = [t for t in trades if t.get('is_win')]
-        losses = [t for t in trades if not t.get('is_win')]
-        total_pnl = sum(t.get('net_pnl_usdt', 0) or 0 for t in trades)
+        df = pd.DataFrame(trades)
+        summary = stats_dict(group_stats(df))['all']
         
         print(f"\n💰 交易統計:")
-        print(f"  總交易數: {len(trades)}")
-        print(f"  獲利: {len(wins)} ({len(wins)/len(trades)*100:.1f}%)")
-        print(f"  虧損: {len(losses)}")
-        print(f"  總 PnL: ${total_pnl:.4f}")
+        print(f"  總交易數: {summary['trades']}")
+        print(f"  獲利: {summary['wins']} ({summary['win_rate']:.1f}%)")
+        print(f"  虧損: {summary['losses']}")
+        print(f"  總 PnL: ${summary['total_pnl_usdt']:.4f}")
         
-        if wins:
-            avg_win = sum(t.get('net_pnl_usdt', 0) or 0 for t in wins) / len(wins)
-            print(f"  平均獲利: ${avg_win:.4f}")
-        if losses:
-            avg_loss = sum(t.get('net_pnl_usdt', 0) or 0 for t in losses) / len(losses)
-            print(f"  平均虧損: ${avg_loss:.4f}")
+        if summary['wins']:
+            print(f"  平均獲利: ${summary['gross_win'] / summary['wins']:.4f}")
+        if summary['losses']:
+            print(f"  平均虧損: ${summary['gross_loss'] / summary['losses']:.4f}")
         
         # 出場原因分析
         exit_reasons = defaultdict(int)
@@ -171,18 +172,10 @@ def print_summary(stats: Dict, trades: List[Dict]):
             print(f"  {reason}: {count} ({pct:.1f}%)")
         
         # 方向分析
-        long_trades = [t for t in trades if t.get('direction') == 'LONG']
-        short_trades = [t for t in trades if t.get('direction') == 'SHORT']
-        
         print(f"\n📊 方向分析:")
-        if long_trades:
-            long_wins = [t for t in long_trades if t.get('is_win')]
-            long_pnl = sum(t.get('net_pnl_usdt', 0) or 0 for t in long_trades)
-            print(f"  LONG: {len(long_trades)} 筆, WR: {len(long_wins)/len(long_trades)*100:.1f}%, PnL: ${long_pnl:.4f}")
-        if short_trades:
-            short_wins = [t for t in short_trades if t.get('is_win')]
-            short_pnl = sum(t.get('net_pnl_usdt', 0) or 0 for t in short_trades)
-            print(f"  SHORT: {len(short_trades)} 筆, WR: {len(short_wins)/len(short_trades)*100:.1f}%, PnL: ${short_pnl:.4f}")
+        for direction, row in stats_dict(group_stats(df, 'direction')).items():
+            if direction in ('LONG', 'SHORT'):
+                print(f"  {direction}: {row['trades']} 筆, WR: {row['win_rate']:.1f}%, PnL: ${row['total_pnl_usdt']:.4f}")
     
     # 顯示最近錯誤
     if stats['errors']:
@@ -255,7 +248,7 @@ def main():
     
     # 分析
     stats = analyze_events(events)
-    trades = analyze_trades(events)
+    trades = analyze_trades(args.date)
     
     # 顯示錯誤
     if args.errors:
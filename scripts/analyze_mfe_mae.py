@@ -8,11 +8,18 @@ Maximum Adverse Excursion (最大浮虧)
 """
 
 import json
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from typing import Dict, List, Tuple
 
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.trading.trade_analytics import TradeAnalytics, trade_records  # noqa: E402
+
 
 class MFEMAEAnalyzer:
     """MFE/MAE 分析器"""
@@ -20,7 +27,7 @@ class MFEMAEAnalyzer:
     def __init__(self, data_file: str):
         """
         Args:
-            data_file: 回測結果 JSON 檔案路徑
+            data_file: 回測結果 JSON 檔案路徑，或交易分析表目錄 (data/analytics)
         """
         self.data_file = Path(data_file)
         self.trades = []
@@ -28,10 +35,13 @@ class MFEMAEAnalyzer:
         
     def load_trades(self) -> None:
         """載入交易記錄"""
-        with open(self.data_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        self.trades = data.get('trades', [])
+        if self.data_file.is_dir():
+            # 交易分析表: 所有已平倉的實盤 / 模擬交易
+            self.trades = trade_records(TradeAnalytics(self.data_file).trades())
+        else:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.trades = data.get('trades', [])
         print(f"✅ 載入 {len(self.trades)} 筆交易記錄")
     
     def load_price_data(self, data_path: str) -> None:
@@ -50,6 +60,7 @@ class MFEMAEAnalyzer:
         
         self.df_1m['timestamp'] = pd.to_datetime(self.df_1m['timestamp'])
         self.df_1m.set_index('timestamp', inplace=True)
+        self.df_1m.sort_index(inplace=True)
         print(f"✅ 載入 {len(self.df_1m)} 根 1m K線")
     
     def calculate_mfe_mae(self) -> pd.DataFrame:
@@ -69,9 +80,8 @@ class MFEMAEAnalyzer:
             entry_price = trade['entry_price']
             direction = trade['direction']
             
-            # 獲取交易期間的價格數據
-            mask = (self.df_1m.index >= entry_time) & (self.df_1m.index <= exit_time)
-            period_data = self.df_1m.loc[mask]
+            # 獲取交易期間的價格數據 (已排序索引，二分切片)
+            period_data = self.df_1m.loc[entry_time:exit_time]
             
             if len(period_data) == 0:
                 continue
@@ -354,11 +364,9 @@ class MFEMAEAnalyzer:
 
 def main():
     """主程式"""
-    import sys
-    
     if len(sys.argv) < 3:
         print("使用方法:")
-        print(f"  {sys.argv[0]} <backtest_json> <btc_1m_data> [output_path]")
+        print(f"  {sys.argv[0]} <backtest_json | analytics_dir> <btc_1m_data> [output_path]")
         print("\n範例:")
         print(f"  {sys.argv[0]} backtest_results/walk_forward/test_2025_v2.0.json data/historical/BTCUSDT_1m_2025.parquet data/mfe_mae_analysis")
         sys.exit(1)
@@ -23,6 +23,14 @@ from enum import Enum
 import threading
 import time
 
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.trading.trade_analytics import group_stats, stats_dict  # noqa: E402
+
 
 class TradingMode(Enum):
     """交易模式"""
@@ -321,15 +329,25 @@ class AutoBacktestModule:
                 analysis_summary="No trades in period"
             )
         
-        # 分析方向表現
-        long_trades = [t for t in recent_trades if t.direction == 'LONG']
-        short_trades = [t for t in recent_trades if t.direction == 'SHORT']
-        
-        long_pnl = sum(t.pnl_pct for t in long_trades) if long_trades else 0
-        short_pnl = sum(t.pnl_pct for t in short_trades) if short_trades else 0
-        
-        long_wr = sum(1 for t in long_trades if t.win) / len(long_trades) * 100 if long_trades else 0
-        short_wr = sum(1 for t in short_trades if t.win) / len(short_trades) * 100 if short_trades else 0
+        # 分析方向表現 (與交易分析表相同的統計口徑)
+        frame = pd.DataFrame({
+            'direction': [t.direction for t in recent_trades],
+            'is_win': [t.win for t in recent_trades],
+            'net_pnl_usdt': [t.pnl_usdt for t in recent_trades],
+            'pnl_pct': [t.pnl_pct for t in recent_trades],
+            'hold_seconds': [t.hold_time_sec for t in recent_trades],
+        })
+        overall = stats_dict(group_stats(frame))['all']
+        by_direction = stats_dict(group_stats(frame, 'direction'))
+        empty = {'trades': 0, 'win_rate': 0.0, 'total_pnl_pct': 0.0}
+        long_stats = by_direction.get('LONG', empty)
+        short_stats = by_direction.get('SHORT', empty)
+        
+        long_pnl = long_stats['total_pnl_pct']
+        short_pnl = short_stats['total_pnl_pct']
+        
+        long_wr = long_stats['win_rate']
+        short_wr = short_stats['win_rate']
         
         # 決定最佳方向
         if long_pnl > short_pnl and long_pnl > 0:
@@ -350,16 +368,16 @@ class AutoBacktestModule:
         summary = f"""
 回測分析結果 ({hours}h)
 ========================
-總交易: {len(recent_trades)} 筆
-總 PnL: {sum(t.pnl_pct for t in recent_trades):.2f}%
+總交易: {overall['trades']} 筆
+總 PnL: {overall['total_pnl_pct']:.2f}%
 
 LONG 表現:
-  - 交易數: {len(long_trades)}
+  - 交易數: {long_stats['trades']}
   - 勝率: {long_wr:.1f}%
   - PnL: {long_pnl:.2f}%
 
 SHORT 表現:
-  - 交易數: {len(short_trades)}
+  - 交易數: {short_stats['trades']}
   - 勝率: {short_wr:.1f}%
   - PnL: {short_pnl:.2f}%
 
@@ -369,9 +387,9 @@ SHORT 表現:
         result = BacktestResult(
             timestamp=datetime.now().isoformat(),
             period_hours=hours,
-            total_trades=len(recent_trades),
-            win_rate=sum(1 for t in recent_trades if t.win) / len(recent_trades) * 100,
-            total_pnl_pct=sum(t.pnl_pct for t in recent_trades),
+            total_trades=overall['trades'],
+            win_rate=overall['win_rate'],
+            total_pnl_pct=overall['total_pnl_pct'],
             best_direction=best_direction,
             recommended_config=recommended_config,
             analysis_summary=summary
@@ -16,6 +16,12 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from collections import defaultdict
 
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.trading.trade_analytics import get_trade_analytics, signal_records  # noqa: E402
+
 try:
     import ccxt
 except ImportError:
@@ -57,24 +63,12 @@ class AutoCalibrator:
             json.dump(self.calibration, f, indent=2, ensure_ascii=False)
     
     def load_signals(self, hours=24):
-        """載入信號記錄"""
-        signals = []
+        """載入信號記錄 (交易分析表的 ENTERED 信號)"""
         log_dir = Path("logs/whale_paper_trader")
+        analytics = get_trade_analytics(ROOT_DIR / "data" / "analytics")
+        analytics.ingest(log_dirs=[log_dir], journals=[])
         cutoff_time = datetime.now() - timedelta(hours=hours)
-        
-        for f in sorted(log_dir.glob("signals_*.json"), reverse=True)[:50]:
-            try:
-                with open(f) as fp:
-                    data = json.load(fp)
-                    for s in data.get("signals", []):
-                        if s.get("signal_type") == "ENTERED":
-                            sig_time = datetime.fromisoformat(s["timestamp"].replace("Z", ""))
-                            if sig_time >= cutoff_time:
-                                signals.append(s)
-            except Exception:
-                pass
-        
-        return signals
+        return signal_records(analytics.signals(since=cutoff_time, signal_type="ENTERED", sources=[log_dir.name]))
     
     def validate_signals(self, signals, lookahead_minutes=5):
         """驗證信號準確率"""
@@ -10,11 +10,23 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from dataclasses import dataclass
 from typing import List, Dict, Tuple, Optional
-from collections import defaultdict
+
+import pandas as pd
 
 # 添加專案根目錄到路徑
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.trading.trade_analytics import (
+    breakdown,
+    get_trade_analytics,
+    group_stats,
+    signal_records,
+    stats_dict,
+    trade_records,
+)
+
+ANALYTICS_DIR = Path(__file__).parent.parent / "data" / "analytics"
+
 @dataclass
 class Trade:
     """單筆交易"""
@@ -50,88 +62,51 @@ class CardConfig:
     use_n_lock_n: bool = True
     n_lock_n_threshold: float = 1.0
 
-def load_trades_from_logs(log_dir: str, hours: int = 24) -> List[Trade]:
-    """從日誌載入交易記錄"""
-    trades = []
-    cutoff = datetime.now() - timedelta(hours=hours)
-    
+def load_trade_frame(log_dir: str, hours: int = 24) -> pd.DataFrame:
+    """從交易分析表查詢平倉交易 (先增量匯入 log_dir 的新日誌)"""
     log_path = Path(log_dir)
-    for trade_file in sorted(log_path.glob("trades_*.json"), reverse=True):
-        try:
-            # 解析檔名時間
-            ts_str = trade_file.stem.replace("trades_", "")
-            # 嘗試不同格式
-            try:
-                file_time = datetime.strptime(ts_str, "%Y%m%d_%H%M%S")
-            except ValueError:
-                try:
-                    file_time = datetime.strptime(ts_str, "%Y%m%d")
-                except ValueError:
-                    continue
-            
-            if file_time < cutoff:
-                continue
-            
-            with open(trade_file) as f:
-                data = json.load(f)
-            
-            for t in data.get("trades", []):
-                # 提取六維分數 (從 strategy_probs 推估)
-                strategy_probs = t.get("strategy_probs", {})
-                probability = t.get("probability", 0)
-                confidence = t.get("confidence", 0)
-                
-                trade = Trade(
-                    timestamp=t.get("entry_time", t.get("timestamp", "")),
-                    direction=t.get("direction", "UNKNOWN"),
-                    entry_price=float(t.get("entry_price", 0)),
-                    exit_price=float(t.get("exit_price", t.get("entry_price", 0))),
-                    pnl_pct=float(t.get("pnl_pct", 0)),
-                    pnl_usdt=float(t.get("pnl_usdt", t.get("net_pnl_usdt", 0))),
-                    hold_seconds=float(t.get("hold_seconds", 0)),
-                    mode=t.get("strategy", "UNKNOWN"),
-                    six_dim_score=int(t.get("six_dim_score", 0)),  # 可能為0
-                    obi=float(t.get("obi", 0)),
-                    regime=t.get("regime", t.get("market_regime", "")),
-                )
-                # 額外屬性
-                trade.probability = probability
-                trade.confidence = confidence
-                trade.leverage = t.get("leverage", 50)
-                trade.max_profit_pct = t.get("max_profit_pct", 0)
-                trade.max_drawdown_pct = t.get("max_drawdown_pct", 0)
-                trade.actual_target_pct = t.get("actual_target_pct", 0)
-                trade.actual_stop_loss_pct = t.get("actual_stop_loss_pct", 0)
-                
-                trades.append(trade)
-        except Exception as e:
-            print(f"⚠️ 讀取 {trade_file} 失敗: {e}")
-    
+    analytics = get_trade_analytics(ANALYTICS_DIR)
+    analytics.ingest(log_dirs=[log_path], journals=[])
+    return analytics.trades(since=datetime.now() - timedelta(hours=hours), sources=[log_path.name])
+
+def trades_from_frame(df: pd.DataFrame) -> List[Trade]:
+    """交易表 → Trade 物件 (卡片回測逐筆模擬用)"""
+    trades = []
+    for t in trade_records(df):
+        trade = Trade(
+            timestamp=t["entry_time"],
+            direction=t["direction"] or "UNKNOWN",
+            entry_price=t["entry_price"],
+            exit_price=t["exit_price"] or t["entry_price"],
+            pnl_pct=t["pnl_pct"],
+            pnl_usdt=t["pnl_usdt"],
+            hold_seconds=t["hold_seconds"],
+            mode=t["strategy"],
+            six_dim_score=int(t["six_dim_score"]),
+            obi=t["obi"],
+            regime=t["regime"],
+        )
+        # 額外屬性
+        trade.probability = t["probability"]
+        trade.confidence = t["confidence"]
+        trade.leverage = t["leverage"] or 50
+        trade.max_profit_pct = t["max_profit_pct"]
+        trade.max_drawdown_pct = t["max_drawdown_pct"]
+        trade.actual_target_pct = t["target_pct"]
+        trade.actual_stop_loss_pct = t["stop_loss_pct"]
+        trades.append(trade)
     return trades
 
+def load_trades_from_logs(log_dir: str, hours: int = 24) -> List[Trade]:
+    """從日誌載入交易記錄"""
+    return trades_from_frame(load_trade_frame(log_dir, hours))
+
 def load_signals_from_logs(log_dir: str, hours: int = 24) -> List[Dict]:
     """從日誌載入信號記錄 (用於模擬回測)"""
-    signals = []
-    cutoff = datetime.now() - timedelta(hours=hours)
-    
     log_path = Path(log_dir)
-    for signal_file in sorted(log_path.glob("signals_*.json"), reverse=True):
-        try:
-            ts_str = signal_file.stem.replace("signals_", "")
-            file_time = datetime.strptime(ts_str, "%Y%m%d_%H%M%S")
-            
-            if file_time < cutoff:
-                continue
-            
-            with open(signal_file) as f:
-                data = json.load(f)
-            
-            for s in data.get("signals", []):
-                signals.append(s)
-        except Exception as e:
-            pass
-    
-    return signals
+    analytics = get_trade_analytics(ANALYTICS_DIR)
+    analytics.ingest(log_dirs=[log_path], journals=[])
+    return signal_records(analytics.signals(since=datetime.now() - timedelta(hours=hours), sources=[log_path.name]))
 
 def get_card_configs() -> List[CardConfig]:
     """載入所有卡片配置"""
@@ -288,127 +263,39 @@ def backtest_with_actual_trades(trades: List[Trade], card: CardConfig) -> Dict:
         "matching_trades": matching_trades
     }
 
-def analyze_by_mode(trades: List[Trade]) -> Dict[str, Dict]:
-    """按模式/策略分析交易"""
-    by_mode = defaultdict(list)
-    for t in trades:
-        by_mode[t.mode].append(t)
-    
-    results = {}
-    for mode, mode_trades in by_mode.items():
-        wins = [t for t in mode_trades if t.pnl_pct > 0]
-        results[mode] = {
-            "total": len(mode_trades),
-            "wins": len(wins),
-            "win_rate": len(wins) / len(mode_trades) * 100 if mode_trades else 0,
-            "total_pnl_pct": sum(t.pnl_pct for t in mode_trades),
-            "avg_pnl_pct": sum(t.pnl_pct for t in mode_trades) / len(mode_trades) if mode_trades else 0,
-            "total_pnl_usdt": sum(t.pnl_usdt for t in mode_trades),
+def _legacy_stats(stats: pd.DataFrame) -> Dict:
+    """group_stats → 本腳本的輸出格式"""
+    return {
+        key: {
+            "total": int(row["trades"]),
+            "wins": int(row["wins"]),
+            "win_rate": float(row["win_rate"]),
+            "total_pnl_pct": float(row["total_pnl_pct"]),
+            "avg_pnl_pct": float(row["avg_pnl_pct"]),
+            "total_pnl_usdt": float(row["total_pnl_usdt"]),
         }
-    
-    return results
+        for key, row in stats.iterrows()
+    }
+
+def analyze_by_mode(df: pd.DataFrame) -> Dict[str, Dict]:
+    """按模式/策略分析交易"""
+    return _legacy_stats(breakdown("mode", df))
 
-def analyze_by_direction(trades: List[Trade]) -> Dict[str, Dict]:
+def analyze_by_direction(df: pd.DataFrame) -> Dict[str, Dict]:
     """按方向分析交易"""
-    by_dir = defaultdict(list)
-    for t in trades:
-        by_dir[t.direction].append(t)
-    
-    results = {}
-    for direction, dir_trades in by_dir.items():
-        wins = [t for t in dir_trades if t.pnl_pct > 0]
-        results[direction] = {
-            "total": len(dir_trades),
-            "wins": len(wins),
-            "win_rate": len(wins) / len(dir_trades) * 100 if dir_trades else 0,
-            "total_pnl_pct": sum(t.pnl_pct for t in dir_trades),
-            "avg_pnl_pct": sum(t.pnl_pct for t in dir_trades) / len(dir_trades) if dir_trades else 0,
-        }
-    
-    return results
+    return _legacy_stats(breakdown("direction", df))
 
-def analyze_by_leverage(trades: List[Trade]) -> Dict[str, Dict]:
+def analyze_by_leverage(df: pd.DataFrame) -> Dict[str, Dict]:
     """按槓桿分析交易"""
-    by_lev = defaultdict(list)
-    for t in trades:
-        lev = getattr(t, 'leverage', 50)
-        # 分組: 1-10x, 11-20x, 21-30x, 31-40x, 41-50x
-        if lev <= 10:
-            group = "1-10x"
-        elif lev <= 20:
-            group = "11-20x"
-        elif lev <= 30:
-            group = "21-30x"
-        elif lev <= 40:
-            group = "31-40x"
-        else:
-            group = "41-50x"
-        by_lev[group].append(t)
-    
-    results = {}
-    for group, group_trades in sorted(by_lev.items()):
-        wins = [t for t in group_trades if t.pnl_pct > 0]
-        results[group] = {
-            "total": len(group_trades),
-            "wins": len(wins),
-            "win_rate": len(wins) / len(group_trades) * 100 if group_trades else 0,
-            "total_pnl_pct": sum(t.pnl_pct for t in group_trades),
-            "avg_pnl_pct": sum(t.pnl_pct for t in group_trades) / len(group_trades) if group_trades else 0,
-        }
-    
-    return results
+    return _legacy_stats(breakdown("leverage", df))
 
-def analyze_by_obi(trades: List[Trade]) -> Dict[str, Dict]:
+def analyze_by_obi(df: pd.DataFrame) -> Dict[str, Dict]:
     """按 OBI 分析交易"""
-    by_obi = defaultdict(list)
-    for t in trades:
-        obi = t.obi
-        # 分組
-        if obi < -0.3:
-            group = "< -0.3 (強賣壓)"
-        elif obi < -0.1:
-            group = "-0.3 ~ -0.1 (賣壓)"
-        elif obi < 0.1:
-            group = "-0.1 ~ 0.1 (中性)"
-        elif obi < 0.3:
-            group = "0.1 ~ 0.3 (買壓)"
-        else:
-            group = "> 0.3 (強買壓)"
-        by_obi[group].append(t)
-    
-    results = {}
-    for group in ["< -0.3 (強賣壓)", "-0.3 ~ -0.1 (賣壓)", "-0.1 ~ 0.1 (中性)", "0.1 ~ 0.3 (買壓)", "> 0.3 (強買壓)"]:
-        group_trades = by_obi.get(group, [])
-        if group_trades:
-            wins = [t for t in group_trades if t.pnl_pct > 0]
-            results[group] = {
-                "total": len(group_trades),
-                "wins": len(wins),
-                "win_rate": len(wins) / len(group_trades) * 100,
-                "total_pnl_pct": sum(t.pnl_pct for t in group_trades),
-                "avg_pnl_pct": sum(t.pnl_pct for t in group_trades) / len(group_trades),
-            }
-    
-    return results
+    return _legacy_stats(breakdown("obi_bucket", df))
 
-def analyze_by_score(trades: List[Trade]) -> Dict[int, Dict]:
+def analyze_by_score(df: pd.DataFrame) -> Dict[int, Dict]:
     """按六維分數分析交易"""
-    by_score = defaultdict(list)
-    for t in trades:
-        by_score[t.six_dim_score].append(t)
-    
-    results = {}
-    for score, score_trades in sorted(by_score.items()):
-        wins = [t for t in score_trades if t.pnl_pct > 0]
-        results[score] = {
-            "total": len(score_trades),
-            "wins": len(wins),
-            "win_rate": len(wins) / len(score_trades) * 100 if score_trades else 0,
-            "total_pnl_pct": sum(t.pnl_pct for t in score_trades),
-            "avg_pnl_pct": sum(t.pnl_pct for t in score_trades) / len(score_trades) if score_trades else 0
-        }
-    
-    return results
+    return {int(k): v for k, v in _legacy_stats(breakdown("six_dim_score", df)).items()}
 
 def main():
     print("=" * 70)
@@ -417,7 +304,8 @@ def main():
     
     # 1. 載入交易數據
     log_dir = Path(__file__).parent.parent / "logs" / "whale_paper_trader"
-    trades = load_trades_from_logs(str(log_dir), hours=48)
+    trade_df = load_trade_frame(str(log_dir), hours=48)
+    trades = trades_from_frame(trade_df)
     signals = load_signals_from_logs(str(log_dir), hours=48)
     
     print(f"\n📊 數據概覽:")
@@ -433,27 +321,26 @@ def main():
     print("📈 整體交易統計 (48h)")
     print("=" * 70)
     
-    wins = [t for t in trades if t.pnl_pct > 0]
-    losses = [t for t in trades if t.pnl_pct <= 0]
-    total_pnl = sum(t.pnl_pct for t in trades)
+    summary = stats_dict(group_stats(trade_df))["all"]
+    total_pnl = summary["total_pnl_pct"]
     
-    print(f"   總交易數: {len(trades)}")
-    print(f"   勝: {len(wins)} / 負: {len(losses)}")
-    print(f"   勝率: {len(wins)/len(trades)*100:.1f}%")
+    print(f"   總交易數: {summary['trades']}")
+    print(f"   勝: {summary['wins']} / 負: {summary['losses']}")
+    print(f"   勝率: {summary['win_rate']:.1f}%")
     print(f"   總 PnL: {total_pnl:+.2f}%")
-    print(f"   平均 PnL: {total_pnl/len(trades):+.3f}%")
+    print(f"   平均 PnL: {summary['avg_pnl_pct']:+.3f}%")
     
-    if wins:
-        print(f"   平均獲利: +{sum(t.pnl_pct for t in wins)/len(wins):.3f}%")
-    if losses:
-        print(f"   平均虧損: {sum(t.pnl_pct for t in losses)/len(losses):.3f}%")
+    if summary["wins"]:
+        print(f"   平均獲利: +{summary['avg_win_pct']:.3f}%")
+    if summary["losses"]:
+        print(f"   平均虧損: {summary['avg_loss_pct']:.3f}%")
     
     # 3. 按模式分析
     print("\n" + "=" * 70)
     print("📊 按策略/模式分析")
     print("=" * 70)
     
-    mode_results = analyze_by_mode(trades)
+    mode_results = analyze_by_mode(trade_df)
     sorted_modes = sorted(mode_results.items(), key=lambda x: x[1]["win_rate"], reverse=True)
     
     print(f"\n{'Strategy':<20} {'Trades':>8} {'Win Rate':>10} {'PnL %':>10} {'Avg PnL':>10} {'PnL $':>10}")
@@ -466,7 +353,7 @@ def main():
     print("📊 按方向分析 (LONG vs SHORT)")
     print("=" * 70)
     
-    dir_results = analyze_by_direction(trades)
+    dir_results = analyze_by_direction(trade_df)
     print(f"\n{'Direction':<12} {'Trades':>8} {'Win Rate':>10} {'PnL %':>12} {'Avg PnL':>10}")
     print("-" * 55)
     for direction, stats in dir_results.items():
@@ -477,7 +364,7 @@ def main():
     print("📊 按槓桿分析")
     print("=" * 70)
     
-    lev_results = analyze_by_leverage(trades)
+    lev_results = analyze_by_leverage(trade_df)
     print(f"\n{'Leverage':<12} {'Trades':>8} {'Win Rate':>10} {'PnL %':>12} {'Avg PnL':>10}")
     print("-" * 55)
     for group, stats in lev_results.items():
@@ -488,7 +375,7 @@ def main():
     print("📊 按 OBI (訂單簿失衡) 分析")
     print("=" * 70)
     
-    obi_results = analyze_by_obi(trades)
+    obi_results = analyze_by_obi(trade_df)
     print(f"\n{'OBI Range':<22} {'Trades':>8} {'Win Rate':>10} {'PnL %':>12} {'Avg PnL':>10}")
     print("-" * 65)
     for group, stats in obi_results.items():
@@ -499,7 +386,7 @@ def main():
     print("📊 按六維分數分析")
     print("=" * 70)
     
-    score_results = analyze_by_score(trades)
+    score_results = analyze_by_score(trade_df)
     
     print(f"\n{'Score':>6} {'Trades':>8} {'Win Rate':>10} {'PnL %':>10} {'Avg PnL':>10}")
     print("-" * 50)
@@ -558,19 +445,17 @@ def main():
     print("=" * 70)
     
     for min_score in range(4, 11):
-        filtered = [t for t in trades if t.six_dim_score >= min_score]
-        if filtered:
-            wins_f = [t for t in filtered if t.pnl_pct > 0]
-            wr = len(wins_f) / len(filtered) * 100
-            pnl = sum(t.pnl_pct for t in filtered)
-            print(f"   Score ≥ {min_score}: {len(filtered):>4} trades, WR: {wr:>5.1f}%, PnL: {pnl:>+7.2f}%")
+        filtered = trade_df[trade_df["six_dim_score"] >= min_score]
+        if len(filtered):
+            row = stats_dict(group_stats(filtered))["all"]
+            print(f"   Score ≥ {min_score}: {row['trades']:>4} trades, WR: {row['win_rate']:>5.1f}%, PnL: {row['total_pnl_pct']:>+7.2f}%")
     
     # 保存結果
     output = {
         "timestamp": datetime.now().isoformat(),
         "summary": {
-            "total_trades": len(trades),
-            "win_rate": len(wins) / len(trades) * 100 if trades else 0,
+            "total_trades": summary["trades"],
+            "win_rate": summary["win_rate"],
             "total_pnl_pct": total_pnl
         },
         "by_mode": {k: v for k, v in mode_results.items()},
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+📏 行情紀錄型別 記憶體 / 配置 / GC 基準
+=====================================
+
+比較熱路徑舊寫法 (每筆成交 / 訂單簿更新各建一份 dict) 與 src/core/market_records.py:
+1. 單筆大小: dict vs slots 紀錄 vs TradeTape (欄位式 ring)
+2. 串流模擬: 以 BinanceWebSocket + SignedVolumeTracker + OBI 歷史的窗口大小餵入 N 筆事件，
+   量測保留記憶體、配置區塊數、GC 追蹤物件數、期間每次 GC 的停頓時間與吞吐量
+   (結尾同時列出變好與變差的指標)
+
+用法:
+    python scripts/benchmark_market_records.py
+    python scripts/benchmark_market_records.py --events 500000 --window 6000
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.core.market_records import (  # noqa: E402
+    OBIHistory,
+    SignedTradeTape,
+    TradeTape,
+    TradeTick,
+)
+
+BIG_TRADE_USDT = 3000.0  # 模擬成交約 1/4 會進大單窗口
+
+
+# ==================== 事件產生 ====================
+
+def _trade(i: int):
+    price = 95000.0 + (i % 500) * 0.1
+    qty = 0.001 * (1 + i % 37)
+    return price, qty, bool(i & 1), 1_700_000_000_000.0 + i * 10
+
+
+class _GcTimer:
+    """以 gc.callbacks 記錄每次回收的停頓"""
+
+    def __init__(self):
+        self.pauses = []
+        self._t0 = 0.0
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self._t0 = time.perf_counter()
+        else:
+            self.pauses.append((info['generation'], time.perf_counter() - self._t0))
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self)
+
+
+# ==================== 舊 / 新 熱路徑 ====================
+
+class LegacyPath:
+    """與改版前相同: 成交 / 帶方向成交 / OBI 樣本都是 dict"""
+
+    def __init__(self, window: int):
+        self.trades_1s = deque(maxlen=100)
+        self.trades_1m = deque(maxlen=window)
+        self.big_trades = deque(maxlen=100)
+        self.signed = deque(maxlen=1000)
+        self.obi_history = deque(maxlen=1000)
+
+    def on_trade(self, i: int):
+        price, qty, is_buy, ts = _trade(i)
+        trade = {'price': price, 'qty': qty, 'is_buy': is_buy, 'time': ts, 'value_usdt': price * qty}
+        self.trades_1s.append(trade)
+        self.trades_1m.append(trade)
+        if trade['value_usdt'] >= BIG_TRADE_USDT:
+            self.big_trades.append(trade)
+        side = 1 if is_buy else -1
+        self.signed.append({
+            'timestamp': ts, 'price': price, 'quantity': qty, 'side': side, 'signed_volume': qty * side
+        })
+
+    def on_depth(self, i: int):
+        self.obi_history.append({
+            'timestamp': datetime.utcnow(), 'obi': 0.1, 'weighted_obi': 0.2, 'bid_size': 12.5,
+            'ask_size': 9.5 + i % 3, 'spread': 0.1, 'microprice': 95000.05, 'mid_price': 95000.0,
+            'microprice_pressure': 0.00001, 'bid_weight': 0.56, 'ask_weight': 0.44,
+        })
+
+
+class RecordPath:
+    """改版後: 所有窗口都是 RecordRing / TradeTape (1 秒窗口是 trades_1m.tail(100))"""
+
+    def __init__(self, window: int):
+        self.trades_1m = TradeTape(window)
+        self.big_trades = TradeTape(100)
+        self.signed = SignedTradeTape(1000)
+        self.obi_history = OBIHistory(1000)
+
+    def on_trade(self, i: int):
+        price, qty, is_buy, ts = _trade(i)
+        value = price * qty
+        self.trades_1m.append(price, qty, is_buy, ts, value)
+        if value >= BIG_TRADE_USDT:
+            self.big_trades.append(price, qty, is_buy, ts, value)
+        side = 1 if is_buy else -1
+        self.signed.append(ts, price, qty, side, qty * side)
+
+    def on_depth(self, i: int):
+        self.obi_history.append(
+            datetime.utcnow(), 0.1, 0.2, 12.5, 9.5 + i % 3, 0.1, 95000.05, 95000.0, 0.00001, 0.56, 0.44
+        )
+
+
+# ==================== 量測 ====================
+
+def measure_unit_sizes(count: int) -> None:
+    print(f"\n📦 單筆大小 ({count:,} 筆保留在 list 中)")
+    builders = {
+        'dict': lambda i: (lambda p, q, b, t: {'price': p, 'qty': q, 'is_buy': b, 'time': t, 'value_usdt': p * q})(*_trade(i)),
+        'TradeTick': lambda i: (lambda p, q, b, t: TradeTick(p, q, b, t, p * q))(*_trade(i)),
+    }
+    for name, build in builders.items():
+        gc.collect()
+        tracemalloc.start()
+        kept = [build(i) for i in range(count)]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        gc.collect()
+        tracked = gc.is_tracked(kept[0])
+        print(f"   {name:<12} {current / count:7.1f} B/筆 | GC 追蹤: {'是' if tracked else '否'}")
+        del kept
+
+    gc.collect()
+    tracemalloc.start()
+    tape = TradeTape(count)
+    for i in range(count):
+        tape.append(*_trade(i))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   {'TradeTape':<12} {current / count:7.1f} B/筆 | GC 追蹤: 否 (array 緩衝區)")
+
+
+def _feed(path, events: int, depth_every: int) -> None:
+    for i in range(events):
+        path.on_trade(i)
+        if i % depth_every == 0:
+            path.on_depth(i)
+
+
+def run_stream(path_cls, events: int, window: int, depth_every: int) -> dict:
+    # 吞吐量單獨量測 (tracemalloc 會拖慢每次配置)
+    gc.collect()
+    t0 = time.perf_counter()
+    _feed(path_cls(window), events, depth_every)
+    elapsed = time.perf_counter() - t0
+
+    gc.collect()
+    objects_before = len(gc.get_objects())
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    path = path_cls(window)  # 預先配置的 ring 緩衝區也計入保留記憶體
+    with _GcTimer() as timer:
+        _feed(path, events, depth_every)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks_after = sys.getallocatedblocks()
+    gc.collect()
+    objects_after = len(gc.get_objects())
+    t0 = time.perf_counter()
+    gc.collect()
+    full_gc_ms = (time.perf_counter() - t0) * 1000
+    pauses_ms = [p * 1000 for _, p in timer.pauses]
+    del path
+    return {
+        'elapsed_s': elapsed,
+        'retained_kb': current / 1024,
+        'peak_kb': peak / 1024,
+        'blocks': blocks_after - blocks_before,
+        'gc_tracked': objects_after - objects_before,
+        'gc_runs': len(pauses_ms),
+        'gc_total_ms': sum(pauses_ms),
+        'gc_max_ms': max(pauses_ms) if pauses_ms else 0.0,
+        'full_gc_ms': full_gc_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行情紀錄型別 記憶體 / GC 基準")
+    parser.add_argument("--events", type=int, default=300_000, help="模擬成交筆數")
+    parser.add_argument("--window", type=int, default=6000, help="1 分鐘成交窗口容量 (BinanceWebSocket.trades_1m)")
+    parser.add_argument("--depth-every", type=int, default=5, help="每幾筆成交插入一次訂單簿更新")
+    parser.add_argument("--unit-count", type=int, default=200_000, help="單筆大小量測筆數")
+    args = parser.parse_args()
+
+    print(f"{'='*64}")
+    print(f"📏 行情紀錄基準 | Python {sys.version.split()[0]}")
+    print(f"{'='*64}")
+
+    measure_unit_sizes(args.unit_count)
+
+    print(f"\n🔁 串流模擬: {args.events:,} 筆成交 + 每 {args.depth_every} 筆一次訂單簿 | 1m 窗口 {args.window:,}")
+    results = {}
+    for name, cls in (('dict', LegacyPath), ('records', RecordPath)):
+        results[name] = run_stream(cls, args.events, args.window, args.depth_every)
+
+    rows = [
+        ('保留記憶體 (KB)', 'retained_kb', '{:,.0f}'),
+        ('峰值記憶體 (KB)', 'peak_kb', '{:,.0f}'),
+        ('淨配置區塊', 'blocks', '{:,}'),
+        ('GC 追蹤物件 (增量)', 'gc_tracked', '{:,}'),
+        ('GC 次數', 'gc_runs', '{:,}'),
+        ('GC 停頓合計 (ms)', 'gc_total_ms', '{:.1f}'),
+        ('GC 最長停頓 (ms)', 'gc_max_ms', '{:.2f}'),
+        ('完整回收 (ms)', 'full_gc_ms', '{:.2f}'),
+        ('吞吐耗時 (s)', 'elapsed_s', '{:.3f}'),
+    ]
+    print(f"\n   {'指標':<20}{'dict':>14}{'records':>14}")
+    for label, key, fmt in rows:
+        print(f"   {label:<20}{fmt.format(results['dict'][key]):>14}{fmt.format(results['records'][key]):>14}")
+
+    # 變好與變差的指標都列出 (GC 追蹤物件含窗口容器本身，為固定值，不隨事件數成長)
+    old, new = results['dict'], results['records']
+    print()
+    for label, key, fmt in rows:
+        if key in ('peak_kb', 'full_gc_ms'):
+            continue
+        before, after = old[key], new[key]
+        mark = '✅' if after <= before else '⚠️'
+        print(f"{mark} {label}: {fmt.format(before)} → {fmt.format(after)}")
+    per_event_us = (new['elapsed_s'] - old['elapsed_s']) / max(1, args.events) * 1e6
+    print(f"   每筆成交差異 {per_event_us:+.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,29 @@ Compare Binance and dYdX top-of-book spread in bps.
 
 Example:
   .venv/bin/python scripts/compare_binance_dydx_spread.py --samples 50 --interval 0.5
+
+  # From feed recordings: both books sampled as-of every --interval seconds on
+  # exchange timestamps instead of two sequential REST calls.
+  .venv/bin/python scripts/compare_binance_dydx_spread.py --interval 1 \
+      --binance-feed data/feeds/BTCUSDT_*.feed --dydx-feed data/feeds/BTC-USD_*.feed
 """
 
 import argparse
 import statistics
+import sys
 import time
 from datetime import datetime, timezone
+from pathlib import Path
 from typing import Dict, List, Tuple
 
 import requests
 
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.exchange.cross_venue_spread import aligned_spread_series, load_top_of_book  # noqa: E402
+
 
 DYDX_BASES = {
     "mainnet": "https://indexer.dydx.trade",
@@ -99,6 +112,27 @@ def _summarize(values: List[float]) -> Dict[str, float]:
     }
 
 
+def _recorded_samples(binance_paths: List[str], dydx_paths: List[str], interval: float, verbose: bool) -> Tuple[List[float], List[float]]:
+    """Top-of-book spread (bps) of both venues, time-aligned on the recordings' exchange timestamps."""
+    aligned = aligned_spread_series(
+        load_top_of_book(binance_paths),
+        load_top_of_book(dydx_paths),
+        grid_ms=max(1, int(interval * 1000)),
+    )
+    binance_bps = ((aligned["binance_ask"] - aligned["binance_bid"]) / aligned["binance_mid"] * 10000).tolist()
+    dydx_bps = ((aligned["dydx_ask"] - aligned["dydx_bid"]) / aligned["dydx_mid"] * 10000).tolist()
+    if verbose:
+        for idx, (ts_ms, bps_binance, bps_dydx) in enumerate(zip(aligned["time_ms"], binance_bps, dydx_bps)):
+            ts = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime("%H:%M:%S.%f")[:-3]
+            print(
+                f"[{idx + 1:02d}] {ts} "
+                f"binance={bps_binance:.3f}bps "
+                f"dydx={bps_dydx:.3f}bps "
+                f"delta={bps_binance - bps_dydx:+.3f}bps"
+            )
+    return binance_bps, dydx_bps
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Compare Binance vs dYdX spread (bps)")
     parser.add_argument("--samples", type=int, default=40, help="Number of samples")
@@ -110,6 +144,8 @@ def main() -> None:
     parser.add_argument("--dydx-symbol", default="BTC-USD")
     parser.add_argument("--limit", type=int, default=5, help="Orderbook depth limit")
     parser.add_argument("--verbose", action="store_true", help="Print each sample")
+    parser.add_argument("--binance-feed", nargs="+", help="Binance feed recordings (offline mode)")
+    parser.add_argument("--dydx-feed", nargs="+", help="dYdX feed recordings (offline mode)")
     args = parser.parse_args()
 
     binance_bps: List[float] = []
@@ -121,6 +157,28 @@ def main() -> None:
     ties = 0
     epsilon = 1e-6
 
+    if args.binance_feed or args.dydx_feed:
+        if not (args.binance_feed and args.dydx_feed):
+            parser.error("--binance-feed and --dydx-feed must be given together")
+        print(
+            "Comparing recorded spreads:",
+            f"binance={len(args.binance_feed)} file(s)",
+            f"dydx={len(args.dydx_feed)} file(s)",
+            f"interval={args.interval}s",
+        )
+        binance_bps, dydx_bps = _recorded_samples(args.binance_feed, args.dydx_feed, args.interval, args.verbose)
+        for bps_binance, bps_dydx in zip(binance_bps, dydx_bps):
+            delta = bps_binance - bps_dydx
+            delta_bps.append(delta)
+            if abs(delta) <= epsilon:
+                ties += 1
+            elif delta < 0:
+                tighter_binance += 1
+            else:
+                tighter_dydx += 1
+        _print_summary(binance_bps, dydx_bps, delta_bps, errors, tighter_binance, tighter_dydx, ties)
+        return
+
     print(
         "Comparing spreads:",
         f"binance={args.binance_market}({args.binance_symbol})",
@@ -185,6 +243,18 @@ def main() -> None:
 
             time.sleep(args.interval)
 
+    _print_summary(binance_bps, dydx_bps, delta_bps, errors, tighter_binance, tighter_dydx, ties)
+
+
+def _print_summary(
+    binance_bps: List[float],
+    dydx_bps: List[float],
+    delta_bps: List[float],
+    errors: int,
+    tighter_binance: int,
+    tighter_dydx: int,
+    ties: int,
+) -> None:
     total = len(binance_bps)
     print()
     print("Summary")
@@ -22,10 +22,8 @@ class DataDownloader:
     MAX_KLINES_PER_REQUEST = 1000
     
     def __init__(self):
-        self.client = BinanceClient()
-        # 使用 Mainnet
-        from binance.client import Client
-        self.client.client = Client(api_key="", api_secret="")
+        # 使用 Mainnet (公開資料無需 API Key)
+        self.client = BinanceClient(api_key="", api_secret="", testnet=False)
         self.data_dir = Path("data/historical")
         self.data_dir.mkdir(parents=True, exist_ok=True)
     
@@ -115,9 +115,7 @@ def main():
     print("=" * 80)
     
     # 初始化客戶端
-    client = BinanceClient()
-    from binance.client import Client
-    client.client = Client(api_key="", api_secret="")  # Mainnet 公開資料
+    client = BinanceClient(api_key="", api_secret="", testnet=False)  # Mainnet 公開資料
     
     data_dir = Path("data/historical")
     data_dir.mkdir(parents=True, exist_ok=True)
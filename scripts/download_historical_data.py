@@ -51,14 +51,12 @@ class HistoricalDataDownloader:
             data_dir: 資料儲存目錄
             use_mainnet: 是否使用 Mainnet（True=正式環境，False=測試網）
         """
-        self.client = BinanceClient()
-        
-        # 如果使用 Mainnet，直接覆蓋 API URL（無需 API Key 即可取得市場資料）
+        # 如果使用 Mainnet，直接連正式環境（無需 API Key 即可取得市場資料）
         if use_mainnet:
-            from binance.client import Client
-            self.client.client = Client(api_key="", api_secret="")  # 公開資料無需 API Key
+            self.client = BinanceClient(api_key="", api_secret="", testnet=False)  # 公開資料無需 API Key
             print(f"✅ 初始化下載器 (Mainnet - 正式環境)")
         else:
+            self.client = BinanceClient()
             print(f"✅ 初始化下載器 (Testnet - 測試網)")
         
         self.symbol = symbol
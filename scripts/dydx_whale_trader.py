@@ -1841,8 +1841,11 @@ class DydxAPI:
             return False
         
         try:
-            market_data = await self.indexer.markets.get_perpetual_markets(self.config.symbol)
-            market_info = market_data.get("markets", {}).get(self.config.symbol, {})
+            # 撤單只需要 clobPairId 推導 order id，connect() 時已快取就不再查 indexer
+            market_info = self.market_info if self.market_info.get("clobPairId") is not None else {}
+            if not market_info:
+                market_data = await self.indexer.markets.get_perpetual_markets(self.config.symbol)
+                market_info = market_data.get("markets", {}).get(self.config.symbol, {})
             market = Market(market_info)
             
             # 根據訂單類型選擇 OrderFlags
@@ -2033,48 +2036,10 @@ class DydxAPI:
                         order_market = order.get("market") or order.get("ticker")
                         if order_market != symbol:
                             continue
-                    client_id = int(order.get("clientId", 0) or 0)
+                    client_id, order_type, gtbt = self.order_cancel_params(order)
                     if client_id <= 0:
                         continue
 
-                    # 推斷 order_type
-                    order_type = "LONG_TERM"
-                    otype = str(order.get("type", "") or "").upper()
-                    tif = str(order.get("timeInForce", "") or "").upper()
-                    flags = None
-                    try:
-                        flags = int(order.get("orderFlags", -1))
-                    except Exception:
-                        flags = None
-
-                    # 優先用 orderFlags 判定（最準）
-                    if flags == int(OrderFlags.CONDITIONAL):
-                        order_type = "CONDITIONAL"
-                    elif flags == int(OrderFlags.LONG_TERM):
-                        order_type = "LONG_TERM"
-                    elif flags == int(OrderFlags.SHORT_TERM):
-                        order_type = "SHORT_TERM"
-                    else:
-                        # fallback：舊 heuristics
-                        if otype in {"STOP_MARKET", "TAKE_PROFIT_MARKET", "STOP_LIMIT", "TAKE_PROFIT_LIMIT", "STOP_LOSS", "TAKE_PROFIT"}:
-                            order_type = "CONDITIONAL"
-                        elif "STOP" in otype or "TAKE_PROFIT" in otype:
-                            order_type = "CONDITIONAL"
-                        elif tif in {"IOC", "FOK"}:
-                            order_type = "SHORT_TERM"
-
-                    # 🔧 v14.6.32: 提取訂單的 goodTilBlockTime
-                    gtbt = 0
-                    gtbt_str = order.get("goodTilBlockTime", "")
-                    if gtbt_str:
-                        try:
-                            from datetime import datetime
-                            # dYdX 返回 ISO 格式: "2025-07-12T01:30:00.000Z"
-                            dt = datetime.fromisoformat(gtbt_str.replace("Z", "+00:00"))
-                            gtbt = int(dt.timestamp())
-                        except Exception:
-                            pass
-
                     success = await self.cancel_order(client_id, order_type=order_type, good_til_block_time=gtbt)
                     if success:
                         cancelled_count += 1
@@ -2089,6 +2054,53 @@ class DydxAPI:
             logger.error(f"❌ 取消未成交掛單失敗: {e}")
             return 0
 
+    @staticmethod
+    def order_cancel_params(order: dict) -> Tuple[int, str, int]:
+        """從 indexer 訂單推斷撤單參數: (client_id, order_type, good_til_block_time)"""
+        try:
+            client_id = int(order.get("clientId", 0) or 0)
+        except Exception:
+            client_id = 0
+
+        # 推斷 order_type
+        order_type = "LONG_TERM"
+        otype = str(order.get("type", "") or "").upper()
+        tif = str(order.get("timeInForce", "") or "").upper()
+        flags = None
+        try:
+            flags = int(order.get("orderFlags", -1))
+        except Exception:
+            flags = None
+
+        # 優先用 orderFlags 判定（最準）
+        if flags == int(OrderFlags.CONDITIONAL):
+            order_type = "CONDITIONAL"
+        elif flags == int(OrderFlags.LONG_TERM):
+            order_type = "LONG_TERM"
+        elif flags == int(OrderFlags.SHORT_TERM):
+            order_type = "SHORT_TERM"
+        else:
+            # fallback：舊 heuristics
+            if otype in {"STOP_MARKET", "TAKE_PROFIT_MARKET", "STOP_LIMIT", "TAKE_PROFIT_LIMIT", "STOP_LOSS", "TAKE_PROFIT"}:
+                order_type = "CONDITIONAL"
+            elif "STOP" in otype or "TAKE_PROFIT" in otype:
+                order_type = "CONDITIONAL"
+            elif tif in {"IOC", "FOK"}:
+                order_type = "SHORT_TERM"
+
+        # 🔧 v14.6.32: 提取訂單的 goodTilBlockTime
+        gtbt = 0
+        gtbt_str = order.get("goodTilBlockTime", "")
+        if gtbt_str:
+            try:
+                from datetime import datetime
+                # dYdX 返回 ISO 格式: "2025-07-12T01:30:00.000Z"
+                dt = datetime.fromisoformat(gtbt_str.replace("Z", "+00:00"))
+                gtbt = int(dt.timestamp())
+            except Exception:
+                pass
+        return client_id, order_type, gtbt
+
     async def get_recent_fills(self, limit: int = 5) -> list[dict]:
         """取得最近 fills（用於與 dYdX 線上紀錄比對）。"""
         try:
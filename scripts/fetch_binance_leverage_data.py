@@ -16,19 +16,17 @@ Usage (offline demo payload, no network):
 from __future__ import annotations
 
 import argparse
+import asyncio
 import json
 import os
 import sys
-import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-import requests
-
-BINANCE_FUTURES_BASE = "https://fapi.binance.com"
-
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.metrics.leverage_data_collector import LeverageDataCollector  # noqa: E402
 
 @dataclass
 class FetchStats:
@@ -60,108 +58,33 @@ class BinanceLeverageDataFetcher:
         limit: int = 30,
         force_limit: int = 50,
         timeout: float = 10.0,
-        session: Optional[requests.Session] = None,
     ) -> None:
         self.symbol = symbol.upper()
         self.period = period
         self.limit = limit
         self.force_limit = force_limit
         self.timeout = timeout
-        self.session = session or requests.Session()
-        self.session.headers.update({"User-Agent": "btn-liq-pressure/1.0"})
-
-    # ------------------------ HTTP helpers ------------------------ #
-    def _get(self, path: str, params: Dict[str, Any]) -> Any:
-        url = f"{BINANCE_FUTURES_BASE}{path}"
-        response = self.session.get(url, params=params, timeout=self.timeout)
-        response.raise_for_status()
-        return response.json()
-
-    # ------------------------ Public endpoints ------------------------ #
-    def fetch_global_long_short_ratio(self) -> List[Dict[str, Any]]:
-        params = {"symbol": self.symbol, "period": self.period, "limit": self.limit}
-        return self._get("/futures/data/globalLongShortAccountRatio", params)
-
-    def fetch_top_long_short_ratio(self) -> List[Dict[str, Any]]:
-        params = {"symbol": self.symbol, "period": self.period, "limit": self.limit}
-        return self._get("/futures/data/topLongShortAccountRatio", params)
-
-    def fetch_open_interest_history(self) -> List[Dict[str, Any]]:
-        params = {"symbol": self.symbol, "period": self.period, "limit": self.limit}
-        return self._get("/futures/data/openInterestHist", params)
-
-    def fetch_recent_funding_rate(self) -> List[Dict[str, Any]]:
-        params = {"symbol": self.symbol, "limit": max(1, min(self.limit, 100))}
-        return self._get("/fapi/v1/fundingRate", params)
-
-    def fetch_force_orders(self) -> List[Dict[str, Any]]:
-        params = {"symbol": self.symbol, "limit": self.force_limit}
-        try:
-            return self._get("/fapi/v1/forceOrders", params)
-        except requests.HTTPError as e:
-            if e.response.status_code == 401:
-                print(f"⚠️ Warning: 401 Unauthorized for forceOrders. Skipping.", file=sys.stderr)
-                return []
-            raise
-
-    def fetch_taker_long_short_ratio(self) -> List[Dict[str, Any]]:
-        """
-        🆕 主動買賣比 (Taker Buy/Sell Volume Ratio)
-        
-        這是爆倉偵測的關鍵指標！
-        - buySellRatio > 1.5: 大量主動買入 → 空頭可能被軋
-        - buySellRatio < 0.6: 大量主動賣出 → 多頭可能被爆
-        
-        API: GET /futures/data/takerlongshortRatio
-        """
-        params = {"symbol": self.symbol, "period": self.period, "limit": self.limit}
-        try:
-            return self._get("/futures/data/takerlongshortRatio", params)
-        except requests.HTTPError as e:
-            print(f"⚠️ Warning: takerlongshortRatio failed: {e}", file=sys.stderr)
-            return []
-
-    def fetch_top_position_ratio(self) -> List[Dict[str, Any]]:
-        """
-        🆕 頂級交易員持倉比 (Top Trader Position Ratio)
-        
-        顯示頂級交易員的多空持倉比，跟散戶反著做！
-        
-        API: GET /futures/data/topLongShortPositionRatio
-        """
-        params = {"symbol": self.symbol, "period": self.period, "limit": self.limit}
-        try:
-            return self._get("/futures/data/topLongShortPositionRatio", params)
-        except requests.HTTPError as e:
-            print(f"⚠️ Warning: topLongShortPositionRatio failed: {e}", file=sys.stderr)
-            return []
+        # 並行收集器: 保留跨呼叫的序列快取，只抓已滾動的新週期
+        self.collector = LeverageDataCollector(
+            symbols=[self.symbol],
+            period=period,
+            limit=limit,
+            force_limit=force_limit,
+            timeout=timeout,
+        )
 
     # ------------------------ Orchestration ------------------------ #
     def collect(self) -> Dict[str, Any]:
-        start = time.time()
-        payload = {
-            "symbol": self.symbol,
-            "period": self.period,
-            "limit": self.limit,
-            "collected_at": datetime.now(timezone.utc).isoformat(),
-            "global_long_short": self.fetch_global_long_short_ratio(),
-            "top_long_short": self.fetch_top_long_short_ratio(),
-            "open_interest": self.fetch_open_interest_history(),
-            "funding_rate": self.fetch_recent_funding_rate(),
-            "force_orders": self.fetch_force_orders(),
-            # 🆕 新增 API
-            "taker_long_short": self.fetch_taker_long_short_ratio(),
-            "top_position_ratio": self.fetch_top_position_ratio(),
-        }
-        elapsed = time.time() - start
-        payload["fetch_stats"] = FetchStats(
-            elapsed_seconds=elapsed,
-            endpoint_count=7,  # 🆕 5 → 7
-            symbol=self.symbol,
-            period=self.period,
-            limit=self.limit,
-        ).to_dict()
-        return payload
+        """Fetch all seven endpoints concurrently (sync wrapper around LeverageDataCollector)."""
+        return asyncio.run(self._collect_async())
+
+    async def _collect_async(self) -> Dict[str, Any]:
+        try:
+            payloads = await self.collector.collect()
+        finally:
+            # aiohttp sessions are bound to the running loop; the series cache survives
+            await self.collector.close()
+        return payloads[self.symbol]
 
 
 # ---------------------------------------------------------------------------
@@ -286,7 +209,7 @@ def main(argv: Optional[List[str]] = None) -> int:
         )
         try:
             payload = fetcher.collect()
-        except requests.RequestException as exc:
+        except Exception as exc:
             print(f"❌ Binance fetch failed: {exc}", file=sys.stderr)
             return 2
 
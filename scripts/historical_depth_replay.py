@@ -15,6 +15,15 @@ Features
    SignedVolumeTracker + VPIN calculators in sync for higher fidelity.
 4. Reuses the exact sniper/hybrid logic from `paper_trading_hybrid_full.py`
    without mocking or reimplementing indicators.
+5. Binary feed recordings (`--recording`) written by
+   `record_binance_realtime_features.py --feed-out` stream depth and trades
+   block by block with bounded memory; a week of depth replays in minutes.
+6. Replay runs on a simulated clock (`src/core/clock.py`), so cooldowns,
+   5s bars and signal windows inside the trader follow replay time.
+7. Maker entries fill by queue position: replayed depth and trades drive
+   `QueueFillSimulator` (`src/exchange/queue_fill_simulator.py`) instead of
+   the touch rule. `scripts/simulate_maker_fills.py` runs the same model in
+   batch over recordings to measure fill rates.
 
 Usage example
 -------------
@@ -27,6 +36,18 @@ Usage example
         --initial-capital 100 \
         --max-position 0.5
 
+Replay a binary recording (one or more files, merged by time):
+    python scripts/historical_depth_replay.py \
+        --recording data/feeds/BTCUSDT_*.feed \
+        --start 2025-01-06 --end 2025-01-12
+
+Convert downloaded depth files once, then replay the recording:
+    python scripts/historical_depth_replay.py \
+        --depth-dir data/historical/depth_raw \
+        --agg-trades data/historical/BTCUSDT_agg_trades.parquet \
+        --start 2024-01-01 --end 2024-01-07 \
+        --convert-to data/feeds/BTCUSDT_20240101_20240107.feed
+
 Important notes
 ---------------
 * Please run `scripts/download_binance_depth.py` first to populate the
@@ -53,7 +74,6 @@ import json
 import os
 import sys
 import zipfile
-from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Generator, Iterable, Iterator, List, Optional, Sequence, Tuple
@@ -67,30 +87,21 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
 
 from scripts.paper_trading_hybrid_full import HybridPaperTradingSystem  # noqa: E402
-
-
-@dataclass
-class DepthEvent:
-    """Normalized depth snapshot."""
-
-    timestamp_ms: int
-    bids: List[Tuple[float, float]]
-    asks: List[Tuple[float, float]]
-
-
-@dataclass
-class TradeEvent:
-    """Normalized aggregated trade event."""
-
-    timestamp_ms: int
-    price: float
-    qty: float
-    is_buyer_maker: bool  # True => seller initiated (buying maker)
+from src.backtesting.feed_recording import (  # noqa: E402
+    DepthEvent,
+    FeedReader,
+    FeedWriter,
+    TradeEvent,
+    iter_feed_events,
+    merge_events,
+)
+from src.backtesting.tick_replay import TickReplayHarness  # noqa: E402
+from src.core.clock import SimulatedClock, use_clock  # noqa: E402
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Replay Binance depth files through the hybrid system")
-    parser.add_argument("--depth-dir", required=True, help="Directory containing extracted depth/book snapshot files")
+    parser.add_argument("--depth-dir", help="Directory containing extracted depth/book snapshot files")
     parser.add_argument("--depth-glob", default="*.csv", help="Glob pattern for depth files (default: *.csv)")
     parser.add_argument("--start", required=True, help="Start timestamp (YYYY-mm-dd or ISO8601)")
     parser.add_argument("--end", required=True, help="End timestamp (YYYY-mm-dd or ISO8601)")
@@ -101,6 +112,15 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--max-position", type=float, default=0.5, help="Max position percentage (0-1)")
     parser.add_argument("--print-status", type=float, default=60.0, help="Status print interval in seconds")
     parser.add_argument("--dry-run", action="store_true", help="Parse files only (no trading logic)")
+    parser.add_argument(
+        "--recording",
+        nargs="+",
+        help="Binary feed recordings (.feed) written by the realtime recorders; replaces --depth-dir/--agg-trades",
+    )
+    parser.add_argument(
+        "--convert-to",
+        help="Convert --depth-dir (+ --agg-trades) into a binary feed recording at this path and exit",
+    )
     return parser.parse_args()
 
 
@@ -305,105 +325,83 @@ def load_trade_events(parquet_path: Path, start_ms: int, end_ms: int) -> List[Tr
 
 
 class DepthReplayRunner:
+    """Replay depth files (+ optional trades) through `TickReplayHarness`.
+
+    Depth and trade streams are merged by timestamp and every event advances
+    the simulated clock, so cooldowns, bar boundaries and signal windows inside
+    the trader see replay time instead of wall-clock time.
+    """
+
     def __init__(
         self,
         system: HybridPaperTradingSystem,
         depth_events: Iterator[DepthEvent],
-        trade_events: Optional[List[TradeEvent]],
+        trade_events: Optional[Iterable[TradeEvent]],
         start_ms: int,
         end_ms: int,
         decision_interval_sec: float,
         status_interval_sec: float,
         dry_run: bool = False,
+        clock: Optional[SimulatedClock] = None,
     ):
         self.system = system
         self.depth_events = depth_events
         self.trade_events = trade_events or []
         self.start_ms = start_ms
         self.end_ms = end_ms
-        self.decision_interval_ms = int(decision_interval_sec * 1000)
-        self.status_interval_ms = int(status_interval_sec * 1000)
+        self.decision_interval_sec = decision_interval_sec
+        self.status_interval_sec = status_interval_sec
         self.dry_run = dry_run
+        self.clock = clock
 
     def run(self):
-        trade_iter = iter(self.trade_events)
-        next_trade = next(trade_iter, None)
-        last_decision = None
-        last_status = None
-        first_loop = True
-
-        processed = 0
-        for event in self.depth_events:
-            if event.timestamp_ms < self.start_ms:
+        events = merge_events(self.depth_events, self.trade_events)
+        harness = TickReplayHarness(
+            self.system,
+            events,
+            clock=self.clock,
+            start_ms=self.start_ms,
+            end_ms=self.end_ms,
+            decision_interval_sec=self.decision_interval_sec,
+            status_interval_sec=self.status_interval_sec,
+            dry_run=self.dry_run,
+        )
+        stats = harness.run()
+
+        print(f"\n✅ Replay finished. Processed {stats.depth_events} depth snapshots.")
+        if stats.trade_events:
+            print(f"   Trades consumed: {stats.trade_events}")
+        print(
+            f"   Simulated {stats.simulated_seconds / 3600:.2f}h in {stats.wall_seconds:.1f}s "
+            f"({stats.speedup:.0f}x real time), decisions: {stats.decisions}"
+        )
+        if not self.dry_run:
+            with use_clock(harness.clock):
+                self.system.generate_report()
+        return stats
+
+
+def convert_to_recording(
+    depth_events: Iterable[DepthEvent],
+    trade_events: Optional[Iterable[TradeEvent]],
+    out_path: Path,
+    symbol: str,
+    start_ms: int,
+    end_ms: int,
+) -> FeedWriter:
+    """Write depth files + agg trades into one binary feed recording."""
+
+    with FeedWriter(out_path, symbol=symbol) as writer:
+        for event in merge_events(depth_events, trade_events or []):
+            if event.timestamp_ms < start_ms:
                 continue
-            if event.timestamp_ms > self.end_ms:
+            if event.timestamp_ms > end_ms:
                 break
-
-            processed += 1
-            self._apply_depth_event(event)
-
-            while next_trade and next_trade.timestamp_ms <= event.timestamp_ms:
-                self._apply_trade(next_trade)
-                next_trade = next(trade_iter, None)
-
-            if self.dry_run:
-                continue
-
-            if last_decision is None or event.timestamp_ms - last_decision >= self.decision_interval_ms:
-                snapshot = self.system._build_market_snapshot()
-                if snapshot:
-                    if not first_loop:
-                        self.system.check_exits(snapshot)
-                    else:
-                        first_loop = False
-                    self.system.check_entries(snapshot)
-                last_decision = event.timestamp_ms
-
-            if last_status is None or event.timestamp_ms - last_status >= self.status_interval_ms:
-                if not self.dry_run:
-                    try:
-                        self.system.print_status()
-                    except Exception:
-                        pass
-                last_status = event.timestamp_ms
-
-        print(f"\n✅ Replay finished. Processed {processed} depth snapshots.")
-        if self.trade_events:
-            print(f"   Trades consumed: {len(self.trade_events)}")
-        if not self.dry_run:
-            self.system.generate_report()
-
-    def _apply_depth_event(self, event: DepthEvent):
-        bids = event.bids
-        asks = event.asks
-        if not bids or not asks:
-            return
-        best_bid_price = float(bids[0][0])
-        best_ask_price = float(asks[0][0])
-        self.system.obi_calc.update_orderbook(bids, asks)
-        self.system.spread_depth.update(bids, asks)
-        self.system.latest_price = (best_bid_price + best_ask_price) / 2
-        event_dt = datetime.fromtimestamp(event.timestamp_ms / 1000, tz=timezone.utc)
-        self.system.orderbook_timestamp = event_dt.isoformat()
-        self.system.orderbook_data = {
-            'bids': bids,
-            'asks': asks,
-            'timestamp': event.timestamp_ms
-        }
-        self.system._record_price(self.system.latest_price)
-        self.system._update_price_bars(best_bid_price, best_ask_price)
-
-    def _apply_trade(self, trade: TradeEvent):
-        payload = {
-            'p': trade.price,
-            'q': trade.qty,
-            'T': trade.timestamp_ms,
-            'm': trade.is_buyer_maker,
-            'isBuyerMaker': trade.is_buyer_maker
-        }
-        self.system.signed_volume.add_trade(payload)
-        self.system.vpin_calc.process_trade(payload)
-        self.system.pending_volume += trade.qty
+            if isinstance(event, TradeEvent):
+                writer.add_trade(event.timestamp_ms, event.price, event.qty, event.is_buyer_maker)
+            else:
+                writer.add_depth(event.timestamp_ms, event.bids, event.asks)
+    return writer
 
 
 def parse_iso_or_date(value: str, default_start: bool) -> datetime:
@@ -431,34 +429,80 @@ def main():
     end_dt = parse_iso_or_date(args.end, False)
     if end_dt <= start_dt:
         raise SystemExit("end must be after start")
+    start_ms = int(start_dt.timestamp() * 1000)
+    end_ms = int(end_dt.timestamp() * 1000)
+
+    if args.recording:
+        recordings = [Path(p) for p in args.recording]
+        missing = [p for p in recordings if not p.exists()]
+        if missing:
+            raise SystemExit(f"Recording not found: {missing[0]}")
+        for path in recordings:
+            reader = FeedReader(path)
+            print(f"📼 {path.name}: depth={reader.depth_count} trades={reader.trade_count} blocks={len(reader.blocks)}")
+        depth_iterator = None
+        trade_events = None
+    else:
+        if not args.depth_dir:
+            raise SystemExit("--depth-dir or --recording is required")
+        depth_dir = Path(args.depth_dir)
+        depth_files = sorted(depth_dir.glob(args.depth_glob))
+        if not depth_files:
+            raise SystemExit(f"No depth files found under {depth_dir} with pattern {args.depth_glob}")
+
+        print(f"📁 Depth files: {len(depth_files)} (first: {depth_files[0].name})")
+        trade_events = None
+        if args.agg_trades:
+            trade_events = load_trade_events(Path(args.agg_trades), start_ms, end_ms)
+            print(f"📄 Aggregated trades loaded: {len(trade_events)}")
+        depth_iterator = iter_depth_files(depth_files)
+
+        if args.convert_to:
+            writer = convert_to_recording(
+                depth_iterator, trade_events, Path(args.convert_to), args.symbol, start_ms, end_ms
+            )
+            print(
+                f"💾 Recording written: {writer.path} "
+                f"(depth={writer.depth_count}, trades={writer.trade_count})"
+            )
+            return
 
-    depth_dir = Path(args.depth_dir)
-    depth_files = sorted(depth_dir.glob(args.depth_glob))
-    if not depth_files:
-        raise SystemExit(f"No depth files found under {depth_dir} with pattern {args.depth_glob}")
-
-    print(f"📁 Depth files: {len(depth_files)} (first: {depth_files[0].name})")
-    trade_events = None
-    if args.agg_trades:
-        trade_events = load_trade_events(Path(args.agg_trades), int(start_dt.timestamp() * 1000), int(end_dt.timestamp() * 1000))
-        print(f"📄 Aggregated trades loaded: {len(trade_events)}")
-
-    system = HybridPaperTradingSystem(
-        initial_capital=args.initial_capital,
-        max_position_pct=args.max_position,
-        test_duration_hours=((end_dt - start_dt).total_seconds() / 3600)
-    )
+    # 系統在虛擬時鐘下建立，初始化時記錄的時間戳才會落在重放時間軸上
+    clock = SimulatedClock(start=start_ms / 1000)
+    with use_clock(clock):
+        system = HybridPaperTradingSystem(
+            initial_capital=args.initial_capital,
+            max_position_pct=args.max_position,
+            test_duration_hours=((end_dt - start_dt).total_seconds() / 3600),
+            clock=clock,
+        )
+
+    if args.recording:
+        harness = TickReplayHarness(
+            system,
+            iter_feed_events(recordings, start_ms, end_ms),
+            clock=clock,
+            decision_interval_sec=args.decision_interval,
+            status_interval_sec=args.print_status,
+            dry_run=args.dry_run,
+        )
+        stats = harness.run()
+        print(f"\n✅ Replay finished: {stats.to_dict()}")
+        if not args.dry_run:
+            with use_clock(clock):
+                system.generate_report()
+        return
 
-    depth_iterator = iter_depth_files(depth_files)
     runner = DepthReplayRunner(
         system=system,
         depth_events=depth_iterator,
         trade_events=trade_events,
-        start_ms=int(start_dt.timestamp() * 1000),
-        end_ms=int(end_dt.timestamp() * 1000),
+        start_ms=start_ms,
+        end_ms=end_ms,
         decision_interval_sec=args.decision_interval,
         status_interval_sec=args.print_status,
-        dry_run=args.dry_run
+        dry_run=args.dry_run,
+        clock=clock,
     )
     runner.run()
 
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Ingest trade / signal / fill logs into the columnar trade-analytics table.
+
+Normalizes ``trades_*.json``, ``signals_*.json`` and the dYdX order journal into
+partitioned Parquet under ``data/analytics`` (see
+`src/trading/trade_analytics.py`). Ingestion is incremental: unchanged files
+are skipped and the journal is read from the last offset, so this can run from
+cron. With ``--report`` the standard group-bys are printed afterwards.
+
+Usage example
+-------------
+    python scripts/ingest_trade_logs.py
+    python scripts/ingest_trade_logs.py --log-dir logs/whale_paper_trader logs/whale_testnet \
+        --report mode direction obi_bucket hour --start 2025-01-01
+    python scripts/ingest_trade_logs.py --sql "SELECT regime, count(*) FROM trades GROUP BY 1"
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.trading.trade_analytics import (  # noqa: E402
+    DEFAULT_ANALYTICS_DIR,
+    DEFAULT_JOURNALS,
+    DEFAULT_LOG_DIRS,
+    DIMENSIONS,
+    TradeAnalytics,
+)
+
+REPORT_COLUMNS = ["trades", "win_rate", "total_pnl_usdt", "avg_pnl_pct", "profit_factor", "avg_roe_pct"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ingest trade logs into the analytics table")
+    parser.add_argument("--root", default=str(ROOT_DIR / DEFAULT_ANALYTICS_DIR), help="Analytics table directory")
+    parser.add_argument("--log-dir", nargs="+", default=[str(ROOT_DIR / p) for p in DEFAULT_LOG_DIRS],
+                        help="Directories with trades_*.json / signals_*.json")
+    parser.add_argument("--journal", nargs="*", default=[str(ROOT_DIR / p) for p in DEFAULT_JOURNALS],
+                        help="Order journal JSONL files")
+    parser.add_argument("--force", action="store_true", help="Re-ingest everything")
+    parser.add_argument("--report", nargs="*", choices=sorted(DIMENSIONS), help="Print group-bys after ingest")
+    parser.add_argument("--start", help="Report start date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Report end date (YYYY-MM-DD)")
+    parser.add_argument("--sql", help="Run a DuckDB query against trades / signals / fills")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    analytics = TradeAnalytics(args.root)
+
+    t0 = time.perf_counter()
+    stats = analytics.ingest(log_dirs=args.log_dir, journals=args.journal, force=args.force)
+    print(
+        f"📥 Ingested {stats.files_ingested}/{stats.files_scanned} files "
+        f"(unchanged {stats.files_unchanged}, failed {stats.files_failed}) | "
+        f"trades={stats.trades} signals={stats.signals} fills={stats.fills} "
+        f"in {time.perf_counter() - t0:.2f}s"
+    )
+
+    if args.report:
+        df = analytics.trades(start=args.start, end=args.end)
+        print(f"\n📊 {len(df)} closed trades")
+        with pd.option_context("display.width", 160, "display.max_columns", None, "display.max_rows", 200, "display.float_format", "{:.3f}".format):
+            for dim in args.report:
+                print(f"\n=== {dim} ===")
+                print(analytics.breakdown(dim, df)[REPORT_COLUMNS])
+
+    if args.sql:
+        print(analytics.sql(args.sql).to_string())
+
+
+if __name__ == "__main__":
+    main()
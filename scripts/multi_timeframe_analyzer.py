@@ -21,7 +21,7 @@ import threading
 import requests
 from datetime import datetime
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any
 from collections import deque
 from enum import Enum
 import numpy as np
@@ -195,9 +195,21 @@ class MultiTimeframeAnalyzer:
     EMA_SLOW = 21
     RSI_PERIOD = 14
     
-    def __init__(self, symbol: str = "BTC-USD", enabled: bool = True):
-        self.symbol = "BTCUSDT" # Binance symbol format
+    def __init__(
+        self,
+        symbol: str = "BTC-USD",
+        enabled: bool = True,
+        rate_gate: Optional[Callable[[float], None]] = None,
+    ):
+        """
+        Args:
+            symbol: 任一格式的交易對 ("BTC-USD" / "ETH/USDT" / "SOLUSDT")，K 線一律拉 Binance USDT 永續
+            enabled: 是否啟用 (停用時不拉任何資料)
+            rate_gate: 每次 REST 請求前呼叫 rate_gate(weight)，多幣種模式由協調器共用權重額度
+        """
+        self.symbol = self._to_binance_symbol(symbol)  # Binance symbol format
         self.enabled = enabled
+        self.rate_gate = rate_gate
         
         # K 線數據緩存
         self.klines: Dict[str, List[KlineData]] = {}
@@ -216,6 +228,20 @@ class MultiTimeframeAnalyzer:
         if enabled:
             self._initial_fetch()
     
+    @staticmethod
+    def _to_binance_symbol(symbol: str) -> str:
+        """'BTC-USD' / 'ETH/USDT' / 'solusdt' → 'BTCUSDT' / 'ETHUSDT' / 'SOLUSDT'"""
+        s = (symbol or "BTC").upper().replace("/", "-")
+        if "-" in s:
+            base = s.split("-", 1)[0]
+        else:
+            base = s
+            for quote in ("USDT", "USDC", "USD"):
+                if s.endswith(quote) and len(s) > len(quote):
+                    base = s[: -len(quote)]
+                    break
+        return f"{base}USDT"
+    
     def _initial_fetch(self):
         """初始拉取所有時間框架數據"""
         for tf in self.TIMEFRAMES:
@@ -243,11 +269,15 @@ class MultiTimeframeAnalyzer:
             config = self.TIMEFRAMES[timeframe]
             # Binance Klines API
             params = {
-                "symbol": "BTCUSDT",
+                "symbol": self.symbol,
                 "interval": config["interval"],
                 "limit": config["lookback"]
             }
             
+            # Binance klines 權重: limit ≤ 100 為 1
+            if self.rate_gate is not None:
+                self.rate_gate(1)
+            
             # 使用 requests (同步)
             response = requests.get(self.BASE_URL, params=params, timeout=5)
             response.raise_for_status()
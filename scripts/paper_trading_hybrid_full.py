@@ -17,7 +17,6 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from pathlib import Path
-import time
 import json
 import csv
 from dataclasses import dataclass, asdict
@@ -25,15 +24,6 @@ from typing import Any, Dict, List, Optional, Tuple
 from enum import Enum
 from collections import deque
 import asyncio
-import websockets
-try:
-    from fetch_binance_leverage_data import BinanceLeverageDataFetcher, save_payload
-except ImportError:
-    try:
-        from scripts.fetch_binance_leverage_data import BinanceLeverageDataFetcher, save_payload
-    except ImportError:
-        BinanceLeverageDataFetcher = None
-        save_payload = None
 
 from src.strategy.hybrid_multi_mode import (
     MultiModeHybridStrategy, 
@@ -43,18 +33,29 @@ from src.strategy.signal_generator import SignalGenerator
 from src.strategy.mode_config_manager import ModeConfigManager
 from src.strategy.rule_engine import RuleEngine
 from src.exchange.obi_calculator import OBICalculator
+from src.exchange.stream_mux import BinanceStreamMux, BookTicker, DepthUpdate
+from src.bridge_channel import BridgeChannel
+from src.core.clock import Clock, get_clock
+from src.core.config_service import get_config_service, thaw_config, write_json_atomic
+from src.utils.dashboard_renderer import DashboardRenderer, DashboardSnapshot, freeze
 from src.exchange.signed_volume_tracker import SignedVolumeTracker
 from src.exchange.vpin_calculator import VPINCalculator
 from src.exchange.spread_depth_monitor import SpreadDepthMonitor
 from src.utils.consolidation_detector import ConsolidationDetector
 from src.utils.market_regime_detector import MarketRegimeDetector, MarketRegime
+from src.utils.regime_engine import get_regime_engine
 from src.utils.cost_aware_filter import CostAwareFilter, CostDecision
 from src.metrics.leverage_pressure import (
     LiquidationPressureSnapshot,
     PressureLevel,
     load_snapshot_from_file,
     render_panel,
+    save_snapshot_to_file,
 )
+try:
+    from src.metrics.leverage_data_collector import LeverageDataCollector
+except ImportError:
+    LeverageDataCollector = None
 # 🆕 爆倉瀑布即時偵測
 try:
     from src.metrics.liquidation_cascade_detector import (
@@ -78,6 +79,7 @@ from src.exchange.maker_order_manager import (
     calculate_fee_impact,
     should_use_maker
 )
+from src.exchange.queue_fill_simulator import QueueFillSimulator, QueueOrderState
 
 
 # ==================== 數據類 ====================
@@ -148,9 +150,9 @@ class SimulatedOrder:
         self.max_holding_hours = max_holding_hours
         self.min_holding_seconds = min_holding_seconds  # 🆕
         self.min_reverse_exit_seconds = max(min_holding_seconds, 45.0)
-        self.entry_time = entry_time or datetime.now().isoformat()
+        self.entry_time = entry_time or get_clock().now().isoformat()
         self.market_data = market_data or {}
-        self.order_id = order_id or f"{strategy}_{int(time.time()*1000)}"
+        self.order_id = order_id or f"{strategy}_{int(get_clock().time()*1000)}"
         self.is_maker = is_maker
         
         # 🆕 Maker 掛單狀態
@@ -159,8 +161,9 @@ class SimulatedOrder:
         self.maker_allow_taker_fallback = maker_allow_taker_fallback
         self.maker_status = "PENDING" if (is_maker and maker_limit_price > 0) else "FILLED"
         # PENDING = 等待成交, FILLED = 已成交, CANCELLED = 已取消, TAKER_FALLBACK = 超時後用Taker
-        self.maker_created_time = time.time() if self.maker_status == "PENDING" else None
-        self.maker_filled_time = None if self.maker_status == "PENDING" else time.time()
+        self.maker_created_time = get_clock().time() if self.maker_status == "PENDING" else None
+        self.maker_filled_time = None if self.maker_status == "PENDING" else get_clock().time()
+        self.maker_fill_ratio = 1.0  # 佇列模擬下超時時的已成交比例
         
         # 開倉費用
         # Maker: -0.01% (返佣), Taker: 0.05%
@@ -197,7 +200,13 @@ class SimulatedOrder:
         self.entry_vpin = market_data.get('vpin', 0)
         self.entry_spread = market_data.get('spread_bps', 0)
     
-    def check_maker_fill(self, current_price: float, high_price: float = None, low_price: float = None) -> str:
+    def check_maker_fill(
+        self,
+        current_price: float,
+        high_price: float = None,
+        low_price: float = None,
+        queue_state: Optional[QueueOrderState] = None
+    ) -> str:
         """
         🆕 檢查 Maker 掛單是否應該成交
         
@@ -205,6 +214,8 @@ class SimulatedOrder:
         - LONG 訂單：當價格下跌到掛單價或更低時成交
         - SHORT 訂單：當價格上漲到掛單價或更高時成交
         - 使用 high/low 可以檢查是否在某根K線內觸及
+        - 提供 queue_state (QueueFillSimulator) 時改用佇列位置：完全成交才算 FILLED；
+          超時時已部分成交的部分保留 (倉位按成交比例縮小)，剩餘部分依設定 Taker 補單或取消
         
         Returns:
             "FILLED" - 已成交
@@ -216,18 +227,30 @@ class SimulatedOrder:
             return self.maker_status
         
         # 檢查超時
-        elapsed = time.time() - self.maker_created_time
+        elapsed = get_clock().time() - self.maker_created_time
         if elapsed > self.maker_timeout_seconds:
+            filled_ratio = queue_state.fill_ratio if queue_state is not None else 0.0
             if self.maker_allow_taker_fallback:
-                # 超時：用 Taker 補單
+                # 超時：用 Taker 補單 (部分成交時只補剩餘部分)
                 self.maker_status = "TAKER_FALLBACK"
                 self.is_maker = False
-                self.actual_entry_price = current_price * (1.0002 if self.direction == "LONG" else 0.9998)
-                self.maker_filled_time = time.time()
+                taker_price = current_price * (1.0002 if self.direction == "LONG" else 0.9998)
+                self.actual_entry_price = self.maker_limit_price * filled_ratio + taker_price * (1 - filled_ratio)
+                self.maker_filled_time = get_clock().time()
                 # 重新計算手續費
-                fee_rate = 0.0005  # Taker
+                fee_rate = -0.0001 * filled_ratio + 0.0005 * (1 - filled_ratio)  # Maker 部分 + Taker 部分
                 self.entry_fee = self.position_value * self.leverage * fee_rate
                 return "TIMEOUT_TAKER"
+            elif filled_ratio > 0:
+                # 超時但已部分成交：保留成交部分，取消剩餘
+                self.maker_fill_ratio = filled_ratio
+                self.position_value *= filled_ratio
+                self.entry_fee = self.position_value * self.leverage * -0.0001
+                self.maker_status = "FILLED"
+                self.maker_filled_time = get_clock().time()
+                self.actual_entry_price = self.maker_limit_price
+                self.entry_time = get_clock().now().isoformat()
+                return "FILLED"
             else:
                 self.maker_status = "CANCELLED"
                 return "TIMEOUT_CANCELLED"
@@ -236,7 +259,10 @@ class SimulatedOrder:
         # 使用 high/low 範圍檢查（如果提供）
         price_touched = False
         
-        if self.direction == "LONG":
+        if queue_state is not None:
+            # 佇列模擬：前方佇列被成交吃完、且我們的數量全部成交
+            price_touched = queue_state.is_complete
+        elif self.direction == "LONG":
             # 做多：掛買單，價格需要下跌到掛單價
             check_price = low_price if low_price else current_price
             if check_price <= self.maker_limit_price:
@@ -249,9 +275,9 @@ class SimulatedOrder:
         
         if price_touched:
             self.maker_status = "FILLED"
-            self.maker_filled_time = time.time()
+            self.maker_filled_time = get_clock().time()
             self.actual_entry_price = self.maker_limit_price  # 以掛單價成交
-            self.entry_time = datetime.now().isoformat()  # 更新進場時間為實際成交時間
+            self.entry_time = get_clock().now().isoformat()  # 更新進場時間為實際成交時間
             return "FILLED"
         
         return "PENDING"
@@ -261,8 +287,8 @@ class SimulatedOrder:
         self.is_blocked = True
         self.blocked_reasons = reasons
     
-    def update_unrealized_pnl(self, current_price: float) -> Tuple[float, float]:
-        """更新未實現盈虧
+    def unrealized_pnl(self, current_price: float) -> Tuple[float, float]:
+        """計算未實現盈虧（未扣除費用，不更新峰值，供顯示用）
         
         Returns:
             (unrealized_pnl_usdt, unrealized_pnl_pct)
@@ -272,9 +298,17 @@ class SimulatedOrder:
         else:  # SHORT
             price_change = (self.actual_entry_price - current_price) / self.actual_entry_price
         
-        # 計算未實現盈虧（未扣除費用）
         unrealized_pnl_pct = price_change * self.leverage * 100
         unrealized_pnl_usdt = self.position_value * price_change * self.leverage
+        return unrealized_pnl_usdt, unrealized_pnl_pct
+    
+    def update_unrealized_pnl(self, current_price: float) -> Tuple[float, float]:
+        """更新未實現盈虧
+        
+        Returns:
+            (unrealized_pnl_usdt, unrealized_pnl_pct)
+        """
+        unrealized_pnl_usdt, unrealized_pnl_pct = self.unrealized_pnl(current_price)
         
         # 更新峰值盈利（用於追蹤止損）
         if unrealized_pnl_pct > self.peak_pnl_pct:
@@ -592,12 +626,23 @@ class HybridPaperTradingSystem:
         self,
         initial_capital: float = 100.0,
         max_position_pct: float = 0.5,
-        test_duration_hours: float = 3.0
+        test_duration_hours: float = 3.0,
+        clock: Optional[Clock] = None,
+        headless: bool = False
     ):
+        # 時鐘服務: 冷卻、穩定窗口、K 棒與超時全部讀這個時鐘 (重放時注入 SimulatedClock)
+        self.clock: Clock = clock or get_clock()
         self.initial_capital = initial_capital
         self.max_position_pct = max_position_pct
         self.test_duration_hours = test_duration_hours
 
+        # 狀態/排行榜輸出: run() 期間交給背景渲染執行緒；headless 時完全不輸出
+        self.headless = headless
+        self.dashboard: Optional[DashboardRenderer] = None
+        self.status_interval_sec = 30.0
+        self.leaderboard_interval_sec = 60.0
+        self._last_leaderboard_render = 0.0
+
         # 目前啟用的狙擊模式 - 專注 M🐺 調整
         self.active_modes: List[TradingMode] = [
             TradingMode.M_AI_WHALE_HUNTER,   # 🐺 主策略
@@ -823,7 +868,12 @@ class HybridPaperTradingSystem:
             "btcusdt@depth20@100ms",
             "btcusdt@aggTrade"
         ]
-        self.ws_url = f"wss://fstream.binance.com/stream?streams={'/'.join(self.ws_streams)}"
+        # 同一條 combined stream 也承載爆倉瀑布偵測器的 forceOrder / aggTrade 訂閱
+        self.stream_mux = BinanceStreamMux(reconnect_delay=1.0, max_reconnect_delay=10.0, stale_timeout=30.0)
+        self.stream_mux.subscribe("btcusdt@bookTicker", self._on_stream_book_ticker)
+        self.stream_mux.subscribe("btcusdt@depth20@100ms", self._on_stream_depth)
+        self.stream_mux.subscribe("btcusdt@aggTrade", self.on_agg_trade, decode='dict')
+        self.ws_url = self.stream_mux.stream_urls()[0]
         self.orderbook_data = None
         self.orderbook_timestamp = None
         self.latest_price = None
@@ -835,7 +885,8 @@ class HybridPaperTradingSystem:
         self.spread_depth = SpreadDepthMonitor(symbol="BTCUSDT", depth_levels=10)
         self.consolidation_detector = ConsolidationDetector(
             bb_width_threshold=0.02,
-            atr_threshold=0.005
+            atr_threshold=0.005,
+            clock=self.clock
         )
         self.market_regime_detector = MarketRegimeDetector(
             ma_short=7,
@@ -843,10 +894,13 @@ class HybridPaperTradingSystem:
             consolidation_threshold=0.003,
             strong_trend_threshold=0.01
         )
+        # 市場狀態 / 盤整指標隨 bar 收盤增量更新，快照時 O(1) 讀取 (同交易對共用一份)
+        self.regime_engine = get_regime_engine("BTCUSDT", self.market_regime_detector, self.consolidation_detector)
         self.cost_filter = CostAwareFilter(
             max_fee_ratio=0.30,
             warning_fee_ratio=0.20,
-            min_profit_usd=3.0
+            min_profit_usd=3.0,
+            clock=self.clock
         )
         
         # 🆕 動態策略配置系統
@@ -854,13 +908,14 @@ class HybridPaperTradingSystem:
             config_path="config/trading_strategies_dynamic.json"
         )
         self.rule_engine = RuleEngine()
-        self.last_config_reload_time = time.time()
+        self.last_config_reload_time = self.clock.time()
         self.config_reload_interval = 10.0  # 每 10 秒檢查一次配置更新
         
         # 🆕 動態獲利配置系統 (手續費感知)
         self.profit_config_path = "config/ai_profit_dynamic.json"
+        self._profit_config_entry = get_config_service().watch(self.profit_config_path)
         self.profit_config = self._load_profit_config()
-        self.last_profit_config_reload = time.time()
+        self._profit_config_generation = self._profit_config_entry.generation
         
         # 初始化 6 個 Hybrid 策略（M0-M5）
         self.strategies: Dict[TradingMode, MultiModeHybridStrategy] = {}
@@ -1048,10 +1103,14 @@ class HybridPaperTradingSystem:
         }
         
         # 🏷️ Maker 訂單管理器 (降低手續費成本)
+        # 佇列成交模擬：依 L2 價位量與成交量追蹤掛單排隊位置 (on_depth / on_agg_trade 餵入)
+        self.queue_fill_sim = QueueFillSimulator(cancel_model="pro_rata")
         self.maker_manager = MakerOrderManager(
             default_timeout=60.0,           # 預設等待 60 秒
             default_taker_fallback=False,   # 🔧 超時取消訂單，不使用 Taker（避免高手續費風險）
-            maker_offset_bps=1.0            # 掛單偏移 1 個基點
+            maker_offset_bps=1.0,           # 掛單偏移 1 個基點
+            clock=self.clock,
+            fill_simulator=self.queue_fill_sim
         )
         # 🔧 改為全 Taker 模式 - 犧牲手續費換取即時成交
         # Taker 成本 (60x): 0.05% * 60 * 2 = 6% ROI
@@ -1153,12 +1212,12 @@ class HybridPaperTradingSystem:
         self.time_analyzer = TimeZoneAnalyzer()
         
         # 測試開始時間
-        self.start_time = datetime.now()
+        self.start_time = self.clock.now()
         self.end_time = self.start_time + timedelta(hours=test_duration_hours)
         
         # 🆕 即時保存檔案結構 (仿照 paper_trading_system.py)
-        self.save_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        self.session_folder = datetime.now().strftime('pt_%Y%m%d_%H%M')
+        self.save_timestamp = self.clock.now().strftime('%Y%m%d_%H%M%S')
+        self.session_folder = self.clock.now().strftime('pt_%Y%m%d_%H%M')
         self.session_dir = f"data/paper_trading/{self.session_folder}"
         
         # 確保資料夾存在
@@ -1250,7 +1309,7 @@ class HybridPaperTradingSystem:
     def _maybe_load_liquidation_pressure(self) -> Optional[LiquidationPressureSnapshot]:
         cfg = self.liq_pressure_config
         path = Path(cfg['data_path']) if not isinstance(cfg['data_path'], Path) else cfg['data_path']
-        now = time.time()
+        now = self.clock.time()
 
         if now - self._liq_pressure_last_load < cfg['refresh_interval']:
             return self._liq_pressure_snapshot
@@ -1291,10 +1350,9 @@ class HybridPaperTradingSystem:
             dt = datetime.fromisoformat(snapshot.collected_at)
         except ValueError:
             return None
-        return max(0.0, time.time() - dt.timestamp())
+        return max(0.0, self.clock.time() - dt.timestamp())
 
-    def _render_liquidation_pressure_panel(self) -> Optional[str]:
-        snapshot = self._maybe_load_liquidation_pressure()
+    def _render_liquidation_pressure_panel(self, snapshot: Optional[LiquidationPressureSnapshot]) -> Optional[str]:
         if not snapshot:
             return None
         panel = render_panel(snapshot)
@@ -1496,7 +1554,7 @@ class HybridPaperTradingSystem:
                 'reason': 'Direction probe already holding position'
             }
 
-        now_ts = time.time()
+        now_ts = self.clock.time()
         last_entry = self.last_entry_time.get(mode, 0.0)
         base_cooldown = self.entry_cooldown.get(mode, 0.0)
         probe_cfg = self.direction_probe_config.get(mode, {})
@@ -1586,7 +1644,7 @@ class HybridPaperTradingSystem:
         """紀錄最新價格供 Sniper 模式估算動能"""
         if price is None:
             return
-        self.price_history.append((time.time(), price))
+        self.price_history.append((self.clock.time(), price))
 
     def _update_price_bars(self, best_bid: Optional[float], best_ask: Optional[float]):
         """
@@ -1601,7 +1659,7 @@ class HybridPaperTradingSystem:
             return
         
         mid_price = (best_bid + best_ask) / 2
-        now = time.time()
+        now = self.clock.time()
         
         # 初始化當前 bar
         if self._current_bar['start_time'] is None:
@@ -1632,6 +1690,13 @@ class HybridPaperTradingSystem:
             self.price_bars['close'].append(self._current_bar['close'])
             self.price_bars['volume'].append(self._current_bar['volume'])
             self.price_bars['timestamp'].append(now)
+            self.regime_engine.update(
+                self._current_bar['high'],
+                self._current_bar['low'],
+                self._current_bar['close'],
+                self._current_bar['volume'],
+                now
+            )
             
             # 開始新的 bar
             self._current_bar = {
@@ -2115,7 +2180,7 @@ class HybridPaperTradingSystem:
             if long_ma != 0:
                 trend_strength = (short_ma - long_ma) / long_ma
 
-        now_ts = time.time()
+        now_ts = self.clock.time()
         obi_velocity = 0.0
         signed_volume_rate = 0.0
         if self.last_snapshot_meta and self.last_snapshot_time:
@@ -2146,32 +2211,17 @@ class HybridPaperTradingSystem:
         regime_details: Dict[str, float] = {}
         consolidation_flag = False
         consolidation_reason = None
-        if len(self.price_bars['close']) >= 60:
-            df = pd.DataFrame({
-                'high': list(self.price_bars['high'])[-60:],
-                'low': list(self.price_bars['low'])[-60:],
-                'close': list(self.price_bars['close'])[-60:],
-                'volume': list(self.price_bars['volume'])[-60:]
-            })
-            regime_result = self.market_regime_detector.detect_regime(df, return_details=True)
-            if isinstance(regime_result, tuple):
-                regime_enum, metrics = regime_result
-                market_regime = regime_enum.value if isinstance(regime_enum, MarketRegime) else str(regime_enum)
-                if isinstance(metrics, dict):
-                    regime_details = {
-                        'ma_distance': metrics.get('ma_distance'),
-                        'volatility': metrics.get('volatility'),
-                        'volume_ratio': metrics.get('volume_ratio')
-                    }
-            else:
-                market_regime = regime_result.value if isinstance(regime_result, MarketRegime) else str(regime_result)
-
-            high_arr = np.array(df['high'], dtype=float)
-            low_arr = np.array(df['low'], dtype=float)
-            close_arr = np.array(df['close'], dtype=float)
-            cons_state = self.consolidation_detector.is_consolidating(high_arr, low_arr, close_arr)
-            consolidation_flag = cons_state.is_consolidating
-            consolidation_reason = cons_state.reason
+        if self.regime_engine.bar_count >= 60:
+            regime_state = self.regime_engine.snapshot
+            market_regime = regime_state.regime.value
+            metrics = regime_state.details
+            regime_details = {
+                'ma_distance': metrics.get('ma_distance'),
+                'volatility': metrics.get('volatility'),
+                'volume_ratio': metrics.get('volume_ratio')
+            }
+            consolidation_flag = regime_state.consolidation.is_consolidating
+            consolidation_reason = regime_state.consolidation.reason
 
         snapshot = {
             'obi': obi,
@@ -2514,7 +2564,7 @@ class HybridPaperTradingSystem:
         # 判斷潛在方向
         potential_dir = 'LONG' if net_qty > 0 else 'SHORT'
         
-        now_ts = time.time()
+        now_ts = self.clock.time()
         
         # 取得 OBI
         obi = self.obi_calc.get_obi() if hasattr(self, 'obi_calc') else 0
@@ -2590,7 +2640,7 @@ class HybridPaperTradingSystem:
             with open(self.whale_flip_log_file, 'a', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 writer.writerow([
-                    datetime.now().isoformat(),
+                    self.clock.now().isoformat(),
                     event_type,
                     current_dir,
                     potential_dir,
@@ -2614,166 +2664,144 @@ class HybridPaperTradingSystem:
         except Exception as e:
             print(f"Error writing to whale flip log: {e}")
 
+    # ==================== 行情事件 (WebSocket 與重放共用) ====================
+
+    def on_book_ticker(self, best_bid: float, best_ask: float, event_time_ms: Optional[int] = None):
+        """處理最優買賣價 (bookTicker)：更新最新價、價格歷史與 K 棒"""
+        if not best_bid or not best_ask:
+            return
+        self.latest_price = (best_bid + best_ask) / 2
+        if event_time_ms:
+            self.orderbook_timestamp = datetime.fromtimestamp(event_time_ms / 1000).isoformat()
+        self._record_price(self.latest_price)
+        self._update_price_bars(best_bid, best_ask)
+
+    def on_depth(self, bids: list, asks: list, event_time_ms: Optional[int] = None):
+        """處理深度快照：更新 OBI / 價差深度 / 訂單簿"""
+        if not bids or not asks:
+            return
+        self.obi_calc.update_orderbook(bids, asks)
+        self.spread_depth.update(bids, asks)
+        self.orderbook_data = {
+            'bids': bids,
+            'asks': asks,
+            'timestamp': event_time_ms
+        }
+        self.maker_manager.on_depth(bids, asks, event_time_ms)
+
+    def on_agg_trade(self, payload: dict):
+        """處理聚合成交 (aggTrade)：訂單流指標 + 大單淨方向訊號"""
+        # 兩個追蹤器都直接讀 p / q / T / m，不必每筆再複製一份 dict
+        self.signed_volume.add_trade(payload)
+        self.vpin_calc.process_trade(payload)
+        try:
+            trade_qty = float(payload.get('q', 0.0))
+            self.pending_volume += trade_qty
+            self.maker_manager.on_trade(float(payload.get('p', 0)), trade_qty, bool(payload.get('m')), payload.get('T'))
+
+            # 🆕 大單偵測 - 先全部記錄下來，之後用「多空總和」決定淨方向
+            if trade_qty >= self.large_trade_threshold:
+                is_buyer_maker = payload.get('m')  # True=賣單吃買盤(偏空), False=買單吃賣盤(偏多)
+                direction = 'SHORT' if is_buyer_maker else 'LONG'
+                now_ts = self.clock.time()
+                self.recent_large_trades.append({
+                    'time': now_ts,
+                    'qty': trade_qty,
+                    'price': float(payload.get('p', 0)),
+                    'direction': direction
+                })
+                self.large_trade_history.append({
+                    'time': now_ts,
+                    'qty': trade_qty,
+                    'direction': direction
+                })
+
+                # 只保留最近 large_trade_agg_window 秒內的大單
+                cutoff = now_ts - self.large_trade_agg_window
+                while self.recent_large_trades and self.recent_large_trades[0]['time'] < cutoff:
+                    self.recent_large_trades.popleft()
+
+                # 🆕 取得動態參數 (M_WHALE_WATCHER)
+                whale_cfg = self.mode_config_manager.get_config('M_WHALE_WATCHER') or {}
+                whale_rules = whale_cfg.get('entry_rules', {}).get('whale_dominance', {})
+                min_count = whale_rules.get('min_count', 5)
+                min_total_qty = whale_rules.get('min_total_qty', 3.0)
+                min_dominance = whale_rules.get('min', 0.6)
+
+                # 檢查樣本數是否足夠
+                if len(self.recent_large_trades) < min_count:
+                    return  # 樣本數不足，跳過訊號發出
+
+                # 計算這段時間內多空總和
+                long_qty = sum(t['qty'] for t in self.recent_large_trades if t['direction'] == 'LONG')
+                short_qty = sum(t['qty'] for t in self.recent_large_trades if t['direction'] == 'SHORT')
+                net_qty = long_qty - short_qty
+
+                # 確保至少有 min_total_qty BTC 的總量才發出訊號
+                total_qty = long_qty + short_qty
+                if total_qty < min_total_qty:
+                    return  # 總量太小，不可信
+
+                # 只有當一邊明顯佔優時才發出方向訊號
+                dominance_ratio = abs(net_qty) / total_qty if total_qty > 0 else 0
+
+                # 計算大單加權平均價格 (VWAP of whales)
+                vwap_sum = sum(t['price'] * t['qty'] for t in self.recent_large_trades)
+                vwap_qty = sum(t['qty'] for t in self.recent_large_trades)
+                whale_vwap = vwap_sum / vwap_qty if vwap_qty > 0 else float(payload.get('p', 0))
+
+                # 🆕 M🐳 反轉預警與衝擊預測
+                self._analyze_whale_flip_risk(net_qty, total_qty, dominance_ratio, long_qty, short_qty)
+
+                if dominance_ratio >= min_dominance:  # 使用動態配置的集中度門檻
+                    net_direction = 'LONG' if net_qty > 0 else 'SHORT'
+                    self.large_trade_signal = {
+                        'direction': net_direction,
+                        'timestamp': now_ts,
+                        'net_qty': net_qty,
+                        'dominance_ratio': dominance_ratio,
+                        'long_qty': long_qty,
+                        'short_qty': short_qty,
+                        'total_qty': total_qty,
+                        'whale_vwap': whale_vwap  # 🐳 鯨魚成本價
+                    }
+                    print(
+                        f"   🐋 大單淨方向訊號: {net_direction} | 多={long_qty:.2f} BTC, 空={short_qty:.2f} BTC, "
+                        f"淨量={net_qty:.2f} BTC, 集中度={dominance_ratio:.2f}"
+                    )
+        except (TypeError, ValueError):
+            pass
+
+    def decision_step(self, run_exits: bool = True) -> Optional[dict]:
+        """
+        單次決策循環：建立市場快照 → 檢查出場 → 檢查進場
+
+        Args:
+            run_exits: 是否先檢查出場 (第一輪跳過)
+
+        Returns:
+            市場快照；數據不足時為 None
+        """
+        snapshot = self._build_market_snapshot()
+        if snapshot is None:
+            return None
+        if run_exits:
+            self.check_exits(snapshot)
+        self.check_entries(snapshot)
+        return snapshot
+
+    def _on_stream_book_ticker(self, ticker: BookTicker):
+        self.on_book_ticker(ticker.bid, ticker.ask, ticker.event_ms or ticker.update_id)
+
+    def _on_stream_depth(self, book: DepthUpdate):
+        self.on_depth(book.bids[:20], book.asks[:20], book.event_ms or None)
+
     async def connect_websocket(self):
-        """連接 WebSocket 獲取即時訂單簿（帶自動重連）"""
+        """連接 WebSocket 獲取即時訂單簿（多工器負責重連 / 假死偵測，跑到 end_time 為止）"""
         print("🔌 連接 Binance WebSocket...")
-        
-        retry_count = 0
-        max_retries = 10
-        
-        while datetime.now() < self.end_time:
-            try:
-                async with websockets.connect(
-                    self.ws_url,
-                    ping_interval=20,
-                    ping_timeout=10,
-                    close_timeout=10
-                ) as ws:
-                    if retry_count > 0:
-                        print(f"✅ WebSocket 重新連接成功\n")
-                    else:
-                        print("✅ WebSocket 已連接\n")
-                    
-                    retry_count = 0  # 重置重試計數
-                    
-                    while datetime.now() < self.end_time:
-                        try:
-                            msg = await asyncio.wait_for(ws.recv(), timeout=2.0)
-                            data = json.loads(msg)
-                            stream = data.get('stream', '')
-                            payload = data.get('data', {})
-                            if not stream or not payload:
-                                continue
-
-                            if 'bookTicker' in stream:
-                                best_bid = float(payload.get('b', 0))
-                                best_ask = float(payload.get('a', 0))
-                                if best_bid and best_ask:
-                                    self.latest_price = (best_bid + best_ask) / 2
-                                    event_time = payload.get('E') or payload.get('u')
-                                    if event_time:
-                                        self.orderbook_timestamp = datetime.fromtimestamp(
-                                            event_time / 1000
-                                        ).isoformat()
-                                    self._record_price(self.latest_price)
-                                    self._update_price_bars(best_bid, best_ask)
-                            elif 'depth' in stream:
-                                bids = [[float(p), float(q)] for p, q in payload.get('b', [])[:20]]
-                                asks = [[float(p), float(q)] for p, q in payload.get('a', [])[:20]]
-                                if bids and asks:
-                                    self.obi_calc.update_orderbook(bids, asks)
-                                    self.spread_depth.update(bids, asks)
-                                    self.orderbook_data = {
-                                        'bids': bids,
-                                        'asks': asks,
-                                        'timestamp': payload.get('E')
-                                    }
-                            elif 'aggTrade' in stream:
-                                trade = {
-                                    'p': payload.get('p'),
-                                    'q': payload.get('q'),
-                                    'T': payload.get('T'),
-                                    'm': payload.get('m'),
-                                    'isBuyerMaker': payload.get('m')
-                                }
-                                self.signed_volume.add_trade(trade)
-                                self.vpin_calc.process_trade(trade)
-                                try:
-                                    trade_qty = float(payload.get('q', 0.0))
-                                    self.pending_volume += trade_qty
-                                    
-                                    # 🆕 大單偵測 - 先全部記錄下來，之後用「多空總和」決定淨方向
-                                    if trade_qty >= self.large_trade_threshold:
-                                        is_buyer_maker = payload.get('m')  # True=賣單吃買盤(偏空), False=買單吃賣盤(偏多)
-                                        direction = 'SHORT' if is_buyer_maker else 'LONG'
-                                        now_ts = time.time()
-                                        self.recent_large_trades.append({
-                                            'time': now_ts,
-                                            'qty': trade_qty,
-                                            'price': float(payload.get('p', 0)),
-                                            'direction': direction
-                                        })
-                                        self.large_trade_history.append({
-                                            'time': now_ts,
-                                            'qty': trade_qty,
-                                            'direction': direction
-                                        })
-
-                                        # 只保留最近 large_trade_agg_window 秒內的大單
-                                        cutoff = now_ts - self.large_trade_agg_window
-                                        while self.recent_large_trades and self.recent_large_trades[0]['time'] < cutoff:
-                                            self.recent_large_trades.popleft()
-
-                                        # 🆕 取得動態參數 (M_WHALE_WATCHER)
-                                        whale_cfg = self.mode_config_manager.get_config('M_WHALE_WATCHER') or {}
-                                        whale_rules = whale_cfg.get('entry_rules', {}).get('whale_dominance', {})
-                                        min_count = whale_rules.get('min_count', 5)
-                                        min_total_qty = whale_rules.get('min_total_qty', 3.0)
-                                        min_dominance = whale_rules.get('min', 0.6)
-
-                                        # 檢查樣本數是否足夠
-                                        if len(self.recent_large_trades) < min_count:
-                                            continue  # 樣本數不足，跳過訊號發出
-
-                                        # 計算這段時間內多空總和
-                                        long_qty = sum(t['qty'] for t in self.recent_large_trades if t['direction'] == 'LONG')
-                                        short_qty = sum(t['qty'] for t in self.recent_large_trades if t['direction'] == 'SHORT')
-                                        net_qty = long_qty - short_qty
-
-                                        # 確保至少有 min_total_qty BTC 的總量才發出訊號
-                                        total_qty = long_qty + short_qty
-                                        if total_qty < min_total_qty:
-                                            continue  # 總量太小，不可信
-
-                                        # 只有當一邊明顯佔優時才發出方向訊號
-                                        dominance_ratio = abs(net_qty) / total_qty if total_qty > 0 else 0
-                                        
-                                        # 計算大單加權平均價格 (VWAP of whales)
-                                        vwap_sum = sum(t['price'] * t['qty'] for t in self.recent_large_trades)
-                                        vwap_qty = sum(t['qty'] for t in self.recent_large_trades)
-                                        whale_vwap = vwap_sum / vwap_qty if vwap_qty > 0 else float(payload.get('p', 0))
-
-                                        # 🆕 M🐳 反轉預警與衝擊預測
-                                        self._analyze_whale_flip_risk(net_qty, total_qty, dominance_ratio, long_qty, short_qty)
-                                        
-                                        if dominance_ratio >= min_dominance:  # 使用動態配置的集中度門檻
-                                            net_direction = 'LONG' if net_qty > 0 else 'SHORT'
-                                            self.large_trade_signal = {
-                                                'direction': net_direction,
-                                                'timestamp': now_ts,
-                                                'net_qty': net_qty,
-                                                'dominance_ratio': dominance_ratio,
-                                                'long_qty': long_qty,
-                                                'short_qty': short_qty,
-                                                'total_qty': total_qty,
-                                                'whale_vwap': whale_vwap  # 🐳 鯨魚成本價
-                                            }
-                                            print(
-                                                f"   🐋 大單淨方向訊號: {net_direction} | 多={long_qty:.2f} BTC, 空={short_qty:.2f} BTC, "
-                                                f"淨量={net_qty:.2f} BTC, 集中度={dominance_ratio:.2f}"
-                                            )
-                                except (TypeError, ValueError):
-                                    pass
-                            
-                        except asyncio.TimeoutError:
-                            continue
-                        except websockets.exceptions.ConnectionClosed:
-                            print("⚠️  WebSocket 連接關閉，準備重連...")
-                            break
-                        except Exception as e:
-                            print(f"⚠️  接收數據錯誤: {e}")
-                            continue
-                            
-            except Exception as e:
-                retry_count += 1
-                if retry_count >= max_retries:
-                    print(f"❌ WebSocket 連接失敗次數過多，放棄重連")
-                    break
-                
-                wait_time = min(retry_count * 2, 10)  # 最多等 10 秒
-                print(f"⚠️  WebSocket 連接失敗 (嘗試 {retry_count}/{max_retries}): {e}")
-                print(f"⏳ {wait_time} 秒後重試...")
-                await asyncio.sleep(wait_time)
+        await self.stream_mux.run(until=lambda: self.clock.now() >= self.end_time)
+        stats = self.stream_mux.stats
+        print(f"🔌 WebSocket 已結束 (重連 {stats.reconnects} 次, 序號缺口 {stats.gaps} 次)")
     
     def make_decision(self, mode: TradingMode, snapshot: Optional[dict] = None) -> dict:
         """為特定模式生成交易決策（整合 Hybrid + Sniper 模式）"""
@@ -3002,7 +3030,7 @@ class HybridPaperTradingSystem:
             # 🆕 Phase 5.1: 檢查反轉頻率限制（防刷單洗盤）
             tracker = self.whale_reversal_tracker.get(mode)
             if tracker:
-                now = time.time()
+                now = self.clock.time()
                 
                 # 清理 30 分鐘前的反轉記錄
                 tracker['reversal_timestamps'] = [
@@ -3121,7 +3149,7 @@ class HybridPaperTradingSystem:
                 return finalize({'action': 'HOLD', 'reason': 'M🐳 Whale: no clear direction'})
             
             # 🆕 Phase 5.3: 大單持續性檢測（防假突破）
-            persistence_check = self._check_whale_persistence(net_direction, time.time())
+            persistence_check = self._check_whale_persistence(net_direction, self.clock.time())
             if not persistence_check['is_persistent']:
                 return finalize({
                     'action': 'HOLD',
@@ -3148,7 +3176,7 @@ class HybridPaperTradingSystem:
             # 檢查價格動能（30 秒內的變動）
             if len(self.price_history) >= 30:
                 price_30s_ago = None
-                now_ts = time.time()
+                now_ts = self.clock.time()
                 for ts, price in self.price_history:
                     if now_ts - ts >= 30:
                         price_30s_ago = price
@@ -3184,7 +3212,7 @@ class HybridPaperTradingSystem:
             
             # 🆕 記錄反轉（如果方向改變）
             if tracker and action != tracker['last_direction'] and tracker['last_direction'] is not None:
-                tracker['reversal_timestamps'].append(time.time())
+                tracker['reversal_timestamps'].append(self.clock.time())
                 tracker['last_direction'] = action
                 print(f"   🔄 [M🐳 Direction Change] {tracker['last_direction']} -> {action} (Total flips in 30min: {len(tracker['reversal_timestamps'])})")
             elif tracker and tracker['last_direction'] is None:
@@ -3219,8 +3247,7 @@ class HybridPaperTradingSystem:
                 if not os.path.exists(bridge_file):
                     return finalize_wrapper({'action': 'HOLD', 'reason': f'{mode.name} Bridge not found'})
                 
-                with open(bridge_file, 'r') as f:
-                    bridge = json.load(f)
+                bridge = self._bridge_channel(bridge_file).view()
                 
                 ai_cmd = bridge.get('ai_to_dragon' if is_dragon else 'ai_to_wolf', {})
                 wolf_status = bridge.get('dragon_to_ai' if is_dragon else 'wolf_to_ai', {})
@@ -3293,7 +3320,7 @@ class HybridPaperTradingSystem:
                 is_fresh = False
                 if pred_time_str:
                     pred_time = datetime.fromisoformat(pred_time_str)
-                    age_seconds = (datetime.now() - pred_time).total_seconds()
+                    age_seconds = (self.clock.now() - pred_time).total_seconds()
                     is_fresh = age_seconds < 120
                     if not is_fresh:
                         return finalize_wrapper({'action': 'HOLD', 'reason': f'{mode.name} Signal stale ({age_seconds:.0f}s)'})
@@ -3312,7 +3339,7 @@ class HybridPaperTradingSystem:
                             # 計算 1 分鐘價格變化 (使用 price_history)
                             price_change_1m = 0.0
                             if len(self.price_history) > 0:
-                                now_ts = time.time()
+                                now_ts = self.clock.time()
                                 price_1m_ago = None
                                 for ts, p in self.price_history:
                                     if now_ts - ts >= 60:
@@ -3579,8 +3606,7 @@ class HybridPaperTradingSystem:
                 if not os.path.exists(bridge_file):
                     return finalize_wrapper_dragon2({'action': 'HOLD', 'reason': 'M_DRAGON2 Bridge not found'})
                 
-                with open(bridge_file, 'r') as f:
-                    bridge = json.load(f)
+                bridge = self._bridge_channel(bridge_file).view()
                 
                 # 🆕 Dragon2 讀取專屬的 ai_to_dragon2 (由 ai_trading_advisor_dragon2.py 寫入)
                 ai_cmd = bridge.get('ai_to_dragon2', {})
@@ -3617,7 +3643,7 @@ class HybridPaperTradingSystem:
                 is_fresh = False
                 if pred_time_str:
                     pred_time = datetime.fromisoformat(pred_time_str)
-                    age_seconds = (datetime.now() - pred_time).total_seconds()
+                    age_seconds = (self.clock.now() - pred_time).total_seconds()
                     is_fresh = age_seconds < 120
                     if not is_fresh:
                         return finalize_wrapper_dragon2({'action': 'HOLD', 'reason': f'M_DRAGON2 Signal stale ({age_seconds:.0f}s)'})
@@ -3774,8 +3800,7 @@ class HybridPaperTradingSystem:
                 if not os.path.exists(bridge_file):
                     return finalize_wrapper_shrimp({'action': 'HOLD', 'reason': f'{mode.name} Bridge not found'})
                 
-                with open(bridge_file, 'r') as f:
-                    bridge = json.load(f)
+                bridge = self._bridge_channel(bridge_file).view()
                 
                 ai_cmd = bridge.get(ai_key, {})
                 wolf_status = bridge.get(status_key, {})
@@ -3819,7 +3844,7 @@ class HybridPaperTradingSystem:
                 is_fresh = False
                 if pred_time_str:
                     pred_time = datetime.fromisoformat(pred_time_str)
-                    age_seconds = (datetime.now() - pred_time).total_seconds()
+                    age_seconds = (self.clock.now() - pred_time).total_seconds()
                     is_fresh = age_seconds < 120
                     if not is_fresh:
                         return finalize_wrapper_shrimp({'action': 'HOLD', 'reason': f'{mode.name} Signal stale ({age_seconds:.0f}s)'})
@@ -3912,8 +3937,7 @@ class HybridPaperTradingSystem:
                 if not os.path.exists(bridge_file):
                     return finalize_wrapper_lion({'action': 'HOLD', 'reason': 'M_LION Bridge not found'})
                 
-                with open(bridge_file, 'r') as f:
-                    bridge = json.load(f)
+                bridge = self._bridge_channel(bridge_file).view()
                 
                 ai_cmd = bridge.get('ai_to_wolf', {})
                 lion_status = bridge.get('wolf_to_ai', {})
@@ -3951,7 +3975,7 @@ class HybridPaperTradingSystem:
                 if pred_time_str:
                     try:
                         pred_time = datetime.fromisoformat(pred_time_str)
-                        age_seconds = (datetime.now() - pred_time).total_seconds()
+                        age_seconds = (self.clock.now() - pred_time).total_seconds()
                         is_fresh = age_seconds < 120
                         if not is_fresh:
                             return finalize_wrapper_lion({'action': 'HOLD', 'reason': f'M_LION Signal stale ({age_seconds:.0f}s)'})
@@ -4053,7 +4077,7 @@ class HybridPaperTradingSystem:
         if open_positions:
             return finalize({'action': 'HOLD', 'reason': 'Already have position'})
         
-        now_ts = time.time()
+        now_ts = self.clock.time()
         last_entry = self.last_entry_time[mode]
         cooldown = self.entry_cooldown[mode]
         
@@ -4210,7 +4234,7 @@ class HybridPaperTradingSystem:
             'signed_volume': snapshot.get('signed_volume', 0.0),
             'microprice_pressure': snapshot.get('microprice_pressure', 0.0),
            
-            'timestamp': time.time() * 1000,
+            'timestamp': self.clock.time() * 1000,
             # 方便之後在 diagnostics 裡分析
             'funding_zscore': funding_zscore,
             'signal_score': signal_score,
@@ -4278,7 +4302,9 @@ class HybridPaperTradingSystem:
                 leverage=config.leverage,
                 direction=action,
                 is_maker=False,
-                account_balance=self.balances[mode]
+                account_balance=self.balances[mode],
+                book=self.spread_depth.book,
+                order_qty=(self.balances[mode] * self.max_position_pct * config.leverage / self.latest_price) if self.latest_price else None
             )
             market_data.update({
                 'cost_decision': cost_analysis.decision.value,
@@ -4395,6 +4421,10 @@ class HybridPaperTradingSystem:
             print(f"   剩餘資金: ${self.m_new_balance:.2f}")
             print("💀"*40 + "\n")
     
+    def _bridge_channel(self, bridge_file: str) -> BridgeChannel:
+        """AI Bridge 通道 (同一檔案共用實例，section 級別寫入不互相覆蓋)"""
+        return BridgeChannel.for_bridge_file(bridge_file)
+    
     def _update_wolf_status_to_bridge(self, status: str, position: Optional[SimulatedOrder], snapshot: dict, is_dragon: bool = False):
         """更新 M🐺 或 M🐲 的狀態到 Bridge（回報給 AI）- 完整版"""
         try:
@@ -4404,12 +4434,11 @@ class HybridPaperTradingSystem:
             if not os.path.exists(bridge_file):
                 return
             
-            with open(bridge_file, 'r') as f:
-                bridge = json.load(f)
+            bridge = self._bridge_channel(bridge_file).load()
             
             wolf_status = {
                 "status": status,  # IDLE, OPENING, IN_POSITION, CLOSING
-                "timestamp": datetime.now().isoformat()
+                "timestamp": self.clock.now().isoformat()
             }
             
             # 🆕 Priority 0: 爆倉瀑布警報 (最重要！)
@@ -4478,7 +4507,7 @@ class HybridPaperTradingSystem:
             
             if position:
                 _, unrealized_pnl_pct = position.update_unrealized_pnl(self.latest_price)
-                holding_seconds = (datetime.now() - datetime.fromisoformat(position.entry_time)).total_seconds()
+                holding_seconds = (self.clock.now() - datetime.fromisoformat(position.entry_time)).total_seconds()
                 
                 wolf_status.update({
                     "position": {
@@ -4522,7 +4551,7 @@ class HybridPaperTradingSystem:
             wolf_status["direction_probes"] = self._get_direction_probe_pnl()
             
             bridge[agent_key] = wolf_status
-            bridge['last_updated'] = datetime.now().isoformat()
+            bridge['last_updated'] = self.clock.now().isoformat()
             
             # 🔧 清理過期事件 (減少 token 消耗)
             # - maker_timeout_event: 超過 30 分鐘就清除
@@ -4530,7 +4559,7 @@ class HybridPaperTradingSystem:
             if 'maker_timeout_event' in bridge:
                 try:
                     event_time = datetime.fromisoformat(bridge['maker_timeout_event'].get('timestamp', ''))
-                    if (datetime.now() - event_time).total_seconds() > 1800:  # 30 分鐘
+                    if (self.clock.now() - event_time).total_seconds() > 1800:  # 30 分鐘
                         del bridge['maker_timeout_event']
                 except:
                     pass
@@ -4538,8 +4567,7 @@ class HybridPaperTradingSystem:
             if 'rollback_events' in bridge:
                 bridge['rollback_events'] = bridge['rollback_events'][-3:]
             
-            with open(bridge_file, 'w') as f:
-                json.dump(bridge, f, indent=2)
+            self._bridge_channel(bridge_file).save(bridge)
                 
         except Exception as e:
             print(f"   ⚠️ Failed to update bridge: {e}")
@@ -4576,7 +4604,7 @@ class HybridPaperTradingSystem:
         Returns:
             完整的訊號品質分析報告
         """
-        now = time.time()
+        now = self.clock.time()
         tracker = self.whale_signal_tracker
         config = tracker['config']
         stats = tracker['effectiveness_stats']
@@ -4958,7 +4986,7 @@ class HybridPaperTradingSystem:
         }
         
         try:
-            now = datetime.now()
+            now = self.clock.now()
             mup_valid = False
             mdown_valid = False
             
@@ -5056,8 +5084,7 @@ class HybridPaperTradingSystem:
             if not os.path.exists(bridge_file):
                 return
             
-            with open(bridge_file, 'r') as f:
-                bridge = json.load(f)
+            bridge = self._bridge_channel(bridge_file).load()
             
             # 計算價格偏離
             price_diff_pct = (self.latest_price - order.maker_limit_price) / order.maker_limit_price * 100
@@ -5065,7 +5092,7 @@ class HybridPaperTradingSystem:
             # 寫入超時事件
             bridge[agent_key] = {
                 "event_type": "MAKER_TIMEOUT",
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": self.clock.now().isoformat(),
                 "order_details": {
                     "direction": order.direction,
                     "maker_price": order.maker_limit_price,
@@ -5088,10 +5115,9 @@ class HybridPaperTradingSystem:
                 }
             }
             
-            bridge['last_updated'] = datetime.now().isoformat()
+            bridge['last_updated'] = self.clock.now().isoformat()
             
-            with open(bridge_file, 'w') as f:
-                json.dump(bridge, f, indent=2)
+            self._bridge_channel(bridge_file).save(bridge)
                 
         except Exception as e:
             print(f"   ⚠️ Failed to notify AI of maker timeout: {e}")
@@ -5141,8 +5167,7 @@ class HybridPaperTradingSystem:
             if not os.path.exists(bridge_file):
                 return
             
-            with open(bridge_file, 'r') as f:
-                bridge = json.load(f)
+            bridge = self._bridge_channel(bridge_file).load()
             
             # 收集進場時的市場數據
             entry_data = position.market_data or {}
@@ -5154,7 +5179,7 @@ class HybridPaperTradingSystem:
             # 分析虧損原因
             loss_analysis = {
                 "event_type": "LOSS_REVIEW_REQUEST",
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": self.clock.now().isoformat(),
                 "urgency": "HIGH" if consecutive_losses >= 3 or loss_pct > 3.0 else "MEDIUM",
                 
                 # 交易數據
@@ -5217,10 +5242,9 @@ class HybridPaperTradingSystem:
             
             # 寫入 Bridge
             bridge['loss_review'] = loss_analysis
-            bridge['last_updated'] = datetime.now().isoformat()
+            bridge['last_updated'] = self.clock.now().isoformat()
             
-            with open(bridge_file, 'w') as f:
-                json.dump(bridge, f, indent=2, ensure_ascii=False)
+            self._bridge_channel(bridge_file).save(bridge)
             
             print(f"   📊 [{self.mode_info[mode]['emoji']}] 虧損分析已發送至 AI")
             print(f"      診斷: {loss_analysis['preliminary_diagnosis']['primary_cause']}")
@@ -5321,8 +5345,7 @@ class HybridPaperTradingSystem:
             if not os.path.exists(bridge_file):
                 return False
             
-            with open(bridge_file, 'r') as f:
-                bridge = json.load(f)
+            bridge = self._bridge_channel(bridge_file).load()
             
             # 讀取 AI 的建議調整
             ai_key = 'ai_to_dragon' if is_dragon else 'ai_to_wolf'
@@ -5370,7 +5393,7 @@ class HybridPaperTradingSystem:
             # 4. 冷卻時間
             cooldown_mins = adjustments.get('cooldown_minutes', 0)
             if cooldown_mins > 0:
-                cooldown_until = datetime.now() + timedelta(minutes=cooldown_mins)
+                cooldown_until = self.clock.now() + timedelta(minutes=cooldown_mins)
                 # 存入 mode_cooldowns (如果存在)
                 if hasattr(self, 'mode_cooldowns'):
                     self.mode_cooldowns[mode] = cooldown_until
@@ -5394,8 +5417,7 @@ class HybridPaperTradingSystem:
             wolf_key = 'wolf_to_ai' if not is_dragon else 'dragon_to_ai'
             if wolf_key in bridge and 'loss_review' in bridge.get(wolf_key, {}):
                 del bridge[wolf_key]['loss_review']
-                with open(bridge_file, 'w') as f:
-                    json.dump(bridge, f, indent=2, ensure_ascii=False)
+                self._bridge_channel(bridge_file).save(bridge)
                 print(f"   🔧 已清除 loss_review 請求")
             
             return len(applied_changes) > 0
@@ -5416,8 +5438,7 @@ class HybridPaperTradingSystem:
             if not os.path.exists(bridge_file):
                 return
             
-            with open(bridge_file, 'r') as f:
-                bridge = json.load(f)
+            bridge = self._bridge_channel(bridge_file).load()
             
             feedback = bridge.get('feedback_loop', {})
             
@@ -5453,7 +5474,7 @@ class HybridPaperTradingSystem:
                 "direction": closed_position.direction,
                 "holding_seconds": closed_position.holding_seconds,
                 "exit_reason": closed_position.exit_reason,
-                "exit_time": datetime.now().isoformat()  # 🆕 記錄平倉時間
+                "exit_time": self.clock.now().isoformat()  # 🆕 記錄平倉時間
             }
             
             # 🆕 根據交易結果自動調整獲利模式
@@ -5503,8 +5524,7 @@ class HybridPaperTradingSystem:
             
             bridge['feedback_loop'] = feedback
             
-            with open(bridge_file, 'w') as f:
-                json.dump(bridge, f, indent=2)
+            self._bridge_channel(bridge_file).save(bridge)
                 
         except Exception as e:
             print(f"   ⚠️ Failed to update feedback loop: {e}")
@@ -5598,29 +5618,24 @@ class HybridPaperTradingSystem:
             "leverage_config": {"default_leverage": 100}
         }
         
-        try:
-            if os.path.exists(self.profit_config_path):
-                with open(self.profit_config_path, 'r') as f:
-                    config = json.load(f)
-                    print(f"   📊 [Profit Config] 載入成功: 模式={config.get('current_mode', 'normal')}")
-                    return config
-        except Exception as e:
-            print(f"   ⚠️ [Profit Config] 載入失敗: {e}，使用預設值")
+        entry = self._profit_config_entry
+        if entry.snapshot.exists:
+            # 可修改的副本: _update_profit_config_mode 會改寫並存回
+            config = thaw_config(entry.data)
+            print(f"   📊 [Profit Config] 載入成功: 模式={config.get('current_mode', 'normal')}")
+            return config
+        if entry.last_error:
+            print(f"   ⚠️ [Profit Config] 載入失敗: {entry.last_error}，使用預設值")
         
         return default_config
     
     def _reload_profit_config_if_needed(self):
-        """定期重新載入獲利配置（每 30 秒檢查一次）"""
-        if time.time() - self.last_profit_config_reload > 30.0:
-            try:
-                if os.path.exists(self.profit_config_path):
-                    mtime = os.path.getmtime(self.profit_config_path)
-                    if mtime > self.last_profit_config_reload:
-                        self.profit_config = self._load_profit_config()
-                        print(f"   🔄 [Profit Config] 配置已更新: 模式={self.profit_config.get('current_mode', 'normal')}")
-            except Exception as e:
-                pass
-            self.last_profit_config_reload = time.time()
+        """獲利配置有新版本時更新 (配置服務監看檔案，這裡只比對 generation)"""
+        generation = self._profit_config_entry.generation
+        if generation != self._profit_config_generation:
+            self._profit_config_generation = generation
+            self.profit_config = self._load_profit_config()
+            print(f"   🔄 [Profit Config] 配置已更新: 模式={self.profit_config.get('current_mode', 'normal')}")
     
     def _get_dynamic_tp_sl(self, mode: TradingMode, leverage: int, is_maker: bool = False) -> Tuple[float, float]:
         """
@@ -5686,14 +5701,14 @@ class HybridPaperTradingSystem:
         """更新獲利配置模式"""
         try:
             self.profit_config["current_mode"] = new_mode
-            self.profit_config["last_updated"] = datetime.now().isoformat()
+            self.profit_config["last_updated"] = self.clock.now().isoformat()
             
             # 記錄變更歷史
             if "update_history" not in self.profit_config:
                 self.profit_config["update_history"] = []
             
             self.profit_config["update_history"].append({
-                "time": datetime.now().isoformat(),
+                "time": self.clock.now().isoformat(),
                 "mode": new_mode,
                 "reason": reason
             })
@@ -5702,9 +5717,10 @@ class HybridPaperTradingSystem:
             if len(self.profit_config["update_history"]) > 50:
                 self.profit_config["update_history"] = self.profit_config["update_history"][-50:]
             
-            # 寫入檔案
-            with open(self.profit_config_path, 'w') as f:
-                json.dump(self.profit_config, f, indent=2)
+            # 寫入檔案 (原子替換)，並直接採用為目前版本，避免自己的寫入再被當成外部更新
+            write_json_atomic(self.profit_config_path, self.profit_config)
+            get_config_service().reload(self.profit_config_path)
+            self._profit_config_generation = self._profit_config_entry.generation
             
             print(f"   📝 [Profit Config] 模式已更新: {new_mode} (原因: {reason})")
             
@@ -5840,19 +5856,21 @@ class HybridPaperTradingSystem:
         if not hasattr(self, 'last_debug_time'):
             self.last_debug_time = 0
         
-        current_time = time.time()
+        current_time = self.clock.time()
         show_debug = (current_time - self.last_debug_time) >= 60
         
         if show_debug:
             # 🆕 顯示排行榜（仿照 paper_trading_system.py）
-            self.print_leaderboard()
+            # 背景渲染器運行中時由 _render_status_frame 負責，不在決策路徑上讀檔/輸出
+            if self.dashboard is None and not self.headless:
+                self.print_leaderboard()
             self.last_debug_time = current_time
         
         for mode in self.active_modes:
             # 🆕 高 VPIN 風險冷卻：若剛在高 VPIN 區被風控平倉，暫時禁止重新開倉
             if hasattr(self, 'high_vpin_cooldown_until'):
                 cooldown_until = self.high_vpin_cooldown_until.get(mode)
-                if cooldown_until and time.time() < cooldown_until:
+                if cooldown_until and self.clock.time() < cooldown_until:
                     continue
             decision = self.make_decision(mode, snapshot)
             
@@ -5894,7 +5912,7 @@ class HybridPaperTradingSystem:
                 apply_delay = self.entry_delay_enabled and style in ['ai_whale_hunter', 'ai_dragon2']
                 
                 if apply_delay:
-                    current_time_ts = time.time()
+                    current_time_ts = self.clock.time()
                     pending = self.pending_entry_signals.get(mode)
                     
                     if pending is None:
@@ -6255,7 +6273,7 @@ class HybridPaperTradingSystem:
                 fee_cost = calculate_fee_impact(order.leverage, order.is_maker)
                 
                 expected_hold = "動態調整"
-                current_time = datetime.now().strftime('%H:%M:%S')
+                current_time = self.clock.now().strftime('%H:%M:%S')
                 market_data = decision_market_data.copy()
                 
                 # 統一顯示格式
@@ -6282,9 +6300,18 @@ class HybridPaperTradingSystem:
                 
                 # 記錄訂單
                 self.orders[mode].append(order)
+                if order.maker_status == "PENDING":
+                    # 佇列模擬以名目數量 (BTC) 排隊
+                    self.queue_fill_sim.place(
+                        order.order_id,
+                        order.direction,
+                        maker_price,
+                        order.position_value * order.leverage / maker_price,
+                        timestamp_ms=int(self.clock.time() * 1000)
+                    )
                 
                 # 🆕 更新最後開倉時間
-                self.last_entry_time[mode] = time.time()
+                self.last_entry_time[mode] = self.clock.time()
                 
                 # 🆕 如果是 M🐺，回報狀態到 Bridge
                 if mode == TradingMode.M_AI_WHALE_HUNTER:
@@ -6320,20 +6347,26 @@ class HybridPaperTradingSystem:
                     if self.orderbook_data.get('asks'):
                         high_price = float(self.orderbook_data['asks'][0][0])
                 
-                # 檢查是否應該成交
+                # 檢查是否應該成交 (有深度時用佇列位置，否則用觸價規則)
+                queue_state = self.queue_fill_sim.get(order.order_id) if self.queue_fill_sim.has_book else None
                 result = order.check_maker_fill(
                     current_price=self.latest_price,
                     high_price=high_price,
-                    low_price=low_price
+                    low_price=low_price,
+                    queue_state=queue_state
                 )
+                if result != "PENDING":
+                    self.queue_fill_sim.release(order.order_id)
                 
                 strategy_info = self.mode_info[mode]
                 
                 if result == "FILLED":
                     # 成交！
-                    elapsed = time.time() - order.maker_created_time
+                    elapsed = self.clock.time() - order.maker_created_time
                     print(f"\n   ✅ [{strategy_info['emoji']}] Maker 掛單成交！")
                     print(f"      成交價: ${order.actual_entry_price:,.2f} | 等待: {elapsed:.1f}s")
+                    if order.maker_fill_ratio < 1.0:
+                        print(f"      ⚠️ 超時前部分成交 {order.maker_fill_ratio*100:.1f}%，剩餘取消 | 投資: ${order.position_value:.2f}")
                     print(f"      💰 手續費節省: Maker -0.01% vs Taker 0.05%")
                     
                     # 更新 Maker 統計
@@ -6414,8 +6447,7 @@ class HybridPaperTradingSystem:
                     feedback_loop = {}
                     ai_cmd = {}
                     if os.path.exists(bridge_file):
-                        with open(bridge_file, 'r') as f:
-                            bridge = json.load(f)
+                        bridge = self._bridge_channel(bridge_file).view()
                         # 🔧 修復: Dragon 讀取 ai_to_dragon, Wolf 讀取 ai_to_wolf
                         ai_key = 'ai_to_dragon' if is_dragon else 'ai_to_wolf'
                         ai_cmd = bridge.get(ai_key, {})
@@ -6429,7 +6461,7 @@ class HybridPaperTradingSystem:
                     
                     for position in open_orders:
                         _, unrealized_pnl_pct = position.update_unrealized_pnl(self.latest_price)
-                        holding_seconds = (datetime.now() - datetime.fromisoformat(position.entry_time)).total_seconds()
+                        holding_seconds = (self.clock.now() - datetime.fromisoformat(position.entry_time)).total_seconds()
                         
                         trap_mode = position.market_data.get('trap_master_mode', 'standard')
                         
@@ -6667,7 +6699,7 @@ class HybridPaperTradingSystem:
                 try:
                     for position in open_orders:
                         _, unrealized_pnl_pct = position.update_unrealized_pnl(self.latest_price)
-                        holding_seconds = (datetime.now() - datetime.fromisoformat(position.entry_time)).total_seconds()
+                        holding_seconds = (self.clock.now() - datetime.fromisoformat(position.entry_time)).total_seconds()
                         
                         # 從 market_data 讀取設定
                         max_holding = position.market_data.get('max_holding_seconds', 180)  # 3 分鐘
@@ -6728,7 +6760,7 @@ class HybridPaperTradingSystem:
                     
                     for position in open_orders:
                         _, unrealized_pnl_pct = position.update_unrealized_pnl(self.latest_price)
-                        holding_seconds = (datetime.now() - datetime.fromisoformat(position.entry_time)).total_seconds()
+                        holding_seconds = (self.clock.now() - datetime.fromisoformat(position.entry_time)).total_seconds()
                         
                         # 從 market_data 讀取設定
                         min_holding = position.market_data.get('min_holding_seconds', 120)  # 2 分鐘
@@ -6868,7 +6900,7 @@ class HybridPaperTradingSystem:
                     if is_high_vpin_exit:
                         # 在高 VPIN 區剛被打出場，暫停該模式重新進場一段時間
                         cooldown_seconds = 120.0
-                        current_ts = time.time()
+                        current_ts = self.clock.time()
                         if not hasattr(self, 'high_vpin_cooldown_until'):
                             self.high_vpin_cooldown_until = {}
                         self.high_vpin_cooldown_until[mode] = max(
@@ -6895,12 +6927,12 @@ class HybridPaperTradingSystem:
                                 consecutive_losses=self.consecutive_losses[mode]
                             )
                             # 短暫冷卻等待 AI 回覆（30 秒）
-                            self.loss_cooldown_until[mode] = time.time() + 30
+                            self.loss_cooldown_until[mode] = self.clock.time() + 30
                             print(f"   🤖 [{self.mode_info[mode]['emoji']}] 觸發 AI 復盤分析...")
                         
                         # 連虧 5 筆：強制暫停 30 分鐘（備援機制）
                         if self.consecutive_losses[mode] >= 5:
-                            self.loss_cooldown_until[mode] = time.time() + 1800
+                            self.loss_cooldown_until[mode] = self.clock.time() + 1800
                             print(f"   ⚠️  [{self.mode_info[mode]['emoji']}] 連虧 {self.consecutive_losses[mode]} 筆，暫停 30 分鐘")
                     else:
                         self.consecutive_losses[mode] = 0  # 獲利重置
@@ -6944,7 +6976,7 @@ class HybridPaperTradingSystem:
                     else:
                         hold_time_str = f"{hold_seconds/3600:.2f} 小時"
                     
-                    current_time = datetime.now().strftime('%H:%M:%S')
+                    current_time = self.clock.now().strftime('%H:%M:%S')
                     
                     print()
                     print(f"✨✨✨ [{strategy_info['emoji']}] {result_icon} {result_text} ⏰ 平倉時間: {current_time}")
@@ -7002,30 +7034,63 @@ class HybridPaperTradingSystem:
                     # 🆕 立即保存到檔案（仿照 paper_trading_system.py）
                     self._append_order_to_file(mode, position)
     
-    def print_status(self):
-        """定期列印狀態"""
+    def _status_snapshot(self, iteration: int) -> DashboardSnapshot:
+        """
+        決策循環上建立狀態面板快照
+        
+        讀檔、Maker 統計與排行榜的顯示時機都在這裡決定；渲染端只讀快照，不改任何狀態。
+        """
+        now = self.clock.time()
+        # 渲染端已顯示過的定時區塊，由決策循環推進計時
+        rendered = self.dashboard.rendered if self.dashboard else None
+        if rendered is not None:
+            if 'maker_stats' in rendered.extra:
+                self.last_maker_stats_time = max(self.last_maker_stats_time, rendered.timestamp)
+            if rendered.extra.get('show_leaderboard'):
+                self._last_leaderboard_render = max(self._last_leaderboard_render, rendered.timestamp)
+
+        extra: Dict[str, Any] = {
+            'orderbook_timestamp': self.orderbook_timestamp,
+            'liquidation_pressure': self._maybe_load_liquidation_pressure(),
+            'cascade_snapshot': self._last_cascade_snapshot,
+        }
+        if self.maker_enabled and now - self.last_maker_stats_time >= self.maker_stats_display_interval:
+            extra['maker_stats'] = dict(self.maker_manager.stats)
+        if now - self._last_leaderboard_render >= self.leaderboard_interval_sec:
+            extra['show_leaderboard'] = True
+        return DashboardSnapshot(
+            iteration=iteration,
+            timestamp=now,
+            price=self.latest_price or 0.0,
+            extra=freeze(extra),
+        )
+
+    def print_status(self, snapshot: DashboardSnapshot):
+        """定期列印狀態 (只讀快照與訂單，不更新峰值/計時)"""
+        price = snapshot.price
+        now_str = datetime.fromtimestamp(snapshot.timestamp).strftime('%H:%M:%S')
+        orderbook_timestamp = snapshot.extra.get('orderbook_timestamp') or self.orderbook_timestamp
         print(f"\n{'─'*80}")
-        print(f"⏰ 時間: {datetime.now().strftime('%H:%M:%S')} | 價格: ${self.latest_price:.2f}")
+        print(f"⏰ 時間: {now_str} | 價格: ${price:.2f}")
         
         # 🏷️ 顯示 Maker 統計
-        if self.maker_enabled and time.time() - self.last_maker_stats_time >= self.maker_stats_display_interval:
-            stats = self.maker_manager.stats
+        stats = snapshot.extra.get('maker_stats')
+        if stats:
             maker_rate = stats.get('maker_rate', 0) * 100
             total_orders = stats.get('total_orders', 0)
             fee_saved = stats.get('total_fee_saved', 0)
             if total_orders > 0:
                 print(f"🏷️ Maker: {stats['filled_as_maker']}/{total_orders} ({maker_rate:.0f}%) | 💰節省: ${fee_saved:.2f}")
-            self.last_maker_stats_time = time.time()
         
         print(f"{'─'*80}\n")
 
-        panel = self._render_liquidation_pressure_panel()
+        panel = self._render_liquidation_pressure_panel(snapshot.extra.get('liquidation_pressure'))
         if panel:
             print(panel)
             print()
         
         # 🆕 顯示即時爆倉瀑布面板
-        cascade_panel = self._render_cascade_panel()
+        cascade_panel = self._render_cascade_panel(snapshot.extra.get('cascade_snapshot'))
         if cascade_panel:
             print(cascade_panel)
             print()
@@ -7057,26 +7122,26 @@ class HybridPaperTradingSystem:
             
             # 🆕 顯示 PENDING 掛單狀態
             for pos in pending_orders:
-                elapsed = time.time() - pos.maker_created_time
+                elapsed = snapshot.timestamp - pos.maker_created_time
                 remaining = pos.maker_timeout_seconds - elapsed
                 dir_emoji = "📈" if pos.direction == "LONG" else "📉"
                 
-                print(f"   ⏳ [{datetime.now().strftime('%H:%M:%S')}] 掛單中: [{strategy_info['emoji']}]")
-                print(f"      {dir_emoji} {pos.direction} Maker @${pos.maker_limit_price:,.2f} | 當前: ${self.latest_price:,.2f}")
+                print(f"   ⏳ [{now_str}] 掛單中: [{strategy_info['emoji']}]")
+                print(f"      {dir_emoji} {pos.direction} Maker @${pos.maker_limit_price:,.2f} | 當前: ${price:,.2f}")
                 
                 # 計算與掛單價的距離
                 if pos.direction == "LONG":
-                    distance_pct = (self.latest_price - pos.maker_limit_price) / pos.maker_limit_price * 100
+                    distance_pct = (price - pos.maker_limit_price) / pos.maker_limit_price * 100
                     print(f"      📏 距離: +{distance_pct:.2f}% | ⏰ 剩餘: {remaining:.0f}s")
                 else:
-                    distance_pct = (pos.maker_limit_price - self.latest_price) / self.latest_price * 100
+                    distance_pct = (pos.maker_limit_price - price) / price * 100
                     print(f"      📏 距離: +{distance_pct:.2f}% | ⏰ 剩餘: {remaining:.0f}s")
             
             # 顯示已成交持倉狀態
             for pos in open_orders:
-                unrealized_pnl_usdt, unrealized_pnl_pct = pos.update_unrealized_pnl(self.latest_price)
+                unrealized_pnl_usdt, unrealized_pnl_pct = pos.unrealized_pnl(price)
                 holding_seconds = (
-                    datetime.fromisoformat(self.orderbook_timestamp) - 
+                    datetime.fromisoformat(orderbook_timestamp) - 
                     datetime.fromisoformat(pos.entry_time)
                 ).total_seconds()
                 
@@ -7091,7 +7156,7 @@ class HybridPaperTradingSystem:
                 else:
                     order_type = "⚡Taker"
                 
-                print(f"   ✨ [{datetime.now().strftime('%H:%M:%S')}] 📊 持倉狀態: [{strategy_info['emoji']}]")
+                print(f"   ✨ [{now_str}] 📊 持倉狀態: [{strategy_info['emoji']}]")
                 print(f"      {dir_emoji} {pos.direction} {order_type} 💵 ${pos.position_value:.2f} / ⚡{pos.leverage}x @ ${pos.actual_entry_price:.2f}")
                 print(f"      {pos_icon} [🌟] 未實現: {unrealized_pnl_pct:+.2f}% | ⏱️ 持倉: {int(holding_seconds)}秒")
         
@@ -7107,9 +7172,9 @@ class HybridPaperTradingSystem:
             order = self.m_new_config.get('order')
             if order and order.exit_time is None:
                 # 持倉中
-                unrealized_pnl_usdt, unrealized_pnl_pct = order.update_unrealized_pnl(self.latest_price)
+                unrealized_pnl_usdt, unrealized_pnl_pct = order.unrealized_pnl(price)
                 holding_seconds = (
-                    datetime.fromisoformat(self.orderbook_timestamp) - 
+                    datetime.fromisoformat(orderbook_timestamp) - 
                     datetime.fromisoformat(order.entry_time)
                 ).total_seconds()
                 
@@ -7117,7 +7182,7 @@ class HybridPaperTradingSystem:
                 liquidation_price = self.m_new_config['liquidation_price']
                 
                 print(f"   📊 持倉: 1筆")
-                print(f"   ✨ [{datetime.now().strftime('%H:%M:%S')}] 📊 持倉狀態: [🔥M_NEW]")
+                print(f"   ✨ [{now_str}] 📊 持倉狀態: [🔥M_NEW]")
                 print(f"      📉 SHORT 💵 ${order.position_value:.2f} USDT / ⚡{order.leverage}x @ ${order.actual_entry_price:.2f}")
                 print(f"      {pos_icon} [🌟] 未實現: {unrealized_pnl_pct:+.2f}% | ⏱️ 持倉: {int(holding_seconds)}秒")
                 print(f"      💀 爆倉價: ${liquidation_price:.2f} USDT | ⏰ 剩餘時間: {self.m_new_config['duration_hours'] - holding_seconds/3600:.2f}小時")
@@ -7153,42 +7218,40 @@ class HybridPaperTradingSystem:
             print(f"✅ Synced {updated_count} mode configs from manager")
 
     async def _run_liquidation_pressure_updater(self):
-        """背景任務：定期更新爆倉壓力數據"""
-        if not BinanceLeverageDataFetcher:
-            print("⚠️ 無法導入 BinanceLeverageDataFetcher，自動更新功能失效")
+        """背景任務：定期更新爆倉壓力數據 (並行抓取，快照直接推送到內部緩存)"""
+        if not LeverageDataCollector:
+            print("⚠️ 無法導入 LeverageDataCollector (需要 aiohttp)，自動更新功能失效")
             return
 
         print("🔄 啟動爆倉壓力自動更新服務 (每 60 秒)...")
-        fetcher = BinanceLeverageDataFetcher(
-            symbol="BTCUSDT",
+        outfile = self.liq_pressure_config['data_path']
+        loop = asyncio.get_running_loop()
+
+        def on_snapshot(snapshot: LiquidationPressureSnapshot, payload: Dict[str, Any]):
+            # 直接更新內部緩存，不再經過 JSON 檔案來回
+            self._liq_pressure_snapshot = snapshot
+            self._liq_pressure_snapshot_dict = snapshot.to_dict()
+            self._liq_pressure_last_load = self.clock.time()
+
+            def persist():
+                # 檔案只留給 AI Advisor 等外部進程讀取；記下 mtime 避免自己再解析一次
+                save_snapshot_to_file(payload, outfile)
+                self._liq_pressure_last_mtime = Path(outfile).stat().st_mtime
+
+            loop.run_in_executor(None, persist)
+
+        async with LeverageDataCollector(
+            symbols=["BTCUSDT"],
             period="5m",
             limit=30,
             force_limit=50,
-            timeout=10.0
-        )
-        outfile = self.liq_pressure_config['data_path']
-        
-        while datetime.now() < self.end_time:
-            try:
-                # 在執行緒池中運行同步的 fetch
-                loop = asyncio.get_running_loop()
-                payload = await loop.run_in_executor(None, fetcher.collect)
-                
-                # 保存檔案
-                await loop.run_in_executor(None, lambda: save_payload(payload, str(outfile)))
-                
-                # 立即更新內部緩存
-                snapshot = load_snapshot_from_file(str(outfile))
-                if snapshot:
-                    self._liq_pressure_snapshot = snapshot
-                    self._liq_pressure_snapshot_dict = snapshot.to_dict()
-                    self._liq_pressure_last_mtime = time.time()
-                
-            except Exception as e:
-                print(f"⚠️ 爆倉壓力更新失敗: {e}")
-            
-            # 等待 60 秒
-            await asyncio.sleep(60)
+            timeout=10.0,
+        ) as collector:
+            collector.subscribe(on_snapshot)
+            await collector.run_forever(
+                interval=60.0,
+                should_continue=lambda: self.clock.now() < self.end_time,
+            )
 
     async def _run_auto_optimizer(self):
         """背景任務：定期執行策略優化分析"""
@@ -7199,12 +7262,12 @@ class HybridPaperTradingSystem:
             print(f"⚠️ 找不到優化腳本: {optimizer_script}")
             return
 
-        while datetime.now() < self.end_time:
+        while self.clock.now() < self.end_time:
             # 初始等待 10 分鐘，之後每 30 分鐘執行一次
-            await asyncio.sleep(1800) 
+            await self.clock.async_sleep(1800) 
             
             try:
-                print(f"\n🔍 [{datetime.now().strftime('%H:%M:%S')}] 正在執行策略優化分析...")
+                print(f"\n🔍 [{self.clock.now().strftime('%H:%M:%S')}] 正在執行策略優化分析...")
                 
                 # 使用 subprocess 執行優化腳本
                 process = await asyncio.create_subprocess_exec(
@@ -7302,12 +7365,11 @@ class HybridPaperTradingSystem:
         print(f"🎲 系統信號: {self._cascade_signal_direction} (強度: {self._cascade_signal_strength:.0f})")
         print("=" * 60 + "\n")
         
-    def _render_cascade_panel(self) -> Optional[str]:
+    def _render_cascade_panel(self, snapshot) -> Optional[str]:
         """渲染爆倉瀑布面板"""
         if not LIQUIDATION_CASCADE_AVAILABLE or not self._cascade_detector:
             return None
             
-        snapshot = self._last_cascade_snapshot
         if not snapshot:
             return "💣 爆倉瀑布雷達: ⏳ 等待數據..."
             
@@ -7353,6 +7415,7 @@ class HybridPaperTradingSystem:
             symbol="BTCUSDT",
             cascade_callback=self._on_cascade_alert,
             snapshot_callback=self._on_cascade_snapshot,
+            mux=self.stream_mux,
         )
         
         try:
@@ -7386,7 +7449,7 @@ class HybridPaperTradingSystem:
         
         # 等待訂單簿數據
         while self.orderbook_data is None:
-            await asyncio.sleep(0.1)
+            await self.clock.async_sleep(0.1)
         
         print("✅ 開始測試...")
         print(f"🔄 動態配置: {self.mode_config_manager.config_path}")
@@ -7396,32 +7459,36 @@ class HybridPaperTradingSystem:
         self._sync_configs()
         
         decision_count = 0
-        last_status_time = time.time()
         first_loop = True  # 🆕 第一輪標記
+
+        # 狀態面板/排行榜在背景執行緒按自己的節奏輸出，決策循環每輪只發布快照
+        self.dashboard = DashboardRenderer(
+            self._render_status_frame,
+            fps=1.0 / self.status_interval_sec,
+            frame_budget_ms=500.0,
+            headless=self.headless,
+            clear_screen=False,
+            max_interval=4 * self.status_interval_sec,
+            name="paper-status-renderer",
+        )
+        self.dashboard.start()
         
         try:
-            while datetime.now() < self.end_time:
+            while self.clock.now() < self.end_time:
                 # 🆕 定期檢查配置更新（熱更新）
-                now = time.time()
+                now = self.clock.time()
                 if now - self.last_config_reload_time >= self.config_reload_interval:
                     if self.mode_config_manager.reload_if_updated():
-                        print(f"\n🔄 [{datetime.now().strftime('%H:%M:%S')}] Config hot-reloaded!")
+                        print(f"\n🔄 [{self.clock.now().strftime('%H:%M:%S')}] Config hot-reloaded!")
                         self._sync_configs()  # 🆕 同步更新到策略配置
                     self.last_config_reload_time = now
                 decision_count += 1
-                snapshot = self._build_market_snapshot()
+                # 🆕 先檢查舊單要不要出場（除了第一輪），再檢查新單進場機會
+                snapshot = self.decision_step(run_exits=not first_loop)
                 if snapshot is None:
-                    await asyncio.sleep(0.5)
+                    await self.clock.async_sleep(0.5)
                     continue
-                
-                # 🆕 先檢查舊單要不要出場（除了第一輪）
-                if not first_loop:
-                    self.check_exits(snapshot)
-                else:
-                    first_loop = False
-                
-                # 再檢查新單進場機會
-                self.check_entries(snapshot)
+                first_loop = False
                 
                 # 🆕 定期更新 Bridge (Heartbeat) - 每 10 秒
                 # 確保 AI 始終獲得最新的市場微結構數據 (OBI, VPIN)
@@ -7442,12 +7509,11 @@ class HybridPaperTradingSystem:
                     else:
                         self._update_wolf_status_to_bridge('IDLE', None, snapshot, is_dragon=True)
 
-                # 每 30 秒列印狀態
-                if time.time() - last_status_time >= 30:
-                    self.print_status()
-                    last_status_time = time.time()
+                # 狀態面板 (背景渲染，每 30 秒一幀)
+                if self.dashboard.enabled:
+                    self.dashboard.publish(self._status_snapshot(decision_count))
                 
-                await asyncio.sleep(2)  # 🔧 v3.0: 每 2 秒檢查一次 (原 5 秒，配合 AI 5 秒判斷)
+                await self.clock.async_sleep(2)  # 🔧 v3.0: 每 2 秒檢查一次 (原 5 秒，配合 AI 5 秒判斷)
                 
         except KeyboardInterrupt:
             print("\n⚠️  使用者中斷測試\n")
@@ -7458,15 +7524,25 @@ class HybridPaperTradingSystem:
             print(f"\n❌ 測試錯誤: {e}\n")
             traceback.print_exc()
         finally:
+            self.dashboard.stop()
+            self.dashboard = None
             ws_task.cancel()
             try:
                 await ws_task
             except asyncio.CancelledError:
                 pass
             self.generate_report()
+
+    def _render_status_frame(self, snapshot: DashboardSnapshot) -> None:
+        """渲染執行緒: 輸出狀態面板，排行榜在快照標記 show_leaderboard 時附帶"""
+        self.print_status(snapshot)
+        if snapshot.extra.get('show_leaderboard'):
+            self.print_leaderboard(snapshot.price)
     
-    def print_leaderboard(self):
-        """顯示資金競賽排行榜（仿照 paper_trading_system.py）"""
+    def print_leaderboard(self, price: Optional[float] = None):
+        """顯示資金競賽排行榜（仿照 paper_trading_system.py），price 預設為最新價格"""
+        if price is None:
+            price = self.latest_price
         print()
         print("🏆 資金競賽排行榜:")
         print("-" * 80)
@@ -7519,29 +7595,27 @@ class HybridPaperTradingSystem:
                 ('ai_shrimp_config.json', 'M🦐', TradingMode.M_SHRIMP, 'ai_to_shrimp', 'shrimp_to_ai'),
             ]
             for bridge_file, key, mode, ai_key, pos_key in bridge_configs:
-                bridge_path = project_root / bridge_file
-                if bridge_path.exists():
-                    with open(bridge_path, 'r') as f:
-                        bridge = json.load(f)
-                        fb = bridge.get('feedback_loop', {})
-                        last_trade = fb.get('last_trade_result', {})
-                        bridge_data[key] = {
-                            'total_pnl': fb.get('total_pnl', 0),
-                            'last_trade_pnl': last_trade.get('pnl_usdt', 0),
-                            'total_trades': fb.get('total_trades', 0),
-                            'win_rate': fb.get('win_rate', 0)
-                        }
-                        
-                        # 🔧 優先從持倉資訊讀取實際槓桿 (這是最準確的)
-                        pos_data = bridge.get(pos_key, {}).get('position', {})
-                        if pos_data.get('leverage') and pos_data.get('leverage') > 0:
-                            ai_leverage_map[mode] = pos_data.get('leverage')
-                        else:
-                            # 其次從 AI 指令讀取
-                            ai_cmd = bridge.get(ai_key, {})
-                            if ai_cmd.get('leverage') and ai_cmd.get('leverage') > 0:
-                                ai_leverage_map[mode] = ai_cmd.get('leverage')
-                        
+                bridge = self._bridge_channel(str(project_root / bridge_file)).view()
+                if bridge:
+                    fb = bridge.get('feedback_loop', {})
+                    last_trade = fb.get('last_trade_result', {})
+                    bridge_data[key] = {
+                        'total_pnl': fb.get('total_pnl', 0),
+                        'last_trade_pnl': last_trade.get('pnl_usdt', 0),
+                        'total_trades': fb.get('total_trades', 0),
+                        'win_rate': fb.get('win_rate', 0)
+                    }
+                    
+                    # 🔧 優先從持倉資訊讀取實際槓桿 (這是最準確的)
+                    pos_data = bridge.get(pos_key, {}).get('position', {})
+                    if pos_data.get('leverage') and pos_data.get('leverage') > 0:
+                        ai_leverage_map[mode] = pos_data.get('leverage')
+                    else:
+                        # 其次從 AI 指令讀取
+                        ai_cmd = bridge.get(ai_key, {})
+                        if ai_cmd.get('leverage') and ai_cmd.get('leverage') > 0:
+                            ai_leverage_map[mode] = ai_cmd.get('leverage')
+                    
         except Exception as e:
             pass
         
@@ -7558,7 +7632,7 @@ class HybridPaperTradingSystem:
             open_orders = [o for o in self.orders[mode] if not o.is_blocked and o.exit_time is None]
             if open_orders:
                 for position in open_orders:
-                    unrealized_usdt, _ = position.update_unrealized_pnl(self.latest_price)
+                    unrealized_usdt, _ = position.unrealized_pnl(price)
                     unrealized_pnl_usdt += unrealized_usdt
             
             total_equity = balance + unrealized_pnl_usdt
@@ -7589,7 +7663,7 @@ class HybridPaperTradingSystem:
             # 計算 M_NEW 未實現盈虧
             if self.m_new_config['order'] and self.m_new_config['order'].exit_time is None:
                 order = self.m_new_config['order']
-                m_new_unrealized, _ = order.update_unrealized_pnl(self.latest_price)
+                m_new_unrealized, _ = order.unrealized_pnl(price)
             
             m_new_total = m_new_balance + m_new_unrealized
             mode_balances.append((None, "🔥M_NEW", m_new_balance, m_new_unrealized, m_new_total, 'M_NEW'))
@@ -7765,7 +7839,7 @@ class HybridPaperTradingSystem:
 
         market_data = decision.get('market_data', {})
         row = [
-            datetime.now().isoformat(),
+            self.clock.now().isoformat(),
             mode.name,
             market_data.get('mode_style'),
             decision.get('reason', decision.get('action', 'UNKNOWN')),
@@ -7890,7 +7964,7 @@ class HybridPaperTradingSystem:
                 data = json.load(f)
             
             # 更新最終 metadata
-            data['metadata']['end_timestamp'] = datetime.now().strftime('%Y%m%d_%H%M%S')
+            data['metadata']['end_timestamp'] = self.clock.now().strftime('%Y%m%d_%H%M%S')
             data['metadata']['final_balances'] = {
                 mode.name: self.balances[mode] for mode in self.active_modes
             }
@@ -7961,7 +8035,7 @@ class HybridPaperTradingSystem:
             prediction_time = state.get('prediction_time')
             if prediction_time:
                 pred_dt = datetime.fromisoformat(prediction_time)
-                if (datetime.now() - pred_dt).total_seconds() > 60:
+                if (self.clock.now() - pred_dt).total_seconds() > 60:
                     return {'action': 'WAIT', 'confidence': 0, 'reason': 'AI signal expired'}
             
             return {
@@ -7984,18 +8058,20 @@ if __name__ == "__main__":
     duration = 8.0  # 小時
     initial_capital = 100.0  # USDT
     
-    # 解析命令列參數
-    if len(sys.argv) > 1:
+    # 解析命令列參數 (--headless: 不輸出狀態面板/排行榜)
+    headless = '--headless' in sys.argv
+    argv = [a for a in sys.argv if a != '--headless']
+    if len(argv) > 1:
         try:
-            duration = float(sys.argv[1])
+            duration = float(argv[1])
         except ValueError:
-            print(f"⚠️ 無效的時長參數: {sys.argv[1]}，使用預設值 {duration} 小時")
+            print(f"⚠️ 無效的時長參數: {argv[1]}，使用預設值 {duration} 小時")
     
-    if len(sys.argv) > 2:
+    if len(argv) > 2:
         try:
-            initial_capital = float(sys.argv[2])
+            initial_capital = float(argv[2])
         except ValueError:
-            print(f"⚠️ 無效的資金參數: {sys.argv[2]}，使用預設值 {initial_capital} USDT")
+            print(f"⚠️ 無效的資金參數: {argv[2]}，使用預設值 {initial_capital} USDT")
     
     print("\n" + "=" * 60)
     print("🚀 Paper Trading Hybrid Full (純模擬版)")
@@ -8009,7 +8085,8 @@ if __name__ == "__main__":
     system = HybridPaperTradingSystem(
         initial_capital=initial_capital,
         max_position_pct=0.5,
-        test_duration_hours=duration
+        test_duration_hours=duration,
+        headless=headless
     )
     
     try:
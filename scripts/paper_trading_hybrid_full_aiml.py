@@ -48,6 +48,7 @@ from src.exchange.vpin_calculator import VPINCalculator
 from src.exchange.spread_depth_monitor import SpreadDepthMonitor
 from src.utils.consolidation_detector import ConsolidationDetector
 from src.utils.market_regime_detector import MarketRegimeDetector, MarketRegime
+from src.utils.regime_engine import get_regime_engine
 from src.utils.cost_aware_filter import CostAwareFilter, CostDecision
 from src.metrics.leverage_pressure import (
     LiquidationPressureSnapshot,
@@ -676,6 +677,8 @@ class HybridPaperTradingSystem:
             consolidation_threshold=0.003,
             strong_trend_threshold=0.01
         )
+        # 市場狀態 / 盤整指標隨 bar 增量更新，快照時 O(1) 讀取 (同交易對共用一份)
+        self.regime_engine = get_regime_engine("BTCUSDT", self.market_regime_detector, self.consolidation_detector)
         self.cost_filter = CostAwareFilter(
             max_fee_ratio=0.30,
             warning_fee_ratio=0.20,
@@ -1281,11 +1284,13 @@ class HybridPaperTradingSystem:
         if best_bid is None or best_ask is None:
             return
         close_price = (best_bid + best_ask) / 2
+        now = time.time()
         self.price_bars['high'].append(best_ask)
         self.price_bars['low'].append(best_bid)
         self.price_bars['close'].append(close_price)
         self.price_bars['volume'].append(self.pending_volume)
-        self.price_bars['timestamp'].append(time.time())
+        self.price_bars['timestamp'].append(now)
+        self.regime_engine.update(best_ask, best_bid, close_price, self.pending_volume, now)
         self.pending_volume = 0.0
 
     def _record_trend_features(self, timestamp: float, obi: float, vpin: Optional[float]):
@@ -1791,32 +1796,17 @@ class HybridPaperTradingSystem:
         regime_details: Dict[str, float] = {}
         consolidation_flag = False
         consolidation_reason = None
-        if len(self.price_bars['close']) >= 60:
-            df = pd.DataFrame({
-                'high': list(self.price_bars['high'])[-60:],
-                'low': list(self.price_bars['low'])[-60:],
-                'close': list(self.price_bars['close'])[-60:],
-                'volume': list(self.price_bars['volume'])[-60:]
-            })
-            regime_result = self.market_regime_detector.detect_regime(df, return_details=True)
-            if isinstance(regime_result, tuple):
-                regime_enum, metrics = regime_result
-                market_regime = regime_enum.value if isinstance(regime_enum, MarketRegime) else str(regime_enum)
-                if isinstance(metrics, dict):
-                    regime_details = {
-                        'ma_distance': metrics.get('ma_distance'),
-                        'volatility': metrics.get('volatility'),
-                        'volume_ratio': metrics.get('volume_ratio')
-                    }
-            else:
-                market_regime = regime_result.value if isinstance(regime_result, MarketRegime) else str(regime_result)
-
-            high_arr = np.array(df['high'], dtype=float)
-            low_arr = np.array(df['low'], dtype=float)
-            close_arr = np.array(df['close'], dtype=float)
-            cons_state = self.consolidation_detector.is_consolidating(high_arr, low_arr, close_arr)
-            consolidation_flag = cons_state.is_consolidating
-            consolidation_reason = cons_state.reason
+        if self.regime_engine.bar_count >= 60:
+            regime_state = self.regime_engine.snapshot
+            market_regime = regime_state.regime.value
+            metrics = regime_state.details
+            regime_details = {
+                'ma_distance': metrics.get('ma_distance'),
+                'volatility': metrics.get('volatility'),
+                'volume_ratio': metrics.get('volume_ratio')
+            }
+            consolidation_flag = regime_state.consolidation.is_consolidating
+            consolidation_reason = regime_state.consolidation.reason
 
         snapshot = {
             'obi': obi,
@@ -3082,7 +3072,9 @@ class HybridPaperTradingSystem:
                 leverage=config.leverage,
                 direction=action,
                 is_maker=False,
-                account_balance=self.balances[mode]
+                account_balance=self.balances[mode],
+                book=self.spread_depth.book,
+                order_qty=(self.balances[mode] * self.max_position_pct * config.leverage / self.latest_price) if self.latest_price else None
             )
             market_data.update({
                 'cost_decision': cost_analysis.decision.value,
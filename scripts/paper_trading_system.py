@@ -33,7 +33,6 @@ from urllib.request import urlopen
 from urllib.parse import urlencode
 import websockets
 import numpy as np
-import pandas as pd
 
 from src.exchange.obi_calculator import OBICalculator
 from src.exchange.signed_volume_tracker import SignedVolumeTracker
@@ -49,6 +48,7 @@ from src.utils.cost_aware_filter import CostAwareFilter
 from src.utils.time_zone_analyzer import TimeZoneAnalyzer
 from src.utils.loss_pattern_analyzer import LossPatternAnalyzer, LossTrade
 from src.utils.market_regime_detector import MarketRegimeDetector, MarketRegime
+from src.utils.regime_engine import get_regime_engine
 
 # 🆕 Phase 2 Week 4: 策略調度器
 from src.strategy.strategy_orchestrator import (
@@ -425,9 +425,6 @@ class PaperTradingSystem:
         self.vpin_calc = VPINCalculator(bucket_size=10000, num_buckets=50)
         self.spread_depth = SpreadDepthMonitor(depth_levels=10)
         
-        # 交易引擎
-        self.trading_engine = LayeredTradingEngine()
-        
         # 訂單簿（動態創建，每種模式獨立）
         self.orders = {mode: [] for mode in self.active_modes}
         
@@ -514,6 +511,11 @@ class PaperTradingSystem:
             consolidation_threshold=0.003,  # 0.3%
             strong_trend_threshold=0.01     # 1%
         )
+        # 市場狀態 / 盤整指標隨報價增量更新；分層引擎的 RegimeFilter 與 Phase 0 過濾共用同一份
+        self.regime_engine = get_regime_engine("BTCUSDT", self.market_regime_detector, self.consolidation_detector)
+        
+        # 交易引擎
+        self.trading_engine = LayeredTradingEngine(regime_engine=self.regime_engine)
         self.cost_filter = CostAwareFilter(
             max_fee_ratio=0.30,  # 手續費/利潤 < 30%
             min_profit_usd=5.0  # 最小利潤 $5
@@ -705,6 +707,7 @@ class PaperTradingSystem:
                 best_ask = float(data['a'])
                 self.price_history['high'].append(best_ask)
                 self.price_history['low'].append(best_bid)
+                self.regime_engine.update(best_ask, best_bid, self.latest_price, 0.0, time.time())
             
         elif 'depth' in stream:
             # 訂單簿深度
@@ -840,20 +843,11 @@ class PaperTradingSystem:
         
         # 過濾 1: 盤整偵測
         market_regime = MarketRegime.NEUTRAL  # 默認值
-        if len(self.price_history) >= 50:
-            # 準備 DataFrame 用於市場狀態偵測
-            regime_df = pd.DataFrame({
-                'high': self.price_history['high'][-50:],
-                'low': self.price_history['low'][-50:],
-                'close': self.price_history['close'][-50:],
-                'volume': self.price_history['volume'][-50:]
-            })
-            
-            # 偵測市場狀態
-            market_regime, regime_details = self.market_regime_detector.detect_regime(
-                regime_df, 
-                return_details=True
-            )
+        if self.regime_engine.bar_count >= 50:
+            # 偵測市場狀態 (共享引擎的最新快照，O(1) 讀取)
+            regime_state = self.regime_engine.snapshot
+            market_regime = regime_state.regime
+            regime_details = regime_state.details
             
             # 記錄到 decision 中
             decision['market_regime'] = market_regime.value
@@ -864,13 +858,7 @@ class PaperTradingSystem:
             }
             
             # 舊的盤整偵測（保留作為雙重確認）
-            high_arr = np.array(self.price_history['high'][-50:], dtype=float)
-            low_arr = np.array(self.price_history['low'][-50:], dtype=float)
-            close_arr = np.array(self.price_history['close'][-50:], dtype=float)
-            
-            consolidation_state = self.consolidation_detector.is_consolidating(
-                high_arr, low_arr, close_arr
-            )
+            consolidation_state = regime_state.consolidation
             
             # 盤整期禁止交易
             if market_regime == MarketRegime.CONSOLIDATION:
@@ -912,7 +900,9 @@ class PaperTradingSystem:
                 leverage=leverage,
                 direction=decision['signal']['direction'],
                 is_maker=False,
-                account_balance=self.initial_capital
+                account_balance=self.initial_capital,
+                book=self.spread_depth.book,
+                order_qty=(self.initial_capital * position_size * leverage / self.latest_price) if self.latest_price else None
             )
             
             if cost_analysis.decision.value != "APPROVE":
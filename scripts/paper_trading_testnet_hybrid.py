@@ -18,7 +18,6 @@ sys.path.insert(0, script_dir)
 
 import asyncio
 import time
-import json
 import threading
 import io
 from datetime import datetime
@@ -27,6 +26,7 @@ from typing import Dict, Optional
 
 # 導入 Paper Trading 系統
 from scripts.paper_trading_hybrid_full import HybridPaperTradingSystem, TradingMode
+from src.bridge_channel import BridgeChannel
 
 # 導入 Testnet 執行器
 from scripts.testnet_executor import (
@@ -428,6 +428,10 @@ class TestnetHybridSystem:
         # 更新 last_position_states
         self.last_position_states[mode] = {'has_position': False}
     
+    def _bridge_channel(self, bridge_file) -> BridgeChannel:
+        """AI Bridge 通道 (section 級別讀寫，bridge 檔本身只是除錯鏡像)"""
+        return BridgeChannel.for_bridge_file(str(bridge_file))
+    
     def _load_sync_config(self) -> dict:
         """
         🆕 載入統一同步配置檔案
@@ -492,8 +496,6 @@ class TestnetHybridSystem:
         Returns:
             {'allow': bool, 'reason': str}
         """
-        import json
-        from pathlib import Path
         from datetime import datetime
         
         # 🆕 v2.2: 同步模式跳過大部分保護檢查
@@ -506,15 +508,12 @@ class TestnetHybridSystem:
         direction = current_state.get('direction', '').upper()
         
         # 讀取 Bridge 數據
-        bridge_path = Path('ai_wolf_bridge.json')
-        if not bridge_path.exists():
-            return {'allow': True, 'reason': 'Bridge 不存在，允許交易'}
-        
         try:
-            with open(bridge_path, 'r', encoding='utf-8') as f:
-                bridge = json.load(f)
+            bridge = self._bridge_channel('ai_wolf_bridge.json').view()
         except:
             return {'allow': True, 'reason': 'Bridge 讀取失敗，允許交易'}
+        if not bridge:
+            return {'allow': True, 'reason': 'Bridge 不存在，允許交易'}
         
         wolf_data = bridge.get('wolf_to_ai', {})
         feedback = bridge.get('feedback_loop', {})
@@ -655,8 +654,6 @@ class TestnetHybridSystem:
         Returns:
             反向方向 + 證據數量，或空字串表示證據不足
         """
-        import json
-        from pathlib import Path
         from datetime import datetime
         
         # 根據策略取得對應的 Bridge 檔案
@@ -665,14 +662,10 @@ class TestnetHybridSystem:
             # 🔧 Testnet 只同步 M🐺
         }
         bridge_file = bridge_map.get(strategy_key, 'ai_wolf_bridge.json')
-        bridge_path = Path(bridge_file)
-        
-        if not bridge_path.exists():
-            return ''
-        
         try:
-            with open(bridge_path, 'r', encoding='utf-8') as f:
-                bridge = json.load(f)
+            bridge = self._bridge_channel(bridge_file).view()
+            if not bridge:
+                return ''
             
             # 取得數據
             ai_key_map = {
@@ -796,16 +789,11 @@ class TestnetHybridSystem:
         Returns:
             反向方向 + 證據數量，或空字串表示證據不足
         """
-        import json
-        from pathlib import Path
-        
-        bridge_path = Path('ai_wolf_bridge.json')
-        if not bridge_path.exists():
-            return ''
         
         try:
-            with open(bridge_path, 'r', encoding='utf-8') as f:
-                bridge = json.load(f)
+            bridge = self._bridge_channel('ai_wolf_bridge.json').view()
+            if not bridge:
+                return ''
             
             wolf_data = bridge.get('wolf_to_ai', {})
             whale_status = wolf_data.get('whale_status', {})
@@ -901,8 +889,6 @@ class TestnetHybridSystem:
         Returns:
             槓桿倍數 (至少 2x)
         """
-        import json
-        from pathlib import Path
         
         # 🔧 Binance Testnet 最小槓桿 (100 USDT notional / 100 USDT capital = 1x，但需要緩衝)
         MIN_LEVERAGE = 2  # 至少 2x 確保滿足最小訂單要求
@@ -917,12 +903,9 @@ class TestnetHybridSystem:
             print(f"⚠️ {strategy_key} 未設定 bridge_file，使用預設槓桿 {default_leverage}x")
             return default_leverage
         
-        bridge_path = Path(bridge_file)
-        
         try:
-            if bridge_path.exists():
-                with open(bridge_path, 'r', encoding='utf-8') as f:
-                    bridge_data = json.load(f)
+            bridge_data = self._bridge_channel(bridge_file).view()
+            if bridge_data:
                 
                 # 🔧 修正：根據策略讀取正確的 AI 指令欄位
                 ai_key_map = {
@@ -985,15 +968,8 @@ class TestnetHybridSystem:
             if not self.testnet_executor:
                 return {'has_position': False}
             
-            # 🔧 使用 testnet_executor 的內部方法獲取倉位
-            import requests
-            import time as _time
-            
-            params = {'timestamp': int(_time.time() * 1000)}
-            resp = requests.get(
-                f'{self.testnet_executor.base_url}/fapi/v2/positionRisk?{self.testnet_executor._sign_request(params)}',
-                headers=self.testnet_executor._get_headers()
-            )
+            # 🔧 使用 testnet_executor 的共用 REST 連線 (同時在途的 positionRisk 會合併)
+            resp = self.testnet_executor.rest.request('GET', '/fapi/v2/positionRisk', signed=True)
             
             if resp.status_code != 200:
                 return {'has_position': False, 'error': f'API error: {resp.status_code}'}
@@ -1169,7 +1145,6 @@ class TestnetHybridSystem:
         🆕 清除 AI Bridge 的績效數據
         確保新的交易週期從零開始計算
         """
-        import json
         from pathlib import Path
         
         project_root = Path(__file__).parent.parent
@@ -1180,14 +1155,12 @@ class TestnetHybridSystem:
         ]
         
         for filename, name in bridge_files:
-            bridge_path = project_root / filename
-            if bridge_path.exists():
+            channel = self._bridge_channel(project_root / filename)
+            if channel.versions():
                 try:
-                    with open(bridge_path, 'r') as f:
-                        bridge = json.load(f)
-                    
                     # 重置績效數據
-                    bridge['feedback_loop'] = {
+                    updates = {}
+                    updates['feedback_loop'] = {
                         'total_trades': 0,
                         'total_wins': 0,
                         'total_pnl': 0,
@@ -1198,12 +1171,13 @@ class TestnetHybridSystem:
                     }
                     
                     # 清除當前倉位記錄
-                    if 'trading_to_ai' in bridge:
-                        bridge['trading_to_ai']['current_position'] = None
-                        bridge['trading_to_ai']['testnet_position'] = None
+                    trading_to_ai = channel.get('trading_to_ai')
+                    if trading_to_ai is not None:
+                        trading_to_ai['current_position'] = None
+                        trading_to_ai['testnet_position'] = None
+                        updates['trading_to_ai'] = trading_to_ai
                     
-                    with open(bridge_path, 'w') as f:
-                        json.dump(bridge, f, indent=2, ensure_ascii=False)
+                    channel.publish_many(updates)
                     
                     print(f"   🔄 {name} Bridge 績效已清除")
                 except Exception as e:
@@ -1347,14 +1321,11 @@ class TestnetHybridSystem:
         
         try:
             # 1. 讀取 AI Wolf Bridge
-            bridge_file = Path("ai_wolf_bridge.json")
-            if not bridge_file.exists():
+            bridge = self._bridge_channel("ai_wolf_bridge.json").export_json()
+            if not bridge:
                 print("   ⚠️ AI Bridge 檔案不存在，等待 AI 系統建立...")
                 return
             
-            with open(bridge_file, 'r') as f:
-                bridge = json.load(f)
-            
             # 2. 檢查 AI 最後更新時間
             last_updated = bridge.get('last_updated')
             ai_to_wolf = bridge.get('ai_to_wolf', {})
@@ -1491,14 +1462,11 @@ class TestnetHybridSystem:
         if not bridge_file:
             return
         
-        bridge_path = Path(project_root) / bridge_file
-        if not bridge_path.exists():
+        channel = self._bridge_channel(Path(project_root) / bridge_file)
+        if not channel.versions():
             return
         
         try:
-            # 讀取現有 Bridge
-            with open(bridge_path, 'r') as f:
-                bridge = json.load(f)
             
             # ═══════════════════════════════════════════════════════════
             # 1. 取得 Paper Trading 狀態 (AI 決策依據)
@@ -1607,7 +1575,7 @@ class TestnetHybridSystem:
             
             # 🎯 方案 A：AI 只看 Paper 數據做決策
             # 保留原有的市場分析數據
-            existing_data = bridge.get(agent_key, {})
+            existing_data = channel.get(agent_key) or {}
             preserved_keys = [
                 'liquidation_cascade', 'whale_status', 'market_microstructure',
                 'volatility', 'risk_indicators', 'market_reaction', 'URGENT_ALERT'
@@ -1662,10 +1630,8 @@ class TestnetHybridSystem:
                     'alert': {'level': 'NONE', 'message': '無持倉'}
                 }
             
-            bridge[agent_key] = new_status
-            
-            with open(bridge_path, 'w') as f:
-                json.dump(bridge, f, indent=2, ensure_ascii=False)
+            # 只發布 wolf_to_ai，不覆寫 AI 顧問同時寫入的其他 section
+            channel.publish(agent_key, new_status)
             
         except Exception as e:
             print(f"⚠️ 更新 {strategy_key} Bridge 失敗: {e}")
@@ -2110,35 +2076,25 @@ class TestnetHybridSystem:
                 return
             
             project_root = Path(__file__).parent.parent
-            bridge_path = project_root / bridge_file
-            
-            if bridge_path.exists():
-                with open(bridge_path, 'r') as f:
-                    bridge = json.load(f)
-            else:
-                bridge = {}
+            channel = self._bridge_channel(project_root / bridge_file)
             
             # 添加回滾事件記錄
-            if 'rollback_events' not in bridge:
-                bridge['rollback_events'] = []
-            
-            bridge['rollback_events'].append({
+            rollback_events = channel.get('rollback_events') or []
+            rollback_events.append({
                 'time': datetime.now().isoformat(),
                 'reason': reason,
                 'message': f'Testnet 交易失敗，Paper Trading 倉位已取消'
             })
             
-            # 只保留最近 3 筆 (減少 token 消耗)
-            bridge['rollback_events'] = bridge['rollback_events'][-3:]
-            
-            # 更新最後回滾時間
-            bridge['last_rollback'] = {
-                'time': datetime.now().isoformat(),
-                'reason': reason
-            }
-            
-            with open(bridge_path, 'w') as f:
-                json.dump(bridge, f, indent=2, ensure_ascii=False)
+            channel.publish_many({
+                # 只保留最近 3 筆 (減少 token 消耗)
+                'rollback_events': rollback_events[-3:],
+                # 更新最後回滾時間
+                'last_rollback': {
+                    'time': datetime.now().isoformat(),
+                    'reason': reason
+                },
+            })
                 
         except Exception as e:
             print(f"   ⚠️ 更新 Bridge 回滾記錄失敗: {e}")
@@ -3,6 +3,10 @@
 Record Binance realtime features to JSONL via WebSocket.
 
 Default is Binance Futures (perp) to better match dYdX perps.
+
+With --feed-out every depth/aggTrade tick is also written to a binary feed
+recording that `scripts/historical_depth_replay.py --recording` can replay
+through the paper trader faster than real time.
 """
 
 from __future__ import annotations
@@ -21,6 +25,10 @@ from typing import Deque, Dict, List, Optional, Tuple
 
 import aiohttp
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -217,7 +225,25 @@ class BinanceWsState:
         return (current - old_price) / old_price * 100
 
 
-async def _consume_binance_ws(url: str, state: BinanceWsState, ssl_ctx: Optional[ssl.SSLContext]) -> None:
+def _write_feed_event(feed, stream: str, data: dict, state: "BinanceWsState") -> None:
+    """Append the raw tick to the binary feed recording (see src/backtesting/feed_recording.py)."""
+    if "depth" in stream:
+        if state.bids and state.asks:
+            feed.add_depth(state.last_depth_event_ms or int(time.time() * 1000), state.bids, state.asks)
+    elif "aggTrade" in stream:
+        price = _to_float(data.get("p"), 0.0)
+        qty = _to_float(data.get("q"), 0.0)
+        if price > 0 and qty > 0:
+            trade_time_ms = int(_to_float(data.get("T") or data.get("E") or 0, 0.0)) or int(time.time() * 1000)
+            feed.add_trade(trade_time_ms, price, qty, bool(data.get("m")))
+
+
+async def _consume_binance_ws(
+    url: str,
+    state: BinanceWsState,
+    ssl_ctx: Optional[ssl.SSLContext],
+    feed=None,
+) -> None:
     backoff = 1.0
     while True:
         try:
@@ -238,6 +264,8 @@ async def _consume_binance_ws(url: str, state: BinanceWsState, ssl_ctx: Optional
                             state.update_depth(data)
                         elif "aggTrade" in stream:
                             state.update_trade(data)
+                        if feed is not None:
+                            _write_feed_event(feed, stream, data, state)
         except asyncio.CancelledError:
             raise
         except Exception:
@@ -256,6 +284,7 @@ def main() -> None:
     parser.add_argument("--big-trade-usd", type=float, default=10000.0, help="Big trade USD threshold")
     parser.add_argument("--out", type=str, default="", help="Output JSONL path")
     parser.add_argument("--no-ssl-verify", action="store_true", help="Disable SSL verification (use if SSL errors)")
+    parser.add_argument("--feed-out", type=str, default="", help="Also record raw ticks to a binary feed file (.feed)")
     args = parser.parse_args()
 
     out_path = Path(args.out) if args.out else Path(
@@ -272,14 +301,25 @@ def main() -> None:
     ssl_ctx = _make_ssl_context(verify=not args.no_ssl_verify)
     state = BinanceWsState(big_trade_usd=args.big_trade_usd, bucket_window_sec=60)
 
+    feed = None
+    if args.feed_out:
+        from src.backtesting.feed_recording import FeedWriter
+
+        feed = FeedWriter(args.feed_out, symbol=symbol, depth_levels=20)
+        print(f"📼 Recording raw ticks to {feed.path}")
+
     deadline = time.time() + args.hours * 3600
     print(f"▶️ Recording Binance snapshots to {out_path} for {args.hours} hours, interval {args.interval}s")
 
     async def runner() -> None:
-        consumer = asyncio.create_task(_consume_binance_ws(ws_url, state, ssl_ctx))
+        consumer = asyncio.create_task(_consume_binance_ws(ws_url, state, ssl_ctx, feed))
+        last_feed_flush = time.time()
         try:
             with out_path.open("a") as f:
                 while time.time() < deadline:
+                    if feed is not None and time.time() - last_feed_flush >= 60:
+                        feed.flush()
+                        last_feed_flush = time.time()
                     now_sec = int(time.time())
                     mid, bid, ask = state.current_prices()
                     if mid <= 0:
@@ -336,6 +376,8 @@ def main() -> None:
     except KeyboardInterrupt:
         print("🛑 interrupted")
     finally:
+        if feed is not None:
+            feed.close()
         print("✅ done")
 
 
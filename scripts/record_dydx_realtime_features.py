@@ -3,6 +3,10 @@
 Record dYdX + Binance realtime features to JSONL using WS feeds.
 
 This collector focuses on short-horizon features for signal validation.
+With --feed-out the Binance depth/aggTrade ticks are also written to a binary
+feed recording for `scripts/historical_depth_replay.py --recording`; with
+--dydx-feed-out every dYdX book update is recorded the same way, so the two
+recordings can be replayed time-aligned (src/exchange/cross_venue_spread.py).
 """
 
 from __future__ import annotations
@@ -13,6 +17,7 @@ import contextlib
 import json
 import ssl
 import sys
+import threading
 import time
 from collections import deque
 from dataclasses import dataclass
@@ -353,11 +358,46 @@ class BinanceWsState:
         return (current - old_price) / old_price * 100
 
 
+def _write_feed_event(feed, stream: str, data: dict, state: "BinanceWsState") -> None:
+    """Append the raw tick to the binary feed recording (see src/backtesting/feed_recording.py)."""
+    if "depth" in stream:
+        if state.bids and state.asks:
+            feed.add_depth(state.last_depth_event_ms or int(time.time() * 1000), state.bids, state.asks)
+    elif "aggTrade" in stream:
+        price = _to_float(data.get("p"), 0.0)
+        qty = _to_float(data.get("q"), 0.0)
+        if price > 0 and qty > 0:
+            trade_time_ms = int(_to_float(data.get("T") or data.get("E") or 0, 0.0)) or int(time.time() * 1000)
+            feed.add_trade(trade_time_ms, price, qty, bool(data.get("m")))
+
+
+def _dydx_feed_recorder(feed, lock: threading.Lock):
+    """DataHub callback: append each new dYdX book, stamped with the hub's receive time."""
+    state = {"last_update": 0.0, "closed": False}
+
+    def on_update(data) -> None:
+        if data.last_update <= state["last_update"] or not data.bids or not data.asks:
+            return
+        with lock:
+            if state["closed"]:
+                return
+            state["last_update"] = data.last_update
+            feed.add_depth(int(data.last_update * 1000), data.bids, data.asks)
+
+    def close() -> None:
+        with lock:
+            state["closed"] = True
+            feed.close()
+
+    return on_update, close
+
+
 async def _consume_binance_ws(
     url: str,
     state: BinanceWsState,
     ssl_ctx: Optional[ssl.SSLContext],
     stop_event: asyncio.Event,
+    feed=None,
 ) -> None:
     backoff = 1.0
     while not stop_event.is_set():
@@ -380,6 +420,8 @@ async def _consume_binance_ws(
                             state.update_depth(data)
                         elif "aggTrade" in stream:
                             state.update_trade(data)
+                        if feed is not None:
+                            _write_feed_event(feed, stream, data, state)
         except asyncio.CancelledError:
             raise
         except Exception:
@@ -397,12 +439,22 @@ async def run(args: argparse.Namespace) -> None:
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
     hub = get_data_hub(symbol=args.market, network=args.network, ssl_verify=not args.no_ssl_verify)
+    dydx_feed = None
+    dydx_feed_lock = threading.Lock()
+    close_dydx_feed = None
+    if args.dydx_feed_out:
+        from src.backtesting.feed_recording import FeedWriter
+
+        dydx_feed = FeedWriter(args.dydx_feed_out, symbol=args.market, depth_levels=args.depth_levels)
+        hub.on_data_update, close_dydx_feed = _dydx_feed_recorder(dydx_feed, dydx_feed_lock)
+        print(f"📼 Recording dYdX books to {dydx_feed.path}")
     hub.start()
 
     binance_state: Optional[BinanceWsState] = None
     binance_task: Optional[asyncio.Task] = None
     funding_fetcher: Optional[BinanceFundingFetcher] = None
     stop_event = asyncio.Event()
+    feed = None
 
     if not args.binance_disable:
         binance_state = BinanceWsState(big_trade_usd=args.big_trade_usd, bucket_window_sec=60)
@@ -413,16 +465,29 @@ async def run(args: argparse.Namespace) -> None:
         streams = f"{symbol_stream}@depth20@100ms/{symbol_stream}@aggTrade"
         ws_url = f"{ws_base}/stream?streams={streams}"
         ssl_ctx = _make_ssl_context(verify=not args.no_ssl_verify)
-        binance_task = asyncio.create_task(_consume_binance_ws(ws_url, binance_state, ssl_ctx, stop_event))
+        if args.feed_out:
+            from src.backtesting.feed_recording import FeedWriter
+
+            feed = FeedWriter(args.feed_out, symbol=symbol, depth_levels=20)
+            print(f"📼 Recording raw Binance ticks to {feed.path}")
+        binance_task = asyncio.create_task(_consume_binance_ws(ws_url, binance_state, ssl_ctx, stop_event, feed))
 
     deadline = time.time() + args.hours * 3600
     print(
         f"▶️ Recording dYdX + Binance snapshots to {out_path} for {args.hours} hours, interval {args.interval}s"
     )
 
+    last_feed_flush = time.time()
     try:
         with out_path.open("a") as f:
             while time.time() < deadline:
+                if time.time() - last_feed_flush >= 60:
+                    if feed is not None:
+                        feed.flush()
+                    if dydx_feed is not None:
+                        with dydx_feed_lock:
+                            dydx_feed.flush()
+                    last_feed_flush = time.time()
                 data = hub.get_data()
                 if data.current_price <= 0:
                     await asyncio.sleep(args.interval)
@@ -555,6 +620,11 @@ async def run(args: argparse.Namespace) -> None:
             binance_task.cancel()
             with contextlib.suppress(asyncio.CancelledError):
                 await binance_task
+        if feed is not None:
+            feed.close()
+        if close_dydx_feed is not None:
+            hub.on_data_update = None
+            close_dydx_feed()
         cleanup_data_hub()
         print("✅ done")
 
@@ -572,6 +642,8 @@ def main() -> None:
     parser.add_argument("--binance-market-type", default="futures", choices=["spot", "futures"])
     parser.add_argument("--binance-disable", action="store_true", help="Disable Binance feed")
     parser.add_argument("--no-ssl-verify", action="store_true", help="Disable SSL verification (use if SSL errors)")
+    parser.add_argument("--feed-out", type=str, default="", help="Also record raw Binance ticks to a binary feed file (.feed)")
+    parser.add_argument("--dydx-feed-out", type=str, default="", help="Also record dYdX book updates to a binary feed file (.feed)")
     args = parser.parse_args()
 
     asyncio.run(run(args))
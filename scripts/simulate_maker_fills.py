@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Queue-position maker fill study over binary feed recordings.
+
+Places a virtual maker order every ``--interval`` seconds at a fixed tick
+offset from the best price and runs the queue-position fill simulator
+(`src/exchange/queue_fill_simulator.py`) over the recorded depth and trades.
+The output compares the queue-aware fill rate with the naive "price touched"
+rate (any print at or through the limit), per side / offset / timeout, which
+is what the maker-vs-taker sizing decisions are based on.
+
+Usage example
+-------------
+    python scripts/simulate_maker_fills.py \
+        --recording data/feeds/BTCUSDT_*.feed \
+        --start 2025-01-06 --end 2025-01-08 \
+        --offset-ticks 0 1 2 --timeouts 10 30 60 \
+        --qty 0.01 --out reports/maker_fill_study.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.exchange.queue_fill_simulator import (  # noqa: E402
+    CANCEL_MODELS,
+    QueueOrderSpec,
+    RecordedBook,
+    simulate_queue_fills,
+    summarize_fills,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Queue-position maker fill study on feed recordings")
+    parser.add_argument("--recording", nargs="+", required=True, help="Binary feed recordings (.feed)")
+    parser.add_argument("--start", help="Start (YYYY-mm-dd or ISO8601, UTC)")
+    parser.add_argument("--end", help="End (YYYY-mm-dd or ISO8601, UTC)")
+    parser.add_argument("--interval", type=float, default=30.0, help="Seconds between virtual orders (default: 30)")
+    parser.add_argument("--offset-ticks", type=int, nargs="+", default=[0, 1], help="Ticks behind the best price (0 = join best)")
+    parser.add_argument("--tick-size", type=float, default=0.1, help="Price tick (default: 0.1)")
+    parser.add_argument("--timeouts", type=float, nargs="+", default=[30.0, 60.0], help="Order timeouts in seconds")
+    parser.add_argument("--qty", type=float, default=0.01, help="Order size in base units (default: 0.01 BTC)")
+    parser.add_argument("--sides", nargs="+", default=["BUY", "SELL"], help="Sides to simulate")
+    parser.add_argument("--cancel-model", choices=CANCEL_MODELS, default="pro_rata")
+    parser.add_argument("--out", help="Optional JSON output path")
+    return parser.parse_args()
+
+
+def parse_ms(value: str, default_start: bool) -> int:
+    text = value.strip()
+    try:
+        dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        dt = datetime.strptime(text, "%Y-%m-%d")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    if len(text) == 10 and not default_start:
+        dt = dt.replace(hour=23, minute=59, second=59)
+    return int(dt.timestamp() * 1000)
+
+
+def build_orders(book: RecordedBook, side: str, offset_ticks: int, tick_size: float,
+                 qty: float, timeout_ms: int, interval_ms: int) -> List[QueueOrderSpec]:
+    """Virtual orders on a fixed grid, priced off the book at placement time."""
+    if not len(book.depth_ts):
+        return []
+    grid = np.arange(book.depth_ts[0], book.depth_ts[-1] - timeout_ms, interval_ms)
+    idx = np.searchsorted(book.depth_ts, grid, "right") - 1
+    if side == "BUY":
+        prices = book.bid_px[idx, 0] - offset_ticks * tick_size
+    else:
+        prices = book.ask_px[idx, 0] + offset_ticks * tick_size
+    return [
+        QueueOrderSpec(int(t), side, round(float(p), 8), qty, timeout_ms, order_id=f"{side}_{int(t)}")
+        for t, p in zip(grid, prices) if p > 0
+    ]
+
+
+def touch_rate(book: RecordedBook, orders: List[QueueOrderSpec]) -> float:
+    """Fill rate under the touch rule: a print at/through the limit or the opposite best crossing it."""
+    if not orders:
+        return 0.0
+    touched = 0
+    for spec in orders:
+        t_end = spec.placed_ms + spec.timeout_ms
+        lo = np.searchsorted(book.depth_ts, spec.placed_ms, "right")
+        hi = np.searchsorted(book.depth_ts, t_end, "right")
+        t_lo = np.searchsorted(book.trade_ts, spec.placed_ms, "right")
+        t_hi = np.searchsorted(book.trade_ts, t_end, "right")
+        px = book.trade_px[t_lo:t_hi]
+        if spec.side == "BUY":
+            opp = book.ask_px[lo:hi, 0]
+            hit = ((opp > 0) & (opp <= spec.price)).any() or (px <= spec.price).any()
+        else:
+            opp = book.bid_px[lo:hi, 0]
+            hit = (opp >= spec.price).any() or (px >= spec.price).any()
+        touched += bool(hit)
+    return touched / len(orders)
+
+
+def main():
+    args = parse_args()
+    start_ms = parse_ms(args.start, True) if args.start else None
+    end_ms = parse_ms(args.end, False) if args.end else None
+
+    t0 = time.perf_counter()
+    book = RecordedBook.from_feed([Path(p) for p in args.recording], start_ms, end_ms)
+    print(f"📼 Loaded depth={len(book.depth_ts):,} trades={len(book.trade_ts):,} in {time.perf_counter() - t0:.1f}s")
+
+    rows: List[Dict] = []
+    for side in [s.upper() for s in args.sides]:
+        for offset in args.offset_ticks:
+            for timeout in args.timeouts:
+                orders = build_orders(book, side, offset, args.tick_size, args.qty,
+                                      int(timeout * 1000), int(args.interval * 1000))
+                t1 = time.perf_counter()
+                results = simulate_queue_fills(book, orders, cancel_model=args.cancel_model)
+                summary = summarize_fills(results)
+                summary.update({
+                    "side": side,
+                    "offset_ticks": offset,
+                    "timeout_sec": timeout,
+                    "touch_fill_rate": touch_rate(book, orders),
+                    "sim_seconds": round(time.perf_counter() - t1, 3),
+                })
+                rows.append(summary)
+                print(
+                    f"{side:4s} offset={offset:<2d} timeout={timeout:>5.0f}s | orders={summary['orders']:>6d} "
+                    f"queue fill={summary['fill_rate'] * 100:5.1f}% partial={summary['partial_rate'] * 100:5.1f}% "
+                    f"touch={summary['touch_fill_rate'] * 100:5.1f}% | wait p50={summary['median_wait_sec']:.1f}s"
+                )
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps({"cancel_model": args.cancel_model, "qty": args.qty, "rows": rows}, indent=2))
+        print(f"💾 Saved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,21 +4,21 @@
 驗證三個優先級的資料是否正確填充
 """
 
-import json
 import os
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.bridge_channel import BridgeChannel
+
 def test_bridge_structure():
     """測試 Bridge 結構完整性"""
-    bridge_file = "ai_wolf_bridge.json"
+    bridge = BridgeChannel.for_bridge_file("ai_wolf_bridge.json").export_json()
     
-    if not os.path.exists(bridge_file):
+    if not bridge:
         print("❌ Bridge file not found!")
         return False
     
-    with open(bridge_file, 'r') as f:
-        bridge = json.load(f)
-    
     print("="*70)
     print("🔍 AI-Wolf Bridge 結構測試")
     print("="*70)
@@ -180,15 +180,12 @@ def test_ai_reading_capability():
     print("🤖 AI 讀取能力測試")
     print("="*70)
     
-    bridge_file = "ai_wolf_bridge.json"
+    bridge = BridgeChannel.for_bridge_file("ai_wolf_bridge.json").export_json()
     
-    if not os.path.exists(bridge_file):
+    if not bridge:
         print("❌ Bridge file not found!")
         return False
     
-    with open(bridge_file, 'r') as f:
-        bridge = json.load(f)
-    
     wolf_to_ai = bridge.get('wolf_to_ai', {})
     
     # 模擬 AI 讀取邏輯
@@ -8,6 +8,7 @@ from datetime import datetime
 # Add scripts to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from scripts.paper_trading_hybrid_full import HybridPaperTradingSystem, TradingMode
+from src.bridge_channel import BridgeChannel
 
 # Config files
 BRIDGE_FILE = "ai_wolf_bridge.json"
@@ -53,8 +54,7 @@ def set_ai_command(command, direction="NEUTRAL", mock_obi=0.0, mock_whale_dir=No
             }
         }
     }
-    with open(BRIDGE_FILE, 'w') as f:
-        json.dump(bridge_data, f, indent=2)
+    BridgeChannel.for_bridge_file(BRIDGE_FILE).publish_many(bridge_data)
     print(f"🤖 AI Command sent: {command} ({direction}) | OBI: {mock_obi} | Whale: {mock_whale_dir}")
 
 class MockTradingSystem(HybridPaperTradingSystem):
@@ -14,16 +14,18 @@
 import os
 import sys
 import time
-import hmac
-import hashlib
 import json
-import requests
 from datetime import datetime
 from typing import Dict, Optional, Tuple, Any
 from dataclasses import dataclass, asdict, field
 from enum import Enum
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.exchange.binance_rest_client import FUTURES_TESTNET_URL, get_rest_client
+from src.exchange.user_data_stream import UserDataStream
+from src.bridge_channel import BridgeChannel
+
 # ==================== 配置 ====================
 
 # 🆕 寬鬆止損設定 (保底，AI 可以提前平倉)
@@ -39,6 +41,11 @@ def _load_sync_config():
     return {}
 
 _SYNC_CONFIG = _load_sync_config()
+
+def _bridge_channel(bridge_file: str) -> BridgeChannel:
+    """專案根目錄下 bridge 檔對應的橋接通道 (檔案本身只是除錯鏡像)"""
+    return BridgeChannel.for_bridge_file(str(Path(__file__).parent.parent / bridge_file))
+
 _GLOBAL_SETTINGS = _SYNC_CONFIG.get('global_settings', {})
 
 # 🏷️ Maker 訂單設定 (從統一配置讀取)
@@ -50,6 +57,10 @@ MAKER_SKIP_ON_VOLATILITY = _GLOBAL_SETTINGS.get('maker_skip_on_volatility', True
 MAKER_FOR_ENTRY = _GLOBAL_SETTINGS.get('maker_for_entry', True)              # 開倉用 Maker
 MAKER_FOR_EXIT = _GLOBAL_SETTINGS.get('maker_for_exit', False)               # 平倉用 Maker (預設關閉)
 
+# 📡 User Data Stream (成交推送，取代每秒 REST 輪詢)
+USER_STREAM_ENABLED = _GLOBAL_SETTINGS.get('user_stream_enabled', True)
+ORDER_CANCEL_CONFIRM_SECONDS = 3.0   # 取消後等待最終狀態 (含部分成交量)
+
 # 🚨 市場狀態偵測閾值
 VOLATILITY_SPIKE_THRESHOLD = 0.5   # 波動率 > 0.5% 視為高波動
 PRICE_MOMENTUM_THRESHOLD = 0.3     # 價格動量 > 0.3% 視為突破
@@ -140,12 +151,18 @@ class BinanceTestnetExecutor:
     """Binance Testnet 交易執行器"""
     
     def __init__(self):
-        self.base_url = 'https://testnet.binancefuture.com'
+        self.base_url = FUTURES_TESTNET_URL
         self.symbol = 'BTCUSDT'
         
         # 從 .env 讀取 API 金鑰
         self._load_api_keys()
         
+        # 共用 keep-alive 連線池 (簽名、伺服器時間偏移、權重限流、GET 合併)
+        self.rest = get_rest_client(self.base_url, self.api_key, self.api_secret)
+        
+        # 📡 訂單 / 持倉推送 (未連上時退回 REST 輪詢)
+        self.user_stream = self._start_user_stream()
+        
         # 初始化投資組合
         self.portfolio = self._load_portfolio()
         
@@ -172,19 +189,53 @@ class BinanceTestnetExecutor:
             raise ValueError("❌ 缺少 BINANCE_TESTNET_API_KEY 或 BINANCE_TESTNET_API_SECRET")
     
     def _sign_request(self, params: Dict) -> str:
-        """簽名請求"""
-        query = '&'.join([f'{k}={v}' for k, v in params.items()])
-        signature = hmac.new(
-            self.api_secret.encode(), 
-            query.encode(), 
-            hashlib.sha256
-        ).hexdigest()
-        return query + '&signature=' + signature
+        """簽名請求 (timestamp 以伺服器時間為準)"""
+        return self.rest.signed_query(params)
     
     def _get_headers(self) -> Dict:
         """取得請求標頭"""
         return {'X-MBX-APIKEY': self.api_key}
     
+    def _start_user_stream(self) -> Optional[UserDataStream]:
+        """啟動 listenKey User Data Stream (失敗則回傳 None，改用 REST 輪詢)"""
+        if not USER_STREAM_ENABLED:
+            return None
+        try:
+            stream = UserDataStream(self.rest.client, symbol=self.symbol)
+            if stream.start_background():
+                print("✅ User Data Stream 已連線 (訂單/持倉推送)")
+            return stream
+        except Exception as e:
+            print(f"⚠️ User Data Stream 啟動失敗，改用 REST 輪詢: {e}")
+            return None
+    
+    def _stream_ready(self) -> bool:
+        return self.user_stream is not None and self.user_stream.connected
+    
+    def _wait_for_order(self, order_id: int, timeout: float) -> Optional[Dict]:
+        """
+        📡 等待訂單進入終態 (FILLED / CANCELED / EXPIRED / REJECTED)
+        
+        有 User Data Stream 時由成交推送直接喚醒；否則每秒查一次 REST。
+        
+        Returns:
+            訂單狀態 (REST 格式)；超時則為當下狀態 (可能部分成交)
+        """
+        if self._stream_ready():
+            order = self.user_stream.wait_for_order_blocking(order_id, timeout)
+            if order is not None:
+                return order.to_rest_dict()
+            return self.get_order_status(order_id)
+        
+        deadline = time.time() + timeout
+        status = self.get_order_status(order_id)
+        while time.time() < deadline:
+            if status and status.get('status') in ('FILLED', 'CANCELED', 'REJECTED', 'EXPIRED'):
+                break
+            time.sleep(1)
+            status = self.get_order_status(order_id) or status
+        return status
+    
     def _load_portfolio(self) -> Portfolio:
         """載入投資組合狀態"""
         if PORTFOLIO_FILE.exists():
@@ -248,13 +299,9 @@ class BinanceTestnetExecutor:
         try:
             # 1. 🆕 開啟雙向持倉 (Hedge Mode)
             hedge_params = {
-                'dualSidePosition': 'true',
-                'timestamp': int(time.time() * 1000)
+                'dualSidePosition': 'true'
             }
-            hedge_resp = requests.post(
-                f'{self.base_url}/fapi/v1/positionSide/dual?{self._sign_request(hedge_params)}',
-                headers=self._get_headers()
-            )
+            hedge_resp = self.rest.request('POST', '/fapi/v1/positionSide/dual', hedge_params, signed=True)
             if hedge_resp.status_code == 200:
                 print("✅ 雙向持倉 (Hedge Mode) 已開啟")
             elif 'No need to change position side' in hedge_resp.text:
@@ -267,25 +314,17 @@ class BinanceTestnetExecutor:
             # 2. 設定逐倉模式
             margin_params = {
                 'symbol': self.symbol,
-                'marginType': 'ISOLATED',
-                'timestamp': int(time.time() * 1000)
+                'marginType': 'ISOLATED'
             }
-            margin_resp = requests.post(
-                f'{self.base_url}/fapi/v1/marginType?{self._sign_request(margin_params)}',
-                headers=self._get_headers()
-            )
+            margin_resp = self.rest.request('POST', '/fapi/v1/marginType', margin_params, signed=True)
             
             # 3. 設定槓桿 (使用第一個策略的槓桿)
             leverage = list(STRATEGY_CONFIG.values())[0]['leverage']
             leverage_params = {
                 'symbol': self.symbol,
-                'leverage': leverage,
-                'timestamp': int(time.time() * 1000)
+                'leverage': leverage
             }
-            leverage_resp = requests.post(
-                f'{self.base_url}/fapi/v1/leverage?{self._sign_request(leverage_params)}',
-                headers=self._get_headers()
-            )
+            leverage_resp = self.rest.request('POST', '/fapi/v1/leverage', leverage_params, signed=True)
             
             print(f"✅ 帳戶設定完成: ISOLATED 模式, {leverage}x 槓桿, Hedge Mode")
             
@@ -305,13 +344,9 @@ class BinanceTestnetExecutor:
         try:
             leverage_params = {
                 'symbol': self.symbol,
-                'leverage': leverage,
-                'timestamp': int(time.time() * 1000)
+                'leverage': leverage
             }
-            resp = requests.post(
-                f'{self.base_url}/fapi/v1/leverage?{self._sign_request(leverage_params)}',
-                headers=self._get_headers()
-            )
+            resp = self.rest.request('POST', '/fapi/v1/leverage', leverage_params, signed=True)
             if resp.status_code == 200:
                 print(f"   ⚡ 交易所槓桿設定為 {leverage}x")
                 return True
@@ -324,16 +359,13 @@ class BinanceTestnetExecutor:
     
     def get_current_price(self) -> float:
         """取得當前價格"""
-        resp = requests.get(f'{self.base_url}/fapi/v1/ticker/price?symbol={self.symbol}')
+        resp = self.rest.request('GET', '/fapi/v1/ticker/price', {'symbol': self.symbol})
         return float(resp.json()['price'])
     
     def get_account_balance(self) -> float:
         """取得帳戶餘額"""
-        params = {'timestamp': int(time.time() * 1000)}
-        resp = requests.get(
-            f'{self.base_url}/fapi/v2/balance?{self._sign_request(params)}',
-            headers=self._get_headers()
-        )
+        params = {}
+        resp = self.rest.request('GET', '/fapi/v2/balance', params, signed=True)
         
         for asset in resp.json():
             if asset['asset'] == 'USDT':
@@ -347,11 +379,8 @@ class BinanceTestnetExecutor:
         Args:
             position_side: 'LONG', 'SHORT', 或 None (返回所有)
         """
-        params = {'timestamp': int(time.time() * 1000)}
-        resp = requests.get(
-            f'{self.base_url}/fapi/v2/positionRisk?{self._sign_request(params)}',
-            headers=self._get_headers()
-        )
+        params = {}
+        resp = self.rest.request('GET', '/fapi/v2/positionRisk', params, signed=True)
         
         positions = []
         for pos in resp.json():
@@ -365,11 +394,12 @@ class BinanceTestnetExecutor:
     
     def get_all_positions(self) -> Dict[str, Dict]:
         """🆕 取得雙向持倉 (LONG 和 SHORT)"""
-        params = {'timestamp': int(time.time() * 1000)}
-        resp = requests.get(
-            f'{self.base_url}/fapi/v2/positionRisk?{self._sign_request(params)}',
-            headers=self._get_headers()
-        )
+        if self._stream_ready():
+            positions = self.user_stream.positions_blocking()
+            return {'LONG': positions.get('LONG'), 'SHORT': positions.get('SHORT')}
+        
+        params = {}
+        resp = self.rest.request('GET', '/fapi/v2/positionRisk', params, signed=True)
         
         result = {'LONG': None, 'SHORT': None}
         for pos in resp.json():
@@ -382,11 +412,14 @@ class BinanceTestnetExecutor:
     
     def _get_real_positions(self) -> list:
         """🔧 取得交易所實際持倉 (不依賴本地記錄)"""
-        params = {'timestamp': int(time.time() * 1000)}
-        resp = requests.get(
-            f'{self.base_url}/fapi/v2/positionRisk?{self._sign_request(params)}',
-            headers=self._get_headers()
-        )
+        if self._stream_ready():
+            return [
+                pos for pos in self.user_stream.positions_blocking().values()
+                if abs(float(pos['positionAmt'])) > 0.001
+            ]
+        
+        params = {}
+        resp = self.rest.request('GET', '/fapi/v2/positionRisk', params, signed=True)
         
         positions = []
         if resp.status_code == 200:
@@ -414,14 +447,10 @@ class BinanceTestnetExecutor:
                 'side': side,
                 'positionSide': position_side,
                 'type': 'MARKET',
-                'quantity': round(quantity, 3),
-                'timestamp': int(time.time() * 1000)
+                'quantity': round(quantity, 3)
             }
             
-            resp = requests.post(
-                f'{self.base_url}/fapi/v1/order?{self._sign_request(order_params)}',
-                headers=self._get_headers()
-            )
+            resp = self.rest.request('POST', '/fapi/v1/order', order_params, signed=True)
             
             if resp.status_code == 200:
                 print(f"   ✅ 殘留持倉已清空: {position_side} {quantity} BTC")
@@ -436,25 +465,17 @@ class BinanceTestnetExecutor:
     def cancel_all_orders(self) -> bool:
         """取消所有掛單"""
         params = {
-            'symbol': self.symbol,
-            'timestamp': int(time.time() * 1000)
+            'symbol': self.symbol
         }
-        resp = requests.delete(
-            f'{self.base_url}/fapi/v1/allOpenOrders?{self._sign_request(params)}',
-            headers=self._get_headers()
-        )
+        resp = self.rest.request('DELETE', '/fapi/v1/allOpenOrders', params, signed=True)
         return resp.status_code == 200
     
     def get_open_orders(self) -> list:
         """🏷️ 取得所有未成交訂單"""
         params = {
-            'symbol': self.symbol,
-            'timestamp': int(time.time() * 1000)
+            'symbol': self.symbol
         }
-        resp = requests.get(
-            f'{self.base_url}/fapi/v1/openOrders?{self._sign_request(params)}',
-            headers=self._get_headers()
-        )
+        resp = self.rest.request('GET', '/fapi/v1/openOrders', params, signed=True)
         if resp.status_code == 200:
             return resp.json()
         return []
@@ -463,13 +484,9 @@ class BinanceTestnetExecutor:
         """🏷️ 查詢訂單狀態"""
         params = {
             'symbol': self.symbol,
-            'orderId': order_id,
-            'timestamp': int(time.time() * 1000)
+            'orderId': order_id
         }
-        resp = requests.get(
-            f'{self.base_url}/fapi/v1/order?{self._sign_request(params)}',
-            headers=self._get_headers()
-        )
+        resp = self.rest.request('GET', '/fapi/v1/order', params, signed=True)
         if resp.status_code == 200:
             return resp.json()
         return None
@@ -478,18 +495,14 @@ class BinanceTestnetExecutor:
         """🏷️ 取消指定訂單"""
         params = {
             'symbol': self.symbol,
-            'orderId': order_id,
-            'timestamp': int(time.time() * 1000)
+            'orderId': order_id
         }
-        resp = requests.delete(
-            f'{self.base_url}/fapi/v1/order?{self._sign_request(params)}',
-            headers=self._get_headers()
-        )
+        resp = self.rest.request('DELETE', '/fapi/v1/order', params, signed=True)
         return resp.status_code == 200
     
     def get_orderbook(self) -> Dict:
         """🏷️ 取得即時 OrderBook (最佳買賣價)"""
-        resp = requests.get(f'{self.base_url}/fapi/v1/ticker/bookTicker?symbol={self.symbol}')
+        resp = self.rest.request('GET', '/fapi/v1/ticker/bookTicker', {'symbol': self.symbol})
         if resp.status_code == 200:
             data = resp.json()
             return {
@@ -543,11 +556,8 @@ class BinanceTestnetExecutor:
         """
         try:
             # 讀取 AI Wolf Bridge 中的市場指標
-            bridge_path = Path(__file__).parent.parent / 'ai_wolf_bridge.json'
-            if bridge_path.exists():
-                with open(bridge_path, 'r', encoding='utf-8') as f:
-                    bridge_data = json.load(f)
-                
+            bridge_data = _bridge_channel('ai_wolf_bridge.json').view()
+            if bridge_data:
                 market_data = bridge_data.get('ai_to_wolf', {}).get('market_data', {})
                 
                 # 1️⃣ 波動率檢查 (ATR)
@@ -628,12 +638,8 @@ class BinanceTestnetExecutor:
         """獲取策略績效 (用於判斷主控權)"""
         try:
             bridge_file = "ai_wolf_bridge.json" if strategy_key == 'M🐺' else "ai_dragon_bridge.json"
-            project_root = Path(__file__).parent.parent
-            bridge_path = project_root / bridge_file
-            
-            if bridge_path.exists():
-                with open(bridge_path, 'r') as f:
-                    bridge = json.load(f)
+            bridge = _bridge_channel(bridge_file).view()
+            if bridge:
                 fb = bridge.get('feedback_loop', {})
                 win_rate = fb.get('win_rate', 50)
                 total_pnl = fb.get('total_pnl', 0)
@@ -667,17 +673,9 @@ class BinanceTestnetExecutor:
         try:
             # 讀取 AI Bridge
             bridge_file = "ai_wolf_bridge.json" if strategy_key == 'M🐺' else "ai_dragon_bridge.json"
-            project_root = Path(__file__).parent.parent
-            bridge_path = project_root / bridge_file
-            
-            if not bridge_path.exists():
-                return result
-            
-            with open(bridge_path, 'r', encoding='utf-8') as f:
-                bridge = json.load(f)
             
             # 讀取主力策略分析
-            ai_command = bridge.get('ai_to_wolf', {})
+            ai_command = _bridge_channel(bridge_file).get('ai_to_wolf', {})
             whale_strategy = ai_command.get('whale_strategy', {})
             
             if not whale_strategy:
@@ -883,14 +881,10 @@ class BinanceTestnetExecutor:
             'side': side,
             'positionSide': position_side,  # 🆕 雙向持倉必須指定
             'type': 'MARKET',
-            'quantity': quantity,
-            'timestamp': int(time.time() * 1000)
+            'quantity': quantity
         }
         
-        order_resp = requests.post(
-            f'{self.base_url}/fapi/v1/order?{self._sign_request(order_params)}',
-            headers=self._get_headers()
-        )
+        order_resp = self.rest.request('POST', '/fapi/v1/order', order_params, signed=True)
         
         if order_resp.status_code != 200:
             error_text = order_resp.text
@@ -930,13 +924,9 @@ class BinanceTestnetExecutor:
             'positionSide': position_side,  # 🆕 雙向持倉
             'type': 'STOP_MARKET',
             'stopPrice': sl_price,
-            'closePosition': 'true',  # 🆕 平掉該方向全部持倉
-            'timestamp': int(time.time() * 1000)
+            'closePosition': 'true'  # 🆕 平掉該方向全部持倉
         }
-        sl_resp = requests.post(
-            f'{self.base_url}/fapi/v1/order?{self._sign_request(sl_params)}',
-            headers=self._get_headers()
-        )
+        sl_resp = self.rest.request('POST', '/fapi/v1/order', sl_params, signed=True)
         sl_order_id = sl_resp.json().get('orderId') if sl_resp.status_code == 200 else None
         
         # 更新策略狀態
@@ -1000,16 +990,12 @@ class BinanceTestnetExecutor:
             'type': 'LIMIT',
             'price': limit_price,
             'quantity': quantity,
-            'timeInForce': 'IOC',  # 🆕 立即成交或取消 (不掛單等待)
-            'timestamp': int(time.time() * 1000)
+            'timeInForce': 'IOC'  # 🆕 立即成交或取消 (不掛單等待)
         }
         
         print(f"   🔄 LIMIT IOC 下單: {direction} {quantity} BTC @ ${limit_price:,.1f}")
         
-        order_resp = requests.post(
-            f'{self.base_url}/fapi/v1/order?{self._sign_request(order_params)}',
-            headers=self._get_headers()
-        )
+        order_resp = self.rest.request('POST', '/fapi/v1/order', order_params, signed=True)
         
         if order_resp.status_code != 200:
             return False, f"❌ LIMIT 開倉也失敗: {order_resp.text}"
@@ -1038,13 +1024,9 @@ class BinanceTestnetExecutor:
             'positionSide': position_side,
             'type': 'STOP_MARKET',
             'stopPrice': sl_price,
-            'closePosition': 'true',
-            'timestamp': int(time.time() * 1000)
+            'closePosition': 'true'
         }
-        sl_resp = requests.post(
-            f'{self.base_url}/fapi/v1/order?{self._sign_request(sl_params)}',
-            headers=self._get_headers()
-        )
+        sl_resp = self.rest.request('POST', '/fapi/v1/order', sl_params, signed=True)
         sl_order_id = sl_resp.json().get('orderId') if sl_resp.status_code == 200 else None
         
         # 更新策略狀態
@@ -1170,16 +1152,12 @@ class BinanceTestnetExecutor:
             'type': 'LIMIT',
             'price': maker_price,
             'quantity': quantity,
-            'timeInForce': 'GTC',  # Good Till Cancel
-            'timestamp': int(time.time() * 1000)
+            'timeInForce': 'GTC'  # Good Till Cancel
         }
         
         print(f"   🏷️ 掛單中... {direction} @ ${maker_price:,.1f} (當前: ${current_price:,.2f})")
         
-        order_resp = requests.post(
-            f'{self.base_url}/fapi/v1/order?{self._sign_request(order_params)}',
-            headers=self._get_headers()
-        )
+        order_resp = self.rest.request('POST', '/fapi/v1/order', order_params, signed=True)
         
         if order_resp.status_code != 200:
             # 掛單失敗，嘗試 Taker
@@ -1190,36 +1168,24 @@ class BinanceTestnetExecutor:
         
         order_data = order_resp.json()
         order_id = order_data.get('orderId')
+        if self.user_stream is not None:
+            self.user_stream.track(order_data)
         
-        # 2. 🏷️ 等待成交
+        # 2. 🏷️ 等待成交 (成交推送到達即返回)
         start_time = time.time()
         filled = False
         entry_price = maker_price
         filled_qty = 0.0  # 🆕 追蹤已成交數量
         
-        while time.time() - start_time < timeout:
-            time.sleep(1)  # 每秒檢查一次
-            
-            status = self.get_order_status(order_id)
-            if status:
-                order_status = status.get('status', '')
-                filled_qty = float(status.get('executedQty', 0))  # 🆕 更新已成交數量
-                
-                if order_status == 'FILLED':
-                    entry_price = float(status.get('avgPrice', maker_price))
-                    filled = True
-                    print(f"   ✅ Maker 成交! @ ${entry_price:,.2f}")
-                    break
-                elif order_status == 'PARTIALLY_FILLED':
-                    # 部分成交，繼續等待
-                    print(f"   ⏳ 部分成交: {filled_qty}/{quantity} BTC")
-                elif order_status in ['CANCELED', 'REJECTED', 'EXPIRED']:
-                    break
-            
-            # 顯示等待進度
-            elapsed = time.time() - start_time
-            if int(elapsed) % 5 == 0 and int(elapsed) > 0:
-                print(f"   ⏳ 等待成交... {int(elapsed)}/{int(timeout)}s")
+        status = self._wait_for_order(order_id, timeout)
+        if status:
+            filled_qty = float(status.get('executedQty', 0))  # 🆕 更新已成交數量
+            if status.get('status') == 'FILLED':
+                entry_price = float(status.get('avgPrice', maker_price))
+                filled = True
+                print(f"   ✅ Maker 成交! @ ${entry_price:,.2f} ({time.time() - start_time:.2f}s)")
+            elif filled_qty > 0:
+                print(f"   ⏳ 部分成交: {filled_qty}/{quantity} BTC")
         
         # 3. 處理超時或部分成交
         if not filled:
@@ -1227,8 +1193,8 @@ class BinanceTestnetExecutor:
             self.cancel_order(order_id)
             elapsed = time.time() - start_time
             
-            # 🆕 檢查是否有部分成交
-            final_status = self.get_order_status(order_id)
+            # 🆕 檢查是否有部分成交 (取消後的最終狀態)
+            final_status = self._wait_for_order(order_id, ORDER_CANCEL_CONFIRM_SECONDS)
             if final_status:
                 filled_qty = float(final_status.get('executedQty', 0))
                 entry_price = float(final_status.get('avgPrice', maker_price)) if filled_qty > 0 else maker_price
@@ -1265,13 +1231,9 @@ class BinanceTestnetExecutor:
             'positionSide': position_side,
             'type': 'STOP_MARKET',
             'stopPrice': sl_price,
-            'closePosition': 'true',
-            'timestamp': int(time.time() * 1000)
+            'closePosition': 'true'
         }
-        sl_resp = requests.post(
-            f'{self.base_url}/fapi/v1/order?{self._sign_request(sl_params)}',
-            headers=self._get_headers()
-        )
+        sl_resp = self.rest.request('POST', '/fapi/v1/order', sl_params, signed=True)
         sl_order_id = sl_resp.json().get('orderId') if sl_resp.status_code == 200 else None
         
         # 更新策略狀態
@@ -1339,14 +1301,10 @@ class BinanceTestnetExecutor:
             'side': side,
             'positionSide': position_side,  # 🆕 雙向持倉必須指定
             'type': 'MARKET',
-            'quantity': quantity,
-            'timestamp': int(time.time() * 1000)
+            'quantity': quantity
         }
         
-        order_resp = requests.post(
-            f'{self.base_url}/fapi/v1/order?{self._sign_request(order_params)}',
-            headers=self._get_headers()
-        )
+        order_resp = self.rest.request('POST', '/fapi/v1/order', order_params, signed=True)
         
         if order_resp.status_code != 200:
             return False, f"❌ 平倉失敗: {order_resp.text}"
@@ -1469,16 +1427,12 @@ class BinanceTestnetExecutor:
             'type': 'LIMIT',
             'price': maker_price,
             'quantity': quantity,
-            'timeInForce': 'GTC',
-            'timestamp': int(time.time() * 1000)
+            'timeInForce': 'GTC'
         }
         
         print(f"   🏷️ Maker 平倉... {close_side} @ ${maker_price:,.1f}")
         
-        order_resp = requests.post(
-            f'{self.base_url}/fapi/v1/order?{self._sign_request(order_params)}',
-            headers=self._get_headers()
-        )
+        order_resp = self.rest.request('POST', '/fapi/v1/order', order_params, signed=True)
         
         if order_resp.status_code != 200:
             print(f"   ⚠️ 掛單失敗: {order_resp.text}")
@@ -1488,37 +1442,31 @@ class BinanceTestnetExecutor:
         
         order_data = order_resp.json()
         order_id = order_data.get('orderId')
+        if self.user_stream is not None:
+            self.user_stream.track(order_data)
         
-        # 等待成交
+        # 等待成交 (成交推送到達即返回)
         start_time = time.time()
         filled = False
         exit_price = maker_price
         filled_qty = 0.0  # 🆕 追蹤已成交數量
         
-        while time.time() - start_time < timeout:
-            time.sleep(1)
-            
-            status = self.get_order_status(order_id)
-            if status:
-                order_status = status.get('status', '')
-                filled_qty = float(status.get('executedQty', 0))  # 🆕 更新已成交數量
-                
-                if order_status == 'FILLED':
-                    exit_price = float(status.get('avgPrice', maker_price))
-                    filled = True
-                    print(f"   ✅ Maker 平倉成交! @ ${exit_price:,.2f}")
-                    break
-                elif order_status == 'PARTIALLY_FILLED':
-                    # 🆕 顯示部分成交進度
-                    print(f"   ⏳ 平倉部分成交: {filled_qty}/{quantity} BTC")
-                elif order_status in ['CANCELED', 'REJECTED', 'EXPIRED']:
-                    break
+        status = self._wait_for_order(order_id, timeout)
+        if status:
+            filled_qty = float(status.get('executedQty', 0))  # 🆕 更新已成交數量
+            if status.get('status') == 'FILLED':
+                exit_price = float(status.get('avgPrice', maker_price))
+                filled = True
+                print(f"   ✅ Maker 平倉成交! @ ${exit_price:,.2f} ({time.time() - start_time:.2f}s)")
+            elif filled_qty > 0:
+                # 🆕 顯示部分成交進度
+                print(f"   ⏳ 平倉部分成交: {filled_qty}/{quantity} BTC")
         
         if not filled:
             self.cancel_order(order_id)
             
-            # 🆕 檢查是否有部分成交
-            final_status = self.get_order_status(order_id)
+            # 🆕 檢查是否有部分成交 (取消後的最終狀態)
+            final_status = self._wait_for_order(order_id, ORDER_CANCEL_CONFIRM_SECONDS)
             if final_status:
                 filled_qty = float(final_status.get('executedQty', 0))
                 exit_price = float(final_status.get('avgPrice', maker_price)) if filled_qty > 0 else maker_price
@@ -20,6 +20,7 @@ from typing import Callable, Optional, Dict, Any
 
 # 導入 WebSocket 監控器
 from scripts.testnet_websocket import TestnetWebSocketMonitor
+from src.bridge_channel import BridgeChannel
 
 # 載入統一配置
 SYNC_CONFIG_FILE = Path(__file__).parent.parent / 'config' / 'strategy_sync_config.json'
@@ -328,23 +329,13 @@ class WebSocketIntegration:
         """
         🆕 更新 AI Bridge 檔案，讓 AI 可以讀取即時 Testnet 狀態
         """
-        import json
-        from pathlib import Path
-        
-        bridge_file = Path(__file__).parent.parent / 'ai_wolf_bridge.json'
+        channel = BridgeChannel.for_bridge_file(str(Path(__file__).parent.parent / 'ai_wolf_bridge.json'))
         
         try:
-            # 讀取現有 bridge
-            bridge = {}
-            if bridge_file.exists():
-                with open(bridge_file, 'r', encoding='utf-8') as f:
-                    bridge = json.load(f)
-            
-            # 更新 Testnet 即時資料
-            if 'wolf_to_ai' not in bridge:
-                bridge['wolf_to_ai'] = {}
+            # 只讀寫 wolf_to_ai 這個 section (其他 section 由各自的寫入者發布)
+            wolf_to_ai = channel.get('wolf_to_ai') or {}
             
-            bridge['wolf_to_ai']['websocket_realtime'] = {
+            wolf_to_ai['websocket_realtime'] = {
                 'source': 'WEBSOCKET_REALTIME',
                 'timestamp': datetime.now().isoformat(),
                 'has_position': abs(pnl_usdt) > 0.01 or direction != '',
@@ -359,9 +350,7 @@ class WebSocketIntegration:
                 'alert': self._get_alert_level(pnl_pct)
             }
             
-            # 寫回
-            with open(bridge_file, 'w', encoding='utf-8') as f:
-                json.dump(bridge, f, indent=2, ensure_ascii=False)
+            channel.publish('wolf_to_ai', wolf_to_ai)
                 
         except Exception as e:
             pass  # 靜默失敗，不影響主流程
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+🐋 Whale Multi-Symbol Runner
+============================
+
+同一套鯨魚交易邏輯同時跑多個幣種 (BTC / ETH / SOL ...)，而不是各開一份 whale_testnet_trader.py:
+- 母進程: 一條 Binance combined stream 訂閱所有幣種，依 stream 名稱分流到各 worker 的 Queue
+- 母進程: RuntimeCoordinator (multiprocessing manager) 集中管理共用資金、同時持倉數、
+          當日合計虧損與 Binance REST 權重
+- worker: 每個幣種一個進程並綁定 CPU 核心，跑 WhaleTestnetSystem(config, binance_feed=..., coordinator=...)
+
+dYdX 行情仍由各幣種的 DydxDataHub 負責 (每個市場自己的 master/consumer 快取)，
+dYdX REST 沿用 src/shared_rate_limiter.py 的跨進程限速。
+
+用法:
+    python scripts/whale_multi_symbol.py --hours 4
+    python scripts/whale_multi_symbol.py --symbols ETH/USDT SOL/USDT --config config/multi_symbol_config.json
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import secrets
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from src.trading.multi_symbol import (  # noqa: E402
+    CombinedStreamRouter,
+    CoordinatorManager,
+    MultiSymbolConfig,
+    SymbolSpec,
+    load_multi_symbol_config,
+    pin_to_core,
+)
+
+
+def _build_config(spec: SymbolSpec, paper_mode: bool, cap_usdt: Optional[float] = None):
+    """在 worker 內依卡片建立 TradingConfig 並套用幣種設定 (每筆保證金不超過協調器的分配額度)"""
+    from scripts.whale_testnet_trader import CARD_MANAGER_AVAILABLE, TradingConfig
+
+    if CARD_MANAGER_AVAILABLE:
+        config = TradingConfig.from_card(spec.card)
+    else:
+        config = TradingConfig(leverage=50, position_size_usdt=100.0, analysis_interval_sec=3.0)
+
+    config.symbol = spec.symbol
+    config.symbol_dydx = spec.dydx_market
+    if spec.position_size_usdt is not None:
+        config.position_size_usdt = spec.position_size_usdt
+    if cap_usdt is not None and config.position_size_usdt > cap_usdt:
+        print(f"⚠️ [{spec.dydx_market}] 每筆保證金 ${config.position_size_usdt:.2f} 超過分配額度，降為 ${cap_usdt:.2f}")
+        config.position_size_usdt = cap_usdt
+    config.paper_mode = paper_mode
+    # dYdX 同步下單的固定 BTC 倉位只適用 BTC-USD，多幣種一律不啟用
+    config.dydx_sync_mode = False
+    if config.contextual_mode is None:
+        config.contextual_mode = True
+    return config
+
+
+def _worker_main(
+    spec: SymbolSpec,
+    feed,
+    coordinator,
+    hours: float,
+    paper_mode: bool,
+    core: Optional[int],
+    cap_usdt: Optional[float] = None,
+) -> None:
+    """單一幣種 worker (spawn 進程入口)"""
+    pinned = pin_to_core(core)
+    print(f"🧵 [{spec.dydx_market}] worker 啟動 (PID {mp.current_process().pid}, core={core if pinned else '-'})")
+
+    from scripts.whale_testnet_trader import WhaleTestnetSystem
+
+    config = _build_config(spec, paper_mode, cap_usdt)
+    system = WhaleTestnetSystem(config, binance_feed=feed, coordinator=coordinator)
+    system.run(hours=hours)
+
+
+def _assign_cores(specs: List[SymbolSpec]) -> Dict[str, Optional[int]]:
+    """未指定 core 的幣種從 1 號核心依序分配 (0 號留給母進程的串流分流)"""
+    cores = {}
+    next_core = 1
+    used = {s.core for s in specs if s.core is not None}
+    for spec in specs:
+        if spec.core is not None:
+            cores[spec.dydx_market] = spec.core
+            continue
+        while next_core in used:
+            next_core += 1
+        cores[spec.dydx_market] = next_core
+        used.add(next_core)
+    return cores
+
+
+def run(config: MultiSymbolConfig, hours: float) -> None:
+    specs = config.active_symbols
+    if not specs:
+        print("❌ 沒有啟用的幣種")
+        return
+
+    ctx = mp.get_context("spawn")
+    mp.current_process().authkey = secrets.token_bytes(32)
+
+    manager = CoordinatorManager(ctx=ctx)
+    manager.start()
+    coordinator = manager.RuntimeCoordinator(**config.coordinator_kwargs())
+
+    router = CombinedStreamRouter(base_url=config.stream_base_url, channels=config.channels)
+    cores = _assign_cores(specs)
+    caps = config.symbol_caps()
+    workers = []
+    for spec in specs:
+        feed = ctx.Queue(maxsize=config.queue_size)
+        router.add_route(spec.symbol, feed)
+        proc = ctx.Process(
+            target=_worker_main,
+            args=(spec, feed, coordinator, hours, config.paper_mode, cores[spec.dydx_market], caps.get(spec.dydx_market)),
+            name=f"whale-{spec.dydx_market}",
+            daemon=False,
+        )
+        workers.append((spec, proc))
+
+    pin_to_core(0)
+    print(f"\n{'='*60}")
+    print(f"🐋 多幣種模式: {', '.join(s.dydx_market for s in specs)}")
+    print(f"   💰 共用資金 ${config.total_capital_usdt:.0f} | 同時持倉 ≤ {config.max_concurrent_positions} | 當日虧損上限 ${config.daily_loss_limit_usdt:.0f}")
+    print(f"   📡 Combined stream: {len(router.streams)} streams / {len(router.stream_urls())} 條連線")
+    print(f"{'='*60}\n")
+
+    router.start()
+    for _, proc in workers:
+        proc.start()
+
+    try:
+        while any(proc.is_alive() for _, proc in workers):
+            time.sleep(30)
+            snap = coordinator.snapshot()
+            print(
+                f"📊 [協調器] 占用 ${snap['committed_usdt']:.2f}/{snap['total_capital_usdt']:.0f} | "
+                f"當日 PnL {json.dumps({k: round(v, 2) for k, v in snap['daily_pnl'].items()})} | "
+                f"分流 {json.dumps(router.stats())}"
+            )
+    except KeyboardInterrupt:
+        print("\n⏹️ 收到中斷，停止所有 worker...")
+        for _, proc in workers:
+            if proc.is_alive():
+                proc.terminate()
+    finally:
+        router.stop()
+        for _, proc in workers:
+            proc.join(timeout=10)
+        try:
+            print(f"📋 最終狀態: {json.dumps(coordinator.snapshot(), ensure_ascii=False)}")
+        except Exception:
+            pass
+        manager.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whale 多幣種執行 (combined stream + 綁核 worker + 中央協調器)")
+    parser.add_argument("--config", type=str, default=None, help="多幣種設定檔 (預設 config/multi_symbol_config.json)")
+    parser.add_argument("--symbols", nargs="+", default=None, help="只跑這些幣種 (如 ETH/USDT SOL/USDT)")
+    parser.add_argument("--hours", type=float, default=1.0, help="運行時間（小時）")
+    parser.add_argument("--live", action="store_true", help="Testnet 真實下單 (預設依設定檔 paper_mode)")
+    args = parser.parse_args()
+
+    config = load_multi_symbol_config(Path(args.config) if args.config else None)
+    if args.symbols:
+        wanted = {SymbolSpec(symbol=s).dydx_market: s for s in args.symbols}
+        for spec in config.symbols:
+            spec.enabled = spec.dydx_market in wanted
+        known = {spec.dydx_market for spec in config.symbols}
+        config.symbols.extend(SymbolSpec(symbol=s) for market, s in wanted.items() if market not in known)
+    if args.live:
+        config.paper_mode = False
+
+    run(config, hours=args.hours)
+
+
+if __name__ == "__main__":
+    main()
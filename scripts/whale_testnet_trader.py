@@ -34,13 +34,12 @@ Version: v12.9 - dYdX 數據源 (取代 Binance)
 import os
 import sys
 import json
-import time
 import asyncio
 import websockets
 import threading
 import subprocess
 import signal
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional, Dict, List, Any, Tuple
 from dataclasses import dataclass, asdict, field
@@ -48,6 +47,8 @@ from collections import deque
 from enum import Enum
 import logging
 import re
+import functools
+import numpy as np
 
 # 🆕 抑制第三方庫的 HTTP 請求日誌 (避免刷屏)
 logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -63,6 +64,31 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 sys.path.insert(0, str(project_root / "src" / "strategy"))
 
+# 時鐘服務: 實盤用系統時間，重放/回測注入 SimulatedClock
+from src.core.clock import WALL_CLOCK, Clock, get_clock
+from src.core.config_service import ConfigEntry, get_config_service, thaw_config, write_json_atomic
+
+# 儀表板渲染器: 交易循環只發布快照，渲染按自己的幀率/幀預算進行
+from src.utils.dashboard_renderer import DashboardRenderer, DashboardSnapshot, PanelCache, freeze
+
+# 訂單簿累積深度: 每次簿變動建一次，任意下單量的 VWAP/滑點只需一次 searchsorted
+from src.exchange.book_impact import BookImpact
+from src.exchange.cross_venue_spread import CrossVenueSpreadEngine, CrossVenueState, dynamic_bands, oracle_gap_status
+from src.core.market_records import BigTradeStats, FeedSnapshot, TradeTape, TradeTick
+from src.exchange.stream_mux import (
+    FUTURES_STREAM_WS,
+    AggTrade,
+    BinanceStreamMux,
+    DepthUpdate,
+    SequenceTracker,
+    StreamGap,
+    decode_message,
+    get_stream_mux,
+)
+
+# 多幣種: 幣種代號轉換 (worker 由 scripts/whale_multi_symbol.py 啟動並注入協調器)
+from src.trading.multi_symbol import binance_symbol_for, dydx_market_for
+
 # 🆕 dYdX Integration
 try:
     from dydx.dydx_trader import DydxTrader
@@ -325,13 +351,25 @@ def _fee_leverage_multiplier(config: Any, leverage: float) -> float:
         pass
     return leverage
 
+STRATEGY_CONFIG_PATH = Path("config/whale_trading_strategy.json")
+CTX_STRATEGY_CONFIG_PATH = Path("config/whale_ctx_strategy.json")
+
+# 第一次載入時向配置服務註冊並保留 ConfigEntry；之後的呼叫只讀 entry.data (不解析路徑、不 stat)
+_strategy_entry: Optional[ConfigEntry] = None
+_ctx_strategy_entry: Optional[ConfigEntry] = None
+
+
 def load_trading_strategy() -> Dict:
-    """載入動態交易策略配置"""
-    strategy_file = Path("config/whale_trading_strategy.json")
-    if strategy_file.exists():
-        with open(strategy_file) as f:
-            return json.load(f)
-    return {}
+    """
+    載入動態交易策略配置
+
+    由配置服務監看並發布唯讀快照；每次進出場檢查呼叫只是讀屬性，不再 json.load。
+    """
+    global _strategy_entry
+    entry = _strategy_entry
+    if entry is None:
+        entry = _strategy_entry = get_config_service().watch(STRATEGY_CONFIG_PATH)
+    return entry.data
 
 
 # ============================================================
@@ -368,45 +406,37 @@ def play_sound(sound_type: str):
 
 def save_trading_strategy(strategy: Dict):
     """保存交易策略配置 (供 AI 優化)"""
-    strategy_file = Path("config/whale_trading_strategy.json")
-    strategy['meta']['last_updated'] = datetime.now().isoformat()
-    with open(strategy_file, 'w') as f:
-        json.dump(strategy, f, indent=2, ensure_ascii=False)
+    strategy = thaw_config(strategy)
+    strategy.setdefault('meta', {})['last_updated'] = get_clock().now().isoformat()
+    # 原子替換: 監看中的讀取端不會讀到寫一半的檔案
+    write_json_atomic(STRATEGY_CONFIG_PATH, strategy)
+    get_config_service().reload(STRATEGY_CONFIG_PATH)
 
 
 # 🆕 v10.3 動態策略配置載入
-_ctx_strategy_config: Dict = {}
-_ctx_strategy_config_mtime: float = 0
+def _announce_ctx_strategy_config(snapshot) -> None:
+    version = snapshot.data.get('_version', 'unknown')
+    print(f"📋 已載入策略配置 {CTX_STRATEGY_CONFIG_PATH.name} (版本: {version})")
+
 
 def load_ctx_strategy_config(force_reload: bool = False) -> Dict:
     """
     載入專屬獲利模式策略配置 (支援熱更新)
     配置檔: config/whale_ctx_strategy.json
+
+    配置服務在檔案變更時才重新解析，這裡只讀最新快照 (檔案不存在時為空)。
     """
-    global _ctx_strategy_config, _ctx_strategy_config_mtime
-    
-    config_path = Path("config/whale_ctx_strategy.json")
-    
-    if not config_path.exists():
-        return {}
-    
-    # 檢查是否需要重新載入 (檔案修改時間變化)
-    try:
-        current_mtime = config_path.stat().st_mtime
-        if not force_reload and current_mtime == _ctx_strategy_config_mtime and _ctx_strategy_config:
-            return _ctx_strategy_config
-        
-        with open(config_path, 'r', encoding='utf-8') as f:
-            _ctx_strategy_config = json.load(f)
-        _ctx_strategy_config_mtime = current_mtime
-        
-        version = _ctx_strategy_config.get('_version', 'unknown')
-        print(f"📋 已載入策略配置 {config_path.name} (版本: {version})")
-        
-        return _ctx_strategy_config
-    except Exception as e:
-        print(f"⚠️ 載入策略配置失敗: {e}")
-        return {}
+    global _ctx_strategy_entry
+    entry = _ctx_strategy_entry
+    if entry is None:
+        entry = get_config_service().watch(CTX_STRATEGY_CONFIG_PATH)
+        entry.subscribe(_announce_ctx_strategy_config)
+        if entry.snapshot.exists:
+            _announce_ctx_strategy_config(entry.snapshot)
+        _ctx_strategy_entry = entry
+    elif force_reload:
+        get_config_service().reload(CTX_STRATEGY_CONFIG_PATH)
+    return entry.data
 
 
 # ============================================================
@@ -433,6 +463,7 @@ class TradingConfig:
 
     # === 基本設定 ===
     symbol: str = None
+    symbol_dydx: str = None  # dYdX 市場 (None = 由 symbol 推導，如 ETH/USDT → ETH-USD)
     leverage: int = None
     leverage_min: int = None
     leverage_max: int = None
@@ -525,8 +556,18 @@ class TradingConfig:
     tp_update_policy: str = None  # "extend" / "tighten"
 
     
+    @property
+    def binance_symbol(self) -> str:
+        """Binance 永續合約代號 (如 ETHUSDT)"""
+        return binance_symbol_for(self.symbol)
+    
     def __post_init__(self):
         """初始化後處理 - 轉換 profit_lock_stages 格式"""
+        # 幣種: 未指定時維持 BTC，dYdX 市場由 symbol 推導
+        if not self.symbol:
+            self.symbol = "BTC/USDT"
+        if not self.symbol_dydx:
+            self.symbol_dydx = dydx_market_for(self.symbol)
         if self.profit_lock_stages is not None:
             # 確保是 tuple 格式
             self.profit_lock_stages = [
@@ -632,6 +673,9 @@ class TradingConfig:
     # === 分析頻率 ===
     ws_interval_sec: float = None
     analysis_interval_sec: float = None
+    dashboard_fps: float = None              # 儀表板幀率 (預設 1)
+    dashboard_frame_budget_ms: float = None  # 單幀預算，超過自動降幀 (預設 50)
+    headless: bool = None                    # 無頭模式: 不輸出儀表板
     min_trade_interval_sec: float = None
     
     # === MTF 策略配置 ===
@@ -823,8 +867,11 @@ class TwoPhaseExitManager:
     
     CONFIG_FILE = Path("config/two_phase_exit_config.json")
     TRADES_DIR = Path("logs/whale_paper_trader")
+    TRADE_DB_NAME = "trades.db"
+    HISTORY_TRADE_LIMIT = 500  # 啟動分析取最近 N 筆平倉
     
-    def __init__(self, config: 'TradingConfig', logger=None):
+    def __init__(self, config: 'TradingConfig', logger=None, clock: Optional[Clock] = None):
+        self.clock: Clock = clock or get_clock()
         self.config = config
         self.logger = logger or logging.getLogger(__name__)
         
@@ -935,7 +982,9 @@ class TwoPhaseExitManager:
         """
         🆕 啟動時分析歷史交易記錄
         
-        掃描最近 10 個 trades_*.json 檔案，計算：
+        交易存放庫可用時: 最近 15 個 trades_*.json 只在新增/變動時匯入一次，
+        統計改為對最近 HISTORY_TRADE_LIMIT 筆平倉的索引查詢；否則逐檔解析 JSON。
+        計算：
         - 平均獲利 %
         - 平均虧損 %
         - 最大獲利 %
@@ -952,10 +1001,66 @@ class TwoPhaseExitManager:
             reverse=True  # 最新的在前
         )[:15]  # 只取最近 15 個檔案
         
-        if not trade_files:
-            self.logger.info("📁 沒有找到交易記錄檔案")
-            return
+        if _HAS_TRADE_STORE:
+            try:
+                store = get_trade_store(self.TRADES_DIR / self.TRADE_DB_NAME, clock=self.clock)
+                store.import_json_files(trade_files)
+                summary = store.roe_summary(limit=self.HISTORY_TRADE_LIMIT)
+            except Exception as e:
+                self.logger.warning(f"交易存放庫查詢失敗: {e}")
+                return
+            win_count = int(summary['win_count'])
+            loss_count = int(summary['loss_count'])
+            avg_win = summary['avg_win_pct']
+            avg_loss = summary['avg_loss_pct']
+            max_win = summary['max_win_pct']
+            min_win = summary['min_win_pct']
+            analyzed_files = [f.name for f in trade_files]
+        else:
+            if not trade_files:
+                self.logger.info("📁 沒有找到交易記錄檔案")
+                return
+            all_wins, all_losses, analyzed_files = self._scan_trade_files(trade_files)
+            win_count = len(all_wins)
+            loss_count = len(all_losses)
+            avg_win = sum(all_wins) / len(all_wins) if all_wins else 0
+            avg_loss = sum(all_losses) / len(all_losses) if all_losses else 0
+            max_win = max(all_wins) if all_wins else 0
+            min_win = min(all_wins) if all_wins else 0
         
+        # 計算統計
+        if win_count or loss_count:
+            total = win_count + loss_count
+            win_rate = win_count / total if total > 0 else 0
+            
+            self.logger.info(f"📊 歷史交易分析完成:")
+            self.logger.info(f"   分析檔案: {len(analyzed_files)} 個")
+            self.logger.info(f"   總交易: {total} 筆 | 勝: {win_count} 負: {loss_count}")
+            self.logger.info(f"   勝率: {win_rate:.1%}")
+            self.logger.info(f"   平均獲利: +{avg_win:.2f}% | 平均虧損: -{avg_loss:.2f}%")
+            self.logger.info(f"   最大獲利: +{max_win:.2f}% | 最小獲利: +{min_win:.2f}%")
+            
+            # 更新 JSON 配置
+            if total >= 5:  # 至少 5 筆交易才更新
+                self._update_config_stats({
+                    'avg_win_pct': round(avg_win, 2),
+                    'avg_loss_pct': round(avg_loss, 2),
+                    'max_win_pct': round(max_win, 2),
+                    'min_win_pct': round(min_win, 2),
+                    'win_count': win_count,
+                    'loss_count': loss_count,
+                    'win_rate': round(win_rate, 3),
+                    'total_trades_analyzed': total,
+                    'last_analyzed': self.clock.now().isoformat(),
+                    'analyzed_files': analyzed_files[:5]  # 只記錄最近 5 個
+                })
+                
+                # 更新實例變數
+                self.json_config['historical_stats']['avg_win_pct'] = round(avg_win, 2)
+                self.json_config['historical_stats']['avg_loss_pct'] = round(avg_loss, 2)
+    
+    def _scan_trade_files(self, trade_files: List[Path]) -> Tuple[List[float], List[float], List[str]]:
+        """逐檔解析 trades_*.json (交易存放庫不可用時的後備路徑)"""
         all_wins = []
         all_losses = []
         analyzed_files = []
@@ -997,42 +1102,7 @@ class TwoPhaseExitManager:
             except Exception as e:
                 self.logger.warning(f"分析 {trade_file.name} 失敗: {e}")
         
-        # 計算統計
-        if all_wins or all_losses:
-            avg_win = sum(all_wins) / len(all_wins) if all_wins else 0
-            avg_loss = sum(all_losses) / len(all_losses) if all_losses else 0
-            max_win = max(all_wins) if all_wins else 0
-            min_win = min(all_wins) if all_wins else 0
-            win_count = len(all_wins)
-            loss_count = len(all_losses)
-            total = win_count + loss_count
-            win_rate = win_count / total if total > 0 else 0
-            
-            self.logger.info(f"📊 歷史交易分析完成:")
-            self.logger.info(f"   分析檔案: {len(analyzed_files)} 個")
-            self.logger.info(f"   總交易: {total} 筆 | 勝: {win_count} 負: {loss_count}")
-            self.logger.info(f"   勝率: {win_rate:.1%}")
-            self.logger.info(f"   平均獲利: +{avg_win:.2f}% | 平均虧損: -{avg_loss:.2f}%")
-            self.logger.info(f"   最大獲利: +{max_win:.2f}% | 最小獲利: +{min_win:.2f}%")
-            
-            # 更新 JSON 配置
-            if total >= 5:  # 至少 5 筆交易才更新
-                self._update_config_stats({
-                    'avg_win_pct': round(avg_win, 2),
-                    'avg_loss_pct': round(avg_loss, 2),
-                    'max_win_pct': round(max_win, 2),
-                    'min_win_pct': round(min_win, 2),
-                    'win_count': win_count,
-                    'loss_count': loss_count,
-                    'win_rate': round(win_rate, 3),
-                    'total_trades_analyzed': total,
-                    'last_analyzed': datetime.now().isoformat(),
-                    'analyzed_files': analyzed_files[:5]  # 只記錄最近 5 個
-                })
-                
-                # 更新實例變數
-                self.json_config['historical_stats']['avg_win_pct'] = round(avg_win, 2)
-                self.json_config['historical_stats']['avg_loss_pct'] = round(avg_loss, 2)
+        return all_wins, all_losses, analyzed_files
     
     def _update_config_stats(self, stats: Dict):
         """更新 JSON 配置檔的統計數據"""
@@ -1044,7 +1114,7 @@ class TwoPhaseExitManager:
                 config = self._get_default_config()
             
             config['historical_stats'] = stats
-            config['_last_updated'] = datetime.now().isoformat()
+            config['_last_updated'] = self.clock.now().isoformat()
             config['_auto_updated'] = True
             
             with open(self.CONFIG_FILE, 'w', encoding='utf-8') as f:
@@ -1067,7 +1137,7 @@ class TwoPhaseExitManager:
                 'avg_win_pct': self.historical_avg_win,
                 'avg_loss_pct': self.historical_avg_loss,
                 'trade_stats': self.trade_stats,
-                'last_updated': datetime.now().isoformat()
+                'last_updated': self.clock.now().isoformat()
             }
             with open(stats_file, 'w') as f:
                 json.dump(data, f, indent=2)
@@ -1125,7 +1195,7 @@ class TwoPhaseExitManager:
             'volatility': volatility,
             'obi': obi,
             'trend_strength': abs(price_change_5m),
-            'last_update': time.time()
+            'last_update': self.clock.time()
         }
     
     def get_dynamic_params(self, net_pnl_pct: float = 0) -> Dict:
@@ -1517,6 +1587,9 @@ class TradeRecord:
     max_profit_pct: float = 0.0    # 持倉期間最大浮盈
     max_drawdown_pct: float = 0.0  # 持倉期間最大回撤
     
+    # 進場時市場狀態 (交易存放庫按 regime 分組統計)
+    market_regime: str = ""
+    
     def to_dict(self) -> Dict:
         d = asdict(self)
         return d
@@ -1526,22 +1599,26 @@ class TradeRecord:
 # Binance Testnet API
 # ============================================================
 
-import requests
-import hmac
-import hashlib
-from urllib.parse import urlencode
+from src.exchange.binance_rest_client import (
+    FUTURES_TESTNET_URL,
+    BinanceTimeoutError,
+    get_rest_client,
+)
 
 class BinanceTestnetAPI:
     """
     Binance Futures Testnet API 客戶端
     直接使用 REST API (因為 ccxt sandbox mode 已停用)
+    走共用 keep-alive 連線池: 下單不再每次重做 TLS 握手，同時在途的 ticker/持倉/訂單簿查詢會合併
     """
     
-    def __init__(self):
-        self.base_url = "https://testnet.binancefuture.com"
+    def __init__(self, clock: Optional[Clock] = None):
+        self.clock: Clock = clock or get_clock()
+        self.base_url = FUTURES_TESTNET_URL
         self.api_key = ""
         self.api_secret = ""
         self._load_api_keys()
+        self.rest = get_rest_client(self.base_url, self.api_key, self.api_secret)
     
     def _load_api_keys(self):
         """從 .env 載入 API Keys"""
@@ -1561,23 +1638,15 @@ class BinanceTestnetAPI:
             print(f"⚠️ 未找到 Testnet API Key")
     
     def _sign(self, params: Dict) -> str:
-        """生成簽名"""
-        query_string = urlencode(params)
-        signature = hmac.new(
-            self.api_secret.encode(),
-            query_string.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        return query_string + '&signature=' + signature
+        """生成簽名 (timestamp 以伺服器時間為準)"""
+        return self.rest.signed_query(params)
     
     def _headers(self) -> Dict:
         return {'X-MBX-APIKEY': self.api_key}
     
     def get_account(self) -> Dict:
         """獲取帳戶資訊"""
-        params = {'timestamp': int(time.time() * 1000)}
-        url = f"{self.base_url}/fapi/v2/account?{self._sign(params)}"
-        response = requests.get(url, headers=self._headers())
+        response = self.rest.request('GET', '/fapi/v2/account', signed=True)
         return response.json() if response.status_code == 200 else {}
     
     def get_balance(self) -> Dict:
@@ -1645,9 +1714,7 @@ class BinanceTestnetAPI:
     
     def get_position(self, symbol: str = "BTCUSDT") -> Optional[Dict]:
         """獲取持倉"""
-        params = {'symbol': symbol, 'timestamp': int(time.time() * 1000)}
-        url = f"{self.base_url}/fapi/v2/positionRisk?{self._sign(params)}"
-        response = requests.get(url, headers=self._headers())
+        response = self.rest.request('GET', '/fapi/v2/positionRisk', {'symbol': symbol}, signed=True)
         if response.status_code == 200:
             for pos in response.json():
                 if float(pos.get('positionAmt', 0)) != 0:
@@ -1658,21 +1725,17 @@ class BinanceTestnetAPI:
         """設置槓桿"""
         params = {
             'symbol': symbol,
-            'leverage': leverage,
-            'timestamp': int(time.time() * 1000)
+            'leverage': leverage
         }
-        url = f"{self.base_url}/fapi/v1/leverage?{self._sign(params)}"
-        response = requests.post(url, headers=self._headers())
+        response = self.rest.request('POST', '/fapi/v1/leverage', params, signed=True)
         return response.status_code == 200
     
     def set_position_mode(self, dual: bool = False) -> bool:
         """設置持倉模式 (One-way / Hedge)"""
         params = {
-            'dualSidePosition': 'true' if dual else 'false',
-            'timestamp': int(time.time() * 1000)
+            'dualSidePosition': 'true' if dual else 'false'
         }
-        url = f"{self.base_url}/fapi/v1/positionSide/dual?{self._sign(params)}"
-        response = requests.post(url, headers=self._headers())
+        response = self.rest.request('POST', '/fapi/v1/positionSide/dual', params, signed=True)
         return response.status_code == 200 or 'No need to change' in response.text
     
     def market_order(self, symbol: str, side: str, quantity: float, 
@@ -1709,14 +1772,12 @@ class BinanceTestnetAPI:
                     'symbol': symbol,
                     'side': side.upper(),
                     'type': 'MARKET',
-                    'quantity': quantity,
-                    'timestamp': int(time.time() * 1000)
+                    'quantity': quantity
                 }
-                url = f"{self.base_url}/fapi/v1/order?{self._sign(params)}"
                 
-                response = requests.post(
-                    url, 
-                    headers=self._headers(),
+                response = self.rest.request(
+                    'POST', '/fapi/v1/order', params,
+                    signed=True,
                     timeout=timeout
                 )
                 
@@ -1739,7 +1800,7 @@ class BinanceTestnetAPI:
                     result['error'] = error_msg
                     print(f"⚠️ 下單失敗 (嘗試 {attempt+1}/{retries}): {error_msg}")
                     
-            except requests.Timeout:
+            except BinanceTimeoutError:
                 result['error'] = f"訂單超時 ({timeout}秒)"
                 print(f"⏱️ 訂單超時 (嘗試 {attempt+1}/{retries})")
                 
@@ -1747,9 +1808,9 @@ class BinanceTestnetAPI:
                 result['error'] = str(e)
                 print(f"❌ 下單異常 (嘗試 {attempt+1}/{retries}): {e}")
             
-            # 重試前等待
+            # 重試前等待 (網路退避，用系統時間)
             if attempt < retries - 1:
-                time.sleep(1)
+                WALL_CLOCK.sleep(1)
         
         return result
     
@@ -1774,35 +1835,35 @@ class BinanceTestnetAPI:
 
     def get_price(self, symbol: str = "BTCUSDT") -> float:
         """獲取當前價格"""
-        response = requests.get(f"{self.base_url}/fapi/v1/ticker/price?symbol={symbol}")
+        response = self.rest.request('GET', '/fapi/v1/ticker/price', {'symbol': symbol})
         if response.status_code == 200:
             return float(response.json()['price'])
         return 0.0
     
     def get_mark_price(self, symbol: str = "BTCUSDT") -> float:
         """獲取標記價格 (用於盈虧計算)"""
-        response = requests.get(f"{self.base_url}/fapi/v1/premiumIndex?symbol={symbol}")
+        response = self.rest.request('GET', '/fapi/v1/premiumIndex', {'symbol': symbol})
         if response.status_code == 200:
             return float(response.json().get('markPrice', 0))
         return 0.0
     
     def get_ticker(self, symbol: str = "BTCUSDT") -> Dict:
         """獲取 24hr ticker 數據"""
-        response = requests.get(f"{self.base_url}/fapi/v1/ticker/24hr?symbol={symbol}")
+        response = self.rest.request('GET', '/fapi/v1/ticker/24hr', {'symbol': symbol})
         if response.status_code == 200:
             return response.json()
         return {}
     
     def get_orderbook(self, symbol: str = "BTCUSDT", limit: int = 5) -> Dict:
         """獲取訂單簿"""
-        response = requests.get(f"{self.base_url}/fapi/v1/depth?symbol={symbol}&limit={limit}")
+        response = self.rest.request('GET', '/fapi/v1/depth', {'symbol': symbol, 'limit': limit})
         if response.status_code == 200:
             return response.json()
         return {'bids': [], 'asks': []}
     
     def get_recent_trades(self, symbol: str = "BTCUSDT", limit: int = 100) -> List:
         """獲取最近成交"""
-        response = requests.get(f"{self.base_url}/fapi/v1/trades?symbol={symbol}&limit={limit}")
+        response = self.rest.request('GET', '/fapi/v1/trades', {'symbol': symbol, 'limit': limit})
         if response.status_code == 200:
             return response.json()
         return []
@@ -1879,10 +1940,14 @@ class MarketSnapshot:
     vol_1s: float = 0.0            # 1 秒波動率 (EMA)
     lat_ms: float = 0.0            # 兩邊報價延遲 (ms)
     vol_per_sec: float = 0.0       # 每秒波動估計
+    spread_pct: float = 0.0        # 時間對齊的 (dYdX-幣安)/幣安 價差 %
+    spread_z: float = 0.0          # 價差 z-score
+    lead_lag_ms: float = 0.0       # 幣安領先 dYdX 的毫秒數 (負值 = dYdX 領先)
     
     # 訂單簿深度
     dydx_bids: List[List[float]] = field(default_factory=list)  # [[price, qty], ...]
     dydx_asks: List[List[float]] = field(default_factory=list)
+    dydx_book: Optional[BookImpact] = None  # 同一份簿的累積深度 (由 DydxWebSocket 維護)
 
 
 @dataclass
@@ -1927,7 +1992,8 @@ class AdvancedRiskController:
     CAN_TRADE ←→ SUSPECT ←→ HALT → ESCAPE
     """
     
-    def __init__(self, config: 'TradingConfig' = None):
+    def __init__(self, config: 'TradingConfig' = None, clock: Optional[Clock] = None):
+        self.clock: Clock = clock or get_clock()
         # 配置
         self.band_config = DynamicBandConfig()
         
@@ -1962,10 +2028,13 @@ class AdvancedRiskController:
         self._binance_ws: Optional['BinanceWebSocket'] = None
         self._dydx_ws: Optional['DydxWebSocket'] = None
         
+        # 跨交易所價差引擎 (兩邊 WebSocket 以交易所時間戳推送報價)
+        self.cross_venue = CrossVenueSpreadEngine(band_config=self.band_config)
+        
         # 狀態
         self.current_state: TradingState = TradingState.CAN_TRADE
         self.exit_phase: ExitPhase = ExitPhase.NORMAL
-        self.state_since: float = time.time()
+        self.state_since: float = self.clock.time()
         self.halt_since: float = 0.0  # 進入 HALT 的時間
         self._band_out_since: Optional[float] = None  # 🔧 v14.6.42: Band 外開始時間
         
@@ -2005,6 +2074,8 @@ class AdvancedRiskController:
         """設定數據源"""
         self._binance_ws = binance_ws
         self._dydx_ws = dydx_ws
+        binance_ws.cross_venue = self.cross_venue
+        dydx_ws.cross_venue = self.cross_venue
         logging.info("✅ 風控系統數據源已連接")
     
     # ═══════════════════════════════════════════════════════════════════
@@ -2015,11 +2086,61 @@ class AdvancedRiskController:
         """
         獲取市場即時快照
         
-        收集幣安和 dYdX 的即時數據用於風控計算
+        兩邊 WebSocket 已推送報價到 cross_venue 時，價格 / 時間戳 / 延遲 / 波動都取自
+        引擎同一時刻的狀態 (兩邊皆以本機收到時間對齊)；否則 (尚未就緒，或某一邊靜默導致水位停滯)
+        退回直接讀 WebSocket 物件的舊做法。
         """
         snapshot = MarketSnapshot()
-        now = time.time()
+        now = self.clock.time()
+        
+        state = self.cross_venue.state()
+        if state.ready and not state.stalled:
+            self._fill_aligned_snapshot(snapshot, state)
+        else:
+            self._sample_ws_snapshot(snapshot, now)
         
+        # 記錄歷史
+        self.snapshot_history.append({
+            'time': now,
+            'snapshot': snapshot
+        })
+        
+        return snapshot
+    
+    def _fill_aligned_snapshot(self, snapshot: MarketSnapshot, cv: CrossVenueState) -> None:
+        """由跨交易所引擎的狀態填入快照 (cross_venue.state() 持鎖取出，欄位彼此一致)"""
+        snapshot.binance_bid = cv.binance_bid
+        snapshot.binance_ask = cv.binance_ask
+        snapshot.binance_mid = cv.binance_mid
+        snapshot.binance_timestamp = cv.binance_ts_ms / 1000
+        
+        snapshot.dydx_bid = cv.dydx_bid
+        snapshot.dydx_ask = cv.dydx_ask
+        snapshot.dydx_mid = cv.dydx_mid
+        snapshot.dydx_timestamp = cv.dydx_ts_ms / 1000
+        snapshot.dydx_spread = cv.dydx_spread_pct
+        
+        snapshot.lat_ms = cv.lat_ms
+        snapshot.vol_1s = cv.vol_1s
+        snapshot.vol_per_sec = cv.vol_1s
+        snapshot.spread_pct = cv.spread_pct
+        snapshot.spread_z = cv.spread_z
+        snapshot.lead_lag_ms = cv.lead_lag_ms
+        
+        snapshot.dydx_oracle = cv.oracle_price or snapshot.dydx_mid
+        if self._dydx_ws:
+            snapshot.dydx_oracle = cv.oracle_price or getattr(self._dydx_ws, 'oracle_price', 0) or snapshot.dydx_mid
+            self._sample_dydx_book(snapshot)
+    
+    def _sample_dydx_book(self, snapshot: MarketSnapshot) -> None:
+        """dYdX 前 10 檔與其累積深度 (同一份簿、快照獨佔，之後的訂單簿更新不會改到)"""
+        bids, asks, book = self._dydx_ws.book_snapshot()
+        snapshot.dydx_bids = bids[:10]
+        snapshot.dydx_asks = asks[:10]
+        snapshot.dydx_book = book
+
+    def _sample_ws_snapshot(self, snapshot: MarketSnapshot, now: float) -> None:
+        """[備援] 引擎尚未就緒時，直接讀兩個 WebSocket 物件當下的值"""
         # 幣安數據
         if self._binance_ws:
             snapshot.binance_mid = self._binance_ws.current_price or 0
@@ -2064,8 +2185,7 @@ class AdvancedRiskController:
                     snapshot.dydx_timestamp = dydx_ts
             else:
                 snapshot.dydx_timestamp = now if snapshot.dydx_mid > 0 else 0
-            snapshot.dydx_bids = getattr(self._dydx_ws, 'bids', [])[:10] if getattr(self._dydx_ws, 'bids', None) else []
-            snapshot.dydx_asks = getattr(self._dydx_ws, 'asks', [])[:10] if getattr(self._dydx_ws, 'asks', None) else []
+            self._sample_dydx_book(snapshot)
             
             # dYdX 點差
             if snapshot.dydx_mid > 0 and snapshot.dydx_bid > 0 and snapshot.dydx_ask > 0:
@@ -2094,14 +2214,6 @@ class AdvancedRiskController:
         if snapshot.binance_mid > 0:
             self._last_price = snapshot.binance_mid
             self._last_price_time = now
-        
-        # 記錄歷史
-        self.snapshot_history.append({
-            'time': now,
-            'snapshot': snapshot
-        })
-        
-        return snapshot
     
     # ═══════════════════════════════════════════════════════════════════
     # 2. 動態 Band 計算
@@ -2121,20 +2233,9 @@ class AdvancedRiskController:
         Returns:
             (band_entry, band_halt) 百分比
         """
-        cfg = self.band_config
-        
-        # 各因素貢獻
-        vol_factor = cfg.k_vol * snapshot.vol_1s
-        spread_factor = cfg.k_spread * snapshot.dydx_spread
-        lat_factor = cfg.k_lat * (snapshot.lat_ms / 1000) * snapshot.vol_per_sec
-        
-        # Entry Band: 取最大值，然後 clamp
-        raw_entry = max(cfg.base_entry, vol_factor, spread_factor, lat_factor)
-        band_entry = max(cfg.min_entry, min(cfg.max_entry, raw_entry))
-        
-        # Halt Band: Entry 的倍數，然後 clamp
-        raw_halt = band_entry * cfg.halt_mult
-        band_halt = max(cfg.min_halt, min(cfg.max_halt, raw_halt))
+        band_entry, band_halt = dynamic_bands(
+            self.band_config, snapshot.vol_1s, snapshot.dydx_spread, snapshot.lat_ms, snapshot.vol_per_sec
+        )
         
         # 保存計算結果
         self.band_entry = band_entry
@@ -2170,32 +2271,38 @@ class AdvancedRiskController:
         if not book or best_price <= 0:
             return snapshot.dydx_mid, 0.0
         
-        # 累積計算 VWAP
-        remaining_qty = qty_btc
-        total_value = 0.0
-        total_qty = 0.0
-        
-        for level in book:
-            if len(level) >= 2:
-                price = float(level[0])
-                size = float(level[1])
-                
-                fill_qty = min(remaining_qty, size)
-                total_value += price * fill_qty
-                total_qty += fill_qty
-                remaining_qty -= fill_qty
-                
-                if remaining_qty <= 0:
-                    break
-        
-        if total_qty <= 0:
+        if qty_btc <= 0:
             return best_price, 0.0
         
-        vwap = total_value / total_qty
+        vwap, _ = self._book_impact(snapshot).fill_price(side, qty_btc)
+        
         slippage_pct = abs(vwap - best_price) / best_price * 100
         
         return vwap, slippage_pct
     
+    def estimate_fill_prices(self, snapshot: MarketSnapshot, side: str, qtys: List[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        一次估計多個下單量的預期成交價 (VWAP) 與滑點
+        
+        Returns:
+            (expected_fill_prices, slippage_pcts) 陣列
+        """
+        qtys = np.asarray(qtys, dtype=float)
+        book = self._book_impact(snapshot)
+        vwaps, _ = book.fill_prices(side, qtys)
+        best_price = snapshot.dydx_ask if side == "BUY" else snapshot.dydx_bid
+        if best_price <= 0 or not len(book.ladder(side)):
+            return np.full(len(qtys), snapshot.dydx_mid), np.zeros(len(qtys))
+        vwaps = np.where(qtys > 0, vwaps, best_price)
+        return vwaps, np.abs(vwaps - best_price) / best_price * 100
+    
+    @staticmethod
+    def _book_impact(snapshot: MarketSnapshot) -> BookImpact:
+        """快照帶的累積深度；沒有時 (例如手動組的快照) 由 dydx_bids/asks 臨時建一份"""
+        if snapshot.dydx_book is not None:
+            return snapshot.dydx_book
+        return BookImpact(snapshot.dydx_bids, snapshot.dydx_asks, max_levels=10)
+    
     def calculate_effective_diff(self, snapshot: MarketSnapshot, side: str, qty_btc: float) -> float:
         """
         計算有效價差 (含滑點)
@@ -2229,18 +2336,7 @@ class AdvancedRiskController:
         Returns:
             (gap_pct, status: 'OK' | 'WARN' | 'HALT')
         """
-        if snapshot.dydx_oracle <= 0 or snapshot.dydx_mid <= 0:
-            return 0.0, 'OK'
-        
-        gap = abs(snapshot.dydx_mid - snapshot.dydx_oracle) / snapshot.dydx_oracle * 100
-        
-        cfg = self.band_config
-        if gap >= cfg.oracle_halt:
-            return gap, 'HALT'
-        elif gap >= cfg.oracle_warn:
-            return gap, 'WARN'
-        else:
-            return gap, 'OK'
+        return oracle_gap_status(snapshot.dydx_mid, snapshot.dydx_oracle, self.band_config)
     
     # ═══════════════════════════════════════════════════════════════════
     # 5. 交易狀態機
@@ -2260,7 +2356,7 @@ class AdvancedRiskController:
         Returns:
             新的交易狀態
         """
-        now = time.time()
+        now = self.clock.time()
         self.stats['total_checks'] += 1
         
         # 檢查冷卻期
@@ -2359,7 +2455,7 @@ class AdvancedRiskController:
         if not has_position:
             return ExitPhase.NORMAL, {}
         
-        now = time.time()
+        now = self.clock.time()
         band_entry, band_halt = self.calculate_dynamic_bands(snapshot)
         effective_diff = self.calculate_effective_diff(snapshot, "SELL", 0.002)  # 簡化
         
@@ -2425,7 +2521,7 @@ class AdvancedRiskController:
         Returns:
             (允許開倉, 原因, 詳細資訊)
         """
-        now = time.time()
+        now = self.clock.time()
         
         # 檢查冷卻期
         if now < self.cooldown_until:
@@ -2477,7 +2573,7 @@ class AdvancedRiskController:
         """啟動冷卻期"""
         if duration is None:
             duration = self.cooldown_duration
-        self.cooldown_until = time.time() + duration
+        self.cooldown_until = self.clock.time() + duration
         logging.info(f"🧊 啟動冷卻期 {duration}s")
     
     def get_stats(self) -> Dict:
@@ -2487,7 +2583,7 @@ class AdvancedRiskController:
             'current_state': self.current_state.value,
             'band_entry': self.band_entry,
             'band_halt': self.band_halt,
-            'state_duration': time.time() - self.state_since
+            'state_duration': self.clock.time() - self.state_since
         }
     
     # ═══════════════════════════════════════════════════════════════════
@@ -2504,10 +2600,15 @@ class AdvancedRiskController:
         """
         [向後兼容] 計算價差
         
+        未指定 binance_price 時，取 dYdX 最新報價時間點 (as-of) 的幣安 mid，
+        而不是讀取當下的幣安最新價。
+        
         Returns:
             兼容舊格式的價差資訊
         """
         if binance_price is None or binance_price <= 0:
+            binance_price = self.cross_venue.binance_mid_at_dydx()
+        if binance_price <= 0:
             binance_price = self.get_binance_price()
         
         if binance_price <= 0 or dydx_price <= 0:
@@ -2534,13 +2635,16 @@ class AdvancedRiskController:
         else:
             status = 'OK'
         
+        cv = self.cross_venue.state()
         return {
             'spread_pct': spread_pct,
             'spread_usdt': spread_usdt,
             'dydx_premium': dydx_premium,
             'status': status,
             'binance_price': binance_price,
-            'dydx_price': dydx_price
+            'dydx_price': dydx_price,
+            'spread_z': cv.spread_z,
+            'lead_lag_ms': cv.lead_lag_ms
         }
     
     def start_binance_feed(self):
@@ -2577,6 +2681,37 @@ try:
 except ImportError:
     _HAS_SHARED_LIMITER = False
 
+# 子帳戶串流狀態 (持倉 / 掛單 / oracle price 讀記憶體，REST 只在跳號時補)
+try:
+    from src.dydx_subaccount_state import DydxSubaccountState
+    _HAS_SUBACCOUNT_STATE = True
+except ImportError:
+    DydxSubaccountState = None
+    _HAS_SUBACCOUNT_STATE = False
+
+# 保護單下單管線 (TP/SL 意圖合併、批次撤單、集中 block rate limit)
+try:
+    from src.dydx_order_pipeline import DydxOrderPipeline
+    _HAS_ORDER_PIPELINE = True
+except ImportError:
+    DydxOrderPipeline = None
+    _HAS_ORDER_PIPELINE = False
+
+# 交易記錄存放庫 (SQLite WAL + 增量統計，trades_*.json 改為按需匯出)
+try:
+    from src.trading.trade_store import get_trade_store
+    _HAS_TRADE_STORE = True
+except ImportError:
+    get_trade_store = None
+    _HAS_TRADE_STORE = False
+
+# 欄位式訓練快照記錄器 (需要 pyarrow；否則沿用 JSONL)
+try:
+    from src.utils.snapshot_recorder import SnapshotRecorder, HAS_PYARROW as _HAS_SNAPSHOT_RECORDER
+except ImportError:
+    SnapshotRecorder = None
+    _HAS_SNAPSHOT_RECORDER = False
+
 
 class DydxWebSocket:
     """
@@ -2595,7 +2730,8 @@ class DydxWebSocket:
     - REST 僅用於啟動初始化 (1次)
     """
     
-    def __init__(self, symbol: str = "BTC-USD", network: str = "mainnet"):
+    def __init__(self, symbol: str = "BTC-USD", network: str = "mainnet", clock: Optional[Clock] = None):
+        self.clock: Clock = clock or get_clock()
         self.symbol = symbol
         self.network = network
         
@@ -2604,7 +2740,8 @@ class DydxWebSocket:
             self._hub = DydxDataHub(
                 symbol=symbol,
                 network=network,
-                big_trade_threshold=1000  # dYdX 適配：$1K
+                big_trade_threshold=1000,  # dYdX 適配：$1K
+                clock=self.clock
             )
             self._use_hub = True
             logging.info(f"✅ 使用 DydxDataHub (純 WebSocket + 本機快取)")
@@ -2624,6 +2761,11 @@ class DydxWebSocket:
         # 訂單簿
         self.bids: List[List[float]] = []
         self.asks: List[List[float]] = []
+        self._book_impact = BookImpact(max_levels=10)
+        
+        # 跨交易所價差引擎 (由 AdvancedRiskController.set_data_sources 掛上)
+        self.cross_venue: Optional[CrossVenueSpreadEngine] = None
+        self._hub_last_update = 0.0
         
         # 大單追蹤
         self.big_trades: deque = deque(maxlen=100)
@@ -2666,6 +2808,32 @@ class DydxWebSocket:
             self._consecutive_429s = 0
             self._backoff_until = 0
     
+    @property
+    def book_impact(self) -> BookImpact:
+        """目前訂單簿的累積深度 (bids/asks 換新 list 時才重建)"""
+        return self.book_snapshot()[2]
+
+    def book_snapshot(self) -> Tuple[List[List[float]], List[List[float]], BookImpact]:
+        """
+        一次讀出 (bids, asks, 累積深度)，三者出自同一份訂單簿
+
+        訂單簿更新只換 list 不改內容；累積深度每份簿建一個新物件、建好後不再修改，
+        快照拿走後不會被下一次更新改寫。
+        """
+        bids, asks = self.bids, self.asks
+        book = self._book_impact
+        if not book.is_source(bids, asks):
+            book = BookImpact(bids, asks, max_levels=10)
+            self._book_impact = book
+        return bids, asks, book
+    
+    def _publish_quote(self, ts_ms: Optional[float] = None):
+        """把最新 bid/ask 推給跨交易所引擎 (dYdX 訂單簿沒有交易所時間戳，用收到時間)"""
+        if self.cross_venue is not None and self.bid_price > 0 and self.ask_price > 0:
+            if ts_ms is None:
+                ts_ms = self.clock.time() * 1000
+            self.cross_venue.on_dydx(int(ts_ms), self.bid_price, self.ask_price)
+    
     def _sync_from_hub(self):
         """從 Data Hub 同步數據到本地屬性"""
         if not self._hub:
@@ -2681,10 +2849,15 @@ class DydxWebSocket:
         self.bids = data.bids
         self.asks = data.asks
         
+        # Hub 每收到一則 WS 訊息更新一次 last_update；只在有新訊息時推送
+        if data.last_update > self._hub_last_update:
+            self._hub_last_update = data.last_update
+            self._publish_quote(data.last_update * 1000)
+        
         # 轉換交易到 deque
         self.trades_1s.clear()
         self.trades_1m.clear()
-        now = time.time() * 1000
+        now = self.clock.time() * 1000
         for t in data.recent_trades:
             if now - t['time'] < 1000:
                 self.trades_1s.append(t)
@@ -2705,7 +2878,7 @@ class DydxWebSocket:
         import aiohttp
         
         # 🔧 v12.11: 檢查退避時間
-        if time.time() < self._backoff_until:
+        if self.clock.time() < self._backoff_until:
             logging.debug(f"⏳ 429 退避中，跳過 REST 請求")
             return
         
@@ -2741,6 +2914,7 @@ class DydxWebSocket:
                         # 🔧 v14.6.38: 統一使用訂單簿中間價 (顯示和成交一致)
                         if self.bids and self.asks:
                             self.current_price = (self.bid_price + self.ask_price) / 2
+                            self._publish_quote()
                 
                 # 🔧 v12.11: 再次檢查速率限制
                 if self._rate_limiter:
@@ -2773,19 +2947,13 @@ class DydxWebSocket:
                                 dt = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
                                 trade_time = dt.timestamp() * 1000
                             except:
-                                trade_time = time.time() * 1000
+                                trade_time = self.clock.time() * 1000
                             
                             self.last_trade_time = trade_time
                             value_usdt = price * size
                             is_buy = side == "BUY"
                             
-                            trade = {
-                                'price': price,
-                                'qty': size,
-                                'is_buy': is_buy,
-                                'time': trade_time,
-                                'value_usdt': value_usdt
-                            }
+                            trade = TradeTick(price, size, is_buy, trade_time, value_usdt)
                             
                             # 避免重複添加
                             if not any(abs(t['time'] - trade_time) < 100 for t in list(self.trades_1m)[-10:]):
@@ -2839,7 +3007,7 @@ class DydxWebSocket:
         
         # 如果有 Retry-After，使用較大的值
         actual_wait = max(wait_seconds, backoff)
-        self._backoff_until = time.time() + actual_wait
+        self._backoff_until = self.clock.time() + actual_wait
         
         # 🔧 動態調整 REST 輪詢間隔
         if self._consecutive_429s >= 3:
@@ -2857,7 +3025,7 @@ class DydxWebSocket:
         import aiohttp
         
         # 🔧 v12.11: 退避檢查
-        if time.time() < self._backoff_until:
+        if self.clock.time() < self._backoff_until:
             return
         
         try:
@@ -2903,18 +3071,12 @@ class DydxWebSocket:
                             
                             if price > 0:
                                 self.current_price = price
-                                trade_time = time.time() * 1000
+                                trade_time = self.clock.time() * 1000
                                 self.last_trade_time = trade_time
                                 value_usdt = price * size
                                 is_buy = side == "BUY"
                                 
-                                trade = {
-                                    'price': price,
-                                    'qty': size,
-                                    'is_buy': is_buy,
-                                    'time': trade_time,
-                                    'value_usdt': value_usdt
-                                }
+                                trade = TradeTick(price, size, is_buy, trade_time, value_usdt)
                                 self.trades_1s.append(trade)
                                 self.trades_1m.append(trade)
                                 
@@ -2931,6 +3093,7 @@ class DydxWebSocket:
                             self.asks = [[float(a["price"]), float(a["size"])] for a in contents["asks"][:10]]
                             if self.asks:
                                 self.ask_price = self.asks[0][0]
+                        self._publish_quote()
                                 
             except Exception as e:
                 logging.debug(f"WS message error: {e}")
@@ -2958,8 +3121,9 @@ class DydxWebSocket:
                     
                     # 同時運行 WebSocket 監聽和 REST 輪詢
                     async def rest_poller():
+                        # I/O 節奏: 以系統時間輪詢，不推進 / 不依賴重放的虛擬時鐘
                         while self.running:
-                            now = time.time()
+                            now = WALL_CLOCK.time()
                             if now - self._last_rest_fetch >= self._rest_fetch_interval:
                                 await self._fetch_rest_data()
                                 self._last_rest_fetch = now
@@ -2987,8 +3151,7 @@ class DydxWebSocket:
         # 🔧 v13.0: 優先使用 Data Hub
         if self._use_hub and self._hub:
             # 🔧 v14.9: 啟動前清除舊快取避免價格延遲
-            cache_file = Path("/tmp/dydx_data_hub.json")
-            lock_file = Path("/tmp/dydx_data_hub.lock")
+            cache_file, lock_file = self._hub.data_path, self._hub.lock_path
             if cache_file.exists() or lock_file.exists():
                 try:
                     if cache_file.exists():
@@ -3005,7 +3168,7 @@ class DydxWebSocket:
             def sync_loop():
                 while self.running:
                     self._sync_from_hub()
-                    time.sleep(0.05)  # 50ms 同步一次
+                    WALL_CLOCK.sleep(0.05)  # 50ms 同步一次 (I/O 節奏，用系統時間)
             
             self._ws_thread = threading.Thread(target=sync_loop, daemon=True)
             self._ws_thread.start()
@@ -3014,7 +3177,7 @@ class DydxWebSocket:
             role = "🔑 Master" if data.master_pid == os.getpid() else "👥 Consumer"
             print(f"✅ dYdX WebSocket 已啟動 ({role})")
             print(f"   📡 純 WebSocket 數據流 (無 REST 輪詢)")
-            print(f"   💾 本機快取共享: /tmp/dydx_data_hub.json")
+            print(f"   💾 本機快取共享: {self._hub.data_path}")
             return
         
         # 舊模式: REST 輪詢
@@ -3089,7 +3252,7 @@ class DydxWebSocket:
         Args:
             window_sec: 時間窗口秒數，預設 30 秒 (dYdX 適配)
         """
-        now = time.time() * 1000
+        now = self.clock.time() * 1000
         window_ms = window_sec * 1000
         try:
             trades_copy = list(self.trades_1s)
@@ -3108,7 +3271,7 @@ class DydxWebSocket:
     
     def get_price_change(self, seconds: int) -> float:
         """計算 N 秒價格變化 %"""
-        now = time.time() * 1000
+        now = self.clock.time() * 1000
         trades_copy = list(self.trades_1m)
         if not trades_copy or self.current_price == 0:
             return 0.0
@@ -3127,9 +3290,9 @@ class DydxWebSocket:
             return 0.0
         return (self.current_price - candidate_price) / candidate_price * 100
     
-    def get_big_trades_stats(self, seconds: int = 60) -> Dict:
+    def get_big_trades_stats(self, seconds: int = 60) -> BigTradeStats:
         """獲取大單統計"""
-        now = time.time() * 1000
+        now = self.clock.time() * 1000
         try:
             big_trades_copy = list(self.big_trades)
             recent_big = [t for t in big_trades_copy if now - t['time'] < seconds * 1000]
@@ -3179,38 +3342,38 @@ class DydxWebSocket:
         
         stable_duration_ms = now - direction_stable_since
         
-        return {
-            'big_trade_count': len(recent_big),
-            'big_buy_count': len(big_buy),
-            'big_sell_count': len(big_sell),
-            'big_buy_volume': sum(t['qty'] for t in big_buy),
-            'big_sell_volume': sum(t['qty'] for t in big_sell),
-            'big_buy_value': sum(t['value_usdt'] for t in big_buy),
-            'big_sell_value': sum(t['value_usdt'] for t in big_sell),
-            'recent_big_trades': recent_big[-5:],
-            'direction_changes': direction_changes,
-            'stable_duration_sec': stable_duration_ms / 1000,
-            'last_direction': last_dominant_direction,
-        }
+        return BigTradeStats(
+            big_trade_count=len(recent_big),
+            big_buy_count=len(big_buy),
+            big_sell_count=len(big_sell),
+            big_buy_volume=sum(t['qty'] for t in big_buy),
+            big_sell_volume=sum(t['qty'] for t in big_sell),
+            big_buy_value=sum(t['value_usdt'] for t in big_buy),
+            big_sell_value=sum(t['value_usdt'] for t in big_sell),
+            recent_big_trades=recent_big[-5:],
+            direction_changes=direction_changes,
+            stable_duration_sec=stable_duration_ms / 1000,
+            last_direction=last_dominant_direction,
+        )
     
-    def get_full_snapshot(self) -> Dict:
+    def get_full_snapshot(self) -> FeedSnapshot:
         """獲取完整市場快照"""
         big_stats = self.get_big_trades_stats()
         
-        return {
-            'timestamp': datetime.now().isoformat(),
-            'price': self.current_price,
-            'bid': self.bid_price,
-            'ask': self.ask_price,
-            'spread': self.ask_price - self.bid_price if self.bid_price > 0 else 0,
-            'obi': self.get_obi(),
-            'trade_imbalance_1s': self.get_trade_imbalance_1s(),
-            'price_change_1m': self.get_price_change(60),
-            'price_change_5m': self.get_price_change(300),
-            'bid_depth': sum(q for _, q in self.bids[:5]) if self.bids else 0,
-            'ask_depth': sum(q for _, q in self.asks[:5]) if self.asks else 0,
-            **big_stats
-        }
+        return FeedSnapshot(
+            timestamp=self.clock.now().isoformat(),
+            price=self.current_price,
+            bid=self.bid_price,
+            ask=self.ask_price,
+            spread=self.ask_price - self.bid_price if self.bid_price > 0 else 0,
+            obi=self.get_obi(),
+            trade_imbalance_1s=self.get_trade_imbalance_1s(),
+            price_change_1m=self.get_price_change(60),
+            price_change_5m=self.get_price_change(300),
+            bid_depth=sum(q for _, q in self.bids[:5]) if self.bids else 0,
+            ask_depth=sum(q for _, q in self.asks[:5]) if self.asks else 0,
+            big=big_stats
+        )
 
 
 # ============================================================
@@ -3223,32 +3386,34 @@ class BinanceWebSocket:
     注意: 主要使用 DydxWebSocket，此類別保留作為備援
     """
     
-    def __init__(self, symbol: str = "btcusdt", use_testnet: bool = True):
+    def __init__(self, symbol: str = "btcusdt", use_testnet: bool = True, clock: Optional[Clock] = None):
+        self.clock: Clock = clock or get_clock()
         self.symbol = symbol.lower()
         self.use_testnet = use_testnet
         
         # 注意: Testnet 沒有公開的 WebSocket，統一使用正式網
         # 正式網和 Testnet 的價格通常差異很小 (< $10)
         # 持倉的盈虧計算會使用 Testnet REST API 的 markPrice
-        base_url = "wss://fstream.binance.com"
-        
-        self.ws_url = f"{base_url}/ws/{self.symbol}@aggTrade"
-        self.depth_url = f"{base_url}/ws/{self.symbol}@depth5@100ms"
+        self.base_url = FUTURES_STREAM_WS
+        self.trade_stream = f"{self.symbol}@aggTrade"
+        self.depth_stream = f"{self.symbol}@depth5@100ms"
         
         # 數據存儲
         self.current_price = 0.0
         self.bid_price = 0.0
         self.ask_price = 0.0
         self.last_trade_time = 0
-        self.trades_1s: deque = deque(maxlen=100)  # 最近 1 秒交易
-        self.trades_1m: deque = deque(maxlen=6000) # 最近 1 分鐘交易
+        self.trades_1m = TradeTape(6000)  # 最近 1 分鐘交易 (欄位式 ring，寫入不產生 Python 物件)
         
         # 訂單簿
         self.bids: List[List[float]] = []  # [[price, qty], ...]
         self.asks: List[List[float]] = []
         
+        # 跨交易所價差引擎 (由 AdvancedRiskController.set_data_sources 掛上)
+        self.cross_venue: Optional[CrossVenueSpreadEngine] = None
+        
         # 大單追蹤 (>$8K USDT) - 拆單識別優化 (Iceberg Detection)
-        self.big_trades: deque = deque(maxlen=100)  # 最近大單
+        self.big_trades = TradeTape(100)  # 最近大單 (迭代時才轉成 TradeTick)
         self.big_trade_threshold = 8000  # User Request: 8K for split order detection
         
         # 統計
@@ -3258,90 +3423,113 @@ class BinanceWebSocket:
         # 控制
         self.running = False
         self._ws_thread = None
+        self._mux: Optional[BinanceStreamMux] = None
+        # 多幣種模式: 母進程 combined stream 分流來的 Queue (設定後不自行連線)
+        self._feed = None
+        # 多幣種模式下母進程以 raw 轉送不解碼，序號缺口改在這裡解碼時檢查
+        self._sequences = SequenceTracker()
+        self.stream_gaps = 0
+        self.stream_missing_events = 0
+    
+    def attach_feed(self, feed) -> None:
+        """
+        改由外部 Queue 供應行情 (scripts/whale_multi_symbol.py 的 CombinedStreamRouter)
+        
+        Queue 內容為 combined stream 原始字串: {"stream": "ethusdt@aggTrade", "data": {...}}
+        """
+        self._feed = feed
     
-    async def _handle_agg_trade(self, ws):
+    def _on_agg_trade(self, event: AggTrade):
         """處理逐筆成交數據"""
-        async for message in ws:
-            if not self.running:
-                break
-            try:
-                data = json.loads(message)
-                price = float(data['p'])
-                qty = float(data['q'])
-                is_buyer_maker = data['m']  # True = 賣方主動, False = 買方主動
-                trade_time = data['T']
-                
-                self.current_price = price
-                self.last_trade_time = trade_time
-                
-                value_usdt = price * qty
-                
-                trade = {
-                    'price': price,
-                    'qty': qty,
-                    'is_buy': not is_buyer_maker,
-                    'time': trade_time,
-                    'value_usdt': value_usdt
-                }
-                self.trades_1s.append(trade)
-                self.trades_1m.append(trade)
-                
-                # 追蹤大單
-                if value_usdt >= self.big_trade_threshold:
-                    self.big_trades.append(trade)
-                
-            except Exception as e:
-                pass
+        price = event.price
+        trade_time = event.time_ms
+        
+        self.current_price = price
+        self.last_trade_time = trade_time
+        
+        value_usdt = event.value_usdt
+        
+        # is_buyer_maker = 賣方主動
+        is_buy = event.is_buy
+        self.trades_1m.append(price, event.qty, is_buy, trade_time, value_usdt)
+        
+        # 追蹤大單
+        if value_usdt >= self.big_trade_threshold:
+            self.big_trades.append(price, event.qty, is_buy, trade_time, value_usdt)
     
-    async def _handle_depth(self, ws):
-        """處理訂單簿數據"""
-        async for message in ws:
-            if not self.running:
-                break
-            try:
-                data = json.loads(message)
-                self.bids = [[float(p), float(q)] for p, q in data.get('b', [])]
-                self.asks = [[float(p), float(q)] for p, q in data.get('a', [])]
-                
-                if self.bids:
-                    self.bid_price = self.bids[0][0]
-                if self.asks:
-                    self.ask_price = self.asks[0][0]
-                    
-            except Exception as e:
-                pass
+    @property
+    def trades_1s(self) -> List[TradeTick]:
+        """最近 100 筆成交 (舊 deque(maxlen=100) 的唯讀相容介面)"""
+        return self.trades_1m.tail(100)
     
-    async def _run_ws(self):
-        """運行 WebSocket"""
+    def _on_depth(self, book: DepthUpdate):
+        """處理訂單簿數據 (檔位已由 stream_mux 轉成 float)"""
+        self.bids = book.bids
+        self.asks = book.asks
+        
+        if self.bids:
+            self.bid_price = self.bids[0][0]
+        if self.asks:
+            self.ask_price = self.asks[0][0]
+        
+        # 本機收到時間 (與 dYdX 同一時鐘；交易所 T/E 與本機時鐘的偏差會變成假的延遲)
+        if self.cross_venue is not None:
+            self.cross_venue.on_binance(int(self.clock.time() * 1000), self.bid_price, self.ask_price)
+    
+    def _on_stream_message(self, message) -> None:
+        """combined stream 原始訊息依 stream 名稱分派 (多幣種 Queue 用)"""
+        try:
+            stream, event = decode_message(message, self._sequences, self._on_stream_gap)
+            if stream.endswith('@aggTrade'):
+                self._on_agg_trade(event)
+            elif '@depth' in stream:
+                self._on_depth(event)
+        except Exception as e:
+            pass
+    
+    def _on_stream_gap(self, gap: StreamGap) -> None:
+        """Queue 行情的序號缺口 (與 BinanceStreamMux 相同的統計與日誌)"""
+        self.stream_gaps += 1
+        self.stream_missing_events += gap.missing
+        logging.debug(f"stream 序號缺口: {gap.stream} 預期 {gap.expected} 收到 {gap.received}")
+    
+    def _run_feed(self):
+        """消費母進程分流的行情 Queue"""
+        from queue import Empty
         while self.running:
             try:
-                async with websockets.connect(self.ws_url) as ws_trade:
-                    async with websockets.connect(self.depth_url) as ws_depth:
-                        await asyncio.gather(
-                            self._handle_agg_trade(ws_trade),
-                            self._handle_depth(ws_depth)
-                        )
-            except Exception as e:
-                if self.running:
-                    print(f"⚠️ WebSocket 重連中... {e}")
-                    await asyncio.sleep(1)
+                message = self._feed.get(timeout=1.0)
+            except Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            self._on_stream_message(message)
     
     def start(self):
         """啟動 WebSocket"""
         self.running = True
         
-        def run_loop():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(self._run_ws())
+        if self._feed is not None:
+            self._ws_thread = threading.Thread(target=self._run_feed, daemon=True)
+            self._ws_thread.start()
+            print(f"✅ WebSocket 已啟動 ({self.symbol}，共用 combined stream)")
+            return
         
-        self._ws_thread = threading.Thread(target=run_loop, daemon=True)
-        self._ws_thread.start()
+        # 同程序共用一個多工器 (背景事件循環)，成交 + 訂單簿同一條連線
+        self._mux = get_stream_mux(self.base_url)
+        self._mux.subscribe(self.trade_stream, self._on_agg_trade)
+        self._mux.subscribe(self.depth_stream, self._on_depth)
+        self._mux.start_background()
         print("✅ WebSocket 已啟動")
     
     def stop(self):
         """停止 WebSocket"""
         self.running = False
+        if self._mux is not None:
+            self._mux.unsubscribe(self.trade_stream, self._on_agg_trade)
+            self._mux.unsubscribe(self.depth_stream, self._on_depth)
+            if not self._mux.streams:
+                self._mux.stop_background()
         print("⏹️ WebSocket 已停止")
     
     def get_obi(self) -> float:
@@ -3359,16 +3547,9 @@ class BinanceWebSocket:
     
     def get_trade_imbalance_1s(self) -> float:
         """計算 1 秒內買賣不平衡"""
-        now = time.time() * 1000
-        # 🔧 修復：先複製資料再迭代，避免 RuntimeError: deque mutated during iteration
-        try:
-            trades_copy = list(self.trades_1s)
-            recent = [t for t in trades_copy if now - t['time'] < 1000]
-        except RuntimeError:
-            return 0.0
-        
-        buy_vol = sum(t['qty'] for t in recent if t['is_buy'])
-        sell_vol = sum(t['qty'] for t in recent if not t['is_buy'])
+        now = self.clock.time() * 1000
+        # 最近 100 筆中 1 秒內的成交 (TradeTape 直接在 ring 上計算，不需先複製)
+        buy_vol, sell_vol = self.trades_1m.flow_since(now - 1000, last_n=100)
         
         total = buy_vol + sell_vol
         if total == 0:
@@ -3378,42 +3559,31 @@ class BinanceWebSocket:
     
     def get_price_change(self, seconds: int) -> float:
         """計算 N 秒價格變化 %"""
-        now = time.time() * 1000
-        trades_copy = list(self.trades_1m)
-        if not trades_copy or self.current_price == 0:
+        now = self.clock.time() * 1000
+        if not len(self.trades_1m) or self.current_price == 0:
             return 0.0
         
-        # 目標時間點 = N 秒前，找「最接近且不晚於」目標時間的成交價
-        # 🔧 v10.19 fix5: 使用逆序迭代（新→舊），找到第一個 <= target 的就是最接近的
+        # 目標時間點 = N 秒前，找「最接近且不晚於」目標時間的成交價 (二分搜尋)
         target_time = now - seconds * 1000
-        candidate_price = None
-        for t in reversed(trades_copy):
-            if t['time'] <= target_time:
-                candidate_price = t['price']
-                break
+        candidate_price = self.trades_1m.price_at_or_before(target_time)
         # 若資料尚未累積到 N 秒，退而取最早一筆成交作為基準
         if candidate_price is None:
-            candidate_price = trades_copy[0]['price']
+            candidate_price = self.trades_1m.first_price()
         
-        if candidate_price == 0:
+        if not candidate_price:
             return 0.0
         return (self.current_price - candidate_price) / candidate_price * 100
     
-    def get_big_trades_stats(self, seconds: int = 60) -> Dict:
+    def get_big_trades_stats(self, seconds: int = 60) -> BigTradeStats:
         """
         獲取大單統計 (用於 TensorFlow)
         v10.7: 增加方向穩定性分析
         """
-        now = time.time() * 1000
-        # 🔧 修復：先複製資料再迭代，避免 RuntimeError
-        try:
-            big_trades_copy = list(self.big_trades)
-            recent_big = [t for t in big_trades_copy if now - t['time'] < seconds * 1000]
-        except RuntimeError:
-            recent_big = []
+        now = self.clock.time() * 1000
+        recent_big = [t for t in self.big_trades if now - t.time < seconds * 1000]
         
-        big_buy = [t for t in recent_big if t['is_buy']]
-        big_sell = [t for t in recent_big if not t['is_buy']]
+        big_buy = [t for t in recent_big if t.is_buy]
+        big_sell = [t for t in recent_big if not t.is_buy]
         
         # v10.7: 分析方向變化次數 (用於穩定性檢查)
         direction_changes = 0
@@ -3422,19 +3592,19 @@ class BinanceWebSocket:
         
         # 按時間排序分析方向變化
         if recent_big:
-            sorted_trades = sorted(recent_big, key=lambda t: t['time'])
+            sorted_trades = sorted(recent_big, key=lambda t: t.time)
             
             # 每 5 秒切片分析主導方向
             slice_duration_ms = 5000  # 5 秒
             time_slices = {}
             for trade in sorted_trades:
-                slice_key = int(trade['time'] // slice_duration_ms)
+                slice_key = int(trade.time // slice_duration_ms)
                 if slice_key not in time_slices:
                     time_slices[slice_key] = {'buy_value': 0, 'sell_value': 0}
-                if trade['is_buy']:
-                    time_slices[slice_key]['buy_value'] += trade['value_usdt']
+                if trade.is_buy:
+                    time_slices[slice_key]['buy_value'] += trade.value_usdt
                 else:
-                    time_slices[slice_key]['sell_value'] += trade['value_usdt']
+                    time_slices[slice_key]['sell_value'] += trade.value_usdt
             
             # 計算方向變化次數
             for slice_key in sorted(time_slices.keys()):
@@ -3459,43 +3629,43 @@ class BinanceWebSocket:
         # 計算穩定時間 (毫秒)
         stable_duration_ms = now - direction_stable_since
         
-        return {
-            'big_trade_count': len(recent_big),
-            'big_buy_count': len(big_buy),
-            'big_sell_count': len(big_sell),
-            'big_buy_volume': sum(t['qty'] for t in big_buy),
-            'big_sell_volume': sum(t['qty'] for t in big_sell),
-            'big_buy_value': sum(t['value_usdt'] for t in big_buy),
-            'big_sell_value': sum(t['value_usdt'] for t in big_sell),
-            'recent_big_trades': recent_big[-5:],  # 最近 5 筆大單
+        return BigTradeStats(
+            big_trade_count=len(recent_big),
+            big_buy_count=len(big_buy),
+            big_sell_count=len(big_sell),
+            big_buy_volume=sum(t.qty for t in big_buy),
+            big_sell_volume=sum(t.qty for t in big_sell),
+            big_buy_value=sum(t.value_usdt for t in big_buy),
+            big_sell_value=sum(t.value_usdt for t in big_sell),
+            recent_big_trades=recent_big[-5:],  # 最近 5 筆大單
             # v10.7: 穩定性指標
-            'direction_changes': direction_changes,
-            'stable_duration_sec': stable_duration_ms / 1000,
-            'last_direction': last_dominant_direction,
-        }
+            direction_changes=direction_changes,
+            stable_duration_sec=stable_duration_ms / 1000,
+            last_direction=last_dominant_direction,
+        )
     
-    def get_full_snapshot(self) -> Dict:
+    def get_full_snapshot(self) -> FeedSnapshot:
         """
         獲取完整市場快照 (用於 TensorFlow 記錄)
         """
         big_stats = self.get_big_trades_stats()
         
-        return {
-            'timestamp': datetime.now().isoformat(),
-            'price': self.current_price,
-            'bid': self.bid_price,
-            'ask': self.ask_price,
-            'spread': self.ask_price - self.bid_price if self.bid_price > 0 else 0,
-            'obi': self.get_obi(),
-            'trade_imbalance_1s': self.get_trade_imbalance_1s(),
-            'price_change_1m': self.get_price_change(60),
-            'price_change_5m': self.get_price_change(300),
+        return FeedSnapshot(
+            timestamp=self.clock.now().isoformat(),
+            price=self.current_price,
+            bid=self.bid_price,
+            ask=self.ask_price,
+            spread=self.ask_price - self.bid_price if self.bid_price > 0 else 0,
+            obi=self.get_obi(),
+            trade_imbalance_1s=self.get_trade_imbalance_1s(),
+            price_change_1m=self.get_price_change(60),
+            price_change_5m=self.get_price_change(300),
             # 訂單簿深度
-            'bid_depth': sum(q for _, q in self.bids[:5]) if self.bids else 0,
-            'ask_depth': sum(q for _, q in self.asks[:5]) if self.asks else 0,
+            bid_depth=sum(q for _, q in self.bids[:5]) if self.bids else 0,
+            ask_depth=sum(q for _, q in self.asks[:5]) if self.asks else 0,
             # 大單資料
-            **big_stats
-        }
+            big=big_stats
+        )
 
 # ============================================================
 # Testnet 交易執行器
@@ -3510,16 +3680,23 @@ class TestnetTrader:
     3. dydx_sync_mode=True: 同步到 dYdX 真實交易 (Aggressive Maker)
     """
     
-    def __init__(self, config: TradingConfig):
+    def __init__(self, config: TradingConfig, clock: Optional[Clock] = None):
+        self.clock: Clock = clock or get_clock()
         self.config = config
         self.paper_mode = config.paper_mode
         
+        # 交易幣種 (多幣種 worker 各自帶不同 config)
+        self.dydx_market: str = config.symbol_dydx
+        self.binance_symbol: str = config.binance_symbol
+        # 多幣種中央協調器 (RuntimeCoordinator 代理；單幣種執行時為 None)
+        self.coordinator = None
+        
         # 🆕 v10.9 兩階段止盈止損管理器
-        self._two_phase_exit_manager = TwoPhaseExitManager(config) if config.two_phase_exit_enabled else None
+        self._two_phase_exit_manager = TwoPhaseExitManager(config, clock=self.clock) if config.two_phase_exit_enabled else None
         
         if not self.paper_mode:
             # 使用直接 API 代替 ccxt (ccxt sandbox 已棄用)
-            self.testnet_api = BinanceTestnetAPI()
+            self.testnet_api = BinanceTestnetAPI(clock=self.clock)
             self.exchange = None  # 不再使用 ccxt
             print("✅ 使用 Testnet 直接 API")
         else:
@@ -3534,7 +3711,7 @@ class TestnetTrader:
         self.dydx_sync_enabled = bool(config.dydx_sync_mode) if config.dydx_sync_mode else False
         self.dydx_initial_balance: Optional[float] = None  # 🆕 dYdX 起始餘額
         # 🆕 v14.6.35: 記錄啟動時間，用於統計只計算本次運行的交易
-        self._session_start_time: str = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        self._session_start_time: str = self.clock.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
         
         # 🆕 v14.12.1: 初始化 logger
         import logging
@@ -3546,7 +3723,7 @@ class TestnetTrader:
         # JSONL 記憶日誌（可追查掛單/取消順序是否打結）
         self._dydx_order_journal_path = Path("logs/dydx_order_journal.jsonl")
         # 每次啟動唯一識別碼（方便串起同一次執行的所有事件）
-        self._dydx_run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self._dydx_run_id = f"{self.clock.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
         self._dydx_journal_failed_once = False
         # 讓 journal 檔案一定會生成（即使沒有成交/沒有掛單）
         self._journal_dydx_event(
@@ -3563,6 +3740,10 @@ class TestnetTrader:
         self._dydx_market_cache: Optional[Dict] = None
         self._dydx_market_cache_time: float = 0.0
         self._dydx_market_backoff_until: float = 0.0
+        # 子帳戶串流狀態 (live 時取代上面的 REST 快取)
+        self.dydx_state: Optional["DydxSubaccountState"] = None
+        # 保護單下單管線 (None 時各呼叫點直接送出)
+        self.dydx_orders: Optional["DydxOrderPipeline"] = None
 
         # 🆕 v12.0 預掛單狀態追蹤（需在 dYdX 啟動清理前初始化）
         self.pending_entry_order: Optional[Dict] = None  # 待成交的進場掛單
@@ -3616,7 +3797,7 @@ class TestnetTrader:
         self.consecutive_losses = 0           # 🆕 連續虧損計數
         self.cooldown_until: float = 0        # 🆕 連續虧損冷卻截止時間
         self.last_loss_time: float = 0        # 🆕 上次虧損時間
-        self.session_start_time = datetime.now()
+        self.session_start_time = self.clock.now()
 
         # 🆕 v14.1: 強制平衡隨機進場 (每 N 筆保證 50/50)
         self._balanced_batch_size: int = _coerce_int(getattr(self.config, "random_entry_balance_batch_size", 20), default=20) or 20
@@ -3634,9 +3815,21 @@ class TestnetTrader:
         # 日誌
         mode_suffix = "paper" if self.paper_mode else "live"
         self.log_dir = Path(f"logs/whale_{mode_suffix}_trader")
+        if self.dydx_market != "BTC-USD":
+            # 多幣種 worker 各自一個目錄，避免同秒啟動的會話檔名互相覆蓋
+            self.log_dir = self.log_dir / self.dydx_market.lower().replace("-", "_")
         self.log_dir.mkdir(parents=True, exist_ok=True)
-        session_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        session_timestamp = self.clock.now().strftime('%Y%m%d_%H%M%S')
+        self.session_id = session_timestamp
         self.trades_file = self.log_dir / f"trades_{session_timestamp}.json"
+        # 交易存放庫: 每次保存只寫入有變動的交易；trades_*.json 於會話結束 / export_trades() 匯出
+        self.trade_store = None
+        self._stored_closed_ids: set = set()
+        if _HAS_TRADE_STORE:
+            try:
+                self.trade_store = get_trade_store(self.log_dir / TwoPhaseExitManager.TRADE_DB_NAME, clock=self.clock)
+            except Exception as e:
+                print(f"⚠️ 交易存放庫開啟失敗，改用 JSON: {e}")
         # 🆕 獨立的信號記錄檔 (記錄所有信號，包括被拒絕的)
         self.signals_file = self.log_dir / f"signals_{session_timestamp}.json"
         self._signal_logs = []  # 信號日誌列表
@@ -3724,7 +3917,7 @@ class TestnetTrader:
 
         try:
             # ========== 🔧 v14.4: Balance 緩存 5 秒 ==========
-            now = time.time()
+            now = self.clock.time()
             if now - getattr(self, '_dydx_balance_time', 0) < 5.0:
                 real_total_equity = getattr(self, '_dydx_balance_cache', 0)
             else:
@@ -3743,16 +3936,22 @@ class TestnetTrader:
             
             # 🔧 v14.6.22: 每次都更新 Oracle Price (不只有持倉時)
             try:
-                oracle_price = await self.dydx_api.get_price()
+                if self._dydx_state_live() and self.dydx_state.oracle_price > 0:
+                    oracle_price = self.dydx_state.oracle_price
+                else:
+                    oracle_price = await self.dydx_api.get_price()
                 if oracle_price and oracle_price > 0:
                     self.dydx_oracle_price_cache = oracle_price
+                    guard = getattr(getattr(self, '_parent_system', None), 'spread_guard', None)
+                    if guard is not None:
+                        guard.cross_venue.on_oracle(int(self.clock.time() * 1000), oracle_price)
             except Exception:
                 pass
             
             # Find BTC position
             current_price = self.dydx_oracle_price_cache or 0
             for pos in positions:
-                if pos.get('market') == 'BTC-USD':
+                if pos.get('market') == self.dydx_market:
                     # Calculate unrealized PnL safely
                     entry_price = float(pos.get('entryPrice', 0))
                     size = float(pos.get('size', 0))
@@ -3796,7 +3995,7 @@ class TestnetTrader:
             return
 
         try:
-            await self._dydx_sweep_open_orders(reason=f"stop_trading:{reason}", market="BTC-USD")
+            await self._dydx_sweep_open_orders(reason=f"stop_trading:{reason}", market=self.dydx_market)
         except Exception:
             pass
 
@@ -3807,7 +4006,7 @@ class TestnetTrader:
             except Exception:
                 positions = []
             for pos in positions or []:
-                if pos.get("market") != "BTC-USD":
+                if pos.get("market") != self.dydx_market:
                     continue
                 raw_size = _coerce_float(pos.get("size", 0.0), default=0.0)
                 if abs(raw_size) <= 0.0001:
@@ -3822,7 +4021,7 @@ class TestnetTrader:
                     "side": "LONG" if raw_size > 0 else "SHORT",
                     "size": abs(raw_size),
                     "entry_price": entry_price,
-                    "entry_time": datetime.now(),
+                    "entry_time": self.clock.now(),
                 }
 
             if self.dydx_real_position and abs(_coerce_float(self.dydx_real_position.get("size", 0.0), default=0.0)) > 0.0001:
@@ -3854,17 +4053,18 @@ class TestnetTrader:
             return
 
         # 🆕 v14.6.11: 優先使用 WebSocket 持倉數據 (更即時)
+        # 子帳戶串流 live 時已有序號檢查的完整快照，不需要再看 dydx_ws 的年齡
         ws_position = None
-        if hasattr(self, 'dydx_ws') and self.dydx_ws:
-            ws_pos = self.dydx_ws.get_position("BTC-USD")
+        if not self._dydx_state_live() and hasattr(self, 'dydx_ws') and self.dydx_ws:
+            ws_pos = self.dydx_ws.get_position(self.dydx_market)
             if ws_pos:
                 ws_position = {
-                    'market': 'BTC-USD',
+                    'market': self.dydx_market,
                     'size': ws_pos['raw_size'],  # 保持正負號
                     'entryPrice': ws_pos['entry_price']
                 }
                 # WebSocket 數據比 REST API 新鮮，優先使用
-                ws_age = time.time() - self.dydx_ws.position_updated
+                ws_age = self.clock.time() - self.dydx_ws.position_updated
                 if ws_age < 10:  # WebSocket 數據 10 秒內有效
                     pass  # 使用 WebSocket 數據
                 else:
@@ -3879,7 +4079,7 @@ class TestnetTrader:
         live_pos = None
         for pos in positions:
             # 🔧 v14.6.2: 修復 - size 可能是負數 (SHORT)，用 abs() 檢測
-            if pos.get('market') == 'BTC-USD' and abs(float(pos.get('size', 0))) > 0.0001:
+            if pos.get('market') == self.dydx_market and abs(float(pos.get('size', 0))) > 0.0001:
                 live_pos = pos
                 break
 
@@ -3892,9 +4092,9 @@ class TestnetTrader:
         if not paper_has_position and live_pos:
             if paper_master:
                 if getattr(self, "_dydx_desync_since", None) is None:
-                    self._dydx_desync_since = time.time()
+                    self._dydx_desync_since = self.clock.time()
 
-                now_ts = time.time()
+                now_ts = self.clock.time()
                 desync_since = getattr(self, "_dydx_desync_since", now_ts) or now_ts
                 desync_age = now_ts - desync_since
                 desync_close_sec = _coerce_float(getattr(self.config, "dydx_desync_close_sec", 120.0), default=120.0)
@@ -3910,7 +4110,7 @@ class TestnetTrader:
                 except Exception:
                     registry_has_conditional = False
                 try:
-                    conditional_orders = await self._get_open_conditional_orders("BTC-USD")
+                    conditional_orders = await self._get_open_conditional_orders(self.dydx_market)
                     has_conditional = bool(conditional_orders)
                 except Exception:
                     has_conditional = False
@@ -3940,11 +4140,11 @@ class TestnetTrader:
                         print(f"   ❌ dYdX 殘留倉位清理異常: {e}")
                 return
             if getattr(self, "_dydx_desync_since", None) is None:
-                self._dydx_desync_since = time.time()
+                self._dydx_desync_since = self.clock.time()
             # 🔧 v14.9.12: 防止止損後立即同步 (避免無限循環)
             # 檢查是否在止損冷卻期內
             last_emergency_ts = getattr(self, '_last_emergency_stop_ts', 0.0)
-            now_ts = time.time()
+            now_ts = self.clock.time()
             emergency_cooldown_sec = 60.0  # 🔧 v14.9.12: 延長到 60 秒 (原 30 秒不夠)
             
             if now_ts - last_emergency_ts < emergency_cooldown_sec:
@@ -3969,7 +4169,7 @@ class TestnetTrader:
                     except Exception:
                         registry_has_conditional = False
                     try:
-                        conditional_orders = await self._get_open_conditional_orders("BTC-USD")
+                        conditional_orders = await self._get_open_conditional_orders(self.dydx_market)
                         has_conditional = bool(conditional_orders)
                     except Exception:
                         has_conditional = False
@@ -4093,16 +4293,16 @@ class TestnetTrader:
                 breakeven_price = entry_price * (1 - total_fee_pct / 100)
             
             # 創建 Paper 倉位
-            trade_id = f"SYNC_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            trade_id = f"SYNC_{self.clock.now().strftime('%Y%m%d_%H%M%S')}"
             trade = TradeRecord(
                 trade_id=trade_id,
-                timestamp=datetime.now().isoformat(),
+                timestamp=self.clock.now().isoformat(),
                 strategy="DYDX_SYNC",
                 probability=0.8,
                 confidence=0.8,
                 direction=side,
                 entry_price=entry_price,
-                entry_time=datetime.now().isoformat(),
+                entry_time=self.clock.now().isoformat(),
                 leverage=leverage,
                 position_size_usdt=size * entry_price,
                 position_size_btc=size,
@@ -4135,13 +4335,14 @@ class TestnetTrader:
             
             self.active_trade = trade
             self.trades.append(trade)
+            self._coordinator_sync()
             
             # 同步 dYdX 追蹤
             self.dydx_real_position = {
                 "side": side,
                 "size": size,
                 "entry_price": entry_price,
-                "entry_time": datetime.now()
+                "entry_time": self.clock.now()
             }
             
             print(f"✅ [Sync] Paper 倉位已同步: {side} {size} BTC @ ${entry_price:,.2f}")
@@ -4172,7 +4373,7 @@ class TestnetTrader:
                 trade = getattr(self, "active_trade", None)
                 if not trade:
                     return
-                now_ts = time.time()
+                now_ts = self.clock.time()
                 cooldown = _coerce_float(
                     getattr(self.config, "dydx_resync_open_cooldown_sec", 8.0),
                     default=8.0
@@ -4218,7 +4419,7 @@ class TestnetTrader:
             # 解法：嘗試從 fills 找到「該筆交易」的實際平倉成交價，並同步關閉 Paper。
             paper_trade = getattr(self, 'active_trade', None)
             if paper_trade and self.dydx_api:
-                now_ts = time.time()
+                now_ts = self.clock.time()
                 last_check = getattr(self, '_dydx_missing_pos_fills_check_ts', 0.0)
                 # 節流：避免每秒狂刷 fills API
                 if now_ts - last_check >= 5.0:
@@ -4239,7 +4440,7 @@ class TestnetTrader:
 
                         # 只抓最近 50 筆，並用 entry_time 做時間窗縮小
                         fills = await self.dydx_api.get_recent_fills(limit=50)
-                        btc_fills = [f for f in (fills or []) if (f.get("market") or f.get("ticker")) == "BTC-USD"]
+                        btc_fills = [f for f in (fills or []) if (f.get("market") or f.get("ticker")) == self.dydx_market]
 
                         def _parse_fill_dt(fill: dict) -> Optional[datetime]:
                             s = str(fill.get("createdAt", "") or "")
@@ -4353,7 +4554,7 @@ class TestnetTrader:
 
                         # 🧹 位置已平 → 清掃殘留 TP/SL（若已無單，cancelled=0 也沒關係）
                         try:
-                            await self._dydx_sweep_open_orders(reason="reconcile_dydx_closed", market="BTC-USD")
+                            await self._dydx_sweep_open_orders(reason="reconcile_dydx_closed", market=self.dydx_market)
                         except Exception:
                             pass
 
@@ -4366,7 +4567,7 @@ class TestnetTrader:
                 entry_time = self.dydx_real_position.get('entry_time')
                 if entry_time:
                     if isinstance(entry_time, datetime):
-                        elapsed = (datetime.now() - entry_time).total_seconds()
+                        elapsed = (self.clock.now() - entry_time).total_seconds()
                     else:
                         elapsed = 999  # 無效時間，允許清除
 
@@ -4381,13 +4582,90 @@ class TestnetTrader:
                     # 無時間戳，清除追蹤
                     self.dydx_real_position = None
 
+    def _start_dydx_state(self, dydx_address: str) -> Optional["DydxSubaccountState"]:
+        """啟動 dYdX 子帳戶串流狀態 (無地址 / 模組不可用時回傳 None，沿用 REST)"""
+        if not dydx_address or not _HAS_SUBACCOUNT_STATE:
+            return None
+        try:
+            state = DydxSubaccountState(dydx_address, market=self.dydx_market, network="mainnet", clock=self.clock)
+            live = state.start(wait_ready=5.0)
+            print("📶 dYdX 子帳戶串流已同步" if live else "⏳ dYdX 子帳戶串流連線中 (暫用 REST)")
+            return state
+        except Exception as e:
+            print(f"⚠️ dYdX 子帳戶串流啟動失敗: {e}")
+            return None
+
+    def _dydx_state_live(self) -> bool:
+        state = getattr(self, "dydx_state", None)
+        return bool(state and state.is_live)
+
+    def _dydx_pipeline_running(self) -> bool:
+        pipeline = getattr(self, "dydx_orders", None)
+        return bool(pipeline and pipeline.running)
+
+    async def _run_dydx_intent(self, slot: str, operation, kind: str = "replace", cost: int = 1):
+        """經下單管線執行 (同槽位排隊中的舊意圖會被合併)；管線不可用時直接執行"""
+        if self._dydx_pipeline_running():
+            return await self.dydx_orders.run(slot, operation, kind=kind, cost=cost)
+        return await operation()
+
+    def _submit_dydx_intent(self, slot: str, operation, kind: str = "place", cost: int = 1):
+        """同步呼叫點用: 回傳 concurrent future；管線不可用時以 asyncio.run 立即執行"""
+        if self._dydx_pipeline_running():
+            return self.dydx_orders.submit(slot, operation, kind=kind, cost=cost)
+        import concurrent.futures
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(asyncio.run(operation()))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    async def _dydx_cancel_orders_batched(
+        self,
+        market: Optional[str] = None,
+        conditional_only: bool = False,
+    ) -> tuple[int, int]:
+        """
+        列出未完成掛單並經下單管線批次撤單
+
+        掛單清單優先讀子帳戶串流快照；撤單依 client id 去重 (已在途的不重送)。
+
+        Returns:
+            (found_count, cancelled_count)
+        """
+        market = market or self.dydx_market
+        if self._dydx_state_live():
+            orders = self.dydx_state.get_open_orders(status=["OPEN", "UNTRIGGERED"], symbol=market)
+        else:
+            orders = await self.dydx_api.get_open_orders(status=["OPEN", "UNTRIGGERED"], symbol=market)
+
+        items = []
+        for order in orders or []:
+            client_id, order_type, gtbt = self.dydx_api.order_cancel_params(order)
+            if client_id <= 0 or (conditional_only and order_type != "CONDITIONAL"):
+                continue
+            items.append((
+                client_id,
+                functools.partial(self.dydx_api.cancel_order, client_id,
+                                  order_type=order_type, good_til_block_time=gtbt),
+            ))
+        if not items:
+            return 0, 0
+        results = await self.dydx_orders.run_cancels(items, timeout=60.0)
+        return len(items), sum(1 for r in results if r is True)
+
     async def _get_dydx_positions_with_cache(self) -> List[Dict]:
         """
         具備 429 backoff 的 positions 取得器
+        - 子帳戶串流 live 時直接讀記憶體快照 (零 API 呼叫)
         - 🔧 v14.3: 快取 3 秒內的查詢 (原 1.2s，減少呼叫)
         - 遇到 429 時退避 5 秒，期間回傳快取
         """
-        now = time.time()
+        if self._dydx_state_live():
+            return self.dydx_state.get_positions()
+
+        now = self.clock.time()
         cache_ttl = 3.0  # 🔧 v14.3: 增加到 3 秒
         backoff_seconds = 5.0  # 🔧 v14.3: 增加到 5 秒
 
@@ -4418,7 +4696,12 @@ class TestnetTrader:
         具備 429 backoff 的 market 查詢，用於 oracle/mark price 等。
         🔧 v14.3: 增加緩存時間
         """
-        now = time.time()
+        if self._dydx_state_live():
+            market = self.dydx_state.get_market()
+            if market:
+                return market
+
+        now = self.clock.time()
         cache_ttl = 3.0  # 🔧 v14.3: 增加到 3 秒
         backoff_seconds = 5.0  # 🔧 v14.3: 增加到 5 秒
 
@@ -4429,7 +4712,7 @@ class TestnetTrader:
             return self._dydx_market_cache
 
         try:
-            market = await self.dydx_api.get_market(self.config.symbol_dydx if hasattr(self.config, 'symbol_dydx') else "BTC-USD")
+            market = await self.dydx_api.get_market(self.dydx_market)
             if market:
                 self._dydx_market_cache = market
                 self._dydx_market_cache_time = now
@@ -4453,7 +4736,7 @@ class TestnetTrader:
         self._journal_dydx_event(
             "sync_init_start",
             network="mainnet",
-            symbol="BTC-USD",
+            symbol=self.dydx_market,
         )
         
         try:
@@ -4465,7 +4748,7 @@ class TestnetTrader:
             cfg_lev = min(cfg_lev, 50)
             dydx_config = DydxTradingConfig(
                 network="mainnet",
-                symbol="BTC-USD",
+                symbol=self.dydx_market,
                 leverage=cfg_lev,
                 paper_trading=False,  # 真實交易
                 sync_real_trading=True,
@@ -4474,10 +4757,13 @@ class TestnetTrader:
             
             # 創建 API 客戶端
             self.dydx_api = DydxAPI(dydx_config)
+            if _HAS_ORDER_PIPELINE:
+                self.dydx_orders = DydxOrderPipeline(clock=self.clock)
+                self.dydx_orders.start()
             self._journal_dydx_event(
                 "sync_api_created",
                 network="mainnet",
-                symbol="BTC-USD",
+                symbol=self.dydx_market,
                 leverage=cfg_lev,
             )
             
@@ -4495,11 +4781,14 @@ class TestnetTrader:
             # 🔧 v14.6.11: 傳入 address 以訂閱持倉更新
             try:
                 from scripts.dydx_whale_trader import DydxWebSocketClient
-                self.dydx_ws = DydxWebSocketClient(symbol="BTC-USD", network="mainnet", address=dydx_address if dydx_address else None)
+                self.dydx_ws = DydxWebSocketClient(symbol=self.dydx_market, network="mainnet", address=dydx_address if dydx_address else None)
                 print("📶 dYdX WebSocket 客戶端已創建 (含持倉訂閱)" if dydx_address else "📶 dYdX WebSocket 客戶端已創建")
             except ImportError:
                 self.dydx_ws = None
                 print("⚠️ dYdX WebSocket 客戶端不可用")
+
+            # 子帳戶串流狀態: 持倉 / 掛單 / oracle price 改讀記憶體快照
+            self.dydx_state = self._start_dydx_state(dydx_address)
             
             # 🔧 v14.2: 立即連接 dYdX API (帶重試)
             print(f"🔗 正在連接 dYdX...")
@@ -4519,7 +4808,7 @@ class TestnetTrader:
                     try:
                         cancelled = asyncio.run(self._dydx_sweep_open_orders(
                             reason="startup_cleanup", 
-                            market="BTC-USD"
+                            market=self.dydx_market
                         ))
                         if cancelled > 0:
                             print(f"🧹 已清空 {cancelled} 筆殘留掛單 (啟動清理)")
@@ -4632,7 +4921,7 @@ class TestnetTrader:
                     "side": direction,
                     "size": size,
                     "entry_price": fill_price,
-                    "entry_time": datetime.now()
+                    "entry_time": self.clock.now()
                 }
                 print(f"✅ dYdX Maker 成交! 價格: ${fill_price:,.2f}")
                 
@@ -4699,7 +4988,7 @@ class TestnetTrader:
             size = self.config.dydx_btc_size
 
             # ✅ 開新一輪前先清空未平倉掛單（避免舊 TP/SL/中間數止損累積造成誤判與 order count limit）
-            await self._dydx_sweep_open_orders(reason="pre_open_new_round", market="BTC-USD")
+            await self._dydx_sweep_open_orders(reason="pre_open_new_round", market=self.dydx_market)
             
             # 🔧 檢查餘額是否足夠
             balance = await self.dydx_api.get_account_balance()
@@ -4756,9 +5045,9 @@ class TestnetTrader:
                     getattr(self.config, "dydx_rest_confirm_timeout_sec", 1.5),
                     default=1.5,
                 )
-                confirm_deadline = time.time() + max(0.2, rest_confirm_timeout)
-                while time.time() < confirm_deadline:
-                    await asyncio.sleep(0.25)
+                confirm_deadline = self.clock.time() + max(0.2, rest_confirm_timeout)
+                while self.clock.time() < confirm_deadline:
+                    await self.clock.async_sleep(0.25)
                     try:
                         if hasattr(self.dydx_api, "get_positions_fresh"):
                             positions = await self.dydx_api.get_positions_fresh()
@@ -4767,7 +5056,7 @@ class TestnetTrader:
                     except Exception:
                         positions = []
                     for pos in positions or []:
-                        if pos.get("market") != "BTC-USD":
+                        if pos.get("market") != self.dydx_market:
                             continue
                         raw_size = _coerce_float(pos.get("size", 0.0), default=0.0)
                         if abs(raw_size) <= 0.0001:
@@ -4782,7 +5071,7 @@ class TestnetTrader:
                                 fills = []
                             close_side = "BUY" if actual_side == "LONG" else "SELL"
                             for fill in fills or []:
-                                if fill.get("market") != "BTC-USD":
+                                if fill.get("market") != self.dydx_market:
                                     continue
                                 if fill.get("side") == close_side:
                                     actual_entry = _coerce_float(fill.get("price", 0.0), default=0.0)
@@ -4796,7 +5085,7 @@ class TestnetTrader:
                             "side": actual_side,
                             "size": actual_size,
                             "entry_price": actual_entry,
-                            "entry_time": datetime.now(),
+                            "entry_time": self.clock.now(),
                         }
                         confirmed_via_rest = True
                         break
@@ -4839,7 +5128,7 @@ class TestnetTrader:
                     "side": direction,
                     "size": size,
                     "entry_price": fill_price,
-                    "entry_time": datetime.now(),
+                    "entry_time": self.clock.now(),
                     "tp_order_id": 0,  # 🆕 追蹤 TP 訂單
                     "sl_order_id": 0,  # 🆕 追蹤 SL 訂單
                 }
@@ -4852,10 +5141,10 @@ class TestnetTrader:
                 )
                 if ws_timeout_sec and ws_timeout_sec > 0 and hasattr(self, 'dydx_ws') and self.dydx_ws:
                     ws_confirmed = False
-                    start_ts = time.time()
-                    while (time.time() - start_ts) < ws_timeout_sec:
-                        await asyncio.sleep(0.25)
-                        if self.dydx_ws.has_position("BTC-USD"):
+                    start_ts = self.clock.time()
+                    while (self.clock.time() - start_ts) < ws_timeout_sec:
+                        await self.clock.async_sleep(0.25)
+                        if self.dydx_ws.has_position(self.dydx_market):
                             ws_confirmed = True
                             print(f"📶 [WS] 持倉已確認!")
                             break
@@ -4934,7 +5223,7 @@ class TestnetTrader:
                             'sl_price': sl_price,
                             'stop_pct': -stop_pct,  # 開倉時是虧損止損，用負值
                             'leverage': leverage,
-                            'created_time': time.time(),
+                            'created_time': self.clock.time(),
                             'status': 'PENDING',
                             'dydx_order_id': sl_order_id,
                         }
@@ -4972,7 +5261,7 @@ class TestnetTrader:
                                     'sl_price': sl_price,
                                     'stop_pct': -stop_pct,  # 開倉時是虧損止損，用負值
                                     'leverage': leverage,
-                                    'created_time': time.time(),
+                                    'created_time': self.clock.time(),
                                     'status': 'PENDING',
                                     'dydx_order_id': sl_order_id2,
                                 }
@@ -5018,7 +5307,7 @@ class TestnetTrader:
                                     'sl_price': sl_price,
                                     'stop_pct': -stop_pct,  # 開倉時是虧損止損，用負值
                                     'leverage': leverage,
-                                    'created_time': time.time(),
+                                    'created_time': self.clock.time(),
                                     'status': 'PENDING',
                                     'dydx_order_id': sl_order_id2,
                                 }
@@ -5079,7 +5368,7 @@ class TestnetTrader:
                             'tp_price': tp_price,
                             'target_pct': target_pct,
                             'leverage': leverage,
-                            'created_time': time.time(),
+                            'created_time': self.clock.time(),
                             'status': 'PENDING',
                             'dydx_order_id': tp_order_id,
                         }
@@ -5117,7 +5406,7 @@ class TestnetTrader:
                                     'tp_price': tp_price,
                                     'target_pct': target_pct,
                                     'leverage': leverage,
-                                    'created_time': time.time(),
+                                    'created_time': self.clock.time(),
                                     'status': 'PENDING',
                                     'dydx_order_id': tp_order_id2,
                                 }
@@ -5227,7 +5516,7 @@ class TestnetTrader:
                     return None
 
                 for rest_pos in positions or []:
-                    if rest_pos.get("market") != "BTC-USD":
+                    if rest_pos.get("market") != self.dydx_market:
                         continue
                     raw_size = _coerce_float(rest_pos.get("size", 0.0), default=0.0)
                     if abs(raw_size) <= 0.0001:
@@ -5249,7 +5538,7 @@ class TestnetTrader:
                         "side": side,
                         "size": abs(raw_size),
                         "entry_price": entry_price,
-                        "entry_time": datetime.now(),
+                        "entry_time": self.clock.now(),
                     }
 
                 return None
@@ -5267,7 +5556,7 @@ class TestnetTrader:
                 print("⚠️ [REST] 未取得持倉，先使用本地追蹤資料平倉")
 
             # ✅ 平倉前先把未平倉掛單清空（避免 TP/SL 交錯成交、或留單累積）
-            await self._dydx_sweep_open_orders(reason=f"pre_close:{reason}", market="BTC-USD")
+            await self._dydx_sweep_open_orders(reason=f"pre_close:{reason}", market=self.dydx_market)
             
             max_attempts = 2 if rest_mismatch else 1
             tx_hash = None
@@ -5354,13 +5643,13 @@ class TestnetTrader:
                 # 🆕 v14.6.11: 等待 WebSocket 確認平倉 (最多 3 秒)
                 if hasattr(self, 'dydx_ws') and self.dydx_ws:
                     for _ in range(6):  # 最多等 3 秒 (6 x 0.5s)
-                        await asyncio.sleep(0.5)
-                        if not self.dydx_ws.has_position("BTC-USD"):
+                        await self.clock.async_sleep(0.5)
+                        if not self.dydx_ws.has_position(self.dydx_market):
                             print(f"📶 [WS] 平倉已確認!")
                             break
 
                 # ✅ v14.6.26: 平倉後必須清空所有未成交掛單，才能開新單
-                await self._dydx_sweep_open_orders(reason=f"post_close:{reason}", market="BTC-USD")
+                await self._dydx_sweep_open_orders(reason=f"post_close:{reason}", market=self.dydx_market)
                 
                 # 清除本地追蹤
                 self.pending_sl_order = None
@@ -5473,7 +5762,50 @@ class TestnetTrader:
             self.daily_pnl = data.get('daily_pnl', 0.0)
     
     def _save_trades(self):
-        """保存交易記錄"""
+        """
+        保存交易記錄
+
+        有交易存放庫時: 只寫入未平倉與剛平倉的交易 (已平倉且寫過的不再重寫)，一個交易事務提交；
+        否則退回整檔重寫 trades_*.json。
+        """
+        if self.trade_store is None:
+            self.export_trades()
+            return
+        pending = [t for t in self.trades if t.trade_id not in self._stored_closed_ids]
+        if not pending:
+            return
+        card = getattr(self.config, 'card_id', '') or ''
+        self.trade_store.upsert_many((t.to_dict() for t in pending), session=self.session_id, card=card)
+        self._stored_closed_ids.update(t.trade_id for t in pending if t.status != "OPEN")
+
+    def _trades_session_info(self) -> Dict:
+        return {
+            'daily_trades': self.daily_trades,
+            'daily_pnl': self.daily_pnl,
+            'total_pnl': self.total_pnl,
+            # 🆕 會話資訊
+            'session': {
+                'mode': 'live' if not self.paper_mode else 'paper',
+                'dydx_sync': self.dydx_sync_enabled,
+                'card_id': getattr(self.config, 'card_id', '') or '',
+                'initial_balance': self.initial_balance,
+                'current_balance': self.current_balance,
+                'session_start': self.session_start_time.isoformat() if hasattr(self, 'session_start_time') else None,
+            }
+        }
+
+    def export_trades(self, path: Optional[Path] = None) -> Path:
+        """
+        匯出本會話的 trades_*.json (原子寫入: 暫存檔 + os.replace)
+
+        Args:
+            path: 目標檔案 (預設 self.trades_file)
+        """
+        path = Path(path) if path else self.trades_file
+        if self.trade_store is not None:
+            self._save_trades()
+            return self.trade_store.export_json(path, self.session_id, extra=self._trades_session_info())
+
         # 計算統計資訊
         closed_trades = [t for t in self.trades if t.status != "OPEN"]
         wins = [t for t in closed_trades if t.net_pnl_usdt > 0]
@@ -5481,10 +5813,8 @@ class TestnetTrader:
         
         data = {
             'trades': [t.to_dict() for t in self.trades],
-            'daily_trades': self.daily_trades,
-            'daily_pnl': self.daily_pnl,
-            'total_pnl': self.total_pnl,
-            'last_updated': datetime.now().isoformat(),
+            **self._trades_session_info(),
+            'last_updated': self.clock.now().isoformat(),
             # 🆕 v14.9.7: 增加統計摘要 (方便分析)
             'statistics': {
                 'total_trades': len(closed_trades),
@@ -5498,17 +5828,12 @@ class TestnetTrader:
                 'avg_hold_seconds': sum(t.hold_seconds for t in closed_trades) / len(closed_trades) if closed_trades else 0,
                 'profit_factor': abs(sum(t.net_pnl_usdt for t in wins) / sum(t.net_pnl_usdt for t in losses)) if losses and sum(t.net_pnl_usdt for t in losses) != 0 else 0,
             },
-            # 🆕 會話資訊
-            'session': {
-                'mode': 'live' if not self.paper_mode else 'paper',
-                'dydx_sync': self.dydx_sync_enabled,
-                'initial_balance': self.initial_balance,
-                'current_balance': self.current_balance,
-                'session_start': self.session_start_time.isoformat() if hasattr(self, 'session_start_time') else None,
-            }
         }
-        with open(self.trades_file, 'w') as f:
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, 'w') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
     
     def _save_signal_log(self, signal_type: str, direction: str, reason: str, 
                          market_data: Dict = None, six_dim: Dict = None, 
@@ -5524,7 +5849,7 @@ class TestnetTrader:
         alignment = alignment or {}
         
         signal_record = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self.clock.now().isoformat(),
             'signal_type': signal_type,  # REJECTED_MTF, REJECTED_SCORE, ENTERED
             'direction': direction,
             'reason': reason,
@@ -5575,7 +5900,7 @@ class TestnetTrader:
             'total_signals': len(self._signal_logs),
             'entered_count': sum(1 for s in self._signal_logs if s['signal_type'] == 'ENTERED'),
             'rejected_count': sum(1 for s in self._signal_logs if s['signal_type'].startswith('REJECTED')),
-            'last_updated': datetime.now().isoformat()
+            'last_updated': self.clock.now().isoformat()
         }
         with open(self.signals_file, 'w') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
@@ -5590,7 +5915,7 @@ class TestnetTrader:
         if getattr(self, 'dydx_sync_enabled', False) and getattr(self, 'dydx_api', None):
             # 優先使用 WebSocket 緩存的持倉 (更即時)
             if hasattr(self, 'dydx_ws') and self.dydx_ws:
-                ws_pos = self.dydx_ws.get_position("BTC-USD")
+                ws_pos = self.dydx_ws.get_position(self.dydx_market)
                 if ws_pos:
                     size = float(ws_pos.get('raw_size', 0))
                     if abs(size) > 0.0001:
@@ -5633,13 +5958,13 @@ class TestnetTrader:
             return None
         
         # 檢查緩存
-        now = time.time()
+        now = self.clock.time()
         if (self._external_position_cache_time > 0 and 
             now - self._external_position_cache_time < self._external_position_cache_ttl):
             return self._external_position_cache
         
         try:
-            pos = self.testnet_api.get_position("BTCUSDT")
+            pos = self.testnet_api.get_position(self.binance_symbol)
             if pos:
                 amt = float(pos.get('positionAmt', 0))
                 if amt != 0:
@@ -5671,7 +5996,7 @@ class TestnetTrader:
             return True
             
         try:
-            symbol = self.config.symbol.replace('/', '')
+            symbol = self.binance_symbol
             # 使用 Testnet API
             if self.testnet_api:
                 success = self.testnet_api.set_leverage(symbol, self.config.leverage)
@@ -5758,6 +6083,78 @@ class TestnetTrader:
         preview = list(self._random_wave1) + list(self._random_wave2)
         return preview[:count]
     
+    # ==================== 多幣種協調器 ====================
+    
+    def _coordinator_reserve(self, margin_usdt: float) -> bool:
+        """
+        多幣種模式: 開倉前向中央協調器預留共用保證金
+        
+        開倉期間由 _coordinator_keepalive() 持續延長預留，開倉失敗時由 open_position 呼叫
+        _coordinator_release()；TTL 只是進程中途掛掉時的保險。
+        協調器無回應時保守地拒絕開倉。
+        """
+        if self.coordinator is None:
+            return True
+        try:
+            decision = self.coordinator.request_entry(self.dydx_market, float(margin_usdt or 0.0))
+        except Exception as e:
+            print(f"⚠️ 無法開倉: 多幣種協調器無回應 ({e})")
+            return False
+        if not decision.get('allowed', False):
+            print(f"⚠️ 無法開倉: {decision.get('reason', '共用預算不足')}")
+            return False
+        return True
+    
+    def _coordinator_keepalive(self) -> Optional[threading.Event]:
+        """
+        多幣種模式: 開倉進行中定期延長預留 (Maker 等待 / 確認輪詢可能超過 TTL)
+
+        Returns:
+            停止事件 (開倉結束時 set)；非多幣種模式為 None
+        """
+        if self.coordinator is None:
+            return None
+        stop = threading.Event()
+
+        def _run() -> None:
+            interval = 1.0
+            while not stop.wait(interval):
+                try:
+                    ttl = self.coordinator.refresh_reservation(self.dydx_market)
+                except Exception as e:
+                    logging.debug(f"多幣種協調器延長預留失敗: {e}")
+                    continue
+                if ttl <= 0:
+                    return
+                interval = max(0.5, ttl / 3)
+
+        threading.Thread(target=_run, name=f"coordinator-keepalive-{self.dydx_market}", daemon=True).start()
+        return stop
+
+    def _coordinator_release(self) -> None:
+        """多幣種模式: 開倉失敗時釋放預留"""
+        if self.coordinator is None:
+            return
+        try:
+            self.coordinator.release(self.dydx_market)
+        except Exception as e:
+            logging.debug(f"多幣種協調器釋放預留失敗: {e}")
+    
+    def _coordinator_sync(self, net_pnl: Optional[float] = None) -> None:
+        """多幣種模式: 回報目前占用的保證金 (無持倉為 0)，平倉時一併回報淨損益"""
+        if self.coordinator is None:
+            return
+        trade = self.active_trade
+        margin = 0.0
+        if trade is not None:
+            margin = _coerce_float(trade.position_size_usdt, default=0.0) / max(1, _coerce_int(trade.leverage, default=1))
+        try:
+            self.coordinator.update_exposure(self.dydx_market, margin)
+            if net_pnl is not None:
+                self.coordinator.record_pnl(self.dydx_market, float(net_pnl))
+        except Exception as e:
+            logging.debug(f"多幣種協調器回報失敗: {e}")
+    
     def can_trade(self) -> tuple[bool, str]:
         """檢查是否可以交易"""
         # 檢查持倉
@@ -5765,13 +6162,13 @@ class TestnetTrader:
             return False, "已有持倉中"
 
         # 連續虧損冷卻
-        if time.time() < self.cooldown_until:
-            remain = self.cooldown_until - time.time()
+        if self.clock.time() < self.cooldown_until:
+            remain = self.cooldown_until - self.clock.time()
             return False, f"連續虧損冷卻中 ({remain/60:.1f}分)"
         
         # 檢查交易間隔
-        if time.time() - self.last_trade_time < self.config.min_trade_interval_sec:
-            remain = self.config.min_trade_interval_sec - (time.time() - self.last_trade_time)
+        if self.clock.time() - self.last_trade_time < self.config.min_trade_interval_sec:
+            remain = self.config.min_trade_interval_sec - (self.clock.time() - self.last_trade_time)
             return False, f"交易冷卻中 ({remain:.0f}s)"
         
         # 🔧 v10.8: 移除每日交易上限 (讓 AI 自由交易)
@@ -6133,7 +6530,7 @@ class TestnetTrader:
             'current_price': current_price,
             'position_btc': position_btc,
             'signal_strength': signal_strength,
-            'created_time': time.time(),
+            'created_time': self.clock.time(),
             'market_data': market_data.copy(),
             'status': 'PENDING',  # PENDING, FILLED, CANCELLED
             'fill_price': None,
@@ -6175,7 +6572,7 @@ class TestnetTrader:
         created_time = order['created_time']
         
         # 檢查是否需要取消 (信號減弱或超時)
-        elapsed = time.time() - created_time
+        elapsed = self.clock.time() - created_time
         
         # 1. 信號減弱到取消閾值
         if signal_strength < self.config.pre_entry_cancel_threshold:
@@ -6205,7 +6602,7 @@ class TestnetTrader:
             fill_price = order_price
             order['status'] = 'FILLED'
             order['fill_price'] = fill_price
-            order['fill_time'] = time.time()
+            order['fill_time'] = self.clock.time()
             
             print(f"\n{'='*60}")
             print(f"✅ 預掛單成交! [{direction}]")
@@ -6271,7 +6668,7 @@ class TestnetTrader:
             'tp_price': tp_price,
             'target_pct': target_pct,
             'leverage': leverage,
-            'created_time': time.time(),
+            'created_time': self.clock.time(),
             'status': 'PENDING',
             'dydx_order_id': None  # 🆕 追蹤 dYdX 訂單 ID
         }
@@ -6366,7 +6763,7 @@ class TestnetTrader:
             'sl_price': sl_price,
             'stop_pct': -stop_pct,  # 🔧 v14.6.28: 統一符號（負=虧損）
             'leverage': leverage,
-            'created_time': time.time(),
+            'created_time': self.clock.time(),
             'status': 'PENDING',
             'dydx_order_id': None  # 追蹤 dYdX 訂單 ID
         }
@@ -6454,7 +6851,7 @@ class TestnetTrader:
         actual_size = 0.0
         actual_entry = 0.0
         for pos in positions or []:
-            if pos.get("market") != "BTC-USD":
+            if pos.get("market") != self.dydx_market:
                 continue
             raw_size = _coerce_float(pos.get("size", 0.0), default=0.0)
             if abs(raw_size) <= 0.0001:
@@ -6475,7 +6872,7 @@ class TestnetTrader:
                 fills = []
             close_side = "BUY" if actual_side == "LONG" else "SELL"
             for fill in fills or []:
-                if fill.get("market") != "BTC-USD":
+                if fill.get("market") != self.dydx_market:
                     continue
                 if fill.get("side") == close_side:
                     actual_entry = _coerce_float(fill.get("price", 0.0), default=0.0)
@@ -6500,7 +6897,7 @@ class TestnetTrader:
             "side": direction,
             "size": actual_size,
             "entry_price": entry_price,
-            "entry_time": datetime.now(),
+            "entry_time": self.clock.now(),
             "tp_order_id": existing_tp_id,
             "sl_order_id": existing_sl_id,
         }
@@ -6512,11 +6909,11 @@ class TestnetTrader:
             getattr(self.config, "dydx_bracket_sweep_interval_sec", 5.0),
             default=5.0,
         )
-        now_ts = time.time()
+        now_ts = self.clock.time()
         last_sweep_ts = getattr(self, "_last_dydx_bracket_sweep_ts", 0.0)
         if (now_ts - last_sweep_ts) >= sweep_interval_sec:
             try:
-                asyncio.run(self._dydx_sweep_open_orders(reason="pre_place_brackets", market="BTC-USD"))
+                asyncio.run(self._dydx_sweep_open_orders(reason="pre_place_brackets", market=self.dydx_market))
                 self._last_dydx_bracket_sweep_ts = now_ts
             except Exception as e:
                 print(f"⚠️ dYdX 清單失敗: {e}")
@@ -6566,18 +6963,29 @@ class TestnetTrader:
         
         # 🔧 v14.6.17: 檢查是否已有 TP 訂單，避免重複掛單
         existing_tp_id = self.dydx_real_position.get("tp_order_id", 0) if self.dydx_real_position else 0
+
+        # SL / TP 一起排入下單管線，依序送出並統一限流 (不再各自 asyncio.run 等待來回)
+        sl_future = self._submit_dydx_intent("SL", functools.partial(
+            self.dydx_api.place_stop_loss_order,
+            side=direction,
+            size=dydx_size,
+            stop_price=sl_price,
+            time_to_live_seconds=3600,
+        ))
+        tp_future = None
+        if not (existing_tp_id and existing_tp_id > 0):
+            tp_future = self._submit_dydx_intent("TP", functools.partial(
+                self.dydx_api.place_take_profit_order,
+                side=direction,
+                size=dydx_size,
+                tp_price=tp_price,
+                time_to_live_seconds=3600,
+            ))
         
         # 1. 掛止損單 (STOP_LOSS + reduce_only)
         try:
             print(f"\n   📉 掛 dYdX 止損單...")
-            tx_hash_sl, order_id_sl = asyncio.run(
-                self.dydx_api.place_stop_loss_order(
-                    side=direction,
-                    size=dydx_size,
-                    stop_price=sl_price,
-                    time_to_live_seconds=3600
-                )
-            )
+            tx_hash_sl, order_id_sl = sl_future.result(timeout=60)
             if tx_hash_sl and order_id_sl:
                 self.pending_sl_order = {
                     'direction': direction,
@@ -6585,7 +6993,7 @@ class TestnetTrader:
                     'sl_price': sl_price,
                     'stop_pct': -stop_pct,  # 🔧 v14.6.28: 統一符號（負=虧損）
                     'leverage': leverage,
-                    'created_time': time.time(),
+                    'created_time': self.clock.time(),
                     'status': 'PENDING',
                     'dydx_order_id': order_id_sl
                 }
@@ -6603,14 +7011,7 @@ class TestnetTrader:
         else:
             try:
                 print(f"\n   📈 掛 dYdX 止盈單...")
-                tx_hash_tp, order_id_tp = asyncio.run(
-                    self.dydx_api.place_take_profit_order(
-                        side=direction,
-                        size=dydx_size,
-                        tp_price=tp_price,
-                        time_to_live_seconds=3600
-                    )
-                )
+                tx_hash_tp, order_id_tp = tp_future.result(timeout=60)
                 if tx_hash_tp and order_id_tp:
                     self.pending_tp_order = {
                         'direction': direction,
@@ -6618,7 +7019,7 @@ class TestnetTrader:
                         'tp_price': tp_price,
                         'target_pct': target_pct,
                         'leverage': leverage,
-                        'created_time': time.time(),
+                        'created_time': self.clock.time(),
                         'status': 'PENDING',
                         'dydx_order_id': order_id_tp
                     }
@@ -6797,7 +7198,7 @@ class TestnetTrader:
         """🧠 v14.6.14: JSONL 記憶日誌（用於追查掛單/取消順序）"""
         try:
             payload = {
-                "ts": datetime.now().isoformat(),
+                "ts": self.clock.now().isoformat(),
                 "run_id": getattr(self, "_dydx_run_id", None),
                 "cwd": os.getcwd(),
                 "event": event,
@@ -6818,7 +7219,8 @@ class TestnetTrader:
                 except Exception:
                     pass
 
-    def _register_dydx_order(self, order_id: int, order_type: str, kind: str, market: str = "BTC-USD"):
+    def _register_dydx_order(self, order_id: int, order_type: str, kind: str, market: Optional[str] = None):
+        market = market or self.dydx_market
         try:
             oid = int(order_id)
             if oid <= 0:
@@ -6827,7 +7229,7 @@ class TestnetTrader:
                 "order_type": order_type,
                 "kind": kind,
                 "market": market,
-                "created_ts": time.time(),
+                "created_ts": self.clock.time(),
             }
             self._journal_dydx_event(
                 "order_registered",
@@ -6866,11 +7268,21 @@ class TestnetTrader:
         # 避免迭代時修改 dict
         order_items = list(self._dydx_order_registry.items())
         failed_count = 0
-        for order_id, meta in order_items:
+        batch = None
+        if self._dydx_pipeline_running():
+            # 一次排入全部撤單，管線依序送出並統一限流 (已在途的 client id 不重送)
+            batch = self.dydx_orders.cancel_batch([
+                (order_id, functools.partial(self.dydx_api.cancel_order, order_id, order_type=meta.get("order_type")))
+                for order_id, meta in order_items
+            ])
+        for index, (order_id, meta) in enumerate(order_items):
             order_type = meta.get("order_type")
             try:
-                import asyncio
-                asyncio.run(self.dydx_api.cancel_order(order_id, order_type=order_type))
+                if batch is not None:
+                    if batch[index].result(timeout=60) is False:
+                        raise RuntimeError("cancel rejected")
+                else:
+                    asyncio.run(self.dydx_api.cancel_order(order_id, order_type=order_type))
                 print(f"   ✅ dYdX 訂單已取消: {order_id} ({order_type})")
                 self._journal_dydx_event(
                     "order_cancelled",
@@ -6894,16 +7306,16 @@ class TestnetTrader:
         # 🔧 v14.6.32: 如果有失敗的，用 sweep 模式補救（它會從 API 取得正確的 GTBT）
         if failed_count > 0:
             try:
-                import asyncio
-                asyncio.run(self._dydx_sweep_open_orders(reason=f"fallback_sweep:{reason}", market="BTC-USD"))
+                asyncio.run(self._dydx_sweep_open_orders(reason=f"fallback_sweep:{reason}", market=self.dydx_market))
             except Exception:
                 pass
 
-    async def _dydx_sweep_open_orders(self, reason: str, market: str = "BTC-USD") -> int:
+    async def _dydx_sweep_open_orders(self, reason: str, market: Optional[str] = None) -> int:
         """在開新一輪/平倉/止損更新前，統一清空 dYdX 未平倉掛單。
 
         目的：避免 TP/SL/中間數更新造成掛單累積，導致誤判或觸發 equity tier 的 order count limit。
         """
+        market = market or self.dydx_market
         if not (self.dydx_sync_enabled and self.dydx_api):
             return 0
 
@@ -6911,12 +7323,22 @@ class TestnetTrader:
         had_local_tracking = bool(self.pending_tp_order or self.pending_sl_order or self._dydx_order_registry)
         sweep_ok = False
         try:
-            cancelled = await self.dydx_api.cancel_open_orders(symbol=market, status=["OPEN", "UNTRIGGERED"])
-            # 條件單有時需要 CONDITIONAL flag 取消才會真的消失，額外補一槍
-            try:
-                cancelled += await self.dydx_api.cancel_all_conditional_orders()
-            except Exception:
-                pass
+            if self._dydx_pipeline_running():
+                # 批次撤單: 同一輪送出、依 client id 去重，交易數由管線統一限流
+                found, cancelled = await self._dydx_cancel_orders_batched(market)
+                if cancelled < found:
+                    # 有撤單失敗才補掃條件單
+                    try:
+                        cancelled += await self.dydx_api.cancel_all_conditional_orders()
+                    except Exception:
+                        pass
+            else:
+                cancelled = await self.dydx_api.cancel_open_orders(symbol=market, status=["OPEN", "UNTRIGGERED"])
+                # 條件單有時需要 CONDITIONAL flag 取消才會真的消失，額外補一槍
+                try:
+                    cancelled += await self.dydx_api.cancel_all_conditional_orders()
+                except Exception:
+                    pass
             sweep_ok = True
             self._journal_dydx_event(
                 "orders_swept",
@@ -6949,8 +7371,9 @@ class TestnetTrader:
 
         return cancelled
 
-    async def _dydx_sweep_on_limit_error(self, err: dict, reason: str, market: str = "BTC-USD") -> bool:
+    async def _dydx_sweep_on_limit_error(self, err: dict, reason: str, market: Optional[str] = None) -> bool:
         """遇到 order count / rate limit 時，清掃殘留訂單後再重試。"""
+        market = market or self.dydx_market
         try:
             code = int(err.get("code") or 0)
         except Exception:
@@ -6958,7 +7381,7 @@ class TestnetTrader:
         if code not in (10001, 5001):
             return False
 
-        now_ts = time.time()
+        now_ts = self.clock.time()
         last_ts = getattr(self, "_last_dydx_limit_sweep_ts", 0.0)
         if now_ts - last_ts < 8.0:
             return False
@@ -6988,7 +7411,10 @@ class TestnetTrader:
         found_count = 0
         cancelled_count = 0
         try:
-            found_count, cancelled_count = await self.dydx_api.cancel_all_conditional_orders(return_details=True)
+            if self._dydx_pipeline_running():
+                found_count, cancelled_count = await self._dydx_cancel_orders_batched(conditional_only=True)
+            else:
+                found_count, cancelled_count = await self.dydx_api.cancel_all_conditional_orders(return_details=True)
             result = "ok" if (found_count == 0 or cancelled_count == found_count) else "partial"
             self._journal_dydx_event(
                 "conditional_orders_cancelled",
@@ -7022,8 +7448,9 @@ class TestnetTrader:
 
         return found_count, cancelled_count
 
-    async def _dydx_cancel_open_tp_orders(self, reason: str, symbol: str = "BTC-USD") -> int:
+    async def _dydx_cancel_open_tp_orders(self, reason: str, symbol: Optional[str] = None) -> int:
         """取消所有非條件單（TP/GTT），避免止盈重複掛單累積。"""
+        symbol = symbol or self.dydx_market
         if not (self.dydx_sync_enabled and self.dydx_api):
             return 0
 
@@ -7113,16 +7540,21 @@ class TestnetTrader:
                 return val
         return 0.0
 
-    async def _get_open_conditional_orders(self, symbol: str = "BTC-USD") -> list[dict]:
+    async def _get_open_conditional_orders(self, symbol: Optional[str] = None) -> list[dict]:
+        symbol = symbol or self.dydx_market
         if not self.dydx_sync_enabled or not self.dydx_api:
             return []
+        if self._dydx_state_live():
+            orders = self.dydx_state.get_open_orders(symbol=symbol)
+            return [o for o in orders if self._is_dydx_conditional_order(o)]
         try:
             orders = await self.dydx_api.get_open_orders(symbol=symbol)
         except Exception:
             return []
         return [o for o in orders if self._is_dydx_conditional_order(o)]
 
-    def _get_open_conditional_orders_sync(self, symbol: str = "BTC-USD") -> list[dict]:
+    def _get_open_conditional_orders_sync(self, symbol: Optional[str] = None) -> list[dict]:
+        symbol = symbol or self.dydx_market
         import asyncio
 
         if not self.dydx_sync_enabled or not self.dydx_api:
@@ -7158,7 +7590,8 @@ class TestnetTrader:
             })
         return summaries
 
-    async def _get_dydx_open_orders_snapshot(self, symbol: str = "BTC-USD") -> dict:
+    async def _get_dydx_open_orders_snapshot(self, symbol: Optional[str] = None) -> dict:
+        symbol = symbol or self.dydx_market
         if not self.dydx_sync_enabled or not self.dydx_api:
             return {
                 "orders": [],
@@ -7166,10 +7599,13 @@ class TestnetTrader:
                 "sl_count": 0,
                 "tp_count": 0,
             }
-        try:
-            orders = await self.dydx_api.get_open_orders(status=["OPEN", "UNTRIGGERED"], symbol=symbol)
-        except Exception:
-            orders = []
+        if self._dydx_state_live():
+            orders = self.dydx_state.get_open_orders(status=["OPEN", "UNTRIGGERED"], symbol=symbol)
+        else:
+            try:
+                orders = await self.dydx_api.get_open_orders(status=["OPEN", "UNTRIGGERED"], symbol=symbol)
+            except Exception:
+                orders = []
         sl_orders = [o for o in orders if self._is_dydx_conditional_order(o)]
         tp_orders = [o for o in orders if not self._is_dydx_conditional_order(o)]
         return {
@@ -7179,7 +7615,8 @@ class TestnetTrader:
             "tp_count": len(tp_orders),
         }
 
-    async def _log_dydx_protection_snapshot(self, reason: str, symbol: str = "BTC-USD"):
+    async def _log_dydx_protection_snapshot(self, reason: str, symbol: Optional[str] = None):
+        symbol = symbol or self.dydx_market
         if not self.dydx_sync_enabled or not self.dydx_api:
             return
         snapshot = await self._get_dydx_open_orders_snapshot(symbol=symbol)
@@ -7201,20 +7638,24 @@ class TestnetTrader:
             dydx_position=position_payload,
         )
 
-    async def _ensure_dydx_protection_orders(self, reason: str = "periodic_check", symbol: str = "BTC-USD") -> None:
+    async def _ensure_dydx_protection_orders(self, reason: str = "periodic_check", symbol: Optional[str] = None) -> None:
+        symbol = symbol or self.dydx_market
         if not self.dydx_sync_enabled or not self.dydx_api:
             return
         if not self.active_trade or not self.dydx_real_position:
             return
 
         live_pos = None
-        try:
-            if hasattr(self.dydx_api, "get_positions_fresh"):
-                positions = await self.dydx_api.get_positions_fresh()
-            else:
-                positions = await self.dydx_api.get_positions()
-        except Exception:
-            positions = []
+        if self._dydx_state_live():
+            positions = self.dydx_state.get_positions()
+        else:
+            try:
+                if hasattr(self.dydx_api, "get_positions_fresh"):
+                    positions = await self.dydx_api.get_positions_fresh()
+                else:
+                    positions = await self.dydx_api.get_positions()
+            except Exception:
+                positions = []
         for pos in positions or []:
             if pos.get("market") != symbol:
                 continue
@@ -7227,14 +7668,14 @@ class TestnetTrader:
                 "side": side,
                 "size": abs(raw_size),
                 "entry_price": entry_price,
-                "entry_time": datetime.now(),
+                "entry_time": self.clock.now(),
             }
             break
         if not live_pos:
             return
         self.dydx_real_position = live_pos
 
-        now_ts = time.time()
+        now_ts = self.clock.time()
         cooldown_sec = _coerce_float(getattr(self.config, "dydx_protection_check_cooldown_sec", 6.0), default=6.0)
         if now_ts - getattr(self, "_last_dydx_protection_check_ts", 0.0) < cooldown_sec:
             return
@@ -7247,7 +7688,11 @@ class TestnetTrader:
         has_tp = tp_count > 0
 
         if tp_count > 1:
+            state_version = self.dydx_state.version if self._dydx_state_live() else None
             await self._dydx_cancel_open_tp_orders(reason="tp_dedupe", symbol=symbol)
+            if state_version is not None:
+                # 等 Indexer 推送撤單結果，避免讀到撤單前的快照
+                await asyncio.to_thread(self.dydx_state.wait_for_update, state_version, 3.0)
             snapshot = await self._get_dydx_open_orders_snapshot(symbol=symbol)
             tp_count = snapshot.get("tp_count", 0)
             has_tp = tp_count > 0
@@ -7355,7 +7800,7 @@ class TestnetTrader:
                     "tp_price": tp_price,
                     "target_pct": target_pct,
                     "leverage": leverage,
-                    "created_time": time.time(),
+                    "created_time": self.clock.time(),
                     "status": "PENDING",
                     "dydx_order_id": order_id,
                 }
@@ -7400,7 +7845,7 @@ class TestnetTrader:
         if not self.dydx_sync_enabled or not self.dydx_api:
             return False
         
-        now_ts = time.time()
+        now_ts = self.clock.time()
         guard_sec = _coerce_float(getattr(self.config, "sl_update_guard_sec", 1.0), default=1.0)
         last_exec = getattr(self, "_last_sl_update_exec_ts", 0.0)
         if (now_ts - last_exec) < guard_sec:
@@ -7412,7 +7857,7 @@ class TestnetTrader:
         try:
             positions = await self._get_dydx_positions_with_cache()
             for pos in positions:
-                if pos.get('market') == 'BTC-USD' and abs(float(pos.get('size', 0))) > 0.0001:
+                if pos.get('market') == self.dydx_market and abs(float(pos.get('size', 0))) > 0.0001:
                     raw_size = float(pos.get('size', 0))
                     refreshed_pos = {
                         "side": "LONG" if raw_size > 0 else "SHORT",
@@ -7425,7 +7870,7 @@ class TestnetTrader:
                     "side": refreshed_pos["side"],
                     "size": refreshed_pos["size"],
                     "entry_price": refreshed_pos["entry_price"],
-                    "entry_time": datetime.now(),
+                    "entry_time": self.clock.now(),
                 }
         except Exception:
             refreshed_pos = None
@@ -7434,7 +7879,7 @@ class TestnetTrader:
             return False
 
         # backoff 期間不要嘗試掛/取消（避免 block rate limit）
-        now_ts = time.time()
+        now_ts = self.clock.time()
         if now_ts < getattr(self, "_dydx_tx_backoff_until", 0.0):
             return False
 
@@ -7566,6 +8011,24 @@ class TestnetTrader:
                 if new_sl_price >= old_sl_price:
                     return False  # 不需更新
 
+        # 撤舊條件單 + 掛新 SL 走下單管線: 快速行情下連續的止損移動只送最後一次
+        return await self._run_dydx_intent(
+            "SL",
+            lambda: self._dydx_replace_stop_loss(
+                trade_direction, trade_entry_price, new_sl_price, new_stop_pct, leverage,
+            ),
+            cost=2,
+        )
+
+    async def _dydx_replace_stop_loss(
+        self,
+        trade_direction: str,
+        trade_entry_price: float,
+        new_sl_price: float,
+        new_stop_pct: float,
+        leverage: float,
+    ) -> bool:
+        """撤掉交易所上的條件單並掛新 SL (由 update_dydx_stop_loss_async 經下單管線呼叫)"""
         # 🛡️ 若本地沒有 pending_sl_order（常見於重啟後狀態遺失），
         # 先清空交易所上的條件單，避免重複掛多張 SL。
         if not self.pending_sl_order:
@@ -7586,7 +8049,7 @@ class TestnetTrader:
 
         # 若找到條件單但未能全部取消，先 backoff，避免疊單觸發 order count limit
         if found_count > 0 and cancelled_count < found_count:
-            self._dydx_tx_backoff_until = time.time() + 12.0
+            self._dydx_tx_backoff_until = self.clock.time() + 12.0
             try:
                 err = self.dydx_api.get_last_tx_error() if self.dydx_api else {}
             except Exception:
@@ -7636,7 +8099,7 @@ class TestnetTrader:
                                 'sl_price': new_sl_price,
                                 'stop_pct': new_stop_pct,
                                 'leverage': leverage,
-                                'created_time': time.time(),
+                                'created_time': self.clock.time(),
                                 'status': 'PENDING',
                                 'dydx_order_id': order_id
                             }
@@ -7658,7 +8121,7 @@ class TestnetTrader:
                             return True
 
                     backoff = 15.0 if code == 5001 else 12.0
-                    self._dydx_tx_backoff_until = time.time() + backoff
+                    self._dydx_tx_backoff_until = self.clock.time() + backoff
                     print(f"   ⚠️ dYdX 拒單，進入 backoff {backoff:.0f}s | codespace={codespace} code={code}")
                     try:
                         await self._dydx_cancel_conditional_orders(reason="sl_place_failed_backoff_cleanup")
@@ -7667,7 +8130,7 @@ class TestnetTrader:
                     return False
 
                 # 其他未知失敗：短暫 backoff，交給下一輪再嘗試
-                self._dydx_tx_backoff_until = time.time() + 8.0
+                self._dydx_tx_backoff_until = self.clock.time() + 8.0
                 return False
 
             if tx_hash and order_id:
@@ -7677,7 +8140,7 @@ class TestnetTrader:
                     'sl_price': new_sl_price,
                     'stop_pct': new_stop_pct,
                     'leverage': leverage,
-                    'created_time': time.time(),
+                    'created_time': self.clock.time(),
                     'status': 'PENDING',
                     'dydx_order_id': order_id
                 }
@@ -7758,6 +8221,17 @@ class TestnetTrader:
         
         print(f"🔄 更新 dYdX 止盈: ${new_tp_price:,.2f}")
 
+        return await self._run_dydx_intent(
+            "TP",
+            lambda: self._dydx_replace_take_profit(trade, new_tp_price, new_target_pct),
+            cost=2,
+        )
+
+    async def _dydx_replace_take_profit(self, trade, new_tp_price: float, new_target_pct: Optional[float]) -> bool:
+        """撤掉舊 TP 並掛新 TP (由 update_dydx_take_profit_async 經下單管線呼叫)"""
+        if not self.dydx_real_position:
+            return False
+
         # 1) 取消舊 TP（避免留下多張訂單造成開反向倉）
         cancelled_tp = 0
         try:
@@ -7804,7 +8278,7 @@ class TestnetTrader:
                     'tp_price': new_tp_price,
                     'target_pct': target_pct,
                     'leverage': trade.actual_leverage or self.config.leverage,
-                    'created_time': time.time(),
+                    'created_time': self.clock.time(),
                     'status': 'PENDING',
                     'dydx_order_id': order_id
                 }
@@ -7847,7 +8321,7 @@ class TestnetTrader:
                         'tp_price': new_tp_price,
                         'target_pct': target_pct,
                         'leverage': trade.actual_leverage or self.config.leverage,
-                        'created_time': time.time(),
+                        'created_time': self.clock.time(),
                         'status': 'PENDING',
                         'dydx_order_id': order_id
                     }
@@ -7911,7 +8385,7 @@ class TestnetTrader:
         if not use_phase and not use_integer:
             return
 
-        now_ts = time.time()
+        now_ts = self.clock.time()
         cooldown_sec = _coerce_float(getattr(cfg, "tp_update_cooldown_sec", 0.0), default=0.0)
         if cooldown_sec > 0 and (now_ts - getattr(self, "_last_tp_update_ts", 0.0)) < cooldown_sec:
             return
@@ -7932,7 +8406,7 @@ class TestnetTrader:
 
                 two_phase_mgr = getattr(self, "_two_phase_exit_manager", None)
                 if two_phase_mgr is None:
-                    two_phase_mgr = TwoPhaseExitManager(self.config)
+                    two_phase_mgr = TwoPhaseExitManager(self.config, clock=self.clock)
 
                 phase_info = two_phase_mgr.get_current_phase(net_pnl_pct, max_net, market_data or {})
                 current_phase = phase_info.get("phase")
@@ -8182,7 +8656,7 @@ class TestnetTrader:
         # 🆕 寬限期：入場後 early_stop_grace_sec 內，價格移動若未超過噪音*sigma，則不觸發止損
         try:
             entry_ts = datetime.fromisoformat(trade.entry_time)
-            elapsed = (datetime.now() - entry_ts).total_seconds()
+            elapsed = (self.clock.now() - entry_ts).total_seconds()
             if elapsed < self.config.early_stop_grace_sec:
                 noise = max(self._get_noise_pct(60), self._get_noise_pct(300))
                 move_pct = abs((current_price - trade.entry_price) / trade.entry_price * 100)
@@ -8241,7 +8715,7 @@ class TestnetTrader:
                     # 已有條件單或已排程更新，不視為缺單
                     self._dydx_sl_missing_since = None
                 else:
-                    now_ts = time.time()
+                    now_ts = self.clock.time()
                     missing_since = getattr(self, "_dydx_sl_missing_since", None)
                     if missing_since is None:
                         self._dydx_sl_missing_since = now_ts
@@ -8282,7 +8756,7 @@ class TestnetTrader:
             
             if should_update_sl:
                 # 🔧 v14.6.31: 節流 + backoff，避免取消/掛單失敗時狂刷，造成 block rate limit 與疊單
-                now_ts = time.time()
+                now_ts = self.clock.time()
                 if now_ts < getattr(self, "_dydx_tx_backoff_until", 0.0):
                     # backoff 期間不排程
                     pass
@@ -8439,7 +8913,36 @@ class TestnetTrader:
         if not can:
             print(f"⚠️ 無法開倉: {reason}")
             return None
+        if not self._coordinator_reserve(self.config.position_size_usdt):
+            return None
         
+        keepalive = self._coordinator_keepalive()
+        try:
+            trade = self._open_position_reserved(
+                direction, current_price, strategy, probability, confidence, market_data,
+                is_limit_fill=is_limit_fill, override_price=override_price, override_size=override_size,
+            )
+        finally:
+            if keepalive is not None:
+                keepalive.set()
+        if trade is None:
+            # 開倉失敗: 立即釋放預留，不佔用協調器名額到 TTL
+            self._coordinator_release()
+        return trade
+    
+    def _open_position_reserved(
+        self,
+        direction: str,
+        current_price: float,
+        strategy: str,
+        probability: float,
+        confidence: float,
+        market_data: Dict,
+        is_limit_fill: bool = False,
+        override_price: Optional[float] = None,
+        override_size: Optional[float] = None
+    ) -> Optional[TradeRecord]:
+        """open_position 的實際開倉流程 (已通過 can_trade 與協調器預留)"""
         try:
             # 🆕 動態計算參數
             dynamic_params = self.calculate_dynamic_params(market_data)
@@ -8560,7 +9063,7 @@ class TestnetTrader:
                              positions = asyncio.run(self.dydx_api.get_positions())
                          has_btc_position = False
                          for pos in positions or []:
-                             if pos.get('market') == 'BTC-USD' and abs(_coerce_float(pos.get('size', 0), default=0.0)) > 0.0001:
+                             if pos.get('market') == self.dydx_market and abs(_coerce_float(pos.get('size', 0), default=0.0)) > 0.0001:
                                  has_btc_position = True
                                  print("⚠️ [StrictSync] dYdX 已有持倉(REST 確認)，先同步/平倉後再開新倉")
                                  return None
@@ -8570,7 +9073,7 @@ class TestnetTrader:
                              if self.dydx_real_position:
                                  print(f"🔄 [v14.9.8] REST 確認無持倉，清空過時的 dydx_real_position")
                                  self.dydx_real_position = None
-                             if hasattr(self, 'dydx_ws') and self.dydx_ws and self.dydx_ws.has_position("BTC-USD"):
+                             if hasattr(self, 'dydx_ws') and self.dydx_ws and self.dydx_ws.has_position(self.dydx_market):
                                  print(f"⚠️ [v14.9.8] REST 無持倉但 WS 有，可能是 WS 延遲")
                      except Exception as e:
                          print(f"⚠️ [StrictSync] REST 檢查失敗: {e}，改用本地追蹤")
@@ -8680,7 +9183,7 @@ class TestnetTrader:
             
             # 下單 (真實交易或模擬)
             if not self.paper_mode and self.testnet_api and not self.dydx_sync_enabled:
-                symbol = self.config.symbol.replace('/', '')
+                symbol = self.binance_symbol
                 side_upper = 'BUY' if side == 'buy' else 'SELL'
                 order = self.testnet_api.place_order(symbol, side_upper, position_btc)
                 if not order:
@@ -8693,17 +9196,17 @@ class TestnetTrader:
                 order = {'id': 'PAPER', 'status': 'filled'}
             
             # 創建交易記錄
-            trade_id = f"WT_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{len(self.trades):04d}"
+            trade_id = f"WT_{self.clock.now().strftime('%Y%m%d_%H%M%S')}_{len(self.trades):04d}"
             
             trade = TradeRecord(
                 trade_id=trade_id,
-                timestamp=datetime.now().isoformat(),
+                timestamp=self.clock.now().isoformat(),
                 strategy=strategy,
                 probability=probability,
                 confidence=confidence,
                 direction=direction,
                 entry_price=entry_price,
-                entry_time=datetime.now().isoformat(),
+                entry_time=self.clock.now().isoformat(),
                 leverage=leverage,
                 position_size_usdt=position_size_usdt, # Use calculated position_size_usdt
                 position_size_btc=position_btc, # Use calculated position_btc
@@ -8751,13 +9254,15 @@ class TestnetTrader:
                 actual_stop_loss_pct=stop_loss_pct,
                 actual_max_hold_min=max_hold_min,
                 market_volatility=dynamic_params['volatility'],
+                market_regime=str(market_data.get('regime', '') or ''),
                 status="OPEN"
             )
             
             self.active_trade = trade
             self.trades.append(trade)
+            self._coordinator_sync()
             self.daily_trades += 1
-            self.last_trade_time = time.time()
+            self.last_trade_time = self.clock.time()
             
             # 🔧 v14.6.25: 計算手續費 (基於名義價值)
             # 名義價值 = BTC_size × entry_price = trade.position_size_usdt
@@ -8880,7 +9385,7 @@ class TestnetTrader:
         # 確保 dYdX 有足夠時間成交 (開倉需要 5-10 秒)
         if self.dydx_sync_enabled and self.dydx_real_position:
             entry_time = datetime.fromisoformat(trade.entry_time)
-            hold_seconds = (datetime.now() - entry_time).total_seconds()
+            hold_seconds = (self.clock.now() - entry_time).total_seconds()
             min_hold_for_dydx = 15.0  # 最少 15 秒 (給 dYdX 成交 + 緩衝)
             
             # 只有 TP/SL/強制平倉 可以繞過此限制
@@ -8909,7 +9414,7 @@ class TestnetTrader:
             
             # 真實交易或模擬
             if not self.paper_mode and self.testnet_api:
-                symbol = self.config.symbol.replace('/', '')
+                symbol = self.binance_symbol
                 order = self.testnet_api.close_position(symbol)
                 if not order:
                     print("❌ API 平倉失敗")
@@ -8961,7 +9466,7 @@ class TestnetTrader:
                             self.cancel_all_pending_orders(f"預掛單成交: {reason}")
                             self.dydx_real_position = None
                             try:
-                                asyncio.run(self._dydx_sweep_open_orders(reason="pre_order_exit", market="BTC-USD"))
+                                asyncio.run(self._dydx_sweep_open_orders(reason="pre_order_exit", market=self.dydx_market))
                                 asyncio.run(self._log_dydx_protection_snapshot(reason="pre_order_exit"))
                             except Exception:
                                 pass
@@ -8978,7 +9483,7 @@ class TestnetTrader:
                                 if not dydx_success:
                                      print(f"❌ [StrictSync] dYdX 平倉失敗 -> 暫停 Paper Close")
                                      # 🔧 v14.9.12: 平倉失敗時設置長冷卻期
-                                     self._last_emergency_stop_ts = time.time() + 300  # 5 分鐘冷卻
+                                     self._last_emergency_stop_ts = self.clock.time() + 300  # 5 分鐘冷卻
                                      return None
                                 
                                 # Sync Real Price (市價會有滑點)
@@ -8992,7 +9497,7 @@ class TestnetTrader:
                             except Exception as e:
                                  print(f"❌ [StrictSync] 執行異常: {e}")
                                  # 🔧 v14.9.12: 異常時設置長冷卻期
-                                 self._last_emergency_stop_ts = time.time() + 300  # 5 分鐘冷卻
+                                 self._last_emergency_stop_ts = self.clock.time() + 300  # 5 分鐘冷卻
                                  return None
                     else:
                         print(f"⚠️ [StrictSync] dYdX 無真實持倉，僅執行 Paper Close")
@@ -9074,12 +9579,12 @@ class TestnetTrader:
             
             # 持倉時間
             entry_time = datetime.fromisoformat(trade.entry_time)
-            hold_seconds = (datetime.now() - entry_time).total_seconds()
+            hold_seconds = (self.clock.now() - entry_time).total_seconds()
             
             # 更新記錄
             trade.status = reason
             trade.exit_price = exit_price
-            trade.exit_time = datetime.now().isoformat()
+            trade.exit_time = self.clock.now().isoformat()
             trade.price_move_pct = price_move_pct
             trade.pnl_pct = pnl_pct
             trade.pnl_usdt = pnl_usdt
@@ -9092,6 +9597,7 @@ class TestnetTrader:
             self.total_pnl += net_pnl
             self.current_balance += net_pnl  # 🆕 更新當前資金
             self.active_trade = None
+            self._coordinator_sync(net_pnl)
             
             # 🆕 更新勝負統計
             if net_pnl > 0:
@@ -9100,10 +9606,10 @@ class TestnetTrader:
             else:
                 self.loss_count += 1
                 self.consecutive_losses += 1 # 🔧 Increment consecutive losses
-                self.last_loss_time = time.time()
+                self.last_loss_time = self.clock.time()
                 print(f"   ⚠️ 連續虧損: {self.consecutive_losses} 次 (閾值: {self.config.max_consecutive_losses})")
                 if self.consecutive_losses >= self.config.max_consecutive_losses:
-                    self.cooldown_until = time.time() + self.config.consecutive_loss_cooldown_min * 60
+                    self.cooldown_until = self.clock.time() + self.config.consecutive_loss_cooldown_min * 60
                     self.consecutive_losses = 0  # 冷卻後重新計數
                     print(f"   ⏸️ 觸發冷卻 {self.config.consecutive_loss_cooldown_min} 分鐘，暫停交易至 {datetime.fromtimestamp(self.cooldown_until).strftime('%H:%M:%S')}")
             
@@ -9240,7 +9746,7 @@ class TestnetTrader:
             if self.dydx_sync_enabled and self.dydx_api:
                 try:
                     import asyncio
-                    asyncio.run(self._dydx_sweep_open_orders(reason=f"post_trade_close:{reason}", market="BTC-USD"))
+                    asyncio.run(self._dydx_sweep_open_orders(reason=f"post_trade_close:{reason}", market=self.dydx_market))
                     asyncio.run(self._log_dydx_protection_snapshot(reason=f"post_trade_close:{reason}"))
                 except Exception:
                     pass
@@ -9363,7 +9869,7 @@ class TestnetTrader:
         
         # 計算持倉時間
         entry_time = datetime.fromisoformat(trade.entry_time)
-        hold_seconds = (datetime.now() - entry_time).total_seconds()
+        hold_seconds = (self.clock.now() - entry_time).total_seconds()
         
         # 從 WhaleTestnetTrader 獲取三線累積時間 (通過 market_data 傳遞)
         # 🔧 v10.21: 只有在 three_line_enabled=True 時才觸發
@@ -9506,13 +10012,13 @@ class TestnetTrader:
         if self.config.two_phase_exit_enabled:
             # 計算持倉時間
             entry_time = datetime.fromisoformat(trade.entry_time)
-            hold_minutes = (datetime.now() - entry_time).total_seconds() / 60
+            hold_minutes = (self.clock.now() - entry_time).total_seconds() / 60
             
             # 獲取兩階段管理器的判斷 (從 WhaleTestnetTrader 傳入)
             two_phase_mgr = getattr(self, '_two_phase_exit_manager', None)
             if two_phase_mgr is None:
                 # 創建臨時管理器
-                two_phase_mgr = TwoPhaseExitManager(self.config)
+                two_phase_mgr = TwoPhaseExitManager(self.config, clock=self.clock)
             
             two_phase_result = two_phase_mgr.check_exit(
                 trade=trade,
@@ -9648,7 +10154,7 @@ class TestnetTrader:
         
         # 時間收緊止損
         entry_time = datetime.fromisoformat(trade.entry_time)
-        hold_minutes = (datetime.now() - entry_time).total_seconds() / 60
+        hold_minutes = (self.clock.now() - entry_time).total_seconds() / 60
         
         time_rules = sl_config.get('time_based_tightening', {}).get('rules', [])
         for rule in time_rules:
@@ -9863,7 +10369,7 @@ class TestnetTrader:
     def get_summary(self) -> Dict:
         """獲取統計摘要"""
         # 🔧 v13.6.1: 無論是否有交易，都計算運行時間
-        runtime = datetime.now() - self.session_start_time
+        runtime = self.clock.now() - self.session_start_time
         runtime_str = f"{int(runtime.total_seconds() // 3600)}h {int((runtime.total_seconds() % 3600) // 60)}m"
         
         if not self.trades:
@@ -10023,20 +10529,38 @@ class WhaleTestnetSystem:
     - 交易數據: dYdX REST + WebSocket
     """
     
-    def __init__(self, config: TradingConfig = None):
+    def __init__(
+        self,
+        config: TradingConfig = None,
+        clock: Optional[Clock] = None,
+        binance_feed=None,
+        coordinator=None,
+    ):
+        """
+        Args:
+            config: 交易配置 (symbol / symbol_dydx 決定交易幣種)
+            clock: 時鐘 (重放時注入 SimulatedClock)
+            binance_feed: 多幣種模式下母進程 combined stream 分流來的 Queue (None = 自己連線)
+            coordinator: 多幣種模式的 RuntimeCoordinator 代理 (共用資金 / 風險 / 限速預算)
+        """
+        self.clock: Clock = clock or get_clock()
         self.config = config or TradingConfig()
+        self.dydx_market: str = self.config.symbol_dydx
+        self.coordinator = coordinator
         
-        # 初始化組件
         # 初始化組件
         # 🆕 v13.2: Hybrid Strategy -使用 Binance WebSocket 作為主要訊號源 (Brain)
-        self.binance_ws = BinanceWebSocket(symbol="btcusdt", use_testnet=False)
+        self.binance_ws = BinanceWebSocket(symbol=self.config.binance_symbol, use_testnet=False, clock=self.clock)
+        if binance_feed is not None:
+            self.binance_ws.attach_feed(binance_feed)
         # 🆕 v12.9: dYdX WebSocket 作為執行數據源 (Hands)
-        self.ws = DydxWebSocket(symbol="BTC-USD", network="mainnet")
-        self.trader = TestnetTrader(self.config)
+        self.ws = DydxWebSocket(symbol=self.dydx_market, network="mainnet", clock=self.clock)
+        self.trader = TestnetTrader(self.config, clock=self.clock)
         self.trader._parent_system = self  # 🆕 v13.7: 連接到父系統 (用於自動回測模組)
+        self.trader.coordinator = coordinator
         
         # 🆕 v14.7: 幣安-dYdX 價差保護系統
-        self.spread_guard = BinanceDydxSpreadGuard(self.config)
+        self.spread_guard = BinanceDydxSpreadGuard(self.config, clock=self.clock)
         
         # 🆕 dYdX Integration (Sync Wrapper) - 用於交易執行
         self.dydx: Optional[DydxTrader] = None
@@ -10066,7 +10590,9 @@ class WhaleTestnetSystem:
         self.mtf_enabled = True  # 預設啟用
         if MTF_AVAILABLE and self.mtf_enabled:
             try:
-                self.mtf_analyzer = MultiTimeframeAnalyzer(symbol="BTC-USD", enabled=True)
+                self.mtf_analyzer = MultiTimeframeAnalyzer(
+                    symbol=self.dydx_market, enabled=True, rate_gate=self._binance_rest_gate if coordinator else None
+                )
                 print("📊 MTF 多時間框架分析器已啟用 (15m/1h/4h) - 數據源: Binance Futures (Brain)")
             except Exception as e:
                 print(f"⚠️ MTF 分析器啟動失敗: {e}")
@@ -10081,6 +10607,10 @@ class WhaleTestnetSystem:
         # 市場數據
         self.market_data = {}
         self.cached_strategy_data = {}  # 🆕 緩存的策略分析結果
+
+        # 儀表板: run() 建立渲染器；慢變區塊 (dYdX 成交/統計) 以交易筆數為 key 快取
+        self.dashboard: Optional[DashboardRenderer] = None
+        self._dashboard_panels = PanelCache(clock=self.clock.monotonic)
         
         # 🆕 信號穩定性追蹤 (防止被洗)
         self.signal_history: List[Dict] = []  # 最近 N 秒的信號記錄
@@ -10122,7 +10652,7 @@ class WhaleTestnetSystem:
         self.trade_exit_history: List[Dict] = []      # 出場歷史 (用於分析最佳止盈點)
         
         # 🆕 v10.9 兩階段止盈止損系統
-        self.two_phase_exit = TwoPhaseExitManager(self.config) if self.config.two_phase_exit_enabled else None
+        self.two_phase_exit = TwoPhaseExitManager(self.config, clock=self.clock) if self.config.two_phase_exit_enabled else None
         if self.two_phase_exit:
             print("🎯 v10.9 兩階段止盈止損系統已啟用")
             print(f"   第一階段: 嚴格止損 -{self.config.phase1_strict_stop_loss_pct}% | 目標 +{self.config.phase1_target_pct}%")
@@ -10132,7 +10662,20 @@ class WhaleTestnetSystem:
         self.training_records: List[Dict] = []
         self.training_data_dir = Path("logs/whale_training")
         self.training_data_dir.mkdir(parents=True, exist_ok=True)
-        self.training_file = self.training_data_dir / f"training_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        self.training_file = self.training_data_dir / f"training_{self.clock.now().strftime('%Y%m%d_%H%M%S')}.json"
+        self.training_record_count = 0
+        # 快照改寫成按日分區的 Arrow 串流 (背景執行緒批次寫入)，ai_dev 以 read_snapshots() 讀取
+        self.snapshot_recorder = None
+        if _HAS_SNAPSHOT_RECORDER:
+            try:
+                self.snapshot_recorder = SnapshotRecorder(
+                    Path("data/tensorflow_training/snapshots"),
+                    session=self.clock.now().strftime('%Y%m%d_%H%M%S'),
+                )
+                self.snapshot_recorder.start()
+            except Exception as e:
+                print(f"⚠️ 訓練快照記錄器啟動失敗，改用 JSONL: {e}")
+                self.snapshot_recorder = None
         
         # 日誌 (必須在其他使用 logger 的方法之前初始化)
         self._setup_logging()
@@ -10150,7 +10693,7 @@ class WhaleTestnetSystem:
             try:
                 # 獲取當前使用的卡片名稱作為 session_id
                 card_name = getattr(self.config, 'trading_card', 'default')
-                session_id = f"{card_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                session_id = f"{card_name}_{self.clock.now().strftime('%Y%m%d_%H%M%S')}"
                 self.backtest_collector = BacktestDataCollector(
                     session_id=session_id,
                     data_dir="data/backtest_sessions",
@@ -10304,7 +10847,7 @@ class WhaleTestnetSystem:
         if not self._should_use_dydx_api_price():
             return 0.0, 0.0
 
-        now = time.time()
+        now = self.clock.time()
         if now - getattr(self, "_dydx_api_book_time", 0.0) < 1.0:
             cached_bid = getattr(self, "_dydx_api_best_bid", 0.0)
             cached_ask = getattr(self, "_dydx_api_best_ask", 0.0)
@@ -10314,7 +10857,7 @@ class WhaleTestnetSystem:
         try:
             orderbook = asyncio.run(
                 self.dydx.get_orderbook(
-                    self.config.symbol_dydx if hasattr(self.config, "symbol_dydx") else "BTC-USD"
+                    self.dydx_market
                 )
             )
             if orderbook:
@@ -10555,7 +11098,7 @@ class WhaleTestnetSystem:
             if getattr(self.config, 'auto_optimize_enabled', False):
                 new_card_path = self.auto_backtest.generate_new_card(
                     result, 
-                    f"auto_optimized_{datetime.now().strftime('%Y%m%d_%H%M')}"
+                    f"auto_optimized_{self.clock.now().strftime('%Y%m%d_%H%M')}"
                 )
                 self.logger.info(f"🃏 v5: 新卡片已生成: {new_card_path}")
             else:
@@ -10759,7 +11302,7 @@ class WhaleTestnetSystem:
         config_path.parent.mkdir(parents=True, exist_ok=True)
         
         # 更新統計數據
-        self.reversal_config['statistics']['last_updated'] = datetime.now().isoformat()
+        self.reversal_config['statistics']['last_updated'] = self.clock.now().isoformat()
         self.reversal_config['statistics']['consecutive_losses'] = self.consecutive_losses
         self.reversal_config['statistics']['consecutive_wins'] = self.consecutive_wins
         self.reversal_config['market_regime']['current'] = self.market_regime
@@ -10810,7 +11353,7 @@ class WhaleTestnetSystem:
                 'gross_target_pct': 6.0,
                 'net_target_pct': 3.0
             }
-        self.dynamic_profit_config['current_active_target']['last_updated'] = datetime.now().isoformat()
+        self.dynamic_profit_config['current_active_target']['last_updated'] = self.clock.now().isoformat()
         
         try:
             with open(config_path, 'w', encoding='utf-8') as f:
@@ -10901,7 +11444,7 @@ class WhaleTestnetSystem:
         smart_rules = config.get('smart_exit_rules', {})
         
         # 規則1: 快速獲利即走
-        hold_time_min = (time.time() - (datetime.fromisoformat(trade.entry_time).timestamp() if trade.entry_time else time.time())) / 60
+        hold_time_min = (self.clock.time() - (datetime.fromisoformat(trade.entry_time).timestamp() if trade.entry_time else self.clock.time())) / 60
         if smart_rules.get('rule_1_quick_profit', {}).get('enabled', True):
             if net_pnl_pct >= net_target and hold_time_min < self.config.quick_profit_time_limit:
                 should_exit = True
@@ -10957,7 +11500,7 @@ class WhaleTestnetSystem:
     def record_exit_for_analysis(self, trade: 'TradeRecord', exit_reason: str):
         """記錄出場數據，用於分析最佳止盈點"""
         exit_record = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self.clock.now().isoformat(),
             'strategy': trade.strategy,
             'direction': trade.direction,
             'leverage': trade.actual_leverage,
@@ -10999,7 +11542,7 @@ class WhaleTestnetSystem:
         
         # 更新配置建議
         analysis = self.dynamic_profit_config.get('trade_history_analysis', {})
-        analysis['last_analysis'] = datetime.now().isoformat()
+        analysis['last_analysis'] = self.clock.now().isoformat()
         analysis['sample_size'] = len(winning_trades)
         analysis['avg_gross_at_exit'] = round(avg_gross, 2)
         analysis['avg_net_at_exit'] = round(avg_net, 2)
@@ -11079,7 +11622,7 @@ class WhaleTestnetSystem:
         
         # 記錄交易
         self.reversal_trade_history.append({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self.clock.now().isoformat(),
             'is_win': is_win,
             'market_regime': self.market_regime,
             **trade_info
@@ -11098,7 +11641,7 @@ class WhaleTestnetSystem:
         
         # 記錄切換
         switch_record = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self.clock.now().isoformat(),
             'from': old_regime,
             'to': new_regime,
             'consecutive_losses': self.consecutive_losses,
@@ -11197,7 +11740,7 @@ class WhaleTestnetSystem:
     
     def _setup_logging(self):
         """設置日誌"""
-        log_file = self.trader.log_dir / f"system_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+        log_file = self.trader.log_dir / f"system_{self.clock.now().strftime('%Y%m%d_%H%M%S')}.log"
         
         self.logger = logging.getLogger("WhaleTestnet")
         self.logger.setLevel(logging.INFO)
@@ -11214,12 +11757,12 @@ class WhaleTestnetSystem:
         """獲取 dYdX 資金費率"""
         if not self.dydx: return 0.0
         try:
-            now = time.time()
+            now = self.clock.time()
             # 緩存 60 秒 (資金費率變化不快)
             if now - getattr(self, '_dydx_funding_time', 0) < 60.0:
                 return getattr(self, '_dydx_funding', 0)
             
-            market = asyncio.run(self.dydx.get_market(self.config.symbol_dydx if hasattr(self.config, 'symbol_dydx') else "BTC-USD"))
+            market = asyncio.run(self.dydx.get_market(self.dydx_market))
             if market:
                 funding = float(market.get('nextFundingRate', 0)) * 100
                 self._dydx_funding = funding
@@ -11256,11 +11799,11 @@ class WhaleTestnetSystem:
         if self.dydx:
             try:
                 # 🔧 v14.4: 緩存 5 秒 (原 0.5 秒太短)
-                now = time.time()
+                now = self.clock.time()
                 if now - getattr(self, '_dydx_price_time', 0) < 5.0:
                     return getattr(self, '_dydx_price', 0)
                 
-                market = asyncio.run(self.dydx.get_market(self.config.symbol_dydx if hasattr(self.config, 'symbol_dydx') else "BTC-USD"))
+                market = asyncio.run(self.dydx.get_market(self.dydx_market))
                 if market:
                     price = float(market.get('oraclePrice', 0))
                     if price > 0:
@@ -11381,7 +11924,7 @@ class WhaleTestnetSystem:
         if self.config.paper_mode:
             return {}
         
-        now = time.time()
+        now = self.clock.time()
         if now - self._testnet_data_cache.get('_time', 0) < 1.0:
             return self._testnet_data_cache
         
@@ -11433,7 +11976,7 @@ class WhaleTestnetSystem:
         current_price = self.get_current_price()
 
         # 更新價格歷史 (用於噪音/波動計算)
-        now_ts = time.time()
+        now_ts = self.clock.time()
         self.price_history.append((now_ts, current_price))
         # 僅保留 5 分鐘資料
         while self.price_history and now_ts - self.price_history[0][0] > 300:
@@ -11467,11 +12010,11 @@ class WhaleTestnetSystem:
             if testnet_obi is None and self.dydx:
                 try:
                     # 🔧 v14.3: 緩存機制 (3秒，減少 API 呼叫)
-                    now = time.time()
+                    now = self.clock.time()
                     if now - getattr(self, '_dydx_obi_time', 0) < 3.0:
                         testnet_obi = getattr(self, '_dydx_obi', 0)
                     else:
-                        orderbook = asyncio.run(self.dydx.get_orderbook(self.config.symbol_dydx if hasattr(self.config, 'symbol_dydx') else "BTC-USD"))
+                        orderbook = asyncio.run(self.dydx.get_orderbook(self.dydx_market))
                         if orderbook:
                             bids = orderbook.get("bids", [])
                             asks = orderbook.get("asks", [])
@@ -11549,11 +12092,11 @@ class WhaleTestnetSystem:
         # ====== 策略分析 (每 N 秒更新或強制更新) ======
         should_analyze_strategy = (
             force_strategy_analysis or 
-            time.time() - self.last_strategy_analysis_time >= self.config.analysis_interval_sec
+            self.clock.time() - self.last_strategy_analysis_time >= self.config.analysis_interval_sec
         )
         
         if should_analyze_strategy and self.detector:
-            self.last_strategy_analysis_time = time.time()
+            self.last_strategy_analysis_time = self.clock.time()
             
             try:
                 # 🆕 v13.2: 餵給 Detector 的數據也必須是 Binance Brain
@@ -11609,7 +12152,7 @@ class WhaleTestnetSystem:
                     'trading_allowed': snapshot.trading_allowed,
                     'key_signals': snapshot.key_signals or [],
                     'risk_warnings': snapshot.risk_warnings or [],
-                    'analysis_time': time.time(),
+                    'analysis_time': self.clock.time(),
                     # 🆕 v13.0: 資料來源追蹤
                     'has_whale_detection': bool(snapshot.strategy_probabilities),
                     'is_fallback_probability': False
@@ -11644,7 +12187,7 @@ class WhaleTestnetSystem:
         data.update(self.cached_strategy_data)
         
         # 計算距離下次分析的時間
-        next_analysis_in = max(0, self.config.analysis_interval_sec - (time.time() - self.last_strategy_analysis_time))
+        next_analysis_in = max(0, self.config.analysis_interval_sec - (self.clock.time() - self.last_strategy_analysis_time))
         data['next_strategy_analysis'] = next_analysis_in
         
         self.market_data = data
@@ -11672,7 +12215,7 @@ class WhaleTestnetSystem:
         """
         if not self.price_history:
             return 0.0
-        now_ts = time.time()
+        now_ts = self.clock.time()
         prices = [p for ts, p in self.price_history if now_ts - ts <= window_seconds and p > 0]
         if len(prices) < 5:
             return 0.0
@@ -11766,7 +12309,7 @@ class WhaleTestnetSystem:
         max_jump = getattr(self.config, 'max_dydx_jump_1s_pct', 0.05)
         
         # 檢查冷卻時間
-        now_ts = time.time()
+        now_ts = self.clock.time()
         if now_ts < getattr(self, '_jump_cooldown_until', 0.0):
             remaining = self._jump_cooldown_until - now_ts
             return False, f"⚠️ 價格跳動冷卻中 (剩餘 {remaining:.1f}s)"
@@ -11912,7 +12455,7 @@ class WhaleTestnetSystem:
         4. Hysteresis: 策略需連續 N 次確認才切換
         5. 無主力狀態: 低分散時顯示觀望
         """
-        now = time.time()
+        now = self.clock.time()
         
         # ====== 1. 更新快線歷史 (最近 5 秒) ======
         self.fast_strategy_history.append({
@@ -12112,7 +12655,7 @@ class WhaleTestnetSystem:
             return {}
         
         # 使用指數衰減權重
-        now = time.time()
+        now = self.clock.time()
         total_weight = 0
         weighted_probs: Dict[str, float] = {}
         
@@ -12140,7 +12683,7 @@ class WhaleTestnetSystem:
         這個函數在每次 analyze_market() 時都會被調用
         即使沒有完整的 30 秒策略分析，也能提供即時判斷
         """
-        now = time.time()
+        now = self.clock.time()
         
         # 使用即時市場數據計算一個簡化的策略機率
         realtime_probs = self._calculate_realtime_strategy_probs(data)
@@ -12239,7 +12782,7 @@ class WhaleTestnetSystem:
         修復問題: 原本六維分數只在 render_dashboard 時計算，但 should_enter 在之前執行，
         導致六維分數永遠是 0。
         """
-        now = time.time()
+        now = self.clock.time()
         
         # 從 cached_strategy_data 獲取三線方向
         dual_period = self.cached_strategy_data.get('dual_period', {})
@@ -12384,8 +12927,13 @@ class WhaleTestnetSystem:
         """
         記錄 TensorFlow 訓練資料 (每次分析都記錄)
         """
+        self.training_record_count += 1
+        if self.snapshot_recorder is not None:
+            self.snapshot_recorder.record(data, timestamp=self.clock.time())
+            return
+        
         record = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self.clock.now().isoformat(),
             'price': data.get('price', 0),
             'obi': data.get('obi', 0),
             'trade_imbalance': data.get('trade_imbalance', 0),
@@ -12420,28 +12968,34 @@ class WhaleTestnetSystem:
         保存 TensorFlow 訓練資料
         
         存儲位置:
-        - data/tensorflow_training/raw/market_snapshots_{date}.jsonl (市場快照)
+        - data/tensorflow_training/snapshots/date=YYYY-MM-DD/*.arrows (市場快照，記錄器啟用時)
+        - data/tensorflow_training/raw/market_snapshots_{date}.jsonl (市場快照，無 pyarrow 時)
         - data/tensorflow_training/raw/trade_records_{date}.json (交易記錄)
+        
+        記錄器啟用時只在會話結束呼叫: 寫出剩餘快照緩衝並保存一次交易記錄
         """
-        if not self.training_records:
+        if self.snapshot_recorder is not None:
+            self.snapshot_recorder.stop()
+        elif not self.training_records:
             return
         
-        date_str = datetime.now().strftime('%Y%m%d')
+        date_str = self.clock.now().strftime('%Y%m%d')
         tf_dir = Path("data/tensorflow_training/raw")
         tf_dir.mkdir(parents=True, exist_ok=True)
         
         # 1. 保存市場快照 (JSONL 格式 - 每行一筆)
-        snapshot_file = tf_dir / f"market_snapshots_{date_str}.jsonl"
-        with open(snapshot_file, 'a') as f:  # 追加模式
-            for record in self.training_records:
-                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        if self.training_records:
+            snapshot_file = tf_dir / f"market_snapshots_{date_str}.jsonl"
+            with open(snapshot_file, 'a') as f:  # 追加模式
+                for record in self.training_records:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
         
         # 2. 保存交易記錄
         trades_file = tf_dir / f"trade_records_{date_str}.json"
         trades_data = {
             'trades': [t.to_dict() for t in self.trader.trades] if hasattr(self.trader, 'trades') else [],
             'total_trades': len(self.trader.trades) if hasattr(self.trader, 'trades') else 0,
-            'last_updated': datetime.now().isoformat(),
+            'last_updated': self.clock.now().isoformat(),
             'config': {
                 'leverage': self.config.leverage,
                 'position_size_usdt': self.config.position_size_usdt,
@@ -12455,8 +13009,8 @@ class WhaleTestnetSystem:
         # 3. 同時保存一份到 logs (備份)
         backup_data = {
             'records': self.training_records[-100:],  # 只保留最近 100 筆
-            'total_records': len(self.training_records),
-            'last_updated': datetime.now().isoformat(),
+            'total_records': self.training_record_count,
+            'last_updated': self.clock.now().isoformat(),
             'trades': trades_data['trades']
         }
         with open(self.training_file, 'w') as f:
@@ -12466,7 +13020,8 @@ class WhaleTestnetSystem:
         saved_count = len(self.training_records)
         self.training_records = []
         
-        print(f"💾 已保存 {saved_count} 筆訓練資料到 {tf_dir}")
+        if saved_count:
+            print(f"💾 已保存 {saved_count} 筆訓練資料到 {tf_dir}")
     
     def should_enter(self) -> tuple[bool, str, Dict]:
         """
@@ -12497,7 +13052,7 @@ class WhaleTestnetSystem:
             if self.iteration % 10 == 0:
                 self.logger.info(f"🎲 隨機進場模式檢查中... (Iteration {self.iteration})")
 
-            runtime_seconds = (datetime.now() - self.trader.session_start_time).total_seconds()
+            runtime_seconds = (self.clock.now() - self.trader.session_start_time).total_seconds()
             if runtime_seconds < self.config.warmup_seconds:
                 remaining = self.config.warmup_seconds - runtime_seconds
                 self.market_data['signal_status'] = {
@@ -12633,7 +13188,7 @@ class WhaleTestnetSystem:
         strategy_probs = data.get('strategy_probs', {})
         
         # 🆕 v12.11: Warm-up 期檢查 (C方案)
-        runtime_seconds = (datetime.now() - self.trader.session_start_time).total_seconds()
+        runtime_seconds = (self.clock.now() - self.trader.session_start_time).total_seconds()
         if runtime_seconds < self.config.warmup_seconds:
             remaining = self.config.warmup_seconds - runtime_seconds
             # 初始化 signal_status
@@ -13066,7 +13621,7 @@ class WhaleTestnetSystem:
             'direction': trade_direction,
             'strategy': best_strategy,  # 🔧 使用 best_strategy
             'probability': best_prob,   # 🔧 使用 best_prob
-            'timestamp': time.time()
+            'timestamp': self.clock.time()
         }
         
         # 🔧 將策略資訊存入 data，供後續使用
@@ -13081,7 +13636,7 @@ class WhaleTestnetSystem:
         self.signal_history.append(current_signal)
         # 只保留最近 10 秒的記錄
         self.signal_history = [s for s in self.signal_history 
-                              if time.time() - s['timestamp'] < 10]
+                              if self.clock.time() - s['timestamp'] < 10]
         
         # 檢查信號是否一致
         is_stable = self._is_signal_stable(trade_direction)
@@ -13095,13 +13650,13 @@ class WhaleTestnetSystem:
         if self.confirmed_signal is None or self.confirmed_signal['direction'] != trade_direction:
             # 新的信號方向，開始計時
             self.confirmed_signal = current_signal
-            self.signal_confirm_start = time.time()
+            self.signal_confirm_start = self.clock.time()
             self.market_data['signal_status']['confirm_progress'] = 0
             self.market_data['signal_status']['reject_reason'] = f"確認中... (0/{self.config.signal_confirm_seconds}秒)"
             return False, "", data
         
         # 檢查是否已確認足夠時間
-        confirm_duration = time.time() - self.signal_confirm_start
+        confirm_duration = self.clock.time() - self.signal_confirm_start
         self.market_data['signal_status']['confirm_progress'] = min(confirm_duration, self.config.signal_confirm_seconds)
         
         if confirm_duration < self.config.signal_confirm_seconds:
@@ -13356,7 +13911,7 @@ class WhaleTestnetSystem:
             'direction': trade_direction,
             'strategy': 'MTF_FIRST',
             'probability': abs(alignment_score) / 100,
-            'timestamp': time.time()
+            'timestamp': self.clock.time()
         }
         
         data['detected_strategy'] = {
@@ -13369,7 +13924,7 @@ class WhaleTestnetSystem:
         # 快速確認（只需 2 秒）
         self.signal_history.append(current_signal)
         self.signal_history = [s for s in self.signal_history 
-                              if time.time() - s['timestamp'] < 5]
+                              if self.clock.time() - s['timestamp'] < 5]
         
         if len(self.signal_history) < 2:
             self.market_data['signal_status']['reject_reason'] = "MTF 信號確認中 (1/2秒)"
@@ -14333,7 +14888,7 @@ class WhaleTestnetSystem:
         
         # 檢查最近的信號是否都是同一方向
         recent_signals = [s for s in self.signal_history 
-                        if time.time() - s['timestamp'] < self.config.signal_confirm_seconds]
+                        if self.clock.time() - s['timestamp'] < self.config.signal_confirm_seconds]
         
         if len(recent_signals) < 3:
             return False
@@ -14360,7 +14915,7 @@ class WhaleTestnetSystem:
         if not big_trades:
             return None
         
-        now = time.time()
+        now = self.clock.time()
         alerts = []
         
         # 1. 檢查單筆超大單
@@ -14443,7 +14998,7 @@ class WhaleTestnetSystem:
             return None
         
         # 冷卻時間檢查
-        now = time.time()
+        now = self.clock.time()
         cooldown = self.config.price_spike_alert_cooldown or 60
         if hasattr(self, '_last_price_spike_alert'):
             if now - self._last_price_spike_alert < cooldown:
@@ -14592,7 +15147,7 @@ class WhaleTestnetSystem:
         """
         market_ws = self._get_market_ws()
         error_record = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self.clock.now().isoformat(),
             'error_type': error_type,
             'price': market_ws.current_price,
             'market_data': {
@@ -14621,8 +15176,122 @@ class WhaleTestnetSystem:
         except Exception as e:
             self.logger.error(f"保存預測錯誤失敗: {e}")
     
-    def render_dashboard(self) -> str:
-        """渲染即時儀表板 (整合策略分析 + WebSocket 數據)"""
+    def _collect_dashboard_extra(self) -> Dict[str, Any]:
+        """
+        收集儀表板需要的 REST 查詢結果與會改動狀態的計算 (在交易循環執行緒上呼叫)
+
+        render_dashboard 在渲染執行緒上只讀快照: 不發 REST、不更新市場品質、不產生隨機波次。
+        """
+        extra: Dict[str, Any] = {}
+        if getattr(self.config, 'random_entry_mode', False):
+            try:
+                extra['direction_preview'] = self._get_balanced_direction_preview()
+            except Exception:
+                extra['direction_preview'] = ([], [])
+
+        extra['external_position'] = self.trader.get_external_position()
+        if self.two_phase_exit and self.trader.active_trade:
+            self.two_phase_exit.update_market_condition(self.market_data)
+            extra['market_condition'] = dict(self.two_phase_exit.market_condition)
+
+        summary = self.trader.get_summary()
+        extra['summary'] = summary
+        extra['can_trade'] = self.trader.can_trade()
+        closed_trades = [t for t in getattr(self.trader, 'trades', []) if getattr(t, 'status', '') != "OPEN"]
+        win_pnls = [t.net_pnl_usdt for t in closed_trades if getattr(t, 'net_pnl_usdt', 0) > 0]
+        loss_pnls = [t.net_pnl_usdt for t in closed_trades if getattr(t, 'net_pnl_usdt', 0) <= 0]
+        extra['avg_win'] = sum(win_pnls) / len(win_pnls) if win_pnls else 0.0
+        extra['avg_loss'] = sum(loss_pnls) / len(loss_pnls) if loss_pnls else 0.0
+
+        if getattr(self.trader, 'dydx_sync_enabled', False) != True or getattr(self.trader, 'dydx_api', None) is None:
+            return extra
+
+        # 🔧 v14.3: 使用緩存版本避免 429
+        try:
+            positions = list(asyncio.run(self.trader._get_dydx_positions_with_cache()) or [])
+            extra['dydx_positions'] = positions
+            btc_pos, _ = self._select_dydx_btc_position(positions)
+            if btc_pos and not getattr(self.trader, 'active_trade', None):
+                # Paper 沒倉且本地 TP/SL 追蹤缺失時，才向 indexer 查 open orders
+                pending_tp = getattr(self.trader, 'pending_tp_order', None)
+                pending_sl = getattr(self.trader, 'pending_sl_order', None)
+                tp_p = pending_tp.get('tp_price', 0) if pending_tp else 0
+                sl_p = pending_sl.get('sl_price', 0) if pending_sl else 0
+                if tp_p <= 0 or sl_p <= 0:
+                    d_side, _, d_entry = self._parse_dydx_position(btc_pos)
+                    extra['dydx_open_protection'] = self._dashboard_panels.get(
+                        'dydx_open_protection', (d_side, round(d_entry, 2)),
+                        lambda: self._fetch_dydx_open_protection(d_side, d_entry),
+                        max_age=5.0,
+                    )
+        except Exception as e:
+            extra['dydx_error'] = str(e)
+
+        # 成交/統計只在交易筆數變化或快取過期時才重查 (避免每輪打 indexer)
+        total_trades = summary.get('wins', 0) + summary.get('losses', 0)
+        try:
+            extra['recent_fills'] = self._dashboard_panels.get(
+                'recent_fills', total_trades,
+                lambda: asyncio.run(self.trader.dydx_api.get_recent_fills(limit=1)),
+                max_age=15.0,
+            )
+        except Exception:
+            pass
+        extra['dydx_real_stats'] = self._dashboard_panels.get(
+            'dydx_real_stats', total_trades, self.trader.get_dydx_real_stats, max_age=30.0
+        )
+        return extra
+
+    def _select_dydx_btc_position(self, positions: List[Dict]) -> Tuple[Optional[Dict], bool]:
+        """
+        從 positions 找出本市場的非零倉位
+
+        Returns:
+            (btc_pos, from_internal)；API 沒有但內部追蹤有倉 (剛開倉、API 延遲) 時回傳內部追蹤數據
+        """
+        for pos in positions:
+            # 🔧 v14.6.8: 使用 abs() 檢查非零 (SHORT 有負數 size)
+            size_val = float(pos.get("size", 0))
+            if pos.get("market") == self.dydx_market and abs(size_val) > 0.00001:
+                return pos, False
+
+        # 🔧 v14.6.8: 如果 API 沒有持倉但內部追蹤有，使用追蹤數據
+        internal_pos = getattr(self.trader, 'dydx_real_position', None)
+        if internal_pos and internal_pos.get('size', 0) > 0:
+            return {
+                "market": self.dydx_market,
+                "size": internal_pos['size'] if internal_pos['side'] == 'LONG' else -internal_pos['size'],
+                "entryPrice": internal_pos['entry_price']
+            }, True
+        return None, False
+
+    @staticmethod
+    def _parse_dydx_position(btc_pos: Dict) -> Tuple[str, float, float]:
+        """dYdX 倉位 → (side, abs size, entry)"""
+        d_size = float(btc_pos.get("size", 0))
+        d_entry = float(btc_pos.get("entryPrice", 0))
+        # 🔧 v14.6.14: 優先使用 API 的 side 欄位
+        d_side = None
+        raw_side = btc_pos.get("side") or btc_pos.get("positionSide")
+        if raw_side:
+            s = str(raw_side).upper()
+            if s in ("LONG", "BUY"):
+                d_side = "LONG"
+            elif s in ("SHORT", "SELL"):
+                d_side = "SHORT"
+        if d_side is None:
+            d_side = "LONG" if d_size > 0 else "SHORT"
+        return d_side, abs(d_size), d_entry
+
+    def render_dashboard(self, snapshot: Optional['DashboardSnapshot'] = None) -> str:
+        """
+        渲染即時儀表板 (整合策略分析 + WebSocket 數據)
+
+        只讀快照與策略物件的顯示資料，不發 REST、不修改任何狀態，可在渲染執行緒上執行。
+
+        Args:
+            snapshot: 交易循環發布的快照 (extra 由 _collect_dashboard_extra 產生)；None = 當場收集一份
+        """
         R = '\033[0m'
         B = '\033[1m'
         g = '\033[32m'
@@ -14634,11 +15303,21 @@ class WhaleTestnetSystem:
         Y_ = '\033[93m'
         m = '\033[35m'  # magenta
         
-        now = datetime.now().strftime('%H:%M:%S')
-        
-        # 價格來源：
-        # - 🔧 v14.6.36: 統一使用 dYdX Oracle Price (交易和顯示一致)
-        price = self.get_current_price()
+        if snapshot is None:
+            # 價格來源：
+            # - 🔧 v14.6.36: 統一使用 dYdX Oracle Price (交易和顯示一致)
+            snapshot = DashboardSnapshot(
+                iteration=self.iteration,
+                timestamp=self.clock.time(),
+                price=self.get_current_price(),
+                market_data=freeze(self.market_data),
+                extra=freeze(self._collect_dashboard_extra()),
+            )
+        now = datetime.fromtimestamp(snapshot.timestamp).strftime('%H:%M:%S')
+        price = snapshot.price
+        iteration = snapshot.iteration
+        market_data = snapshot.market_data
+        extra = snapshot.extra
         price_ctx = self._get_price_context()
         
         # 交易模式標籤
@@ -14652,7 +15331,7 @@ class WhaleTestnetSystem:
         
         lines = []
         lines.append(f"{c}{'='*80}{R}")
-        lines.append(f"{c}{B}card {card_display}{R} {mode_label}  {Y_}BTC ${price:,.2f}{R}  {now}  #{self.iteration}")
+        lines.append(f"{c}{B}card {card_display}{R} {mode_label}  {Y_}BTC ${price:,.2f}{R}  {now}  #{iteration}")
         lines.append(f"{c}{'='*80}{R}")
         
         # 🆕 v14.x: 隨機入場模式時，隱藏策略分析區塊 (因為不使用分析進場)
@@ -14661,12 +15340,7 @@ class WhaleTestnetSystem:
         # 隨機模式簡潔提示
         if not show_strategy_analysis:
             lines.append(f"\n{Y_}🎲 隨機入場模式{R} - 策略分析區塊已隱藏 (進場方向隨機，出場按止盈止損)")
-            wave1 = []
-            wave2 = []
-            try:
-                wave1, wave2 = self._get_balanced_direction_preview()
-            except Exception:
-                wave1, wave2 = [], []
+            wave1, wave2 = extra.get('direction_preview', ([], []))
             if wave1 or wave2:
                 def _dir_icon(d: str) -> str:
                     return "🟢" if d == "LONG" else "🔴"
@@ -14678,16 +15352,16 @@ class WhaleTestnetSystem:
         
         # ==================== 第一區塊：即時市場數據 ====================
         if show_strategy_analysis:
-            obi = self.market_data.get('obi', 0)
-            wpi = self.market_data.get('trade_imbalance', 0)
+            obi = market_data.get('obi', 0)
+            wpi = market_data.get('trade_imbalance', 0)
             obi_c = G_ if obi > 0.3 else R_ if obi < -0.3 else y
             wpi_c = G_ if wpi > 0.3 else R_ if wpi < -0.3 else y
             
             lines.append(f"\n{B}📊 即時數據 (Binance Brain){R}")
             lines.append(f"   OBI: {obi_c}{obi:+.3f}{R}  WPI: {wpi_c}{wpi:+.3f}{R}")
-            lines.append(f"   1分鐘: {self.market_data.get('price_change_1m', 0):+.3f}%  "
-                        f"5分鐘: {self.market_data.get('price_change_5m', 0):+.3f}%")
-            lines.append(f"   Spread: {self.market_data.get('spread_pct', 0):.4f}%")
+            lines.append(f"   1分鐘: {market_data.get('price_change_1m', 0):+.3f}%  "
+                        f"5分鐘: {market_data.get('price_change_5m', 0):+.3f}%")
+            lines.append(f"   Spread: {market_data.get('spread_pct', 0):.4f}%")
             
             # 🆕 v14.8: 進階風控狀態顯示
             if hasattr(self, 'spread_guard') and self.spread_guard:
@@ -14718,13 +15392,13 @@ class WhaleTestnetSystem:
                 
                 # 如果不是 CAN_TRADE，顯示原因
                 if risk_state != TradingState.CAN_TRADE:
-                    state_duration = time.time() - self.spread_guard.state_since
+                    state_duration = self.clock.time() - self.spread_guard.state_since
                     lines.append(f"   {state_c}持續 {state_duration:.0f}s{R}")
             
             # 大單統計
-            big_count = self.market_data.get('big_trade_count', 0)
-            big_buy = self.market_data.get('big_buy_value', 0)
-            big_sell = self.market_data.get('big_sell_value', 0)
+            big_count = market_data.get('big_trade_count', 0)
+            big_buy = market_data.get('big_buy_value', 0)
+            big_sell = market_data.get('big_sell_value', 0)
             if big_count > 0:
                 buy_c = G_ if big_buy > big_sell else y
                 sell_c = R_ if big_sell > big_buy else y
@@ -14732,7 +15406,7 @@ class WhaleTestnetSystem:
                 lines.append(f"   數量: {big_count}筆  買: {buy_c}${big_buy/1000:.1f}K{R}  賣: {sell_c}${big_sell/1000:.1f}K{R}")
         
         # 🚨 鯨魚緊急警報 (警報一律顯示)
-        whale_alert = self.market_data.get('whale_alert')
+        whale_alert = market_data.get('whale_alert')
         if whale_alert:
             alert_level = whale_alert.get('level', '')
             if alert_level == 'EMERGENCY':
@@ -14743,7 +15417,7 @@ class WhaleTestnetSystem:
                 lines.append(f"\n{Y_}⚠️ 警告: {whale_alert['message']}{R}")
         
         # 🆕 v12.10: 急跌急漲警報 (警報一律顯示)
-        price_spike = self.market_data.get('price_spike')
+        price_spike = market_data.get('price_spike')
         if price_spike:
             spike_dir = price_spike.get('direction', '')
             spike_pct = price_spike.get('price_change_pct', 0)
@@ -14761,11 +15435,11 @@ class WhaleTestnetSystem:
         
         # ==================== 第二區塊：主力策略分析 (完整) ====================
         # 隨機入場模式時跳過此區塊
-        strategy_probs = self.market_data.get('strategy_probs', {}) if show_strategy_analysis else {}
+        strategy_probs = market_data.get('strategy_probs', {}) if show_strategy_analysis else {}
         
         if show_strategy_analysis:
-            next_analysis = self.market_data.get('next_strategy_analysis', 0)
-            buffer_count = self.market_data.get('buffer_count', 0)
+            next_analysis = market_data.get('next_strategy_analysis', 0)
+            buffer_count = market_data.get('buffer_count', 0)
             
             lines.append(f"\n{c}{'-'*80}{R}")
             lines.append(f"{B}🎯 主力策略識別系統 v5.9{R}  {G_}(即時){R} | {y}決策: {next_analysis:.0f}秒後 ({buffer_count}筆){R}")
@@ -14968,14 +15642,14 @@ class WhaleTestnetSystem:
         
         # 整體偏向 (隨機模式也跳過)
         if show_strategy_analysis:
-            bias = self.market_data.get('overall_bias', 'NEUTRAL')
-            confidence = self.market_data.get('overall_confidence', 0)
+            bias = market_data.get('overall_bias', 'NEUTRAL')
+            confidence = market_data.get('overall_confidence', 0)
             bias_c = G_ if bias == 'BULLISH' else R_ if bias == 'BEARISH' else y
             lines.append(f"{B}📈 市場偏向{R}: {bias_c}{bias}{R}  信心: {confidence:.0%}")
         
         # 交易允許 (隨機模式也跳過)
         if show_strategy_analysis:
-            trading_allowed = self.market_data.get('trading_allowed', False)
+            trading_allowed = market_data.get('trading_allowed', False)
             allow_c = G_ if trading_allowed else R_
             lines.append(f"{B}🔐 交易允許{R}: {allow_c}{'✅ 是' if trading_allowed else '❌ 否'}{R}")
             
@@ -15036,7 +15710,7 @@ class WhaleTestnetSystem:
             lines.append(f"   {B}📊 5分慢線{R}: {regime_c}{slow_regime}{R} ({slow_top1}:{slow_top1_prob:.0%})  {action_tag}  ({slow_count}樣本)")
             
             # 🔧 v10.19: 從 _update_six_dim_analysis 計算的結果讀取，不重新計算
-            six_dim = self.market_data.get('six_dim', {})
+            six_dim = market_data.get('six_dim', {})
             long_score = six_dim.get('long_score', 0)
             short_score = six_dim.get('short_score', 0)
             obi_dir = six_dim.get('obi_dir', 'NEUTRAL')
@@ -15076,7 +15750,7 @@ class WhaleTestnetSystem:
             
             # 🔧 v12.12.2: 整合過濾條件到進度條顯示
             # 讀取 signal_status 判斷是否真的會下單
-            signal_status = self.market_data.get('signal_status', {})
+            signal_status = market_data.get('signal_status', {})
             reject_reason = signal_status.get('reject_reason', '')
             use_three_line = signal_status.get('use_three_line', False)
             three_line_dir = signal_status.get('three_line_direction', '')
@@ -15168,7 +15842,7 @@ class WhaleTestnetSystem:
                 lines.append(f"   {c}MTF: 15m RSI={rsi_15m_c}{rsi_15m_str}{R} | 1h RSI={rsi_1h_c}{rsi_1h_str}{R} → {mtf_c}{mtf_dir}{R}")
         
         # 🆕 信號穩定性狀態 (防止被主力洗的關鍵指標) - 隨機模式跳過
-        signal_status = self.market_data.get('signal_status', {})
+        signal_status = market_data.get('signal_status', {})
         if show_strategy_analysis and signal_status:
             # 🆕 v9.0: 情境式策略專用顯示
             if signal_status.get('mode') == 'CONTEXTUAL_v9.0':
@@ -15256,7 +15930,7 @@ class WhaleTestnetSystem:
             # 這個區塊已經在上方的競爭進度條中處理了
         
         # 🆕 v10.14: 三線系統進場建議 (簡化版) - 隨機模式跳過
-        signal_status = self.market_data.get('signal_status', {})
+        signal_status = market_data.get('signal_status', {})
         three_line_dir = signal_status.get('three_line_direction')
         use_three_line = signal_status.get('use_three_line', False)
         mtf_aligned = signal_status.get('mtf_aligned', False)
@@ -15295,8 +15969,8 @@ class WhaleTestnetSystem:
                 lines.append(f"   {Y_}⏳ {trade_status}{R}")
         
         # 進場信號 - 隨機模式跳過
-        if show_strategy_analysis and self.market_data.get('entry_signal'):
-            sig = self.market_data['entry_signal']
+        if show_strategy_analysis and market_data.get('entry_signal'):
+            sig = market_data['entry_signal']
             dir_c = G_ if '多' in sig.direction.value else R_
             lines.append(f"\n{B}💡 進場信號{R}")
             lines.append(f"   {dir_c}{'='*20} {sig.direction.value} {'='*20}{R}")
@@ -15304,7 +15978,7 @@ class WhaleTestnetSystem:
             lines.append(f"   倉位: {sig.position_size_pct:.0f}%  緊急度: {sig.urgency}")
         
         # 風險警告 - 隨機模式跳過
-        warnings = self.market_data.get('risk_warnings', [])
+        warnings = market_data.get('risk_warnings', [])
         if show_strategy_analysis and warnings:
             lines.append(f"\n{R_}⚠️ 風險警告{R}")
             for w in warnings[:3]:
@@ -15343,7 +16017,7 @@ class WhaleTestnetSystem:
                         lines.append(f"   {Y_}⚠️ 多方正在累積: [{bar}] {reverse_secs:.1f}s / {reverse_threshold}s{R}")
         
         # 🔴 重要：永遠以 Testnet 真實持倉為準
-        external_pos = self.trader.get_external_position()
+        external_pos = extra.get('external_position')
         system_trade = self.trader.active_trade
         
         if external_pos:
@@ -15387,7 +16061,7 @@ class WhaleTestnetSystem:
                 lines.append(f"   爆倉價: ${external_pos['liquidation_price']:,.2f}")
             
             # 🆕 v4.0 智能止盈目標 (Testnet 真實持倉)
-            smart_exit = self.market_data.get('smart_exit_info', {})
+            smart_exit = market_data.get('smart_exit_info', {})
             if smart_exit:
                 gross_target = smart_exit.get('gross_target_pct', 10.0)
                 net_target = smart_exit.get('net_target_pct', 6.0)
@@ -15419,10 +16093,10 @@ class WhaleTestnetSystem:
                 curr_net = smart_exit.get('current_net_pnl_pct', 0) if smart_exit else 0
                 max_net = system_trade.max_profit_pct if hasattr(system_trade, 'max_profit_pct') else curr_net
                 
-                # 更新市場品質評分
-                self.two_phase_exit.update_market_condition(self.market_data)
-                quality = self.two_phase_exit.market_condition.get('quality', 'NORMAL')
-                quality_score = self.two_phase_exit.market_condition.get('score', 50)
+                # 市場品質評分 (交易循環收集快照時更新)
+                market_condition = extra.get('market_condition') or {}
+                quality = market_condition.get('quality', 'NORMAL')
+                quality_score = market_condition.get('score', 50)
                 
                 # 市場品質顯示
                 quality_icons = {'GOOD': ('🟢', G_), 'NORMAL': ('🟡', Y_), 'BAD': ('🔴', R_)}
@@ -15430,7 +16104,7 @@ class WhaleTestnetSystem:
                 lines.append(f"   {B}📊 市場品質{R} {q_icon} {q_color}{quality}{R} (評分: {quality_score}/100)")
                 
                 # 取得動態參數
-                phase_info = self.two_phase_exit.get_current_phase(curr_net, max_net, self.market_data)
+                phase_info = self.two_phase_exit.get_current_phase(curr_net, max_net, market_data)
                 
                 phase_emoji = phase_info.get('emoji', '🎯')
                 phase_name = phase_info.get('name', '未知')
@@ -15584,7 +16258,7 @@ class WhaleTestnetSystem:
             lines.append(f"   Bid/Ask: ${bid_price:,.2f} / ${ask_price:,.2f}  Spread: {spread_pct:.4f}% ({spread_bps:.1f}bps)")
             
             # 🆕 v4.0 智能止盈目標
-            smart_exit = self.market_data.get('smart_exit_info', {})
+            smart_exit = market_data.get('smart_exit_info', {})
             if smart_exit:
                 gross_target = smart_exit.get('gross_target_pct', 10.0)
                 net_target = smart_exit.get('net_target_pct', 6.0)
@@ -15613,7 +16287,7 @@ class WhaleTestnetSystem:
             
             # 🆕 v10.9 兩階段止盈止損狀態 (Paper Trading)
             if self.two_phase_exit and t:
-                smart_exit_paper = self.market_data.get('smart_exit_info', {})
+                smart_exit_paper = market_data.get('smart_exit_info', {})
                 curr_net_p = smart_exit_paper.get('current_net_pnl_pct', 0) if smart_exit_paper else real_net_pnl
                 max_net_p = t.max_profit_pct if hasattr(t, 'max_profit_pct') else curr_net_p
                 phase_info_p = self.two_phase_exit.get_current_phase(curr_net_p, max_net_p)
@@ -15698,7 +16372,7 @@ class WhaleTestnetSystem:
             
             # 持倉時間
             entry_time = datetime.fromisoformat(t.entry_time)
-            hold_min = (datetime.now() - entry_time).total_seconds() / 60
+            hold_min = (self.clock.now() - entry_time).total_seconds() / 60
             time_c = Y_ if hold_min > max_hold * 0.8 else R
             lines.append(f"   持倉: {time_c}{hold_min:.1f}/{max_hold:.0f}分鐘{R}")
         else:
@@ -15722,72 +16396,25 @@ class WhaleTestnetSystem:
             lines.append(f"\n{c}{'-'*80}{R}")
             lines.append(f"{B}🔗 dYdX 真實同步狀態{R}")
             
-            # 🔧 v14.3: 使用緩存版本避免 429
+            # 持倉由交易循環在 _collect_dashboard_extra 查詢 (🔧 v14.3: 使用緩存版本避免 429)
             try:
-                import asyncio
-                positions = asyncio.run(self.trader._get_dydx_positions_with_cache())
-                btc_pos = None
-                for pos in positions:
-                    # 🔧 v14.6.8: 使用 abs() 檢查非零 (SHORT 有負數 size)
-                    size_val = float(pos.get("size", 0))
-                    if pos.get("market") == "BTC-USD" and abs(size_val) > 0.00001:
-                        btc_pos = pos
-                        break
-                
-                # 🔧 v14.6.8: 如果 API 沒有持倉但內部追蹤有，使用追蹤數據
-                internal_pos = getattr(self.trader, 'dydx_real_position', None)
-                if not btc_pos and internal_pos and internal_pos.get('size', 0) > 0:
+                if 'dydx_error' in extra:
+                    raise RuntimeError(extra['dydx_error'])
+                positions = extra.get('dydx_positions') or []
+                btc_pos, from_internal = self._select_dydx_btc_position(positions)
+                if from_internal:
                     # API 延遲，顯示內部追蹤的數據 (可能剛開倉)
                     lines.append(f"   {Y_}⏳ [API 同步中] 使用內部追蹤數據{R}")
-                    btc_pos = {
-                        "market": "BTC-USD",
-                        "size": internal_pos['size'] if internal_pos['side'] == 'LONG' else -internal_pos['size'],
-                        "entryPrice": internal_pos['entry_price']
-                    }
                 
                 if btc_pos:
-                    d_size = float(btc_pos.get("size", 0))
-                    d_entry = float(btc_pos.get("entryPrice", 0))
-                    # 🔧 v14.6.14: 優先使用 API 的 side 欄位
-                    d_side = None
-                    raw_side = btc_pos.get("side") or btc_pos.get("positionSide")
-                    if raw_side:
-                        s = str(raw_side).upper()
-                        if s in ("LONG", "BUY"):
-                            d_side = "LONG"
-                        elif s in ("SHORT", "SELL"):
-                            d_side = "SHORT"
-                    if d_side is None:
-                        d_side = "LONG" if d_size > 0 else "SHORT"
-                    d_size = abs(d_size)
+                    d_side, d_size, d_entry = self._parse_dydx_position(btc_pos)
                     
                     # 🔧 v14.6.22: 使用 dYdX Oracle Price (而非 Binance 或慢速的 WS)
                     # 優先順序: dydx_oracle_price_cache > dYdX WebSocket > Binance
-                    dydx_current_price = price  # 預設用 Binance
-                    oracle_cache = getattr(self.trader, 'dydx_oracle_price_cache', 0)
-                    if oracle_cache and oracle_cache > 0:
-                        dydx_current_price = oracle_cache
-                    elif hasattr(self.trader, 'dydx_ws') and self.trader.dydx_ws:
-                        ws_price = getattr(self.trader.dydx_ws, 'current_price', 0)
-                        if ws_price > 0:
-                            dydx_current_price = ws_price
+                    dydx_current_price = self._dydx_mark_price(price)  # 預設用 Binance
                     
                     # 計算真實盈虧 (使用 dYdX 價格)
-                    # 🔧 v14.6.25: 修正槓桿獲取邏輯，優先使用 50X (dYdX BTC 預設)
-                    d_leverage = 50
-                    try:
-                        # 嘗試從 API 配置獲取，如果沒有則維持 50
-                        api_cfg = getattr(getattr(self.trader, 'dydx_api', None), 'config', None)
-                        lev = getattr(api_cfg, 'leverage', None) if api_cfg else None
-                        if isinstance(lev, (int, float)) and lev > 0:
-                            d_leverage = int(lev)
-                        # 只有在非 dYdX 模式下才回退到 config.leverage
-                    except Exception:
-                        pass
-                    
-                    if d_leverage <= 0:
-                        d_leverage = 50
-                    d_leverage = min(int(d_leverage), 50)
+                    d_leverage = self._dydx_leverage()
                     
                     if d_side == "LONG":
                         d_pnl_pct_raw = (dydx_current_price - d_entry) / d_entry * 100
@@ -15852,76 +16479,12 @@ class WhaleTestnetSystem:
                         sl_p = pending_sl.get('sl_price', 0) if pending_sl else 0
 
                         # 若本地追蹤缺失，從 indexer 取得實際 open orders 顯示
-                        if (tp_p <= 0 or sl_p <= 0) and getattr(self.trader, 'dydx_api', None):
-                            try:
-                                import asyncio
-                                open_orders = asyncio.run(
-                                    self.trader.dydx_api.get_open_orders(
-                                        status=["OPEN", "UNTRIGGERED"],
-                                        symbol="BTC-USD",
-                                    )
-                                )
-                            except Exception:
-                                open_orders = []
-
-                            if open_orders:
-                                expected_exit_side = "SELL" if d_side == "LONG" else "BUY"
-                                tp_best_dist = None
-                                sl_best_dist = None
-
-                                for order in open_orders:
-                                    side_raw = str(order.get("side", "") or "").upper()
-                                    if side_raw in ("LONG", "BUY"):
-                                        side_norm = "BUY"
-                                    elif side_raw in ("SHORT", "SELL"):
-                                        side_norm = "SELL"
-                                    else:
-                                        side_norm = side_raw
-
-                                    if expected_exit_side and side_norm and side_norm != expected_exit_side:
-                                        continue
-
-                                    otype = str(order.get("type", "") or "").upper()
-                                    trigger_price = _coerce_float(order.get("triggerPrice", 0.0), default=0.0)
-                                    price = _coerce_float(order.get("price", 0.0), default=0.0)
-                                    is_conditional = False
-                                    if trigger_price > 0:
-                                        is_conditional = True
-                                    elif "STOP" in otype or "TAKE_PROFIT" in otype:
-                                        is_conditional = True
-
-                                    if is_conditional and sl_p <= 0:
-                                        sl_price = trigger_price if trigger_price > 0 else price
-                                        if sl_price <= 0:
-                                            continue
-                                        if (d_side == "LONG" and sl_price > d_entry) or (d_side == "SHORT" and sl_price < d_entry):
-                                            continue
-                                        dist = abs(sl_price - d_entry)
-                                        if sl_best_dist is None or dist < sl_best_dist:
-                                            sl_best_dist = dist
-                                            sl_p = sl_price
-                                            open_sl_info = {
-                                                "price": sl_price,
-                                                "client_id": order.get("clientId") or order.get("id"),
-                                                "source": "indexer",
-                                            }
-                                        continue
-
-                                    if (not is_conditional) and tp_p <= 0:
-                                        tp_price = price
-                                        if tp_price <= 0:
-                                            continue
-                                        if (d_side == "LONG" and tp_price < d_entry) or (d_side == "SHORT" and tp_price > d_entry):
-                                            continue
-                                        dist = abs(tp_price - d_entry)
-                                        if tp_best_dist is None or dist < tp_best_dist:
-                                            tp_best_dist = dist
-                                            tp_p = tp_price
-                                            open_tp_info = {
-                                                "price": tp_price,
-                                                "client_id": order.get("clientId") or order.get("id"),
-                                                "source": "indexer",
-                                            }
+                        if tp_p <= 0 or sl_p <= 0:
+                            open_tp_info, open_sl_info = extra.get('dydx_open_protection') or (None, None)
+                            if tp_p <= 0 and open_tp_info:
+                                tp_p = open_tp_info["price"]
+                            if sl_p <= 0 and open_sl_info:
+                                sl_p = open_sl_info["price"]
 
                         if tp_p > 0 or sl_p > 0:
                             tp_text = f"${tp_p:,.2f}" if tp_p > 0 else "--"
@@ -15929,18 +16492,8 @@ class WhaleTestnetSystem:
                             lines.append(f"   {Y_}[dYdX 預掛單]{R} TP: {tp_text}  SL: {sl_text}")
                         
                         # 🔧 v14.9.6: 不要在 Dashboard 渲染時執行同步，只顯示提示
-                        # 同步應該在主交易循環中處理
+                        # 同步由主交易循環 _maintain_dydx_protective_orders() 標記並處理
                         lines.append(f"   {Y_}⚠️ dYdX 有倉但 Paper 無倉 - 請等待自動同步...{R}")
-                        # 標記需要同步，主循環會處理
-                        if not getattr(self.trader, '_pending_dydx_sync', False):
-                            self.trader._pending_dydx_sync = True
-                    
-                    # 同步內部追蹤變數（確保後續止損補掛使用最新 entry/size）
-                    self.trader.dydx_real_position = {
-                        "side": d_side,
-                        "size": d_size,
-                        "entry_price": d_entry,
-                    }
 
                     # 🔐 N%鎖N% 鎖利狀態 (從 Paper Trading 複製)
                     # 🔧 v14.6.11: 即使沒有 paper_trade 也顯示基本 N%鎖N% (使用 dYdX 數據)
@@ -15954,8 +16507,7 @@ class WhaleTestnetSystem:
                             max_pnl = getattr(self.trader, '_dydx_max_pnl', current_pnl)
                         
                         if current_pnl > max_pnl:
-                            max_pnl = current_pnl
-                            self.trader._dydx_max_pnl = max_pnl  # 更新追蹤
+                            max_pnl = current_pnl  # 追蹤值由交易循環更新
                         
                         lock_pct, stage_name = self.trader.get_progressive_stop_loss(max_pnl)
                         
@@ -16017,37 +16569,16 @@ class WhaleTestnetSystem:
                         else:
                             if lock_pct > 0:
                                 lines.append(f"      {Y_}⚠️ 應掛 dYdX 止損單 (鎖利 {lock_pct:+.1f}%) 但尚未掛單{R}")
-
-                                # 🛡️ 重要：鎖利應該要真的落地到交易所條件單
-                                # 避免只在畫面顯示「應該鎖住」但實際沒掛單。
-                                try:
-                                    last_ts = getattr(self.trader, '_last_sl_autoplace_ts', 0.0)
-                                    now_ts = time.time()
-                                    # 每 10 秒最多嘗試一次，避免 Dashboard 刷新造成狂打 API
-                                    if now_ts - last_ts >= 10.0:
-                                        self.trader._last_sl_autoplace_ts = now_ts
-                                        ok = self.trader.update_dydx_stop_loss(lock_pct)
-                                        if ok:
-                                            # 更新後下一輪會透過 pending_sl_order 顯示掛單資訊
-                                            lines.append(f"      {G_}✅ 已自動補掛 dYdX 止損單{R}")
-                                except Exception as e:
-                                    lines.append(f"      {Y_}⚠️ 自動補掛失敗: {e}{R}")
                             else:
                                 lines.append(f"      {y}📋 無 dYdX 止損掛單 (尚未進入鎖利區){R}")
 
                         if lock_pct > 0 and sl_update_needed:
                             lines.append(f"      {Y_}⚠️ dYdX 止損掛單偏弱，需更新 ({sl_update_reason}){R}")
-                            try:
-                                last_ts = getattr(self.trader, '_last_sl_autoplace_ts', 0.0)
-                                now_ts = time.time()
-                                # 每 10 秒最多嘗試一次，避免 Dashboard 刷新造成狂打 API
-                                if now_ts - last_ts >= 10.0:
-                                    self.trader._last_sl_autoplace_ts = now_ts
-                                    ok = self.trader.update_dydx_stop_loss(lock_pct)
-                                    if ok:
-                                        lines.append(f"      {G_}✅ 已更新 dYdX 止損單 (鎖利 {lock_pct:+.2f}%){R}")
-                            except Exception as e:
-                                lines.append(f"      {Y_}⚠️ 自動更新失敗: {e}{R}")
+
+                        # 止損補掛由交易循環執行，這裡只顯示最近一次結果
+                        repair_note = getattr(self.trader, '_last_sl_autoplace_note', '')
+                        if repair_note:
+                            lines.append(f"      {Y_}{repair_note}{R}")
                     
                 else:
                     # 🔧 v14.6.8: 改進無持倉提示，顯示 API 回傳數量與 Paper 狀態
@@ -16067,41 +16598,17 @@ class WhaleTestnetSystem:
                         lines.append(f"   {R_}   可能原因: 開倉失敗/API 延遲/已被平倉{R}")
                         lines.append(f"   {y}   API 回傳持倉數: {api_pos_count}{R}")
                         
-                        # 🆕 v14.6.19: 自動清空 dYdX 殘留訂單 (避免孤兒 TP/SL 單)
-                        # 每 60 秒最多觸發一次清單
-                        last_sweep_time = getattr(self.trader, '_last_orphan_sweep_time', 0)
-                        now_ts = time.time()
-                        if now_ts - last_sweep_time > 60:
-                            self.trader._last_orphan_sweep_time = now_ts
-                            try:
-                                import asyncio
-                                if self.trader.dydx_api:
-                                    # 清空所有 OPEN + UNTRIGGERED 訂單
-                                    cancelled = asyncio.run(
-                                        self.trader.dydx_api.cancel_open_orders(
-                                            symbol="BTC-USD",
-                                            status=["OPEN", "UNTRIGGERED"]
-                                        )
-                                    )
-                                    if cancelled > 0:
-                                        lines.append(f"   {Y_}🧹 已清空 {cancelled} 筆孤兒訂單{R}")
-                                        self.logger.warning(f"🧹 Paper有倉dYdX無倉，已清空 {cancelled} 筆殘留訂單")
-                                    # 同時清空本地追蹤
-                                    self.trader.pending_tp_order = None
-                                    self.trader.pending_sl_order = None
-                                    if self.trader.dydx_real_position:
-                                        self.trader.dydx_real_position["tp_order_id"] = 0
-                                        self.trader.dydx_real_position["sl_order_id"] = 0
-                            except Exception as e:
-                                lines.append(f"   {R_}⚠️ 清單失敗: {e}{R}")
+                        # 🆕 v14.6.19: 殘留訂單清掃由交易循環執行，這裡只顯示最近一次結果
+                        sweep_note = getattr(self.trader, '_last_orphan_sweep_note', '')
+                        if sweep_note:
+                            lines.append(f"   {Y_}{sweep_note}{R}")
                     else:
                         lines.append(f"   {y}無 dYdX 持倉{R} (API 回傳: {api_pos_count} 筆)")
-                    self.trader.dydx_real_position = None
             except Exception as e:
                 lines.append(f"   {R_}查詢失敗: {e}{R}")
         
         # 🆕 資金統計 (類似圖片排行榜)
-        summary = self.trader.get_summary()
+        summary = extra.get('summary') or {}
         initial = summary.get('initial_balance', 100)
         current = summary.get('current_balance', 100)
         profit_pct = summary.get('profit_pct', 0)
@@ -16111,11 +16618,8 @@ class WhaleTestnetSystem:
         win_rate = wins / total_trades * 100 if total_trades > 0 else 0
         runtime = summary.get('runtime', '0h 0m')
 
-        closed_trades = [t for t in getattr(self.trader, 'trades', []) if getattr(t, 'status', '') != "OPEN"]
-        win_trades = [t for t in closed_trades if getattr(t, 'net_pnl_usdt', 0) > 0]
-        loss_trades = [t for t in closed_trades if getattr(t, 'net_pnl_usdt', 0) <= 0]
-        avg_win = sum(t.net_pnl_usdt for t in win_trades) / len(win_trades) if win_trades else 0.0
-        avg_loss = sum(t.net_pnl_usdt for t in loss_trades) / len(loss_trades) if loss_trades else 0.0
+        avg_win = extra.get('avg_win', 0.0)
+        avg_loss = extra.get('avg_loss', 0.0)
         
         # ════════════════════════════════════════════════════════════════════
         # 🆕 dYdX 同步模式：使用真實餘額
@@ -16164,8 +16668,7 @@ class WhaleTestnetSystem:
 
             # 🧾 最近成交（用於與 dYdX 線上交易紀錄快速比對）
             try:
-                import asyncio
-                fills = asyncio.run(self.trader.dydx_api.get_recent_fills(limit=1))
+                fills = extra.get('recent_fills')
                 if fills and len(fills) > 0:
                     f0 = fills[0]
                     f_mkt = f0.get('market', '')
@@ -16178,7 +16681,7 @@ class WhaleTestnetSystem:
                 pass
             
             # 🆕 v14.6.25: 從 dYdX API 獲取真實統計 (最準確)
-            real_stats = self.trader.get_dydx_real_stats()
+            real_stats = extra.get('dydx_real_stats')
             if real_stats:
                 r_trades = real_stats.get('total_trades', 0)
                 r_wins = real_stats.get('wins', 0)
@@ -16224,7 +16727,7 @@ class WhaleTestnetSystem:
             lines.append(f"      最佳平均: {avg_win_c}${avg_win:+.2f}{R}  最差平均: {avg_loss_c}${avg_loss:+.2f}{R}")
         
         # 交易狀態
-        can_trade, reason = self.trader.can_trade()
+        can_trade, reason = extra.get('can_trade', (False, ''))
         status_c = G_ if can_trade else y
         lines.append(f"\n{B}⏱️ 交易狀態{R}: {status_c}{reason}{R}")
         
@@ -16232,6 +16735,306 @@ class WhaleTestnetSystem:
         
         return "\n".join(lines)
     
+    # ==================== dYdX 保護單維護 ====================
+
+    def _dydx_mark_price(self, fallback: float) -> float:
+        """dYdX 標記價格: Oracle 緩存 > dYdX WebSocket > fallback (Binance)"""
+        # 🔧 v14.6.22: 使用 dYdX Oracle Price (而非 Binance 或慢速的 WS)
+        oracle_cache = getattr(self.trader, 'dydx_oracle_price_cache', 0)
+        if oracle_cache and oracle_cache > 0:
+            return oracle_cache
+        if hasattr(self.trader, 'dydx_ws') and self.trader.dydx_ws:
+            ws_price = getattr(self.trader.dydx_ws, 'current_price', 0)
+            if ws_price > 0:
+                return ws_price
+        return fallback
+
+    def _dydx_leverage(self) -> int:
+        """dYdX 槓桿: 優先讀 API 配置，缺省/異常時 50X (dYdX BTC 預設)，上限 50X"""
+        # 🔧 v14.6.25: 修正槓桿獲取邏輯，優先使用 50X (dYdX BTC 預設)
+        d_leverage = 50
+        try:
+            api_cfg = getattr(getattr(self.trader, 'dydx_api', None), 'config', None)
+            lev = getattr(api_cfg, 'leverage', None) if api_cfg else None
+            if isinstance(lev, (int, float)) and lev > 0:
+                d_leverage = int(lev)
+        except Exception:
+            pass
+        if d_leverage <= 0:
+            d_leverage = 50
+        return min(int(d_leverage), 50)
+
+    def _fetch_dydx_open_protection(self, d_side: str, d_entry: float) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """
+        從 indexer 的 open orders 找出最接近進場價的 TP / SL 單
+
+        Returns:
+            (open_tp_info, open_sl_info)，各為 {"price", "client_id", "source"} 或 None
+        """
+        if not getattr(self.trader, 'dydx_api', None):
+            return None, None
+        try:
+            open_orders = asyncio.run(
+                self.trader.dydx_api.get_open_orders(
+                    status=["OPEN", "UNTRIGGERED"],
+                    symbol=self.dydx_market,
+                )
+            )
+        except Exception:
+            open_orders = []
+
+        open_tp_info = None
+        open_sl_info = None
+        if not open_orders:
+            return open_tp_info, open_sl_info
+
+        expected_exit_side = "SELL" if d_side == "LONG" else "BUY"
+        tp_best_dist = None
+        sl_best_dist = None
+
+        for order in open_orders:
+            side_raw = str(order.get("side", "") or "").upper()
+            if side_raw in ("LONG", "BUY"):
+                side_norm = "BUY"
+            elif side_raw in ("SHORT", "SELL"):
+                side_norm = "SELL"
+            else:
+                side_norm = side_raw
+
+            if expected_exit_side and side_norm and side_norm != expected_exit_side:
+                continue
+
+            otype = str(order.get("type", "") or "").upper()
+            trigger_price = _coerce_float(order.get("triggerPrice", 0.0), default=0.0)
+            price = _coerce_float(order.get("price", 0.0), default=0.0)
+            is_conditional = False
+            if trigger_price > 0:
+                is_conditional = True
+            elif "STOP" in otype or "TAKE_PROFIT" in otype:
+                is_conditional = True
+
+            if is_conditional:
+                sl_price = trigger_price if trigger_price > 0 else price
+                if sl_price <= 0:
+                    continue
+                if (d_side == "LONG" and sl_price > d_entry) or (d_side == "SHORT" and sl_price < d_entry):
+                    continue
+                dist = abs(sl_price - d_entry)
+                if sl_best_dist is None or dist < sl_best_dist:
+                    sl_best_dist = dist
+                    open_sl_info = {
+                        "price": sl_price,
+                        "client_id": order.get("clientId") or order.get("id"),
+                        "source": "indexer",
+                    }
+                continue
+
+            tp_price = price
+            if tp_price <= 0:
+                continue
+            if (d_side == "LONG" and tp_price < d_entry) or (d_side == "SHORT" and tp_price > d_entry):
+                continue
+            dist = abs(tp_price - d_entry)
+            if tp_best_dist is None or dist < tp_best_dist:
+                tp_best_dist = dist
+                open_tp_info = {
+                    "price": tp_price,
+                    "client_id": order.get("clientId") or order.get("id"),
+                    "source": "indexer",
+                }
+
+        return open_tp_info, open_sl_info
+
+    def _maintain_dydx_protective_orders(self) -> None:
+        """
+        dYdX 保護單維護 (每輪交易循環執行，不受儀表板幀率/退避/無頭模式影響)
+
+        - 同步 dydx_real_position / _dydx_max_pnl 追蹤，dYdX 有倉 Paper 無倉時標記同步
+        - N%鎖N%: 鎖利止損未掛或偏弱時補掛/更新 (每 10 秒最多一次)
+        - Paper 有倉但 dYdX 無倉: 清空殘留 TP/SL 孤兒單 (每 60 秒最多一次)
+
+        執行結果寫入 trader._last_sl_autoplace_note / _last_orphan_sweep_note 供儀表板顯示。
+        """
+        if not (getattr(self.trader, 'dydx_sync_enabled', False) == True and getattr(self.trader, 'dydx_api', None)):
+            return
+
+        # 🔧 v14.3: 使用緩存版本避免 429
+        try:
+            positions = asyncio.run(self.trader._get_dydx_positions_with_cache())
+        except Exception as e:
+            self.logger.debug(f"dYdX 保護單維護略過: {e}")
+            return
+
+        btc_pos = None
+        for pos in positions or []:
+            try:
+                size_val = float(pos.get("size", 0))
+            except (TypeError, ValueError):
+                continue
+            if pos.get("market") == self.dydx_market and abs(size_val) > 0.00001:
+                btc_pos = pos
+                break
+
+        # 🔧 v14.6.8: API 延遲 (可能剛開倉) 時使用內部追蹤數據
+        internal_pos = getattr(self.trader, 'dydx_real_position', None)
+        if not btc_pos and internal_pos and internal_pos.get('size', 0) > 0:
+            btc_pos = {
+                "market": self.dydx_market,
+                "size": internal_pos['size'] if internal_pos['side'] == 'LONG' else -internal_pos['size'],
+                "entryPrice": internal_pos['entry_price']
+            }
+
+        paper_trade = getattr(self.trader, 'active_trade', None)
+
+        if not btc_pos:
+            self.trader._last_sl_autoplace_note = ""
+            if paper_trade:
+                self._sweep_orphan_dydx_orders()
+            else:
+                self.trader._last_orphan_sweep_note = ""
+            self.trader.dydx_real_position = None
+            return
+        self.trader._last_orphan_sweep_note = ""
+
+        d_size = float(btc_pos.get("size", 0))
+        d_entry = float(btc_pos.get("entryPrice", 0))
+        # 🔧 v14.6.14: 優先使用 API 的 side 欄位
+        d_side = None
+        raw_side = btc_pos.get("side") or btc_pos.get("positionSide")
+        if raw_side:
+            s = str(raw_side).upper()
+            if s in ("LONG", "BUY"):
+                d_side = "LONG"
+            elif s in ("SHORT", "SELL"):
+                d_side = "SHORT"
+        if d_side is None:
+            d_side = "LONG" if d_size > 0 else "SHORT"
+        d_size = abs(d_size)
+
+        # 🔧 v14.9.6: dYdX 有倉但 Paper 無倉，標記同步 (下一輪 1.6 步驟處理)
+        if not paper_trade and not getattr(self.trader, '_pending_dydx_sync', False):
+            self.trader._pending_dydx_sync = True
+
+        # 同步內部追蹤變數（確保後續止損補掛使用最新 entry/size）
+        self.trader.dydx_real_position = {
+            "side": d_side,
+            "size": d_size,
+            "entry_price": d_entry,
+        }
+
+        if not self.config.use_n_lock_n or d_entry <= 0:
+            return
+
+        dydx_current_price = self._dydx_mark_price(self.get_current_price())
+        d_leverage = self._dydx_leverage()
+        if d_side == "LONG":
+            d_pnl_pct_raw = (dydx_current_price - d_entry) / d_entry * 100
+        else:
+            d_pnl_pct_raw = (d_entry - dydx_current_price) / d_entry * 100
+        current_pnl = d_pnl_pct_raw * d_leverage
+
+        if paper_trade:
+            max_pnl = paper_trade.max_profit_pct if hasattr(paper_trade, 'max_profit_pct') else current_pnl
+        else:
+            max_pnl = getattr(self.trader, '_dydx_max_pnl', current_pnl)
+        if current_pnl > max_pnl:
+            max_pnl = current_pnl
+            self.trader._dydx_max_pnl = max_pnl
+
+        lock_pct, _ = self.trader.get_progressive_stop_loss(max_pnl)
+        if lock_pct <= 0:
+            self.trader._last_sl_autoplace_note = ""
+            return
+
+        # 🛡️ 鎖利必須真的落地到交易所條件單，每 10 秒最多嘗試一次避免狂打 API
+        now_ts = self.clock.time()
+        if now_ts - getattr(self.trader, '_last_sl_autoplace_ts', 0.0) < 10.0:
+            return
+
+        if d_side == "LONG":
+            sl_price = d_entry * (1 + lock_pct / d_leverage / 100)
+        else:
+            sl_price = d_entry * (1 - lock_pct / d_leverage / 100)
+
+        pending_sl = getattr(self.trader, 'pending_sl_order', None)
+        has_sl = bool(pending_sl)
+        needs_update = False
+        if pending_sl:
+            try:
+                needs_update = lock_pct > float(pending_sl.get('stop_pct', 0)) + 0.05
+            except (TypeError, ValueError):
+                pass
+        else:
+            open_sl_info = None
+            if not paper_trade:
+                _, open_sl_info = self._fetch_dydx_open_protection(d_side, d_entry)
+            if open_sl_info:
+                has_sl = True
+                sl_order_price = open_sl_info.get("price", 0)
+                price_tol = max(0.01, sl_price * 0.001)
+                if sl_order_price > 0 and (
+                    (d_side == "LONG" and sl_order_price < sl_price - price_tol)
+                    or (d_side == "SHORT" and sl_order_price > sl_price + price_tol)
+                ):
+                    needs_update = True
+            else:
+                needs_update = True
+
+        if not needs_update:
+            return
+
+        self.trader._last_sl_autoplace_ts = now_ts
+        action = "更新" if has_sl else "補掛"
+        try:
+            ok = self.trader.update_dydx_stop_loss(lock_pct)
+        except Exception as e:
+            self.trader._last_sl_autoplace_note = f"⚠️ 自動{action}止損失敗: {e}"
+            self.logger.warning(f"dYdX 止損自動{action}失敗: {e}")
+            return
+        if ok:
+            self.trader._last_sl_autoplace_note = f"✅ 已自動{action} dYdX 止損單 (鎖利 {lock_pct:+.2f}%)"
+            self.logger.info(f"🛡️ 已自動{action} dYdX 止損單 (鎖利 {lock_pct:+.2f}%)")
+
+    def _sweep_orphan_dydx_orders(self) -> None:
+        """Paper 有倉但 dYdX 無倉: 清空 OPEN + UNTRIGGERED 殘留單與本地追蹤 (每 60 秒最多一次)"""
+        # 🆕 v14.6.19: 自動清空 dYdX 殘留訂單 (避免孤兒 TP/SL 單)
+        now_ts = self.clock.time()
+        if now_ts - getattr(self.trader, '_last_orphan_sweep_time', 0) <= 60:
+            return
+        self.trader._last_orphan_sweep_time = now_ts
+        try:
+            cancelled = asyncio.run(
+                self.trader.dydx_api.cancel_open_orders(
+                    symbol=self.dydx_market,
+                    status=["OPEN", "UNTRIGGERED"]
+                )
+            )
+        except Exception as e:
+            self.trader._last_orphan_sweep_note = f"⚠️ 清單失敗: {e}"
+            self.logger.warning(f"dYdX 殘留訂單清掃失敗: {e}")
+            return
+        if cancelled > 0:
+            self.trader._last_orphan_sweep_note = f"🧹 已清空 {cancelled} 筆孤兒訂單"
+            self.logger.warning(f"🧹 Paper有倉dYdX無倉，已清空 {cancelled} 筆殘留訂單")
+        # 同時清空本地追蹤
+        self.trader.pending_tp_order = None
+        self.trader.pending_sl_order = None
+        if self.trader.dydx_real_position:
+            self.trader.dydx_real_position["tp_order_id"] = 0
+            self.trader.dydx_real_position["sl_order_id"] = 0
+
+    def _binance_rest_gate(self, weight: float = 1.0) -> None:
+        """多幣種模式: 送出 Binance REST 前向協調器扣權重，額度不足時等待"""
+        if self.coordinator is None:
+            return
+        try:
+            wait = self.coordinator.acquire_rate("binance_rest", weight)
+        except Exception as e:
+            logging.debug(f"協調器限速查詢失敗: {e}")
+            return
+        if wait > 0:
+            WALL_CLOCK.sleep(wait)  # REST 限速等待，用系統時間
+
     def _preload_strategy_history(self):
         """
         🆕 v13.2: 預載過去 5 分鐘的策略歷史數據 (Binance Brain)
@@ -16247,12 +17050,13 @@ class WhaleTestnetSystem:
                 # Binance Futures API
                 base_url = "https://fapi.binance.com/fapi/v1/klines"
                 params = {
-                    "symbol": "BTCUSDT",
+                    "symbol": self.config.binance_symbol,
                     "interval": "1m",
                     "limit": 10
                 }
+                self._binance_rest_gate(1)
                 
-                now = time.time()
+                now = self.clock.time()
                 
                 async with aiohttp.ClientSession() as session:
                     async with session.get(base_url, params=params) as resp:
@@ -16385,7 +17189,7 @@ class WhaleTestnetSystem:
         signal.signal(signal.SIGTERM, graceful_shutdown)  # kill 命令
         
         # 🆕 v13.6: 自動保存計時器
-        self._last_auto_save_time = time.time()
+        self._last_auto_save_time = self.clock.time()
         self._auto_save_interval = 30  # 每 30 秒自動保存
         
         # 啟動 WebSocket
@@ -16400,7 +17204,7 @@ class WhaleTestnetSystem:
             self.spread_guard.set_data_sources(self.binance_ws, self.ws)
             print("✅ 幣安-dYdX 價差保護系統啟動")
         
-        end_time = time.time() + hours * 3600
+        end_time = self.clock.time() + hours * 3600
         
         mode_str = "PAPER 模擬" if self.config.paper_mode else "TESTNET 測試網"
         
@@ -16462,16 +17266,29 @@ class WhaleTestnetSystem:
         # 啟動 WebSocket
         if not use_binance_paper:
             self.ws.start()
-        time.sleep(2)  # 等待連接
+        self.clock.sleep(2)  # 等待連接
         
         # 🆕 v12.10: 預載歷史數據 (不用等 5 分鐘)
         self._preload_strategy_history()
         
+        # 儀表板渲染器: 背景執行緒按幀率渲染交易循環發布的快照，超出幀預算時退避；
+        # REST 查詢在循環內由 _collect_dashboard_extra() 完成，render_dashboard 只負責顯示，
+        # 止損補掛/孤兒單清掃由 _maintain_dydx_protective_orders() 每輪執行
+        headless = bool(getattr(self.config, 'headless', False))
+        self.dashboard = DashboardRenderer(
+            self.render_dashboard,
+            fps=getattr(self.config, 'dashboard_fps', None) or 1.0,
+            frame_budget_ms=getattr(self.config, 'dashboard_frame_budget_ms', None) or 50.0,
+            headless=headless,
+        )
+        self.dashboard.start()
+        
         # 隱藏游標
-        print("\033[?25l", end="")
+        if not headless:
+            print("\033[?25l", end="")
         
         try:
-            while self.running and time.time() < end_time:
+            while self.running and self.clock.time() < end_time:
                 self.iteration += 1
                 
                 # ========== 即時監控 (每秒) ==========
@@ -16496,7 +17313,7 @@ class WhaleTestnetSystem:
                 else:
                     # 保留最近一次警報 30 秒供 Dashboard 顯示
                     if self.market_data.get('price_spike'):
-                        if time.time() - self.market_data['price_spike'].get('timestamp', 0) > 30:
+                        if self.clock.time() - self.market_data['price_spike'].get('timestamp', 0) > 30:
                             self.market_data['price_spike'] = None
 
                 # 1.6 🆕 dYdX 實倉同步 (防殘留/幻影倉)
@@ -16706,7 +17523,7 @@ class WhaleTestnetSystem:
                 
                 # 🔧 v14.1: 價格為 0 時跳過交易邏輯 (API rate limit)
                 if market_price <= 0:
-                    time.sleep(1)
+                    self.clock.sleep(1)
                     continue
                 
                 # 🆕 v12.0 預掛單模式處理
@@ -16855,7 +17672,7 @@ class WhaleTestnetSystem:
                     exchange_conditional_orders = []
                     exchange_has_conditional = False
                     if self.trader.dydx_sync_enabled and self.trader.dydx_api:
-                        exchange_conditional_orders = self.trader._get_open_conditional_orders_sync("BTC-USD")
+                        exchange_conditional_orders = self.trader._get_open_conditional_orders_sync(self.dydx_market)
                         exchange_has_conditional = bool(exchange_conditional_orders)
                     if exchange_has_conditional and not has_pending_sl:
                         has_pending_sl = True
@@ -16883,7 +17700,7 @@ class WhaleTestnetSystem:
                         pending = self.trader._pending_sl_update
                         stop_pct = pending.get('stop_pct', 0)
                         try:
-                            now_ts = time.time()
+                            now_ts = self.clock.time()
                             if now_ts < getattr(self.trader, "_dydx_tx_backoff_until", 0.0):
                                 ok = False
                             else:
@@ -16913,7 +17730,7 @@ class WhaleTestnetSystem:
                             is_emergency = True  # 舊格式，預設緊急
                         
                         # 🔧 v14.6.36: 節流「等待 dYdX 條件單」訊息，每 30 秒最多打印一次
-                        now_ts = time.time()
+                        now_ts = self.clock.time()
                         last_wait_log_ts = getattr(self, '_last_wait_dydx_log_ts', 0)
                         should_log_wait = (now_ts - last_wait_log_ts) >= 30.0
 
@@ -17043,20 +17860,20 @@ class WhaleTestnetSystem:
                                 except Exception:
                                     positions = []
                                 for pos in positions or []:
-                                    if pos.get("market") != "BTC-USD":
+                                    if pos.get("market") != self.dydx_market:
                                         continue
                                     size = _coerce_float(pos.get("size", 0.0), default=0.0)
                                     if abs(size) > 0.0001:
                                         rest_has_position = True
                                         break
                                 if rest_has_position:
-                                    rest_conditionals = self.trader._get_open_conditional_orders_sync("BTC-USD")
+                                    rest_conditionals = self.trader._get_open_conditional_orders_sync(self.dydx_market)
                                     if not rest_conditionals:
                                         try:
                                             asyncio.run(self.trader._ensure_dydx_protection_orders(reason="pre_forced_close"))
                                         except Exception as e:
                                             self.logger.warning(f"   ⚠️ [v14.9.13] dYdX 保護單補掛失敗: {e}")
-                                        rest_conditionals = self.trader._get_open_conditional_orders_sync("BTC-USD")
+                                        rest_conditionals = self.trader._get_open_conditional_orders_sync(self.dydx_market)
                                 if rest_has_position and rest_conditionals:
                                     if should_log_wait:
                                         self.logger.warning("   ✅ [v14.9.13] REST 確認條件單存在，延長等待避免本地平倉")
@@ -17074,7 +17891,7 @@ class WhaleTestnetSystem:
                         
                         # 🔧 v14.9.12: 任何止損都設置冷卻標記防止無限循環同步
                         # (不只緊急止損，普通止損也需要！因為止損後 Paper 清空會觸發 SYNC)
-                        self.trader._last_emergency_stop_ts = time.time()
+                        self.trader._last_emergency_stop_ts = self.clock.time()
                         self.logger.info(f"   ⏳ [v14.9.12] 設置 30 秒止損冷卻期 (防止 SYNC 循環)")
                         
                         # 🔧 v14.9.10: 緊急止損時，對 dYdX 發出真實的市價平倉指令
@@ -17118,7 +17935,7 @@ class WhaleTestnetSystem:
                             # 這樣可以防止 SYNC 循環 (Paper 有倉 + dYdX 有倉 = 不會觸發 SYNC)
                             if not dydx_close_success:
                                 self.logger.warning(f"   ⚠️ [v14.9.12] dYdX 平倉失敗，保留 Paper 倉位避免 SYNC 循環")
-                                self.trader._last_emergency_stop_ts = time.time() + 300  # 延長冷卻 5 分鐘
+                                self.trader._last_emergency_stop_ts = self.clock.time() + 300  # 延長冷卻 5 分鐘
                                 continue  # 跳過本次止損，等待下次重試
                         elif has_pending_sl and is_emergency:
                             # 有預掛 SL 但緊急：先取消 dYdX 條件單，再市價平倉
@@ -17178,7 +17995,7 @@ class WhaleTestnetSystem:
                     try:
                         # 1. WS 即時檢查：是否已有持倉
                         if hasattr(self.trader, 'dydx_ws') and self.trader.dydx_ws:
-                            if self.trader.dydx_ws.has_position("BTC-USD"):
+                            if self.trader.dydx_ws.has_position(self.dydx_market):
                                 self.logger.warning("⚠️ [WS] dYdX 已有持倉，跳過進場")
                                 dydx_entry_blocked = True
                         
@@ -17255,6 +18072,7 @@ class WhaleTestnetSystem:
                             'strategy_probs': data.get('strategy_probs', {}),
                             'price_change_1m': data.get('price_change_1m', 0),
                             'price_change_5m': data.get('price_change_5m', 0),
+                            'regime': self.current_regime or self.market_regime,
                             # 🆕 v14.13: 加入六維指標完整資訊
                             'six_dim': {
                                 'long_score': six_dim_info.get('long_score', 0),
@@ -17288,8 +18106,8 @@ class WhaleTestnetSystem:
                 # ========== 定期決策 (每 30 秒) ==========
                 
                 # 5. 定期策略分析同步
-                if time.time() - self.last_analysis_time >= self.config.analysis_interval_sec:
-                    self.last_analysis_time = time.time()
+                if self.clock.time() - self.last_analysis_time >= self.config.analysis_interval_sec:
+                    self.last_analysis_time = self.clock.time()
                     
                     # 🆕 v14.6.16: 定期檢查 dYdX 是否有殘留訂單 (無持倉時自動清掃)
                     if self.config.dydx_sync_mode and self.trader.dydx_api:
@@ -17299,21 +18117,21 @@ class WhaleTestnetSystem:
                                 # 檢查 dYdX WebSocket 持倉狀態
                                 ws_has_pos = (hasattr(self.trader, 'dydx_ws') and 
                                               self.trader.dydx_ws and 
-                                              self.trader.dydx_ws.has_position("BTC-USD"))
+                                              self.trader.dydx_ws.has_position(self.dydx_market))
                                 # 檢查 API 持倉狀態
                                 api_has_pos = bool(self.trader.dydx_real_position and 
                                                    self.trader.dydx_real_position.get('size', 0) > 0.00001)
                                 
                                 # 如果 dYdX 端也沒有持倉，但還有掛單記錄，執行清掃
                                 if not ws_has_pos and not api_has_pos:
-                                    now_ts = time.time()
+                                    now_ts = self.clock.time()
                                     last_sweep_ts = getattr(self.trader, "_last_flat_order_sweep_ts", 0.0)
                                     if (now_ts - last_sweep_ts) >= 15.0:
                                         self.trader._last_flat_order_sweep_ts = now_ts
                                         open_orders = asyncio.run(
                                             self.trader.dydx_api.get_open_orders(
                                                 status=["OPEN", "UNTRIGGERED"],
-                                                symbol="BTC-USD"
+                                                symbol=self.dydx_market
                                             )
                                         )
                                         cache_age = now_ts - getattr(self.trader.dydx_api, "_open_orders_cache_time", 0.0)
@@ -17322,7 +18140,7 @@ class WhaleTestnetSystem:
                                             self.logger.info("🧹 [定期] 無持倉但有殘留掛單，執行清掃...")
                                             asyncio.run(self.trader._dydx_sweep_open_orders(
                                                 reason="periodic_no_position_sweep",
-                                                market="BTC-USD"
+                                                market=self.dydx_market
                                             ))
                                             try:
                                                 asyncio.run(self.trader._log_dydx_protection_snapshot(
@@ -17341,11 +18159,18 @@ class WhaleTestnetSystem:
                         except Exception as e:
                             self.logger.debug(f"Periodic position check skipped: {e}")
                 
-                # 4. 渲染儀表板
-                dashboard = self.render_dashboard()
-                sys.stdout.write("\033[2J\033[H")
-                sys.stdout.write(dashboard)
-                sys.stdout.flush()
+                # 🛡️ dYdX 保護單維護 (止損補掛/孤兒單清掃，不受儀表板退避影響)
+                self._maintain_dydx_protective_orders()
+                
+                # 4. 發布儀表板快照 (渲染執行緒按幀率進行，畫面未變不重寫；無頭模式不收集)
+                if self.dashboard.enabled:
+                    self.dashboard.publish(DashboardSnapshot(
+                        iteration=self.iteration,
+                        timestamp=self.clock.time(),
+                        price=self.get_current_price(),
+                        market_data=freeze(self.market_data),
+                        extra=freeze(self._collect_dashboard_extra()),
+                    ))
                 
                 # 5. 日誌記錄
                 if self.iteration % 10 == 0:  # 每 10 秒記錄一次
@@ -17357,7 +18182,7 @@ class WhaleTestnetSystem:
                     )
                 
                 # 🆕 v13.6: 每 30 秒自動保存交易和回測數據
-                if time.time() - self._last_auto_save_time >= self._auto_save_interval:
+                if self.clock.time() - self._last_auto_save_time >= self._auto_save_interval:
                     try:
                         # 保存交易記錄
                         self.trader._save_trades()
@@ -17366,20 +18191,25 @@ class WhaleTestnetSystem:
                         if self.backtest_collector:
                             self.backtest_collector.save_incremental()
                         
-                        self._last_auto_save_time = time.time()
+                        self._last_auto_save_time = self.clock.time()
                         self.logger.debug(f"💾 自動保存完成 (每 {self._auto_save_interval} 秒)")
                     except Exception as e:
                         self.logger.warning(f"自動保存失敗: {e}")
                 
                 # 6. 等待 1 秒
-                time.sleep(self.config.ws_interval_sec)
+                self.clock.sleep(self.config.ws_interval_sec)
         
         except KeyboardInterrupt:
             print("\n\n⚠️ 收到停止信號...")
         
         finally:
+            if self.dashboard:
+                self.dashboard.stop()
             # 顯示游標
-            print("\033[?25h", end="")
+            if not headless:
+                print("\033[?25h", end="")
+            if self.dashboard and self.dashboard.stats.frames:
+                self.logger.info(f"📺 儀表板統計: {self.dashboard.stats.to_dict()}")
 
             # 🆕 v14.6.43: 收尾清理 dYdX 殘留倉位/掛單 (避免停止後卡倉)
             if self.config.dydx_sync_mode and self.trader.dydx_sync_enabled and self.trader.dydx_api:
@@ -17418,6 +18248,16 @@ class WhaleTestnetSystem:
                     self.trader.dydx_ws.stop()
                 except Exception:
                     pass
+            if getattr(self.trader, 'dydx_state', None):
+                try:
+                    self.trader.dydx_state.stop_background()
+                except Exception:
+                    pass
+            if getattr(self.trader, 'dydx_orders', None):
+                try:
+                    self.trader.dydx_orders.stop()
+                except Exception:
+                    pass
             if getattr(self.trader, 'dydx_api', None):
                 try:
                     # 若有 aiohttp session，確保關閉避免 Unclosed client session
@@ -17427,13 +18267,18 @@ class WhaleTestnetSystem:
                 except Exception:
                     pass
             
-            # 保存交易記錄
-            self.trader._save_trades()
+            # 保存交易記錄 (並匯出本會話 trades_*.json)
+            try:
+                self.trader.export_trades()
+            except Exception as e:
+                print(f"⚠️ 匯出交易記錄失敗: {e}")
             
             # 保存 TensorFlow 訓練資料
             self._save_training_data()
             print(f"\n📊 TensorFlow 訓練資料已保存:")
-            print(f"   記錄數: {len(self.training_records)}")
+            print(f"   記錄數: {self.training_record_count}")
+            if self.snapshot_recorder is not None:
+                print(f"   快照: {self.snapshot_recorder.root} ({self.snapshot_recorder.batches_written} 批)")
             print(f"   路徑: {self.training_file}")
             # 打印最終報告
             self._print_final_report()
@@ -17492,7 +18337,7 @@ async def fetch_dydx_1m_candles(hours: float = 24.0, market: str = "BTC-USD") ->
         f"https://indexer.v4.dydx.exchange/v4/candles/perpetualMarkets/{market}",
     ]
 
-    end_time = datetime.now(timezone.utc)
+    end_time = get_clock().now(timezone.utc)
     target_candles = int(max(1.0, hours) * 60) + 10
 
     candles: list[dict] = []
@@ -17642,6 +18487,7 @@ def main():
     
     # 🆕 10U Test Arguments
     parser.add_argument('--auto-confirm', '--auto', action='store_true', help='跳過確認 (Automated)')
+    parser.add_argument('--headless', action='store_true', help='無頭模式: 不輸出儀表板 (背景/服務執行)')
     parser.add_argument('--base_balance_deduct', type=float, default=25.83, help='顯示餘額扣除額 (模擬 10U)')
     parser.add_argument('--stop_on_zero_budget', action='store_true', help='🛑 10U 測試：當 (dYdX equity - base_balance_deduct) <= 0 時停止 dYdX 交易並退出')
     parser.add_argument('--no_stop_on_zero_budget', action='store_true', help='不啟用 zero budget 停止機制')
@@ -17770,6 +18616,8 @@ def main():
         # dYdX Sync 預設強制 Maker (Post-only) 以避免 Taker 手續費放大成 ROE 地獄
         config.use_maker_simulation = True
     config.auto_confirm = args.auto_confirm
+    if args.headless:
+        config.headless = True
     config.base_balance_deduct = args.base_balance_deduct
 
     # 🛑 10U 測試：自動停止 (預設：若你自訂 base_balance_deduct 且啟用 --sync，則自動開啟；可用 --no_stop_on_zero_budget 關閉)
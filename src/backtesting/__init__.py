@@ -7,12 +7,31 @@
 - LatencySimulator: 延遲模擬器
 - BacktestRunner: 回測執行器
 - PerformanceAnalyzer: 績效分析器
+- FeedWriter / FeedReader: 二進位行情錄製格式 (列式區塊 + 時間索引)
+- TickReplayHarness: 逐筆重放器 (虛擬時鐘驅動)
 """
 
 from .market_replay_engine import MarketReplayEngine
 from .historical_data_loader import HistoricalDataLoader
+from .feed_recording import (
+    DepthEvent,
+    FeedReader,
+    FeedWriter,
+    TradeEvent,
+    iter_feed_events,
+    merge_events,
+)
+from .tick_replay import ReplayStats, TickReplayHarness
 
 __all__ = [
     'MarketReplayEngine',
     'HistoricalDataLoader',
+    'DepthEvent',
+    'TradeEvent',
+    'FeedWriter',
+    'FeedReader',
+    'iter_feed_events',
+    'merge_events',
+    'TickReplayHarness',
+    'ReplayStats',
 ]
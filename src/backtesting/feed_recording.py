@@ -0,0 +1,443 @@
+"""
+Feed Recording - 二進位行情錄製格式
+
+取代 JSONL/CSV 深度檔：把 Binance depth / aggTrade 逐筆寫成列式 (columnar) 區塊，
+檔尾附時間索引，重放時可以直接跳到指定時段、一次只解碼一個區塊。
+
+檔案結構:
+    [Header]  magic "BTFEED01" | version | depth_levels | symbol
+    [Block]*  kind(DPTH/TRAD) | codec | count | first_ts | last_ts | payload_len | payload
+    [Index]   每個區塊的 (offset, kind, count, first_ts, last_ts)
+    [Trailer] index_offset | index_count | magic "BTIDX001"
+
+區塊 payload (列式，little-endian):
+    TRAD: ts int64[n] | price float64[n] | qty float64[n] | buyer_maker uint8[n]
+    DPTH: ts int64[n] | n_bids uint8[n] | n_asks uint8[n]
+          | bid_px float64[n*L] | bid_qty float64[n*L] | ask_px float64[n*L] | ask_qty float64[n*L]
+
+錄製中途中斷 (沒有 Trailer) 時，讀取端會順序掃描區塊重建索引，截斷的最後一塊會被丟棄。
+
+用法:
+    with FeedWriter("data/feeds/BTCUSDT_20250101.feed", symbol="BTCUSDT") as writer:
+        writer.add_depth(ts_ms, bids, asks)
+        writer.add_trade(ts_ms, price, qty, is_buyer_maker)
+
+    for event in iter_feed_events(["a.feed", "b.feed"], start_ms, end_ms):
+        ...  # DepthEvent / TradeEvent，依時間合併排序
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+FEED_MAGIC = b"BTFEED01"
+INDEX_MAGIC = b"BTIDX001"
+FEED_VERSION = 1
+
+KIND_DEPTH = b"DPTH"
+KIND_TRADE = b"TRAD"
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+
+_HEADER = struct.Struct("<8sHH16s")
+_BLOCK = struct.Struct("<4sBIqqI")
+_INDEX_ENTRY = struct.Struct("<Q4sIqq")
+_TRAILER = struct.Struct("<QI8s")
+
+# 同一毫秒內 trade 先於 depth (與 Binance 推送順序一致：成交先發生，深度後更新)
+_KIND_PRIORITY = {KIND_TRADE: 0, KIND_DEPTH: 1}
+
+PathLike = Union[str, Path]
+
+
+class DepthEvent(NamedTuple):
+    """深度快照"""
+
+    timestamp_ms: int
+    bids: List[Tuple[float, float]]
+    asks: List[Tuple[float, float]]
+
+
+class TradeEvent(NamedTuple):
+    """聚合成交"""
+
+    timestamp_ms: int
+    price: float
+    qty: float
+    is_buyer_maker: bool  # True => 賣方主動 (買方掛單被吃)
+
+
+class BlockInfo(NamedTuple):
+    """索引中的一個區塊"""
+
+    offset: int
+    kind: bytes
+    count: int
+    first_ts: int
+    last_ts: int
+
+
+def _to_le(arr: array) -> bytes:
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _from_le(typecode: str, data: memoryview) -> array:
+    arr = array(typecode)
+    arr.frombytes(data)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+class FeedWriter:
+    """
+    二進位行情錄製器
+
+    - 每種事件各自緩衝，滿 block_size 筆寫出一個區塊
+    - 時間戳在同一種事件內保持非遞減 (少量倒序會被夾到前一筆時間)
+    - close() 寫入索引與 Trailer
+    """
+
+    def __init__(
+        self,
+        path: PathLike,
+        symbol: str = "BTCUSDT",
+        depth_levels: int = 20,
+        block_size: int = 2048,
+        compress: bool = True,
+    ):
+        if not 1 <= depth_levels <= 255:
+            raise ValueError("depth_levels must be between 1 and 255")
+        self.path = Path(path)
+        self.symbol = symbol.upper()
+        self.depth_levels = depth_levels
+        self.block_size = max(1, block_size)
+        self.codec = CODEC_ZLIB if compress else CODEC_RAW
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh: Optional[BinaryIO] = self.path.open("wb")
+        self._fh.write(_HEADER.pack(FEED_MAGIC, FEED_VERSION, depth_levels,
+                                    self.symbol.encode("ascii", "ignore")[:16]))
+        self._index: List[BlockInfo] = []
+
+        self._trade_ts = array("q")
+        self._trade_px = array("d")
+        self._trade_qty = array("d")
+        self._trade_flags = array("B")
+
+        self._depth_ts = array("q")
+        self._depth_nb = array("B")
+        self._depth_na = array("B")
+        self._bid_px = array("d")
+        self._bid_qty = array("d")
+        self._ask_px = array("d")
+        self._ask_qty = array("d")
+
+        self._last_ts = {KIND_DEPTH: 0, KIND_TRADE: 0}
+        self.depth_count = 0
+        self.trade_count = 0
+        self.reordered = 0
+
+    # ------------------------------------------------------------------ #
+    def _monotonic_ts(self, kind: bytes, timestamp_ms: int) -> int:
+        ts = int(timestamp_ms)
+        last = self._last_ts[kind]
+        if ts < last:
+            self.reordered += 1
+            ts = last
+        self._last_ts[kind] = ts
+        return ts
+
+    def add_trade(self, timestamp_ms: int, price: float, qty: float, is_buyer_maker: bool) -> None:
+        """寫入一筆 aggTrade"""
+        self._trade_ts.append(self._monotonic_ts(KIND_TRADE, timestamp_ms))
+        self._trade_px.append(float(price))
+        self._trade_qty.append(float(qty))
+        self._trade_flags.append(1 if is_buyer_maker else 0)
+        self.trade_count += 1
+        if len(self._trade_ts) >= self.block_size:
+            self._flush_trades()
+
+    def add_depth(
+        self,
+        timestamp_ms: int,
+        bids: Sequence[Sequence[float]],
+        asks: Sequence[Sequence[float]],
+    ) -> None:
+        """寫入一筆深度快照 (超過 depth_levels 的檔位會被截掉)"""
+        levels = self.depth_levels
+        self._depth_ts.append(self._monotonic_ts(KIND_DEPTH, timestamp_ms))
+        for side, px_col, qty_col, count_col in (
+            (bids, self._bid_px, self._bid_qty, self._depth_nb),
+            (asks, self._ask_px, self._ask_qty, self._depth_na),
+        ):
+            n = min(len(side), levels)
+            for i in range(n):
+                px_col.append(float(side[i][0]))
+                qty_col.append(float(side[i][1]))
+            if n < levels:
+                pad = levels - n
+                px_col.extend(array("d", bytes(8 * pad)))
+                qty_col.extend(array("d", bytes(8 * pad)))
+            count_col.append(n)
+        self.depth_count += 1
+        if len(self._depth_ts) >= self.block_size:
+            self._flush_depth()
+
+    # ------------------------------------------------------------------ #
+    def _write_block(self, kind: bytes, count: int, first_ts: int, last_ts: int, columns: Iterable[array]) -> None:
+        payload = b"".join(_to_le(col) for col in columns)
+        if self.codec == CODEC_ZLIB:
+            payload = zlib.compress(payload, 1)
+        offset = self._fh.tell()
+        self._fh.write(_BLOCK.pack(kind, self.codec, count, first_ts, last_ts, len(payload)))
+        self._fh.write(payload)
+        self._index.append(BlockInfo(offset, kind, count, first_ts, last_ts))
+
+    def _flush_trades(self) -> None:
+        if not self._trade_ts:
+            return
+        self._write_block(
+            KIND_TRADE, len(self._trade_ts), self._trade_ts[0], self._trade_ts[-1],
+            (self._trade_ts, self._trade_px, self._trade_qty, self._trade_flags),
+        )
+        for col in (self._trade_ts, self._trade_px, self._trade_qty, self._trade_flags):
+            del col[:]
+
+    def _flush_depth(self) -> None:
+        if not self._depth_ts:
+            return
+        self._write_block(
+            KIND_DEPTH, len(self._depth_ts), self._depth_ts[0], self._depth_ts[-1],
+            (self._depth_ts, self._depth_nb, self._depth_na,
+             self._bid_px, self._bid_qty, self._ask_px, self._ask_qty),
+        )
+        for col in (self._depth_ts, self._depth_nb, self._depth_na,
+                    self._bid_px, self._bid_qty, self._ask_px, self._ask_qty):
+            del col[:]
+
+    def flush(self) -> None:
+        """把緩衝中的事件寫成區塊 (不寫索引，檔案仍可被重建索引讀取)"""
+        if self._fh is None:
+            return
+        self._flush_trades()
+        self._flush_depth()
+        self._fh.flush()
+
+    def close(self) -> None:
+        if self._fh is None:
+            return
+        self.flush()
+        index_offset = self._fh.tell()
+        for entry in self._index:
+            self._fh.write(_INDEX_ENTRY.pack(*entry))
+        self._fh.write(_TRAILER.pack(index_offset, len(self._index), INDEX_MAGIC))
+        self._fh.close()
+        self._fh = None
+        logger.info(
+            "Feed closed: %s (depth=%d, trades=%d, blocks=%d, reordered=%d)",
+            self.path, self.depth_count, self.trade_count, len(self._index), self.reordered,
+        )
+
+    def __enter__(self) -> "FeedWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class FeedReader:
+    """
+    二進位行情讀取器
+
+    只讀入索引；iter_* 逐區塊解碼，記憶體用量與檔案大小無關。
+    """
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        with self.path.open("rb") as fh:
+            header = fh.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{self.path}: truncated feed header")
+            magic, version, depth_levels, symbol = _HEADER.unpack(header)
+            if magic != FEED_MAGIC:
+                raise ValueError(f"{self.path}: not a feed recording")
+            if version > FEED_VERSION:
+                raise ValueError(f"{self.path}: unsupported feed version {version}")
+            self.version = version
+            self.depth_levels = depth_levels
+            self.symbol = symbol.rstrip(b"\x00").decode("ascii")
+            self.blocks: List[BlockInfo] = self._read_index(fh)
+
+        self._by_kind = {
+            kind: [b for b in self.blocks if b.kind == kind] for kind in (KIND_DEPTH, KIND_TRADE)
+        }
+
+    def _read_index(self, fh: BinaryIO) -> List[BlockInfo]:
+        size = os.fstat(fh.fileno()).st_size
+        if size >= _HEADER.size + _TRAILER.size:
+            fh.seek(size - _TRAILER.size)
+            index_offset, count, magic = _TRAILER.unpack(fh.read(_TRAILER.size))
+            if magic == INDEX_MAGIC and index_offset + count * _INDEX_ENTRY.size + _TRAILER.size == size:
+                fh.seek(index_offset)
+                raw = fh.read(count * _INDEX_ENTRY.size)
+                return [BlockInfo(*entry) for entry in _INDEX_ENTRY.iter_unpack(raw)]
+
+        # 沒有索引 (錄製中斷) → 順序掃描重建
+        logger.warning("%s: feed index missing, rebuilding by scan", self.path)
+        blocks: List[BlockInfo] = []
+        offset = _HEADER.size
+        while offset + _BLOCK.size <= size:
+            fh.seek(offset)
+            kind, _codec, count, first_ts, last_ts, length = _BLOCK.unpack(fh.read(_BLOCK.size))
+            if kind not in _KIND_PRIORITY or offset + _BLOCK.size + length > size:
+                break
+            blocks.append(BlockInfo(offset, kind, count, first_ts, last_ts))
+            offset += _BLOCK.size + length
+        return blocks
+
+    # ------------------------------------------------------------------ #
+    @property
+    def time_range(self) -> Tuple[int, int]:
+        if not self.blocks:
+            return (0, 0)
+        return (min(b.first_ts for b in self.blocks), max(b.last_ts for b in self.blocks))
+
+    @property
+    def depth_count(self) -> int:
+        return sum(b.count for b in self._by_kind[KIND_DEPTH])
+
+    @property
+    def trade_count(self) -> int:
+        return sum(b.count for b in self._by_kind[KIND_TRADE])
+
+    def _select_blocks(self, kind: bytes, start_ms: Optional[int], end_ms: Optional[int]) -> List[BlockInfo]:
+        blocks = self._by_kind[kind]
+        if start_ms is not None:
+            # 同種區塊時間非遞減 → 用 last_ts 二分跳過整段舊資料
+            blocks = blocks[bisect_left([b.last_ts for b in blocks], start_ms):]
+        if end_ms is not None:
+            blocks = [b for b in blocks if b.first_ts <= end_ms]
+        return blocks
+
+    def _read_payload(self, fh: BinaryIO, block: BlockInfo) -> memoryview:
+        fh.seek(block.offset)
+        kind, codec, count, _first, _last, length = _BLOCK.unpack(fh.read(_BLOCK.size))
+        payload = fh.read(length)
+        if codec == CODEC_ZLIB:
+            payload = zlib.decompress(payload)
+        return memoryview(payload)
+
+    def iter_trade_columns(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[Tuple[array, array, array, memoryview]]:
+        """
+        逐區塊回傳成交欄位 (ts, price, qty, buyer_maker)，不逐筆建立物件
+
+        區塊只依索引挑選，邊界區塊內仍可能有範圍外的資料，由呼叫端過濾。
+        批次計算 (例如 numpy.frombuffer) 用這個介面。
+        """
+        with self.path.open("rb") as fh:
+            for block in self._select_blocks(KIND_TRADE, start_ms, end_ms):
+                view = self._read_payload(fh, block)
+                n = block.count
+                yield (
+                    _from_le("q", view[: 8 * n]),
+                    _from_le("d", view[8 * n: 16 * n]),
+                    _from_le("d", view[16 * n: 24 * n]),
+                    view[24 * n: 25 * n],
+                )
+
+    def iter_depth_columns(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[Tuple[array, memoryview, memoryview, array, array, array, array]]:
+        """
+        逐區塊回傳深度欄位 (ts, n_bids, n_asks, bid_px, bid_qty, ask_px, ask_qty)
+
+        價量欄位長度為 count * depth_levels，不足檔數補 0。過濾規則同 iter_trade_columns。
+        """
+        levels = self.depth_levels
+        with self.path.open("rb") as fh:
+            for block in self._select_blocks(KIND_DEPTH, start_ms, end_ms):
+                view = self._read_payload(fh, block)
+                n = block.count
+                span = 8 * n * levels
+                base = 10 * n
+                yield (
+                    _from_le("q", view[: 8 * n]),
+                    view[8 * n: 9 * n],
+                    view[9 * n: 10 * n],
+                    _from_le("d", view[base: base + span]),
+                    _from_le("d", view[base + span: base + 2 * span]),
+                    _from_le("d", view[base + 2 * span: base + 3 * span]),
+                    _from_le("d", view[base + 3 * span: base + 4 * span]),
+                )
+
+    def iter_trades(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[TradeEvent]:
+        for ts, px, qty, flags in self.iter_trade_columns(start_ms, end_ms):
+            for i in range(len(ts)):
+                t = ts[i]
+                if start_ms is not None and t < start_ms:
+                    continue
+                if end_ms is not None and t > end_ms:
+                    return
+                yield TradeEvent(t, px[i], qty[i], bool(flags[i]))
+
+    def iter_depth(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[DepthEvent]:
+        levels = self.depth_levels
+        for ts, nb, na, bid_px, bid_qty, ask_px, ask_qty in self.iter_depth_columns(start_ms, end_ms):
+            for i in range(len(ts)):
+                t = ts[i]
+                if start_ms is not None and t < start_ms:
+                    continue
+                if end_ms is not None and t > end_ms:
+                    return
+                lo = i * levels
+                bids = list(zip(bid_px[lo: lo + nb[i]], bid_qty[lo: lo + nb[i]]))
+                asks = list(zip(ask_px[lo: lo + na[i]], ask_qty[lo: lo + na[i]]))
+                yield DepthEvent(t, bids, asks)
+
+    def iter_events(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[Union[DepthEvent, TradeEvent]]:
+        """依時間合併 depth 與 trade (同毫秒 trade 先)"""
+        return merge_events(self.iter_depth(start_ms, end_ms), self.iter_trades(start_ms, end_ms))
+
+
+def _event_key(event: Union[DepthEvent, TradeEvent]) -> Tuple[int, int]:
+    return (event.timestamp_ms, 0 if isinstance(event, TradeEvent) else 1)
+
+
+def merge_events(*streams: Iterable[Union[DepthEvent, TradeEvent]]) -> Iterator[Union[DepthEvent, TradeEvent]]:
+    """合併多個已排序的事件串流 (每個串流只保留一個待處理事件)"""
+    return heapq.merge(*streams, key=_event_key)
+
+
+def iter_feed_events(
+    paths: Sequence[PathLike],
+    start_ms: Optional[int] = None,
+    end_ms: Optional[int] = None,
+) -> Iterator[Union[DepthEvent, TradeEvent]]:
+    """
+    合併多個錄製檔 (例如每小時輪替的檔案) 成單一時間序列
+
+    Args:
+        paths: 錄製檔路徑
+        start_ms / end_ms: 時間範圍 (毫秒，含端點)
+    """
+    readers = [FeedReader(p) for p in paths]
+    readers = [r for r in readers if r.blocks]
+    if start_ms is not None:
+        readers = [r for r in readers if r.time_range[1] >= start_ms]
+    if end_ms is not None:
+        readers = [r for r in readers if r.time_range[0] <= end_ms]
+    return merge_events(*(r.iter_events(start_ms, end_ms) for r in readers))
@@ -0,0 +1,191 @@
+"""
+Tick Replay Harness - 逐筆重放器
+
+把錄製的 depth / aggTrade 事件依時間順序餵給交易系統，並以虛擬時鐘驅動：
+- 每個事件先把 SimulatedClock 推進到事件時間，再交給系統處理
+- 決策循環、狀態列印依「虛擬時間」的間隔觸發，與實盤 run() 的節奏相同
+- 系統內的 time.time() / datetime.now() 透過 use_clock 讀到虛擬時間，
+  冷卻、穩定窗口、K 棒切分等時間邏輯與實盤一致
+
+系統需提供的公開介面 (HybridPaperTradingSystem 已實作):
+    on_depth(bids, asks, event_time_ms)
+    on_book_ticker(best_bid, best_ask, event_time_ms)
+    on_agg_trade(payload)
+    decision_step(run_exits: bool) -> Optional[dict]
+    print_status() / generate_report()   (可選)
+
+用法:
+    clock = SimulatedClock(start=start_ms / 1000)
+    with use_clock(clock):
+        system = HybridPaperTradingSystem(...)     # 在虛擬時間下建立，初始時間戳才一致
+        harness = TickReplayHarness(system, iter_feed_events(paths, start_ms, end_ms), clock=clock)
+        stats = harness.run()
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Iterable, Optional, Union
+
+from ..core.clock import SimulatedClock, use_clock
+from .feed_recording import DepthEvent, TradeEvent
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReplayStats:
+    """重放統計"""
+
+    depth_events: int = 0
+    trade_events: int = 0
+    decisions: int = 0
+    skipped: int = 0
+    first_ts_ms: int = 0
+    last_ts_ms: int = 0
+    wall_seconds: float = 0.0
+
+    @property
+    def simulated_seconds(self) -> float:
+        if not self.first_ts_ms:
+            return 0.0
+        return (self.last_ts_ms - self.first_ts_ms) / 1000
+
+    @property
+    def speedup(self) -> float:
+        """虛擬時間 / 實際耗時 (例如 600 = 比實盤快 600 倍)"""
+        return self.simulated_seconds / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data['simulated_seconds'] = round(self.simulated_seconds, 3)
+        data['speedup'] = round(self.speedup, 1)
+        return data
+
+
+class TickReplayHarness:
+    """逐筆重放器"""
+
+    def __init__(
+        self,
+        system: Any,
+        events: Iterable[Union[DepthEvent, TradeEvent]],
+        clock: Optional[SimulatedClock] = None,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+        decision_interval_sec: float = 2.0,
+        status_interval_sec: float = 60.0,
+        progress_interval_sec: float = 3600.0,
+        depth_updates_price: bool = True,
+        dry_run: bool = False,
+    ):
+        """
+        Args:
+            system: 交易系統 (需實作模組說明中的公開介面)
+            events: 依時間排序的 DepthEvent / TradeEvent 串流
+            clock: 虛擬時鐘；None 時從第一個事件時間開始
+            start_ms / end_ms: 額外的時間過濾 (毫秒)
+            decision_interval_sec: 決策循環間隔 (虛擬秒，實盤 run() 為 2 秒)
+            status_interval_sec: print_status 間隔 (虛擬秒，<=0 關閉)
+            progress_interval_sec: 進度日誌間隔 (虛擬秒，<=0 關閉)
+            depth_updates_price: 錄製檔沒有 bookTicker，用深度第一檔代替
+            dry_run: 只讀取事件、不呼叫系統
+        """
+        self.system = system
+        self.events = events
+        self.clock = clock
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.decision_interval_ms = int(decision_interval_sec * 1000)
+        self.status_interval_ms = int(status_interval_sec * 1000)
+        self.progress_interval_ms = int(progress_interval_sec * 1000)
+        self.depth_updates_price = depth_updates_price
+        self.dry_run = dry_run
+        self.stats = ReplayStats()
+
+    def run(self) -> ReplayStats:
+        """執行重放，回傳統計"""
+        events = iter(self.events)
+        first = next(events, None)
+        if first is None:
+            logger.warning("Tick replay: no events")
+            return self.stats
+
+        if self.clock is None:
+            self.clock = SimulatedClock(start=first.timestamp_ms / 1000)
+
+        wall_start = time.perf_counter()
+        with use_clock(self.clock):
+            self._replay(first, events)
+        self.stats.wall_seconds = time.perf_counter() - wall_start
+        return self.stats
+
+    def _replay(self, first: Union[DepthEvent, TradeEvent], events: Iterable[Union[DepthEvent, TradeEvent]]) -> None:
+        system = self.system
+        clock = self.clock
+        stats = self.stats
+        has_status = self.status_interval_ms > 0 and hasattr(system, 'print_status')
+
+        last_decision: Optional[int] = None
+        last_status: Optional[int] = None
+        last_progress: Optional[int] = None
+        first_loop = True
+        have_book = False
+
+        event: Optional[Union[DepthEvent, TradeEvent]] = first
+        while event is not None:
+            ts = event.timestamp_ms
+            if self.start_ms is not None and ts < self.start_ms:
+                stats.skipped += 1
+                event = next(events, None)
+                continue
+            if self.end_ms is not None and ts > self.end_ms:
+                break
+
+            if not stats.first_ts_ms:
+                stats.first_ts_ms = ts
+            stats.last_ts_ms = ts
+            clock.advance_to(ts / 1000)
+
+            if isinstance(event, TradeEvent):
+                stats.trade_events += 1
+                if not self.dry_run:
+                    system.on_agg_trade({
+                        'p': event.price,
+                        'q': event.qty,
+                        'T': ts,
+                        'm': event.is_buyer_maker,
+                    })
+            else:
+                stats.depth_events += 1
+                if not self.dry_run and event.bids and event.asks:
+                    system.on_depth(event.bids, event.asks, ts)
+                    if self.depth_updates_price:
+                        system.on_book_ticker(event.bids[0][0], event.asks[0][0], ts)
+                    have_book = True
+
+            if not self.dry_run and have_book:
+                if last_decision is None or ts - last_decision >= self.decision_interval_ms:
+                    if system.decision_step(run_exits=not first_loop) is not None:
+                        first_loop = False
+                        stats.decisions += 1
+                    last_decision = ts
+
+                if has_status and (last_status is None or ts - last_status >= self.status_interval_ms):
+                    try:
+                        system.print_status()
+                    except Exception as e:
+                        logger.debug("print_status failed during replay: %s", e)
+                    last_status = ts
+
+            if self.progress_interval_ms > 0 and (last_progress is None or ts - last_progress >= self.progress_interval_ms):
+                logger.info(
+                    "Tick replay @ %s | depth=%d trades=%d decisions=%d",
+                    clock.now().isoformat(timespec='seconds'),
+                    stats.depth_events, stats.trade_events, stats.decisions,
+                )
+                last_progress = ts
+
+            event = next(events, None)
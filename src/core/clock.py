@@ -0,0 +1,248 @@
+"""
+時鐘服務 (Clock)
+
+交易系統內所有「現在幾點」都應該經過這裡：
+- RealClock: 直接使用系統時間 (實盤 / Paper Trading)
+- SimulatedClock: 虛擬時間，由重放器推進；sleep 立即返回並推進時間
+
+原理:
+    冷卻時間、訊號穩定窗口、Maker 超時、自動存檔間隔都是拿 time.time()
+    相減。只要把時間來源換成虛擬時鐘，重放時這些邏輯就跟實盤一模一樣，
+    而且不需要真的等待 → 可以用 100x~1000x 速度回放。
+
+注入方式:
+    1. 建構子參數 (優先): HybridPaperTradingSystem / WhaleTestnetSystem / TestnetTrader /
+       MakerOrderManager / ConsolidationDetector / CostAwareFilter / DydxDataHub /
+       BinanceWebSocket / DydxWebSocket 都接受 clock=...，未指定時用 get_clock()
+    2. use_clock(): 設定全域時鐘，並替換尚未改寫的模組中的 time / datetime
+    I/O 節奏與簽名 timestamp 不屬於交易邏輯，一律用 WALL_CLOCK (系統時間)。
+
+用法:
+    clock = SimulatedClock(start=1_700_000_000)
+    with use_clock(clock):
+        system = HybridPaperTradingSystem(..., clock=clock)
+        clock.advance(5)              # 虛擬時間前進 5 秒
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time as _time
+from contextlib import contextmanager
+from datetime import datetime as _datetime
+from datetime import timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+class Clock:
+    """時鐘介面 (預設行為 = 系統時間)"""
+
+    def time(self) -> float:
+        return _time.time()
+
+    def monotonic(self) -> float:
+        return _time.monotonic()
+
+    def now(self, tz: Optional[timezone] = None) -> _datetime:
+        return _datetime.fromtimestamp(self.time(), tz)
+
+    def time_ms(self) -> int:
+        return int(self.time() * 1000)
+
+    def sleep(self, seconds: float) -> None:
+        _time.sleep(max(0.0, seconds))
+
+    async def async_sleep(self, seconds: float) -> None:
+        await asyncio.sleep(max(0.0, seconds))
+
+    @property
+    def is_simulated(self) -> bool:
+        return False
+
+
+class RealClock(Clock):
+    """系統時間 (實盤)"""
+
+
+class SimulatedClock(Clock):
+    """
+    虛擬時鐘
+
+    - time() 回傳虛擬時間 (秒)
+    - sleep() / async_sleep() 立即推進虛擬時間，不佔用實際時間
+    - advance_to() 只會往前走 (重放資料偶有毫秒級倒序時忽略)
+    """
+
+    def __init__(self, start: Optional[float] = None):
+        self._now = float(start if start is not None else _time.time())
+        self._origin = self._now
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._now - self._origin
+
+    def advance(self, seconds: float) -> float:
+        if seconds > 0:
+            with self._lock:
+                self._now += seconds
+        return self._now
+
+    def advance_to(self, timestamp: float) -> float:
+        if timestamp > self._now:
+            with self._lock:
+                if timestamp > self._now:
+                    self._now = float(timestamp)
+        return self._now
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+
+    async def async_sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+        await asyncio.sleep(0)  # 仍讓出事件循環，其他 task 才有機會執行
+
+    @property
+    def is_simulated(self) -> bool:
+        return True
+
+
+# ==================== 全域預設時鐘 ====================
+
+_default_clock: Clock = RealClock()
+
+# 永遠是系統時間: I/O 節奏 (輪詢執行緒、重連退避、REST 限速) 與交易所簽名 timestamp 用這個，
+# 重放時不會被 use_clock() 替換，也不會自行推進虛擬時間
+WALL_CLOCK: Clock = RealClock()
+
+
+def get_clock() -> Clock:
+    """取得目前的全域時鐘"""
+    return _default_clock
+
+
+def set_clock(clock: Clock) -> Clock:
+    """設定全域時鐘，回傳舊的時鐘"""
+    global _default_clock
+    previous = _default_clock
+    _default_clock = clock
+    return previous
+
+
+# ==================== 模組層級替換 ====================
+
+class _ClockTimeModule:
+    """代替 `time` 模組: time/monotonic/sleep 走時鐘，其他屬性轉給真正的 time"""
+
+    def __init__(self, clock: Clock):
+        self._clock = clock
+
+    def time(self) -> float:
+        return self._clock.time()
+
+    def time_ns(self) -> int:
+        return int(self._clock.time() * 1_000_000_000)
+
+    def monotonic(self) -> float:
+        return self._clock.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        self._clock.sleep(seconds)
+
+    def localtime(self, secs: Optional[float] = None):
+        return _time.localtime(self._clock.time() if secs is None else secs)
+
+    def gmtime(self, secs: Optional[float] = None):
+        return _time.gmtime(self._clock.time() if secs is None else secs)
+
+    def strftime(self, fmt: str, t=None) -> str:
+        return _time.strftime(fmt, self.localtime() if t is None else t)
+
+    def __getattr__(self, name: str):
+        return getattr(_time, name)
+
+
+def clock_datetime_class(clock: Clock) -> type:
+    """建立 datetime 子類別，now()/utcnow()/today() 讀取指定時鐘"""
+
+    class ClockDatetime(_datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls.fromtimestamp(clock.time(), tz)
+
+        @classmethod
+        def utcnow(cls):
+            return cls.fromtimestamp(clock.time(), timezone.utc).replace(tzinfo=None)
+
+        @classmethod
+        def today(cls):
+            return cls.now()
+
+    ClockDatetime.__name__ = 'datetime'
+    ClockDatetime.__qualname__ = 'datetime'
+    return ClockDatetime
+
+
+DEFAULT_PATCH_PREFIXES: Tuple[str, ...] = ('src.', 'scripts.', '__main__')
+
+
+@contextmanager
+def use_clock(clock: Clock, prefixes: Sequence[str] = DEFAULT_PATCH_PREFIXES) -> Iterator[Clock]:
+    """
+    在 with 區塊內把時鐘注入已載入的專案模組
+
+    會替換模組全域變數中的:
+    - `time` 模組 (含別名) → 時鐘代理
+    - `datetime.datetime` 類別 → ClockDatetime
+    - `from time import time/sleep/monotonic` 取得的函式
+
+    離開時全部還原，同時設為全域預設時鐘。
+    模組全域設定 `__wall_clock__ = True` 者整個跳過 (例如 REST 客戶端的限速與簽名)。
+
+    Args:
+        clock: 要注入的時鐘
+        prefixes: 只替換這些名稱開頭的模組 (避免動到第三方套件)
+    """
+    time_proxy = _ClockTimeModule(clock)
+    datetime_cls = clock_datetime_class(clock)
+    function_map = {
+        id(_time.time): clock.time,
+        id(_time.sleep): clock.sleep,
+        id(_time.monotonic): clock.monotonic,
+    }
+
+    patched: List[Tuple[Dict[str, object], str, object]] = []
+    for name, module in list(sys.modules.items()):
+        if module is None or name == __name__ or not any(name == p or name.startswith(p) for p in prefixes):
+            continue
+        namespace = getattr(module, '__dict__', None)
+        if not isinstance(namespace, dict) or namespace.get('__wall_clock__'):
+            continue
+        for attr, value in list(namespace.items()):
+            replacement = None
+            if value is _time or isinstance(value, _ClockTimeModule):
+                replacement = time_proxy
+            elif value is _datetime or (isinstance(value, type) and value.__name__ == 'datetime'
+                                        and issubclass(value, _datetime) and value is not _datetime
+                                        and getattr(value, '__module__', '') == __name__):
+                replacement = datetime_cls
+            elif id(value) in function_map and callable(value):
+                replacement = function_map[id(value)]
+            elif isinstance(getattr(value, '__self__', None), Clock) and \
+                    getattr(value, '__name__', '') in ('time', 'sleep', 'monotonic'):
+                replacement = getattr(clock, value.__name__)  # 外層 use_clock 注入過的函式
+            if replacement is not None:
+                patched.append((namespace, attr, value))
+                namespace[attr] = replacement
+
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
+        for namespace, attr, original in reversed(patched):
+            namespace[attr] = original
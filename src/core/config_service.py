@@ -0,0 +1,518 @@
+"""
+配置服務 (Config Service)
+
+所有 JSON 配置檔的單一入口:
+- watch(path) 註冊檔案，回傳 ConfigEntry；熱路徑讀 entry.data / entry.compiled 只是一次屬性存取，沒有 stat、沒有 json.load
+- 背景執行緒監看檔案變更: Linux 用 inotify (監看所在目錄，原子替換 rename 也抓得到)，其他平台退回 mtime 輪詢
+- 變更時: 讀檔 → 解析 → 驗證 → 編譯成不可變快照 → 一次性替換參考並遞增 generation → 通知訂閱者
+- 解析或驗證失敗 (例如讀到寫到一半的檔案) 時保留上一份有效快照，並短暫重試
+
+原理:
+    過去每個呼叫點各自 json.load / stat / 輪詢 (load_trading_strategy、load_ctx_strategy_config、
+    ConfigMonitor、ModeConfigManager、獲利配置 reload)，每次進出場檢查都在做檔案系統呼叫，
+    還偶爾讀到寫到一半的檔案。快照是 FrozenConfig (唯讀 Mapping，支援 .get / [] / 屬性存取)，
+    發布後不會再變，讀取端不需要鎖；要比較是否更新過，只需比 generation 整數。
+
+用法:
+    entry = get_config_service().watch("config/whale_ctx_strategy.json", default={})
+    cfg = entry.data                      # FrozenConfig, 熱路徑直接讀
+    if entry.generation != seen: ...      # 判斷是否有新版本
+    entry.subscribe(lambda snap: print(snap.generation))
+    write_json_atomic(path, thaw_config(cfg) | {"x": 1})   # 寫檔一律原子替換
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import struct
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from .clock import get_clock
+
+logger = logging.getLogger(__name__)
+
+Validator = Callable[[Mapping[str, Any]], List[str]]
+Compiler = Callable[[Mapping[str, Any]], Any]
+
+_UNREADABLE = object()
+
+
+# ==================== 不可變快照 ====================
+
+class FrozenConfig(Mapping):
+    """唯讀巢狀配置 (dict → FrozenConfig, list → tuple)；同時支援 cfg['a'] / cfg.get('a') / cfg.a"""
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: Mapping[str, Any]):
+        object.__setattr__(self, '_data', {k: freeze_config(v) for k, v in data.items()})
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getattr__(self, key: str) -> Any:
+        if key.startswith('__') or key == '_data':
+            raise AttributeError(key)
+        try:
+            return self._data[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def copy(self) -> Dict[str, Any]:
+        """可修改的深複製 (相容 dict.copy() 的呼叫點)"""
+        return thaw_config(self)
+
+    def __reduce__(self):
+        return (FrozenConfig, (self._data,))
+
+    def __copy__(self) -> "FrozenConfig":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "FrozenConfig":
+        return self
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise TypeError("FrozenConfig is read-only; use thaw_config() for a mutable copy")
+
+    def __repr__(self) -> str:
+        return f"FrozenConfig({self._data!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, FrozenConfig):
+            return self._data == other._data
+        if isinstance(other, Mapping):
+            return self._data == dict(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+def freeze_config(value: Any) -> Any:
+    if isinstance(value, FrozenConfig):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenConfig(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_config(v) for v in value)
+    return value
+
+
+def thaw_config(value: Any) -> Any:
+    """轉回可修改的 dict / list (要改配置並寫回檔案時使用)"""
+    if isinstance(value, Mapping):
+        return {k: thaw_config(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw_config(v) for v in value]
+    return value
+
+
+def write_json_atomic(path: str | Path, data: Any, indent: int = 2) -> None:
+    """寫到同目錄暫存檔再 os.replace，讀取端 (及監看器) 永遠只看到完整檔案"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(thaw_config(data), f, indent=indent, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """某一版配置 (發布後不再改變)"""
+
+    path: str
+    generation: int
+    data: FrozenConfig
+    compiled: Any
+    loaded_at: float
+    exists: bool
+
+
+# ==================== 單一配置檔 ====================
+
+class ConfigEntry:
+    """
+    一個被監看的配置檔
+
+    snapshot 只會被整份替換；熱路徑讀 entry.data / entry.compiled / entry.generation。
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        validate: Optional[Validator] = None,
+        compile: Optional[Compiler] = None,
+        default: Optional[Mapping[str, Any]] = None,
+        retries: int = 3,
+        retry_delay: float = 0.05,
+    ):
+        self.path = path
+        self.validate = validate
+        self.compile = compile
+        self.default = FrozenConfig(default or {})
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.last_error: Optional[str] = None
+        self.rejected = 0
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._subscribers: List[Callable[[ConfigSnapshot], None]] = []
+        self._lock = threading.Lock()
+        try:
+            self.snapshot = self._build(self.default, generation=0, exists=False)
+        except Exception as e:
+            # 預設內容編譯不過 (compile 需要完整檔案): compiled 先留空，等檔案載入
+            logger.debug(f"default config does not compile for {path}: {e}")
+            self.snapshot = ConfigSnapshot(str(path), 0, self.default, None, get_clock().time(), False)
+
+    # ------------------------ 讀取端 ------------------------ #
+    @property
+    def data(self) -> FrozenConfig:
+        return self.snapshot.data
+
+    @property
+    def compiled(self) -> Any:
+        return self.snapshot.compiled
+
+    @property
+    def generation(self) -> int:
+        return self.snapshot.generation
+
+    def subscribe(self, callback: Callable[[ConfigSnapshot], None]) -> Callable[[], None]:
+        """新版本發布時呼叫 callback(snapshot) (在監看執行緒上)；回傳取消訂閱函式"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    # ------------------------ 載入 ------------------------ #
+    def _build(self, data: FrozenConfig, generation: int, exists: bool) -> ConfigSnapshot:
+        compiled = self.compile(data) if self.compile else data
+        return ConfigSnapshot(
+            path=str(self.path),
+            generation=generation,
+            data=data,
+            compiled=compiled,
+            loaded_at=get_clock().time(),
+            exists=exists,
+        )
+
+    def _stat_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        檔案有變 (或 force) 時重新載入；成功發布新版本回傳 True
+
+        讀檔/解析失敗會短暫重試 (寫入端可能還沒寫完)；驗證失敗直接拒絕。失敗時保留舊快照。
+        """
+        with self._lock:
+            signature = self._stat_signature()
+            if not force and signature == self._signature:
+                return False
+            if signature is None:
+                # 檔案被刪除: 保留最後一份有效配置
+                self._signature = None
+                return False
+
+            error = None
+            for attempt in range(self.retries + 1):
+                try:
+                    data = json.loads(self.path.read_bytes())
+                    break
+                except (OSError, ValueError) as e:
+                    # 多半是寫入端還沒寫完: 稍等再讀
+                    error = e
+                    time.sleep(self.retry_delay)
+                    signature = self._stat_signature()
+            else:
+                data = _UNREADABLE
+
+            if data is not _UNREADABLE:
+                try:
+                    if not isinstance(data, Mapping):
+                        raise ValueError("top-level JSON must be an object")
+                    frozen = FrozenConfig(data)
+                    errors = self.validate(frozen) if self.validate else []
+                    if errors:
+                        raise ValueError("; ".join(errors))
+                    snapshot = self._build(frozen, self.snapshot.generation + 1, exists=True)
+                    error = None
+                except Exception as e:
+                    # 完整檔案但驗證 / 編譯失敗: 不重試
+                    error = e
+
+            self._signature = signature
+            if error is not None:
+                self.rejected += 1
+                self.last_error = str(error)
+                logger.warning(f"config rejected, keeping generation {self.snapshot.generation}: {self.path}: {error}")
+                return False
+            self.last_error = None
+            self.snapshot = snapshot
+            subscribers = list(self._subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.warning(f"config subscriber failed for {self.path}: {e}")
+        return True
+
+
+# ==================== inotify (Linux) ====================
+
+class _Inotify:
+    """最小 inotify 封裝 (ctypes)；不可用時 available=False"""
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ATTRIB
+    _EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        self.fd = -1
+        self.available = False
+        if not sys.platform.startswith('linux'):
+            return
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            self._add_watch = libc.inotify_add_watch
+            self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return
+        if fd < 0:
+            return
+        self.fd = fd
+        self.available = True
+
+    def add_dir(self, directory: Path) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(str(directory)), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {directory}")
+        return wd
+
+    def read(self, timeout: float) -> List[Tuple[int, str]]:
+        """等待事件 (最多 timeout 秒)，回傳 [(wd, 檔名)]"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + self._EVENT.size <= len(buf):
+            wd, _mask, _cookie, length = self._EVENT.unpack_from(buf, offset)
+            offset += self._EVENT.size
+            name = buf[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            events.append((wd, name))
+        return events
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+# ==================== 服務 ====================
+
+@dataclass
+class ConfigServiceStats:
+    """配置服務統計"""
+
+    watched: int = 0
+    reloads: int = 0
+    rejected: int = 0
+    events: int = 0
+    polls: int = 0
+    backend: str = "poll"
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class ConfigService:
+    """配置檔監看與發布"""
+
+    def __init__(self, poll_interval: float = 1.0, safety_poll_interval: float = 30.0, debounce: float = 0.02,
+                 use_inotify: bool = True):
+        """
+        Args:
+            poll_interval: 無 inotify 時的輪詢間隔 (秒)
+            safety_poll_interval: 有 inotify 時仍定期全量檢查一次 (防漏事件)
+            debounce: 收到事件後等待同批寫入完成的時間 (秒)
+            use_inotify: False = 強制使用輪詢
+        """
+        self.poll_interval = poll_interval
+        self.safety_poll_interval = safety_poll_interval
+        self.debounce = debounce
+        self.stats = ConfigServiceStats()
+        self._entries: Dict[Path, ConfigEntry] = {}
+        self._lock = threading.Lock()
+        self._inotify = _Inotify() if use_inotify else None
+        self._dir_watches: Dict[Path, int] = {}
+        self._wd_dirs: Dict[int, Path] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if self._inotify is not None and self._inotify.available:
+            self.stats.backend = "inotify"
+
+    def watch(
+        self,
+        path: str | Path,
+        validate: Optional[Validator] = None,
+        compile: Optional[Compiler] = None,
+        default: Optional[Mapping[str, Any]] = None,
+    ) -> ConfigEntry:
+        """
+        註冊 (或取得已註冊的) 配置檔，並立即同步載入一次
+
+        同一路徑只會有一個 ConfigEntry；validate / compile / default 以第一次註冊為準。
+
+        Args:
+            path: JSON 檔路徑 (相對路徑以目前工作目錄解析)
+            validate: 驗證函式，回傳錯誤訊息列表 (空 = 通過)
+            compile: 編譯函式，把 FrozenConfig 轉成熱路徑使用的型別物件 (entry.compiled)
+            default: 檔案不存在時的內容
+        """
+        resolved = Path(path).resolve()
+        with self._lock:
+            entry = self._entries.get(resolved)
+            if entry is not None:
+                return entry
+            entry = ConfigEntry(resolved, validate=validate, compile=compile, default=default)
+            self._entries[resolved] = entry
+            self.stats.watched = len(self._entries)
+            self._watch_dir(resolved.parent)
+        if entry.refresh(force=True):
+            self.stats.reloads += 1
+        self.start()
+        return entry
+
+    def get(self, path: str | Path) -> Optional[ConfigEntry]:
+        return self._entries.get(Path(path).resolve())
+
+    def reload(self, path: str | Path) -> bool:
+        """強制重新讀取 (例如剛寫完檔、不想等監看執行緒)"""
+        entry = self.get(path)
+        if entry is None:
+            return False
+        return self._refresh(entry, force=True)
+
+    def _refresh(self, entry: ConfigEntry, force: bool = False) -> bool:
+        rejected = entry.rejected
+        changed = entry.refresh(force=force)
+        if changed:
+            self.stats.reloads += 1
+        self.stats.rejected += entry.rejected - rejected
+        return changed
+
+    def _watch_dir(self, directory: Path) -> None:
+        if self._inotify is None or not self._inotify.available or directory in self._dir_watches:
+            return
+        try:
+            wd = self._inotify.add_dir(directory)
+        except OSError as e:
+            # 目錄不存在等: 這個檔案靠安全輪詢
+            logger.debug(f"inotify watch failed for {directory}: {e}")
+            return
+        self._dir_watches[directory] = wd
+        self._wd_dirs[wd] = directory
+
+    # ------------------------ 背景執行緒 ------------------------ #
+    def _poll_all(self) -> None:
+        self.stats.polls += 1
+        for entry in list(self._entries.values()):
+            self._refresh(entry)
+
+    def _loop(self) -> None:
+        inotify = self._inotify if self._inotify is not None and self._inotify.available else None
+        last_poll = time.monotonic()
+        while not self._stop.is_set():
+            if inotify is None:
+                self._stop.wait(self.poll_interval)
+                self._poll_all()
+                continue
+            events = inotify.read(timeout=min(1.0, self.safety_poll_interval))
+            if events:
+                # 同一次存檔常帶多個事件 (CREATE + CLOSE_WRITE + MOVED_TO)，合併後再載入
+                self._stop.wait(self.debounce)
+                events += inotify.read(timeout=0)
+                self.stats.events += len(events)
+                touched = {self._wd_dirs.get(wd, Path()) / name for wd, name in events if name}
+                for path in touched:
+                    entry = self._entries.get(path)
+                    if entry is not None:
+                        self._refresh(entry)
+            if time.monotonic() - last_poll >= self.safety_poll_interval:
+                self._poll_all()
+                last_poll = time.monotonic()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="config-service", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+_global_service: Optional[ConfigService] = None
+_global_lock = threading.Lock()
+
+
+def get_config_service() -> ConfigService:
+    """獲取全局配置服務"""
+    global _global_service
+    if _global_service is None:
+        with _global_lock:
+            if _global_service is None:
+                _global_service = ConfigService()
+    return _global_service
@@ -0,0 +1,549 @@
+"""
+行情紀錄型別 (Market Records)
+
+即時熱路徑 (每筆成交 / 每次訂單簿更新) 原本各自組 dict: 一筆成交在 Binance WS、
+DydxDataHub、SignedVolumeTracker 各建一份 5 鍵 dict，OBI 歷史每 100ms 存一份 11 鍵 dict。
+長時間運行時這些短命 dict 是 RSS 與 GC 停頓持續成長的主因。
+
+這裡改用 __slots__ dataclass:
+- 每筆只有固定欄位槽，沒有 per-instance __dict__ 與 keys 表 (連同欄位值約為 dict 的 60%)，
+  建立時也只有一次配置
+- 以 @record 宣告並繼承 RecordMapping，保留 dict 介面: record['price']、record.get('qty', 0)、
+  'is_buy' in record、dict(record)、{**record} 都照舊可用，既有消費端不必修改
+- 需要 JSON 時呼叫 to_dict() (或 as_dict() 同時相容 dict / 紀錄)；
+  dataclasses.asdict 會遞迴轉換，MarketData.to_dict() 不受影響
+
+slots 物件一律被循環 GC 追蹤 (只含數值的 dict 則不會)，所以長期保存的滾動窗口不放紀錄物件，
+而是用 RecordRing: 每個欄位一條 array.array 的 ring buffer，寫入不產生任何 Python 物件、
+不增加 GC 追蹤數，讀取時才組回紀錄。成交窗口用 TradeTape (RecordRing + 依時間二分搜尋)。
+紀錄物件只在讀取端與短命的快照 (FeedSnapshot / BigTradeStats) 出現。
+
+用法:
+    trade = TradeTick(price, qty, is_buy, time_ms, price * qty)
+    trade.price          # 熱路徑用屬性存取
+    trade['value_usdt']  # 舊程式碼的 dict 存取仍可用
+    json.dumps(as_dict(trade))
+
+    tape = TradeTape(6000)
+    tape.append(price, qty, is_buy, time_ms)
+    tape.price_at_or_before(now_ms - 60_000)
+
+    history = OBIHistory(1000)
+    history.append(now, obi, ...)   # 依 OBISample 欄位順序
+    history[-1]['obi']
+"""
+
+from array import array
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+# ==================== dict 轉接 ====================
+
+class RecordMapping(Mapping):
+    """
+    讓 slots dataclass 以唯讀 dict 的方式被讀取
+
+    Mapping 本身 __slots__ = ()，不會帶回 __dict__；欄位名稱由 @record 設定。
+    與 dict 比較相等時比的是內容 (Mapping.__eq__)。
+    """
+
+    __slots__ = ()
+
+    _field_names: Tuple[str, ...] = ()
+    _keys: FrozenSet[str] = frozenset()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._keys:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._field_names)
+
+    def __len__(self) -> int:
+        return len(self._field_names)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self._field_names}
+
+    @classmethod
+    def from_dict(cls, data: Mapping):
+        """由 dict (例如跨進程 JSON 檔) 建立；缺少的欄位使用預設值"""
+        return cls(**{k: data[k] for k in cls._field_names if k in data})
+
+
+def record(cls):
+    """@dataclass(slots=True) + 設定 RecordMapping 的欄位名稱"""
+    cls = dataclass(slots=True, eq=False)(cls)
+    cls._field_names = tuple(f.name for f in fields(cls))
+    cls._keys = frozenset(cls._field_names)
+    return cls
+
+
+def as_dict(record: Any) -> Dict[str, Any]:
+    """dict / 紀錄一律轉成 dict (JSON 輸出邊界使用)"""
+    if isinstance(record, dict):
+        return record
+    if isinstance(record, RecordMapping):
+        return record.to_dict()
+    return dict(record)
+
+
+# ==================== 欄位式 ring ====================
+
+class RecordRing:
+    """
+    固定容量的 @record 滾動窗口，每個欄位一條預先配置的 array.array
+
+    取代 deque(maxlen=N) 裝 slots 紀錄: 寫入只是逐欄位定址賦值，不建立 Python 物件，
+    緩衝區也不被 GC 追蹤；讀取 ([-1]、迭代、tail()) 時才組回紀錄，介面與 deque 相同
+    (len / bool / 負索引 / list())。
+
+    單一寫入者 (餵資料的 WS 執行緒)，寫入不持鎖: 以序號 _seq 發布 (寫入中為奇數，
+    完成後為偶數，_seq >> 1 即累計筆數)。查詢端 (分析執行緒) 讀完後比對序號，
+    讀取期間被覆寫的最舊幾列: 批次讀取 (tail / column / 快照) 直接捨去，
+    單點讀取與彙總則重讀。
+
+    Args:
+        record_type: @record 類別，append() 的參數依其欄位順序
+        capacity: 窗口筆數
+        typecodes: 欄位 → array typecode (預設 'd')
+        codecs: 欄位 → (寫入轉換, 讀取轉換)，例如 datetime ↔ 微秒整數
+    """
+
+    __slots__ = ('record_type', 'capacity', '_columns', '_codecs', '_pos', '_seq', '_start')
+
+    def __init__(self, record_type, capacity: int, typecodes: Optional[Dict[str, str]] = None,
+                 codecs: Optional[Dict[str, Tuple[Callable, Callable]]] = None):
+        self.record_type = record_type
+        self.capacity = max(1, int(capacity))
+        typecodes = typecodes or {}
+        self._columns = tuple(array(typecodes.get(name, 'd'), [0]) * self.capacity for name in record_type._field_names)
+        codecs = codecs or {}
+        self._codecs = tuple(
+            (record_type._field_names.index(name), encode, decode) for name, (encode, decode) in codecs.items()
+        )
+        self._pos = 0       # 下一筆寫入的位置 (只有寫入端使用)
+        self._seq = 0       # 2 × 累計寫入筆數 (+1 表示寫入中)
+        self._start = 0     # clear() 時的累計筆數
+
+    def __len__(self) -> int:
+        return self._view()[1]
+
+    def append(self, *values) -> None:
+        if self._codecs:
+            values = list(values)
+            for index, encode, _ in self._codecs:
+                values[index] = encode(values[index])
+        seq = self._seq
+        i = self._pos
+        self._seq = seq + 1
+        try:
+            for column, value in zip(self._columns, values):
+                column[i] = value
+        except BaseException:
+            self._seq = seq  # 這筆未發布
+            raise
+        self._pos = 0 if i + 1 == self.capacity else i + 1
+        self._seq = seq + 2
+
+    def append_record(self, item: RecordMapping) -> None:
+        self.append(*(getattr(item, name) for name in self.record_type._field_names))
+
+    def clear(self) -> None:
+        """由寫入端呼叫: 之後的查詢只看到 clear() 之後寫入的紀錄"""
+        self._start = self._seq >> 1
+
+    # ---------- 內部: 讀取快照與驗證 ----------
+
+    def _view(self) -> Tuple[int, int]:
+        """(累計筆數, 窗口筆數) 的快照"""
+        count = self._seq >> 1
+        return count, max(0, min(count - self._start, self.capacity))
+
+    def _stale(self, count: int, size: int) -> int:
+        """快照 (count, size) 之後已開始的寫入覆寫掉的最舊列數 (0 = 讀到的都有效)"""
+        started = ((self._seq + 1) >> 1) - count
+        return max(0, started + size - self.capacity)
+
+    def _slot(self, count: int, size: int, k: int) -> int:
+        """快照中第 k 筆 (0 = 窗口內最舊) 的實體位置"""
+        return (count - size + k) % self.capacity
+
+    def _row(self, i: int):
+        values = [column[i] for column in self._columns]
+        for index, _, decode in self._codecs:
+            values[index] = decode(values[index])
+        return self.record_type(*values)
+
+    # ---------- 查詢 ----------
+
+    def tail(self, n: int) -> List[Any]:
+        """最新 n 筆紀錄 (舊 → 新)"""
+        count, size = self._view()
+        lo = max(0, size - n)
+        rows = [self._row(self._slot(count, size, k)) for k in range(lo, size)]
+        return rows[max(0, self._stale(count, size) - lo):]
+
+    def column(self, name: str, last_n: Optional[int] = None) -> List[Any]:
+        """單一欄位的原始值 (舊 → 新；不組紀錄，適合只要 obi 之類的計算)"""
+        column = self._columns[self.record_type._field_names.index(name)]
+        count, size = self._view()
+        lo = 0 if last_n is None else max(0, size - last_n)
+        values = [column[self._slot(count, size, k)] for k in range(lo, size)]
+        return values[max(0, self._stale(count, size) - lo):]
+
+    def _read_valid(self, read: Callable[[int, int], Tuple[Any, int]]) -> Any:
+        """重讀直到結果沒用到讀取期間被覆寫的列: read(count, size) → (結果, 用到的最舊列序號)"""
+        while True:
+            count, size = self._view()
+            result, lo = read(count, size)
+            if self._stale(count, size) <= lo:
+                return result
+
+    def __getitem__(self, index: int):
+        def read(count: int, size: int):
+            k = index + size if index < 0 else index
+            if not 0 <= k < size:
+                raise IndexError(index)
+            return self._row(self._slot(count, size, k)), k
+        return self._read_valid(read)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.tail(self.capacity))
+
+
+# ==================== 成交 ====================
+
+@record
+class TradeTick(RecordMapping):
+    """
+    一筆成交 (鯨魚交易器 / DydxDataHub 的 trades_1s、trades_1m、big_trades)
+
+    dict 鍵: price, qty, is_buy, time, value_usdt
+    """
+    price: float
+    qty: float
+    is_buy: bool
+    time: float              # 毫秒
+    value_usdt: float = 0.0
+
+
+@record
+class SignedTrade(RecordMapping):
+    """
+    帶方向的成交 (SignedVolumeTracker.trades)
+
+    dict 鍵: timestamp, price, quantity, side, signed_volume
+    """
+    timestamp: float         # 毫秒
+    price: float
+    quantity: float
+    side: int                # 1 買方主動 / -1 賣方主動 / 0 無法判斷
+    signed_volume: float
+
+
+class SignedTradeTape(RecordRing):
+    """SignedVolumeTracker 的交易歷史 (RecordRing[SignedTrade]，append 展開成逐欄位賦值)"""
+
+    __slots__ = ()
+
+    def __init__(self, capacity: int):
+        super().__init__(SignedTrade, capacity, typecodes={'side': 'b'})
+
+    def append(self, timestamp: float, price: float, quantity: float, side: int,
+               signed_volume: Optional[float] = None) -> None:
+        if signed_volume is None:
+            signed_volume = quantity * side
+        time_col, price_col, qty_col, side_col, signed_col = self._columns
+        seq = self._seq
+        i = self._pos
+        self._seq = seq + 1
+        try:
+            time_col[i] = timestamp
+            price_col[i] = price
+            qty_col[i] = quantity
+            side_col[i] = side
+            signed_col[i] = signed_volume
+        except BaseException:
+            self._seq = seq
+            raise
+        self._pos = 0 if i + 1 == self.capacity else i + 1
+        self._seq = seq + 2
+
+
+TRADE_DTYPE = np.dtype([
+    ('time', 'f8'),
+    ('price', 'f8'),
+    ('qty', 'f8'),
+    ('value_usdt', 'f8'),
+    ('is_buy', '?'),
+])
+
+
+class TradeTape(RecordRing):
+    """
+    成交滾動窗口 (RecordRing[TradeTick] + 依時間查詢)
+
+    時間倒退的成交 (亂序) 以上一筆時間記錄，維持遞增，依時間的查詢因此可以二分搜尋。
+    append() 針對每筆成交的熱路徑展開成逐欄位賦值。
+    """
+
+    __slots__ = ('_last_time',)
+
+    def __init__(self, capacity: int):
+        super().__init__(TradeTick, capacity, typecodes={'is_buy': 'b'})
+        self._last_time = float('-inf')
+
+    def append(self, price: float, qty: float, is_buy: bool, time_ms: float,
+               value_usdt: Optional[float] = None) -> None:
+        if value_usdt is None:
+            value_usdt = price * qty
+        if time_ms < self._last_time:
+            time_ms = self._last_time
+        self._last_time = time_ms
+        price_col, qty_col, buy_col, time_col, value_col = self._columns
+        seq = self._seq
+        i = self._pos
+        self._seq = seq + 1
+        try:
+            price_col[i] = price
+            qty_col[i] = qty
+            buy_col[i] = is_buy
+            time_col[i] = time_ms
+            value_col[i] = value_usdt
+        except BaseException:
+            self._seq = seq
+            raise
+        self._pos = 0 if i + 1 == self.capacity else i + 1
+        self._seq = seq + 2
+
+    def clear(self) -> None:
+        super().clear()
+        self._last_time = float('-inf')
+
+    def _row(self, i: int) -> TradeTick:
+        price_col, qty_col, buy_col, time_col, value_col = self._columns
+        return TradeTick(price_col[i], qty_col[i], bool(buy_col[i]), time_col[i], value_col[i])
+
+    def _bisect_time(self, count: int, size: int, ts_ms: float, right: bool) -> int:
+        """快照中第一筆 time > ts_ms (right) / time >= ts_ms 的序號"""
+        times = self._columns[3]
+        lo, hi = 0, size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            t = times[self._slot(count, size, mid)]
+            if t < ts_ms or (right and t == ts_ms):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _column_array(self, column: array, count: int, size: int, lo: int, hi: int) -> np.ndarray:
+        """快照中 [lo, hi) 列的單一欄位 (numpy 複本)"""
+        values = np.frombuffer(column, dtype=column.typecode)
+        if hi <= lo:
+            return values[:0].copy()
+        first, last = self._slot(count, size, lo), self._slot(count, size, hi - 1)
+        if first <= last:
+            return values[first:last + 1].copy()
+        return np.concatenate((values[first:], values[:last + 1]))
+
+    def _rows(self, count: int, size: int, lo: int, hi: int) -> np.ndarray:
+        out = np.empty(max(0, hi - lo), dtype=TRADE_DTYPE)
+        for name, column in zip(TradeTick._field_names, self._columns):
+            out[name] = self._column_array(column, count, size, lo, hi)
+        return out
+
+    def snapshot(self) -> np.ndarray:
+        """目前窗口內容 (結構化陣列複本，依時間排序)"""
+        count, size = self._view()
+        out = self._rows(count, size, 0, size)
+        return out[self._stale(count, size):]
+
+    def since(self, cutoff_ms: float) -> np.ndarray:
+        """time >= cutoff_ms 的成交 (複本)"""
+        def read(count: int, size: int):
+            lo = self._bisect_time(count, size, cutoff_ms, right=False)
+            return self._rows(count, size, lo, size), lo
+        return self._read_valid(read)
+
+    def flow_since(self, cutoff_ms: float, last_n: Optional[int] = None) -> Tuple[float, float]:
+        """
+        time > cutoff_ms 的主動買 / 賣成交量 (qty)
+
+        Args:
+            last_n: 只看最新 n 筆 (與舊的 deque(maxlen=n) 窗口相同)
+        """
+        _, qty_col, buy_col, _, _ = self._columns
+
+        def read(count: int, size: int):
+            lo = self._bisect_time(count, size, cutoff_ms, right=True)
+            if last_n is not None:
+                lo = max(lo, size - last_n)
+            buy = sell = 0.0
+            for k in range(lo, size):
+                i = self._slot(count, size, k)
+                if buy_col[i]:
+                    buy += qty_col[i]
+                else:
+                    sell += qty_col[i]
+            return (buy, sell), lo
+        return self._read_valid(read)
+
+    def price_at_or_before(self, ts_ms: float) -> Optional[float]:
+        """time <= ts_ms 的最後一筆成交價；窗口內沒有更早的成交時回傳 None"""
+        def read(count: int, size: int):
+            k = self._bisect_time(count, size, ts_ms, right=True)
+            if k == 0:
+                return None, 0
+            return self._columns[0][self._slot(count, size, k - 1)], k - 1
+        return self._read_valid(read)
+
+    def first_price(self) -> Optional[float]:
+        def read(count: int, size: int):
+            return (self._columns[0][self._slot(count, size, 0)] if size else None), 0
+        return self._read_valid(read)
+
+
+# ==================== 訂單簿 ====================
+
+@record
+class OBISample(RecordMapping):
+    """OBICalculator.obi_history 的一筆樣本 (每次訂單簿更新一筆)"""
+    timestamp: datetime
+    obi: float
+    weighted_obi: float
+    bid_size: float
+    ask_size: float
+    spread: float
+    microprice: float = 0.0
+    mid_price: float = 0.0
+    microprice_pressure: float = 0.0
+    bid_weight: float = 0.0
+    ask_weight: float = 0.0
+
+
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+
+
+def _datetime_to_us(value: datetime) -> int:
+    return (value - _EPOCH) // _US
+
+
+def _us_to_datetime(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+# naive UTC datetime 以微秒整數存放 (精確還原)
+OBI_SAMPLE_TYPECODES = {'timestamp': 'q'}
+OBI_SAMPLE_CODECS = {'timestamp': (_datetime_to_us, _us_to_datetime)}
+
+
+class OBIHistory(RecordRing):
+    """OBICalculator 的 OBI 歷史 (RecordRing[OBISample]，append 展開成逐欄位賦值)"""
+
+    __slots__ = ()
+
+    def __init__(self, capacity: int):
+        super().__init__(OBISample, capacity, OBI_SAMPLE_TYPECODES, OBI_SAMPLE_CODECS)
+
+    def append(self, timestamp: datetime, obi: float, weighted_obi: float, bid_size: float,
+               ask_size: float, spread: float, microprice: float = 0.0, mid_price: float = 0.0,
+               microprice_pressure: float = 0.0, bid_weight: float = 0.0, ask_weight: float = 0.0) -> None:
+        (time_col, obi_col, weighted_col, bid_col, ask_col, spread_col,
+         micro_col, mid_col, pressure_col, bid_w_col, ask_w_col) = self._columns
+        time_us = (timestamp - _EPOCH) // _US
+        seq = self._seq
+        i = self._pos
+        self._seq = seq + 1
+        try:
+            time_col[i] = time_us
+            obi_col[i] = obi
+            weighted_col[i] = weighted_obi
+            bid_col[i] = bid_size
+            ask_col[i] = ask_size
+            spread_col[i] = spread
+            micro_col[i] = microprice
+            mid_col[i] = mid_price
+            pressure_col[i] = microprice_pressure
+            bid_w_col[i] = bid_weight
+            ask_w_col[i] = ask_weight
+        except BaseException:
+            self._seq = seq
+            raise
+        self._pos = 0 if i + 1 == self.capacity else i + 1
+        self._seq = seq + 2
+
+
+# ==================== 快照 ====================
+
+@record
+class BigTradeStats(RecordMapping):
+    """大單統計 (BinanceWebSocket / DydxWebSocket.get_big_trades_stats)"""
+    big_trade_count: int = 0
+    big_buy_count: int = 0
+    big_sell_count: int = 0
+    big_buy_volume: float = 0.0
+    big_sell_volume: float = 0.0
+    big_buy_value: float = 0.0
+    big_sell_value: float = 0.0
+    recent_big_trades: Optional[List[Any]] = None
+    direction_changes: int = 0
+    stable_duration_sec: float = 0.0
+    last_direction: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = RecordMapping.to_dict(self)
+        data['recent_big_trades'] = [as_dict(t) for t in self.recent_big_trades or ()]
+        return data
+
+
+@record
+class FeedSnapshot(RecordMapping):
+    """
+    每個分析週期的行情快照 (get_full_snapshot)
+
+    大單統計以 big 欄位攜帶 (不再攤平複製)；dict 讀取時 big 的鍵照舊可直接取用。
+    """
+    timestamp: str
+    price: float
+    bid: float
+    ask: float
+    spread: float
+    obi: float
+    trade_imbalance_1s: float
+    price_change_1m: float
+    price_change_5m: float
+    bid_depth: float
+    ask_depth: float
+    big: BigTradeStats
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._keys and key != 'big':
+            return getattr(self, key)
+        return self.big[key]
+
+    def __contains__(self, key: object) -> bool:
+        return (key in self._keys and key != 'big') or key in self.big
+
+    def __iter__(self) -> Iterator[str]:
+        yield from (name for name in self._field_names if name != 'big')
+        yield from self.big
+
+    def __len__(self) -> int:
+        return len(self._field_names) - 1 + len(self.big)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self._field_names if name != 'big'}
+        data.update(self.big.to_dict())
+        return data
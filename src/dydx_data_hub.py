@@ -23,7 +23,6 @@ Version: 1.0.0
 """
 
 import json
-import time
 import fcntl
 import os
 import asyncio
@@ -31,22 +30,42 @@ import websockets
 import logging
 import threading
 from pathlib import Path
-from typing import Dict, Optional, List, Any, Callable
+from typing import Dict, Optional, List, Any, Callable, Tuple
 from dataclasses import dataclass, field, asdict
 from collections import deque
 from datetime import datetime, timezone
 import aiohttp
 import ssl
 
+from .core.clock import WALL_CLOCK, Clock, get_clock
+from .core.market_records import TradeTick
+
 # 抑制 HTTP 請求日誌 (避免刷屏)
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("httpcore").setLevel(logging.WARNING)
 logging.getLogger("websockets").setLevel(logging.WARNING)
 logging.getLogger("aiohttp").setLevel(logging.WARNING)
 
-# 數據快取檔案路徑
+# 數據快取檔案路徑 (BTC-USD 沿用舊檔名，其他市場見 hub_paths())
 DATA_HUB_PATH = Path("/tmp/dydx_data_hub.json")
 LOCK_FILE_PATH = Path("/tmp/dydx_data_hub.lock")
+DEFAULT_SYMBOL = "BTC-USD"
+
+
+def hub_paths(symbol: str = DEFAULT_SYMBOL) -> Tuple[Path, Path]:
+    """
+    各市場的 (快取檔, 鎖檔) 路徑
+
+    每個市場各自選舉 master，BTC-USD 維持舊路徑讓既有 consumer 不受影響，
+    其他市場為 /tmp/dydx_data_hub_<eth_usd>.json / .lock。
+    """
+    if not symbol or symbol.upper() == DEFAULT_SYMBOL:
+        return DATA_HUB_PATH, LOCK_FILE_PATH
+    slug = symbol.lower().replace("-", "_").replace("/", "_")
+    return (
+        DATA_HUB_PATH.with_name(f"dydx_data_hub_{slug}.json"),
+        LOCK_FILE_PATH.with_name(f"dydx_data_hub_{slug}.lock"),
+    )
 
 # 大單歷史保存路徑 (長期保存)
 BIG_TRADES_DIR = Path(__file__).parent.parent / "data" / "big_trades"
@@ -73,9 +92,9 @@ class MarketData:
     # K 線 (1m, 最近 60 根)
     candles_1m: List[Dict] = field(default_factory=list)
     
-    # 即時交易
-    recent_trades: List[Dict] = field(default_factory=list)
-    big_trades: List[Dict] = field(default_factory=list)
+    # 即時交易 (TradeTick；仍可用 t['price'] 讀取)
+    recent_trades: List[TradeTick] = field(default_factory=list)
+    big_trades: List[TradeTick] = field(default_factory=list)
     
     # 成交量統計
     buy_volume_1m: float = 0.0
@@ -94,7 +113,11 @@ class MarketData:
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'MarketData':
-        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+        data = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        for key in ('recent_trades', 'big_trades'):
+            if key in data:
+                data[key] = [TradeTick.from_dict(t) for t in data[key]]
+        return cls(**data)
 
 
 class DydxDataHub:
@@ -126,8 +149,11 @@ class DydxDataHub:
         big_trade_threshold: float = 1000.0,
         on_data_update: Optional[Callable[[MarketData], None]] = None,
         ssl_verify: bool = True,
+        clock: Optional[Clock] = None,
     ):
+        self.clock: Clock = clock or get_clock()
         self.symbol = symbol
+        self.data_path, self.lock_path = hub_paths(symbol)
         self.network = network
         self.big_trade_threshold = big_trade_threshold
         self.on_data_update = on_data_update
@@ -220,7 +246,7 @@ class DydxDataHub:
         try:
             # 創建/打開鎖文件
             self._lock_fd = os.open(
-                str(LOCK_FILE_PATH),
+                str(self.lock_path),
                 os.O_RDWR | os.O_CREAT,
                 0o666
             )
@@ -316,7 +342,7 @@ class DydxDataHub:
                 msg_type = data.get("type", "")
                 channel = data.get("channel", "")
                 
-                self._last_ws_message = time.time()
+                self._last_ws_message = self.clock.time()
                 
                 if msg_type in ("subscribed", "channel_data", "channel_batch_data"):
                     contents = data.get("contents", {})
@@ -329,7 +355,7 @@ class DydxDataHub:
                         self._process_candles(contents)
                     
                     # 更新時間戳
-                    self._data.last_update = time.time()
+                    self._data.last_update = self.clock.time()
                     
                     # 觸發回調
                     if self.on_data_update:
@@ -352,18 +378,12 @@ class DydxDataHub:
                     continue
                 
                 self._data.current_price = price
-                self._data.last_trade_time = time.time() * 1000
+                self._data.last_trade_time = self.clock.time() * 1000
                 
                 value_usdt = price * size
                 is_buy = side == "BUY"
                 
-                trade = {
-                    'price': price,
-                    'qty': size,
-                    'is_buy': is_buy,
-                    'time': self._data.last_trade_time,
-                    'value_usdt': value_usdt
-                }
+                trade = TradeTick(price, size, is_buy, self._data.last_trade_time, value_usdt)
                 
                 self._trades_buffer.append(trade)
                 
@@ -488,7 +508,7 @@ class DydxDataHub:
             self._data.spread_pct = (self._data.ask_price - self._data.bid_price) / self._data.bid_price * 100
         
         # 🔧 v14.9: 更新時間戳 (orderbook 更新頻率高，確保數據新鮮度)
-        self._data.last_trade_time = time.time() * 1000
+        self._data.last_trade_time = self.clock.time() * 1000
     
     def _process_candles(self, contents: Dict):
         """處理 K 線數據"""
@@ -535,7 +555,7 @@ class DydxDataHub:
     
     def _cleanup_volumes(self):
         """清理舊的成交量統計"""
-        now = time.time() * 1000
+        now = self.clock.time() * 1000
         one_minute_ago = now - 60000
         
         # 過濾舊交易
@@ -543,24 +563,24 @@ class DydxDataHub:
         old_sell = self._data.sell_volume_1m
         
         self._data.buy_volume_1m = sum(
-            t['value_usdt'] for t in self._trades_buffer
-            if t['time'] > one_minute_ago and t['is_buy']
+            t.value_usdt for t in self._trades_buffer
+            if t.time > one_minute_ago and t.is_buy
         )
         self._data.sell_volume_1m = sum(
-            t['value_usdt'] for t in self._trades_buffer
-            if t['time'] > one_minute_ago and not t['is_buy']
+            t.value_usdt for t in self._trades_buffer
+            if t.time > one_minute_ago and not t.is_buy
         )
     
     def _save_to_file(self):
         """保存數據到本機檔案 (原子寫入)"""
         try:
-            temp_path = DATA_HUB_PATH.with_suffix('.tmp')
+            temp_path = self.data_path.with_suffix('.tmp')
             
             with open(temp_path, 'w') as f:
                 json.dump(self._data.to_dict(), f)
             
             # 原子替換
-            temp_path.rename(DATA_HUB_PATH)
+            temp_path.rename(self.data_path)
             
         except Exception as e:
             logging.debug(f"檔案保存錯誤: {e}")
@@ -578,7 +598,7 @@ class DydxDataHub:
     
     def _rotate_big_trades_file(self):
         """根據日期切換大單歷史文件"""
-        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        today = self.clock.now(timezone.utc).strftime("%Y-%m-%d")
         if today != self._big_trades_date:
             self._big_trades_date = today
             self._big_trades_file = BIG_TRADES_DIR / f"{self.symbol}_{today}.jsonl"
@@ -643,10 +663,10 @@ class DydxDataHub:
                     self._maybe_takeover_master()
                     if self._is_master:
                         return  # 已升級成 master，read loop 結束（改由 WS loop 更新）
-                time.sleep(0.05)  # 50ms 讀取間隔
+                WALL_CLOCK.sleep(0.05)  # 50ms 讀取間隔
             except Exception as e:
                 logging.debug(f"讀取錯誤: {e}")
-                time.sleep(0.1)
+                WALL_CLOCK.sleep(0.1)
 
     def _maybe_takeover_master(self):
         """
@@ -656,7 +676,7 @@ class DydxDataHub:
         - 如果鎖檔案無法釋放但 master PID 已不存在，強制刪除鎖檔案
         - 避免殭屍鎖導致數據無限期過期
         """
-        now = time.time()
+        now = self.clock.time()
 
         # 節流：避免每 50ms 都嘗試搶鎖
         if now - self._last_takeover_attempt < 2.0:
@@ -666,7 +686,7 @@ class DydxDataHub:
         # 若快取檔不存在，或 last_update 過舊，才需要嘗試接手
         last_update = getattr(self._data, "last_update", 0.0) or 0.0
         data_age = (now - last_update) if last_update > 0 else float("inf")
-        stale = (not DATA_HUB_PATH.exists()) or data_age > 5.0
+        stale = (not self.data_path.exists()) or data_age > 5.0
         if not stale:
             return
 
@@ -687,7 +707,7 @@ class DydxDataHub:
                 # 進程不存在，強制刪除鎖檔案
                 try:
                     logging.warning(f"🗑️ 舊 master (PID: {old_master_pid}) 已死亡，清理殭屍鎖...")
-                    LOCK_FILE_PATH.unlink(missing_ok=True)
+                    self.lock_path.unlink(missing_ok=True)
                 except Exception as e:
                     logging.debug(f"清理鎖檔案失敗: {e}")
         
@@ -706,7 +726,7 @@ class DydxDataHub:
         try:
             self._data.master_pid = self._pid
             self._data.ws_connected = False
-            self._data.last_update = time.time()
+            self._data.last_update = self.clock.time()
             self._save_to_file()
         except Exception:
             pass
@@ -722,10 +742,10 @@ class DydxDataHub:
     def _read_from_file(self):
         """從本機檔案讀取數據"""
         try:
-            if not DATA_HUB_PATH.exists():
+            if not self.data_path.exists():
                 return
             
-            with open(DATA_HUB_PATH, 'r') as f:
+            with open(self.data_path, 'r') as f:
                 data = json.load(f)
             
             self._data = MarketData.from_dict(data)
@@ -808,35 +828,35 @@ class DydxDataHub:
         return self._data.asks
     
     @property
-    def big_trades(self) -> List[Dict]:
+    def big_trades(self) -> List[TradeTick]:
         return self._data.big_trades
     
     @property
     def trades_1s(self):
         """兼容舊 API: 返回最近 1 秒的交易"""
-        now = time.time() * 1000
-        return [t for t in self._data.recent_trades if now - t['time'] < 1000]
+        now = self.clock.time() * 1000
+        return [t for t in self._data.recent_trades if now - t.time < 1000]
     
     @property
     def trades_1m(self):
         """兼容舊 API: 返回最近 1 分鐘的交易"""
-        now = time.time() * 1000
-        return [t for t in self._data.recent_trades if now - t['time'] < 60000]
+        now = self.clock.time() * 1000
+        return [t for t in self._data.recent_trades if now - t.time < 60000]
     
     @property
     def buy_volume_1s(self) -> float:
-        now = time.time() * 1000
+        now = self.clock.time() * 1000
         return sum(
-            t['value_usdt'] for t in self._data.recent_trades
-            if now - t['time'] < 1000 and t['is_buy']
+            t.value_usdt for t in self._data.recent_trades
+            if now - t.time < 1000 and t.is_buy
         )
     
     @property
     def sell_volume_1s(self) -> float:
-        now = time.time() * 1000
+        now = self.clock.time() * 1000
         return sum(
-            t['value_usdt'] for t in self._data.recent_trades
-            if now - t['time'] < 1000 and not t['is_buy']
+            t.value_usdt for t in self._data.recent_trades
+            if now - t.time < 1000 and not t.is_buy
         )
     
     def get_price_change(self, period_seconds: int) -> float:
@@ -864,41 +884,43 @@ class DydxDataHub:
 
 # ===== 全局實例管理 =====
 
-_global_hub: Optional[DydxDataHub] = None
+_global_hubs: Dict[str, DydxDataHub] = {}
 
 def get_data_hub(
-    symbol: str = "BTC-USD",
+    symbol: str = DEFAULT_SYMBOL,
     network: str = "mainnet",
     ssl_verify: bool = True,
 ) -> DydxDataHub:
     """
-    獲取全局 Data Hub 實例
+    獲取全局 Data Hub 實例 (每個市場一個)
     
     使用方式:
     ```python
     from src.dydx_data_hub import get_data_hub
     
-    hub = get_data_hub()
+    hub = get_data_hub()            # BTC-USD
+    eth_hub = get_data_hub("ETH-USD")
     hub.start()
     
     data = hub.get_data()
     print(f"BTC: ${data.current_price}")
     ```
     """
-    global _global_hub
-    
-    if _global_hub is None:
-        _global_hub = DydxDataHub(symbol=symbol, network=network, ssl_verify=ssl_verify)
+    hub = _global_hubs.get(symbol)
+    if hub is None:
+        hub = DydxDataHub(symbol=symbol, network=network, ssl_verify=ssl_verify)
+        _global_hubs[symbol] = hub
     
-    return _global_hub
+    return hub
 
 
-def cleanup_data_hub():
-    """清理全局 Data Hub"""
-    global _global_hub
-    if _global_hub:
-        _global_hub.stop()
-        _global_hub = None
+def cleanup_data_hub(symbol: Optional[str] = None):
+    """清理全局 Data Hub (symbol=None 時清理全部)"""
+    symbols = [symbol] if symbol else list(_global_hubs)
+    for sym in symbols:
+        hub = _global_hubs.pop(sym, None)
+        if hub:
+            hub.stop()
 
 
 if __name__ == "__main__":
@@ -914,7 +936,7 @@ if __name__ == "__main__":
     
     try:
         for i in range(30):
-            time.sleep(1)
+            WALL_CLOCK.sleep(1)
             data = hub.get_data()
             print(
                 f"[{i+1}s] 價格: ${data.current_price:,.2f} | "
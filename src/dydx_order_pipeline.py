@@ -0,0 +1,407 @@
+"""
+dYdX 下單 / 撤單管線 (Order Pipeline)
+====================================
+
+把保護單 (TP / SL) 的掛單、撤單、改單集中到單一背景工作者執行:
+- 意圖排隊: place / cancel / replace 以「槽位」(slot，例如 "SL" / "TP") 為鍵
+- 合併: 同一槽位尚未送出的同類舊意圖會被新意圖取代 (1 秒內 3 次移動止損 → 只送最後一次)，
+  被取代者的 future 直接拿到最新意圖的結果
+- 撤單批次: 同一輪排出的撤單一起送出，同一個 client id 的重複撤單只送一次
+- 在途追蹤: in-flight client id 可查詢；每個意圖都有完成 future
+- 集中限流: 每區塊 / 每窗口的交易數在這裡統一控制，不再由各呼叫點各自 sleep
+
+原理:
+    dYdX 的條件單 / 長期單與其撤單都是鏈上交易，共用錢包 sequence，
+    並受 block rate limit (code 5001) 與 order count limit (code 10001) 約束。
+    過去每個呼叫點各自 asyncio.run + 逐筆等待，快速行情時追蹤止損會堆疊請求、
+    交易互相搶 sequence，偶爾留下孤兒條件單。
+    管線在獨立執行緒的事件循環上「依序」送出交易 (stateful 交易不能平行，否則 sequence 衝突)，
+    排入後先等 coalesce_window 讓後續意圖有機會合併，再一次排空佇列。
+
+用法:
+    pipeline = DydxOrderPipeline(max_per_block=2, max_per_window=20)
+    pipeline.start()
+
+    # async 呼叫點 (任何事件循環)
+    ok = await pipeline.run("SL", lambda: trader._dydx_replace_stop_loss(...), kind="replace", cost=2)
+
+    # 同步呼叫點
+    future = pipeline.submit("TP", lambda: api.place_take_profit_order(...), kind="place")
+    result = future.result(timeout=30)
+
+    # 批次撤單 (依 client id 去重)
+    futures = pipeline.cancel_batch([(cid, lambda cid=cid: api.cancel_order(cid)) for cid in ids])
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+from .core.clock import Clock, get_clock
+
+logger = logging.getLogger(__name__)
+
+Operation = Callable[[], Awaitable[Any]]
+
+# dYdX v4 stateful order 限制 (每區塊 2 筆、每 100 區塊 20 筆；區塊約 1 秒)
+DEFAULT_MAX_PER_BLOCK = 2
+DEFAULT_BLOCK_SECONDS = 1.0
+DEFAULT_MAX_PER_WINDOW = 20
+DEFAULT_WINDOW_SECONDS = 100.0
+DEFAULT_COALESCE_WINDOW = 0.25
+
+
+class TxBudget:
+    """
+    鏈上交易預算 (兩層滑動窗口)
+
+    Args:
+        max_per_block: 每個區塊時間內最多交易數
+        block_seconds: 區塊時間 (秒)
+        max_per_window: 長窗口內最多交易數
+        window_seconds: 長窗口 (秒)
+        clock: 時鐘 (窗口計時與等待；重放時跟著虛擬時間走)
+    """
+
+    def __init__(
+        self,
+        max_per_block: int = DEFAULT_MAX_PER_BLOCK,
+        block_seconds: float = DEFAULT_BLOCK_SECONDS,
+        max_per_window: int = DEFAULT_MAX_PER_WINDOW,
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+        clock: Optional[Clock] = None,
+    ):
+        self.clock: Clock = clock or get_clock()
+        self.limits: Tuple[Tuple[int, float], ...] = (
+            (max(1, max_per_block), block_seconds),
+            (max(1, max_per_window), window_seconds),
+        )
+        self._sent: Deque[float] = deque()
+        self._penalty_until = 0.0
+
+    def wait_time(self, cost: int = 1, now: Optional[float] = None) -> float:
+        """還需要等多久才能再送出 cost 筆交易"""
+        now = self.clock.monotonic() if now is None else now
+        horizon = max(seconds for _, seconds in self.limits)
+        while self._sent and now - self._sent[0] >= horizon:
+            self._sent.popleft()
+        wait = max(0.0, self._penalty_until - now)
+        for limit, seconds in self.limits:
+            recent = [ts for ts in self._sent if now - ts < seconds]
+            overflow = len(recent) + min(cost, limit) - limit
+            if overflow > 0:
+                wait = max(wait, recent[overflow - 1] + seconds - now)
+        return wait
+
+    async def acquire(self, cost: int = 1) -> float:
+        """等待預算並登記 cost 筆交易，回傳等待秒數"""
+        waited = 0.0
+        while True:
+            wait = self.wait_time(cost)
+            if wait <= 0:
+                break
+            waited += wait
+            await self.clock.async_sleep(wait)
+        now = self.clock.monotonic()
+        self._sent.extend([now] * cost)
+        return waited
+
+    def penalize(self, seconds: float) -> None:
+        """交易所回報 rate limit 時暫停送出"""
+        self._penalty_until = max(self._penalty_until, self.clock.monotonic() + seconds)
+
+
+@dataclass
+class OrderIntent:
+    """排隊中的下單 / 撤單意圖"""
+
+    kind: str                       # place / cancel / replace
+    slot: str                       # 合併鍵 (撤單為 "cancel:<client_id>")
+    operation: Operation
+    cost: int = 1
+    client_id: Optional[int] = None
+    created_at: float = 0.0
+    superseded: int = 0
+    future: concurrent.futures.Future = field(default_factory=concurrent.futures.Future)
+
+
+@dataclass
+class PipelineStats:
+    """管線統計"""
+
+    submitted: int = 0
+    coalesced: int = 0
+    deduplicated: int = 0
+    executed: int = 0
+    failed: int = 0
+    cancels: int = 0
+    cancel_batches: int = 0
+    budget_wait_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class DydxOrderPipeline:
+    """dYdX 保護單管線 (單一背景工作者，依序送出)"""
+
+    def __init__(
+        self,
+        max_per_block: int = DEFAULT_MAX_PER_BLOCK,
+        block_seconds: float = DEFAULT_BLOCK_SECONDS,
+        max_per_window: int = DEFAULT_MAX_PER_WINDOW,
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+        coalesce_window: float = DEFAULT_COALESCE_WINDOW,
+        clock: Optional[Clock] = None,
+    ):
+        """
+        Args:
+            max_per_block / block_seconds: 每區塊交易上限
+            max_per_window / window_seconds: 長窗口交易上限
+            coalesce_window: 第一個意圖排入後等待合併的秒數
+            clock: 時鐘 (意圖建立時間與交易預算計時)
+        """
+        self.clock: Clock = clock or get_clock()
+        self.budget = TxBudget(max_per_block, block_seconds, max_per_window, window_seconds, clock=self.clock)
+        self.coalesce_window = coalesce_window
+        self.stats = PipelineStats()
+
+        self._lock = threading.Lock()
+        self._queue: "OrderedDict[str, OrderIntent]" = OrderedDict()
+        self._in_flight: Dict[str, OrderIntent] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    # ==================== 提交 ====================
+
+    def submit(
+        self,
+        slot: str,
+        operation: Operation,
+        kind: str = "replace",
+        cost: int = 1,
+        client_id: Optional[int] = None,
+    ) -> concurrent.futures.Future:
+        """
+        排入意圖 (執行緒安全)
+
+        同一槽位尚未送出的同類意圖會被取代 (replace 取代 replace、place 取代 place)。
+        不同類意圖不合併: 各自的回傳型別不同 (place 回傳 (tx_hash, order_id)，replace 回傳 bool)，
+        舊意圖的 future 不能拿到另一種結果；新意圖排在舊意圖之後 (依提交順序執行)。
+
+        Returns:
+            完成 future (result = operation 的回傳值)
+        """
+        intent = OrderIntent(kind=kind, slot=slot, operation=operation, cost=max(1, cost),
+                             client_id=client_id, created_at=self.clock.time())
+        with self._lock:
+            self.stats.submitted += 1
+            key = slot
+            previous = self._queue.get(slot)
+            if previous is not None and kind == previous.kind:
+                del self._queue[slot]
+                self.stats.coalesced += 1
+                intent.superseded = previous.superseded + 1
+                intent.cost = max(intent.cost, previous.cost)
+                _chain(intent.future, previous.future)
+                logger.debug(f"dYdX 意圖合併: {slot} (已取代 {intent.superseded} 次)")
+            elif previous is not None:
+                key = f"{slot}#{self.stats.submitted}"
+            self._queue[key] = intent
+        self._notify()
+        return intent.future
+
+    def cancel(self, client_id: int, operation: Operation) -> concurrent.futures.Future:
+        """排入撤單 (同一 client id 已排隊或在途時回傳同一個 future)"""
+        slot = f"cancel:{client_id}"
+        with self._lock:
+            existing = self._queue.get(slot) or self._in_flight.get(slot)
+            if existing is not None:
+                self.stats.deduplicated += 1
+                return existing.future
+        return self.submit(slot, operation, kind="cancel", client_id=client_id)
+
+    def cancel_batch(self, items: Sequence[Tuple[int, Operation]]) -> List[concurrent.futures.Future]:
+        """一次排入多筆撤單 (同一輪排空時一起送出)"""
+        return [self.cancel(client_id, operation) for client_id, operation in items]
+
+    async def run(self, slot: str, operation: Operation, kind: str = "replace", cost: int = 1,
+                  timeout: Optional[float] = None) -> Any:
+        """
+        從任何事件循環提交並等待結果
+
+        在管線自己的工作者內呼叫 (例如 replace 內部又要掃單) 時直接執行，避免自我等待死鎖。
+        """
+        if self.in_worker() or not self.running:
+            return await operation()
+        future = asyncio.wrap_future(self.submit(slot, operation, kind=kind, cost=cost))
+        return await (asyncio.wait_for(future, timeout) if timeout else future)
+
+    async def run_cancels(self, items: Sequence[Tuple[int, Operation]], timeout: Optional[float] = None) -> List[Any]:
+        """
+        批次撤單並等待結果 (例外以物件形式回傳)
+
+        在工作者內呼叫時 (例如 replace 遇到 order count limit 要掃單) 直接依序執行，仍計入預算。
+        """
+        if self.in_worker() or not self.running:
+            results: List[Any] = []
+            for client_id, operation in items:
+                try:
+                    if self.in_worker():
+                        self.stats.budget_wait_seconds += await self.budget.acquire()
+                    results.append(await operation())
+                except Exception as e:
+                    results.append(e)
+            return results
+        return await self.gather(self.cancel_batch(items), timeout)
+
+    async def gather(self, futures: Sequence[concurrent.futures.Future], timeout: Optional[float] = None) -> List[Any]:
+        """等待多個完成 future (例外以物件形式回傳)"""
+        wrapped = [asyncio.wrap_future(f) for f in futures]
+        return await asyncio.wait_for(asyncio.gather(*wrapped, return_exceptions=True), timeout)
+
+    # ==================== 查詢 ====================
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stopped
+
+    def in_worker(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def in_flight_client_ids(self) -> Set[int]:
+        with self._lock:
+            return {i.client_id for i in self._in_flight.values() if i.client_id is not None}
+
+    def pending_slots(self) -> List[str]:
+        with self._lock:
+            return [i.slot for i in list(self._in_flight.values()) + list(self._queue.values())]
+
+    def is_busy(self, slot: str) -> bool:
+        with self._lock:
+            return any(i.slot == slot for i in list(self._queue.values()) + list(self._in_flight.values()))
+
+    # ==================== 工作者 ====================
+
+    def _notify(self) -> None:
+        if self._loop is not None and self._wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _take_batch(self) -> Tuple[List[OrderIntent], List[OrderIntent]]:
+        with self._lock:
+            intents = list(self._queue.items())
+            self._queue.clear()
+            for key, intent in intents:
+                self._in_flight[key] = intent
+        intents = [intent for _, intent in intents]
+        cancels = [i for i in intents if i.kind == "cancel"]
+        others = [i for i in intents if i.kind != "cancel"]
+        return cancels, others
+
+    async def _execute(self, intent: OrderIntent) -> None:
+        if intent.future.done():
+            self._finish(intent)
+            return
+        try:
+            self.stats.budget_wait_seconds += await self.budget.acquire(intent.cost)
+            result = await intent.operation()
+        except Exception as e:
+            self.stats.failed += 1
+            logger.warning(f"dYdX 管線意圖失敗 ({intent.slot}): {e}")
+            if not intent.future.done():
+                intent.future.set_exception(e)
+        else:
+            self.stats.executed += 1
+            if not intent.future.done():
+                intent.future.set_result(result)
+        finally:
+            self._finish(intent)
+
+    def _finish(self, intent: OrderIntent) -> None:
+        with self._lock:
+            for key, value in list(self._in_flight.items()):
+                if value is intent:
+                    del self._in_flight[key]
+
+    async def _worker(self) -> None:
+        self._wakeup = asyncio.Event()
+        while not self._stopped:
+            if not self._queue:
+                await self._wakeup.wait()
+            self._wakeup.clear()
+            if self._stopped:
+                break
+            if self.coalesce_window > 0:
+                await asyncio.sleep(self.coalesce_window)
+            while self._queue and not self._stopped:
+                cancels, others = self._take_batch()
+                if cancels:
+                    # 撤單先送: 讓 replace 的新單不會撞到 order count limit
+                    self.stats.cancel_batches += 1
+                    self.stats.cancels += len(cancels)
+                    for intent in cancels:
+                        await self._execute(intent)
+                for intent in others:
+                    await self._execute(intent)
+        self._fail_pending(RuntimeError("dYdX 下單管線已停止"))
+
+    def _fail_pending(self, error: Exception) -> None:
+        with self._lock:
+            pending = list(self._queue.values())
+            self._queue.clear()
+        for intent in pending:
+            if not intent.future.done():
+                intent.future.set_exception(error)
+
+    # ------------------------ 背景執行緒 ------------------------ #
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopped = False
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run() -> None:
+            asyncio.set_event_loop(self._loop)
+            self._loop.call_soon(ready.set)
+            try:
+                self._loop.run_until_complete(self._worker())
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=_run, name="dydx-order-pipeline", daemon=True)
+        self._thread.start()
+        ready.wait(5.0)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self._stopped = True
+        self._notify()
+        self._thread.join(timeout)
+        self._thread = None
+        self._fail_pending(RuntimeError("dYdX 下單管線已停止"))
+
+
+def _chain(source: concurrent.futures.Future, target: concurrent.futures.Future) -> None:
+    """source 完成時把結果 / 例外複製到 target (被合併的舊意圖拿到新意圖的結果)"""
+
+    def _copy(done: concurrent.futures.Future) -> None:
+        if target.done():
+            return
+        if done.cancelled():
+            target.cancel()
+        elif done.exception() is not None:
+            target.set_exception(done.exception())
+        else:
+            target.set_result(done.result())
+
+    source.add_done_callback(_copy)
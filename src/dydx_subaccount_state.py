@@ -0,0 +1,738 @@
+"""
+dYdX 子帳戶狀態服務 (Subaccount State)
+======================================
+
+以 Indexer WebSocket 推送維護子帳戶狀態，取代交易循環中反覆的 REST 查詢:
+- v4_subaccounts: 持倉 (openPerpetualPositions)、掛單 (OPEN / UNTRIGGERED 條件單)、成交
+- v4_markets: oracle price 與市場參數
+- 讀取 = 記憶體快照，零網路請求；多個 bot 同時運行也不會再觸發 429
+
+原理:
+    Indexer 對每條連線的訊息都帶遞增的 message_id。服務在背景執行緒的事件循環上
+    消費推送並檢查序號，一旦出現跳號 (訊息遺失) 就把狀態標記為過期，
+    用 REST 重新拉一次完整快照 (經 SharedRateLimiter)，之後較舊區塊高度的推送會被忽略。
+    正常情況下 REST 只在偵測到缺口時使用；訂閱時的 subscribed 訊息本身就是完整快照。
+
+    讀取端 (交易循環，可能在另一個執行緒 / asyncio.run 中) 只拿鎖複製資料，
+    回傳格式與 DydxAPI.get_positions() / get_open_orders() 相同，可直接替換。
+
+用法:
+    state = DydxSubaccountState(address, network="mainnet", market="BTC-USD")
+    state.start()
+    if state.is_live:
+        positions = state.get_positions()
+        orders = state.get_open_orders(symbol="BTC-USD")
+        oracle = state.oracle_price
+
+    # 本地測試: 以腳本重放 Indexer 推送 (含跳號)
+    server = LocalIndexerServer(address, script=[position_update("BTC-USD", 0.01, 90000),
+                                                 {'op': 'drop'}, oracle_update("BTC-USD", 90100)])
+    state = DydxSubaccountState(address, connect=server.connect, rest_get=server.rest_get)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover - 依環境而定
+    websockets = None
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - 依環境而定
+    aiohttp = None
+
+from .core.clock import Clock, get_clock
+
+logger = logging.getLogger(__name__)
+
+INDEXER_URLS = {
+    "mainnet": ("wss://indexer.dydx.trade/v4/ws", "https://indexer.dydx.trade/v4"),
+    "testnet": ("wss://indexer.v4testnet.dydx.exchange/v4/ws", "https://indexer.v4testnet.dydx.exchange/v4"),
+}
+
+OPEN_ORDER_STATUSES = ("OPEN", "UNTRIGGERED", "BEST_EFFORT_OPENED")
+CONDITIONAL_ORDER_TYPES = ("STOP_LIMIT", "STOP_MARKET", "TAKE_PROFIT", "TAKE_PROFIT_MARKET")
+
+WS_RECONNECT_DELAY = 1.0
+WS_MAX_RECONNECT_DELAY = 30.0
+WS_PING_INTERVAL = 30.0
+MAX_FILLS = 200
+
+RestGet = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+
+def _height(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _as_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+@dataclass
+class SubaccountStateStats:
+    """服務統計"""
+
+    connects: int = 0
+    reconnects: int = 0
+    messages: int = 0
+    gaps: int = 0
+    resyncs: int = 0
+    rest_calls: int = 0
+    stale_skipped: int = 0
+    last_message_ts: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class DydxSubaccountState:
+    """
+    dYdX 子帳戶串流狀態
+
+    狀態 (全部只在事件循環執行緒寫入，讀取端經 _lock 複製):
+        positions:  market -> 持倉 dict (Indexer 格式，size 帶正負號)
+        orders:     order id -> 未完成掛單 dict (OPEN / UNTRIGGERED / BEST_EFFORT_OPENED)
+        fills:      最近成交 (最多 MAX_FILLS 筆)
+        markets:    ticker -> 市場 dict (含 oraclePrice)
+    """
+
+    def __init__(
+        self,
+        address: str,
+        subaccount_number: int = 0,
+        market: str = "BTC-USD",
+        network: str = "mainnet",
+        ws_url: Optional[str] = None,
+        rest_url: Optional[str] = None,
+        connect: Optional[Callable[[str], Any]] = None,
+        rest_get: Optional[RestGet] = None,
+        rate_limiter: Any = None,
+        clock: Optional[Clock] = None,
+    ):
+        """
+        Args:
+            address: dYdX 地址 (dydx1...)
+            subaccount_number: 子帳戶編號
+            market: 主要交易市場 (v4_markets 只追蹤此 ticker 的 oracle price 快取)
+            network: mainnet / testnet (未指定 ws_url / rest_url 時使用)
+            connect: 自訂 WebSocket 連線工廠 (測試用，預設 websockets.connect)
+            rest_get: 自訂 REST 讀取 `await rest_get(path, params)` (預設 aiohttp + SharedRateLimiter)
+            rate_limiter: 自訂限流器 (需提供 `await acquire()`)
+            clock: 時鐘 (記錄更新時間)
+        """
+        self.clock: Clock = clock or get_clock()
+        default_ws, default_rest = INDEXER_URLS.get(network, INDEXER_URLS["mainnet"])
+        self.address = address
+        self.subaccount_number = subaccount_number
+        self.market = market
+        self.ws_url = ws_url or default_ws
+        self.rest_url = (rest_url or default_rest).rstrip('/')
+        self._connect = connect or self._default_connect
+        self._rest_get = rest_get or self._default_rest_get
+        self._rate_limiter = rate_limiter
+        self.stats = SubaccountStateStats()
+
+        self._lock = threading.Condition()
+        self._positions: Dict[str, Dict[str, Any]] = {}
+        self._orders: Dict[str, Dict[str, Any]] = {}
+        self._fills: Deque[Dict[str, Any]] = deque(maxlen=MAX_FILLS)
+        self._markets: Dict[str, Dict[str, Any]] = {}
+        self._subaccount: Dict[str, Any] = {}
+        self._version = 0
+        self._updated_at = 0.0
+
+        # 序號 / 新舊判斷
+        self._last_message_id: Optional[int] = None
+        self._snapshot_height = 0
+        self._stale = True
+        self._subscribed: set = set()
+
+        # 背景執行
+        self.connected = False
+        self._stopped = False
+        self._ws: Any = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Any = None
+        self._resync_task: Optional[asyncio.Task] = None
+
+    # ==================== 讀取 (零網路) ====================
+
+    @property
+    def subaccount_id(self) -> str:
+        return f"{self.address}/{self.subaccount_number}"
+
+    @property
+    def is_live(self) -> bool:
+        """連線中、兩個頻道都已訂閱且沒有待補的缺口"""
+        return self.connected and not self._stale and len(self._subscribed) >= 2
+
+    @property
+    def version(self) -> int:
+        """每次狀態變更 +1 (可搭配 wait_for_update)"""
+        return self._version
+
+    @property
+    def age(self) -> float:
+        """距離上次狀態變更的秒數"""
+        return self.clock.time() - self._updated_at if self._updated_at else float('inf')
+
+    def get_positions(self) -> List[Dict[str, Any]]:
+        """未平倉持倉 (DydxAPI.get_positions 格式)"""
+        with self._lock:
+            return [dict(p) for p in self._positions.values()]
+
+    def get_position(self, market: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            pos = self._positions.get(market or self.market)
+            return dict(pos) if pos else None
+
+    def get_open_orders(self, status: Any = OPEN_ORDER_STATUSES, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        未完成掛單 (DydxAPI.get_open_orders 格式)
+
+        Args:
+            status: 單一狀態或狀態列表
+            symbol: 只回傳此市場
+        """
+        statuses = {status} if isinstance(status, str) else set(status)
+        if "OPEN" in statuses:
+            statuses.add("BEST_EFFORT_OPENED")
+        with self._lock:
+            return [
+                dict(o) for o in self._orders.values()
+                if o.get("status") in statuses and (not symbol or o.get("ticker") == symbol)
+            ]
+
+    def get_conditional_orders(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        """條件單 (止損 / 止盈觸發單)"""
+        return [
+            o for o in self.get_open_orders(symbol=symbol)
+            if o.get("status") == "UNTRIGGERED" or o.get("type") in CONDITIONAL_ORDER_TYPES
+        ]
+
+    def get_fills(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(f) for f in list(self._fills)[-limit:]]
+
+    def get_market(self, market: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._markets.get(market or self.market, {}))
+
+    @property
+    def oracle_price(self) -> float:
+        with self._lock:
+            return _as_float(self._markets.get(self.market, {}).get("oraclePrice"))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """完整狀態快照 (供日誌 / 儀表板)"""
+        with self._lock:
+            return {
+                "live": self.is_live,
+                "version": self._version,
+                "updated_at": self._updated_at,
+                "equity": self._subaccount.get("equity"),
+                "free_collateral": self._subaccount.get("freeCollateral"),
+                "positions": [dict(p) for p in self._positions.values()],
+                "orders": [dict(o) for o in self._orders.values()],
+                "oracle_price": _as_float(self._markets.get(self.market, {}).get("oraclePrice")),
+                "stats": self.stats.to_dict(),
+            }
+
+    def wait_for_update(self, after_version: int, timeout: float) -> bool:
+        """阻塞等待狀態版本超過 after_version (例如撤單後等 Indexer 推送)"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._version <= after_version:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+            return True
+
+    # ==================== 訊息處理 ====================
+
+    def handle_message(self, raw: Any) -> None:
+        """處理一則 Indexer WebSocket 訊息"""
+        msg = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+        msg_type = msg.get("type")
+        self.stats.messages += 1
+        self.stats.last_message_ts = self.clock.time()
+
+        message_id = msg.get("message_id")
+        if message_id is not None:
+            message_id = int(message_id)
+            last = self._last_message_id
+            self._last_message_id = message_id
+            if last is not None and message_id > last + 1:
+                self.stats.gaps += 1
+                logger.warning(f"dYdX Indexer 訊息跳號 {last} -> {message_id}，排程 REST 重新同步")
+                self._schedule_resync()
+
+        if msg_type == "connected":
+            return
+        if msg_type == "error":
+            logger.warning(f"dYdX Indexer 錯誤: {msg.get('message')}")
+            return
+
+        channel = msg.get("channel")
+        if msg_type == "subscribed":
+            if channel == "v4_subaccounts":
+                self._apply_subaccount_snapshot(msg.get("contents") or {})
+            elif channel == "v4_markets":
+                self._apply_markets(msg.get("contents") or {})
+            self._subscribed.add(channel)
+            return
+
+        if msg_type == "channel_data":
+            batch = [msg.get("contents") or {}]
+        elif msg_type == "channel_batch_data":
+            batch = list(msg.get("contents") or [])
+        else:
+            return
+
+        for contents in batch:
+            if channel == "v4_subaccounts":
+                self._apply_subaccount_update(contents)
+            elif channel == "v4_markets":
+                self._apply_markets(contents)
+
+    def _apply_subaccount_snapshot(self, contents: Dict[str, Any]) -> None:
+        subaccount = dict(contents.get("subaccount") or {})
+        positions = subaccount.pop("openPerpetualPositions", None) or {}
+        subaccount.pop("assetPositions", None)
+        orders = contents.get("orders") or []
+        with self._lock:
+            self._subaccount = subaccount
+            self._positions = {}
+            for market, pos in (positions.items() if isinstance(positions, dict) else ((p.get("market"), p) for p in positions)):
+                self._merge_position(dict(pos, market=pos.get("market") or market))
+            self._orders = {}
+            for order in orders:
+                self._merge_order(order)
+            self._snapshot_height = _height(contents.get("blockHeight"))
+            self._stale = False
+            self._touch()
+
+    def _apply_subaccount_update(self, contents: Dict[str, Any]) -> None:
+        height = _height(contents.get("blockHeight"))
+        if height and height <= self._snapshot_height:
+            # REST 快照已包含此區塊，重放只會讓狀態倒退
+            self.stats.stale_skipped += 1
+            return
+        with self._lock:
+            for pos in contents.get("perpetualPositions") or []:
+                self._merge_position(pos)
+            for order in contents.get("orders") or []:
+                self._merge_order(order)
+            for fill in contents.get("fills") or []:
+                self._fills.append(fill)
+            self._touch()
+
+    def _apply_markets(self, contents: Dict[str, Any]) -> None:
+        with self._lock:
+            for key in ("markets", "trading"):
+                for ticker, fields in (contents.get(key) or {}).items():
+                    self._markets.setdefault(ticker, {}).update(fields)
+            for ticker, fields in (contents.get("oraclePrices") or {}).items():
+                market = self._markets.setdefault(ticker, {})
+                if "oraclePrice" in fields:
+                    market["oraclePrice"] = fields["oraclePrice"]
+            self._touch()
+
+    def _merge_position(self, update: Dict[str, Any]) -> None:
+        market = update.get("market")
+        if not market:
+            return
+        merged = dict(self._positions.get(market, {}), **update)
+        if merged.get("status", "OPEN") != "OPEN" or abs(_as_float(merged.get("size"))) <= 0:
+            self._positions.pop(market, None)
+        else:
+            self._positions[market] = merged
+
+    def _merge_order(self, update: Dict[str, Any]) -> None:
+        order_id = update.get("id")
+        if not order_id:
+            return
+        current = self._orders.get(order_id)
+        update_height = _height(update.get("updatedAtHeight"))
+        if current and update_height and update_height < _height(current.get("updatedAtHeight")):
+            return
+        merged = dict(current or {}, **update)
+        if merged.get("status") in OPEN_ORDER_STATUSES:
+            self._orders[order_id] = merged
+        else:
+            self._orders.pop(order_id, None)
+
+    def _touch(self) -> None:
+        self._version += 1
+        self._updated_at = self.clock.time()
+        self._lock.notify_all()
+
+    # ==================== REST 重新同步 (僅缺口時) ====================
+
+    def _schedule_resync(self) -> None:
+        self._stale = True
+        if self._resync_task is None or self._resync_task.done():
+            self._resync_task = asyncio.ensure_future(self.resync())
+
+    async def resync(self) -> None:
+        """以 REST 拉取完整子帳戶 / 掛單 / 市場快照，取代記憶體狀態"""
+        self.stats.resyncs += 1
+        base = {"address": self.address, "subaccountNumber": self.subaccount_number}
+        try:
+            account = await self._get(f"/addresses/{self.address}/subaccountNumber/{self.subaccount_number}", {})
+            orders: List[Dict[str, Any]] = []
+            for status in ("OPEN", "UNTRIGGERED"):
+                response = await self._get("/orders", dict(base, status=status))
+                orders.extend(response if isinstance(response, list) else (response or {}).get("orders", []))
+            markets = await self._get("/perpetualMarkets", {"ticker": self.market})
+        except Exception as e:
+            logger.warning(f"dYdX 子帳戶 REST 重新同步失敗: {e}")
+            return
+
+        subaccount = (account or {}).get("subaccount") or {}
+        self._apply_subaccount_snapshot({
+            "subaccount": subaccount,
+            "orders": orders,
+            "blockHeight": subaccount.get("updatedAtHeight") or (account or {}).get("height"),
+        })
+        self._apply_markets({"markets": (markets or {}).get("markets") or {}})
+        logger.info(f"dYdX 子帳戶狀態已重新同步 ({len(self._positions)} 持倉 / {len(self._orders)} 掛單)")
+
+    async def _get(self, path: str, params: Dict[str, Any]) -> Any:
+        self.stats.rest_calls += 1
+        return await self._rest_get(path, params)
+
+    async def _default_rest_get(self, path: str, params: Dict[str, Any]) -> Any:
+        if aiohttp is None:
+            raise RuntimeError("aiohttp 未安裝，無法執行 REST 重新同步")
+        if self._rate_limiter is None:
+            from .shared_rate_limiter import SharedRateLimiter
+            self._rate_limiter = SharedRateLimiter()
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        await self._rate_limiter.acquire()
+        async with self._session.get(f"{self.rest_url}{path}", params=params) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    # ==================== WebSocket ====================
+
+    def _default_connect(self, url: str) -> Any:
+        if websockets is None:
+            raise RuntimeError("websockets 未安裝，無法訂閱 dYdX Indexer")
+        return websockets.connect(url, ping_interval=WS_PING_INTERVAL)
+
+    async def _subscribe(self, ws: Any) -> None:
+        await ws.send(json.dumps({"type": "subscribe", "channel": "v4_subaccounts", "id": self.subaccount_id}))
+        await ws.send(json.dumps({"type": "subscribe", "channel": "v4_markets", "batched": True}))
+
+    async def run(self) -> None:
+        """連線 → 訂閱 (snapshot) → 消費推送；斷線後退避重連"""
+        delay = WS_RECONNECT_DELAY
+        try:
+            while not self._stopped:
+                try:
+                    async with self._connect(self.ws_url) as ws:
+                        self._ws = ws
+                        self._last_message_id = None
+                        self._subscribed = set()
+                        self._snapshot_height = 0
+                        if self.stats.connects:
+                            self.stats.reconnects += 1
+                        self.stats.connects += 1
+                        self.connected = True
+                        await self._subscribe(ws)
+                        delay = WS_RECONNECT_DELAY
+                        async for raw in ws:
+                            try:
+                                self.handle_message(raw)
+                            except Exception as e:
+                                logger.warning(f"dYdX 子帳戶訊息處理失敗: {e}")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"dYdX 子帳戶 WebSocket 斷線: {e}")
+                finally:
+                    self.connected = False
+                    self._stale = True
+                    self._ws = None
+                if self._stopped:
+                    break
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, WS_MAX_RECONNECT_DELAY)
+        finally:
+            self.connected = False
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+
+    async def stop(self) -> None:
+        self._stopped = True
+        if self._ws is not None:
+            await self._ws.close()
+
+    # ------------------------ 背景執行緒 ------------------------ #
+    def start(self, wait_ready: float = 0.0) -> bool:
+        """
+        在獨立執行緒的事件循環上啟動 (交易循環常用 asyncio.run，不能共用它的 loop)
+
+        Args:
+            wait_ready: 等待首次快照的秒數 (0 = 不等待)
+
+        Returns:
+            是否已 live
+        """
+        if self._thread is None:
+            self._stopped = False
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_thread, name="dydx-subaccount-state", daemon=True)
+            self._thread.start()
+        deadline = time.monotonic() + wait_ready
+        while wait_ready > 0 and not self.is_live and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self.is_live
+
+    def _run_thread(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self.run())
+        except Exception as e:
+            logger.warning(f"dYdX 子帳戶狀態服務結束: {e}")
+
+    def stop_background(self, timeout: float = 5.0) -> None:
+        if self._loop is None or self._thread is None:
+            return
+        if self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.stop(), self._loop)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+# ==================== 本地 Indexer 替身 ====================
+
+def position_update(market: str, size: float, entry_price: float, status: str = "OPEN",
+                    height: Optional[int] = None) -> Dict[str, Any]:
+    """v4_subaccounts 持倉推送 (size 帶正負號)"""
+    contents: Dict[str, Any] = {"perpetualPositions": [{
+        "market": market, "status": status, "side": "LONG" if size >= 0 else "SHORT",
+        "size": str(size), "entryPrice": str(entry_price),
+    }]}
+    if height is not None:
+        contents["blockHeight"] = str(height)
+    return {"channel": "v4_subaccounts", "contents": contents}
+
+
+def order_update(order_id: str, status: str, market: str = "BTC-USD", side: str = "SELL",
+                 size: float = 0.0, price: float = 0.0, order_type: str = "LIMIT",
+                 trigger_price: Optional[float] = None, height: int = 0, **fields: Any) -> Dict[str, Any]:
+    """v4_subaccounts 掛單推送"""
+    order: Dict[str, Any] = {
+        "id": order_id, "ticker": market, "status": status, "side": side, "size": str(size),
+        "price": str(price), "type": order_type, "updatedAtHeight": str(height), **fields,
+    }
+    if trigger_price is not None:
+        order["triggerPrice"] = str(trigger_price)
+    return {"channel": "v4_subaccounts", "contents": {"orders": [order]}}
+
+
+def fill_update(market: str, side: str, size: float, price: float, order_id: str = "") -> Dict[str, Any]:
+    return {"channel": "v4_subaccounts", "contents": {"fills": [{
+        "market": market, "side": side, "size": str(size), "price": str(price), "orderId": order_id,
+    }]}}
+
+
+def oracle_update(market: str, price: float) -> Dict[str, Any]:
+    return {"channel": "v4_markets", "contents": {"oraclePrices": {market: {"oraclePrice": str(price)}}}}
+
+
+class _LocalIndexerConnection:
+    """LocalIndexerServer 的單一連線 (支援 async with / async for / send / close)"""
+
+    def __init__(self, server: 'LocalIndexerServer') -> None:
+        self.server = server
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+        self.message_id = 0
+
+    async def __aenter__(self) -> '_LocalIndexerConnection':
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    def __aiter__(self) -> '_LocalIndexerConnection':
+        return self
+
+    async def __anext__(self) -> str:
+        item = await self.queue.get()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+    async def send(self, raw: str) -> None:
+        self.server._on_subscribe(self, json.loads(raw))
+
+    def deliver(self, msg: Dict[str, Any], drop: bool = False) -> None:
+        self.message_id += 1
+        if not drop and not self.closed:
+            self.queue.put_nowait(json.dumps(dict(msg, message_id=self.message_id)))
+
+    async def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.queue.put_nowait(None)
+
+
+class LocalIndexerServer:
+    """
+    本地 dYdX Indexer 替身
+
+    依腳本重放 v4_subaccounts / v4_markets 推送，同時扮演 REST 端 (子帳戶 / 掛單 / 市場)，
+    伺服器狀態隨腳本事件更新，可驗證跳號後的 REST 重新同步能補回遺失的事件。
+
+    腳本步驟:
+        {'op': 'sleep', 'seconds': 0.5}   等待
+        {'op': 'drop'}                    下一筆事件只更新伺服器狀態、不送出 (message_id 仍遞增 → 跳號)
+        {'op': 'disconnect'}              關閉目前連線
+        {'op': 'wait_connect'}            等待客戶端 (重新) 連上並完成訂閱
+        {'channel': ..., 'contents': ...} 推送事件 (position_update / order_update / oracle_update ...)
+    """
+
+    def __init__(self, address: str, subaccount_number: int = 0, script: Optional[List[Dict[str, Any]]] = None,
+                 oracle_prices: Optional[Dict[str, float]] = None):
+        self.address = address
+        self.subaccount_number = subaccount_number
+        self.script = list(script or [])
+        self.positions: Dict[str, Dict[str, Any]] = {}
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.markets: Dict[str, Dict[str, Any]] = {
+            ticker: {"ticker": ticker, "oraclePrice": str(price)} for ticker, price in (oracle_prices or {}).items()
+        }
+        self.height = 1
+        self.requests: List[Tuple[str, Dict[str, Any]]] = []
+        self.sent: List[Dict[str, Any]] = []
+        self.dropped: List[Dict[str, Any]] = []
+        self._connection: Optional[_LocalIndexerConnection] = None
+        self._subscribed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------ WebSocket ------------------------ #
+    def connect(self, url: str) -> _LocalIndexerConnection:
+        self._connection = _LocalIndexerConnection(self)
+        if self._subscribed is None:
+            self._subscribed = asyncio.Event()
+        self._subscribed.clear()
+        self._connection.deliver({"type": "connected", "connection_id": "local"})
+        if self._task is None and self.script:
+            self._task = asyncio.ensure_future(self._play())
+        return self._connection
+
+    def _on_subscribe(self, connection: _LocalIndexerConnection, msg: Dict[str, Any]) -> None:
+        channel = msg.get("channel")
+        if channel == "v4_subaccounts":
+            contents = {
+                "subaccount": {"address": self.address, "subaccountNumber": self.subaccount_number,
+                               "openPerpetualPositions": {k: dict(v) for k, v in self.positions.items()}},
+                "orders": [dict(o) for o in self.orders.values()],
+                "blockHeight": str(self.height),
+            }
+            connection.deliver({"type": "subscribed", "channel": channel, "id": msg.get("id"), "contents": contents})
+        elif channel == "v4_markets":
+            contents = {"markets": {k: dict(v) for k, v in self.markets.items()}}
+            connection.deliver({"type": "subscribed", "channel": channel, "contents": contents})
+            self._subscribed.set()
+
+    async def push(self, event: Dict[str, Any], drop: bool = False) -> None:
+        """送出一筆事件 (drop=True 或無連線時只更新伺服器狀態)"""
+        self.height += 1
+        contents = dict(event["contents"])
+        if event["channel"] == "v4_subaccounts":
+            contents.setdefault("blockHeight", str(self.height))
+        self._apply(event["channel"], contents)
+        msg = {"type": "channel_data", "channel": event["channel"], "contents": contents}
+        connection = self._connection
+        if connection is not None and not connection.closed:
+            connection.deliver(msg, drop=drop)
+            (self.dropped if drop else self.sent).append(msg)
+        else:
+            self.dropped.append(msg)
+        await asyncio.sleep(0)
+
+    async def disconnect(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+
+    async def _play(self) -> None:
+        drop = False
+        for step in self.script:
+            op = step.get("op")
+            if op == "sleep":
+                await asyncio.sleep(step.get("seconds", 0))
+            elif op == "drop":
+                drop = True
+            elif op == "disconnect":
+                await self.disconnect()
+            elif op == "wait_connect":
+                await self._subscribed.wait()
+            else:
+                await self.push(step, drop=drop)
+                drop = False
+
+    async def finished(self) -> None:
+        """等待腳本播放完畢"""
+        if self._task is not None:
+            await self._task
+
+    # ------------------------ 伺服器狀態 ------------------------ #
+    def _apply(self, channel: str, contents: Dict[str, Any]) -> None:
+        if channel == "v4_markets":
+            for ticker, fields in (contents.get("oraclePrices") or {}).items():
+                self.markets.setdefault(ticker, {"ticker": ticker})["oraclePrice"] = fields["oraclePrice"]
+            return
+        for pos in contents.get("perpetualPositions") or []:
+            merged = dict(self.positions.get(pos["market"], {}), **pos)
+            if merged.get("status") != "OPEN" or abs(_as_float(merged.get("size"))) <= 0:
+                self.positions.pop(pos["market"], None)
+            else:
+                self.positions[pos["market"]] = merged
+        for order in contents.get("orders") or []:
+            merged = dict(self.orders.get(order["id"], {}), **order)
+            if merged.get("status") in OPEN_ORDER_STATUSES:
+                self.orders[order["id"]] = merged
+            else:
+                self.orders.pop(order["id"], None)
+
+    # ------------------------ REST ------------------------ #
+    async def rest_get(self, path: str, params: Dict[str, Any]) -> Any:
+        self.requests.append((path, dict(params)))
+        if path.startswith("/addresses/"):
+            return {"subaccount": {
+                "address": self.address, "subaccountNumber": self.subaccount_number,
+                "openPerpetualPositions": {k: dict(v) for k, v in self.positions.items()},
+                "updatedAtHeight": str(self.height),
+            }}
+        if path == "/orders":
+            return [dict(o) for o in self.orders.values() if o.get("status") == params.get("status")]
+        if path == "/perpetualMarkets":
+            ticker = params.get("ticker")
+            return {"markets": {k: dict(v) for k, v in self.markets.items() if not ticker or k == ticker}}
+        raise ValueError(f"unknown path {path}")
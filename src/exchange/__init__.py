@@ -4,5 +4,54 @@ Exchange module
 """
 
 from .binance_client import BinanceClient
+from .book_impact import BookImpact, DepthLadder
+from .cross_venue_spread import CrossVenueSpreadEngine, QuoteRing
+from .binance_rest_client import (
+    BinanceAPIError,
+    BinanceRestClient,
+    BinanceRestError,
+    BinanceTimeoutError,
+    BlockingBinanceRestClient,
+    RestResponse,
+    get_rest_client,
+)
+from .stream_mux import (
+    AggTrade,
+    BinanceStreamMux,
+    BookTicker,
+    DepthUpdate,
+    ForceOrder,
+    SequenceTracker,
+    StreamGap,
+    decode_message,
+    get_stream_mux,
+)
+from .user_data_stream import LocalUserDataServer, OrderState, PositionState, UserDataStream
 
-__all__ = ['BinanceClient']
+__all__ = [
+    'BinanceClient',
+    'BookImpact',
+    'DepthLadder',
+    'CrossVenueSpreadEngine',
+    'QuoteRing',
+    'BinanceRestClient',
+    'BlockingBinanceRestClient',
+    'RestResponse',
+    'BinanceRestError',
+    'BinanceAPIError',
+    'BinanceTimeoutError',
+    'get_rest_client',
+    'BinanceStreamMux',
+    'AggTrade',
+    'DepthUpdate',
+    'BookTicker',
+    'ForceOrder',
+    'SequenceTracker',
+    'StreamGap',
+    'decode_message',
+    'get_stream_mux',
+    'UserDataStream',
+    'OrderState',
+    'PositionState',
+    'LocalUserDataServer',
+]
@@ -1,19 +1,23 @@
 """
 Binance Exchange Client Module
 提供 Binance API 的高級封裝，包含錯誤處理、重試機制、速率限制
+
+底層走 binance_rest_client 的共用連線池 (keep-alive、伺服器時間偏移、
+X-MBX-USED-WEIGHT 權重限流)，與 Futures 執行器共用同一套 REST 管線。
 """
 
 import time
-import hmac
-import hashlib
 from typing import Dict, List, Optional, Any
-from datetime import datetime
 import logging
 
-from binance.client import Client
-from binance.exceptions import BinanceAPIException, BinanceRequestException
-import requests
-
+from .binance_rest_client import (
+    SPOT_MAINNET_URL,
+    SPOT_TESTNET_URL,
+    SPOT_WEIGHTS,
+    BinanceAPIError,
+    BinanceRestError,
+    get_rest_client,
+)
 from ..core.config import get_config
 
 logger = logging.getLogger(__name__)
@@ -25,7 +29,7 @@ class BinanceClient:
     
     功能：
     - 自動重試機制（指數退避）
-    - 速率限制管理
+    - 速率限制管理（依回應標頭的已用權重）
     - 錯誤處理與日誌記錄
     - REST API 和 WebSocket 支援
     """
@@ -50,85 +54,71 @@ class BinanceClient:
         """
         config = get_config()
         
-        self.api_key = api_key or config.binance.api_key
-        self.api_secret = api_secret or config.binance.api_secret
+        self.api_key = api_key if api_key is not None else config.binance.api_key
+        self.api_secret = api_secret if api_secret is not None else config.binance.api_secret
         self.testnet = testnet if testnet is not None else config.binance.testnet
         
-        # 初始化 python-binance 客戶端
-        self.client = Client(
-            api_key=self.api_key,
-            api_secret=self.api_secret,
-            testnet=self.testnet
-        )
-        
-        # 設置 Testnet URL
         if self.testnet:
-            self.client.API_URL = 'https://testnet.binance.vision/api'
+            self.base_url = SPOT_TESTNET_URL
             logger.info("使用 Binance Testnet")
         else:
+            self.base_url = SPOT_MAINNET_URL
             logger.warning("使用 Binance 正式環境！")
         
-        # 速率限制追蹤
-        self._request_count = 0
-        self._request_window_start = time.time()
-        self._last_request_time = 0
+        # 共用連線池 + 權重限流 (同一個 base_url / api_key 的所有實例共用)
+        self.rest = get_rest_client(
+            self.base_url,
+            self.api_key or '',
+            self.api_secret or '',
+            max_weight_per_minute=self.MAX_REQUESTS_PER_MINUTE,
+            time_path='/api/v3/time',
+            weights=SPOT_WEIGHTS,
+        )
         
         logger.info(f"BinanceClient 初始化成功 (Testnet: {self.testnet})")
     
-    def _check_rate_limit(self):
-        """檢查並執行速率限制"""
-        current_time = time.time()
-        
-        # 重置計數器（每分鐘）
-        if current_time - self._request_window_start > 60:
-            self._request_count = 0
-            self._request_window_start = current_time
-        
-        # 檢查是否超過限制
-        if self._request_count >= self.MAX_REQUESTS_PER_MINUTE:
-            sleep_time = 60 - (current_time - self._request_window_start)
-            if sleep_time > 0:
-                logger.warning(f"達到速率限制，等待 {sleep_time:.2f} 秒")
-                time.sleep(sleep_time)
-                self._request_count = 0
-                self._request_window_start = time.time()
-        
-        self._request_count += 1
-        self._last_request_time = current_time
-    
-    def _retry_request(self, func, *args, **kwargs) -> Any:
+    def _retry_request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        signed: bool = False,
+        weight: Optional[int] = None
+    ) -> Any:
         """
         執行 API 請求，帶重試機制
         
         Args:
-            func: 要執行的函數
-            *args: 函數參數
-            **kwargs: 函數關鍵字參數
+            method: HTTP 方法（GET, POST, DELETE）
+            path: 端點路徑（例如 /api/v3/klines）
+            params: 查詢參數（值為 None 的參數不送出）
+            signed: 是否需要簽名
+            weight: 請求權重（None 則查權重表）
             
         Returns:
-            API 響應結果
+            API 響應結果（已解析的 JSON）
             
         Raises:
-            BinanceAPIException: API 錯誤（重試後仍失敗）
-            BinanceRequestException: 網路錯誤（重試後仍失敗）
+            BinanceAPIError: API 錯誤（重試後仍失敗）
+            BinanceRestError: 網路錯誤（重試後仍失敗）
         """
+        if params:
+            params = {k: v for k, v in params.items() if v is not None}
         last_exception = None
         
         for attempt in range(self.MAX_RETRIES):
             try:
-                # 檢查速率限制
-                self._check_rate_limit()
-                
-                # 執行請求
-                result = func(*args, **kwargs)
+                # 執行請求（速率限制由共用限流器處理）
+                result = self.rest.request(method, path, params, signed=signed, weight=weight)
+                result.raise_for_status()
                 
                 # 成功則返回
                 if attempt > 0:
                     logger.info(f"重試成功（嘗試 {attempt + 1}/{self.MAX_RETRIES}）")
                 
-                return result
+                return result.json()
                 
-            except BinanceAPIException as e:
+            except BinanceAPIError as e:
                 last_exception = e
                 
                 # 某些錯誤不應重試
@@ -136,10 +126,9 @@ class BinanceClient:
                     logger.error(f"API 驗證失敗: {e.message}")
                     raise
                 
-                # 速率限制錯誤
+                # 速率限制錯誤（限流器已依 Retry-After 暫停）
                 if e.code == -1003:
                     logger.warning("觸發 Binance 速率限制，等待後重試")
-                    time.sleep(60)
                     continue
                 
                 # 其他錯誤：指數退避
@@ -151,7 +140,7 @@ class BinanceClient:
                     logger.error(f"API 請求失敗，已重試 {self.MAX_RETRIES} 次: {e.message}")
                     raise
                     
-            except BinanceRequestException as e:
+            except BinanceRestError as e:
                 last_exception = e
                 
                 if attempt < self.MAX_RETRIES - 1:
@@ -181,7 +170,7 @@ class BinanceClient:
         Returns:
             伺服器時間戳（毫秒）
         """
-        result = self._retry_request(self.client.get_server_time)
+        result = self._retry_request('GET', '/api/v3/time')
         return result['serverTime']
     
     def get_symbol_ticker(self, symbol: str = "BTCUSDT") -> Dict[str, Any]:
@@ -194,7 +183,7 @@ class BinanceClient:
         Returns:
             包含 symbol 和 price 的字典
         """
-        return self._retry_request(self.client.get_symbol_ticker, symbol=symbol)
+        return self._retry_request('GET', '/api/v3/ticker/price', {'symbol': symbol})
     
     def get_klines(
         self,
@@ -221,14 +210,13 @@ class BinanceClient:
                 收盤時間, 成交額, 成交筆數, 主動買入成交量, 主動買入成交額, 忽略
             ]
         """
-        return self._retry_request(
-            self.client.get_klines,
-            symbol=symbol,
-            interval=interval,
-            limit=limit,
-            startTime=start_time,
-            endTime=end_time
-        )
+        return self._retry_request('GET', '/api/v3/klines', {
+            'symbol': symbol,
+            'interval': interval,
+            'limit': limit,
+            'startTime': start_time,
+            'endTime': end_time
+        })
     
     def get_order_book(self, symbol: str = "BTCUSDT", limit: int = 100) -> Dict[str, Any]:
         """
@@ -242,7 +230,9 @@ class BinanceClient:
             包含 bids（買單）和 asks（賣單）的字典
             每個訂單為 [價格, 數量] 格式
         """
-        return self._retry_request(self.client.get_order_book, symbol=symbol, limit=limit)
+        return self._retry_request(
+            'GET', '/api/v3/depth', {'symbol': symbol, 'limit': limit}, weight=self._depth_weight(limit)
+        )
     
     def get_recent_trades(self, symbol: str = "BTCUSDT", limit: int = 500) -> List[Dict]:
         """
@@ -255,7 +245,7 @@ class BinanceClient:
         Returns:
             成交記錄列表
         """
-        return self._retry_request(self.client.get_recent_trades, symbol=symbol, limit=limit)
+        return self._retry_request('GET', '/api/v3/trades', {'symbol': symbol, 'limit': limit})
     
     def get_24h_ticker(self, symbol: str = "BTCUSDT") -> Dict[str, Any]:
         """
@@ -267,7 +257,7 @@ class BinanceClient:
         Returns:
             包含 24h 統計資料的字典
         """
-        return self._retry_request(self.client.get_ticker, symbol=symbol)
+        return self._retry_request('GET', '/api/v3/ticker/24hr', {'symbol': symbol})
     
     # ==========================================
     # 帳戶資料 API
@@ -280,7 +270,7 @@ class BinanceClient:
         Returns:
             帳戶資訊字典，包含餘額、權限等
         """
-        return self._retry_request(self.client.get_account)
+        return self._retry_request('GET', '/api/v3/account', signed=True)
     
     def get_balance(self, asset: str = "USDT") -> Dict[str, str]:
         """
@@ -337,7 +327,7 @@ class BinanceClient:
         
         params.update(kwargs)
         
-        return self._retry_request(self.client.create_test_order, **params)
+        return self._retry_request('POST', '/api/v3/order/test', params, signed=True)
     
     def get_exchange_info(self, symbol: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -350,9 +340,11 @@ class BinanceClient:
             交易所資訊字典
         """
         if symbol:
-            return self._retry_request(self.client.get_symbol_info, symbol)
+            info = self._retry_request('GET', '/api/v3/exchangeInfo', {'symbol': symbol})
+            symbols = info.get('symbols', [])
+            return symbols[0] if symbols else None
         else:
-            return self._retry_request(self.client.get_exchange_info)
+            return self._retry_request('GET', '/api/v3/exchangeInfo')
     
     # ==========================================
     # 輔助方法
@@ -366,7 +358,7 @@ class BinanceClient:
             連線是否正常
         """
         try:
-            self._retry_request(self.client.ping)
+            self._retry_request('GET', '/api/v3/ping')
             return True
         except Exception as e:
             logger.error(f"Ping 失敗: {e}")
@@ -379,7 +371,18 @@ class BinanceClient:
         Returns:
             系統狀態字典（status: 0=正常, 1=維護）
         """
-        return self._retry_request(self.client.get_system_status)
+        return self._retry_request('GET', '/sapi/v1/system/status')
+    
+    @staticmethod
+    def _depth_weight(limit: int) -> int:
+        """訂單簿請求權重（依檔位數）"""
+        if limit <= 100:
+            return 5
+        if limit <= 500:
+            return 25
+        if limit <= 1000:
+            return 50
+        return 250
     
     def __repr__(self) -> str:
         return f"BinanceClient(testnet={self.testnet}, api_key={self.api_key[:8]}...)"
@@ -0,0 +1,639 @@
+"""
+Binance REST 客戶端 (共用連線池)
+
+所有 Binance REST 呼叫 (Futures Testnet 執行器、Whale Testnet API、Spot BinanceClient)
+都經過這裡，取代各自手寫的 requests.get/post + HMAC 簽名。
+
+原理:
+    Testnet 下單延遲主要花在每次請求重新建立 TCP + TLS 握手，而不是交易所撮合。
+    - 連線池: 單一 aiohttp ClientSession (HTTP/1.1 keep-alive)，握手只付一次
+    - 預先計算簽名: HMAC key 只初始化一次，每次請求 copy() 後只做 update()
+    - 伺服器時間偏移: 定期對時，簽名請求的 timestamp = 本地時間 + offset，
+      -1021 (timestamp 超出 recvWindow) 時自動重新對時並重送一次
+    - 權重限流: 以 X-MBX-USED-WEIGHT-1M 回應標頭校正本地計數，429/418 依 Retry-After 暫停
+    - 請求合併: 相同的 GET (ticker / positionRisk / depth) 同時在途時只送一次，
+      所有呼叫者共用同一個回應
+
+用法:
+    # async
+    async with BinanceRestClient(FUTURES_TESTNET_URL, api_key, api_secret) as client:
+        resp = await client.request('GET', '/fapi/v2/positionRisk', signed=True)
+
+    # 同步呼叫點 (背景事件循環執行，多個物件共用同一個連線池)
+    rest = get_rest_client(FUTURES_TESTNET_URL, api_key, api_secret)
+    resp = rest.request('POST', '/fapi/v1/order', params, signed=True)
+    if resp.status_code == 200:
+        order = resp.json()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import concurrent.futures
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlencode
+
+try:
+    import aiohttp
+    from yarl import URL
+except ImportError:  # pragma: no cover - 依部署環境而定
+    aiohttp = None
+    URL = None
+
+logger = logging.getLogger(__name__)
+
+# 限速視窗與簽名 timestamp 必須是系統時間: 重放時 use_clock() 不替換本模組的 time
+__wall_clock__ = True
+
+
+FUTURES_TESTNET_URL = 'https://testnet.binancefuture.com'
+FUTURES_MAINNET_URL = 'https://fapi.binance.com'
+SPOT_TESTNET_URL = 'https://testnet.binance.vision'
+SPOT_MAINNET_URL = 'https://api.binance.com'
+
+# 請求權重 (未列出的端點 = 1)
+FUTURES_WEIGHTS: Dict[str, int] = {
+    '/fapi/v2/account': 5,
+    '/fapi/v2/balance': 5,
+    '/fapi/v2/positionRisk': 5,
+    '/fapi/v1/openOrders': 1,
+    '/fapi/v1/allOpenOrders': 1,
+    '/fapi/v1/depth': 2,
+    '/fapi/v1/ticker/24hr': 1,
+    '/fapi/v1/trades': 5,
+    '/fapi/v1/listenKey': 1,
+}
+
+SPOT_WEIGHTS: Dict[str, int] = {
+    '/api/v3/account': 20,
+    '/api/v3/exchangeInfo': 20,
+    '/api/v3/klines': 2,
+    '/api/v3/trades': 25,
+    '/api/v3/ticker/price': 2,
+    '/api/v3/ticker/24hr': 2,
+}
+
+# 不參與請求合併比對的參數 (每次都不同)
+_VOLATILE_PARAMS = frozenset({'timestamp', 'signature', 'recvWindow'})
+
+ERROR_TIMESTAMP_OUTSIDE_RECV_WINDOW = -1021
+
+
+# ==================== 錯誤類型 ====================
+
+class BinanceRestError(Exception):
+    """網路層錯誤 (連線失敗、回應無法讀取)"""
+
+
+class BinanceTimeoutError(BinanceRestError):
+    """請求超時"""
+
+
+class BinanceAPIError(BinanceRestError):
+    """交易所回傳錯誤 (HTTP 4xx/5xx，附 Binance 錯誤碼)"""
+
+    def __init__(self, status_code: int, code: int, message: str, response: Optional['RestResponse'] = None):
+        super().__init__(f"APIError(status={status_code}, code={code}): {message}")
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+        self.response = response
+
+
+# ==================== 回應 ====================
+
+class RestResponse:
+    """
+    REST 回應 (介面與 requests.Response 常用部分相同: status_code / text / json())
+
+    合併請求時多個呼叫者共用同一個物件，json() 只解析一次。
+    """
+
+    __slots__ = ('status_code', 'headers', 'text', 'elapsed_ms', '_json', '_parsed')
+
+    def __init__(self, status_code: int, headers: Mapping[str, str], text: str, elapsed_ms: float = 0.0):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        self.elapsed_ms = elapsed_ms
+        self._json: Any = None
+        self._parsed = False
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 300
+
+    def json(self) -> Any:
+        if not self._parsed:
+            self._json = json.loads(self.text) if self.text else None
+            self._parsed = True
+        return self._json
+
+    def error_code(self) -> Optional[int]:
+        """Binance 錯誤碼 ({"code": -2019, "msg": ...})，非錯誤回應回傳 None"""
+        if self.ok:
+            return None
+        try:
+            data = self.json()
+        except ValueError:
+            return None
+        if isinstance(data, dict) and 'code' in data:
+            try:
+                return int(data['code'])
+            except (TypeError, ValueError):
+                return None
+        return None
+
+    def raise_for_status(self) -> 'RestResponse':
+        if self.ok:
+            return self
+        code = self.error_code()
+        message = self.text
+        try:
+            data = self.json()
+            if isinstance(data, dict):
+                message = data.get('msg', message)
+        except ValueError:
+            pass
+        raise BinanceAPIError(self.status_code, code if code is not None else 0, message, self)
+
+    def __repr__(self) -> str:
+        return f"RestResponse(status={self.status_code}, bytes={len(self.text)})"
+
+
+# ==================== 權重限流 ====================
+
+class WeightRateLimiter:
+    """
+    每分鐘請求權重預算
+
+    本地先行扣除權重，收到回應後以 X-MBX-USED-WEIGHT-1M 校正 (取較大者)，
+    多個呼叫點共用同一個 IP 配額時也不會低估。
+    """
+
+    def __init__(self, max_weight_per_minute: int = 2400, safety_ratio: float = 0.9):
+        self.max_weight = int(max_weight_per_minute * safety_ratio)
+        self.used = 0
+        self.server_used = 0
+        self._window = self._current_window()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _current_window() -> int:
+        return int(time.time() // 60)
+
+    def _roll(self) -> None:
+        window = self._current_window()
+        if window != self._window:
+            self._window = window
+            self.used = 0
+            self.server_used = 0
+
+    async def acquire(self, weight: int) -> None:
+        async with self._lock:
+            while True:
+                now = time.time()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._roll()
+                if self.used + weight <= self.max_weight:
+                    break
+                wait = 60 - now % 60 + 0.05
+                logger.warning(f"權重預算用盡 ({self.used}/{self.max_weight})，等待 {wait:.1f} 秒")
+                await asyncio.sleep(wait)
+            self.used += weight
+
+    def sync(self, headers: Mapping[str, str]) -> None:
+        """以回應標頭校正已用權重"""
+        value = headers.get('X-MBX-USED-WEIGHT-1M') or headers.get('X-MBX-USED-WEIGHT')
+        if value is None:
+            return
+        try:
+            used = int(value)
+        except (TypeError, ValueError):
+            return
+        self._roll()
+        self.server_used = used
+        self.used = max(self.used, used)
+
+    def penalize(self, retry_after: float) -> None:
+        """429 / 418: 暫停送出直到 Retry-After 結束"""
+        self._blocked_until = max(self._blocked_until, time.time() + max(1.0, retry_after))
+        logger.warning(f"Binance 限流 (Retry-After {retry_after:.0f}s)")
+
+
+# ==================== 統計 ====================
+
+@dataclass
+class RestClientStats:
+    requests: int = 0
+    coalesced: int = 0
+    errors: int = 0
+    time_syncs: int = 0
+    resigned: int = 0
+    time_offset_ms: float = 0.0
+    last_latency_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# ==================== Async 客戶端 ====================
+
+class BinanceRestClient:
+    """Binance REST 客戶端 (async，單一 keep-alive 連線池)"""
+
+    def __init__(
+        self,
+        base_url: str = FUTURES_TESTNET_URL,
+        api_key: str = '',
+        api_secret: str = '',
+        recv_window: int = 5000,
+        timeout: float = 10.0,
+        max_connections: int = 16,
+        max_weight_per_minute: int = 2400,
+        time_path: str = '/fapi/v1/time',
+        time_sync_interval: float = 300.0,
+        weights: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Args:
+            base_url: REST 根網址 (不含路徑)
+            api_key / api_secret: API 金鑰 (公開端點可留空)
+            recv_window: 簽名請求的 recvWindow (毫秒)
+            timeout: 預設請求超時 (秒)
+            max_connections: 連線池上限
+            max_weight_per_minute: 每分鐘權重上限 (Futures 2400 / Spot 6000)
+            time_path: 對時端點 (Futures /fapi/v1/time, Spot /api/v3/time)
+            time_sync_interval: 重新對時間隔 (秒)
+            weights: 端點權重表 (預設 FUTURES_WEIGHTS)
+        """
+        if aiohttp is None:
+            raise ImportError("BinanceRestClient 需要 aiohttp: pip install aiohttp")
+
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.recv_window = recv_window
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.time_path = time_path
+        self.time_sync_interval = time_sync_interval
+        self.weights = weights if weights is not None else FUTURES_WEIGHTS
+
+        # 預先計算: HMAC key schedule 與簽名標頭
+        self._mac = hmac.new(api_secret.encode(), digestmod=hashlib.sha256) if api_secret else None
+        self._auth_headers = {'X-MBX-APIKEY': api_key} if api_key else {}
+
+        self.limiter = WeightRateLimiter(max_weight_per_minute)
+        self.stats = RestClientStats()
+        self.time_offset_ms = 0.0
+        self._last_time_sync = 0.0
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._inflight: Dict[Tuple, 'asyncio.Future'] = {}
+
+    # ------------------------ Session ------------------------ #
+    async def __aenter__(self) -> 'BinanceRestClient':
+        await self._ensure_session()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    async def _ensure_session(self) -> 'aiohttp.ClientSession':
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': 'btc-dual-ai-trader/1.0'},
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ------------------------ 簽名 / 對時 ------------------------ #
+    def sign(self, query: str) -> str:
+        """HMAC-SHA256 簽名 (使用預先初始化的 key)"""
+        if self._mac is None:
+            raise BinanceRestError("簽名請求需要 api_secret")
+        mac = self._mac.copy()
+        mac.update(query.encode())
+        return mac.hexdigest()
+
+    def signed_query(self, params: Optional[Mapping[str, Any]] = None) -> str:
+        """編碼參數並加上 timestamp / recvWindow / signature"""
+        payload = dict(params or {})
+        payload['timestamp'] = self.timestamp_ms()
+        payload.setdefault('recvWindow', self.recv_window)
+        query = urlencode(payload)
+        return f"{query}&signature={self.sign(query)}"
+
+    def timestamp_ms(self) -> int:
+        """以伺服器時間為準的毫秒時間戳"""
+        return int(time.time() * 1000 + self.time_offset_ms)
+
+    async def sync_time(self) -> float:
+        """
+        對時: offset = serverTime - 請求往返中點
+
+        Returns:
+            時間偏移 (毫秒，正值代表本地時間落後)
+        """
+        started = time.time()
+        resp = await self.request('GET', self.time_path, coalesce=True)
+        finished = time.time()
+        resp.raise_for_status()
+        server_ms = float(resp.json()['serverTime'])
+        self.time_offset_ms = server_ms - (started + finished) / 2 * 1000
+        self._last_time_sync = finished
+        self.stats.time_syncs += 1
+        self.stats.time_offset_ms = round(self.time_offset_ms, 1)
+        if abs(self.time_offset_ms) > 1000:
+            logger.warning(f"本地時鐘與 Binance 相差 {self.time_offset_ms:.0f}ms")
+        return self.time_offset_ms
+
+    async def _ensure_time_synced(self) -> None:
+        if time.time() - self._last_time_sync > self.time_sync_interval:
+            try:
+                await self.sync_time()
+            except BinanceRestError as e:
+                logger.warning(f"對時失敗，沿用舊偏移 {self.time_offset_ms:.0f}ms: {e}")
+                self._last_time_sync = time.time()
+
+    # ------------------------ 請求 ------------------------ #
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Mapping[str, Any]] = None,
+        signed: bool = False,
+        weight: Optional[int] = None,
+        timeout: Optional[float] = None,
+        coalesce: Optional[bool] = None,
+        keyed: bool = False,
+    ) -> RestResponse:
+        """
+        送出請求
+
+        Args:
+            method: GET / POST / PUT / DELETE
+            path: 端點路徑 (例如 /fapi/v1/order)
+            params: 查詢參數；簽名請求的 timestamp 由客戶端填入 (呼叫端的值會被覆蓋)
+            signed: 是否需要簽名 (會帶 X-MBX-APIKEY)
+            keyed: 只帶 X-MBX-APIKEY 不簽名 (USER_STREAM 端點，例如 listenKey)
+            weight: 請求權重 (None = 查權重表)
+            timeout: 本次請求超時 (None = 預設)
+            coalesce: 相同請求在途時是否共用回應 (None = GET 才合併)
+
+        Returns:
+            RestResponse (HTTP 錯誤不拋例外，由呼叫端檢查 status_code)
+
+        Raises:
+            BinanceTimeoutError: 超時
+            BinanceRestError: 網路錯誤
+        """
+        method = method.upper()
+        if coalesce is None:
+            coalesce = method == 'GET'
+        if not coalesce:
+            return await self._send(method, path, params, signed, weight, timeout, keyed)
+
+        key = (method, path, signed, keyed, tuple(sorted(
+            (k, str(v)) for k, v in (params or {}).items() if k not in _VOLATILE_PARAMS
+        )))
+        pending = self._inflight.get(key)
+        if pending is not None and not pending.done():
+            self.stats.coalesced += 1
+            return await asyncio.shield(pending)
+
+        task = asyncio.ensure_future(self._send(method, path, params, signed, weight, timeout, keyed))
+        self._inflight[key] = task
+
+        def _release(finished: 'asyncio.Future', key: Tuple = key) -> None:
+            if self._inflight.get(key) is finished:
+                del self._inflight[key]
+
+        task.add_done_callback(_release)
+        return await asyncio.shield(task)
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Mapping[str, Any]],
+        signed: bool,
+        weight: Optional[int],
+        timeout: Optional[float],
+        keyed: bool = False,
+    ) -> RestResponse:
+        if signed:
+            await self._ensure_time_synced()
+
+        resp = await self._send_once(method, path, params, signed, weight, timeout, keyed)
+        if signed and resp.error_code() == ERROR_TIMESTAMP_OUTSIDE_RECV_WINDOW:
+            # 時鐘漂移: 重新對時後以新的 timestamp 重送一次
+            self._last_time_sync = 0.0
+            await self._ensure_time_synced()
+            self.stats.resigned += 1
+            resp = await self._send_once(method, path, params, signed, weight, timeout, keyed)
+        return resp
+
+    async def _send_once(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Mapping[str, Any]],
+        signed: bool,
+        weight: Optional[int],
+        timeout: Optional[float],
+        keyed: bool = False,
+    ) -> RestResponse:
+        session = await self._ensure_session()
+        await self.limiter.acquire(weight if weight is not None else self.weights.get(path, 1))
+
+        if signed:
+            query = self.signed_query(params)
+        else:
+            query = urlencode(dict(params)) if params else ''
+        url = URL(f"{self.base_url}{path}?{query}" if query else f"{self.base_url}{path}", encoded=True)
+        headers = self._auth_headers if signed or keyed else None
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout is not None else None
+
+        self.stats.requests += 1
+        started = time.perf_counter()
+        try:
+            async with session.request(method, url, headers=headers, timeout=request_timeout) as response:
+                text = await response.text()
+                headers_in = response.headers.copy()
+                status = response.status
+        except asyncio.TimeoutError as e:
+            self.stats.errors += 1
+            raise BinanceTimeoutError(f"{method} {path} 超時 ({timeout or self.timeout}s)") from e
+        except aiohttp.ClientError as e:
+            self.stats.errors += 1
+            raise BinanceRestError(f"{method} {path} 失敗: {e}") from e
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats.last_latency_ms = round(elapsed_ms, 2)
+        self.limiter.sync(headers_in)
+        if status in (418, 429):
+            try:
+                retry_after = float(headers_in.get('Retry-After', 60))
+            except (TypeError, ValueError):
+                retry_after = 60.0
+            self.limiter.penalize(retry_after)
+        if status >= 400:
+            self.stats.errors += 1
+
+        return RestResponse(status, headers_in, text, elapsed_ms)
+
+    # ------------------------ 便捷方法 ------------------------ #
+    async def get(self, path: str, params: Optional[Mapping[str, Any]] = None, signed: bool = False, **kwargs: Any) -> RestResponse:
+        return await self.request('GET', path, params, signed=signed, **kwargs)
+
+    async def post(self, path: str, params: Optional[Mapping[str, Any]] = None, signed: bool = True, **kwargs: Any) -> RestResponse:
+        return await self.request('POST', path, params, signed=signed, **kwargs)
+
+    async def delete(self, path: str, params: Optional[Mapping[str, Any]] = None, signed: bool = True, **kwargs: Any) -> RestResponse:
+        return await self.request('DELETE', path, params, signed=signed, **kwargs)
+
+
+# ==================== 同步介面 ====================
+
+_loop_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """所有同步客戶端共用的背景事件循環 (連線池綁定在這個 loop 上)"""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None or _loop_thread is None or not _loop_thread.is_alive():
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name='binance-rest', daemon=True)
+            _loop_thread.start()
+        return _loop
+
+
+class BlockingBinanceRestClient:
+    """
+    同步包裝 (給原本用 requests 的呼叫點)
+
+    請求在背景事件循環上執行，所以不同執行緒、不同物件的相同 GET 也能合併，
+    並共用同一個 keep-alive 連線池。
+    """
+
+    def __init__(self, client: BinanceRestClient):
+        self.client = client
+        self._loop = background_loop()
+
+    @property
+    def base_url(self) -> str:
+        return self.client.base_url
+
+    @property
+    def stats(self) -> RestClientStats:
+        return self.client.stats
+
+    def _run(self, coro: Any, timeout: Optional[float]) -> Any:
+        if threading.current_thread() is _loop_thread:
+            coro.close()
+            raise RuntimeError("BlockingBinanceRestClient 不能在背景事件循環內呼叫，請改用 .client")
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        wait = (timeout if timeout is not None else self.client.timeout) * 2 + 5  # 含對時 / 重送 / 排隊
+        try:
+            return future.result(wait)
+        except concurrent.futures.TimeoutError as e:
+            future.cancel()
+            raise BinanceTimeoutError(f"請求等待超過 {wait:.0f}s") from e
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Mapping[str, Any]] = None,
+        signed: bool = False,
+        weight: Optional[int] = None,
+        timeout: Optional[float] = None,
+        coalesce: Optional[bool] = None,
+        keyed: bool = False,
+    ) -> RestResponse:
+        """同 BinanceRestClient.request (阻塞直到回應)"""
+        return self._run(
+            self.client.request(
+                method, path, params,
+                signed=signed, weight=weight, timeout=timeout, coalesce=coalesce, keyed=keyed,
+            ),
+            timeout,
+        )
+
+    def get(self, path: str, params: Optional[Mapping[str, Any]] = None, signed: bool = False, **kwargs: Any) -> RestResponse:
+        return self.request('GET', path, params, signed=signed, **kwargs)
+
+    def post(self, path: str, params: Optional[Mapping[str, Any]] = None, signed: bool = True, **kwargs: Any) -> RestResponse:
+        return self.request('POST', path, params, signed=signed, **kwargs)
+
+    def delete(self, path: str, params: Optional[Mapping[str, Any]] = None, signed: bool = True, **kwargs: Any) -> RestResponse:
+        return self.request('DELETE', path, params, signed=signed, **kwargs)
+
+    def sign(self, query: str) -> str:
+        return self.client.sign(query)
+
+    def signed_query(self, params: Optional[Mapping[str, Any]] = None) -> str:
+        return self.client.signed_query(params)
+
+    def sync_time(self) -> float:
+        return self._run(self.client.sync_time(), None)
+
+    def close(self) -> None:
+        if self._loop.is_running():
+            self._run(self.client.close(), None)
+
+
+_shared_clients: Dict[Tuple[str, str], BlockingBinanceRestClient] = {}
+_shared_lock = threading.Lock()
+
+
+def get_rest_client(base_url: str, api_key: str = '', api_secret: str = '', **kwargs: Any) -> BlockingBinanceRestClient:
+    """
+    取得共用的同步客戶端 (同一個 base_url + api_key 共用連線池、限流與對時)
+
+    Args:
+        base_url: REST 根網址
+        api_key / api_secret: API 金鑰
+        **kwargs: 首次建立時傳給 BinanceRestClient 的參數
+    """
+    key = (base_url.rstrip('/'), api_key)
+    with _shared_lock:
+        rest = _shared_clients.get(key)
+        if rest is None:
+            rest = BlockingBinanceRestClient(BinanceRestClient(base_url, api_key, api_secret, **kwargs))
+            _shared_clients[key] = rest
+        return rest
+
+
+@atexit.register
+def _close_shared_clients() -> None:
+    for rest in list(_shared_clients.values()):
+        try:
+            rest.close()
+        except Exception:
+            pass
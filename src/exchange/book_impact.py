@@ -0,0 +1,268 @@
+"""
+訂單簿衝擊核心 (Book Impact Kernel)
+===================================
+
+每次訂單簿變動時把各側檔位轉成累積數量 / 累積名義金額陣列，之後任何下單量的
+VWAP 成交價、滑點、有效價差都只需一次二分搜尋 (bisect / np.searchsorted)，
+不用再逐檔 float() 走訪。
+AdvancedRiskController (滑點預估)、SpreadDepthMonitor (深度 / 有效價差)
+與 CostAwareFilter (滑點成本) 共用同一份 ladder。
+
+原理:
+    cum_qty[k]      = size[0] + ... + size[k]
+    cum_notional[k] = price[0]*size[0] + ... + price[k]*size[k]
+    下單量 q 落在第 k 檔 (cum_qty[k-1] < q ≤ cum_qty[k])：
+        notional = cum_notional[k-1] + (q - cum_qty[k-1]) * price[k]
+    q 超過總深度時只成交 cum_qty[-1]，VWAP 為已成交部分的均價。
+    向量版本對整個下單量陣列做同一件事。
+
+用法:
+    book = BookImpact(bids, asks)                 # 或 book.update(bids, asks)
+    vwap, slippage_pct = book.fill_price("BUY", 0.05)
+    vwaps, slips = book.fill_prices("SELL", np.array([0.01, 0.05, 0.2]))
+    book.effective_spread(1.0), book.depth(10)
+"""
+
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# ==================== 單側 ====================
+
+class DepthLadder:
+    """單側訂單簿 (依成交優先順序: asks 由低到高、bids 由高到低)"""
+
+    __slots__ = ('prices', 'cum_qty', 'cum_notional', '_arrays')
+
+    def __init__(self, levels: Optional[Sequence[Sequence[float]]] = None, max_levels: Optional[int] = None):
+        """
+        Args:
+            levels: [[price, size], ...]，數值或字串皆可
+            max_levels: 只取前 N 檔 (None = 全部)
+        """
+        levels = levels or []
+        if max_levels is not None:
+            levels = levels[:max_levels]
+        self.prices = [float(lv[0]) for lv in levels]
+        sizes = [float(lv[1]) for lv in levels]
+        self.cum_qty = list(accumulate(sizes))
+        self.cum_notional = list(accumulate(p * q for p, q in zip(self.prices, sizes)))
+        self._arrays = None
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @property
+    def best_price(self) -> float:
+        return self.prices[0] if self.prices else 0.0
+
+    @property
+    def total_qty(self) -> float:
+        return self.cum_qty[-1] if self.cum_qty else 0.0
+
+    def depth(self, levels: Optional[int] = None) -> Tuple[float, float]:
+        """前 N 檔的 (總數量, 總名義金額)"""
+        n = len(self.cum_qty) if levels is None else min(levels, len(self.cum_qty))
+        if n <= 0:
+            return 0.0, 0.0
+        return self.cum_qty[n - 1], self.cum_notional[n - 1]
+
+    def fill(self, qty: float) -> Tuple[float, float]:
+        """
+        吃單 qty 的成交結果
+
+        Returns:
+            (成交名義金額, 實際成交數量)；深度不足時只成交到最後一檔
+        """
+        cum_qty = self.cum_qty
+        n = len(cum_qty)
+        if n == 0 or qty <= 0:
+            return 0.0, 0.0
+        k = min(bisect_left(cum_qty, qty), n - 1)
+        filled = min(qty, cum_qty[-1])
+        if k == 0:
+            return filled * self.prices[0], filled
+        return self.cum_notional[k - 1] + (filled - cum_qty[k - 1]) * self.prices[k], filled
+
+    def fill_many(self, qtys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """fill() 的向量版本: 回傳 (成交名義金額陣列, 實際成交數量陣列)"""
+        qtys = np.asarray(qtys, dtype=float)
+        if not self.cum_qty:
+            zeros = np.zeros_like(qtys)
+            return zeros, zeros.copy()
+        if self._arrays is None:
+            # 第一次向量查詢才建 numpy 陣列；前面補 0 的累積量免去 k == 0 的分支
+            cum_qty = np.asarray(self.cum_qty)
+            self._arrays = (
+                cum_qty,
+                np.asarray(self.prices),
+                np.concatenate(([0.0], cum_qty[:-1])),
+                np.concatenate(([0.0], self.cum_notional[:-1])),
+            )
+        cum_qty, prices, prev_qty, prev_notional = self._arrays
+        k = np.minimum(np.searchsorted(cum_qty, qtys, 'left'), len(cum_qty) - 1)
+        filled = np.clip(qtys, 0.0, cum_qty[-1])
+        notional = prev_notional[k] + (filled - prev_qty[k]) * prices[k]
+        return notional, filled
+
+
+# ==================== 雙側 ====================
+
+class BookImpact:
+    """
+    買賣雙側 ladder
+
+    update() 於訂單簿變動時呼叫一次；sync() 只在傳入的 list 物件換了才重建
+    (WebSocket 每次更新都會產生新的 list，適合在讀取端直接呼叫)。
+    """
+
+    def __init__(
+        self,
+        bids: Optional[Sequence[Sequence[float]]] = None,
+        asks: Optional[Sequence[Sequence[float]]] = None,
+        max_levels: Optional[int] = None
+    ):
+        self.max_levels = max_levels
+        self._src_bids = None
+        self._src_asks = None
+        self.update(bids or [], asks or [])
+
+    def update(self, bids: Sequence[Sequence[float]], asks: Sequence[Sequence[float]]) -> None:
+        """以新的訂單簿重建兩側 ladder"""
+        self.bids = DepthLadder(bids, self.max_levels)
+        self.asks = DepthLadder(asks, self.max_levels)
+        self._src_bids = bids
+        self._src_asks = asks
+
+    def sync(self, bids: Sequence[Sequence[float]], asks: Sequence[Sequence[float]]) -> bool:
+        """
+        與來源 list 同步 (以物件身分判斷是否變動)
+
+        Returns:
+            是否重建
+        """
+        if bids is self._src_bids and asks is self._src_asks:
+            return False
+        self.update(bids, asks)
+        return True
+
+    def is_source(self, bids, asks) -> bool:
+        """bids / asks 是否就是最近一次 update() 的來源"""
+        return bids is self._src_bids and asks is self._src_asks
+
+    def ladder(self, side: str) -> DepthLadder:
+        """BUY 吃 asks、SELL 吃 bids"""
+        return self.asks if side.upper() == "BUY" else self.bids
+
+    @property
+    def best_bid(self) -> float:
+        return self.bids.best_price
+
+    @property
+    def best_ask(self) -> float:
+        return self.asks.best_price
+
+    @property
+    def mid(self) -> float:
+        if self.best_bid > 0 and self.best_ask > 0:
+            return (self.best_bid + self.best_ask) / 2
+        return 0.0
+
+    # ---------- 成交價 / 滑點 ----------
+
+    def fill_price(self, side: str, qty: float) -> Tuple[float, float]:
+        """
+        吃單 qty 的預期成交價 (VWAP) 與相對最優價的滑點
+
+        Returns:
+            (vwap, slippage_pct)；qty ≤ 0 時為 (最優價, 0)，該側無掛單時為 (0, 0)
+        """
+        ladder = self.ladder(side)
+        best = ladder.best_price
+        notional, filled = ladder.fill(qty)
+        if filled <= 0 or best <= 0:
+            return best, 0.0
+        vwap = notional / filled
+        return vwap, abs(vwap - best) / best * 100
+
+    def fill_prices(self, side: str, qtys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """fill_price() 的向量版本: 回傳 (vwap 陣列, slippage_pct 陣列)"""
+        ladder = self.ladder(side)
+        best = ladder.best_price
+        notional, filled = ladder.fill_many(qtys)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = np.where(filled > 0, notional / filled, best)
+        if best <= 0:
+            return vwap, np.zeros_like(vwap)
+        return vwap, np.abs(vwap - best) / best * 100
+
+    def impact_cost(self, side: str, qty: float) -> float:
+        """
+        吃單 qty 相對最優價多付 (或少收) 的金額
+
+        Returns:
+            衝擊金額；深度不足以成交 qty 時為 inf (與 effective_spread 相同慣例)
+        """
+        ladder = self.ladder(side)
+        notional, filled = ladder.fill(qty)
+        if qty > 0 and filled < qty - qty * 1e-12:
+            return float('inf')
+        return abs(notional - filled * ladder.best_price)
+
+    def effective_spread(self, trade_size: float = 1.0) -> Dict[str, float]:
+        """
+        雙邊吃單 trade_size 的有效價差 (深度不足時買價 inf / 賣價 0)
+
+        Returns:
+            與 SpreadDepthMonitor.calculate_effective_spread 相同的欄位
+        """
+        if not len(self.bids) or not len(self.asks):
+            return {
+                'effective_buy_price': 0.0,
+                'effective_sell_price': 0.0,
+                'effective_spread': 0.0,
+                'slippage': 0.0
+            }
+
+        mid_price = (self.best_bid + self.best_ask) / 2
+        buy_cost, buy_filled = self.asks.fill(trade_size)
+        sell_revenue, sell_filled = self.bids.fill(trade_size)
+        tolerance = trade_size * 1e-12  # 累積和的浮點誤差
+        effective_buy_price = buy_cost / trade_size if buy_filled >= trade_size - tolerance else float('inf')
+        effective_sell_price = sell_revenue / trade_size if sell_filled >= trade_size - tolerance else 0.0
+
+        if effective_buy_price != float('inf') and effective_sell_price > 0:
+            effective_spread = (effective_buy_price - effective_sell_price) / mid_price
+            slippage = ((effective_buy_price + effective_sell_price) / 2 - mid_price) / mid_price
+        else:
+            effective_spread = float('inf')
+            slippage = float('inf')
+
+        return {
+            'effective_buy_price': effective_buy_price,
+            'effective_sell_price': effective_sell_price,
+            'effective_spread': effective_spread,
+            'slippage': slippage
+        }
+
+    def depth(self, levels: Optional[int] = None) -> Dict[str, float]:
+        """
+        前 N 檔深度
+
+        Returns:
+            與 SpreadDepthMonitor.calculate_depth 相同的欄位
+        """
+        bid_depth, bid_value = self.bids.depth(levels)
+        ask_depth, ask_value = self.asks.depth(levels)
+        total_depth = bid_depth + ask_depth
+        return {
+            'bid_depth': bid_depth,
+            'ask_depth': ask_depth,
+            'total_depth': total_depth,
+            'depth_imbalance': (bid_depth - ask_depth) / total_depth if total_depth > 0 else 0.0,
+            'bid_value': bid_value,
+            'ask_value': ask_value
+        }
@@ -0,0 +1,751 @@
+"""
+跨交易所價差引擎 (Binance / dYdX Cross-Venue Spread Engine)
+==========================================================
+
+兩邊的 top-of-book 以「同一個時鐘的時間戳」寫入各自的環形緩衝，價差、z-score、
+lead-lag、波動、動態 Band 與 Oracle Gap 都在對齊後的時間格點上增量計算，
+不再各自在「讀取當下」抓兩個 WebSocket 物件的最新值。
+AdvancedRiskController (即時) 與 analyze_binance_lead_dydx_follow.py /
+compare_binance_dydx_spread.py (離線錄製資料) 共用同一套計算。
+
+原理:
+    時間基準: 即時模式兩邊都用本機「收到時間」(dYdX 訂單簿沒有交易所時間戳，
+        若幣安用交易所 T/E 而 dYdX 用本機時間，兩邊時鐘偏差會直接變成假的 lead-lag / 延遲)；
+        離線重放用錄製檔的時間戳 (錄製時同樣是本機時間)。
+    執行緒: 幣安與 dYdX 的推送在不同執行緒，輸入與查詢都在同一把鎖內，
+        state() 一次取出彼此一致的整組數值。
+    水位 watermark = min(幣安最後時間戳, dYdX 最後時間戳)
+        只有 ≤ watermark 的格點兩邊都已經「看過」，該格點用 as-of
+        (時間戳 ≤ t 的最後一筆報價) 取兩邊 mid，較快的一邊多收到的報價不會提前混入。
+        代價: 某一邊沒有推送時水位停住，價差 / z-score / lead-lag 都停在水位那一刻。
+        兩邊最新時間戳相差超過 max_silence_ms 時 stalled = True，呼叫端應改用備援數據
+        (該邊恢復推送後水位一次追上；跳過超過 max_gap_ms 則重設格點統計)。
+    spread_pct = (dydx_mid - binance_mid) / binance_mid * 100
+    z-score    = (spread - EW 平均) / EW 標準差 (更新前的統計，半衰期以毫秒計)
+    lead-lag   = 格點報酬的交叉乘積和 C_bd[k] = Σ r_b[n-k]·r_d[n]、C_db[k] = Σ r_d[n-k]·r_b[n]
+                 每個新格點加入一列、移出窗口最舊的一列，O(max_lag)；
+                 正值代表幣安領先 dYdX k 個格點
+                 相關係數以同一段重疊樣本的能量正規化:
+                 corr_bd[k] = C_bd[k] / sqrt(E_b[k]·E_d[0])，E_b[k] = Σ r_b[n-k]² (同一窗口 n)，
+                 由 Cauchy-Schwarz 保證 |corr| ≤ 1
+    vol_1s     = 每 vol_step_ms 幣安 mid 變動百分比的 EMA (與舊版 alpha 相同)
+
+用法:
+    engine = CrossVenueSpreadEngine(band_config=DynamicBandConfig())
+    engine.on_binance(ts_ms, bid, ask)          # 幣安 depth 推送
+    engine.on_dydx(ts_ms, bid, ask)             # dYdX 訂單簿推送
+    engine.on_oracle(ts_ms, oracle_price)
+    engine.spread_z, engine.lead_lag_ms, engine.bands(), engine.oracle_gap()
+
+    # 離線: 錄製檔 → 同一套增量計算
+    engine = CrossVenueSpreadEngine(record=True)
+    engine.replay(load_top_of_book(binance_paths), load_top_of_book(dydx_paths))
+    df = engine.history_frame()
+
+    # 只需要對齊後的價差時，直接向量化
+    df = aligned_spread_series(load_top_of_book(a), load_top_of_book(b), grid_ms=1000)
+"""
+
+import math
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import pandas as pd
+    HAS_PANDAS = True
+except ImportError:
+    HAS_PANDAS = False
+
+# (ts_ms, bid, ask) 三個等長陣列
+QuoteArrays = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+# ==================== Band / Oracle ====================
+
+@dataclass
+class SpreadBandConfig:
+    """動態 Band 與 Oracle Gap 參數 (欄位與 DynamicBandConfig 相同，可直接傳入後者)"""
+    base_entry: float = 0.25
+    min_entry: float = 0.15
+    max_entry: float = 0.50
+    k_vol: float = 2.0
+    k_spread: float = 1.5
+    k_lat: float = 0.5
+    halt_mult: float = 2.5
+    min_halt: float = 0.40
+    max_halt: float = 1.00
+    oracle_warn: float = 0.08
+    oracle_halt: float = 0.20
+
+
+def dynamic_bands(cfg: Any, vol_1s: float, spread_pct: float, lat_ms: float, vol_per_sec: float) -> Tuple[float, float]:
+    """
+    動態 Entry/Halt Band
+
+    band_entry = clamp(max(base_entry, k_vol·vol_1s, k_spread·spread, k_lat·lat_s·vol_per_sec), min_entry, max_entry)
+    band_halt  = clamp(band_entry · halt_mult, min_halt, max_halt)
+
+    Returns:
+        (band_entry, band_halt) 百分比
+    """
+    vol_factor = cfg.k_vol * vol_1s
+    spread_factor = cfg.k_spread * spread_pct
+    lat_factor = cfg.k_lat * (lat_ms / 1000) * vol_per_sec
+
+    raw_entry = max(cfg.base_entry, vol_factor, spread_factor, lat_factor)
+    band_entry = max(cfg.min_entry, min(cfg.max_entry, raw_entry))
+    band_halt = max(cfg.min_halt, min(cfg.max_halt, band_entry * cfg.halt_mult))
+    return band_entry, band_halt
+
+
+def oracle_gap_status(mid: float, oracle: float, cfg: Any) -> Tuple[float, str]:
+    """
+    Oracle Gap = |mid - oracle| / oracle * 100
+
+    Returns:
+        (gap_pct, 'OK' | 'WARN' | 'HALT')
+    """
+    if oracle <= 0 or mid <= 0:
+        return 0.0, 'OK'
+    gap = abs(mid - oracle) / oracle * 100
+    if gap >= cfg.oracle_halt:
+        return gap, 'HALT'
+    if gap >= cfg.oracle_warn:
+        return gap, 'WARN'
+    return gap, 'OK'
+
+
+# ==================== 報價環形緩衝 ====================
+
+class QuoteRing:
+    """
+    單一交易所的 top-of-book 時間序列
+
+    底層陣列長度為 2 × capacity，寫滿時把最後 capacity 筆搬回開頭 (攤銷 O(1))，
+    所以有效窗口永遠是連續的一段，可以直接 np.searchsorted 做 as-of 查詢。
+    時間戳倒退 (交易所偶發亂序) 時沿用上一筆時間，維持單調。
+    """
+
+    __slots__ = ('capacity', 'ts', 'bid', 'ask', 'mid', 'start', 'end',
+                 'last_ts', 'last_bid', 'last_ask', 'last_mid')
+
+    def __init__(self, capacity: int = 4096):
+        self.capacity = max(2, int(capacity))
+        size = 2 * self.capacity
+        self.ts = np.zeros(size, dtype=np.int64)
+        self.bid = np.zeros(size)
+        self.ask = np.zeros(size)
+        self.mid = np.zeros(size)
+        self.clear()
+
+    def clear(self) -> None:
+        self.start = self.end = 0
+        self.last_ts = 0
+        self.last_bid = self.last_ask = self.last_mid = 0.0
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    @property
+    def first_ts(self) -> int:
+        return int(self.ts[self.start]) if self.end > self.start else 0
+
+    def push(self, ts_ms: int, bid: float, ask: float) -> int:
+        """
+        寫入一筆報價
+
+        Returns:
+            實際寫入的時間戳 (亂序時為上一筆的時間)
+        """
+        if self.end > self.start and ts_ms < self.last_ts:
+            ts_ms = self.last_ts
+        if self.end == len(self.ts):
+            keep = self.capacity
+            lo = self.end - keep
+            for arr in (self.ts, self.bid, self.ask, self.mid):
+                arr[:keep] = arr[lo:self.end]
+            self.start, self.end = 0, keep
+
+        mid = (bid + ask) / 2
+        i = self.end
+        self.ts[i] = ts_ms
+        self.bid[i] = bid
+        self.ask[i] = ask
+        self.mid[i] = mid
+        self.end = i + 1
+        if self.end - self.start > self.capacity:
+            self.start = self.end - self.capacity
+
+        self.last_ts = ts_ms
+        self.last_bid = bid
+        self.last_ask = ask
+        self.last_mid = mid
+        return ts_ms
+
+    def index_at(self, ts_ms: int) -> int:
+        """時間戳 ≤ ts_ms 的最後一筆 (底層索引)；沒有則 -1"""
+        if self.end == self.start:
+            return -1
+        if ts_ms >= self.last_ts:
+            return self.end - 1
+        k = int(np.searchsorted(self.ts[self.start:self.end], ts_ms, 'right'))
+        return self.start + k - 1 if k > 0 else -1
+
+    def mid_at(self, ts_ms: int) -> float:
+        i = self.index_at(ts_ms)
+        return float(self.mid[i]) if i >= 0 else 0.0
+
+    def arrays(self) -> QuoteArrays:
+        """目前窗口的 (ts, bid, ask) 視圖 (不複製)"""
+        window = slice(self.start, self.end)
+        return self.ts[window], self.bid[window], self.ask[window]
+
+
+# ==================== 引擎 ====================
+
+@dataclass
+class CrossVenueState:
+    """引擎目前狀態 (給快照 / 儀表板 / 日誌)"""
+    binance_ts_ms: int = 0
+    binance_bid: float = 0.0
+    binance_ask: float = 0.0
+    binance_mid: float = 0.0
+    dydx_ts_ms: int = 0
+    dydx_bid: float = 0.0
+    dydx_ask: float = 0.0
+    dydx_mid: float = 0.0
+    dydx_spread_pct: float = 0.0
+    watermark_ms: int = 0
+    ready: bool = False
+    stalled: bool = False
+    spread_pct: float = 0.0
+    spread_z: float = 0.0
+    lead_lag_ms: float = 0.0
+    lead_lag_corr: float = 0.0
+    vol_1s: float = 0.0
+    lat_ms: float = 0.0
+    oracle_price: float = 0.0
+    oracle_gap_pct: float = 0.0
+    band_entry: float = 0.0
+    band_halt: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class CrossVenueSpreadEngine:
+    """
+    Binance / dYdX 時間對齊價差引擎
+
+    on_binance / on_dydx 每筆 O(1)；水位推進時對每個新格點做一次 O(max_lag) 的增量更新。
+    record=True 時保留每個格點的結果，history_frame() 轉成 DataFrame (離線分析用)。
+    輸入 (on_*) 與查詢 (state / lead_lag / spread_at ...) 皆持有同一把鎖，可由不同執行緒呼叫。
+    """
+
+    HISTORY_COLUMNS = (
+        'time_ms', 'binance_mid', 'dydx_mid', 'spread_pct', 'spread_z',
+        'vol_1s', 'lead_lag_ms', 'lead_lag_corr',
+    )
+
+    def __init__(
+        self,
+        band_config: Any = None,
+        grid_ms: int = 100,
+        max_lag_ms: int = 2000,
+        corr_window_ms: int = 60_000,
+        z_half_life_ms: int = 60_000,
+        vol_step_ms: int = 1000,
+        vol_alpha: float = 0.3,
+        capacity: int = 4096,
+        max_gap_ms: int = 60_000,
+        max_silence_ms: int = 5_000,
+        record: bool = False
+    ):
+        """
+        Args:
+            band_config: 動態 Band / Oracle 參數 (SpreadBandConfig 或 DynamicBandConfig)
+            grid_ms: 對齊格點間距
+            max_lag_ms: lead-lag 搜尋範圍 (±)
+            corr_window_ms: lead-lag 交叉相關窗口
+            z_half_life_ms: 價差 EW 平均 / 標準差的半衰期
+            vol_step_ms: 波動取樣間距 (需為 grid_ms 的倍數)
+            vol_alpha: 波動 EMA 係數
+            capacity: 每個交易所保留的報價筆數
+            max_gap_ms: 水位一次跳過超過此值 (某一邊斷線) 時重設格點統計
+            max_silence_ms: 兩邊最新報價時間相差超過此值時視為水位停滯 (stalled)
+            record: 是否保留每個格點的結果
+        """
+        self.band_config = band_config or SpreadBandConfig()
+        self.grid_ms = max(1, int(grid_ms))
+        self.max_lag_steps = max(1, int(max_lag_ms) // self.grid_ms)
+        self.window_steps = max(self.max_lag_steps + 1, int(corr_window_ms) // self.grid_ms)
+        self._z_alpha = 1.0 - 0.5 ** (self.grid_ms / max(1, z_half_life_ms))
+        self.vol_step_ms = max(self.grid_ms, int(vol_step_ms) // self.grid_ms * self.grid_ms)
+        self.vol_alpha = vol_alpha
+        self.max_gap_ms = max_gap_ms
+        self.max_silence_ms = max_silence_ms
+        self.record = record
+
+        self._lock = threading.RLock()
+        self.binance = QuoteRing(capacity)
+        self.dydx = QuoteRing(capacity)
+        self.oracle_price = 0.0
+        self.oracle_ts_ms = 0
+        self._history: List[Tuple] = []
+        self._reset_grid()
+
+    def reset(self) -> None:
+        """清空報價與所有統計"""
+        with self._lock:
+            self.binance.clear()
+            self.dydx.clear()
+            self.oracle_price = 0.0
+            self.oracle_ts_ms = 0
+            self._history = []
+            self._reset_grid()
+
+    def _reset_grid(self) -> None:
+        self.next_grid_ms: Optional[int] = None
+        self.grid_count = 0
+        self.spread_pct = 0.0
+        self.spread_z = 0.0
+        self._ew_mean: Optional[float] = None
+        self._ew_var = 0.0
+        self._prev_b = 0.0
+        self._prev_d = 0.0
+        self._vol_ref = 0.0
+        self.vol_1s = 0.0
+
+        lags = self.max_lag_steps
+        self._hist = self.window_steps + lags + 1
+        # 前 _hist 格是 0 (視為尚無報酬)，讓移出與 resync 的切片永遠不為負
+        self._rb = np.zeros(2 * self._hist)
+        self._rd = np.zeros(2 * self._hist)
+        self._hend = self._hist
+        self._n_returns = 0
+        self._c_bd = np.zeros(lags + 1)
+        self._c_db = np.zeros(lags + 1)
+        # 窗口內延遲 k 格的報酬平方和；[0] 即未延遲的能量
+        self._e_b = np.zeros(lags + 1)
+        self._e_d = np.zeros(lags + 1)
+        self._lag_cache: Optional[Tuple[float, float]] = None
+
+    # ---------- 輸入 ----------
+
+    def on_binance(self, ts_ms: int, bid: float, ask: float) -> None:
+        """幣安報價 (ts_ms 與 on_dydx 同一時鐘；即時模式為本機收到時間)"""
+        if bid > 0 and ask > 0:
+            with self._lock:
+                self.binance.push(int(ts_ms), bid, ask)
+                self._advance()
+
+    def on_dydx(self, ts_ms: int, bid: float, ask: float) -> None:
+        """dYdX 報價 (ts_ms 與 on_binance 同一時鐘；即時模式為本機收到時間)"""
+        if bid > 0 and ask > 0:
+            with self._lock:
+                self.dydx.push(int(ts_ms), bid, ask)
+                self._advance()
+
+    def on_oracle(self, ts_ms: int, price: float) -> None:
+        """dYdX Oracle 價格"""
+        if price > 0:
+            with self._lock:
+                self.oracle_price = price
+                self.oracle_ts_ms = int(ts_ms)
+
+    def replay(
+        self,
+        binance: QuoteArrays,
+        dydx: QuoteArrays,
+        oracle: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ) -> 'CrossVenueSpreadEngine':
+        """
+        依交易所時間戳合併兩邊 (及 oracle) 的錄製報價，逐筆餵入引擎
+
+        同一毫秒的順序為 幣安 → dYdX → oracle。
+        """
+        streams = [binance, dydx]
+        if oracle is not None:
+            streams.append((oracle[0], oracle[1], oracle[1]))
+        ts = np.concatenate([np.asarray(s[0], dtype=np.int64) for s in streams])
+        venue = np.concatenate([np.full(len(s[0]), i, dtype=np.int8) for i, s in enumerate(streams)])
+        bid = np.concatenate([np.asarray(s[1], dtype=float) for s in streams])
+        ask = np.concatenate([np.asarray(s[2], dtype=float) for s in streams])
+        order = np.argsort(ts, kind='stable')
+
+        handlers = (self.on_binance, self.on_dydx, lambda t, px, _: self.on_oracle(t, px))
+        for t, v, b, a in zip(ts[order].tolist(), venue[order].tolist(), bid[order].tolist(), ask[order].tolist()):
+            handlers[v](t, b, a)
+        return self
+
+    # ---------- 格點推進 ----------
+
+    @property
+    def watermark_ms(self) -> int:
+        """兩邊都已經收到的時間上限"""
+        if not len(self.binance) or not len(self.dydx):
+            return 0
+        return min(self.binance.last_ts, self.dydx.last_ts)
+
+    def _advance(self) -> None:
+        if not len(self.binance) or not len(self.dydx):
+            return
+        watermark = min(self.binance.last_ts, self.dydx.last_ts)
+        grid = self.grid_ms
+        if self.next_grid_ms is None:
+            first = max(self.binance.first_ts, self.dydx.first_ts)
+            self.next_grid_ms = -(-first // grid) * grid
+        if watermark - self.next_grid_ms > self.max_gap_ms:
+            # 某一邊斷線後恢復: 中間的格點只剩陳舊報價，從目前水位重新開始
+            self._reset_grid()
+            self.next_grid_ms = watermark // grid * grid
+        while self.next_grid_ms <= watermark:
+            self._step(self.next_grid_ms)
+            self.next_grid_ms += grid
+
+    def _step(self, t: int) -> None:
+        b = self.binance.mid_at(t)
+        d = self.dydx.mid_at(t)
+        if b <= 0 or d <= 0:
+            return
+        self.grid_count += 1
+
+        # 價差 z-score (以更新前的 EW 統計衡量目前這一點)
+        spread = (d - b) / b * 100
+        if self._ew_mean is None:
+            self._ew_mean = spread
+            self.spread_z = 0.0
+        else:
+            std = math.sqrt(self._ew_var)
+            diff = spread - self._ew_mean
+            self.spread_z = diff / std if std > 1e-12 else 0.0
+            incr = self._z_alpha * diff
+            self._ew_mean += incr
+            self._ew_var = (1.0 - self._z_alpha) * (self._ew_var + diff * incr)
+        self.spread_pct = spread
+
+        # lead-lag 交叉乘積
+        if self._prev_b > 0:
+            self._push_returns(math.log(b / self._prev_b), math.log(d / self._prev_d))
+        self._prev_b = b
+        self._prev_d = d
+
+        # 波動
+        if t % self.vol_step_ms == 0:
+            if self._vol_ref > 0:
+                pct_change = abs(b - self._vol_ref) / self._vol_ref * 100
+                self.vol_1s = self.vol_alpha * pct_change + (1 - self.vol_alpha) * self.vol_1s
+            self._vol_ref = b
+
+        if self.record:
+            lag_ms, corr = self.lead_lag()
+            self._history.append((t, b, d, spread, self.spread_z, self.vol_1s, lag_ms, corr))
+
+    def _push_returns(self, rb: float, rd: float) -> None:
+        hist = self._hist
+        if self._hend == 2 * hist:
+            self._rb[:hist] = self._rb[hist:]
+            self._rd[:hist] = self._rd[hist:]
+            self._hend = hist
+        e = self._hend
+        self._rb[e] = rb
+        self._rd[e] = rd
+        e += 1
+        self._hend = e
+
+        lags = self.max_lag_steps
+        # 反轉後第 k 個元素 = k 格之前的報酬
+        lag_b = self._rb[e - lags - 1:e][::-1]
+        lag_d = self._rd[e - lags - 1:e][::-1]
+        self._c_bd += rd * lag_b
+        self._c_db += rb * lag_d
+        self._e_b += lag_b * lag_b
+        self._e_d += lag_d * lag_d
+        self._n_returns += 1
+
+        window = self.window_steps
+        if self._n_returns > window:
+            j = e - 1 - window
+            old_lag_b = self._rb[j - lags:j + 1][::-1]
+            old_lag_d = self._rd[j - lags:j + 1][::-1]
+            self._c_bd -= self._rd[j] * old_lag_b
+            self._c_db -= self._rb[j] * old_lag_d
+            self._e_b -= old_lag_b * old_lag_b
+            self._e_d -= old_lag_d * old_lag_d
+            if self._n_returns % window == 0:
+                self._resync(e)
+        self._lag_cache = None
+
+    def _resync(self, e: int) -> None:
+        """以窗口內的原始報酬重算交叉乘積，消除加減累積的浮點誤差"""
+        window = self.window_steps
+        rb = self._rb
+        rd = self._rd
+        cur_b = rb[e - window:e]
+        cur_d = rd[e - window:e]
+        for k in range(self.max_lag_steps + 1):
+            lag_b = rb[e - window - k:e - k]
+            lag_d = rd[e - window - k:e - k]
+            self._c_bd[k] = float(np.dot(lag_b, cur_d))
+            self._c_db[k] = float(np.dot(lag_d, cur_b))
+            self._e_b[k] = float(np.dot(lag_b, lag_b))
+            self._e_d[k] = float(np.dot(lag_d, lag_d))
+
+    # ---------- 查詢 ----------
+
+    @property
+    def ready(self) -> bool:
+        """兩邊都有報價且至少推進過一個格點"""
+        return self.grid_count > 0
+
+    @property
+    def stalled(self) -> bool:
+        """某一邊超過 max_silence_ms 沒有推送，水位停住 (價差 / z-score / lead-lag 已過時)"""
+        return self.ready and self.lat_ms > self.max_silence_ms
+
+    def _lag_corr(self) -> Tuple[np.ndarray, np.ndarray]:
+        """各延遲的相關係數 (corr_bd[k], corr_db[k])，以每個延遲的重疊樣本正規化"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            den_bd = np.sqrt(self._e_b * self._e_d[0])
+            den_db = np.sqrt(self._e_d * self._e_b[0])
+            corr_bd = np.where(den_bd > 0, self._c_bd / den_bd, 0.0)
+            corr_db = np.where(den_db > 0, self._c_db / den_db, 0.0)
+        # 增量加減的浮點誤差可能讓值略超出 ±1
+        return np.clip(corr_bd, -1.0, 1.0), np.clip(corr_db, -1.0, 1.0)
+
+    def lead_lag(self) -> Tuple[float, float]:
+        """
+        窗口內交叉相關最高的延遲
+
+        Returns:
+            (lag_ms, corr)；lag_ms > 0 代表幣安領先 dYdX，< 0 代表 dYdX 領先；corr ∈ [-1, 1]
+        """
+        with self._lock:
+            if self._lag_cache is not None:
+                return self._lag_cache
+            if self._e_b[0] <= 0 or self._e_d[0] <= 0:
+                self._lag_cache = (0.0, 0.0)
+                return self._lag_cache
+            corr_bd, corr_db = self._lag_corr()
+            k_bd = int(np.argmax(corr_bd))
+            k_db = int(np.argmax(corr_db[1:])) + 1
+            if corr_bd[k_bd] >= corr_db[k_db]:
+                result = (float(k_bd * self.grid_ms), float(corr_bd[k_bd]))
+            else:
+                result = (float(-k_db * self.grid_ms), float(corr_db[k_db]))
+            self._lag_cache = result
+            return result
+
+    @property
+    def lead_lag_ms(self) -> float:
+        return self.lead_lag()[0]
+
+    def lead_lag_profile(self) -> Dict[int, float]:
+        """各延遲 (ms) 的交叉相關係數"""
+        with self._lock:
+            if self._e_b[0] <= 0 or self._e_d[0] <= 0:
+                return {}
+            corr_bd, corr_db = self._lag_corr()
+        profile = {int(k * self.grid_ms): float(c) for k, c in enumerate(corr_bd)}
+        profile.update({-int(k * self.grid_ms): float(c) for k, c in enumerate(corr_db) if k > 0})
+        return dict(sorted(profile.items()))
+
+    @property
+    def lat_ms(self) -> float:
+        """兩邊最新報價的收到時間差"""
+        if not len(self.binance) or not len(self.dydx):
+            return 0.0
+        return float(abs(self.binance.last_ts - self.dydx.last_ts))
+
+    @property
+    def dydx_spread_pct(self) -> float:
+        """dYdX (ask - bid) / mid 點差 %"""
+        mid = self.dydx.last_mid
+        return (self.dydx.last_ask - self.dydx.last_bid) / mid * 100 if mid > 0 else 0.0
+
+    def spread_at(self, ts_ms: Optional[int] = None) -> float:
+        """任一時間點 (預設水位) 的對齊價差 %"""
+        with self._lock:
+            if ts_ms is None:
+                ts_ms = self.watermark_ms
+            b = self.binance.mid_at(ts_ms)
+            d = self.dydx.mid_at(ts_ms)
+        return (d - b) / b * 100 if b > 0 and d > 0 else 0.0
+
+    def binance_mid_at_dydx(self) -> float:
+        """dYdX 最新報價時間點 (as-of) 的幣安 mid；尚未就緒為 0"""
+        with self._lock:
+            return self.binance.mid_at(self.dydx.last_ts) if self.ready else 0.0
+
+    def bands(self) -> Tuple[float, float]:
+        """以目前波動 / dYdX 點差 / 延遲計算的 (band_entry, band_halt)"""
+        return dynamic_bands(self.band_config, self.vol_1s, self.dydx_spread_pct, self.lat_ms, self.vol_1s)
+
+    def oracle_gap(self) -> Tuple[float, str]:
+        """dYdX 最新 mid 相對 Oracle 的偏離 (gap_pct, status)"""
+        return oracle_gap_status(self.dydx.last_mid, self.oracle_price, self.band_config)
+
+    def state(self) -> CrossVenueState:
+        """一次取出目前狀態 (持鎖，所有欄位出自同一時刻)"""
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> CrossVenueState:
+        lag_ms, corr = self.lead_lag()
+        band_entry, band_halt = self.bands()
+        return CrossVenueState(
+            binance_ts_ms=self.binance.last_ts,
+            binance_bid=self.binance.last_bid,
+            binance_ask=self.binance.last_ask,
+            binance_mid=self.binance.last_mid,
+            dydx_ts_ms=self.dydx.last_ts,
+            dydx_bid=self.dydx.last_bid,
+            dydx_ask=self.dydx.last_ask,
+            dydx_mid=self.dydx.last_mid,
+            dydx_spread_pct=self.dydx_spread_pct,
+            watermark_ms=self.watermark_ms,
+            ready=self.ready,
+            stalled=self.stalled,
+            spread_pct=self.spread_at(),
+            spread_z=self.spread_z,
+            lead_lag_ms=lag_ms,
+            lead_lag_corr=corr,
+            vol_1s=self.vol_1s,
+            lat_ms=self.lat_ms,
+            oracle_price=self.oracle_price,
+            oracle_gap_pct=self.oracle_gap()[0],
+            band_entry=band_entry,
+            band_halt=band_halt,
+        )
+
+    def history_frame(self) -> 'pd.DataFrame':
+        """record=True 時每個格點的結果"""
+        if not HAS_PANDAS:
+            raise ImportError("history_frame() 需要 pandas")
+        return pd.DataFrame(self._history, columns=list(self.HISTORY_COLUMNS))
+
+
+# ==================== 離線工具 ====================
+
+def asof_indices(left_ts: np.ndarray, right_ts: np.ndarray, tolerance_ms: Optional[int] = None) -> np.ndarray:
+    """
+    left_ts 每個時間點在 right_ts 中 as-of (≤) 的索引；沒有 (或超過容忍) 為 -1
+
+    right_ts 需已排序。
+    """
+    left_ts = np.asarray(left_ts, dtype=np.int64)
+    right_ts = np.asarray(right_ts, dtype=np.int64)
+    idx = np.searchsorted(right_ts, left_ts, 'right') - 1
+    if tolerance_ms is not None and len(right_ts):
+        stale = (idx >= 0) & (left_ts - right_ts[np.maximum(idx, 0)] > tolerance_ms)
+        idx[stale] = -1
+    return idx
+
+
+def asof_align(
+    left_ts: np.ndarray,
+    right_ts: np.ndarray,
+    right_values: np.ndarray,
+    tolerance_ms: Optional[int] = None
+) -> np.ndarray:
+    """right_values 對齊到 left_ts (as-of)，沒有對應值為 NaN"""
+    idx = asof_indices(left_ts, right_ts, tolerance_ms)
+    values = np.asarray(right_values, dtype=float)
+    out = np.full(len(idx), np.nan)
+    hit = idx >= 0
+    out[hit] = values[idx[hit]]
+    return out
+
+
+def _monotonic(ts: np.ndarray) -> np.ndarray:
+    """與 QuoteRing.push 相同: 時間戳倒退時沿用上一筆"""
+    return np.maximum.accumulate(np.asarray(ts, dtype=np.int64)) if len(ts) else np.asarray(ts, dtype=np.int64)
+
+
+def aligned_spread_series(
+    binance: QuoteArrays,
+    dydx: QuoteArrays,
+    grid_ms: int = 100,
+    start_ms: Optional[int] = None,
+    end_ms: Optional[int] = None
+) -> 'pd.DataFrame':
+    """
+    向量化的時間格點對齊 (與 CrossVenueSpreadEngine 的格點、as-of 規則相同)
+
+    Returns:
+        DataFrame: time_ms, binance_bid/ask/mid, dydx_bid/ask/mid, spread_pct
+    """
+    if not HAS_PANDAS:
+        raise ImportError("aligned_spread_series() 需要 pandas")
+    b_ts, b_bid, b_ask = (np.asarray(a) for a in binance)
+    d_ts, d_bid, d_ask = (np.asarray(a) for a in dydx)
+    b_ok = (b_bid > 0) & (b_ask > 0)
+    d_ok = (d_bid > 0) & (d_ask > 0)
+    b_ts, b_bid, b_ask = _monotonic(b_ts[b_ok]), b_bid[b_ok], b_ask[b_ok]
+    d_ts, d_bid, d_ask = _monotonic(d_ts[d_ok]), d_bid[d_ok], d_ask[d_ok]
+    columns = ['time_ms', 'binance_bid', 'binance_ask', 'binance_mid', 'dydx_bid', 'dydx_ask', 'dydx_mid', 'spread_pct']
+    if not len(b_ts) or not len(d_ts):
+        return pd.DataFrame(columns=columns)
+
+    first = max(int(b_ts[0]), int(d_ts[0]), start_ms if start_ms is not None else 0)
+    last = min(int(b_ts[-1]), int(d_ts[-1]))
+    if end_ms is not None:
+        last = min(last, end_ms)
+    grid = np.arange(-(-first // grid_ms) * grid_ms, last + 1, grid_ms, dtype=np.int64)
+
+    bi = np.searchsorted(b_ts, grid, 'right') - 1
+    di = np.searchsorted(d_ts, grid, 'right') - 1
+    b_mid = (b_bid[bi] + b_ask[bi]) / 2
+    d_mid = (d_bid[di] + d_ask[di]) / 2
+    return pd.DataFrame({
+        'time_ms': grid,
+        'binance_bid': b_bid[bi],
+        'binance_ask': b_ask[bi],
+        'binance_mid': b_mid,
+        'dydx_bid': d_bid[di],
+        'dydx_ask': d_ask[di],
+        'dydx_mid': d_mid,
+        'spread_pct': (d_mid - b_mid) / b_mid * 100,
+    })
+
+
+def load_top_of_book(paths: Sequence[Any], start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> QuoteArrays:
+    """
+    從行情錄製檔 (FeedRecorder) 取出 top-of-book 序列
+
+    Args:
+        paths: 同一交易所的錄製檔 (可跨多個輪替檔)
+        start_ms / end_ms: 時間範圍 (毫秒，含端點)
+
+    Returns:
+        (ts_ms, bid, ask) 陣列，依時間排序，單邊空簿的記錄略過
+    """
+    from ..backtesting.feed_recording import FeedReader
+
+    readers = sorted((FeedReader(p) for p in paths), key=lambda r: r.time_range[0] if r.blocks else 0)
+    ts_parts, bid_parts, ask_parts = [], [], []
+    for reader in readers:
+        levels = reader.depth_levels
+        for ts, nb, na, bid_px, _bid_qty, ask_px, _ask_qty in reader.iter_depth_columns(start_ms, end_ms):
+            ts = np.asarray(ts, dtype=np.int64)
+            nb = np.frombuffer(nb, dtype=np.uint8)
+            na = np.frombuffer(na, dtype=np.uint8)
+            top_bid = np.asarray(bid_px)[::levels]
+            top_ask = np.asarray(ask_px)[::levels]
+            keep = (nb > 0) & (na > 0)
+            if start_ms is not None:
+                keep &= ts >= start_ms
+            if end_ms is not None:
+                keep &= ts <= end_ms
+            ts_parts.append(ts[keep])
+            bid_parts.append(top_bid[keep])
+            ask_parts.append(top_ask[keep])
+
+    if not ts_parts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+    ts = np.concatenate(ts_parts)
+    order = np.argsort(ts, kind='stable')
+    return ts[order], np.concatenate(bid_parts)[order], np.concatenate(ask_parts)[order]
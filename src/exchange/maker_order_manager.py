@@ -21,7 +21,9 @@ from dataclasses import dataclass, field
 from typing import Optional, Dict, List, Tuple
 from datetime import datetime
 from enum import Enum
-import time
+
+from ..core.clock import Clock, get_clock
+from .queue_fill_simulator import QueueFillSimulator
 
 
 class MakerOrderStatus(Enum):
@@ -45,7 +47,7 @@ class MakerOrder:
     
     # 狀態追蹤
     status: MakerOrderStatus = MakerOrderStatus.PENDING
-    created_at: float = field(default_factory=time.time)
+    created_at: float = field(default_factory=lambda: get_clock().time())
     filled_at: Optional[float] = None
     filled_price: Optional[float] = None
     
@@ -57,10 +59,26 @@ class MakerOrder:
     strategy: str = ""
     reason: str = ""
     market_data: Dict = field(default_factory=dict)
+    clock: Clock = field(default_factory=get_clock, repr=False, compare=False)
+    
+    # 佇列模擬 (QueueFillSimulator) 的部分成交
+    filled_quantity_usdt: float = 0.0
+    
+    @property
+    def fill_ratio(self) -> float:
+        """已成交比例 (0~1)"""
+        if self.status == MakerOrderStatus.FILLED:
+            return 1.0
+        return self.filled_quantity_usdt / self.quantity_usdt if self.quantity_usdt > 0 else 0.0
+    
+    @property
+    def base_quantity(self) -> float:
+        """名目數量 (基礎幣)：quantity_usdt × leverage / limit_price"""
+        return self.quantity_usdt * self.leverage / self.limit_price if self.limit_price > 0 else 0.0
     
     def is_expired(self) -> bool:
         """檢查是否超時"""
-        return time.time() - self.created_at > self.timeout_seconds
+        return self.clock.time() - self.created_at > self.timeout_seconds
     
     def check_fill(self, current_price: float, best_bid: float, best_ask: float) -> bool:
         """
@@ -70,7 +88,7 @@ class MakerOrder:
         - LONG: 市價下跌到我們的買入掛單價格
         - SHORT: 市價上漲到我們的賣出掛單價格
         """
-        if self.status != MakerOrderStatus.PENDING:
+        if self.status not in (MakerOrderStatus.PENDING, MakerOrderStatus.PARTIALLY_FILLED):
             return self.status == MakerOrderStatus.FILLED
         
         is_filled = False
@@ -90,14 +108,14 @@ class MakerOrder:
         
         if is_filled:
             self.status = MakerOrderStatus.FILLED
-            self.filled_at = time.time()
+            self.filled_at = self.clock.time()
             return True
         
         return False
     
     def get_fill_wait_time(self) -> float:
         """獲取等待成交時間"""
-        return time.time() - self.created_at
+        return self.clock.time() - self.created_at
     
     def to_dict(self) -> Dict:
         return {
@@ -110,6 +128,7 @@ class MakerOrder:
             "created_at": self.created_at,
             "filled_at": self.filled_at,
             "filled_price": self.filled_price,
+            "fill_ratio": self.fill_ratio,
             "wait_time": self.get_fill_wait_time(),
             "strategy": self.strategy,
             "reason": self.reason
@@ -128,7 +147,9 @@ class MakerOrderManager:
         default_timeout: float = 30.0,
         default_taker_fallback: bool = True,
         maker_offset_bps: float = 1.0,  # 掛單偏移 (基點)
-        aggressive_offset_bps: float = 0.0  # 激進模式：直接掛在最佳價
+        aggressive_offset_bps: float = 0.0,  # 激進模式：直接掛在最佳價
+        clock: Optional[Clock] = None,
+        fill_simulator: Optional[QueueFillSimulator] = None
     ):
         """
         Args:
@@ -137,7 +158,11 @@ class MakerOrderManager:
             maker_offset_bps: 掛單價格偏移 (相對於最佳價的基點數)
                              - 正數: 更保守 (更容易成交但可能滑點)
                              - 負數: 更激進 (可能搶到更好價格但成交率低)
+            clock: 時鐘 (預設系統時間；重放時注入 SimulatedClock)
+            fill_simulator: 佇列成交模擬器；提供時改用佇列位置判斷成交 (含部分成交)，
+                            需由 on_depth / on_trade 餵入行情，尚無深度時退回觸價規則
         """
+        self.clock: Clock = clock or get_clock()
         self.default_timeout = default_timeout
         self.default_taker_fallback = default_taker_fallback
         self.maker_offset_bps = maker_offset_bps
@@ -146,10 +171,14 @@ class MakerOrderManager:
         # 待處理的 Maker 訂單
         self.pending_orders: Dict[str, MakerOrder] = {}
         
+        # 佇列成交模擬 (None = 觸價規則)
+        self.fill_simulator = fill_simulator
+        
         # 統計
         self.stats = {
             "total_orders": 0,
             "filled_as_maker": 0,
+            "partial_fills": 0,
             "taker_fallback": 0,
             "cancelled": 0,
             "expired": 0,
@@ -221,7 +250,7 @@ class MakerOrderManager:
         Args:
             custom_limit_price: 自訂限價 (如果提供，覆蓋自動計算)
         """
-        order_id = f"MK_{strategy}_{int(time.time()*1000)}"
+        order_id = f"MK_{strategy}_{int(self.clock.time()*1000)}"
         
         # 決定掛單價格
         if custom_limit_price and custom_limit_price > 0:
@@ -241,14 +270,58 @@ class MakerOrderManager:
             allow_taker_fallback=allow_taker_fallback if allow_taker_fallback is not None else self.default_taker_fallback,
             strategy=strategy,
             reason=reason,
-            market_data=market_data or {}
+            market_data=market_data or {},
+            created_at=self.clock.time(),
+            clock=self.clock
         )
         
         self.pending_orders[order_id] = order
         self.stats["total_orders"] += 1
         
+        if self.fill_simulator is not None:
+            self.fill_simulator.place(
+                order_id,
+                direction,
+                limit_price,
+                order.base_quantity,
+                timestamp_ms=int(self.clock.time() * 1000)
+            )
+        
         return order
     
+    # ==================== 佇列成交模擬 ====================
+    
+    def on_depth(self, bids: list, asks: list, event_time_ms: Optional[int] = None) -> None:
+        """餵入深度快照 (佇列模式)"""
+        if self.fill_simulator is not None:
+            self.fill_simulator.on_depth(bids, asks, event_time_ms)
+    
+    def on_trade(self, price: float, qty: float, is_buyer_maker: bool, event_time_ms: Optional[int] = None) -> None:
+        """餵入成交 (佇列模式)"""
+        if self.fill_simulator is not None:
+            self.fill_simulator.on_trade(price, qty, is_buyer_maker, event_time_ms)
+    
+    def _apply_queue_fills(self, order: MakerOrder) -> Optional[str]:
+        """把模擬器累積的成交套用到訂單，回傳 "FILLED" / "PARTIAL" (有新成交) / None"""
+        state = self.fill_simulator.get(order.order_id)
+        if state is None:
+            return None
+        filled_usdt = order.quantity_usdt * state.fill_ratio
+        if filled_usdt <= order.filled_quantity_usdt:
+            return None
+        order.filled_quantity_usdt = filled_usdt
+        order.filled_price = order.limit_price
+        if state.is_complete:
+            order.status = MakerOrderStatus.FILLED
+            order.filled_at = self.clock.time()
+            return "FILLED"
+        order.status = MakerOrderStatus.PARTIALLY_FILLED
+        return "PARTIAL"
+    
+    def _release(self, order_id: str) -> None:
+        if self.fill_simulator is not None:
+            self.fill_simulator.release(order_id)
+    
     def update_orders(
         self,
         current_price: float,
@@ -258,22 +331,36 @@ class MakerOrderManager:
         """
         更新所有待處理訂單
         
+        有 fill_simulator 且已收到深度時，成交由佇列位置決定 (on_depth / on_trade 累積)；
+        否則使用觸價規則 (check_fill)。
+        
         Returns:
             List of (order, action) where action is:
             - "FILLED": Maker 成交
-            - "TAKER_FALLBACK": 超時改用 Taker
-            - "CANCELLED": 超時且不允許 Taker
+            - "PARTIAL": 部分成交 (佇列模式，仍在掛單；order.fill_ratio 為已成交比例)
+            - "TAKER_FALLBACK": 超時改用 Taker (部分成交時只有剩餘部分用 Taker)
+            - "CANCELLED": 超時且不允許 Taker (order.filled_quantity_usdt 為已成交部分)
             - None: 繼續等待
         """
         results = []
         orders_to_remove = []
+        use_queue = self.fill_simulator is not None and self.fill_simulator.has_book
         
         for order_id, order in self.pending_orders.items():
-            if order.status != MakerOrderStatus.PENDING:
+            if order.status not in (MakerOrderStatus.PENDING, MakerOrderStatus.PARTIALLY_FILLED):
                 continue
             
             # 檢查是否成交
-            if order.check_fill(current_price, best_bid, best_ask):
+            if use_queue:
+                action = self._apply_queue_fills(order)
+                if action == "PARTIAL":
+                    self.stats["partial_fills"] += 1
+                    results.append((order, "PARTIAL"))
+                filled = action == "FILLED"
+            else:
+                filled = order.check_fill(current_price, best_bid, best_ask)
+            
+            if filled:
                 fill_time = order.get_fill_wait_time()
                 self.fill_times.append(fill_time)
                 self.stats["filled_as_maker"] += 1
@@ -291,8 +378,11 @@ class MakerOrderManager:
             if order.is_expired():
                 if order.allow_taker_fallback:
                     order.status = MakerOrderStatus.TAKER_FALLBACK
-                    order.filled_price = current_price * (1.0002 if order.direction == "LONG" else 0.9998)
-                    order.filled_at = time.time()
+                    taker_price = current_price * (1.0002 if order.direction == "LONG" else 0.9998)
+                    maker_ratio = order.fill_ratio
+                    # 部分成交：Maker 部分在掛單價，剩餘用 Taker
+                    order.filled_price = order.limit_price * maker_ratio + taker_price * (1 - maker_ratio)
+                    order.filled_at = self.clock.time()
                     self.stats["taker_fallback"] += 1
                     results.append((order, "TAKER_FALLBACK"))
                 else:
@@ -305,6 +395,7 @@ class MakerOrderManager:
         # 清理已處理的訂單
         for order_id in orders_to_remove:
             del self.pending_orders[order_id]
+            self._release(order_id)
         
         # 更新統計
         self._update_stats()
@@ -317,6 +408,7 @@ class MakerOrderManager:
             self.pending_orders[order_id].status = MakerOrderStatus.CANCELLED
             self.stats["cancelled"] += 1
             del self.pending_orders[order_id]
+            self._release(order_id)
             return True
         return False
     
@@ -339,6 +431,7 @@ class MakerOrderManager:
             f"📊 Maker 統計:\n"
             f"   總訂單: {self.stats['total_orders']}\n"
             f"   Maker成交: {self.stats['filled_as_maker']} ({self.stats['maker_rate']*100:.1f}%)\n"
+            f"   部分成交: {self.stats['partial_fills']}\n"
             f"   Taker補單: {self.stats['taker_fallback']}\n"
             f"   取消: {self.stats['cancelled']}\n"
             f"   平均等待: {self.stats['avg_fill_time']:.1f}s\n"
@@ -11,12 +11,9 @@ OBI (Order Book Imbalance) 計算模組
 - 趨勢分析與統計
 """
 
-import asyncio
-import json
 import time
 from typing import Dict, Optional, Callable, List, Tuple
 from datetime import datetime
-from collections import deque
 from enum import Enum
 import numpy as np
 
@@ -25,6 +22,9 @@ try:
 except ImportError:
     websockets = None
 
+from ..core.market_records import OBIHistory
+from .stream_mux import SPOT_STREAM_WS, BinanceStreamMux
+
 
 class OBISignal(Enum):
     """OBI 訊號類型"""
@@ -100,8 +100,8 @@ class OBICalculator:
             'last_update': None
         }
         
-        # OBI 歷史
-        self.obi_history: deque = deque(maxlen=history_size)
+        # OBI 歷史 (欄位式 ring，讀取時組回 OBISample；仍可用 item['obi'] 讀取)
+        self.obi_history = OBIHistory(history_size)
         
         # 持倉信息（用於離場判斷）
         self.position: Optional[str] = None  # 'LONG' or 'SHORT'
@@ -110,7 +110,7 @@ class OBICalculator:
         self.min_obi: Optional[float] = None   # 持倉期間最小 OBI（空單）
         
         # WebSocket 相關
-        self.ws = None
+        self.mux: Optional[BinanceStreamMux] = None
         self.is_running = False
         
         # 回調函數
@@ -306,9 +306,8 @@ class OBICalculator:
         if len(self.obi_history) < window:
             return None
         
-        # 取最近 window 個樣本，提取 obi 值
-        recent_obis = [item['obi'] if isinstance(item, dict) else item 
-                       for item in list(self.obi_history)[-window:]]
+        # 取最近 window 個樣本的 obi 欄位 (直接讀欄位，不組紀錄)
+        recent_obis = self.obi_history.column('obi', last_n=window)
         
         # 使用線性擬合計算斜率
         x = np.arange(window)
@@ -342,13 +341,10 @@ class OBICalculator:
         
         # 計算速度序列
         velocities = []
-        history_list = list(self.obi_history)
+        history_list = self.obi_history.column('obi')
         
         for i in range(len(history_list) - window + 1):
-            window_data = history_list[i:i+window]
-            # 提取 obi 值
-            obi_values = [item['obi'] if isinstance(item, dict) else item 
-                         for item in window_data]
+            obi_values = history_list[i:i+window]
             
             x = np.arange(window)
             y = np.array(obi_values)
@@ -475,13 +471,7 @@ class OBICalculator:
         
         # 從歷史中提取 microprice 相關數據
         # 注意：需要先在 update_orderbook 中儲存 microprice
-        recent = list(self.obi_history)[-window:]
-        
-        # 如果歷史中沒有 microprice 資料，即時計算
-        pressures = []
-        for item in recent:
-            if isinstance(item, dict) and 'microprice_pressure' in item:
-                pressures.append(item['microprice_pressure'])
+        pressures = self.obi_history.column('microprice_pressure', last_n=window)
         
         if len(pressures) < window:
             return None
@@ -695,9 +685,10 @@ class OBICalculator:
             bids: 買單列表
             asks: 賣單列表
         """
+        now = datetime.utcnow()
         self.orderbook['bids'] = bids
         self.orderbook['asks'] = asks
-        self.orderbook['last_update'] = datetime.utcnow()
+        self.orderbook['last_update'] = now
         
         # 計算 OBI
         obi = self.calculate_obi(bids, asks)
@@ -706,21 +697,21 @@ class OBICalculator:
         # 計算 Microprice（Task 1.6.1 - B2）
         microprice_data = self.calculate_microprice(bids, asks)
         
-        # 記錄歷史
-        self.obi_history.append({
-            'timestamp': datetime.utcnow(),
-            'obi': obi,
-            'weighted_obi': weighted_obi,
-            'bid_size': sum(float(b[1]) for b in bids[:self.depth_limit]),
-            'ask_size': sum(float(a[1]) for a in asks[:self.depth_limit]),
-            'spread': float(asks[0][0]) - float(bids[0][0]) if bids and asks else 0,
+        # 記錄歷史 (依 OBISample 欄位順序)
+        self.obi_history.append(
+            now,
+            obi,
+            weighted_obi,
+            sum(float(b[1]) for b in bids[:self.depth_limit]),                   # bid_size
+            sum(float(a[1]) for a in asks[:self.depth_limit]),                   # ask_size
+            float(asks[0][0]) - float(bids[0][0]) if bids and asks else 0,       # spread
             # Microprice 相關數據
-            'microprice': microprice_data['microprice'],
-            'mid_price': microprice_data['mid_price'],
-            'microprice_pressure': microprice_data['pressure'],
-            'bid_weight': microprice_data['bid_weight'],
-            'ask_weight': microprice_data['ask_weight']
-        })
+            microprice_data['microprice'],
+            microprice_data['mid_price'],
+            microprice_data['pressure'],
+            microprice_data['bid_weight'],
+            microprice_data['ask_weight'],
+        )
         
         # 更新統計
         self.stats['total_updates'] += 1
@@ -841,8 +832,7 @@ class OBICalculator:
         if len(self.obi_history) < periods:
             return None
         
-        recent = list(self.obi_history)[-periods:]
-        obi_values = [item['obi'] for item in recent]
+        obi_values = self.obi_history.column('obi', last_n=periods)
         
         # 線性回歸斜率
         x = np.arange(len(obi_values))
@@ -865,7 +855,7 @@ class OBICalculator:
         if not self.obi_history:
             return self.stats
         
-        obi_values = [item['obi'] for item in self.obi_history]
+        obi_values = self.obi_history.column('obi')
         trend = self.get_obi_trend()
         
         return {
@@ -891,34 +881,21 @@ class OBICalculator:
             raise ImportError("websockets 未安裝，請執行: pip install websockets")
         
         self.is_running = True
-        ws_url = f"wss://stream.binance.com:9443/ws/{self.symbol.lower()}@depth20@100ms"
+        stream = f"{self.symbol.lower()}@depth20@100ms"
         
-        print(f"🔌 連接 WebSocket: {ws_url}")
+        def on_depth(data: Dict):
+            # 現貨部分深度: {"lastUpdateId", "bids", "asks"}
+            if 'bids' in data and 'asks' in data:
+                self.update_orderbook(data['bids'], data['asks'])
+            if on_message:
+                on_message(data)
         
-        try:
-            async with websockets.connect(ws_url) as ws:
-                self.ws = ws
-                print(f"✅ WebSocket 已連接")
-                
-                while self.is_running:
-                    try:
-                        message = await asyncio.wait_for(ws.recv(), timeout=30)
-                        data = json.loads(message)
-                        
-                        # 更新訂單簿
-                        if 'bids' in data and 'asks' in data:
-                            self.update_orderbook(data['bids'], data['asks'])
-                        
-                        if on_message:
-                            on_message(data)
-                        
-                    except asyncio.TimeoutError:
-                        print("⚠️  WebSocket 接收超時")
-                        continue
-                    except Exception as e:
-                        print(f"❌ WebSocket 錯誤: {e}")
-                        break
+        self.mux = BinanceStreamMux(base_url=SPOT_STREAM_WS)
+        self.mux.subscribe(stream, on_depth, decode='dict')
+        print(f"🔌 連接 WebSocket: {self.mux.stream_urls()[0]}")
         
+        try:
+            await self.mux.run(until=lambda: not self.is_running)
         except Exception as e:
             print(f"❌ WebSocket 連接失敗: {e}")
         finally:
@@ -928,6 +905,8 @@ class OBICalculator:
     def stop_websocket(self):
         """停止 WebSocket"""
         self.is_running = False
+        if self.mux is not None:
+            self.mux.stop()
 
 
 # 便利函數
@@ -0,0 +1,586 @@
+"""
+Queue Fill Simulator - 佇列位置 Maker 成交模擬
+
+「價格碰到就成交」的假設會高估 Maker 成交率：實盤掛單要排在同價位所有既有掛單之後，
+只有同價位的成交量先吃完前面的佇列，才輪到我們。
+
+原理:
+    1. 掛單時，前方佇列 (queue_ahead) = 該價位目前的 L2 掛單量
+    2. 同價位的主動成交 (賣方主動吃買單 / 買方主動吃賣單) 先扣前方佇列，
+       超出的部分才成交我們的數量 → 可能只部分成交
+    3. 深度更新時，價位量的減少若多於期間成交量，差額視為撤單；
+       撤單有多少在我們前方由 cancel_model 決定:
+         pro_rata  依前方佔比分攤 (預設)
+         front     全部在前方 (樂觀)
+         back      全部在後方 (保守)
+       新增的掛單一律排在我們後方
+    4. 成交價穿過我們的價位 (trade-through) 或對手最優價越過我們 (crossed)
+       → 整個價位被掃光，剩餘數量全部成交
+    5. 掛單價不在錄製深度的檔位範圍內時，不推論撤單，只靠成交扣佇列
+
+兩種用法共用同一份佇列狀態機 (QueueOrderState):
+    - QueueFillSimulator: 逐事件 (on_depth / on_trade)，給 MakerOrderManager / 紙上交易 / 逐筆重放
+    - simulate_queue_fills: 批次，以 numpy 預先篩出觸及價位的事件，數天的錄製也能快速掃完
+
+用法:
+    sim = QueueFillSimulator()
+    sim.on_depth(bids, asks, ts_ms)
+    sim.place("MK_1", "BUY", 100000.0, 0.01)
+    for fill in sim.on_trade(100000.0, 0.5, True, ts_ms):
+        ...  # QueueFill(order_id, qty, price, timestamp_ms, complete, reason)
+
+    book = RecordedBook.from_feed(["data/feeds/BTCUSDT_20250101.feed"])
+    results = simulate_queue_fills(book, [QueueOrderSpec(placed_ms, "BUY", price, 0.01, 30_000)])
+    print(summarize_fills(results))
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CANCEL_MODELS = ("pro_rata", "front", "back")
+
+# 價格比對容差 (相對)：錄製價格是 float64，同一檔位的價格應完全相同，這裡只吸收捨入誤差
+_PRICE_RTOL = 1e-12
+
+# 成交原因
+FILL_QUEUE = "QUEUE"                  # 同價位成交排到我們
+FILL_TRADE_THROUGH = "TRADE_THROUGH"  # 成交價穿過我們的價位
+FILL_CROSSED = "CROSSED"              # 對手最優價越過我們的價位
+
+
+def normalize_side(side: str) -> str:
+    """LONG/BUY → BUY, SHORT/SELL → SELL"""
+    side = side.upper()
+    if side in ("BUY", "LONG"):
+        return "BUY"
+    if side in ("SELL", "SHORT"):
+        return "SELL"
+    raise ValueError(f"unknown side: {side}")
+
+
+def _same_price(a: float, b: float) -> bool:
+    return abs(a - b) <= _PRICE_RTOL * max(abs(a), abs(b))
+
+
+def level_quantity(levels: Sequence[Sequence[float]], price: float, is_bid: bool) -> Tuple[float, bool]:
+    """
+    取得掛單價位在同側深度中的掛單量
+
+    Returns:
+        (quantity, visible): visible=False 表示價位在錄製檔位之外 (量未知)
+    """
+    if not levels:
+        return 0.0, False
+    for px, qty in levels:
+        px = float(px)
+        if _same_price(px, price):
+            return float(qty), True
+        # 同側深度由最優價往外排序：已經越過掛單價 → 這個價位沒有掛單
+        if (is_bid and px < price) or (not is_bid and px > price):
+            return 0.0, True
+    return 0.0, False
+
+
+@dataclass
+class QueueFill:
+    """一次成交 (可能是部分成交)"""
+
+    order_id: str
+    qty: float
+    price: float
+    timestamp_ms: Optional[int]
+    complete: bool
+    reason: str
+
+
+@dataclass
+class QueueOrderState:
+    """
+    單筆掛單的佇列狀態機
+
+    quantity / queue_ahead / level_qty 的單位與深度數量相同 (BTC)。
+    """
+
+    order_id: str
+    side: str                              # "BUY" or "SELL"
+    price: float
+    quantity: float
+    queue_ahead: float = 0.0
+    queue_known: bool = False              # 掛單時沒有深度 → 第一次看到價位量時才初始化
+    queue_at_place: Optional[float] = None
+    level_qty: Optional[float] = None      # 上一次深度中的價位量
+    traded_since_depth: float = 0.0        # 上一次深度之後，同價位的成交量
+    filled_qty: float = 0.0
+    placed_ms: Optional[int] = None
+    first_fill_ms: Optional[int] = None
+    last_fill_ms: Optional[int] = None
+    reason: Optional[str] = None
+
+    @property
+    def remaining(self) -> float:
+        return max(self.quantity - self.filled_qty, 0.0)
+
+    @property
+    def is_complete(self) -> bool:
+        return self.remaining <= self.quantity * 1e-9
+
+    @property
+    def fill_ratio(self) -> float:
+        return self.filled_qty / self.quantity if self.quantity > 0 else 0.0
+
+    @property
+    def is_bid(self) -> bool:
+        return self.side == "BUY"
+
+    def _fill(self, qty: float, timestamp_ms: Optional[int], reason: str) -> Optional[QueueFill]:
+        qty = min(qty, self.remaining)
+        if qty <= 0:
+            return None
+        self.filled_qty += qty
+        if self.first_fill_ms is None:
+            self.first_fill_ms = timestamp_ms
+        self.last_fill_ms = timestamp_ms
+        self.reason = reason
+        complete = self.is_complete
+        if complete:
+            self.filled_qty = self.quantity
+        return QueueFill(self.order_id, qty, self.price, timestamp_ms, complete, reason)
+
+    def init_queue(self, level_qty: float, visible: bool) -> None:
+        """以目前價位量初始化前方佇列 (價位不可見時前方佇列視為 0，等第一次看到再修正)"""
+        if visible:
+            self.queue_ahead = level_qty
+            self.level_qty = level_qty
+            self.queue_known = True
+            self.queue_at_place = level_qty
+        self.traded_since_depth = 0.0
+
+    def on_level_trade(self, qty: float, timestamp_ms: Optional[int] = None) -> Optional[QueueFill]:
+        """同價位的主動成交：先扣前方佇列，超出部分成交我們"""
+        self.traded_since_depth += qty
+        consumed = min(self.queue_ahead, qty)
+        self.queue_ahead -= consumed
+        return self._fill(qty - consumed, timestamp_ms, FILL_QUEUE)
+
+    def on_level_depth(self, level_qty: float, cancel_model: str = "pro_rata") -> None:
+        """價位量更新：推論撤單、新掛單排到後方"""
+        if not self.queue_known:
+            self.init_queue(level_qty, True)
+            return
+        prev = self.level_qty if self.level_qty is not None else level_qty
+        expected = max(prev - self.traded_since_depth, 0.0)
+        cancelled = expected - level_qty
+        if cancelled > 0 and self.queue_ahead > 0:
+            if cancel_model == "front":
+                self.queue_ahead -= cancelled
+            elif cancel_model == "pro_rata":
+                self.queue_ahead -= cancelled * min(self.queue_ahead / expected, 1.0)
+        # 前方佇列不可能多於整個價位的量
+        self.queue_ahead = max(min(self.queue_ahead, level_qty), 0.0)
+        self.level_qty = level_qty
+        self.traded_since_depth = 0.0
+
+    def fill_rest(self, timestamp_ms: Optional[int], reason: str) -> Optional[QueueFill]:
+        """價位被掃穿 → 剩餘數量全部成交"""
+        self.queue_ahead = 0.0
+        return self._fill(self.remaining, timestamp_ms, reason)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data['remaining'] = self.remaining
+        data['fill_ratio'] = round(self.fill_ratio, 6)
+        return data
+
+
+class QueueFillSimulator:
+    """
+    逐事件佇列成交模擬器
+
+    持有最新一筆深度；place() 依該深度初始化前方佇列。
+    on_trade / on_depth 回傳這個事件造成的成交 (含部分成交)，
+    完全成交的訂單會留在模擬器內直到 cancel()/release()，方便查詢最終狀態。
+    """
+
+    def __init__(self, cancel_model: str = "pro_rata"):
+        """
+        Args:
+            cancel_model: 撤單歸屬模型 ("pro_rata" / "front" / "back")
+        """
+        if cancel_model not in CANCEL_MODELS:
+            raise ValueError(f"cancel_model must be one of {CANCEL_MODELS}")
+        self.cancel_model = cancel_model
+        self.orders: Dict[str, QueueOrderState] = {}
+        self.bids: List[Sequence[float]] = []
+        self.asks: List[Sequence[float]] = []
+        self.last_depth_ms: Optional[int] = None
+
+    @property
+    def has_book(self) -> bool:
+        return bool(self.bids and self.asks)
+
+    def place(
+        self,
+        order_id: str,
+        side: str,
+        price: float,
+        quantity: float,
+        timestamp_ms: Optional[int] = None,
+    ) -> QueueOrderState:
+        """登記一筆掛單 (quantity 為基礎幣數量)；已越過對手價的掛單立即成交"""
+        state = QueueOrderState(
+            order_id=order_id,
+            side=normalize_side(side),
+            price=float(price),
+            quantity=float(quantity),
+            placed_ms=timestamp_ms,
+        )
+        if self.has_book:
+            qty, visible = level_quantity(self.bids if state.is_bid else self.asks, state.price, state.is_bid)
+            state.init_queue(qty, visible)
+            if self._crossed(state):
+                state.fill_rest(timestamp_ms, FILL_CROSSED)
+        self.orders[order_id] = state
+        return state
+
+    def get(self, order_id: str) -> Optional[QueueOrderState]:
+        return self.orders.get(order_id)
+
+    def cancel(self, order_id: str) -> Optional[QueueOrderState]:
+        """移除掛單並回傳最終狀態 (filled_qty 即已部分成交的數量)"""
+        return self.orders.pop(order_id, None)
+
+    release = cancel
+
+    def _crossed(self, state: QueueOrderState) -> bool:
+        if state.is_bid:
+            return bool(self.asks) and float(self.asks[0][0]) <= state.price
+        return bool(self.bids) and float(self.bids[0][0]) >= state.price
+
+    def on_trade(
+        self,
+        price: float,
+        qty: float,
+        is_buyer_maker: bool,
+        timestamp_ms: Optional[int] = None,
+    ) -> List[QueueFill]:
+        """
+        處理一筆成交
+
+        is_buyer_maker=True → 賣方主動，只會成交買單；False → 買方主動，只會成交賣單。
+        """
+        fills: List[QueueFill] = []
+        price = float(price)
+        qty = float(qty)
+        for state in self.orders.values():
+            if state.is_complete or state.is_bid != bool(is_buyer_maker):
+                continue
+            if _same_price(price, state.price):
+                fill = state.on_level_trade(qty, timestamp_ms)
+            elif (price < state.price) if state.is_bid else (price > state.price):
+                fill = state.fill_rest(timestamp_ms, FILL_TRADE_THROUGH)
+            else:
+                continue
+            if fill is not None:
+                fills.append(fill)
+        return fills
+
+    def on_depth(
+        self,
+        bids: Sequence[Sequence[float]],
+        asks: Sequence[Sequence[float]],
+        timestamp_ms: Optional[int] = None,
+    ) -> List[QueueFill]:
+        """處理一筆深度快照"""
+        self.bids = bids
+        self.asks = asks
+        self.last_depth_ms = timestamp_ms
+        fills: List[QueueFill] = []
+        for state in self.orders.values():
+            if state.is_complete:
+                continue
+            if self._crossed(state):
+                fill = state.fill_rest(timestamp_ms, FILL_CROSSED)
+                if fill is not None:
+                    fills.append(fill)
+                continue
+            qty, visible = level_quantity(bids if state.is_bid else asks, state.price, state.is_bid)
+            if visible:
+                state.on_level_depth(qty, self.cancel_model)
+        return fills
+
+
+# ==================== 批次模擬 ====================
+
+@dataclass
+class RecordedBook:
+    """
+    列式行情 (numpy)：批次模擬的輸入
+
+    深度價量為 (n, levels) 矩陣，不足檔數補 0；同毫秒成交先於深度。
+    """
+
+    trade_ts: np.ndarray          # int64[n]
+    trade_px: np.ndarray          # float64[n]
+    trade_qty: np.ndarray         # float64[n]
+    trade_buyer_maker: np.ndarray  # bool[n]
+    depth_ts: np.ndarray          # int64[m]
+    bid_px: np.ndarray            # float64[m, L]
+    bid_qty: np.ndarray
+    ask_px: np.ndarray
+    ask_qty: np.ndarray
+
+    @classmethod
+    def from_feed(
+        cls,
+        paths: Sequence[Union[str, Path]],
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+    ) -> "RecordedBook":
+        """從二進位錄製檔 (feed_recording.py) 逐區塊讀成 numpy 陣列"""
+        from ..backtesting.feed_recording import FeedReader
+
+        readers = sorted((FeedReader(p) for p in paths), key=lambda r: r.time_range[0])
+        levels = max((r.depth_levels for r in readers), default=1)
+        trades: List[Tuple[np.ndarray, ...]] = []
+        depth: List[Tuple[np.ndarray, ...]] = []
+        for reader in readers:
+            for ts, px, qty, flags in reader.iter_trade_columns(start_ms, end_ms):
+                trades.append((
+                    np.frombuffer(ts, dtype=np.int64),
+                    np.frombuffer(px, dtype=np.float64),
+                    np.frombuffer(qty, dtype=np.float64),
+                    np.frombuffer(flags, dtype=np.uint8).astype(bool),
+                ))
+            n_levels = reader.depth_levels
+            for ts, _nb, _na, bpx, bqty, apx, aqty in reader.iter_depth_columns(start_ms, end_ms):
+                cols = [np.frombuffer(c, dtype=np.float64).reshape(len(ts), n_levels) for c in (bpx, bqty, apx, aqty)]
+                if n_levels < levels:
+                    cols = [np.pad(c, ((0, 0), (0, levels - n_levels))) for c in cols]
+                depth.append((np.frombuffer(ts, dtype=np.int64), *cols))
+        book = cls.from_arrays(trades, depth, levels)
+        return book.between(start_ms, end_ms)
+
+    @classmethod
+    def from_arrays(cls, trades: List[Tuple[np.ndarray, ...]], depth: List[Tuple[np.ndarray, ...]], levels: int) -> "RecordedBook":
+        def cat(parts: List[Tuple[np.ndarray, ...]], i: int, empty: np.ndarray) -> np.ndarray:
+            return np.concatenate([p[i] for p in parts]) if parts else empty
+
+        empty_levels = np.zeros((0, levels))
+        trade_ts = cat(trades, 0, np.zeros(0, np.int64))
+        depth_ts = cat(depth, 0, np.zeros(0, np.int64))
+        # 多個錄製檔可能時間交錯：穩定排序保留同毫秒內的原始順序
+        t_order = np.argsort(trade_ts, kind="stable")
+        d_order = np.argsort(depth_ts, kind="stable")
+        return cls(
+            trade_ts=trade_ts[t_order],
+            trade_px=cat(trades, 1, np.zeros(0))[t_order],
+            trade_qty=cat(trades, 2, np.zeros(0))[t_order],
+            trade_buyer_maker=cat(trades, 3, np.zeros(0, bool))[t_order],
+            depth_ts=depth_ts[d_order],
+            bid_px=cat(depth, 1, empty_levels)[d_order],
+            bid_qty=cat(depth, 2, empty_levels)[d_order],
+            ask_px=cat(depth, 3, empty_levels)[d_order],
+            ask_qty=cat(depth, 4, empty_levels)[d_order],
+        )
+
+    def between(self, start_ms: Optional[int], end_ms: Optional[int]) -> "RecordedBook":
+        lo_t = 0 if start_ms is None else int(np.searchsorted(self.trade_ts, start_ms, "left"))
+        hi_t = len(self.trade_ts) if end_ms is None else int(np.searchsorted(self.trade_ts, end_ms, "right"))
+        lo_d = 0 if start_ms is None else int(np.searchsorted(self.depth_ts, start_ms, "left"))
+        hi_d = len(self.depth_ts) if end_ms is None else int(np.searchsorted(self.depth_ts, end_ms, "right"))
+        return RecordedBook(
+            self.trade_ts[lo_t:hi_t], self.trade_px[lo_t:hi_t], self.trade_qty[lo_t:hi_t],
+            self.trade_buyer_maker[lo_t:hi_t], self.depth_ts[lo_d:hi_d],
+            self.bid_px[lo_d:hi_d], self.bid_qty[lo_d:hi_d], self.ask_px[lo_d:hi_d], self.ask_qty[lo_d:hi_d],
+        )
+
+    def best_prices(self, timestamp_ms: int) -> Tuple[Optional[float], Optional[float]]:
+        """某時間點 (含) 之前最後一筆深度的最優買賣價"""
+        i = int(np.searchsorted(self.depth_ts, timestamp_ms, "right")) - 1
+        if i < 0:
+            return None, None
+        return float(self.bid_px[i, 0]), float(self.ask_px[i, 0])
+
+
+@dataclass
+class QueueOrderSpec:
+    """批次模擬的掛單"""
+
+    placed_ms: int
+    side: str           # "BUY"/"SELL" (或 LONG/SHORT)
+    price: float
+    quantity: float     # 基礎幣數量
+    timeout_ms: int
+    order_id: str = ""
+
+
+@dataclass
+class QueueFillResult:
+    """批次模擬結果"""
+
+    order_id: str
+    side: str
+    price: float
+    quantity: float
+    placed_ms: int
+    filled_qty: float
+    fill_ratio: float
+    queue_at_place: Optional[float]
+    first_fill_ms: Optional[int]
+    complete_ms: Optional[int]     # 完全成交時間 (None = 超時時未完全成交)
+    reason: Optional[str]          # 最後一次成交原因
+
+    @property
+    def wait_ms(self) -> Optional[int]:
+        return None if self.complete_ms is None else self.complete_ms - self.placed_ms
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data['wait_ms'] = self.wait_ms
+        return data
+
+
+def _level_series(px: np.ndarray, qty: np.ndarray, price: float, is_bid: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """每筆深度中，掛單價位的量與是否可見 (價位在錄製檔位範圍內)"""
+    match = np.abs(px - price) <= _PRICE_RTOL * price
+    level = np.where(match, qty, 0.0).sum(axis=1)
+    valid = px > 0
+    if is_bid:
+        visible = valid.any(axis=1) & (price >= np.where(valid, px, np.inf).min(axis=1))
+    else:
+        visible = valid.any(axis=1) & (price <= np.where(valid, px, -np.inf).max(axis=1))
+    return level, visible
+
+
+def _simulate_one(book: RecordedBook, spec: QueueOrderSpec, cancel_model: str) -> QueueFillResult:
+    side = normalize_side(spec.side)
+    is_bid = side == "BUY"
+    t0, t1 = int(spec.placed_ms), int(spec.placed_ms + spec.timeout_ms)
+    state = QueueOrderState(spec.order_id, side, float(spec.price), float(spec.quantity), placed_ms=t0)
+    own_px, own_qty, opp_px = (book.bid_px, book.bid_qty, book.ask_px) if is_bid else (book.ask_px, book.ask_qty, book.bid_px)
+
+    # 掛單當下的深度 (時間 <= t0 的最後一筆)：初始化佇列、檢查是否已越價
+    d_place = int(np.searchsorted(book.depth_ts, t0, "right")) - 1
+    d_lo, d_hi = d_place + 1, int(np.searchsorted(book.depth_ts, t1, "right"))
+    if d_place >= 0:
+        level, visible = _level_series(own_px[d_place:d_place + 1], own_qty[d_place:d_place + 1], state.price, is_bid)
+        state.init_queue(float(level[0]), bool(visible[0]))
+        opp0 = opp_px[d_place, 0]
+        if opp0 > 0 and (opp0 <= state.price if is_bid else opp0 >= state.price):
+            state.fill_rest(t0, FILL_CROSSED)
+
+    # 視窗內與我們同側的成交 (賣方主動 → 買單；買方主動 → 賣單)
+    t_lo, t_hi = int(np.searchsorted(book.trade_ts, t0, "right")), int(np.searchsorted(book.trade_ts, t1, "right"))
+    tr_ts = book.trade_ts[t_lo:t_hi]
+    tr_px = book.trade_px[t_lo:t_hi]
+    ours = book.trade_buyer_maker[t_lo:t_hi] == is_bid
+    at_level = ours & (np.abs(tr_px - state.price) <= _PRICE_RTOL * state.price)
+    through = ours & ((tr_px < state.price) if is_bid else (tr_px > state.price)) & ~at_level
+
+    # 對手最優價越過我們的第一筆深度
+    opp_best = opp_px[d_lo:d_hi, 0]
+    crossed = (opp_best > 0) & ((opp_best <= state.price) if is_bid else (opp_best >= state.price))
+
+    # 終止事件 (排序鍵: 時間, 種類 0=成交 1=深度)
+    end_key: Optional[Tuple[int, int]] = None
+    end_reason = None
+    if through.any():
+        end_key, end_reason = (int(tr_ts[np.argmax(through)]), 0), FILL_TRADE_THROUGH
+    if crossed.any():
+        key = (int(book.depth_ts[d_lo + np.argmax(crossed)]), 1)
+        if end_key is None or key < end_key:
+            end_key, end_reason = key, FILL_CROSSED
+
+    if not state.is_complete:
+        # 只走訪會改變佇列的事件：同價位成交、價位量變化的深度、成交後的第一筆深度
+        lvl_idx = np.flatnonzero(at_level)
+        lvl_ts, lvl_qty = tr_ts[lvl_idx], book.trade_qty[t_lo:t_hi][lvl_idx]
+        d_ts = book.depth_ts[d_lo:d_hi]
+        level, visible = _level_series(own_px[d_lo:d_hi], own_qty[d_lo:d_hi], state.price, is_bid)
+        prev_level = np.r_[np.nan if state.level_qty is None else state.level_qty, level[:-1]]
+        keep = visible & (level != prev_level)
+        if len(lvl_ts):
+            after_trade = np.searchsorted(d_ts, lvl_ts, "left")
+            keep[after_trade[after_trade < len(d_ts)]] = True
+            keep &= visible
+        d_idx = np.flatnonzero(keep)
+
+        events = [(int(t), 0, float(q)) for t, q in zip(lvl_ts, lvl_qty)]
+        events += [(int(d_ts[i]), 1, float(level[i])) for i in d_idx]
+        events.sort(key=lambda e: (e[0], e[1]))
+        for ts, kind, value in events:
+            if end_key is not None and (ts, kind) >= end_key:
+                break
+            if kind == 0:
+                state.on_level_trade(value, ts)
+            else:
+                state.on_level_depth(value, cancel_model)
+            if state.is_complete:
+                break
+        if end_key is not None and not state.is_complete:
+            state.fill_rest(end_key[0], end_reason)
+
+    return QueueFillResult(
+        order_id=spec.order_id,
+        side=side,
+        price=state.price,
+        quantity=state.quantity,
+        placed_ms=t0,
+        filled_qty=state.filled_qty,
+        fill_ratio=state.fill_ratio,
+        queue_at_place=state.queue_at_place,
+        first_fill_ms=state.first_fill_ms,
+        complete_ms=state.last_fill_ms if state.is_complete else None,
+        reason=state.reason,
+    )
+
+
+def simulate_queue_fills(
+    book: RecordedBook,
+    orders: Sequence[QueueOrderSpec],
+    cancel_model: str = "pro_rata",
+) -> List[QueueFillResult]:
+    """
+    批次模擬多筆掛單 (各自獨立，不互相排隊)
+
+    每筆訂單用 searchsorted 切出自己的時間視窗，以 numpy 找出穿價 / 越價的終止點與
+    價位量序列，Python 迴圈只走訪真正改變佇列的少數事件。
+
+    Args:
+        book: 列式行情
+        orders: 掛單清單
+        cancel_model: 撤單歸屬模型 ("pro_rata" / "front" / "back")
+
+    Returns:
+        與 orders 同順序的 QueueFillResult
+    """
+    if cancel_model not in CANCEL_MODELS:
+        raise ValueError(f"cancel_model must be one of {CANCEL_MODELS}")
+    return [_simulate_one(book, spec, cancel_model) for spec in orders]
+
+
+def summarize_fills(results: Sequence[QueueFillResult]) -> Dict[str, float]:
+    """成交率摘要：完全成交率、部分成交率、平均成交比例、完全成交的等待時間"""
+    n = len(results)
+    if n == 0:
+        return {"orders": 0, "fill_rate": 0.0, "partial_rate": 0.0, "avg_fill_ratio": 0.0,
+                "avg_wait_sec": 0.0, "median_wait_sec": 0.0}
+    ratios = np.array([r.fill_ratio for r in results])
+    waits = np.array([r.wait_ms for r in results if r.wait_ms is not None], dtype=float) / 1000
+    complete = ratios >= 1.0 - 1e-9
+    return {
+        "orders": n,
+        "fill_rate": float(complete.mean()),
+        "partial_rate": float(((ratios > 0) & ~complete).mean()),
+        "avg_fill_ratio": float(ratios.mean()),
+        "avg_wait_sec": float(waits.mean()) if len(waits) else 0.0,
+        "median_wait_sec": float(np.median(waits)) if len(waits) else 0.0,
+    }
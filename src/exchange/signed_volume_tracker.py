@@ -8,10 +8,11 @@ Signed Volume Tracker - Task 1.6.1 - B3
 """
 
 from typing import List, Dict, Optional, Callable
-from collections import deque
 from datetime import datetime
 import numpy as np
 
+from ..core.market_records import SignedTrade, SignedTradeTape
+
 
 class SignedVolumeTracker:
     """
@@ -41,8 +42,8 @@ class SignedVolumeTracker:
         self.history_size = history_size
         self.window_size = window_size
         
-        # 交易歷史
-        self.trades: deque = deque(maxlen=history_size)
+        # 交易歷史 (欄位式 ring，讀取時組回 SignedTrade；仍可用 t['side'] 讀取)
+        self.trades = SignedTradeTape(history_size)
         
         # 最後價格（用於 tick rule）
         self.last_price: Optional[float] = None
@@ -123,15 +124,10 @@ class SignedVolumeTracker:
         side = self.classify_trade_side(trade)
         
         # 儲存交易
-        trade_record = {
-            'timestamp': trade.get('T', datetime.utcnow().timestamp() * 1000),
-            'price': price,
-            'quantity': quantity,
-            'side': side,
-            'signed_volume': quantity * side
-        }
-        
-        self.trades.append(trade_record)
+        timestamp = trade.get('T')
+        if timestamp is None:
+            timestamp = datetime.utcnow().timestamp() * 1000
+        self.trades.append(timestamp, price, quantity, side, quantity * side)
         
         # 更新最後價格
         self.last_price = price
@@ -154,7 +150,7 @@ class SignedVolumeTracker:
         
         # 觸發回調
         if self.on_trade:
-            self.on_trade(trade_record)
+            self.on_trade(SignedTrade(timestamp, price, quantity, side, quantity * side))
     
     def calculate_signed_volume(self, window: int = None) -> float:
         """
@@ -176,8 +172,7 @@ class SignedVolumeTracker:
         if window == 0:
             return 0.0
         
-        recent_trades = list(self.trades)[-window:]
-        signed_vol = sum([t['signed_volume'] for t in recent_trades])
+        signed_vol = sum(self.trades.column('signed_volume', window))
         
         return signed_vol
     
@@ -213,10 +208,11 @@ class SignedVolumeTracker:
                 'sell_ratio': 0.0
             }
         
-        recent_trades = list(self.trades)[-window:]
+        quantities = self.trades.column('quantity', window)
+        sides = self.trades.column('side', window)
         
-        buy_volume = sum([t['quantity'] for t in recent_trades if t['side'] == 1])
-        sell_volume = sum([t['quantity'] for t in recent_trades if t['side'] == -1])
+        buy_volume = sum(q for q, side in zip(quantities, sides) if side == 1)
+        sell_volume = sum(q for q, side in zip(quantities, sides) if side == -1)
         net_volume = buy_volume - sell_volume
         total_volume = buy_volume + sell_volume
         
@@ -271,8 +267,7 @@ class SignedVolumeTracker:
         
         # 分析趨勢（使用最近的交易）
         if len(self.trades) >= 10:
-            recent = list(self.trades)[-10:]
-            sides = [t['side'] for t in recent]
+            sides = self.trades.column('side', 10)
             
             # 計算連續買/賣次數
             consecutive_buy = 0
@@ -5,6 +5,9 @@ Spread & Depth Monitor - Task 1.6.1 - B5
 - Spread（價差）: best_ask - best_bid
 - Depth（深度）: 各檔位的掛單量
 - 流動性健康度檢測
+
+深度 / 有效價差由 BookImpact 的累積陣列計算: update() 時建一次，
+之後同一份 bids / asks 的查詢都是 O(1) / 一次 searchsorted。
 """
 
 from typing import List, Dict, Optional, Tuple
@@ -12,6 +15,8 @@ from collections import deque
 from datetime import datetime
 import numpy as np
 
+from .book_impact import BookImpact
+
 
 class SpreadDepthMonitor:
     """
@@ -45,6 +50,9 @@ class SpreadDepthMonitor:
         # 歷史記錄
         self.spread_history: deque = deque(maxlen=history_size)
         
+        # 最新訂單簿的累積深度 (update() 時重建)
+        self.book = BookImpact()
+        
         # 統計
         self.stats = {
             'min_spread': float('inf'),
@@ -143,33 +151,7 @@ class SpreadDepthMonitor:
                 'ask_value': 0.0
             }
         
-        # 取前 N 層
-        bids_slice = bids[:min(levels, len(bids))]
-        asks_slice = asks[:min(levels, len(asks))]
-        
-        # 計算深度（數量）
-        bid_depth = sum([float(b[1]) for b in bids_slice])
-        ask_depth = sum([float(a[1]) for a in asks_slice])
-        total_depth = bid_depth + ask_depth
-        
-        # 計算價值（數量 * 價格）
-        bid_value = sum([float(b[0]) * float(b[1]) for b in bids_slice])
-        ask_value = sum([float(a[0]) * float(a[1]) for a in asks_slice])
-        
-        # 深度失衡
-        if total_depth > 0:
-            depth_imbalance = (bid_depth - ask_depth) / total_depth
-        else:
-            depth_imbalance = 0.0
-        
-        return {
-            'bid_depth': bid_depth,
-            'ask_depth': ask_depth,
-            'total_depth': total_depth,
-            'depth_imbalance': depth_imbalance,
-            'bid_value': bid_value,
-            'ask_value': ask_value
-        }
+        return self._book_for(bids, asks).depth(levels)
     
     def calculate_depth_weighted_spread(
         self,
@@ -212,6 +194,12 @@ class SpreadDepthMonitor:
             'liquidity_penalty': liquidity_penalty
         }
     
+    def _book_for(self, bids: List[List[float]], asks: List[List[float]]) -> BookImpact:
+        """同一份訂單簿沿用 update() 建好的累積陣列，否則臨時建一份"""
+        if self.book.is_source(bids, asks):
+            return self.book
+        return BookImpact(bids, asks)
+    
     def calculate_effective_spread(
         self,
         bids: List[List[float]],
@@ -245,66 +233,7 @@ class SpreadDepthMonitor:
                 'slippage': 0.0
             }
         
-        mid_price = (float(bids[0][0]) + float(asks[0][0])) / 2
-        
-        # 計算買入有效價格（吃賣單）
-        remaining_size = trade_size
-        total_cost = 0.0
-        
-        for price_str, size_str in asks:
-            price = float(price_str)
-            size = float(size_str)
-            
-            if remaining_size <= size:
-                total_cost += remaining_size * price
-                remaining_size = 0
-                break
-            else:
-                total_cost += size * price
-                remaining_size -= size
-        
-        if remaining_size > 0:
-            # 流動性不足
-            effective_buy_price = float('inf')
-        else:
-            effective_buy_price = total_cost / trade_size
-        
-        # 計算賣出有效價格（吃買單）
-        remaining_size = trade_size
-        total_revenue = 0.0
-        
-        for price_str, size_str in bids:
-            price = float(price_str)
-            size = float(size_str)
-            
-            if remaining_size <= size:
-                total_revenue += remaining_size * price
-                remaining_size = 0
-                break
-            else:
-                total_revenue += size * price
-                remaining_size -= size
-        
-        if remaining_size > 0:
-            # 流動性不足
-            effective_sell_price = 0.0
-        else:
-            effective_sell_price = total_revenue / trade_size
-        
-        # 有效價差
-        if effective_buy_price != float('inf') and effective_sell_price > 0:
-            effective_spread = (effective_buy_price - effective_sell_price) / mid_price
-            slippage = ((effective_buy_price + effective_sell_price) / 2 - mid_price) / mid_price
-        else:
-            effective_spread = float('inf')
-            slippage = float('inf')
-        
-        return {
-            'effective_buy_price': effective_buy_price,
-            'effective_sell_price': effective_sell_price,
-            'effective_spread': effective_spread,
-            'slippage': slippage
-        }
+        return self._book_for(bids, asks).effective_spread(trade_size)
     
     def detect_liquidity_crisis(
         self,
@@ -378,6 +307,7 @@ class SpreadDepthMonitor:
             bids: 買單列表
             asks: 賣單列表
         """
+        self.book.update(bids, asks)
         spread_data = self.calculate_spread(bids, asks)
         
         # 記錄歷史
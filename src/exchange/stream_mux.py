@@ -0,0 +1,689 @@
+"""
+Binance Combined Stream 多工器 (Stream Multiplexer)
+
+所有公開行情共用 /stream?streams=a/b/c 連線，依 stream 名稱分派給型別化的處理器，
+取代每個模組各開一條 (甚至巢狀兩條) WebSocket 再各自 json.loads:
+- 一條連線最多 max_streams_per_conn 個 stream，超過自動開新連線；執行中新增的 stream
+  以 SUBSCRIBE 加到既有連線，不需重連
+- 解碼: orjson > msgspec > json (擇已安裝者)；只有原始字串訂閱者時完全不解碼
+- 事件轉成 __slots__ 結構 (AggTrade / DepthUpdate / BookTicker / ForceOrder)，
+  欄位在這裡一次轉成 float/int，處理器不再重複 float(data['p'])
+- 斷線以 full jitter 指數退避重連；stale_timeout 秒沒有訊息視為假死，主動重連
+- 缺口偵測: aggTrade 的 a (聚合成交 id) 必須連號、合約 depth 的 pu 必須等於上一則的 u；
+  重連本身也記一筆缺口 (期間的推送不會補發)
+
+原理:
+    路由先用 stream_name_of() 從字串前綴取出 stream 名稱 (Binance 固定把 "stream" 放第一個)，
+    找不到訂閱者就直接丟棄；同一則訊息有多個訂閱者時只解碼 / 轉型一次。
+    處理器是 coroutine function 時，在它訂閱時所在的事件循環上執行
+    (跨執行緒用 run_coroutine_threadsafe)，同一循環則以 ensure_future 排成 task
+    (分派本身是同步的，不等待處理器完成；task 依建立順序開始執行)。
+
+用法:
+    mux = get_stream_mux()                                   # 合約行情，程序內共用
+    mux.subscribe("btcusdt@aggTrade", on_trade)              # on_trade(trade: AggTrade)
+    mux.subscribe("btcusdt@depth5@100ms", on_depth)          # on_depth(book: DepthUpdate)
+    mux.subscribe("btcusdt@forceOrder", on_liq, decode="dict")
+    mux.add_gap_listener(lambda gap: print(gap.to_dict()))
+    mux.start_background()
+
+    # 在既有事件循環內執行 (處理器與呼叫端同一執行緒)
+    mux = BinanceStreamMux()
+    mux.subscribe(...)
+    await mux.run(until=lambda: clock.now() >= end_time)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover - 依部署環境而定
+    websockets = None
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import msgspec
+    HAS_MSGSPEC = True
+except ImportError:
+    HAS_MSGSPEC = False
+
+from .binance_rest_client import background_loop
+
+logger = logging.getLogger(__name__)
+
+
+FUTURES_STREAM_WS = 'wss://fstream.binance.com'
+SPOT_STREAM_WS = 'wss://stream.binance.com:9443'
+
+DECODE_MODES = ('typed', 'dict', 'raw')
+
+if HAS_ORJSON:
+    loads = orjson.loads
+    JSON_BACKEND = 'orjson'
+elif HAS_MSGSPEC:
+    loads = msgspec.json.Decoder().decode
+    JSON_BACKEND = 'msgspec'
+else:
+    loads = json.loads
+    JSON_BACKEND = 'json'
+
+
+# ==================== 事件結構 ====================
+
+def _levels(rows: Any) -> List[List[float]]:
+    return [[float(p), float(q)] for p, q, *_ in rows or ()]
+
+
+@dataclass(slots=True)
+class AggTrade:
+    """<symbol>@aggTrade"""
+    symbol: str
+    trade_id: int
+    price: float
+    qty: float
+    time_ms: int
+    is_buyer_maker: bool
+    event_ms: int = 0
+
+    @property
+    def is_buy(self) -> bool:
+        """買方主動 (taker 為買方)"""
+        return not self.is_buyer_maker
+
+    @property
+    def value_usdt(self) -> float:
+        return self.price * self.qty
+
+    @classmethod
+    def from_wire(cls, d: Dict[str, Any]) -> 'AggTrade':
+        return cls(d.get('s', ''), int(d.get('a', 0)), float(d['p']), float(d['q']),
+                   int(d.get('T', 0)), bool(d.get('m', False)), int(d.get('E', 0)))
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class DepthUpdate:
+    """<symbol>@depth<N>[@100ms] (合約 b/a + U/u/pu；現貨部分深度 bids/asks + lastUpdateId)"""
+    symbol: str
+    bids: List[List[float]]
+    asks: List[List[float]]
+    event_ms: int = 0
+    tx_ms: int = 0
+    first_update_id: int = 0
+    last_update_id: int = 0
+    prev_update_id: int = 0
+
+    @property
+    def best_bid(self) -> float:
+        return self.bids[0][0] if self.bids else 0.0
+
+    @property
+    def best_ask(self) -> float:
+        return self.asks[0][0] if self.asks else 0.0
+
+    @classmethod
+    def from_wire(cls, d: Dict[str, Any]) -> 'DepthUpdate':
+        if 'b' in d or 'a' in d:
+            return cls(d.get('s', ''), _levels(d.get('b')), _levels(d.get('a')), int(d.get('E', 0)),
+                       int(d.get('T', 0)), int(d.get('U', 0)), int(d.get('u', 0)), int(d.get('pu', 0)))
+        last_id = int(d.get('lastUpdateId', 0))
+        return cls('', _levels(d.get('bids')), _levels(d.get('asks')), last_update_id=last_id)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class BookTicker:
+    """<symbol>@bookTicker"""
+    symbol: str
+    bid: float
+    bid_qty: float
+    ask: float
+    ask_qty: float
+    update_id: int = 0
+    event_ms: int = 0
+    tx_ms: int = 0
+
+    @classmethod
+    def from_wire(cls, d: Dict[str, Any]) -> 'BookTicker':
+        return cls(d.get('s', ''), float(d.get('b', 0)), float(d.get('B', 0)), float(d.get('a', 0)),
+                   float(d.get('A', 0)), int(d.get('u', 0)), int(d.get('E', 0)), int(d.get('T', 0)))
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class ForceOrder:
+    """<symbol>@forceOrder (強平單；S=SELL 為多頭被爆)"""
+    symbol: str
+    side: str
+    qty: float
+    price: float
+    event_ms: int = 0
+    trade_ms: int = 0
+
+    @property
+    def usd_value(self) -> float:
+        return self.qty * self.price
+
+    @classmethod
+    def from_wire(cls, d: Dict[str, Any]) -> 'ForceOrder':
+        o = d.get('o', {})
+        return cls(o.get('s', ''), o.get('S', 'SELL'), float(o.get('q', 0)),
+                   float(o.get('ap', 0) or o.get('p', 0)), int(d.get('E', 0)), int(o.get('T', 0)))
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+_PARSERS: Tuple[Tuple[str, Callable[[Dict[str, Any]], Any]], ...] = (
+    ('@aggTrade', AggTrade.from_wire),
+    ('@depth', DepthUpdate.from_wire),
+    ('@bookTicker', BookTicker.from_wire),
+    ('@forceOrder', ForceOrder.from_wire),
+)
+
+
+def parser_for(stream: str) -> Optional[Callable[[Dict[str, Any]], Any]]:
+    """stream 名稱對應的型別轉換 (未知 stream 回傳 None → 處理器收到 dict)"""
+    for marker, parser in _PARSERS:
+        if marker in stream:
+            return parser
+    return None
+
+
+def stream_name_of(raw: Any) -> str:
+    """
+    取出 combined stream 訊息的 stream 名稱
+
+    Binance 固定把 "stream" 放在最前面，先用字串切片避免整則解碼；格式不符時才完整解碼。
+    """
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8')
+    if raw.startswith('{"stream":"'):
+        end = raw.find('"', 11)
+        if end > 11:
+            return raw[11:end]
+    try:
+        return loads(raw).get('stream', '')
+    except (ValueError, AttributeError):
+        return ''
+
+
+def decode_message(
+    raw: Any,
+    sequences: Optional['SequenceTracker'] = None,
+    on_gap: Optional[Callable[['StreamGap'], None]] = None,
+) -> Tuple[str, Any]:
+    """
+    解碼一則 combined stream 訊息
+
+    Args:
+        raw: 原始字串
+        sequences: 序號追蹤器 (多幣種 worker 自行解碼時傳入，缺口偵測與多工器一致)
+        on_gap: 偵測到缺口時的回調
+
+    Returns:
+        (stream 名稱, 型別化事件；未知 stream 為 dict)
+    """
+    message = loads(raw)
+    stream = message.get('stream', '')
+    data = message.get('data') or {}
+    if sequences is not None:
+        gap = sequences.check(stream, data)
+        if gap is not None and on_gap is not None:
+            on_gap(gap)
+    parser = parser_for(stream)
+    return stream, parser(data) if parser else data
+
+
+# ==================== 缺口偵測 ====================
+
+@dataclass
+class StreamGap:
+    """序號缺口 / 重連造成的資料空窗"""
+    stream: str
+    kind: str                 # 'sequence' / 'reconnect' / 'stale'
+    expected: int = 0
+    received: int = 0
+    missing: int = 0
+    downtime_ms: int = 0
+    detected_at: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class SequenceTracker:
+    """
+    依 stream 追蹤推送序號
+
+    aggTrade: a 必須連號；合約 depth: pu 必須等於上一則 u (部分深度快照本身完整，缺口僅供監控)。
+    序號倒退 (重送 / 亂序) 計入 out_of_order，不算缺口。
+    """
+
+    def __init__(self):
+        self._last: Dict[str, int] = {}
+        self.out_of_order = 0
+
+    def reset(self, stream: Optional[str] = None) -> None:
+        if stream is None:
+            self._last.clear()
+        else:
+            self._last.pop(stream, None)
+
+    def check(self, stream: str, data: Dict[str, Any]) -> Optional[StreamGap]:
+        if '@aggTrade' in stream:
+            seq = data.get('a')
+            if seq is None:
+                return None
+            last = self._last.get(stream)
+            if last is not None and seq <= last:
+                self.out_of_order += 1
+                return None
+            self._last[stream] = seq
+            if last is not None and seq != last + 1:
+                return StreamGap(stream, 'sequence', last + 1, seq, seq - last - 1, detected_at=time.time())
+        elif '@depth' in stream and 'pu' in data:
+            last = self._last.get(stream)
+            self._last[stream] = data.get('u', 0)
+            prev = data['pu']
+            if last is not None and prev != last:
+                if prev < last:
+                    self.out_of_order += 1
+                    return None
+                return StreamGap(stream, 'sequence', last, prev, detected_at=time.time())
+        return None
+
+
+# ==================== 多工器 ====================
+
+@dataclass
+class StreamMuxStats:
+    connects: int = 0
+    reconnects: int = 0
+    messages: int = 0
+    unrouted: int = 0
+    decode_errors: int = 0
+    handler_errors: int = 0
+    gaps: int = 0
+    missing_events: int = 0
+    stale_reconnects: int = 0
+    last_message_ts: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class _Route:
+    handler: Callable[[Any], Any]
+    decode: str
+    is_coroutine: bool
+    loop: Optional[asyncio.AbstractEventLoop]
+
+
+@dataclass
+class _Connection:
+    streams: List[str] = field(default_factory=list)
+    ws: Any = None
+    task: Optional[asyncio.Task] = None
+    next_id: int = 1
+
+
+class BinanceStreamMux:
+    """Binance combined stream 連線管理 + 依 stream 名稱分派"""
+
+    def __init__(
+        self,
+        base_url: str = FUTURES_STREAM_WS,
+        max_streams_per_conn: int = 200,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30.0,
+        stale_timeout: float = 30.0,
+        connect: Optional[Callable[[str], Any]] = None,
+    ):
+        """
+        Args:
+            base_url: wss 根網址 (合約 FUTURES_STREAM_WS / 現貨 SPOT_STREAM_WS)
+            max_streams_per_conn: 每條連線的 stream 上限 (Binance 合約 200)
+            reconnect_delay / max_reconnect_delay: 重連退避基數與上限 (秒，full jitter)
+            stale_timeout: 連線多久沒有任何訊息就主動重連 (秒)
+            connect: WebSocket 連線工廠 (預設 websockets.connect，測試時可替換)
+        """
+        self.base_url = base_url.rstrip('/')
+        self.max_streams_per_conn = max(1, int(max_streams_per_conn))
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.stale_timeout = stale_timeout
+        self._connect = connect
+
+        self.stats = StreamMuxStats()
+        self.gaps_by_stream: Dict[str, int] = {}
+        self._routes: Dict[str, List[_Route]] = {}
+        self._gap_listeners: List[Callable[[StreamGap], Any]] = []
+        self._sequences = SequenceTracker()
+        self._connections: List[_Connection] = []
+        self._lock = threading.Lock()
+
+        self.running = False
+        self._stop_requested = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._main_task: Optional[asyncio.Future] = None
+
+    # ---------- 訂閱 ----------
+
+    def subscribe(self, stream: str, handler: Callable[[Any], Any], decode: str = 'typed') -> None:
+        """
+        訂閱 stream
+
+        Args:
+            stream: 如 "btcusdt@aggTrade" (symbol 會轉小寫)
+            handler: handler(event)；可為 coroutine function
+            decode: 'typed' = 事件結構、'dict' = 解碼後的 data dict、'raw' = 原始訊息字串
+        """
+        if decode not in DECODE_MODES:
+            raise ValueError(f"decode 需為 {DECODE_MODES}: {decode}")
+        symbol, sep, channel = stream.partition('@')
+        stream = f"{symbol.lower()}{sep}{channel}"
+        is_coroutine = inspect.iscoroutinefunction(handler)
+        try:
+            owner_loop = asyncio.get_running_loop() if is_coroutine else None
+        except RuntimeError:
+            owner_loop = None
+
+        with self._lock:
+            is_new = stream not in self._routes
+            self._routes.setdefault(stream, []).append(_Route(handler, decode, is_coroutine, owner_loop))
+
+        if is_new and self.running and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._attach_stream, stream)
+
+    def unsubscribe(self, stream: str, handler: Callable[[Any], Any]) -> None:
+        """移除處理器 (stream 仍保留在連線上，沒有訂閱者的訊息直接丟棄)"""
+        symbol, sep, channel = stream.partition('@')
+        stream = f"{symbol.lower()}{sep}{channel}"
+        with self._lock:
+            routes = [r for r in self._routes.get(stream, []) if r.handler != handler]
+            if routes:
+                self._routes[stream] = routes
+            else:
+                self._routes.pop(stream, None)
+
+    def add_gap_listener(self, callback: Callable[[StreamGap], Any]) -> None:
+        self._gap_listeners.append(callback)
+
+    @property
+    def streams(self) -> List[str]:
+        return list(self._routes)
+
+    def stream_urls(self, streams: Optional[List[str]] = None) -> List[str]:
+        streams = self.streams if streams is None else streams
+        n = self.max_streams_per_conn
+        return [
+            f"{self.base_url}/stream?streams={'/'.join(streams[i:i + n])}"
+            for i in range(0, len(streams), n)
+        ]
+
+    # ---------- 分派 ----------
+
+    def dispatch(self, raw: Any) -> int:
+        """
+        分派一則原始訊息
+
+        Returns:
+            收到此訊息的處理器數量
+        """
+        self.stats.messages += 1
+        self.stats.last_message_ts = time.time()
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8')
+        stream = stream_name_of(raw)
+        routes = self._routes.get(stream)
+        if not routes:
+            self.stats.unrouted += 1
+            return 0
+
+        data = None
+        event = None
+        delivered = 0
+        for route in routes:
+            try:
+                if route.decode == 'raw':
+                    payload = raw
+                else:
+                    if data is None:
+                        data = loads(raw).get('data') or {}
+                        gap = self._sequences.check(stream, data)
+                        if gap is not None:
+                            self._report_gap(gap)
+                    if route.decode == 'dict':
+                        payload = data
+                    else:
+                        if event is None:
+                            parser = parser_for(stream)
+                            event = parser(data) if parser else data
+                        payload = event
+            except Exception as e:
+                self.stats.decode_errors += 1
+                logger.debug(f"stream 訊息解碼失敗 ({stream}): {e}")
+                return delivered
+            self._invoke(route, payload)
+            delivered += 1
+        return delivered
+
+    def _invoke(self, route: _Route, payload: Any) -> None:
+        try:
+            result = route.handler(payload)
+            if route.is_coroutine or inspect.isawaitable(result):
+                if route.loop is not None and route.loop is not self._loop:
+                    asyncio.run_coroutine_threadsafe(result, route.loop)
+                else:
+                    asyncio.ensure_future(result)
+        except Exception as e:
+            self.stats.handler_errors += 1
+            logger.warning(f"stream 處理器錯誤: {e}")
+
+    def _report_gap(self, gap: StreamGap) -> None:
+        self.stats.gaps += 1
+        self.stats.missing_events += gap.missing
+        self.gaps_by_stream[gap.stream] = self.gaps_by_stream.get(gap.stream, 0) + 1
+        if gap.kind == 'sequence':
+            logger.debug(f"stream 序號缺口: {gap.stream} 預期 {gap.expected} 收到 {gap.received}")
+        else:
+            logger.warning(f"stream {gap.kind}: {gap.stream} 空窗 {gap.downtime_ms}ms")
+        for callback in self._gap_listeners:
+            try:
+                callback(gap)
+            except Exception as e:
+                logger.debug(f"缺口回調失敗: {e}")
+
+    # ---------- 連線 ----------
+
+    def _attach_stream(self, stream: str) -> None:
+        """執行中新增 stream: 有空位的連線送 SUBSCRIBE，否則開新連線 (在事件循環上呼叫)"""
+        if not self.running or any(stream in conn.streams for conn in self._connections):
+            return
+        for conn in self._connections:
+            if len(conn.streams) < self.max_streams_per_conn:
+                conn.streams.append(stream)
+                if conn.ws is not None:
+                    asyncio.ensure_future(self._send_subscribe(conn, [stream]))
+                return
+        conn = _Connection(streams=[stream])
+        self._connections.append(conn)
+        conn.task = asyncio.ensure_future(self._run_connection(conn))
+
+    async def _send_subscribe(self, conn: _Connection, streams: List[str]) -> None:
+        try:
+            await conn.ws.send(json.dumps({'method': 'SUBSCRIBE', 'params': streams, 'id': conn.next_id}))
+            conn.next_id += 1
+        except Exception as e:
+            # 連線已斷: 重連時 URL 會帶上完整 stream 清單
+            logger.debug(f"SUBSCRIBE 失敗，等待重連: {e}")
+
+    def _open(self, url: str) -> Any:
+        if self._connect is not None:
+            return self._connect(url)
+        return websockets.connect(url, ping_interval=20, ping_timeout=60, max_queue=None)
+
+    async def _run_connection(self, conn: _Connection) -> None:
+        attempt = 0
+        disconnected_at: Optional[float] = None
+        while self.running:
+            url = self.stream_urls(list(conn.streams))[0]
+            try:
+                async with self._open(url) as ws:
+                    conn.ws = ws
+                    if self.stats.connects:
+                        self.stats.reconnects += 1
+                    self.stats.connects += 1
+                    attempt = 0
+                    if disconnected_at is not None:
+                        downtime_ms = int((time.time() - disconnected_at) * 1000)
+                        for stream in conn.streams:
+                            self._sequences.reset(stream)
+                            self._report_gap(StreamGap(stream, 'reconnect', downtime_ms=downtime_ms,
+                                                       detected_at=time.time()))
+                        disconnected_at = None
+                    logger.info(f"✅ Binance combined stream 已連接 ({len(conn.streams)} streams)")
+                    while self.running:
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=self.stale_timeout)
+                        except asyncio.TimeoutError:
+                            self.stats.stale_reconnects += 1
+                            logger.warning(f"⚠️ combined stream {self.stale_timeout:.0f}s 無訊息，重新連線")
+                            break
+                        self.dispatch(raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.running:
+                    logger.warning(f"⚠️ combined stream 斷線: {e}")
+            finally:
+                conn.ws = None
+            if not self.running:
+                break
+            if disconnected_at is None:
+                disconnected_at = time.time()
+            # full jitter: 0 ~ min(上限, 基數 × 2^n)
+            delay = random.uniform(0, min(self.max_reconnect_delay, self.reconnect_delay * (2 ** attempt)))
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def run(self, until: Optional[Callable[[], bool]] = None) -> None:
+        """
+        在目前事件循環上執行直到 stop() 或 until() 為真
+
+        Args:
+            until: 每秒檢查一次的結束條件
+        """
+        if websockets is None and self._connect is None:
+            raise ImportError("BinanceStreamMux 需要 websockets: pip install websockets")
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._stop_requested = False
+        self.running = True
+        with self._lock:
+            streams = list(self._routes)
+        n = self.max_streams_per_conn
+        self._connections = [_Connection(streams=streams[i:i + n]) for i in range(0, len(streams), n)]
+        for conn in self._connections:
+            conn.task = asyncio.ensure_future(self._run_connection(conn))
+        try:
+            while self.running and not (until and until()):
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.running = False
+            for conn in self._connections:
+                if conn.ws is not None:
+                    try:
+                        await conn.ws.close()
+                    except Exception:
+                        pass
+                if conn.task is not None:
+                    conn.task.cancel()
+            await asyncio.gather(*(c.task for c in self._connections if c.task), return_exceptions=True)
+            self._connections = []
+
+    def stop(self) -> None:
+        """結束 run() (任何執行緒皆可呼叫)"""
+        self._stop_requested = True
+        self.running = False
+        if self._loop is not None and self._stop_event is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                pass
+
+    # ---------- 同步介面 ----------
+
+    def start_background(self) -> bool:
+        """
+        在共用背景事件循環 (binance_rest_client.background_loop) 上執行
+
+        Returns:
+            是否新啟動 (已在執行時回傳 False)
+        """
+        with self._lock:
+            if self.running or (self._main_task is not None and not self._main_task.done()):
+                return False
+            self.running = True
+            self._stop_requested = False
+        loop = background_loop()
+        self._main_task = asyncio.run_coroutine_threadsafe(self._run_background(), loop)
+        return True
+
+    async def _run_background(self) -> None:
+        # start_background() 之後、排上背景循環之前就被 stop() 的情況
+        if not self._stop_requested:
+            await self.run()
+
+    def stop_background(self, timeout: float = 5.0) -> None:
+        self.stop()
+        if self._main_task is not None:
+            try:
+                self._main_task.result(timeout)
+            except Exception:
+                pass
+            self._main_task = None
+
+
+# ==================== 程序內共用 ====================
+
+_muxes: Dict[str, BinanceStreamMux] = {}
+_muxes_lock = threading.Lock()
+
+
+def get_stream_mux(base_url: str = FUTURES_STREAM_WS) -> BinanceStreamMux:
+    """同一程序內共用的多工器 (每個 base_url 一個)"""
+    key = base_url.rstrip('/')
+    with _muxes_lock:
+        mux = _muxes.get(key)
+        if mux is None:
+            mux = BinanceStreamMux(base_url=key)
+            _muxes[key] = mux
+        return mux
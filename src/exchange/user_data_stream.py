@@ -0,0 +1,778 @@
+"""
+Binance Futures User Data Stream (listenKey)
+
+以 WebSocket 推送維護訂單 / 持倉狀態，取代 Maker 掛單後每秒 REST 輪詢:
+- ORDER_TRADE_UPDATE → 訂單狀態機 (NEW → PARTIALLY_FILLED → FILLED / CANCELED / EXPIRED)
+- ACCOUNT_UPDATE → 持倉 (positionAmt / entryPrice / unrealizedProfit，依 positionSide)
+- 等待成交 = 可 await 的 future (含超時)，成交推送到達即喚醒，偵測延遲從 ~1 秒降到毫秒級
+- listenKey 每 30 分鐘 keepalive；過期 (listenKeyExpired / -1125) 自動換新 key 重連
+- REST 只在 (重新) 連線後對帳一次: openOrders + 追蹤中的未完成訂單 + positionRisk
+
+原理:
+    所有狀態變更都在背景事件循環上執行 (與 binance_rest_client 共用)，同步呼叫點
+    (BinanceTestnetExecutor) 透過 *_blocking 方法等待。事件以 transaction time 和
+    累計成交量判斷新舊，重連對帳的 REST 快照與緩衝中的推送交錯時不會倒退。
+
+用法:
+    stream = UserDataStream(rest.client, symbol='BTCUSDT')
+    stream.start_background()
+    stream.track(order_data)                                  # 下單回應
+    order = stream.wait_for_order_blocking(order_id, timeout=30)
+    if order and order.status == 'FILLED': ...
+
+    # 本地測試: 以腳本重放推送事件
+    server = LocalUserDataServer([order_update_event(1, 'NEW'), {'op': 'sleep', 'seconds': 0.1},
+                                  order_update_event(1, 'FILLED', executed_qty=0.01, avg_price=90000)])
+    stream = UserDataStream(server, symbol='BTCUSDT', connect=server.connect)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover - 依部署環境而定
+    websockets = None
+
+from .binance_rest_client import RestResponse, background_loop
+
+logger = logging.getLogger(__name__)
+
+
+FUTURES_TESTNET_WS = 'wss://stream.binancefuture.com/ws'
+FUTURES_MAINNET_WS = 'wss://fstream.binance.com/ws'
+
+FINAL_ORDER_STATUSES = frozenset({'FILLED', 'CANCELED', 'EXPIRED', 'REJECTED', 'EXPIRED_IN_MATCH'})
+
+ERROR_LISTEN_KEY_NOT_EXIST = -1125
+
+
+def _f(value: Any, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+# ==================== 狀態 ====================
+
+@dataclass
+class OrderState:
+    """單一訂單的最新狀態"""
+
+    order_id: int
+    symbol: str = ''
+    client_order_id: str = ''
+    side: str = ''
+    position_side: str = ''
+    order_type: str = ''
+    status: str = 'NEW'
+    price: float = 0.0
+    orig_qty: float = 0.0
+    executed_qty: float = 0.0
+    avg_price: float = 0.0
+    last_fill_qty: float = 0.0
+    last_fill_price: float = 0.0
+    commission: float = 0.0
+    realized_pnl: float = 0.0
+    update_time_ms: int = 0
+
+    @property
+    def is_final(self) -> bool:
+        return self.status in FINAL_ORDER_STATUSES
+
+    @property
+    def is_filled(self) -> bool:
+        return self.status == 'FILLED'
+
+    def to_rest_dict(self) -> Dict[str, Any]:
+        """轉成 REST /fapi/v1/order 的欄位格式 (舊呼叫點可直接沿用)"""
+        return {
+            'orderId': self.order_id,
+            'symbol': self.symbol,
+            'clientOrderId': self.client_order_id,
+            'side': self.side,
+            'positionSide': self.position_side,
+            'type': self.order_type,
+            'status': self.status,
+            'price': str(self.price),
+            'origQty': str(self.orig_qty),
+            'executedQty': str(self.executed_qty),
+            'avgPrice': str(self.avg_price),
+            'updateTime': self.update_time_ms,
+        }
+
+
+@dataclass
+class PositionState:
+    """單一 (symbol, positionSide) 持倉"""
+
+    symbol: str
+    position_side: str = 'BOTH'
+    amount: float = 0.0
+    entry_price: float = 0.0
+    unrealized_pnl: float = 0.0
+    margin_type: str = ''
+    update_time_ms: int = 0
+
+    def to_rest_dict(self) -> Dict[str, Any]:
+        """轉成 REST /fapi/v2/positionRisk 的欄位格式"""
+        return {
+            'symbol': self.symbol,
+            'positionSide': self.position_side,
+            'positionAmt': str(self.amount),
+            'entryPrice': str(self.entry_price),
+            'unRealizedProfit': str(self.unrealized_pnl),
+            'marginType': self.margin_type,
+            'updateTime': self.update_time_ms,
+        }
+
+
+@dataclass
+class UserStreamStats:
+    connects: int = 0
+    reconnects: int = 0
+    events: int = 0
+    order_updates: int = 0
+    account_updates: int = 0
+    stale_events: int = 0
+    reconciliations: int = 0
+    keepalives: int = 0
+    listen_keys: int = 0
+    last_event_ms: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class UserDataState:
+    """
+    訂單 / 持倉狀態機
+
+    只能在背景事件循環上修改 (UserDataStream 負責排程)。
+    """
+
+    def __init__(self, symbol: Optional[str] = None):
+        self.symbol = symbol
+        self.orders: Dict[int, OrderState] = {}
+        self.positions: Dict[Tuple[str, str], PositionState] = {}
+        self.balances: Dict[str, float] = {}
+        self._waiters: Dict[int, List[asyncio.Future]] = {}
+        self._listeners: List[Callable[[str, Any], None]] = []
+
+    # ------------------------ 訂閱 ------------------------ #
+    def add_listener(self, callback: Callable[[str, Any], None]) -> None:
+        """callback(kind, state): kind = 'order' / 'position'"""
+        self._listeners.append(callback)
+
+    def _notify(self, kind: str, state: Any) -> None:
+        for callback in self._listeners:
+            try:
+                callback(kind, state)
+            except Exception as e:
+                logger.debug(f"user stream listener 失敗: {e}")
+
+    # ------------------------ 訂單 ------------------------ #
+    def order_future(self, order_id: int) -> asyncio.Future:
+        """訂單進入終態 (FILLED / CANCELED / ...) 時完成的 future"""
+        future = asyncio.get_running_loop().create_future()
+        order = self.orders.get(order_id)
+        if order is not None and order.is_final:
+            future.set_result(order)
+        else:
+            self._waiters.setdefault(order_id, []).append(future)
+        return future
+
+    def _resolve(self, order: OrderState) -> None:
+        if not order.is_final:
+            return
+        for future in self._waiters.pop(order.order_id, []):
+            if not future.done():
+                future.set_result(order)
+
+    def _merge_order(self, incoming: OrderState) -> bool:
+        """套用訂單更新；過期 (較舊) 的更新回傳 False"""
+        current = self.orders.get(incoming.order_id)
+        if current is not None:
+            if current.is_final and not incoming.is_final:
+                return False
+            if incoming.executed_qty < current.executed_qty:
+                return False
+            if (incoming.update_time_ms < current.update_time_ms
+                    and incoming.executed_qty == current.executed_qty
+                    and incoming.is_final == current.is_final):
+                return False
+            # 推送不含下單時的欄位時沿用舊值
+            for name in ('symbol', 'client_order_id', 'side', 'position_side', 'order_type'):
+                if not getattr(incoming, name):
+                    setattr(incoming, name, getattr(current, name))
+            if not incoming.orig_qty:
+                incoming.orig_qty = current.orig_qty
+            if not incoming.price:
+                incoming.price = current.price
+            incoming.commission = current.commission + (incoming.commission if incoming.last_fill_qty else 0.0)
+        self.orders[incoming.order_id] = incoming
+        self._resolve(incoming)
+        self._notify('order', incoming)
+        return True
+
+    def apply_order_update(self, o: Dict[str, Any], event_time_ms: int = 0) -> bool:
+        """ORDER_TRADE_UPDATE 的 'o' 物件"""
+        if self.symbol and o.get('s') and o['s'] != self.symbol:
+            return False
+        order = OrderState(
+            order_id=int(o['i']),
+            symbol=o.get('s', ''),
+            client_order_id=o.get('c', ''),
+            side=o.get('S', ''),
+            position_side=o.get('ps', ''),
+            order_type=o.get('o', ''),
+            status=o.get('X', 'NEW'),
+            price=_f(o.get('p')),
+            orig_qty=_f(o.get('q')),
+            executed_qty=_f(o.get('z')),
+            avg_price=_f(o.get('ap')),
+            last_fill_qty=_f(o.get('l')),
+            last_fill_price=_f(o.get('L')),
+            commission=_f(o.get('n')),
+            realized_pnl=_f(o.get('rp')),
+            update_time_ms=int(o.get('T') or event_time_ms or 0),
+        )
+        return self._merge_order(order)
+
+    def apply_rest_order(self, data: Dict[str, Any]) -> bool:
+        """REST 下單 / 查詢回應 (對帳用)"""
+        if not data or 'orderId' not in data:
+            return False
+        order = OrderState(
+            order_id=int(data['orderId']),
+            symbol=data.get('symbol', ''),
+            client_order_id=data.get('clientOrderId', ''),
+            side=data.get('side', ''),
+            position_side=data.get('positionSide', ''),
+            order_type=data.get('type', ''),
+            status=data.get('status', 'NEW'),
+            price=_f(data.get('price')),
+            orig_qty=_f(data.get('origQty')),
+            executed_qty=_f(data.get('executedQty')),
+            avg_price=_f(data.get('avgPrice')),
+            update_time_ms=int(data.get('updateTime') or data.get('time') or 0),
+        )
+        return self._merge_order(order)
+
+    # ------------------------ 持倉 ------------------------ #
+    def _merge_position(self, incoming: PositionState, force: bool = False) -> bool:
+        key = (incoming.symbol, incoming.position_side)
+        current = self.positions.get(key)
+        if not force and current is not None and incoming.update_time_ms < current.update_time_ms:
+            return False
+        self.positions[key] = incoming
+        self._notify('position', incoming)
+        return True
+
+    def apply_account_update(self, a: Dict[str, Any], event_time_ms: int = 0) -> int:
+        """ACCOUNT_UPDATE 的 'a' 物件；回傳更新的持倉數"""
+        for balance in a.get('B', []):
+            self.balances[balance.get('a', '')] = _f(balance.get('wb'))
+        applied = 0
+        for p in a.get('P', []):
+            if self.symbol and p.get('s') != self.symbol:
+                continue
+            position = PositionState(
+                symbol=p.get('s', ''),
+                position_side=p.get('ps', 'BOTH'),
+                amount=_f(p.get('pa')),
+                entry_price=_f(p.get('ep')),
+                unrealized_pnl=_f(p.get('up')),
+                margin_type=p.get('mt', ''),
+                update_time_ms=int(event_time_ms),
+            )
+            applied += self._merge_position(position)
+        return applied
+
+    def apply_rest_positions(self, rows: List[Dict[str, Any]]) -> None:
+        """REST positionRisk 快照 (對帳用)"""
+        for row in rows or []:
+            if self.symbol and row.get('symbol') != self.symbol:
+                continue
+            update_time = int(row.get('updateTime') or 0)
+            # 空倉的 updateTime 可能是 0，視為權威快照
+            self._merge_position(PositionState(
+                symbol=row.get('symbol', ''),
+                position_side=row.get('positionSide', 'BOTH'),
+                amount=_f(row.get('positionAmt')),
+                entry_price=_f(row.get('entryPrice')),
+                unrealized_pnl=_f(row.get('unRealizedProfit')),
+                margin_type=row.get('marginType', ''),
+                update_time_ms=update_time,
+            ), force=update_time == 0)
+
+    # ------------------------ 查詢 ------------------------ #
+    def open_order_ids(self) -> List[int]:
+        return [order_id for order_id, order in self.orders.items() if not order.is_final]
+
+    def positions_by_side(self, symbol: Optional[str] = None) -> Dict[str, PositionState]:
+        symbol = symbol or self.symbol
+        return {
+            side: position for (sym, side), position in self.positions.items()
+            if sym == symbol and position.amount != 0
+        }
+
+
+# ==================== Stream ====================
+
+class UserDataStream:
+    """listenKey 連線、keepalive、重連對帳"""
+
+    def __init__(
+        self,
+        rest: Any,
+        symbol: str = 'BTCUSDT',
+        ws_url: str = FUTURES_TESTNET_WS,
+        connect: Optional[Callable[[str], Any]] = None,
+        keepalive_interval: float = 30 * 60,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        """
+        Args:
+            rest: async REST 客戶端 (BinanceRestClient 或 LocalUserDataServer)
+            symbol: 只追蹤此交易對
+            ws_url: User Data Stream 根網址 (不含 listenKey)
+            connect: WebSocket 連線工廠 (預設 websockets.connect，測試時傳入 LocalUserDataServer.connect)
+            keepalive_interval: listenKey keepalive 間隔 (秒，Binance 60 分鐘過期)
+            reconnect_delay / max_reconnect_delay: 重連退避 (秒)
+        """
+        if connect is None:
+            if websockets is None:
+                raise ImportError("UserDataStream 需要 websockets: pip install websockets")
+            connect = lambda url: websockets.connect(url, ping_interval=20, ping_timeout=20)  # noqa: E731
+        self.rest = rest
+        self.symbol = symbol
+        self.ws_url = ws_url.rstrip('/')
+        self._connect = connect
+        self.keepalive_interval = keepalive_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.state = UserDataState(symbol)
+        self.stats = UserStreamStats()
+        self.listen_key: Optional[str] = None
+        self.connected = False
+        self._stopped = False
+        self._ws: Any = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+
+    # ------------------------ listenKey ------------------------ #
+    async def _new_listen_key(self) -> str:
+        resp: RestResponse = await self.rest.request('POST', '/fapi/v1/listenKey', keyed=True, coalesce=False)
+        resp.raise_for_status()
+        self.listen_key = resp.json()['listenKey']
+        self.stats.listen_keys += 1
+        return self.listen_key
+
+    async def _keepalive_loop(self) -> None:
+        while not self._stopped:
+            await asyncio.sleep(self.keepalive_interval)
+            if not self.listen_key:
+                continue
+            try:
+                resp = await self.rest.request('PUT', '/fapi/v1/listenKey', keyed=True, coalesce=False)
+            except Exception as e:
+                logger.warning(f"listenKey keepalive 失敗: {e}")
+                continue
+            if resp.error_code() == ERROR_LISTEN_KEY_NOT_EXIST:
+                logger.warning("listenKey 已失效，重新建立並重連")
+                self._force_reconnect(drop_key=True)
+            elif resp.ok:
+                self.stats.keepalives += 1
+
+    def _force_reconnect(self, drop_key: bool = False) -> None:
+        if drop_key:
+            self.listen_key = None
+        if self._ws is not None:
+            asyncio.ensure_future(self._ws.close())
+
+    # ------------------------ 對帳 ------------------------ #
+    async def reconcile(self) -> None:
+        """REST 對帳: openOrders + 追蹤中未完成訂單 + positionRisk (只在 (重新) 連線後呼叫)"""
+        params = {'symbol': self.symbol}
+        resp = await self.rest.request('GET', '/fapi/v1/openOrders', params, signed=True)
+        open_ids = set()
+        if resp.ok:
+            for row in resp.json() or []:
+                self.state.apply_rest_order(row)
+                open_ids.add(int(row['orderId']))
+
+        # 斷線期間成交 / 取消的訂單不在 openOrders 裡，逐筆查最終狀態
+        for order_id in self.state.open_order_ids():
+            if order_id in open_ids:
+                continue
+            resp = await self.rest.request('GET', '/fapi/v1/order', {**params, 'orderId': order_id}, signed=True)
+            if resp.ok:
+                self.state.apply_rest_order(resp.json())
+
+        resp = await self.rest.request('GET', '/fapi/v2/positionRisk', params, signed=True)
+        if resp.ok:
+            self.state.apply_rest_positions(resp.json())
+        self.stats.reconciliations += 1
+
+    # ------------------------ 事件 ------------------------ #
+    def handle_message(self, raw: Any) -> None:
+        message = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+        event = message.get('e')
+        event_time = int(message.get('E') or 0)
+        self.stats.events += 1
+        self.stats.last_event_ms = event_time
+
+        if event == 'ORDER_TRADE_UPDATE':
+            self.stats.order_updates += 1
+            if not self.state.apply_order_update(message.get('o', {}), event_time):
+                self.stats.stale_events += 1
+        elif event == 'ACCOUNT_UPDATE':
+            self.stats.account_updates += 1
+            self.state.apply_account_update(message.get('a', {}), int(message.get('T') or event_time))
+        elif event == 'listenKeyExpired':
+            logger.warning("listenKey 過期，重新建立並重連")
+            self._force_reconnect(drop_key=True)
+
+    # ------------------------ 主循環 ------------------------ #
+    async def run(self) -> None:
+        """連線 → 對帳 → 消費推送；斷線後退避重連"""
+        self._ready = self._ready or asyncio.Event()
+        keepalive = asyncio.ensure_future(self._keepalive_loop())
+        delay = self.reconnect_delay
+        try:
+            while not self._stopped:
+                try:
+                    if not self.listen_key:
+                        await self._new_listen_key()
+                    async with self._connect(f"{self.ws_url}/{self.listen_key}") as ws:
+                        self._ws = ws
+                        if self.stats.connects:
+                            self.stats.reconnects += 1
+                        self.stats.connects += 1
+                        await self.reconcile()
+                        self.connected = True
+                        self._ready.set()
+                        delay = self.reconnect_delay
+                        async for raw in ws:
+                            try:
+                                self.handle_message(raw)
+                            except Exception as e:
+                                logger.warning(f"user stream 訊息處理失敗: {e}")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"User Data Stream 斷線: {e}")
+                finally:
+                    self.connected = False
+                    self._ws = None
+                if self._stopped:
+                    break
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+        finally:
+            keepalive.cancel()
+            self.connected = False
+
+    async def stop(self) -> None:
+        self._stopped = True
+        if self._ws is not None:
+            await self._ws.close()
+        if self.listen_key and hasattr(self.rest, 'request'):
+            try:
+                await self.rest.request('DELETE', '/fapi/v1/listenKey', keyed=True, coalesce=False)
+            except Exception:
+                pass
+
+    # ------------------------ 等待成交 ------------------------ #
+    async def wait_for_order(self, order_id: int, timeout: float) -> Optional[OrderState]:
+        """
+        等待訂單進入終態
+
+        Returns:
+            終態的 OrderState；超時則回傳當下最新狀態 (可能部分成交)，未知訂單回傳 None
+        """
+        future = self.state.order_future(order_id)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            return self.state.orders.get(order_id)
+
+    # ------------------------ 同步介面 ------------------------ #
+    def start_background(self, wait_ready: float = 10.0) -> bool:
+        """
+        在共用背景事件循環上啟動，等待第一次連線 + 對帳完成
+
+        Returns:
+            是否在 wait_ready 秒內連上
+        """
+        self._loop = background_loop()
+
+        async def _start() -> None:
+            self._ready = asyncio.Event()
+            self._task = asyncio.ensure_future(self.run())
+            await asyncio.wait_for(self._ready.wait(), wait_ready)
+
+        try:
+            asyncio.run_coroutine_threadsafe(_start(), self._loop).result(wait_ready + 1)
+            return True
+        except (asyncio.TimeoutError, concurrent.futures.TimeoutError):
+            logger.warning(f"User Data Stream {wait_ready:.0f}s 內未連線，背景持續重試")
+            return False
+
+    def _call(self, func: Callable[..., Any], *args: Any) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(func, *args)
+        else:
+            func(*args)
+
+    def track(self, order_data: Dict[str, Any]) -> None:
+        """登記 REST 下單回應 (推送比回應先到時也不會漏)"""
+        self._call(self.state.apply_rest_order, order_data)
+
+    def wait_for_order_blocking(self, order_id: int, timeout: float) -> Optional[OrderState]:
+        """同步版 wait_for_order"""
+        if self._loop is None:
+            raise RuntimeError("UserDataStream 尚未 start_background()")
+        future = asyncio.run_coroutine_threadsafe(self.wait_for_order(order_id, timeout), self._loop)
+        return future.result(timeout + 5)
+
+    def positions_blocking(self, timeout: float = 5.0) -> Dict[str, Dict[str, Any]]:
+        """
+        目前持倉 (positionSide → positionRisk 格式)
+
+        狀態只在背景事件循環上修改，複本也排到同一個循環上做，
+        讀到的是兩筆推送之間的一致狀態 (不會與 ACCOUNT_UPDATE 交錯)。
+        """
+        def _copy() -> Dict[str, Dict[str, Any]]:
+            return {side: pos.to_rest_dict() for side, pos in self.state.positions_by_side().items()}
+
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+        if self._loop is None or in_loop:
+            return _copy()
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def _run() -> None:
+            try:
+                future.set_result(_copy())
+            except Exception as e:
+                future.set_exception(e)
+
+        self._loop.call_soon_threadsafe(_run)
+        return future.result(timeout)
+
+    def stop_background(self, timeout: float = 5.0) -> None:
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result(timeout)
+        except Exception:
+            pass
+        if self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+
+# ==================== 本地替身 (測試 / 重放) ====================
+
+def order_update_event(
+    order_id: int,
+    status: str,
+    symbol: str = 'BTCUSDT',
+    side: str = 'BUY',
+    position_side: str = 'LONG',
+    price: float = 0.0,
+    orig_qty: float = 0.0,
+    executed_qty: float = 0.0,
+    avg_price: float = 0.0,
+    last_qty: float = 0.0,
+    event_time_ms: Optional[int] = None,
+) -> Dict[str, Any]:
+    """建立 ORDER_TRADE_UPDATE 推送"""
+    ts = event_time_ms if event_time_ms is not None else int(time.time() * 1000)
+    return {
+        'e': 'ORDER_TRADE_UPDATE', 'E': ts, 'T': ts,
+        'o': {
+            's': symbol, 'c': f'local-{order_id}', 'S': side, 'o': 'LIMIT', 'f': 'GTC',
+            'q': str(orig_qty), 'p': str(price), 'ap': str(avg_price), 'sp': '0',
+            'x': 'TRADE' if last_qty else ('NEW' if status == 'NEW' else status),
+            'X': status, 'i': order_id, 'l': str(last_qty), 'z': str(executed_qty),
+            'L': str(avg_price if last_qty else 0), 'n': '0', 'N': 'USDT', 'T': ts,
+            'ps': position_side, 'rp': '0',
+        },
+    }
+
+
+def account_update_event(
+    position_side: str,
+    amount: float,
+    entry_price: float = 0.0,
+    symbol: str = 'BTCUSDT',
+    unrealized_pnl: float = 0.0,
+    event_time_ms: Optional[int] = None,
+) -> Dict[str, Any]:
+    """建立 ACCOUNT_UPDATE 推送 (單一持倉)"""
+    ts = event_time_ms if event_time_ms is not None else int(time.time() * 1000)
+    return {
+        'e': 'ACCOUNT_UPDATE', 'E': ts, 'T': ts,
+        'a': {
+            'm': 'ORDER',
+            'B': [],
+            'P': [{
+                's': symbol, 'pa': str(amount), 'ep': str(entry_price), 'up': str(unrealized_pnl),
+                'mt': 'isolated', 'iw': '0', 'ps': position_side,
+            }],
+        },
+    }
+
+
+class _LocalConnection:
+    """LocalUserDataServer 的單一連線 (支援 async with / async for / close)"""
+
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    async def __aenter__(self) -> '_LocalConnection':
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    def __aiter__(self) -> '_LocalConnection':
+        return self
+
+    async def __anext__(self) -> str:
+        item = await self.queue.get()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+    async def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.queue.put_nowait(None)
+
+
+class LocalUserDataServer:
+    """
+    本地 User Data Stream 替身
+
+    依腳本重放推送事件，同時扮演 REST 端 (listenKey / openOrders / order / positionRisk)，
+    狀態隨腳本事件更新，可驗證斷線期間漏掉的事件會在重連對帳時補回。
+
+    腳本步驟:
+        {'op': 'sleep', 'seconds': 0.5}   等待
+        {'op': 'disconnect'}              關閉目前連線 (之後的事件在重連前會遺失)
+        {'op': 'wait_connect'}            等待客戶端 (重新) 連上
+        {'e': ...}                        User Data 推送事件
+    """
+
+    def __init__(self, script: Optional[List[Dict[str, Any]]] = None):
+        self.script = list(script or [])
+        self.orders: Dict[int, Dict[str, Any]] = {}
+        self.positions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.sent: List[Dict[str, Any]] = []
+        self.dropped: List[Dict[str, Any]] = []
+        self.requests: List[Tuple[str, str]] = []
+        self._connection: Optional[_LocalConnection] = None
+        self._connected: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._key_seq = 0
+
+    # ------------------------ WebSocket ------------------------ #
+    def connect(self, url: str) -> _LocalConnection:
+        self._connection = _LocalConnection()
+        if self._connected is None:
+            self._connected = asyncio.Event()
+        self._connected.set()
+        if self._task is None and self.script:
+            self._task = asyncio.ensure_future(self._play())
+        return self._connection
+
+    async def push(self, event: Dict[str, Any]) -> None:
+        """送出一筆事件 (無連線時只更新伺服器狀態)"""
+        self._apply(event)
+        connection = self._connection
+        if connection is not None and not connection.closed:
+            self.sent.append(event)
+            connection.queue.put_nowait(json.dumps(event))
+        else:
+            self.dropped.append(event)
+        await asyncio.sleep(0)
+
+    async def disconnect(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+        if self._connected is not None:
+            self._connected.clear()
+
+    async def _play(self) -> None:
+        for step in self.script:
+            op = step.get('op')
+            if op == 'sleep':
+                await asyncio.sleep(step.get('seconds', 0))
+            elif op == 'disconnect':
+                await self.disconnect()
+            elif op == 'wait_connect':
+                await self._connected.wait()
+            else:
+                await self.push(step)
+
+    async def finished(self) -> None:
+        """等待腳本播放完畢"""
+        if self._task is not None:
+            await self._task
+
+    # ------------------------ 伺服器狀態 ------------------------ #
+    def _apply(self, event: Dict[str, Any]) -> None:
+        if event.get('e') == 'ORDER_TRADE_UPDATE':
+            o = event['o']
+            self.orders[int(o['i'])] = {
+                'orderId': int(o['i']), 'symbol': o.get('s'), 'clientOrderId': o.get('c'),
+                'side': o.get('S'), 'positionSide': o.get('ps'), 'type': o.get('o'),
+                'status': o.get('X'), 'price': o.get('p'), 'origQty': o.get('q'),
+                'executedQty': o.get('z'), 'avgPrice': o.get('ap'), 'updateTime': o.get('T'),
+            }
+        elif event.get('e') == 'ACCOUNT_UPDATE':
+            for p in event['a'].get('P', []):
+                self.positions[(p['s'], p['ps'])] = {
+                    'symbol': p['s'], 'positionSide': p['ps'], 'positionAmt': p['pa'],
+                    'entryPrice': p['ep'], 'unRealizedProfit': p['up'], 'marginType': p.get('mt', ''),
+                    'updateTime': event.get('T') or event.get('E'),
+                }
+
+    # ------------------------ REST ------------------------ #
+    async def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> RestResponse:
+        method = method.upper()
+        params = params or {}
+        self.requests.append((method, path))
+        body: Any = {}
+        if path == '/fapi/v1/listenKey':
+            if method == 'POST':
+                self._key_seq += 1
+                body = {'listenKey': f'local-{self._key_seq}'}
+        elif path == '/fapi/v1/openOrders':
+            body = [o for o in self.orders.values() if o['status'] not in FINAL_ORDER_STATUSES]
+        elif path == '/fapi/v1/order' and method == 'GET':
+            order = self.orders.get(int(params.get('orderId', 0)))
+            if order is None:
+                return RestResponse(400, {}, json.dumps({'code': -2013, 'msg': 'Order does not exist.'}))
+            body = order
+        elif path == '/fapi/v2/positionRisk':
+            body = list(self.positions.values())
+        return RestResponse(200, {}, json.dumps(body))
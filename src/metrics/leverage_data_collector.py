@@ -0,0 +1,431 @@
+"""Concurrent Binance Futures collector for liquidation pressure snapshots.
+
+Replaces the sequential `/futures/data/*` crawl in
+`scripts/fetch_binance_leverage_data.py` and the duplicate aiohttp fetcher in
+`liquidation_cascade_detector.py` with one async collector:
+
+* all endpoints (and all symbols) are fetched concurrently over one shared
+  keep-alive connection pool;
+* every request is charged against a per-minute weight budget that is kept in
+  sync with Binance's `X-MBX-USED-WEIGHT-1M` response header;
+* period-based series are refreshed conditionally: an endpoint is only hit
+  once its aggregation period has rolled over, and then only for the new
+  periods, which are merged into the cached series;
+* each pass publishes typed `LiquidationPressureSnapshot`s straight to
+  subscribers, so consumers no longer need the JSON file round trip.
+
+Usage:
+    async with LeverageDataCollector(symbols=["BTCUSDT", "ETHUSDT"]) as collector:
+        collector.subscribe(lambda snapshot, payload: print(snapshot.summary))
+        payloads = await collector.collect()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from src.metrics.leverage_pressure import LiquidationPressureSnapshot, compute_liquidation_pressure
+
+BINANCE_FUTURES_BASE = "https://fapi.binance.com"
+
+PERIOD_MS = {
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 60 * 60_000,
+    "2h": 2 * 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "6h": 6 * 60 * 60_000,
+    "12h": 12 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+}
+
+FUNDING_PERIOD_MS = 8 * 60 * 60_000
+
+
+@dataclass(frozen=True)
+class EndpointSpec:
+    """Static description of one REST endpoint in the snapshot."""
+
+    key: str                      # payload key consumed by leverage_pressure
+    path: str
+    weight: int
+    time_field: Optional[str]     # None ⇒ not period based, always refetched
+    periodic: bool = True         # uses the collector's `period` parameter
+    max_limit: int = 500
+    optional: bool = False        # failures degrade to [] instead of raising
+
+
+ENDPOINTS: Tuple[EndpointSpec, ...] = (
+    EndpointSpec("global_long_short", "/futures/data/globalLongShortAccountRatio", 1, "timestamp"),
+    EndpointSpec("top_long_short", "/futures/data/topLongShortAccountRatio", 1, "timestamp"),
+    EndpointSpec("open_interest", "/futures/data/openInterestHist", 1, "timestamp"),
+    EndpointSpec("funding_rate", "/fapi/v1/fundingRate", 1, "fundingTime", periodic=False, max_limit=100),
+    EndpointSpec("force_orders", "/fapi/v1/forceOrders", 20, None, periodic=False, optional=True),
+    EndpointSpec("taker_long_short", "/futures/data/takerlongshortRatio", 1, "timestamp", optional=True),
+    EndpointSpec("top_position_ratio", "/futures/data/topLongShortPositionRatio", 1, "timestamp", optional=True),
+)
+
+ENDPOINT_BY_KEY: Dict[str, EndpointSpec] = {spec.key: spec for spec in ENDPOINTS}
+
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    skipped: int = 0
+    errors: int = 0
+    weight: int = 0
+    last_latency_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "weight": self.weight,
+            "last_latency_ms": round(self.last_latency_ms, 1),
+        }
+
+
+@dataclass
+class CollectStats:
+    """Telemetry for one collection pass (superset of the script's FetchStats)."""
+
+    elapsed_seconds: float
+    endpoint_count: int
+    skipped_count: int
+    symbol: str
+    period: str
+    limit: int
+    used_weight_1m: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "endpoint_count": self.endpoint_count,
+            "skipped_count": self.skipped_count,
+            "symbol": self.symbol,
+            "period": self.period,
+            "limit": self.limit,
+            "used_weight_1m": self.used_weight_1m,
+        }
+
+
+# ------------------------ Weight accounting ------------------------ #
+
+class WeightBudget:
+    """Per-minute request weight budget shared by every endpoint.
+
+    Local accounting is reconciled with the exchange's own counter whenever a
+    response carries `X-MBX-USED-WEIGHT-1M`.
+    """
+
+    def __init__(self, max_weight_per_minute: int = 1200) -> None:
+        self.max_weight = max_weight_per_minute
+        self.used = 0
+        self._window_start = self._current_window()
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _current_window() -> int:
+        return int(time.time() // 60)
+
+    def _roll(self) -> None:
+        window = self._current_window()
+        if window != self._window_start:
+            self._window_start = window
+            self.used = 0
+
+    async def acquire(self, weight: int) -> None:
+        async with self._lock:
+            self._roll()
+            while self.used + weight > self.max_weight:
+                # wait for the next minute window
+                await asyncio.sleep(60 - time.time() % 60 + 0.05)
+                self._roll()
+            self.used += weight
+
+    def sync(self, headers: Any) -> None:
+        value = headers.get("X-MBX-USED-WEIGHT-1M") or headers.get("x-mbx-used-weight-1m")
+        if value is None:
+            return
+        try:
+            self._roll()
+            self.used = max(self.used, int(value))
+        except (TypeError, ValueError):
+            pass
+
+
+# ------------------------ Series cache helpers ------------------------ #
+
+def period_to_ms(period: str) -> int:
+    try:
+        return PERIOD_MS[period]
+    except KeyError:
+        raise ValueError(f"Unsupported Binance period: {period}") from None
+
+
+def merge_series(cached: List[Dict[str, Any]], fresh: List[Dict[str, Any]], time_field: str, limit: int) -> List[Dict[str, Any]]:
+    """Merge newly fetched points into a cached series (newest wins), keep last `limit`."""
+
+    merged: Dict[Any, Dict[str, Any]] = {row.get(time_field): row for row in cached}
+    for row in fresh:
+        merged[row.get(time_field)] = row
+    ordered = [merged[key] for key in sorted(merged, key=lambda k: k or 0)]
+    return ordered[-limit:]
+
+
+@dataclass
+class _SeriesState:
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    bucket: int = -1
+
+
+# ------------------------ Collector ------------------------ #
+
+SnapshotSubscriber = Callable[[LiquidationPressureSnapshot, Dict[str, Any]], None]
+
+
+class LeverageDataCollector:
+    """Async, multi-symbol, conditionally refreshing leverage data collector."""
+
+    def __init__(
+        self,
+        symbols: Iterable[str] = ("BTCUSDT",),
+        period: str = "5m",
+        limit: int = 30,
+        force_limit: int = 50,
+        timeout: float = 10.0,
+        max_connections: int = 16,
+        max_weight_per_minute: int = 1200,
+        force_orders_retry_seconds: float = 3600.0,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> None:
+        self.symbols = [s.upper() for s in symbols]
+        self.period = period
+        self.period_ms = period_to_ms(period)
+        self.limit = limit
+        self.force_limit = force_limit
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.force_orders_retry_seconds = force_orders_retry_seconds
+
+        self.budget = WeightBudget(max_weight_per_minute)
+        self.endpoint_stats: Dict[str, EndpointStats] = {spec.key: EndpointStats() for spec in ENDPOINTS}
+
+        self._session = session
+        self._owns_session = session is None
+        self._series: Dict[Tuple[str, str], _SeriesState] = {}
+        # forceOrders needs an API key; after a 401 back off instead of paying 20 weight each pass
+        self._force_orders_disabled_until: Dict[str, float] = {}
+        self._subscribers: List[SnapshotSubscriber] = []
+        self._latest: Dict[str, LiquidationPressureSnapshot] = {}
+        self._latest_payload: Dict[str, Dict[str, Any]] = {}
+
+    # ------------------------ Session lifecycle ------------------------ #
+    async def __aenter__(self) -> "LeverageDataCollector":
+        await self._ensure_session()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": "btn-liq-pressure/1.0"},
+            )
+            self._owns_session = True
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and self._owns_session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ------------------------ Subscribers ------------------------ #
+    def subscribe(self, callback: SnapshotSubscriber) -> None:
+        """Register a consumer of freshly computed pressure snapshots."""
+        self._subscribers.append(callback)
+
+    def latest(self, symbol: str = "BTCUSDT") -> Optional[LiquidationPressureSnapshot]:
+        return self._latest.get(symbol.upper())
+
+    def latest_payload(self, symbol: str = "BTCUSDT") -> Optional[Dict[str, Any]]:
+        return self._latest_payload.get(symbol.upper())
+
+    # ------------------------ HTTP ------------------------ #
+    async def _get(self, spec: EndpointSpec, params: Dict[str, Any]) -> Any:
+        session = await self._ensure_session()
+        stats = self.endpoint_stats[spec.key]
+        await self.budget.acquire(spec.weight)
+        started = time.perf_counter()
+        stats.requests += 1
+        stats.weight += spec.weight
+        async with session.get(f"{BINANCE_FUTURES_BASE}{spec.path}", params=params) as response:
+            self.budget.sync(response.headers)
+            stats.last_latency_ms = (time.perf_counter() - started) * 1000
+            response.raise_for_status()
+            return await response.json()
+
+    def _params(self, spec: EndpointSpec, symbol: str, limit: int, period: Optional[str] = None) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"symbol": symbol, "limit": max(1, min(limit, spec.max_limit))}
+        if spec.periodic:
+            params["period"] = period or self.period
+        return params
+
+    async def fetch_raw(self, key: str, symbol: str, limit: Optional[int] = None, period: Optional[str] = None) -> Any:
+        """Uncached single-endpoint fetch through the shared pool and weight budget."""
+        spec = ENDPOINT_BY_KEY[key]
+        return await self._get(spec, self._params(spec, symbol.upper(), limit or self.limit, period))
+
+    async def _fetch_endpoint(self, spec: EndpointSpec, symbol: str, now_ms: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """Return (rows, fetched) for one endpoint, using the cache when nothing rolled over."""
+
+        stats = self.endpoint_stats[spec.key]
+
+        if spec.key == "force_orders":
+            if time.time() < self._force_orders_disabled_until.get(symbol, 0.0):
+                stats.skipped += 1
+                return [], False
+            try:
+                return await self._get(spec, self._params(spec, symbol, self.force_limit)), True
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                stats.errors += 1
+                if isinstance(exc, aiohttp.ClientResponseError) and exc.status == 401:
+                    self._force_orders_disabled_until[symbol] = time.time() + self.force_orders_retry_seconds
+                    print("⚠️ Warning: 401 Unauthorized for forceOrders. Skipping.", file=sys.stderr)
+                else:
+                    print(f"⚠️ Warning: forceOrders failed: {exc!r}", file=sys.stderr)
+                return [], True
+
+        period_ms = self.period_ms if spec.periodic else FUNDING_PERIOD_MS
+        limit = self.limit
+        state = self._series.setdefault((symbol, spec.key), _SeriesState())
+        bucket = now_ms // period_ms
+
+        if state.rows and bucket == state.bucket:
+            stats.skipped += 1
+            return state.rows, False
+
+        fetch_limit = limit
+        if state.rows and state.bucket >= 0:
+            # only the rolled-over periods plus the last (possibly revised) point
+            fetch_limit = min(limit, bucket - state.bucket + 1)
+
+        try:
+            fresh = await self._get(spec, self._params(spec, symbol, fetch_limit))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            stats.errors += 1
+            if not spec.optional:
+                raise
+            print(f"⚠️ Warning: {spec.path.rsplit('/', 1)[-1]} failed: {exc!r}", file=sys.stderr)
+            return state.rows, True
+
+        state.rows = merge_series(state.rows, fresh or [], spec.time_field or "timestamp", limit)
+        state.bucket = bucket
+        return state.rows, True
+
+    # ------------------------ Orchestration ------------------------ #
+    async def collect(
+        self,
+        symbols: Optional[Iterable[str]] = None,
+        keys: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Fetch every endpoint for every symbol concurrently.
+
+        Returns a payload per symbol in the same shape the JSON snapshot file
+        has always used, and publishes the derived pressure snapshots.
+        `keys` restricts the pass to a subset of endpoints; such partial
+        payloads are returned but not published.
+        """
+
+        targets = [s.upper() for s in (symbols or self.symbols)]
+        specs = ENDPOINTS if keys is None else tuple(ENDPOINT_BY_KEY[key] for key in keys)
+        start = time.time()
+        now_ms = int(start * 1000)
+
+        jobs = [(symbol, spec) for symbol in targets for spec in specs]
+        results = await asyncio.gather(
+            *(self._fetch_endpoint(spec, symbol, now_ms) for symbol, spec in jobs),
+            return_exceptions=True,
+        )
+
+        grouped: Dict[str, Dict[str, Any]] = {symbol: {} for symbol in targets}
+        fetched: Dict[str, int] = {symbol: 0 for symbol in targets}
+        errors: Dict[str, BaseException] = {}
+        for (symbol, spec), result in zip(jobs, results):
+            if isinstance(result, BaseException):
+                errors.setdefault(symbol, result)
+                continue
+            rows, was_fetched = result
+            grouped[symbol][spec.key] = list(rows)
+            fetched[symbol] += int(was_fetched)
+
+        elapsed = time.time() - start
+        payloads: Dict[str, Dict[str, Any]] = {}
+        for symbol in targets:
+            if symbol in errors:
+                print(f"❌ Binance fetch failed for {symbol}: {errors[symbol]}", file=sys.stderr)
+                continue
+            payload = {
+                "symbol": symbol,
+                "period": self.period,
+                "limit": self.limit,
+                "collected_at": datetime.now(timezone.utc).isoformat(),
+                **grouped[symbol],
+            }
+            payload["fetch_stats"] = CollectStats(
+                elapsed_seconds=elapsed,
+                endpoint_count=fetched[symbol],
+                skipped_count=len(specs) - fetched[symbol],
+                symbol=symbol,
+                period=self.period,
+                limit=self.limit,
+                used_weight_1m=self.budget.used,
+            ).to_dict()
+            payloads[symbol] = payload
+            if keys is None:
+                self._publish(symbol, payload)
+
+        if errors and not payloads:
+            raise next(iter(errors.values()))
+        return payloads
+
+    def _publish(self, symbol: str, payload: Dict[str, Any]) -> None:
+        self._latest_payload[symbol] = payload
+        snapshot = compute_liquidation_pressure(payload)
+        if snapshot is None:
+            return
+        self._latest[symbol] = snapshot
+        for callback in self._subscribers:
+            try:
+                callback(snapshot, payload)
+            except Exception as exc:  # pragma: no cover - subscriber bugs must not stop collection
+                print(f"⚠️ Leverage snapshot subscriber failed: {exc}", file=sys.stderr)
+
+    async def run_forever(self, interval: float = 60.0, should_continue: Optional[Callable[[], bool]] = None) -> None:
+        """Collect on a fixed cadence until `should_continue()` returns False."""
+
+        while should_continue is None or should_continue():
+            try:
+                await self.collect()
+            except Exception as exc:
+                print(f"⚠️ 爆倉壓力更新失敗: {exc}", file=sys.stderr)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "used_weight_1m": self.budget.used,
+            "endpoints": {key: stats.to_dict() for key, stats in self.endpoint_stats.items()},
+        }
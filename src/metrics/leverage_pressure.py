@@ -355,6 +355,15 @@ def load_snapshot_from_file(path: str | Path) -> Optional[LiquidationPressureSna
     return compute_liquidation_pressure(data)
 
 
+def save_snapshot_to_file(payload: Dict[str, Any], path: str | Path) -> None:
+    """Atomically write a raw snapshot payload (readers never see a partial file)."""
+    file_path = Path(path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_name(f".{file_path.name}.tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    tmp_path.replace(file_path)
+
+
 def render_panel(snapshot: LiquidationPressureSnapshot) -> str:
     """Return a console-ready block matching the documentation design."""
 
@@ -26,6 +26,8 @@ from __future__ import annotations
 import asyncio
 import json
 import time
+from array import array
+from bisect import bisect_left
 from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
@@ -34,7 +36,9 @@ from pathlib import Path
 from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
 
 import aiohttp
-import websockets
+
+from src.exchange.stream_mux import AggTrade, BinanceStreamMux, ForceOrder
+from src.metrics.leverage_data_collector import LeverageDataCollector
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -97,6 +101,18 @@ class LiquidationEvent:
             price=price,
             usd_value=qty * price
         )
+    
+    @classmethod
+    def from_force_order(cls, order: ForceOrder) -> "LiquidationEvent":
+        """從 stream_mux 的 ForceOrder 轉換 (欄位已是數值)"""
+        return cls(
+            timestamp=order.event_ms or int(time.time() * 1000),
+            symbol=order.symbol or "BTCUSDT",
+            side=order.side,
+            quantity=order.qty,
+            price=order.price,
+            usd_value=order.usd_value
+        )
 
 
 @dataclass
@@ -187,6 +203,146 @@ class CascadeSnapshot:
         }
 
 
+# ---------------------------------------------------------------------------
+# 索引結構 (取代逐筆掃描)
+# ---------------------------------------------------------------------------
+
+class LiquidationWindowIndex:
+    """
+    時間分桶的爆倉前綴和索引
+    
+    每個時間桶記錄「累計到該桶為止」的多/空爆倉 USD 與筆數，
+    任意窗口 [cutoff, now] 的統計 = 最後累計值 - cutoff 前一桶的累計值，
+    以 bisect 定位桶，查詢 O(log n)，新增 O(1)。
+    
+    bucket_ms=1 時與逐筆掃描結果完全一致；調大可降低爆量時的記憶體。
+    累計值是絕對值，壓縮舊桶時記下 base，不需要重算。
+    """
+    
+    def __init__(self, bucket_ms: int = 1, retention_ms: int = 10 * 60 * 1000):
+        self.bucket_ms = max(1, int(bucket_ms))
+        self.retention_ms = retention_ms
+        self._starts = array("q")
+        self._cum_long_usd = array("d")
+        self._cum_short_usd = array("d")
+        self._cum_long_count = array("q")
+        self._cum_short_count = array("q")
+        # 已壓縮掉的桶的累計值
+        self._base = (0.0, 0.0, 0, 0)
+        
+    def __len__(self) -> int:
+        return len(self._starts)
+        
+    def _last(self) -> Tuple[float, float, int, int]:
+        if not self._starts:
+            return self._base
+        return (
+            self._cum_long_usd[-1],
+            self._cum_short_usd[-1],
+            self._cum_long_count[-1],
+            self._cum_short_count[-1],
+        )
+        
+    def add(self, timestamp_ms: float, side: str, usd_value: float):
+        """新增一筆爆倉 (side: SELL=多頭被爆, BUY=空頭被爆)"""
+        start = int(timestamp_ms) // self.bucket_ms * self.bucket_ms
+        long_usd, short_usd, long_count, short_count = self._last()
+        if side == "SELL":
+            long_usd += usd_value
+            long_count += 1
+        else:
+            short_usd += usd_value
+            short_count += 1
+            
+        if self._starts and start <= self._starts[-1]:
+            # 同一桶 (或亂序的舊事件): 併入最後一桶
+            self._cum_long_usd[-1] = long_usd
+            self._cum_short_usd[-1] = short_usd
+            self._cum_long_count[-1] = long_count
+            self._cum_short_count[-1] = short_count
+        else:
+            self._starts.append(start)
+            self._cum_long_usd.append(long_usd)
+            self._cum_short_usd.append(short_usd)
+            self._cum_long_count.append(long_count)
+            self._cum_short_count.append(short_count)
+            self._compact(start)
+            
+    def _compact(self, newest_start: int):
+        """丟棄超過保留期的桶 (攤銷: 過期桶超過一半才搬移陣列)"""
+        cutoff = newest_start - self.retention_ms
+        expired = bisect_left(self._starts, cutoff)
+        if expired == 0 or expired * 2 < len(self._starts):
+            return
+        i = expired - 1
+        self._base = (
+            self._cum_long_usd[i],
+            self._cum_short_usd[i],
+            self._cum_long_count[i],
+            self._cum_short_count[i],
+        )
+        for arr in (self._starts, self._cum_long_usd, self._cum_short_usd,
+                    self._cum_long_count, self._cum_short_count):
+            del arr[:expired]
+            
+    def query(self, cutoff_ms: float) -> Tuple[float, float, int, int]:
+        """回傳 timestamp >= cutoff_ms 的 (long_usd, short_usd, long_count, short_count)"""
+        i = bisect_left(self._starts, cutoff_ms)
+        if i == 0:
+            before = self._base
+        else:
+            before = (
+                self._cum_long_usd[i - 1],
+                self._cum_short_usd[i - 1],
+                self._cum_long_count[i - 1],
+                self._cum_short_count[i - 1],
+            )
+        last = self._last()
+        return (
+            last[0] - before[0],
+            last[1] - before[1],
+            last[2] - before[2],
+            last[3] - before[3],
+        )
+
+
+class PriceSeries:
+    """
+    陣列化的價格序列 (時間遞增)，以二分搜尋查詢某時間點之後的第一個價格
+    
+    依時間保留 (而非固定筆數)，爆量時 1 分鐘前的價格不會被擠出緩衝區。
+    """
+    
+    def __init__(self, retention_ms: int = 10 * 60 * 1000):
+        self.retention_ms = retention_ms
+        self._ts = array("q")
+        self._prices = array("d")
+        
+    def __len__(self) -> int:
+        return len(self._ts)
+        
+    def __iter__(self):
+        return zip(self._ts, self._prices)
+        
+    def append(self, timestamp_ms: float, price: float):
+        ts = int(timestamp_ms)
+        if self._ts and ts < self._ts[-1]:
+            ts = self._ts[-1]  # 保持遞增
+        self._ts.append(ts)
+        self._prices.append(price)
+        
+        expired = bisect_left(self._ts, ts - self.retention_ms)
+        if expired and expired * 2 >= len(self._ts):
+            del self._ts[:expired]
+            del self._prices[:expired]
+            
+    def first_at_or_after(self, cutoff_ms: float, default: float) -> float:
+        i = bisect_left(self._ts, cutoff_ms)
+        if i < len(self._ts):
+            return self._prices[i]
+        return default
+
+
 class LiquidationCascadeDetector:
     """
     即時爆倉瀑布偵測器
@@ -205,21 +361,33 @@ class LiquidationCascadeDetector:
         symbol: str = "BTCUSDT",
         cascade_callback: Optional[Callable[[CascadeAlert], None]] = None,
         snapshot_callback: Optional[Callable[[CascadeSnapshot], None]] = None,
+        window_sizes_sec: Tuple[int, ...] = (10, 60, 300),
+        bucket_ms: int = 1,
+        mux: Optional[BinanceStreamMux] = None,
     ):
         self.symbol = symbol.upper().replace("USDT", "").lower() + "usdt"
         self.cascade_callback = cascade_callback
         self.snapshot_callback = snapshot_callback
         
-        # 爆倉事件緩存 (保留 5 分鐘)
+        # 同時維護的窗口 (秒)；索引保留最長窗口的兩倍
+        self.window_sizes_sec = tuple(sorted(set(window_sizes_sec) | {10, 60, 300}))
+        retention_ms = max(self.window_sizes_sec) * 1000 * 2
+        
+        # 爆倉事件緩存 (原始事件，供除錯/統計)
         self._events: Deque[LiquidationEvent] = deque(maxlen=10000)
+        # 窗口統計索引 (O(log n) 查詢)
+        self._liq_index = LiquidationWindowIndex(bucket_ms=bucket_ms, retention_ms=retention_ms)
         
         # 價格追蹤
-        self._price_history: Deque[Tuple[float, float]] = deque(maxlen=600)  # (ts, price)
+        self._price_history = PriceSeries(retention_ms=retention_ms)  # (ts, price)
         self._current_price: float = 0.0
         
         # 狀態
         self._running: bool = False
         self._ws_task: Optional[asyncio.Task] = None
+        # 共用多工器 (例如與主行情同一條 combined stream)；None 時 start() 自建一個
+        self._mux: Optional[BinanceStreamMux] = mux
+        self._owns_mux: bool = False
         self._last_snapshot: Optional[CascadeSnapshot] = None
         self._last_alert: Optional[CascadeAlert] = None
         self._last_alert_time: float = 0
@@ -231,22 +399,41 @@ class LiquidationCascadeDetector:
         
     # ---------------------- WebSocket 連接 ---------------------- #
     
+    @property
+    def streams(self) -> Tuple[str, str]:
+        return (
+            f"{self.symbol}@forceOrder",  # 爆倉流
+            f"{self.symbol}@aggTrade",    # 成交流 (用於價格追蹤)
+        )
+    
     async def start(self):
-        """啟動 WebSocket 連接"""
+        """啟動 WebSocket 連接 (有共用多工器時只訂閱，不另開連線)"""
         self._running = True
-        self._ws_task = asyncio.create_task(self._ws_loop())
+        force_stream, trade_stream = self.streams
+        if self._mux is None:
+            self._mux = BinanceStreamMux(reconnect_delay=1.0, max_reconnect_delay=60.0)
+            self._owns_mux = True
+        self._mux.subscribe(force_stream, self._handle_liquidation)
+        self._mux.subscribe(trade_stream, self._handle_trade)
+        if self._owns_mux:
+            self._ws_task = asyncio.create_task(self._mux.run())
         # 🆕 定期更新 snapshot (即使無爆倉事件)
         self._periodic_task = asyncio.create_task(self._periodic_snapshot_loop())
-        print(f"🚀 爆倉瀑布偵測器啟動 - 監聯 {self.symbol}@forceOrder")
+        print(f"🚀 爆倉瀑布偵測器啟動 - 監聽 {force_stream}")
         
     async def stop(self):
         """停止 WebSocket 連接"""
         self._running = False
+        if self._mux is not None:
+            force_stream, trade_stream = self.streams
+            self._mux.unsubscribe(force_stream, self._handle_liquidation)
+            self._mux.unsubscribe(trade_stream, self._handle_trade)
+            if self._owns_mux:
+                self._mux.stop()
         if self._ws_task:
-            self._ws_task.cancel()
             try:
-                await self._ws_task
-            except asyncio.CancelledError:
+                await asyncio.wait_for(self._ws_task, timeout=5)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
                 pass
         if hasattr(self, '_periodic_task') and self._periodic_task:
             self._periodic_task.cancel()
@@ -268,73 +455,12 @@ class LiquidationCascadeDetector:
             except Exception as e:
                 print(f"⚠️ 定期快照更新錯誤: {e}")
                 await asyncio.sleep(5)
-        
-    async def _ws_loop(self):
-        """WebSocket 主循環"""
-        streams = [
-            f"{self.symbol}@forceOrder",  # 爆倉流
-            f"{self.symbol}@aggTrade",     # 成交流 (用於價格追蹤)
-        ]
-        ws_url = f"{BINANCE_WS_BASE}/{'/'.join(streams)}"
-        
-        # 使用組合流
-        combined_url = f"wss://fstream.binance.com/stream?streams={'/'.join(streams)}"
-        
-        reconnect_delay = 1
-        max_reconnect_delay = 60
-        
-        while self._running:
-            try:
-                async with websockets.connect(combined_url) as ws:
-                    print(f"✅ 已連接爆倉流 WebSocket")
-                    reconnect_delay = 1
-                    
-                    async for message in ws:
-                        if not self._running:
-                            break
-                        await self._handle_message(message)
-                        
-            except websockets.ConnectionClosed as e:
-                print(f"⚠️ WebSocket 斷線: {e}")
-            except Exception as e:
-                print(f"❌ WebSocket 錯誤: {e}")
-                
-            if self._running:
-                print(f"🔄 {reconnect_delay}秒後重連...")
-                await asyncio.sleep(reconnect_delay)
-                reconnect_delay = min(reconnect_delay * 2, max_reconnect_delay)
-                
-    async def _handle_message(self, message: str):
-        """處理 WebSocket 消息"""
-        try:
-            data = json.loads(message)
-            
-            # 組合流格式
-            if "stream" in data:
-                stream = data["stream"]
-                payload = data["data"]
-                
-                if "forceOrder" in stream:
-                    await self._handle_liquidation(payload)
-                elif "aggTrade" in stream:
-                    await self._handle_trade(payload)
-            else:
-                # 單流格式
-                event_type = data.get("e")
-                if event_type == "forceOrder":
-                    await self._handle_liquidation(data)
-                elif event_type == "aggTrade":
-                    await self._handle_trade(data)
-                    
-        except json.JSONDecodeError:
-            pass
-        except Exception as e:
-            print(f"⚠️ 消息處理錯誤: {e}")
             
-    async def _handle_liquidation(self, data: Dict[str, Any]):
+    async def _handle_liquidation(self, order: ForceOrder):
         """處理爆倉事件"""
-        event = LiquidationEvent.from_ws_message(data)
+        event = LiquidationEvent.from_force_order(order)
         self._events.append(event)
+        self._liq_index.add(event.timestamp, event.side, event.usd_value)
         
         # 更新統計
         self._total_liq_usd += event.usd_value
@@ -351,14 +477,11 @@ class LiquidationCascadeDetector:
         # 檢查是否觸發瀑布警報
         await self._check_cascade()
         
-    async def _handle_trade(self, data: Dict[str, Any]):
+    def _handle_trade(self, trade: AggTrade):
         """處理成交 (價格追蹤)"""
-        price = float(data.get("p", 0))
-        ts = data.get("T", int(time.time() * 1000))
-        
-        if price > 0:
-            self._current_price = price
-            self._price_history.append((ts, price))
+        if trade.price > 0:
+            self._current_price = trade.price
+            self._price_history.append(trade.time_ms or int(time.time() * 1000), trade.price)
             
     # ---------------------- 瀑布偵測 ---------------------- #
     
@@ -367,9 +490,10 @@ class LiquidationCascadeDetector:
         now = time.time() * 1000
         
         # 計算各時間窗口統計
-        stats_10s = self._calc_window_stats(now, 10 * 1000)
-        stats_1m = self._calc_window_stats(now, 60 * 1000)
-        stats_5m = self._calc_window_stats(now, 5 * 60 * 1000)
+        window_stats = self.get_window_stats(now)
+        stats_10s = window_stats[10]
+        stats_1m = window_stats[60]
+        stats_5m = window_stats[300]
         
         # 計算價格變動
         price_change_1m = self._calc_price_change(now, 60 * 1000)
@@ -421,23 +545,22 @@ class LiquidationCascadeDetector:
                 # 打印警報
                 self._print_alert(alert)
                 
+    def get_window_stats(self, now_ms: Optional[float] = None) -> Dict[int, Dict[str, float]]:
+        """一次取得所有維護中窗口的統計 {窗口秒數: stats}"""
+        if now_ms is None:
+            now_ms = time.time() * 1000
+        return {
+            window: self._calc_window_stats(now_ms, window * 1000)
+            for window in self.window_sizes_sec
+        }
+        
     def _calc_window_stats(self, now_ms: float, window_ms: float) -> Dict[str, float]:
-        """計算指定時間窗口的爆倉統計"""
+        """計算指定時間窗口的爆倉統計 (前綴和索引，O(log n))"""
         cutoff = now_ms - window_ms
         
-        total_usd = 0.0
-        long_usd = 0.0
-        short_usd = 0.0
-        count = 0
-        
-        for event in self._events:
-            if event.timestamp >= cutoff:
-                total_usd += event.usd_value
-                count += 1
-                if event.side == "SELL":
-                    long_usd += event.usd_value
-                else:
-                    short_usd += event.usd_value
+        long_usd, short_usd, long_count, short_count = self._liq_index.query(cutoff)
+        total_usd = long_usd + short_usd
+        count = long_count + short_count
                     
         velocity = total_usd / (window_ms / 1000) if window_ms > 0 else 0
         
@@ -452,12 +575,7 @@ class LiquidationCascadeDetector:
     def _calc_price_change(self, now_ms: float, window_ms: float) -> Dict[str, float]:
         """計算價格變動"""
         cutoff = now_ms - window_ms
-        price_ago = self._current_price
-        
-        for ts, price in self._price_history:
-            if ts >= cutoff:
-                price_ago = price
-                break
+        price_ago = self._price_history.first_at_or_after(cutoff, self._current_price)
                 
         change_pct = 0.0
         if price_ago > 0:
@@ -685,19 +803,28 @@ class LiquidationDataFetcher:
     - Taker Buy/Sell Volume Ratio
     - Open Interest Statistics
     - Long/Short Ratio
+    
+    所有請求委派給 LeverageDataCollector，與爆倉壓力快照共用連線池與權重計數。
     """
     
-    def __init__(self, symbol: str = "BTCUSDT"):
+    def __init__(self, symbol: str = "BTCUSDT", collector: Optional[LeverageDataCollector] = None):
         self.symbol = symbol.upper()
-        self.session = None
+        self._owns_collector = collector is None
+        self.collector = collector or LeverageDataCollector(symbols=[self.symbol])
         
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        await self.collector.__aenter__()
         return self
         
     async def __aexit__(self, *args):
-        if self.session:
-            await self.session.close()
+        if self._owns_collector:
+            await self.collector.close()
+            
+    async def _fetch(self, key: str, period: str, limit: int) -> List[Dict[str, Any]]:
+        try:
+            return await self.collector.fetch_raw(key, self.symbol, limit=limit, period=period)
+        except aiohttp.ClientError:
+            return []
             
     async def fetch_taker_long_short_ratio(self, period: str = "5m", limit: int = 30) -> List[Dict[str, Any]]:
         """
@@ -708,13 +835,7 @@ class LiquidationDataFetcher:
         
         API: GET /futures/data/takerlongshortRatio
         """
-        url = f"{BINANCE_REST_BASE}/futures/data/takerlongshortRatio"
-        params = {"symbol": self.symbol, "period": period, "limit": limit}
-        
-        async with self.session.get(url, params=params) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            return []
+        return await self._fetch("taker_long_short", period, limit)
             
     async def fetch_open_interest_hist(self, period: str = "5m", limit: int = 30) -> List[Dict[str, Any]]:
         """
@@ -724,13 +845,7 @@ class LiquidationDataFetcher:
         
         API: GET /futures/data/openInterestHist
         """
-        url = f"{BINANCE_REST_BASE}/futures/data/openInterestHist"
-        params = {"symbol": self.symbol, "period": period, "limit": limit}
-        
-        async with self.session.get(url, params=params) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            return []
+        return await self._fetch("open_interest", period, limit)
             
     async def fetch_global_long_short_ratio(self, period: str = "5m", limit: int = 30) -> List[Dict[str, Any]]:
         """
@@ -738,13 +853,7 @@ class LiquidationDataFetcher:
         
         API: GET /futures/data/globalLongShortAccountRatio
         """
-        url = f"{BINANCE_REST_BASE}/futures/data/globalLongShortAccountRatio"
-        params = {"symbol": self.symbol, "period": period, "limit": limit}
-        
-        async with self.session.get(url, params=params) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            return []
+        return await self._fetch("global_long_short", period, limit)
             
     async def fetch_top_long_short_ratio(self, period: str = "5m", limit: int = 30) -> List[Dict[str, Any]]:
         """
@@ -752,32 +861,32 @@ class LiquidationDataFetcher:
         
         API: GET /futures/data/topLongShortAccountRatio
         """
-        url = f"{BINANCE_REST_BASE}/futures/data/topLongShortAccountRatio"
-        params = {"symbol": self.symbol, "period": period, "limit": limit}
-        
-        async with self.session.get(url, params=params) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            return []
+        return await self._fetch("top_long_short", period, limit)
             
-    async def collect_all(self) -> Dict[str, Any]:
-        """收集所有補充數據"""
-        tasks = [
-            self.fetch_taker_long_short_ratio(),
-            self.fetch_open_interest_hist(),
-            self.fetch_global_long_short_ratio(),
-            self.fetch_top_long_short_ratio(),
-        ]
+    async def collect_all(self, include_force_orders: bool = False) -> Dict[str, Any]:
+        """收集所有補充數據 (並行 + 只抓已滾動的新週期)
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        return {
-            "taker_long_short": results[0] if not isinstance(results[0], Exception) else [],
-            "open_interest_hist": results[1] if not isinstance(results[1], Exception) else [],
-            "global_long_short": results[2] if not isinstance(results[2], Exception) else [],
-            "top_long_short": results[3] if not isinstance(results[3], Exception) else [],
-            "collected_at": datetime.now(timezone.utc).isoformat(),
+        forceOrders 權重 20 且需 API Key，預設不抓；需要時以 include_force_orders=True 開啟。
+        """
+        keys = ["taker_long_short", "open_interest", "global_long_short", "top_long_short"]
+        if include_force_orders:
+            keys.append("force_orders")
+        try:
+            payloads = await self.collector.collect([self.symbol], keys=keys)
+        except Exception:
+            payloads = {}
+        payload = payloads.get(self.symbol, {})
+        
+        result = {
+            "taker_long_short": payload.get("taker_long_short", []),
+            "open_interest_hist": payload.get("open_interest", []),
+            "global_long_short": payload.get("global_long_short", []),
+            "top_long_short": payload.get("top_long_short", []),
+            "collected_at": payload.get("collected_at", datetime.now(timezone.utc).isoformat()),
         }
+        if include_force_orders:
+            result["force_orders"] = payload.get("force_orders", [])
+        return result
 
 
 # ---------------------------------------------------------------------------
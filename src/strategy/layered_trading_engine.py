@@ -32,6 +32,7 @@ from collections import deque
 from src.strategy.signal_generator import SignalGenerator
 from src.strategy.regime_filter import RegimeFilter
 from src.strategy.execution_engine import ExecutionEngine
+from src.utils.regime_engine import RegimeEngine
 
 
 class LayeredTradingEngine:
@@ -50,7 +51,8 @@ class LayeredTradingEngine:
         signal_config: Optional[dict] = None,
         regime_config: Optional[dict] = None,
         execution_config: Optional[dict] = None,
-        history_size: int = 1000
+        history_size: int = 1000,
+        regime_engine: Optional[RegimeEngine] = None
     ):
         """
         初始化分層交易引擎
@@ -61,6 +63,7 @@ class LayeredTradingEngine:
             regime_config: 風險過濾器配置
             execution_config: 執行引擎配置
             history_size: 歷史記錄大小
+            regime_engine: 共享的 K 線市場狀態引擎 (交給 RegimeFilter，由呼叫端在 K 線收盤時更新)
         """
         self.symbol = symbol
         
@@ -72,6 +75,7 @@ class LayeredTradingEngine:
         
         self.regime_filter = RegimeFilter(
             symbol=symbol,
+            regime_engine=regime_engine,
             **(regime_config or {})
         )
         
@@ -1,15 +1,17 @@
 """
 ModeConfigManager - 動態策略配置管理器
 負責：JSON 載入、熱更新、schema 驗證、配置快取
+
+檔案監看、解析與驗證交給 src.core.config_service；reload() 只比對 generation，
+有新版本才更新 configs (沒有 stat / json.load)。
 """
-import json
-import os
-import time
-from typing import Dict, Optional, Any
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Any
 from datetime import datetime
-from pathlib import Path
 import logging
 
+from src.core.config_service import get_config_service, thaw_config
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,70 +21,59 @@ class ModeConfigManager:
     def __init__(self, config_path: str = "config/trading_strategies_dynamic.json"):
         self.config_path = config_path
         self.configs: Dict[str, dict] = {}
-        self.last_mtime: float = 0
+        self.generation: int = 0
         self.last_load_time: datetime = None
         self.load_error: Optional[str] = None
+        self._entry = get_config_service().watch(config_path, validate=self._schema_errors)
         
         # 初次載入
         self.reload()
     
+    def _schema_errors(self, data: dict) -> List[str]:
+        return [] if self._validate_schema(data) else ["Schema validation failed"]
+    
     def reload(self) -> bool:
         """重新載入配置檔（如果有變更）
         
         Returns:
             bool: True 表示成功載入或無變更，False 表示載入失敗
         """
-        try:
-            if not os.path.exists(self.config_path):
+        entry = self._entry
+        if not entry.snapshot.exists:
+            self.load_error = entry.last_error
+            if entry.last_error:
+                logger.error(f"Error loading config from {self.config_path}: {entry.last_error}")
+            else:
                 logger.warning(f"Config file not found: {self.config_path}")
-                return False
-            
-            # 檢查檔案修改時間
-            current_mtime = os.path.getmtime(self.config_path)
-            if current_mtime <= self.last_mtime:
-                return True  # 無變更
-            
-            # 載入 JSON
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # 驗證 schema
-            if not self._validate_schema(data):
-                logger.error(f"Config schema validation failed for {self.config_path}")
-                self.load_error = "Schema validation failed"
-                return False
-            
-            # 更新配置
-            old_configs = self.configs.copy()
-            self.configs = data.get('modes', {})
-            self.last_mtime = current_mtime
-            self.last_load_time = datetime.now()
-            self.load_error = None
-            
-            # 報告變更
-            added = set(self.configs.keys()) - set(old_configs.keys())
-            removed = set(old_configs.keys()) - set(self.configs.keys())
-            modified = {k for k in self.configs.keys() if k in old_configs and self.configs[k] != old_configs[k]}
-            
-            if added or removed or modified:
-                logger.info(f"✅ Config reloaded: +{len(added)} modes, -{len(removed)} modes, ~{len(modified)} modified")
-                if added:
-                    logger.info(f"   Added: {', '.join(added)}")
-                if removed:
-                    logger.info(f"   Removed: {', '.join(removed)}")
-                if modified:
-                    logger.info(f"   Modified: {', '.join(modified)}")
-            
-            return True
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error in {self.config_path}: {e}")
-            self.load_error = f"JSON decode error: {e}"
-            return False
-        except Exception as e:
-            logger.error(f"Error loading config from {self.config_path}: {e}")
-            self.load_error = str(e)
             return False
+        
+        if entry.generation == self.generation:
+            # 無變更；若最新一次寫入未通過驗證，沿用舊配置但回報失敗
+            self.load_error = entry.last_error
+            return entry.last_error is None
+        
+        # 更新配置 (可修改副本: _sync_configs 會把欄位 setattr 到模式物件上)
+        old_configs = self.configs
+        self.configs = thaw_config(entry.data.get('modes', {}))
+        self.generation = entry.generation
+        self.last_load_time = datetime.now()
+        self.load_error = None
+        
+        # 報告變更
+        added = set(self.configs.keys()) - set(old_configs.keys())
+        removed = set(old_configs.keys()) - set(self.configs.keys())
+        modified = {k for k in self.configs.keys() if k in old_configs and self.configs[k] != old_configs[k]}
+        
+        if added or removed or modified:
+            logger.info(f"✅ Config reloaded: +{len(added)} modes, -{len(removed)} modes, ~{len(modified)} modified")
+            if added:
+                logger.info(f"   Added: {', '.join(added)}")
+            if removed:
+                logger.info(f"   Removed: {', '.join(removed)}")
+            if modified:
+                logger.info(f"   Modified: {', '.join(modified)}")
+        
+        return True
     
     def _validate_schema(self, data: dict) -> bool:
         """驗證 JSON schema
@@ -96,7 +87,7 @@ class ModeConfigManager:
             return False
         
         modes = data['modes']
-        if not isinstance(modes, dict):
+        if not isinstance(modes, Mapping):
             logger.error("'modes' must be a dictionary")
             return False
         
@@ -36,6 +36,7 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 # 導入 Phase 0 模組
 from src.utils.consolidation_detector import ConsolidationDetector
+from src.utils.regime_engine import RegimeEngine
 from src.utils.time_zone_analyzer import TimeZoneAnalyzer
 from src.utils.cost_aware_filter import CostAwareFilter
 
@@ -149,6 +150,8 @@ class MVPStrategyV2:
         # 初始化 Phase 0 模組
         if self.enable_consolidation_filter:
             self.consolidation_detector = ConsolidationDetector()
+            # 盤整狀態隨 K 線增量更新 (每次只餵新增的 K 線，不重算 50 根視窗)
+            self.regime_engine = RegimeEngine(consolidation_detector=self.consolidation_detector)
         
         if self.enable_timezone_filter:
             self.timezone_analyzer = TimeZoneAnalyzer()
@@ -227,13 +230,7 @@ class MVPStrategyV2:
         # 1. 盤整過濾
         if self.enable_consolidation_filter:
             try:
-                # 使用最近 50 根 K 線進行盤整檢測
-                lookback = min(50, len(df))
-                consolidation_state = self.consolidation_detector.is_consolidating(
-                    high=df['high'].values[-lookback:],
-                    low=df['low'].values[-lookback:],
-                    close=df['close'].values[-lookback:]
-                )
+                consolidation_state = self.regime_engine.sync(df).consolidation
                 filters_passed['consolidation'] = not consolidation_state.is_consolidating
                 
                 # 記錄盤整狀態（debug 用）
@@ -35,6 +35,7 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 # 導入 Phase 0 模組（保留但放寬）
 from src.utils.consolidation_detector import ConsolidationDetector
+from src.utils.regime_engine import RegimeEngine
 from src.utils.time_zone_analyzer import TimeZoneAnalyzer
 from src.utils.cost_aware_filter import CostAwareFilter
 
@@ -151,6 +152,8 @@ class MVPStrategyV4HFT:
         
         # 初始化 Phase 0 模組
         self.consolidation_detector = ConsolidationDetector()
+        # 盤整狀態隨 K 線增量更新 (每次只餵新增的 K 線，不重算 50 根視窗)
+        self.regime_engine = RegimeEngine(consolidation_detector=self.consolidation_detector)
         self.timezone_analyzer = TimeZoneAnalyzer()
         self.cost_filter = CostAwareFilter()
         
@@ -225,12 +228,7 @@ class MVPStrategyV4HFT:
         
         # 1. 盤整過濾 - 放寬閾值
         if self.enable_consolidation_filter:
-            lookback = 50
-            consolidation_state = self.consolidation_detector.is_consolidating(
-                high=df['high'].values[-lookback:],
-                low=df['low'].values[-lookback:],
-                close=df['close'].values[-lookback:],
-            )
+            consolidation_state = self.regime_engine.sync(df).consolidation
             
             # HFT 版本：只過濾高信心度盤整
             if consolidation_state.is_consolidating and consolidation_state.confidence >= self.consolidation_confidence_threshold:
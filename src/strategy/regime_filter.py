@@ -13,6 +13,7 @@ Risk Filters:
     2. Spread - 檢測流動性成本
     3. Depth - 檢測市場深度充足性
     4. Depth Imbalance - 檢測訂單簿失衡
+    5. Bar Regime (選填) - 讀取共享 RegimeEngine 的盤整狀態 (O(1)，不重算 K 線指標)
 
 Output:
     - Safe: True / False
@@ -27,6 +28,8 @@ from typing import Dict, Tuple, List, Optional
 from datetime import datetime
 from collections import deque
 
+from ..utils.regime_engine import RegimeEngine
+
 
 class RegimeFilter:
     """
@@ -46,7 +49,8 @@ class RegimeFilter:
         spread_bps_threshold: float = 10.0,  # Spread 基點閾值
         min_depth_btc: float = 5.0,          # 最小深度（BTC）
         depth_imbalance_threshold: float = 0.7,  # 深度失衡閾值
-        history_size: int = 100
+        history_size: int = 100,
+        regime_engine: Optional[RegimeEngine] = None
     ):
         """
         初始化市場狀態過濾器
@@ -58,6 +62,7 @@ class RegimeFilter:
             min_depth_btc: 最小總深度（BTC）
             depth_imbalance_threshold: 深度失衡閾值（>0.7 = 嚴重失衡）
             history_size: 歷史記錄大小
+            regime_engine: 共享的 K 線市場狀態引擎（盤整時風險至少 WARNING）
         """
         self.symbol = symbol
         
@@ -66,6 +71,7 @@ class RegimeFilter:
         self.spread_bps_threshold = spread_bps_threshold
         self.min_depth_btc = min_depth_btc
         self.depth_imbalance_threshold = depth_imbalance_threshold
+        self.regime_engine = regime_engine
         
         # 歷史記錄
         self.regime_history: deque = deque(maxlen=history_size)
@@ -179,8 +185,18 @@ class RegimeFilter:
                 risk_factors.append(('depth_imbalance', 'WARNING', depth_imbalance))
                 imbalance_risk = "WARNING"
         
+        # === 檢查 5: K 線市場狀態（共享引擎，O(1) 讀取）===
+        bar_regime = None
+        bar_regime_risk = "SAFE"
+        if self.regime_engine is not None and self.regime_engine.ready:
+            regime_state = self.regime_engine.snapshot
+            bar_regime = regime_state.regime.value
+            if regime_state.is_consolidating:
+                risk_factors.append(('bar_regime', 'WARNING', regime_state.consolidation.reason))
+                bar_regime_risk = "WARNING"
+        
         # === 綜合風險評估 ===
-        risk_levels = [vpin_risk, spread_risk, depth_risk, imbalance_risk]
+        risk_levels = [vpin_risk, spread_risk, depth_risk, imbalance_risk, bar_regime_risk]
         
         # 計算最高風險等級
         if "CRITICAL" in risk_levels:
@@ -228,6 +244,10 @@ class RegimeFilter:
                     'value': depth_imbalance,
                     'threshold': self.depth_imbalance_threshold,
                     'risk': imbalance_risk
+                },
+                'bar_regime': {
+                    'value': bar_regime,
+                    'risk': bar_regime_risk
                 }
             },
             'timestamp': timestamp
@@ -21,6 +21,7 @@ from datetime import datetime
 from typing import Dict, Optional, Any, List
 import numpy as np
 
+from src.bridge_channel import BridgeChannel
 from src.strategy.whale_strategy_detector import (
     WhaleStrategyDetector,
     StrategyPrediction,
@@ -53,13 +54,10 @@ class WhaleStrategyBridge:
         self.max_history = 1000
         
     def _read_bridge(self, path: Path) -> Dict:
-        """讀取 bridge 文件"""
-        if not path.exists():
-            return {}
+        """讀取 bridge 通道 (唯讀視圖，只在 section 版本變動時重新解析)"""
         try:
-            with open(path, 'r') as f:
-                return json.load(f)
-        except:
+            return BridgeChannel.for_bridge_file(str(path)).view()
+        except Exception:
             return {}
     
     def _extract_market_data(self) -> Dict:
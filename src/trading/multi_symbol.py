@@ -0,0 +1,483 @@
+"""
+多幣種執行框架 (Multi-Symbol Runtime)
+====================================
+
+讓同一套鯨魚交易邏輯同時跑 BTC / ETH / SOL，而不是複製 N 份腳本各開各的連線與快取:
+- SymbolSpec / MultiSymbolConfig: 幣種清單與共用預算 (config/multi_symbol_config.json)
+- RuntimeCoordinator: 中央協調器，集中管理資金、風險 (同時持倉數 / 當日虧損) 與 REST 權重預算
+- CoordinatorManager: 以 multiprocessing.managers 將協調器提供給各 worker 進程
+- CombinedStreamRouter: 以 BinanceStreamMux 訂閱所有幣種，依 stream 名稱分流到各 worker
+
+原理:
+    行情: 母進程只開 /stream?streams=btcusdt@aggTrade/ethusdt@aggTrade/... 一條連線，
+          每則訊息只讀前綴的 "stream" 欄位決定路由，原始字串直接丟進該幣種的 Queue，
+          JSON 解碼留給綁核的 worker 進程做，母進程不成為瓶頸。
+    資金: worker 進場前 request_entry() 預留保證金 (有 TTL，開倉失敗自動釋放)，
+          開倉 / 平倉後 update_exposure() 回報實際占用，平倉 record_pnl() 累計當日損益。
+    限速: acquire_rate() 為 token bucket，回傳呼叫端應等待的秒數 (權重先扣，可為負)，
+          所有 worker 共用同一份 Binance REST 權重額度。
+
+用法:
+    specs = load_multi_symbol_config()
+    manager = CoordinatorManager()
+    manager.start()
+    coordinator = manager.RuntimeCoordinator(**specs.coordinator_kwargs())
+
+    decision = coordinator.request_entry("ETH-USD", 50.0)
+    if decision['allowed']:
+        ...
+        coordinator.update_exposure("ETH-USD", 50.0)
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from multiprocessing.managers import BaseManager
+from pathlib import Path
+from queue import Full
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..core.clock import Clock, get_clock
+from ..exchange.stream_mux import BinanceStreamMux, stream_name_of, websockets
+
+HAS_WEBSOCKETS = websockets is not None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parents[2] / "config" / "multi_symbol_config.json"
+BINANCE_FUTURES_WS = "wss://fstream.binance.com"
+DEFAULT_CHANNELS = ("aggTrade", "depth5@100ms")
+
+_QUOTE_SUFFIXES = ("USDT", "USDC", "USD")
+
+
+# ==================== 幣種代號 ====================
+
+def _base_asset(symbol: str) -> str:
+    s = (symbol or "BTC").upper().replace("/", "-").replace("_", "-")
+    if "-" in s:
+        return s.split("-", 1)[0]
+    for suffix in _QUOTE_SUFFIXES:
+        if s.endswith(suffix) and len(s) > len(suffix):
+            return s[: -len(suffix)]
+    return s
+
+
+def binance_symbol_for(symbol: str) -> str:
+    """'BTC/USDT' / 'BTC-USD' / 'btcusdt' → 'BTCUSDT' (Binance USDT 永續)"""
+    return f"{_base_asset(symbol)}USDT"
+
+
+def dydx_market_for(symbol: str) -> str:
+    """'BTC/USDT' / 'BTCUSDT' / 'btc-usd' → 'BTC-USD' (dYdX v4 永續)"""
+    return f"{_base_asset(symbol)}-USD"
+
+
+# ==================== 設定 ====================
+
+@dataclass
+class SymbolSpec:
+    """單一幣種的執行設定"""
+    symbol: str                          # 卡片格式，如 "ETH/USDT"
+    card: Optional[str] = None           # 使用的交易卡片 (None = master_config 的 active_card)
+    symbol_dydx: Optional[str] = None    # dYdX 市場 (None = 由 symbol 推導)
+    capital_weight: float = 1.0          # 共用資金的分配權重
+    position_size_usdt: Optional[float] = None  # 覆蓋卡片的每筆保證金
+    core: Optional[int] = None           # 綁定的 CPU 核心 (None = 依序分配)
+    enabled: bool = True
+
+    @property
+    def binance_symbol(self) -> str:
+        return binance_symbol_for(self.symbol)
+
+    @property
+    def dydx_market(self) -> str:
+        return self.symbol_dydx or dydx_market_for(self.symbol)
+
+    @property
+    def stream_key(self) -> str:
+        """combined stream 的 stream 名稱前綴 (小寫)"""
+        return self.binance_symbol.lower()
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SymbolSpec':
+        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+
+
+@dataclass
+class MultiSymbolConfig:
+    """多幣種執行的共用預算"""
+    symbols: List[SymbolSpec] = field(default_factory=list)
+    total_capital_usdt: float = 300.0
+    max_concurrent_positions: int = 2
+    daily_loss_limit_usdt: float = 30.0
+    reservation_ttl_sec: float = 30.0
+    # Binance Futures REST: 2400 weight / 分鐘 (留 1/4 給其他程式)
+    binance_rest_weight_per_min: float = 1800.0
+    paper_mode: bool = True
+    stream_base_url: str = BINANCE_FUTURES_WS
+    channels: List[str] = field(default_factory=lambda: list(DEFAULT_CHANNELS))
+    queue_size: int = 20000
+
+    @property
+    def active_symbols(self) -> List[SymbolSpec]:
+        return [s for s in self.symbols if s.enabled]
+
+    def symbol_caps(self) -> Dict[str, float]:
+        """各 dYdX 市場可占用的保證金上限 (依 capital_weight 分配)"""
+        active = self.active_symbols
+        total_weight = sum(max(0.0, s.capital_weight) for s in active)
+        if total_weight <= 0:
+            return {}
+        return {
+            s.dydx_market: self.total_capital_usdt * max(0.0, s.capital_weight) / total_weight
+            for s in active
+        }
+
+    def coordinator_kwargs(self) -> Dict[str, Any]:
+        """RuntimeCoordinator 的建構參數 (皆為可 pickle 的基本型別)"""
+        return {
+            'total_capital_usdt': self.total_capital_usdt,
+            'max_concurrent_positions': self.max_concurrent_positions,
+            'daily_loss_limit_usdt': self.daily_loss_limit_usdt,
+            'symbol_caps': self.symbol_caps(),
+            'rate_limits': {'binance_rest': (self.binance_rest_weight_per_min, self.binance_rest_weight_per_min / 60.0)},
+            'reservation_ttl_sec': self.reservation_ttl_sec,
+        }
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def load_multi_symbol_config(path: Optional[Path] = None) -> MultiSymbolConfig:
+    """
+    讀取多幣種設定
+
+    Args:
+        path: JSON 設定檔 (預設 config/multi_symbol_config.json)
+
+    Returns:
+        MultiSymbolConfig；檔案不存在時只含 BTC/USDT
+    """
+    path = Path(path) if path else DEFAULT_CONFIG_PATH
+    if not path.exists():
+        logger.warning(f"多幣種設定不存在，只跑 BTC/USDT: {path}")
+        return MultiSymbolConfig(symbols=[SymbolSpec(symbol="BTC/USDT")])
+
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+
+    symbols = [SymbolSpec.from_dict(s) for s in raw.get('symbols', [])]
+    budget = {k: v for k, v in raw.items() if k in MultiSymbolConfig.__dataclass_fields__ and k != 'symbols'}
+    config = MultiSymbolConfig(symbols=symbols, **budget)
+
+    markets = [s.dydx_market for s in config.active_symbols]
+    if len(markets) != len(set(markets)):
+        raise ValueError(f"多幣種設定有重複的市場: {markets}")
+    return config
+
+
+# ==================== 中央協調器 ====================
+
+class RuntimeCoordinator:
+    """
+    跨進程共用的資金 / 風險 / 限速預算
+
+    所有方法皆為執行緒安全 (manager 以多執行緒處理各 worker 的呼叫)，
+    回傳值只用 dict / float 等可 pickle 型別。
+    """
+
+    def __init__(
+        self,
+        total_capital_usdt: float = 300.0,
+        max_concurrent_positions: int = 2,
+        daily_loss_limit_usdt: float = 30.0,
+        symbol_caps: Optional[Dict[str, float]] = None,
+        rate_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        reservation_ttl_sec: float = 30.0,
+        clock: Optional[Clock] = None,
+    ):
+        """
+        Args:
+            total_capital_usdt: 所有幣種合計可占用的保證金
+            max_concurrent_positions: 同時持倉 (含預留中) 的幣種數上限
+            daily_loss_limit_usdt: 當日 (UTC) 合計虧損達此值後停止所有進場
+            symbol_caps: 各市場保證金上限 (未列出的市場只受總額限制)
+            rate_limits: {bucket: (容量, 每秒補充量)}
+            reservation_ttl_sec: 預留保證金未確認 (也未 refresh_reservation) 時的自動釋放秒數
+        """
+        self.clock: Clock = clock or get_clock()
+        self.total_capital_usdt = float(total_capital_usdt)
+        self.max_concurrent_positions = int(max_concurrent_positions)
+        self.daily_loss_limit_usdt = float(daily_loss_limit_usdt)
+        self.symbol_caps = dict(symbol_caps or {})
+        self.reservation_ttl_sec = float(reservation_ttl_sec)
+
+        self._lock = threading.Lock()
+        self._exposure: Dict[str, float] = {}
+        self._reservations: Dict[str, Tuple[float, float]] = {}  # symbol -> (margin, expires_at)
+        self._day = self._utc_day()
+        self._daily_pnl: Dict[str, float] = {}
+        self._total_pnl: Dict[str, float] = {}
+        self._trade_count: Dict[str, int] = {}
+        self._denied: Dict[str, int] = {}
+
+        self._buckets: Dict[str, List[float]] = {}  # bucket -> [capacity, refill_per_sec, tokens, last]
+        now = self.clock.monotonic()
+        for name, (capacity, refill) in (rate_limits or {}).items():
+            self._buckets[name] = [float(capacity), float(refill), float(capacity), now]
+
+    def _utc_day(self) -> str:
+        return datetime.fromtimestamp(self.clock.time(), timezone.utc).strftime('%Y-%m-%d')
+
+    def _roll_day(self) -> None:
+        day = self._utc_day()
+        if day != self._day:
+            self._day = day
+            self._daily_pnl.clear()
+
+    def _expire_reservations(self) -> None:
+        now = self.clock.time()
+        for symbol in [s for s, (_, exp) in self._reservations.items() if exp <= now]:
+            del self._reservations[symbol]
+
+    def _committed(self, exclude: Optional[str] = None) -> float:
+        total = sum(m for s, m in self._exposure.items() if s != exclude)
+        return total + sum(m for s, (m, _) in self._reservations.items() if s != exclude)
+
+    # ---------- 資金 / 風險 ----------
+
+    def request_entry(self, symbol: str, margin_usdt: float) -> Dict[str, Any]:
+        """
+        進場前預留保證金
+
+        Returns:
+            {'allowed': bool, 'reason': str, 'available_usdt': float}
+        """
+        with self._lock:
+            self._roll_day()
+            self._expire_reservations()
+            margin = max(0.0, float(margin_usdt))
+            committed = self._committed(exclude=symbol)
+            available = max(0.0, self.total_capital_usdt - committed)
+
+            reason = ""
+            daily_pnl = sum(self._daily_pnl.values())
+            active = {s for s, m in self._exposure.items() if m > 0} | set(self._reservations)
+            active.discard(symbol)
+            cap = self.symbol_caps.get(symbol)
+            if self.daily_loss_limit_usdt > 0 and daily_pnl <= -self.daily_loss_limit_usdt:
+                reason = f"當日合計虧損 ${-daily_pnl:.2f} 已達上限 ${self.daily_loss_limit_usdt:.2f}"
+            elif self._exposure.get(symbol, 0.0) > 0:
+                reason = f"{symbol} 已有持倉"
+            elif len(active) >= self.max_concurrent_positions:
+                reason = f"同時持倉 {len(active)} 已達上限 {self.max_concurrent_positions}"
+            elif margin > available:
+                reason = f"共用資金不足 (需 ${margin:.2f}，剩 ${available:.2f})"
+            elif cap is not None and margin > cap:
+                reason = f"{symbol} 超過分配額度 ${cap:.2f}"
+
+            if reason:
+                self._denied[symbol] = self._denied.get(symbol, 0) + 1
+                return {'allowed': False, 'reason': reason, 'available_usdt': available}
+
+            self._reservations[symbol] = (margin, self.clock.time() + self.reservation_ttl_sec)
+            return {'allowed': True, 'reason': "", 'available_usdt': available - margin}
+
+    def update_exposure(self, symbol: str, margin_usdt: float) -> None:
+        """回報實際占用的保證金 (0 = 已平倉)，同時清除預留"""
+        with self._lock:
+            self._reservations.pop(symbol, None)
+            if margin_usdt > 0:
+                self._exposure[symbol] = float(margin_usdt)
+            else:
+                self._exposure.pop(symbol, None)
+
+    def refresh_reservation(self, symbol: str) -> float:
+        """
+        延長預留期限 (開倉還在進行中時由 worker 定期呼叫，Maker 等待再久也不會中途過期)
+
+        Returns:
+            新的剩餘秒數 (= reservation_ttl_sec)；預留已確認或釋放時為 0
+        """
+        with self._lock:
+            reservation = self._reservations.get(symbol)
+            if reservation is None:
+                return 0.0
+            self._reservations[symbol] = (reservation[0], self.clock.time() + self.reservation_ttl_sec)
+            return self.reservation_ttl_sec
+
+    def release(self, symbol: str) -> None:
+        """開倉失敗時釋放預留"""
+        with self._lock:
+            self._reservations.pop(symbol, None)
+
+    def record_pnl(self, symbol: str, net_pnl_usdt: float) -> None:
+        """平倉後累計損益 (當日虧損上限依此判斷)"""
+        with self._lock:
+            self._roll_day()
+            pnl = float(net_pnl_usdt)
+            self._daily_pnl[symbol] = self._daily_pnl.get(symbol, 0.0) + pnl
+            self._total_pnl[symbol] = self._total_pnl.get(symbol, 0.0) + pnl
+            self._trade_count[symbol] = self._trade_count.get(symbol, 0) + 1
+
+    # ---------- 限速 ----------
+
+    def acquire_rate(self, bucket: str, weight: float = 1.0) -> float:
+        """
+        扣除 REST 權重
+
+        Returns:
+            呼叫端應等待的秒數 (0 = 可立即送出)；未設定的 bucket 一律 0
+        """
+        with self._lock:
+            state = self._buckets.get(bucket)
+            if state is None:
+                return 0.0
+            capacity, refill, tokens, last = state
+            now = self.clock.monotonic()
+            tokens = min(capacity, tokens + (now - last) * refill) - float(weight)
+            state[2], state[3] = tokens, now
+            if tokens >= 0 or refill <= 0:
+                return 0.0
+            return -tokens / refill
+
+    # ---------- 狀態 ----------
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._roll_day()
+            self._expire_reservations()
+            return {
+                'day': self._day,
+                'total_capital_usdt': self.total_capital_usdt,
+                'committed_usdt': self._committed(),
+                'exposure': dict(self._exposure),
+                'reservations': {s: m for s, (m, _) in self._reservations.items()},
+                'daily_pnl': dict(self._daily_pnl),
+                'total_pnl': dict(self._total_pnl),
+                'trade_count': dict(self._trade_count),
+                'denied': dict(self._denied),
+                'rate_tokens': {name: round(state[2], 2) for name, state in self._buckets.items()},
+            }
+
+
+class CoordinatorManager(BaseManager):
+    """提供 RuntimeCoordinator 代理物件給 worker 進程"""
+
+
+CoordinatorManager.register('RuntimeCoordinator', RuntimeCoordinator)
+
+
+# ==================== 行情分流 ====================
+
+class CombinedStreamRouter:
+    """
+    Binance combined stream → 各幣種 Queue
+
+    連線、重連與拆分 (每條連線最多 max_streams_per_conn 個 stream) 交給 BinanceStreamMux，
+    這裡以 raw 模式訂閱，原始字串不解碼直接投遞。Queue 滿時丟棄並計數，不阻塞讀取迴圈。
+    """
+
+    def __init__(
+        self,
+        base_url: str = BINANCE_FUTURES_WS,
+        channels: Sequence[str] = DEFAULT_CHANNELS,
+        max_streams_per_conn: int = 200,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        self.channels = list(channels)
+        self.mux = BinanceStreamMux(
+            base_url=base_url,
+            max_streams_per_conn=max_streams_per_conn,
+            reconnect_delay=reconnect_delay,
+            max_reconnect_delay=max_reconnect_delay,
+        )
+
+        self._routes: Dict[str, Any] = {}
+        self.dropped: Dict[str, int] = {}
+        self.routed: Dict[str, int] = {}
+
+    @property
+    def running(self) -> bool:
+        return self.mux.running
+
+    def add_route(self, symbol: str, queue) -> None:
+        """symbol 可為任何格式 ('ETH/USDT'、'ethusdt')；queue 需支援 put_nowait"""
+        key = binance_symbol_for(symbol).lower()
+        if key in self._routes:
+            self._routes[key] = queue
+            return
+        self._routes[key] = queue
+        self.dropped.setdefault(key, 0)
+        self.routed.setdefault(key, 0)
+
+        def forward(raw: str, key: str = key) -> None:
+            try:
+                self._routes[key].put_nowait(raw)
+            except Full:
+                self.dropped[key] += 1
+                return
+            self.routed[key] += 1
+
+        for channel in self.channels:
+            self.mux.subscribe(f"{key}@{channel}", forward, decode='raw')
+
+    @property
+    def streams(self) -> List[str]:
+        return self.mux.streams
+
+    def stream_urls(self) -> List[str]:
+        return self.mux.stream_urls()
+
+    def dispatch(self, raw) -> bool:
+        """把一則原始訊息丟到對應幣種的 Queue；回傳是否成功投遞"""
+        key = stream_name_of(raw).split('@', 1)[0]
+        before = self.routed.get(key, 0)
+        self.mux.dispatch(raw)
+        return self.routed.get(key, 0) > before
+
+    async def run(self) -> None:
+        if not HAS_WEBSOCKETS:
+            raise RuntimeError("websockets 未安裝，無法啟動 combined stream")
+        await self.mux.run()
+
+    def start(self) -> None:
+        """在共用背景事件循環上執行"""
+        if not HAS_WEBSOCKETS:
+            raise RuntimeError("websockets 未安裝，無法啟動 combined stream")
+        self.mux.start_background()
+
+    def stop(self) -> None:
+        self.mux.stop_background()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {key: {'routed': self.routed[key], 'dropped': self.dropped[key]} for key in self._routes}
+
+
+# ==================== 進程 ====================
+
+def pin_to_core(core: Optional[int]) -> bool:
+    """
+    把目前進程綁定到單一 CPU 核心 (僅 Linux 支援 sched_setaffinity)
+
+    Returns:
+        是否成功綁定
+    """
+    if core is None or not hasattr(os, 'sched_setaffinity'):
+        return False
+    try:
+        available = sorted(os.sched_getaffinity(0))
+        target = available[core % len(available)]
+        os.sched_setaffinity(0, {target})
+        return True
+    except OSError as e:
+        logger.warning(f"綁定 CPU 核心 {core} 失敗: {e}")
+        return False
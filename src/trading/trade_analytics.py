@@ -0,0 +1,873 @@
+"""
+交易分析資料表 (Columnar Trade Analytics)
+=======================================
+
+把 trades_*.json / signals_*.json / dYdX order journal 正規化成三張分區 Parquet 表，
+所有分析腳本改成對同一份資料下查詢:
+- trades:  每筆交易一列 (平倉判定、勝負、ROE、六維分數、OBI、時段等欄位定義只有一份)
+- signals: 每個信號一列 (六維 / MTF / 市場狀態展平成欄位)
+- fills:   order journal 每個事件一列 (成交價、數量、盈虧；原始事件保留在 payload)
+
+檔案結構:
+    {root}/manifest.json                                  已匯入的來源檔 (mtime / size / offset / parts)
+    {root}/{table}/date=YYYY-MM-DD/{source}.parquet       一個來源檔在一天內的資料
+
+原理:
+    過去每個腳本各自 json.load 全部檔案、各自決定「平倉」「獲勝」「六維分數」怎麼算，
+    幾個月的日誌每次分析都要數分鐘，而且結果互相對不上。
+    匯入是增量的: 來源檔依 mtime + size 判斷是否變動，只重寫變動檔案的分區檔；
+    journal 是追加寫入的 JSONL，只讀取上次 offset 之後的完整行。
+    查詢以 pyarrow.dataset 依日期分區剪枝，分組統計全部是向量化的 pandas groupby。
+
+用法:
+    analytics = TradeAnalytics("data/analytics")
+    analytics.ingest(log_dirs=["logs/whale_paper_trader"], journals=["logs/dydx_order_journal.jsonl"])
+
+    df = analytics.trades(start="2025-01-01", end="2025-03-31")
+    print(analytics.breakdown("obi_bucket", df))    # mode / direction / leverage / obi_bucket /
+                                                     # six_dim_score / hour / regime ...
+    signals = analytics.signals(since=cutoff, signal_type="ENTERED")
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pa_ds
+import pyarrow.parquet as pq
+
+from ..core.config_service import write_json_atomic
+from ..utils.snapshot_recorder import PROB_FIELDS, STRATEGY_COLUMNS
+from .trade_store import trade_roe_pct
+
+try:
+    import duckdb
+    HAS_DUCKDB = True
+except ImportError:
+    duckdb = None
+    HAS_DUCKDB = False
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+DEFAULT_ANALYTICS_DIR = Path("data/analytics")
+DEFAULT_LOG_DIRS: Tuple[Path, ...] = (Path("logs/whale_paper_trader"),)
+DEFAULT_JOURNALS: Tuple[Path, ...] = (Path("logs/dydx_order_journal.jsonl"),)
+
+TABLES = ("trades", "signals", "fills")
+JOURNAL_SOURCE = "dydx_journal"
+
+PathLike = Union[str, Path]
+
+# ==================== Schema ====================
+
+PROB_COLUMNS: Tuple[str, ...] = PROB_FIELDS  # 與快照表相同的策略機率欄位
+_PROB_INDEX = {name: i for i, name in enumerate(STRATEGY_COLUMNS)}
+
+_TS = pa.timestamp("ms")  # UTC (naive 字串視為本機時間，一律轉成 UTC)
+
+TRADE_FIELDS: Tuple[Tuple[str, pa.DataType], ...] = (
+    ("trade_id", pa.string()),
+    ("source", pa.string()),          # 日誌目錄名稱或 dydx_journal
+    ("session", pa.string()),
+    ("card", pa.string()),
+    ("strategy", pa.string()),        # 模式 / 策略 (mode)
+    ("direction", pa.string()),
+    ("status", pa.string()),
+    ("exit_reason", pa.string()),
+    ("closed", pa.bool_()),
+    ("is_win", pa.bool_()),
+    ("entry_time", _TS),
+    ("exit_time", _TS),
+    ("entry_hour", pa.int8()),
+    ("entry_price", pa.float64()),
+    ("exit_price", pa.float64()),
+    ("leverage", pa.float64()),
+    ("position_size_usdt", pa.float64()),
+    ("pnl_usdt", pa.float64()),
+    ("net_pnl_usdt", pa.float64()),
+    ("pnl_pct", pa.float64()),        # 槓桿後 %
+    ("price_move_pct", pa.float64()),
+    ("roe_pct", pa.float64()),        # 扣費後槓桿 ROE% (trade_store.trade_roe_pct)
+    ("fee_usdt", pa.float64()),
+    ("hold_seconds", pa.float64()),
+    ("probability", pa.float64()),
+    ("confidence", pa.float64()),
+    ("obi", pa.float64()),
+    ("vpin", pa.float64()),
+    ("six_dim_long", pa.int16()),
+    ("six_dim_short", pa.int16()),
+    ("six_dim_score", pa.int16()),    # 與交易方向一致的那一邊
+    ("regime", pa.string()),
+    ("entry_type", pa.string()),
+    ("max_profit_pct", pa.float64()),
+    ("max_drawdown_pct", pa.float64()),
+    ("target_pct", pa.float64()),
+    ("stop_loss_pct", pa.float64()),
+    ("ingest_seq", pa.int64()),       # 同一 trade_id 出現在多個來源時取最新匯入的
+) + tuple((name, pa.float64()) for name in PROB_COLUMNS)
+
+SIGNAL_FIELDS: Tuple[Tuple[str, pa.DataType], ...] = (
+    ("timestamp", _TS),
+    ("source", pa.string()),
+    ("session", pa.string()),
+    ("signal_type", pa.string()),
+    ("direction", pa.string()),
+    ("reason", pa.string()),
+    ("price", pa.float64()),
+    ("hour", pa.int8()),
+    ("long_score", pa.int16()),
+    ("short_score", pa.int16()),
+    ("fast_dir", pa.string()),
+    ("medium_dir", pa.string()),
+    ("slow_dir", pa.string()),
+    ("obi_dir", pa.string()),
+    ("momentum_dir", pa.string()),
+    ("volume_dir", pa.string()),
+    ("rsi_1m", pa.float64()),
+    ("rsi_5m", pa.float64()),
+    ("rsi_15m", pa.float64()),
+    ("rsi_1h", pa.float64()),
+    ("rsi_4h", pa.float64()),
+    ("mtf_direction", pa.string()),
+    ("mtf_aligned", pa.bool_()),
+    ("obi", pa.float64()),
+    ("regime", pa.string()),
+    ("strategy", pa.string()),
+    ("alignment", pa.string()),       # JSON
+)
+
+FILL_FIELDS: Tuple[Tuple[str, pa.DataType], ...] = (
+    ("ts", _TS),
+    ("source", pa.string()),
+    ("run_id", pa.string()),
+    ("event", pa.string()),
+    ("trade_id", pa.string()),
+    ("side", pa.string()),
+    ("size", pa.float64()),
+    ("fill_price", pa.float64()),
+    ("entry_price", pa.float64()),
+    ("pnl_pct", pa.float64()),
+    ("pnl_usd", pa.float64()),
+    ("execution_time_sec", pa.float64()),
+    ("reason", pa.string()),
+    ("payload", pa.string()),         # 原始事件 JSON
+)
+
+_FIELDS = {"trades": TRADE_FIELDS, "signals": SIGNAL_FIELDS, "fills": FILL_FIELDS}
+_TIME_COLUMN = {"trades": "entry_time", "signals": "timestamp", "fills": "ts"}
+
+
+def table_schema(table: str) -> pa.Schema:
+    """某張表目前版本的 Arrow schema"""
+    return pa.schema([pa.field(n, t) for n, t in _FIELDS[table]],
+                     metadata={"schema_version": str(SCHEMA_VERSION), "table": table})
+
+
+# ==================== 正規化 ====================
+
+def _num(value: Any, default: float = 0.0) -> float:
+    try:
+        return float(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _int(value: Any) -> int:
+    return int(_num(value))
+
+
+def _str(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def _utc(dt: datetime) -> datetime:
+    """datetime → naive UTC (naive 的視為本機時間，與日誌的 datetime.now() 一致)"""
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _ts(value: Any) -> Optional[datetime]:
+    """ISO 字串 / epoch 秒 → naive UTC datetime (小時 / 日期分桶都以 UTC 為準)"""
+    if value in (None, ""):
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(float(value), tz=timezone.utc).replace(tzinfo=None)
+        return _utc(datetime.fromisoformat(str(value).replace("Z", "+00:00")))
+    except (ValueError, OSError, OverflowError):
+        return None
+
+
+def _probs(strategy_probs: Any) -> List[float]:
+    row = [0.0] * len(PROB_COLUMNS)
+    if isinstance(strategy_probs, Mapping):
+        for key, value in strategy_probs.items():
+            idx = _PROB_INDEX.get(getattr(key, 'name', key))
+            row[-1 if idx is None else idx] += _num(value)
+    return row
+
+
+def normalize_trade(t: Mapping[str, Any], source: str = "", session: str = "", card: str = "") -> Dict[str, Any]:
+    """
+    一筆交易 (TradeRecord.to_dict / 舊版日誌 / journal trade_closed) → trades 表的一列
+
+    欄位定義:
+        closed:        status 以 CLOSED 開頭 (journal 的 trade_closed 一律為平倉)
+        is_win:        記錄本身的 is_win；否則 net_pnl_usdt > 0，沒有 USDT 盈虧時用 pnl_pct > 0
+        six_dim_score: LONG 取多方分數、SHORT 取空方分數
+    """
+    direction = _str(t.get('direction') or t.get('side')).upper()
+    status = _str(t.get('status') or ('CLOSED' if t.get('exit_time') or t.get('event') == 'trade_closed' else 'OPEN'))
+    if t.get('event') == 'trade_closed' and not status.startswith('CLOSED'):
+        status = 'CLOSED'
+    exit_reason = _str(t.get('exit_reason'))
+    if not exit_reason and status.startswith('CLOSED_'):
+        exit_reason = status[len('CLOSED_'):]
+
+    has_usdt = any(t.get(k) is not None for k in ('net_pnl_usdt', 'pnl_usdt'))
+    net_pnl = _num(t.get('net_pnl_usdt', t.get('pnl_usdt')))
+    pnl_pct = _num(t.get('pnl_pct'))
+    six_long = _int(t.get('six_dim_long_score', t.get('entry_six_dim_long')))
+    six_short = _int(t.get('six_dim_short_score', t.get('entry_six_dim_short')))
+    if 'six_dim_score' in t and not (six_long or six_short):
+        score = _int(t.get('six_dim_score'))
+    else:
+        score = six_long if direction == 'LONG' else six_short if direction == 'SHORT' else max(six_long, six_short)
+    leverage = _num(t.get('actual_leverage', t.get('leverage')))
+    entry_time = _ts(t.get('entry_time') or t.get('timestamp'))
+    exit_time = _ts(t.get('exit_time'))
+    if t.get('event') == 'trade_closed':
+        # journal 只記錄平倉時間；進場時間由持倉秒數回推
+        exit_time = _ts(t.get('ts'))
+        if entry_time is None and exit_time is not None:
+            entry_time = exit_time - timedelta(seconds=_num(t.get('hold_seconds')))
+    if t.get('is_win') is not None:
+        is_win = bool(t.get('is_win'))
+    else:
+        is_win = net_pnl > 0 if has_usdt else pnl_pct > 0
+
+    row = {
+        'trade_id': _str(t.get('trade_id') or t.get('order_id')),
+        'source': source,
+        'session': session,
+        'card': card,
+        'strategy': _str(t.get('strategy') or t.get('mode') or 'UNKNOWN'),
+        'direction': direction,
+        'status': status,
+        'exit_reason': exit_reason,
+        'closed': status.startswith('CLOSED'),
+        'is_win': is_win,
+        'entry_time': entry_time,
+        'exit_time': exit_time,
+        'entry_hour': entry_time.hour if entry_time else -1,
+        'entry_price': _num(t.get('entry_price')),
+        'exit_price': _num(t.get('exit_price')),
+        'leverage': leverage,
+        'position_size_usdt': _num(t.get('position_size_usdt', t.get('position_value'))),
+        'pnl_usdt': _num(t.get('pnl_usdt', t.get('net_pnl_usdt'))),
+        'net_pnl_usdt': net_pnl,
+        'pnl_pct': pnl_pct,
+        'price_move_pct': _num(t.get('price_move_pct')),
+        'roe_pct': trade_roe_pct({**t, 'net_pnl_usdt': net_pnl}),
+        'fee_usdt': _num(t.get('fee_usdt')),
+        'hold_seconds': _num(t.get('hold_seconds', t.get('holding_seconds'))),
+        'probability': _num(t.get('probability')),
+        'confidence': _num(t.get('confidence')),
+        'obi': _num(t.get('obi', t.get('entry_obi'))),
+        'vpin': _num(t.get('vpin', t.get('entry_vpin'))),
+        'six_dim_long': six_long,
+        'six_dim_short': six_short,
+        'six_dim_score': score,
+        'regime': _str(t.get('market_regime') or t.get('regime')),
+        'entry_type': _str(t.get('entry_type')),
+        'max_profit_pct': _num(t.get('max_profit_pct')),
+        'max_drawdown_pct': _num(t.get('max_drawdown_pct')),
+        'target_pct': _num(t.get('actual_target_pct')),
+        'stop_loss_pct': _num(t.get('actual_stop_loss_pct')),
+        'ingest_seq': 0,
+    }
+    row.update(zip(PROB_COLUMNS, _probs(t.get('strategy_probs'))))
+    return row
+
+
+def normalize_signal(s: Mapping[str, Any], source: str = "", session: str = "") -> Dict[str, Any]:
+    """signals_*.json 的一筆信號 → signals 表的一列"""
+    six = s.get('six_dim') or {}
+    mtf = s.get('mtf') or {}
+    market = s.get('market') or {}
+    ts = _ts(s.get('timestamp'))
+    return {
+        'timestamp': ts,
+        'source': source,
+        'session': session,
+        'signal_type': _str(s.get('signal_type')),
+        'direction': _str(s.get('direction')).upper(),
+        'reason': _str(s.get('reason')),
+        'price': _num(s.get('price')),
+        'hour': ts.hour if ts else -1,
+        'long_score': _int(six.get('long_score')),
+        'short_score': _int(six.get('short_score')),
+        'fast_dir': _str(six.get('fast_dir')),
+        'medium_dir': _str(six.get('medium_dir')),
+        'slow_dir': _str(six.get('slow_dir')),
+        'obi_dir': _str(six.get('obi_dir')),
+        'momentum_dir': _str(six.get('momentum_dir')),
+        'volume_dir': _str(six.get('volume_dir')),
+        'rsi_1m': _num(mtf.get('rsi_1m')),
+        'rsi_5m': _num(mtf.get('rsi_5m')),
+        'rsi_15m': _num(mtf.get('rsi_15m')),
+        'rsi_1h': _num(mtf.get('rsi_1h')),
+        'rsi_4h': _num(mtf.get('rsi_4h')),
+        'mtf_direction': _str(mtf.get('direction')),
+        'mtf_aligned': bool(mtf.get('aligned', False)),
+        'obi': _num(market.get('obi', s.get('obi'))),
+        'regime': _str(market.get('regime', s.get('regime'))),
+        'strategy': _str(market.get('strategy', s.get('strategy'))),
+        'alignment': json.dumps(s.get('alignment') or {}, ensure_ascii=False, default=str),
+    }
+
+
+def normalize_fill(e: Mapping[str, Any], source: str = JOURNAL_SOURCE) -> Dict[str, Any]:
+    """order journal 的一個事件 → fills 表的一列"""
+    return {
+        'ts': _ts(e.get('ts')),
+        'source': source,
+        'run_id': _str(e.get('run_id')),
+        'event': _str(e.get('event') or 'unknown'),
+        'trade_id': _str(e.get('trade_id')),
+        'side': _str(e.get('side') or e.get('direction')).upper(),
+        'size': _num(e.get('size')),
+        'fill_price': _num(e.get('fill_price')),
+        'entry_price': _num(e.get('entry_price')),
+        'pnl_pct': _num(e.get('pnl_pct')),
+        'pnl_usd': _num(e.get('pnl_usd', e.get('net_pnl_usdt'))),
+        'execution_time_sec': _num(e.get('execution_time_sec')),
+        'reason': _str(e.get('reason') or e.get('exit_reason')),
+        'payload': json.dumps(e, ensure_ascii=False, default=str),
+    }
+
+
+def _to_table(table: str, rows: Sequence[Mapping[str, Any]]) -> pa.Table:
+    schema = table_schema(table)
+    columns = {name: [row.get(name) for row in rows] for name in schema.names}
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+# ==================== 匯入 ====================
+
+@dataclass
+class IngestStats:
+    """一次匯入的統計"""
+
+    files_scanned: int = 0
+    files_ingested: int = 0
+    files_unchanged: int = 0
+    files_failed: int = 0
+    trades: int = 0
+    signals: int = 0
+    fills: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _part_name(key: str) -> str:
+    return re.sub(r"[^0-9A-Za-z_.-]+", "_", key)
+
+
+def _session_of(path: Path, prefix: str) -> str:
+    return path.stem[len(prefix):] if path.stem.startswith(prefix) else path.stem
+
+
+# ==================== 查詢 ====================
+
+DEFAULT_LEVERAGE = 50  # 舊版 analyze_by_leverage 對缺少槓桿的交易一律視為 50X
+
+
+def _leverage_bucket(lev: pd.Series) -> pd.Series:
+    """
+    槓桿分組 (與舊版 backtest_cards 一致: 缺少/非正值視為 DEFAULT_LEVERAGE → "41-50x")
+
+    舊版把 40X 以上全部歸入 "41-50x"；現在 50X 以上另分 "51-75x" / "76x+"，
+    避免高槓桿卡片混進 41-50x 的統計。
+    """
+    lev = lev.where(lev > 0, DEFAULT_LEVERAGE)
+    bins = [-np.inf, 10, 20, 30, 40, 50, 75, np.inf]
+    labels = ["1-10x", "11-20x", "21-30x", "31-40x", "41-50x", "51-75x", "76x+"]
+    return pd.cut(lev, bins=bins, labels=labels)
+
+
+def _obi_bucket(obi: pd.Series) -> pd.Series:
+    bins = [-np.inf, -0.3, -0.1, 0.1, 0.3, np.inf]
+    labels = ["< -0.3 (強賣壓)", "-0.3 ~ -0.1 (賣壓)", "-0.1 ~ 0.1 (中性)", "0.1 ~ 0.3 (買壓)", "> 0.3 (強買壓)"]
+    return pd.cut(obi, bins=bins, labels=labels, right=False)
+
+
+# 預先定義的分組維度: 名稱 → 欄位名稱 或 (DataFrame → Series)
+DIMENSIONS: Dict[str, Union[str, Callable[[pd.DataFrame], pd.Series]]] = {
+    "mode": "strategy",
+    "strategy": "strategy",
+    "direction": "direction",
+    "leverage": lambda df: _leverage_bucket(df["leverage"]),
+    "obi_bucket": lambda df: _obi_bucket(df["obi"]),
+    "six_dim_score": "six_dim_score",
+    "hour": "entry_hour",
+    "regime": "regime",
+    "exit_reason": "exit_reason",
+    "card": "card",
+    "session": "session",
+    "source": "source",
+    "date": lambda df: df["entry_time"].dt.strftime("%Y-%m-%d"),
+}
+
+
+def group_stats(df: pd.DataFrame, by: Union[None, str, pd.Series, Sequence[Union[str, pd.Series]]] = None) -> pd.DataFrame:
+    """
+    向量化的交易統計 (by=None 時整體一列)
+
+    欄位: trades, wins, losses, win_rate (%), total_pnl_usdt, avg_pnl_usdt, total_pnl_pct,
+    avg_pnl_pct, avg_win_pct, avg_loss_pct, gross_win, gross_loss, profit_factor,
+    expectancy_usdt, avg_roe_pct, avg_hold_seconds
+
+    df 至少要有 is_win / net_pnl_usdt / pnl_pct；roe_pct / hold_seconds 可省略
+    """
+    win = df["is_win"].astype(bool)
+    pnl = df["net_pnl_usdt"]
+    frame = pd.DataFrame({
+        "trades": 1,
+        "wins": win.astype(int),
+        "total_pnl_usdt": pnl,
+        "total_pnl_pct": df["pnl_pct"],
+        "win_pct": df["pnl_pct"].where(win),
+        "loss_pct": df["pnl_pct"].where(~win),
+        "gross_win": pnl.clip(lower=0),
+        "gross_loss": pnl.clip(upper=0),
+        "roe_pct": df["roe_pct"] if "roe_pct" in df else np.nan,
+        "hold_seconds": df["hold_seconds"] if "hold_seconds" in df else np.nan,
+    }, index=df.index)
+    agg = {
+        "trades": "sum", "wins": "sum", "total_pnl_usdt": "sum", "total_pnl_pct": "sum",
+        "win_pct": "mean", "loss_pct": "mean", "gross_win": "sum", "gross_loss": "sum",
+        "roe_pct": "mean", "hold_seconds": "mean",
+    }
+    if by is None:
+        out = frame.agg(agg).to_frame().T
+        out.index = ["all"]
+    else:
+        keys = [by] if isinstance(by, (str, pd.Series)) else list(by)
+        keys = [df[k] if isinstance(k, str) else k for k in keys]
+        out = frame.groupby(keys, observed=True, sort=True).agg(agg)
+    out["trades"] = out["trades"].astype(int)
+    out["wins"] = out["wins"].astype(int)
+    out["losses"] = out["trades"] - out["wins"]
+    out["win_rate"] = np.where(out["trades"] > 0, out["wins"] / out["trades"].clip(lower=1) * 100, 0.0)
+    out["avg_pnl_usdt"] = out["total_pnl_usdt"] / out["trades"].clip(lower=1)
+    out["avg_pnl_pct"] = out["total_pnl_pct"] / out["trades"].clip(lower=1)
+    out["profit_factor"] = np.where(out["gross_loss"] < 0, out["gross_win"] / -out["gross_loss"].where(out["gross_loss"] < 0, -1), 0.0)
+    out["expectancy_usdt"] = out["avg_pnl_usdt"]
+    out = out.rename(columns={"win_pct": "avg_win_pct", "loss_pct": "avg_loss_pct",
+                              "roe_pct": "avg_roe_pct", "hold_seconds": "avg_hold_seconds"})
+    return out[[
+        "trades", "wins", "losses", "win_rate", "total_pnl_usdt", "avg_pnl_usdt", "total_pnl_pct",
+        "avg_pnl_pct", "avg_win_pct", "avg_loss_pct", "gross_win", "gross_loss", "profit_factor",
+        "expectancy_usdt", "avg_roe_pct", "avg_hold_seconds",
+    ]].fillna(0.0)
+
+
+def breakdown(dimension: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    預先定義維度的分組統計
+
+    Args:
+        dimension: DIMENSIONS 的名稱 (mode / direction / leverage / obi_bucket /
+                   six_dim_score / hour / regime / exit_reason / card / session / source / date)
+        df: 交易表 (TradeAnalytics.trades 的結果)
+    """
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"unknown dimension: {dimension} (choose from {sorted(DIMENSIONS)})")
+    key = DIMENSIONS[dimension]
+    series = df[key] if isinstance(key, str) else key(df)
+    return group_stats(df, series.rename(dimension))
+
+
+def stats_dict(stats: pd.DataFrame) -> Dict[Any, Dict[str, Any]]:
+    """group_stats 結果 → {group: {欄位: 值}} (腳本輸出用)"""
+    return {key: {k: (v.item() if hasattr(v, 'item') else v) for k, v in row.items()}
+            for key, row in stats.to_dict(orient="index").items()}
+
+
+def trade_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """trades 表 → 舊格式的交易 dict (strategy_probs 由 prob_* 欄位還原，時間為 ISO 字串)"""
+    base_cols = [c for c in df.columns if not c.startswith("prob_")]
+    records = df[base_cols].astype(object).where(df[base_cols].notna(), None).to_dict(orient="records")
+    probs = df[[c for c in PROB_COLUMNS if c in df.columns]].to_numpy(dtype=float) if len(df) else None
+    names = list(STRATEGY_COLUMNS) + ["OTHER"]
+    for i, rec in enumerate(records):
+        for key in ("entry_time", "exit_time"):
+            value = rec.get(key)
+            rec[key] = value.isoformat() if value is not None else ""
+        rec['market_regime'] = rec.get('regime', '')
+        if probs is not None:
+            rec['strategy_probs'] = {n: float(p) for n, p in zip(names, probs[i]) if p}
+    return records
+
+
+def signal_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """signals 表 → signals_*.json 的巢狀格式"""
+    out = []
+    for rec in df.astype(object).where(df.notna(), None).to_dict(orient="records"):
+        ts = rec.get('timestamp')
+        out.append({
+            'timestamp': ts.isoformat() if ts is not None else "",
+            'signal_type': rec['signal_type'],
+            'direction': rec['direction'],
+            'reason': rec['reason'],
+            'price': rec['price'],
+            'six_dim': {k: rec[k] for k in ('long_score', 'short_score', 'fast_dir', 'medium_dir',
+                                            'slow_dir', 'obi_dir', 'momentum_dir', 'volume_dir')},
+            'mtf': {
+                'rsi_1m': rec['rsi_1m'], 'rsi_5m': rec['rsi_5m'], 'rsi_15m': rec['rsi_15m'],
+                'rsi_1h': rec['rsi_1h'], 'rsi_4h': rec['rsi_4h'],
+                'direction': rec['mtf_direction'], 'aligned': rec['mtf_aligned'],
+            },
+            'market': {'obi': rec['obi'], 'regime': rec['regime'], 'strategy': rec['strategy']},
+            'alignment': json.loads(rec['alignment'] or '{}'),
+        })
+    return out
+
+
+class TradeAnalytics:
+    """交易分析資料表：增量匯入 + 分區查詢"""
+
+    def __init__(self, root: PathLike = DEFAULT_ANALYTICS_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._manifest_path = self.root / "manifest.json"
+
+    # ------------------------------------------------------------------ #
+    # 匯入
+    # ------------------------------------------------------------------ #
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self._manifest_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            data = {}
+        if data.get('schema_version') != SCHEMA_VERSION:
+            if data:
+                logger.info("Analytics schema changed (%s → %s), re-ingesting all sources",
+                            data.get('schema_version'), SCHEMA_VERSION)
+                self._drop_parts(p for src in data.get('sources', {}).values() for p in src.get('parts', []))
+            data = {'schema_version': SCHEMA_VERSION, 'seq': 0, 'sources': {}}
+        return data
+
+    def _drop_parts(self, parts: Iterable[str]) -> None:
+        for rel in parts:
+            try:
+                (self.root / rel).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _write_parts(self, table: str, key: str, rows: Sequence[Mapping[str, Any]]) -> List[str]:
+        """依日期分區寫出一個來源的資料，回傳相對路徑"""
+        if not rows:
+            return []
+        time_col = _TIME_COLUMN[table]
+        by_day: Dict[str, List[Mapping[str, Any]]] = {}
+        for row in rows:
+            ts = row.get(time_col)
+            by_day.setdefault(ts.strftime("%Y-%m-%d") if ts else "unknown", []).append(row)
+        parts = []
+        for day, day_rows in sorted(by_day.items()):
+            rel = f"{table}/date={day}/{_part_name(key)}.parquet"
+            path = self.root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".parquet.tmp")
+            pq.write_table(_to_table(table, day_rows), tmp, compression="zstd")
+            os.replace(tmp, path)
+            parts.append(rel)
+        return parts
+
+    def ingest(
+        self,
+        log_dirs: Iterable[PathLike] = DEFAULT_LOG_DIRS,
+        journals: Iterable[PathLike] = DEFAULT_JOURNALS,
+        force: bool = False,
+    ) -> IngestStats:
+        """
+        增量匯入日誌 (trades_*.json / signals_*.json / journal JSONL)
+
+        Args:
+            log_dirs: 含 trades_*.json / signals_*.json 的目錄 (目錄名稱即 source)
+            journals: order journal JSONL 路徑
+            force: 忽略 manifest，全部重新匯入
+        """
+        stats = IngestStats()
+        with self._lock:
+            manifest = self._load_manifest()
+            sources: Dict[str, Any] = manifest['sources']
+            if force:
+                self._drop_parts(p for src in sources.values() for p in src.get('parts', []))
+                sources.clear()
+
+            for log_dir in map(Path, log_dirs):
+                if not log_dir.is_dir():
+                    continue
+                for path in sorted(log_dir.glob("trades_*.json")) + sorted(log_dir.glob("signals_*.json")):
+                    stats.files_scanned += 1
+                    self._ingest_json(path, log_dir.name, sources, manifest, stats)
+
+            for journal in map(Path, journals):
+                if journal.is_file():
+                    stats.files_scanned += 1
+                    self._ingest_journal(journal, sources, manifest, stats)
+
+            if stats.files_ingested:
+                write_json_atomic(self._manifest_path, manifest)
+        return stats
+
+    def _ingest_json(self, path: Path, source: str, sources: Dict[str, Any],
+                     manifest: Dict[str, Any], stats: IngestStats) -> None:
+        key = f"{source}/{path.name}"
+        try:
+            st = path.stat()
+        except OSError:
+            return
+        prev = sources.get(key)
+        if prev and prev['mtime'] == st.st_mtime and prev['size'] == st.st_size:
+            stats.files_unchanged += 1
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            # 寫入中的檔案可能暫時不完整，下次再匯入
+            logger.warning("Analytics: skip %s (%s)", path, e)
+            stats.files_failed += 1
+            return
+
+        manifest['seq'] += 1
+        if path.name.startswith("trades_"):
+            table, session = "trades", _session_of(path, "trades_")
+            card = _str((data.get('session') or {}).get('card_id')) if isinstance(data, dict) else ""
+            raw = data.get('trades', []) if isinstance(data, dict) else data
+            rows = [normalize_trade(t, source, session, card) for t in raw if isinstance(t, Mapping)]
+            for row in rows:
+                row['ingest_seq'] = manifest['seq']
+            stats.trades += len(rows)
+        else:
+            table, session = "signals", _session_of(path, "signals_")
+            raw = data.get('signals', []) if isinstance(data, dict) else data
+            rows = [normalize_signal(s, source, session) for s in raw if isinstance(s, Mapping)]
+            stats.signals += len(rows)
+
+        parts = self._write_parts(table, key, rows)
+        if prev:
+            self._drop_parts(set(prev.get('parts', [])) - set(parts))
+        sources[key] = {'path': str(path), 'mtime': st.st_mtime, 'size': st.st_size, 'parts': parts}
+        stats.files_ingested += 1
+
+    def _ingest_journal(self, path: Path, sources: Dict[str, Any],
+                        manifest: Dict[str, Any], stats: IngestStats) -> None:
+        key = f"{JOURNAL_SOURCE}/{path.name}"
+        size = path.stat().st_size
+        prev = sources.get(key) or {'offset': 0, 'parts': []}
+        offset = prev.get('offset', 0)
+        if size < offset:
+            # 檔案被截斷 / 輪替 → 從頭匯入
+            self._drop_parts(prev.get('parts', []))
+            prev, offset = {'offset': 0, 'parts': []}, 0
+        if size == offset:
+            stats.files_unchanged += 1
+            return
+
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            chunk = f.read(size - offset)
+        end = chunk.rfind(b"\n") + 1  # 只處理完整的行
+        if end == 0:
+            stats.files_unchanged += 1
+            return
+
+        fills, closed = [], []
+        for line in chunk[:end].splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(event, dict):
+                continue
+            fills.append(normalize_fill(event))
+            if event.get('event') == 'trade_closed':
+                closed.append(event)
+
+        manifest['seq'] += 1
+        part_key = f"{key}@{offset:012d}"
+        trade_rows = [normalize_trade(e, JOURNAL_SOURCE, _str(e.get('run_id'))) for e in closed]
+        for row in trade_rows:
+            row['ingest_seq'] = manifest['seq']
+        parts = self._write_parts("fills", part_key, fills) + self._write_parts("trades", part_key, trade_rows)
+        sources[key] = {'path': str(path), 'offset': offset + end, 'parts': prev.get('parts', []) + parts}
+        stats.fills += len(fills)
+        stats.trades += len(trade_rows)
+        stats.files_ingested += 1
+
+    # ------------------------------------------------------------------ #
+    # 查詢
+    # ------------------------------------------------------------------ #
+    def read(
+        self,
+        table: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None,
+        filter: Optional[pa_ds.Expression] = None,
+    ) -> pd.DataFrame:
+        """
+        讀取一張表 (start / end 為 YYYY-MM-DD，依分區剪枝)
+
+        Args:
+            filter: 額外的 pyarrow.dataset 條件 (例如 pa_ds.field("direction") == "LONG")
+        """
+        if table not in TABLES:
+            raise ValueError(f"unknown table: {table}")
+        schema = table_schema(table)
+        base = self.root / table
+        if not base.exists():
+            return schema.empty_table().to_pandas()
+        part_schema = pa.schema([pa.field("date", pa.string())])
+        dataset = pa_ds.dataset(str(base), format="parquet", schema=schema.append(part_schema.field("date")),
+                                partitioning=pa_ds.partitioning(part_schema, flavor="hive"))
+        cond = filter
+        date = pa_ds.field("date")
+        for op, value in (("ge", start), ("le", end)):
+            if value:
+                expr = (date >= str(value)[:10]) if op == "ge" else (date <= str(value)[:10])
+                cond = expr if cond is None else cond & expr
+        result = dataset.to_table(columns=list(columns) if columns else schema.names, filter=cond)
+        return result.to_pandas()
+
+    def trades(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        since: Optional[datetime] = None,
+        closed_only: bool = True,
+        sources: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        交易表 (同一 trade_id 只保留最新匯入的一列)
+
+        Args:
+            since: 進場時間下限 (精確到秒；naive 視為本機時間；start/end 只做日期剪枝)
+            closed_only: 只取平倉交易
+            sources: 只取某些來源 (日誌目錄名稱 / dydx_journal)
+        """
+        cond = None
+        if closed_only:
+            cond = pa_ds.field("closed") == True  # noqa: E712
+        if sources:
+            expr = pa_ds.field("source").isin(list(sources))
+            cond = expr if cond is None else cond & expr
+        if since is not None:
+            since = _utc(since)
+            start = start or since.strftime("%Y-%m-%d")
+        df = self.read("trades", start, end, filter=cond)
+        if since is not None:
+            df = df[df["entry_time"] >= pd.Timestamp(since)]
+        has_id = df["trade_id"] != ""
+        dedup = df[has_id].sort_values("ingest_seq").drop_duplicates(["source", "trade_id"], keep="last")
+        df = pd.concat([dedup, df[~has_id]])
+        return df.sort_values("entry_time", kind="stable").reset_index(drop=True)
+
+    def signals(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        since: Optional[datetime] = None,
+        signal_type: Optional[str] = None,
+        sources: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """信號表 (signal_type 可指定單一類型，例如 ENTERED；sources 同 trades())"""
+        cond = pa_ds.field("signal_type") == signal_type if signal_type else None
+        if sources:
+            expr = pa_ds.field("source").isin(list(sources))
+            cond = expr if cond is None else cond & expr
+        if since is not None:
+            since = _utc(since)
+            start = start or since.strftime("%Y-%m-%d")
+        df = self.read("signals", start, end, filter=cond)
+        if since is not None:
+            df = df[df["timestamp"] >= pd.Timestamp(since)]
+        return df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+    def fills(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        events: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """order journal 事件表 (events 可篩選事件類型)"""
+        cond = pa_ds.field("event").isin(list(events)) if events else None
+        df = self.read("fills", start, end, filter=cond)
+        return df.sort_values("ts", kind="stable").reset_index(drop=True)
+
+    def breakdown(self, dimension: str, df: Optional[pd.DataFrame] = None, **query) -> pd.DataFrame:
+        """分組統計；df 為 None 時以 query (trades() 的參數) 查詢"""
+        return breakdown(dimension, self.trades(**query) if df is None else df)
+
+    def summary(self, df: Optional[pd.DataFrame] = None, **query) -> Dict[str, Any]:
+        """整體統計 (一個 dict)"""
+        if df is None:
+            df = self.trades(**query)
+        return stats_dict(group_stats(df))["all"]
+
+    def sql(self, query: str):
+        """
+        以 DuckDB 查詢 (需要 duckdb；表名 trades / signals / fills)
+
+        Returns:
+            pandas.DataFrame
+        """
+        if not HAS_DUCKDB:
+            raise ImportError("duckdb is required for TradeAnalytics.sql()")
+        con = duckdb.connect()
+        try:
+            for table in TABLES:
+                base = self.root / table
+                if base.exists():
+                    con.execute(
+                        f"CREATE VIEW {table} AS SELECT * FROM "
+                        f"read_parquet('{base.as_posix()}/*/*.parquet', hive_partitioning = true)"
+                    )
+            return con.execute(query).df()
+        finally:
+            con.close()
+
+
+# 全局實例 (同一 root 共用，匯入互斥)
+_instances: Dict[str, TradeAnalytics] = {}
+_instances_lock = threading.Lock()
+
+
+def get_trade_analytics(root: PathLike = DEFAULT_ANALYTICS_DIR) -> TradeAnalytics:
+    """獲取某個 root 的共享 TradeAnalytics"""
+    key = str(Path(root).resolve())
+    with _instances_lock:
+        inst = _instances.get(key)
+        if inst is None:
+            inst = _instances[key] = TradeAnalytics(root)
+        return inst
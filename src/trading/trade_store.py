@@ -0,0 +1,445 @@
+"""
+交易記錄存放庫 (Trade Store)
+===========================
+
+以 SQLite (WAL 模式) 保存交易記錄，並增量維護統計:
+- upsert: 單筆交易一個交易事務寫入；崩潰時最多遺失最後一筆未提交的更新
+- 增量統計: 交易第一次「平倉」時，把它的貢獻加到 all / session / card / strategy / regime
+  各維度的累加列 (筆數、勝負、盈虧總和、持倉時間總和)；勝率 / 平均盈虧 / profit factor
+  直接由累加列算出，不再每次掃描全部交易
+- 索引查詢: 啟動分析 (最近 N 筆平倉 ROE 的平均 / 最大 / 最小) 走 exit_ts 索引
+- JSON 匯出: trades_*.json 只在需要時 (會話結束 / 手動) 以「暫存檔 + os.replace」原子寫出
+- 歷史匯入: 舊的 trades_*.json 依檔名 + mtime 只匯入一次
+
+原理:
+    過去每次保存都重建 closed / wins / losses 清單、重算總和，再用 indent=2 重寫整個 JSON，
+    保存時間隨歷史長度線性成長；json.dump 中途崩潰會留下截斷的檔案 (整天的紀錄遺失)。
+    WAL 模式下寫入是追加到日誌檔、讀取不阻塞寫入，synchronous=NORMAL 在 WAL 下仍保證
+    資料庫一致性 (最多遺失最後一個事務)。
+
+用法:
+    store = TradeStore("logs/whale_paper_trader/trades.db")
+    store.upsert(trade.to_dict(), session="20250101_120000", card="scalp")
+    stats = store.stats()                      # 全部
+    by_card = store.breakdown("card")          # 每張卡片
+    summary = store.roe_summary(limit=500)     # 最近 500 筆平倉的 ROE 統計
+    store.export_json(path, session="20250101_120000", extra={...})
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from ..core.clock import Clock, get_clock
+
+logger = logging.getLogger(__name__)
+
+# 統計維度 (scope): all 只有一個 key "*"
+SCOPES = ("all", "session", "card", "strategy", "regime")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id     TEXT PRIMARY KEY,
+    session      TEXT NOT NULL DEFAULT '',
+    card         TEXT NOT NULL DEFAULT '',
+    strategy     TEXT NOT NULL DEFAULT '',
+    regime       TEXT NOT NULL DEFAULT '',
+    direction    TEXT NOT NULL DEFAULT '',
+    status       TEXT NOT NULL DEFAULT 'OPEN',
+    closed       INTEGER NOT NULL DEFAULT 0,
+    entry_ts     REAL,
+    exit_ts      REAL,
+    net_pnl_usdt REAL NOT NULL DEFAULT 0,
+    roe_pct      REAL NOT NULL DEFAULT 0,
+    hold_seconds REAL NOT NULL DEFAULT 0,
+    data         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trades_closed_exit ON trades (closed, exit_ts);
+CREATE INDEX IF NOT EXISTS idx_trades_session ON trades (session);
+
+CREATE TABLE IF NOT EXISTS aggregates (
+    scope         TEXT NOT NULL,
+    key           TEXT NOT NULL,
+    trades        INTEGER NOT NULL DEFAULT 0,
+    wins          INTEGER NOT NULL DEFAULT 0,
+    gross_win     REAL NOT NULL DEFAULT 0,
+    gross_loss    REAL NOT NULL DEFAULT 0,
+    sum_win_roe   REAL NOT NULL DEFAULT 0,
+    sum_loss_roe  REAL NOT NULL DEFAULT 0,
+    sum_hold      REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, key)
+);
+
+CREATE TABLE IF NOT EXISTS imported_files (
+    name   TEXT PRIMARY KEY,
+    mtime  REAL NOT NULL,
+    trades INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+@dataclass
+class TradeStats:
+    """某一維度的累計統計 (losses = 非獲利的平倉筆數，與 trades_*.json 的 statistics 一致)"""
+
+    trades: int = 0
+    wins: int = 0
+    losses: int = 0
+    total_pnl_usdt: float = 0.0
+    gross_win: float = 0.0
+    gross_loss: float = 0.0
+    win_rate: float = 0.0          # %
+    avg_win: float = 0.0           # USDT
+    avg_loss: float = 0.0          # USDT (負數)
+    avg_win_roe_pct: float = 0.0
+    avg_loss_roe_pct: float = 0.0  # 負數
+    profit_factor: float = 0.0
+    avg_hold_seconds: float = 0.0
+
+    @classmethod
+    def from_row(cls, row: Optional[sqlite3.Row]) -> 'TradeStats':
+        if row is None or not row['trades']:
+            return cls()
+        trades, wins = row['trades'], row['wins']
+        losses = trades - wins
+        gross_win, gross_loss = row['gross_win'], row['gross_loss']
+        return cls(
+            trades=trades,
+            wins=wins,
+            losses=losses,
+            total_pnl_usdt=gross_win + gross_loss,
+            gross_win=gross_win,
+            gross_loss=gross_loss,
+            win_rate=wins / trades * 100,
+            avg_win=gross_win / wins if wins else 0.0,
+            avg_loss=gross_loss / losses if losses else 0.0,
+            avg_win_roe_pct=row['sum_win_roe'] / wins if wins else 0.0,
+            avg_loss_roe_pct=row['sum_loss_roe'] / losses if losses else 0.0,
+            profit_factor=abs(gross_win / gross_loss) if gross_loss else 0.0,
+            avg_hold_seconds=row['sum_hold'] / trades,
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _parse_ts(value: Any) -> Optional[float]:
+    if not value:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def trade_roe_pct(trade: Dict[str, Any]) -> float:
+    """槓桿後淨 ROE% (net_pnl_usdt 已含手續費；缺倉位/槓桿時退回 pnl_pct)"""
+    net_pnl = trade.get('net_pnl_usdt', 0) or 0
+    pos_usdt = trade.get('position_size_usdt', 0) or 0
+    try:
+        lev = float(trade.get('actual_leverage', trade.get('leverage', 0)) or 0)
+    except (TypeError, ValueError):
+        lev = 0.0
+    if pos_usdt and lev:
+        return net_pnl / pos_usdt * lev * 100
+    return float(trade.get('pnl_pct', 0) or 0)
+
+
+class TradeStore:
+    """SQLite 交易記錄存放庫 (執行緒安全，單一連線 + 鎖)"""
+
+    def __init__(self, path: Union[str, Path], clock: Optional[Clock] = None):
+        self.clock = clock or get_clock()
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ==================== 寫入 ====================
+
+    def upsert(
+        self,
+        trade: Dict[str, Any],
+        session: str = "",
+        card: str = "",
+        regime: Optional[str] = None,
+    ) -> bool:
+        """
+        寫入 / 更新一筆交易
+
+        Args:
+            trade: TradeRecord.to_dict()
+            session: 會話 ID (trades_{session}.json 的時間戳)
+            card: 交易卡片 ID
+            regime: 市場狀態；None = 取 trade['market_regime']
+
+        Returns:
+            這次寫入是否讓交易變成平倉 (已計入統計)
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                newly_closed = self._upsert(trade, session, card, regime)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return newly_closed
+
+    def upsert_many(
+        self,
+        trades: Iterable[Dict[str, Any]],
+        session: str = "",
+        card: str = "",
+    ) -> int:
+        """一個交易事務寫入多筆，回傳新平倉筆數"""
+        closed = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for trade in trades:
+                    closed += self._upsert(trade, session, card, None)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return closed
+
+    def _upsert(self, trade: Dict[str, Any], session: str, card: str, regime: Optional[str]) -> bool:
+        trade_id = str(trade.get('trade_id') or '')
+        if not trade_id:
+            raise ValueError("trade_id is required")
+        status = str(trade.get('status') or 'OPEN')
+        closed = status != 'OPEN'
+        regime = regime if regime is not None else str(trade.get('market_regime') or '')
+        strategy = str(trade.get('strategy') or '')
+        net_pnl = float(trade.get('net_pnl_usdt', 0) or 0)
+        roe = trade_roe_pct(trade)
+        hold = float(trade.get('hold_seconds', 0) or 0)
+
+        prev = self._conn.execute(
+            "SELECT closed, session, card, strategy, regime, net_pnl_usdt, roe_pct, hold_seconds "
+            "FROM trades WHERE trade_id = ?",
+            (trade_id,),
+        ).fetchone()
+        # 已平倉的交易再次寫入 (例如盈虧修正): 先扣掉舊的貢獻
+        if prev is not None and prev['closed']:
+            self._apply(prev['session'], prev['card'], prev['strategy'], prev['regime'],
+                        prev['net_pnl_usdt'], prev['roe_pct'], prev['hold_seconds'], sign=-1)
+
+        self._conn.execute(
+            "INSERT INTO trades (trade_id, session, card, strategy, regime, direction, status, closed, "
+            "entry_ts, exit_ts, net_pnl_usdt, roe_pct, hold_seconds, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(trade_id) DO UPDATE SET session=excluded.session, card=excluded.card, "
+            "strategy=excluded.strategy, regime=excluded.regime, direction=excluded.direction, "
+            "status=excluded.status, closed=excluded.closed, entry_ts=excluded.entry_ts, "
+            "exit_ts=excluded.exit_ts, net_pnl_usdt=excluded.net_pnl_usdt, roe_pct=excluded.roe_pct, "
+            "hold_seconds=excluded.hold_seconds, data=excluded.data",
+            (
+                trade_id, session, card, strategy, regime, str(trade.get('direction') or ''),
+                status, int(closed), _parse_ts(trade.get('entry_time')), _parse_ts(trade.get('exit_time')),
+                net_pnl, roe, hold, json.dumps(trade, ensure_ascii=False, default=str),
+            ),
+        )
+        if closed:
+            self._apply(session, card, strategy, regime, net_pnl, roe, hold, sign=1)
+        return closed and (prev is None or not prev['closed'])
+
+    def _apply(self, session: str, card: str, strategy: str, regime: str,
+               net_pnl: float, roe: float, hold: float, sign: int) -> None:
+        win = net_pnl > 0
+        values = (
+            sign,
+            sign * int(win),
+            sign * net_pnl if win else 0.0,
+            0.0 if win else sign * net_pnl,
+            sign * roe if win else 0.0,
+            0.0 if win else sign * roe,
+            sign * hold,
+        )
+        for scope, key in (("all", "*"), ("session", session), ("card", card),
+                           ("strategy", strategy), ("regime", regime)):
+            self._conn.execute(
+                "INSERT INTO aggregates (scope, key, trades, wins, gross_win, gross_loss, "
+                "sum_win_roe, sum_loss_roe, sum_hold) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(scope, key) DO UPDATE SET trades=trades+excluded.trades, "
+                "wins=wins+excluded.wins, gross_win=gross_win+excluded.gross_win, "
+                "gross_loss=gross_loss+excluded.gross_loss, sum_win_roe=sum_win_roe+excluded.sum_win_roe, "
+                "sum_loss_roe=sum_loss_roe+excluded.sum_loss_roe, sum_hold=sum_hold+excluded.sum_hold",
+                (scope, key or '', *values),
+            )
+
+    # ==================== 查詢 ====================
+
+    def stats(self, scope: str = "all", key: str = "*") -> TradeStats:
+        """某一維度的累計統計 (O(1) 讀取累加列)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM aggregates WHERE scope = ? AND key = ?", (scope, key)
+            ).fetchone()
+        return TradeStats.from_row(row)
+
+    def breakdown(self, scope: str) -> Dict[str, TradeStats]:
+        """某一維度所有 key 的統計 (例如每張卡片 / 每個策略)"""
+        if scope not in SCOPES:
+            raise ValueError(f"unknown scope: {scope}")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM aggregates WHERE scope = ? AND trades > 0 ORDER BY key", (scope,)
+            ).fetchall()
+        return {row['key']: TradeStats.from_row(row) for row in rows}
+
+    def roe_summary(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        最近 limit 筆平倉交易的 ROE% 統計 (CLOSED* 狀態，盈虧為 0 的不計)
+
+        Returns:
+            {'win_count', 'loss_count', 'avg_win_pct', 'avg_loss_pct' (正數), 'max_win_pct', 'min_win_pct'}
+        """
+        sql = (
+            "SELECT "
+            "SUM(net_pnl_usdt > 0) AS win_count, SUM(net_pnl_usdt < 0) AS loss_count, "
+            "AVG(CASE WHEN net_pnl_usdt > 0 THEN roe_pct END) AS avg_win_pct, "
+            "AVG(CASE WHEN net_pnl_usdt < 0 THEN ABS(roe_pct) END) AS avg_loss_pct, "
+            "MAX(CASE WHEN net_pnl_usdt > 0 THEN roe_pct END) AS max_win_pct, "
+            "MIN(CASE WHEN net_pnl_usdt > 0 THEN roe_pct END) AS min_win_pct "
+            "FROM (SELECT net_pnl_usdt, roe_pct FROM trades "
+            "WHERE closed = 1 AND status LIKE 'CLOSED%' ORDER BY exit_ts DESC LIMIT ?)"
+        )
+        with self._lock:
+            row = self._conn.execute(sql, (limit if limit else -1,)).fetchone()
+        return {k: (row[k] or 0) for k in row.keys()}
+
+    def session_trades(self, session: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM trades WHERE session = ? ORDER BY entry_ts, rowid", (session,)
+            ).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    # ==================== 匯入 / 匯出 ====================
+
+    def import_json_files(self, paths: Iterable[Path]) -> int:
+        """
+        匯入舊的 trades_*.json (依檔名 + mtime 只匯入一次)
+
+        Returns:
+            本次匯入的交易筆數
+        """
+        imported = 0
+        for path in paths:
+            path = Path(path)
+            try:
+                mtime = path.stat().st_mtime
+            except OSError:
+                continue
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT mtime FROM imported_files WHERE name = ?", (path.name,)
+                ).fetchone()
+            if row is not None and row['mtime'] >= mtime:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"匯入 {path.name} 失敗: {e}")
+                continue
+            trades = [t for t in data.get('trades', []) if t.get('trade_id')]
+            session = path.stem[len("trades_"):] if path.stem.startswith("trades_") else path.stem
+            card = str((data.get('session') or {}).get('card_id') or '')
+            self.upsert_many(trades, session=session, card=card)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO imported_files (name, mtime, trades) VALUES (?, ?, ?)",
+                    (path.name, mtime, len(trades)),
+                )
+            imported += len(trades)
+        return imported
+
+    def export_json(self, path: Union[str, Path], session: str, extra: Optional[Dict[str, Any]] = None) -> Path:
+        """
+        匯出某會話的 trades_*.json (暫存檔 + os.replace，寫到一半崩潰不會截斷舊檔)
+
+        Args:
+            path: 目標檔案
+            session: 會話 ID
+            extra: 額外欄位 (daily_trades / daily_pnl / session 資訊等)
+        """
+        path = Path(path)
+        stats = self.stats("session", session)
+        data = {
+            'trades': self.session_trades(session),
+            **(extra or {}),
+            'last_updated': self.clock.now().isoformat(),
+            'statistics': {
+                'total_trades': stats.trades,
+                'open_trades': self._open_count(session),
+                'wins': stats.wins,
+                'losses': stats.losses,
+                'win_rate': stats.win_rate,
+                'total_pnl_usdt': stats.total_pnl_usdt,
+                'avg_win': stats.avg_win,
+                'avg_loss': stats.avg_loss,
+                'avg_hold_seconds': stats.avg_hold_seconds,
+                'profit_factor': stats.profit_factor,
+            },
+        }
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        # 自己匯出的檔案不需要再匯入
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO imported_files (name, mtime, trades) VALUES (?, ?, ?)",
+                (path.name, path.stat().st_mtime, len(data['trades'])),
+            )
+        return path
+
+    def _open_count(self, session: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM trades WHERE session = ? AND closed = 0", (session,)
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# 全局實例 (同一資料庫檔案共用一個連線)
+_stores: Dict[str, TradeStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_trade_store(path: Union[str, Path], clock: Optional[Clock] = None) -> TradeStore:
+    """獲取某個資料庫檔案的共享 TradeStore"""
+    key = str(Path(path).resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = TradeStore(path, clock=clock)
+        return store
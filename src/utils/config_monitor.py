@@ -10,16 +10,20 @@
 
 重要性：⭐⭐⭐⭐
 用途：交易過程中動態調整策略參數
+
+檔案監看與驗證由 src.core.config_service 負責 (inotify / 輪詢後備)，
+check_for_updates() 只比對 generation，不再每次 stat 檔案。
 """
 
 import json
-import os
 import time
 import shutil
 from pathlib import Path
 from typing import Dict, Optional, Callable
 from datetime import datetime
 
+from src.core.config_service import get_config_service, thaw_config, write_json_atomic
+
 
 class ConfigMonitor:
     """配置檔案熱重載監控器"""
@@ -42,8 +46,12 @@ class ConfigMonitor:
         if not self.config_path.exists():
             raise FileNotFoundError(f"配置檔案不存在: {config_path}")
         
-        # 記錄最後修改時間
-        self.last_modified = self.config_path.stat().st_mtime
+        # 由配置服務監看；驗證未通過的版本不會被發布
+        self._entry = get_config_service().watch(
+            self.config_path, validate=lambda cfg: self._validate_config(cfg)[1]
+        )
+        self.generation = self._entry.generation
+        self._reported_error: Optional[str] = None
         
         # 備份目錄
         self.backup_dir = self.config_path.parent / "backups"
@@ -61,15 +69,10 @@ class ConfigMonitor:
         print(f"   備份目錄: {self.backup_dir}")
     
     def _load_config(self) -> dict:
-        """載入配置檔案"""
-        try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            return config
-        except json.JSONDecodeError as e:
-            raise ValueError(f"配置檔案 JSON 格式錯誤: {e}")
-        except Exception as e:
-            raise Exception(f"載入配置失敗: {e}")
+        """取得配置服務上的最新有效版本 (可修改副本)"""
+        if not self._entry.snapshot.exists:
+            raise ValueError(f"載入配置失敗: {self._entry.last_error or self.config_path}")
+        return thaw_config(self._entry.data)
     
     def _validate_config(self, config: dict) -> tuple[bool, list[str]]:
         """
@@ -106,8 +109,8 @@ class ConfigMonitor:
         
         return len(errors) == 0, errors
     
-    def _create_backup(self, suffix: str = ""):
-        """創建配置檔案備份"""
+    def _create_backup(self, suffix: str = "", config: Optional[dict] = None):
+        """創建配置檔案備份 (指定 config 時備份該內容，否則複製目前檔案)"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         if suffix:
             backup_name = f"{self.config_path.stem}_{suffix}_{timestamp}.json"
@@ -115,12 +118,16 @@ class ConfigMonitor:
             backup_name = f"{self.config_path.stem}_backup_{timestamp}.json"
         
         backup_path = self.backup_dir / backup_name
-        shutil.copy2(self.config_path, backup_path)
+        if config is not None:
+            write_json_atomic(backup_path, config)
+        else:
+            shutil.copy2(self.config_path, backup_path)
         return backup_path
     
     def _rollback(self, backup_path: Path):
-        """從備份回滾配置"""
-        shutil.copy2(backup_path, self.config_path)
+        """從備份回滾配置 (原子替換)"""
+        with open(backup_path, 'r', encoding='utf-8') as f:
+            write_json_atomic(self.config_path, json.load(f))
         print(f"🔄 已回滾配置: {backup_path.name}")
     
     def check_for_updates(self) -> bool:
@@ -130,11 +137,26 @@ class ConfigMonitor:
         Returns:
             是否成功重載配置
         """
+        entry = self._entry
         try:
-            # 檢查檔案修改時間
-            current_modified = self.config_path.stat().st_mtime
+            if entry.generation == self.generation:
+                # 新寫入未通過解析/驗證: 配置服務仍發布舊版，這裡回滾檔案並提示一次
+                if entry.last_error and entry.last_error != self._reported_error:
+                    self._reported_error = entry.last_error
+                    print()
+                    print("❌ 配置驗證失敗:")
+                    for error in entry.last_error.split("; "):
+                        print(f"   • {error}")
+                    print()
+                    print("🔄 正在回滾到上一個有效配置...")
+                    self._rollback(self._create_backup("last_valid", self.current_config))
+                return False
             
-            if current_modified <= self.last_modified:
+            new_config = thaw_config(entry.data)
+            self.generation = entry.generation
+            self._reported_error = None
+            if new_config == self.current_config:
+                # 內容相同 (例如回滾寫回)，不必重新通知
                 return False
             
             print()
@@ -143,32 +165,15 @@ class ConfigMonitor:
             print("=" * 80)
             print(f"⏰ 檢測時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
             
-            # 創建變更前備份
-            backup_path = self._create_backup("before_change")
+            # 備份變更前的有效配置
+            backup_path = self._create_backup("before_change", self.current_config)
             print(f"💾 已創建備份: {backup_path.name}")
             
-            # 載入新配置
-            new_config = self._load_config()
-            
-            # 驗證新配置
-            is_valid, errors = self._validate_config(new_config)
-            
-            if not is_valid:
-                print()
-                print("❌ 配置驗證失敗:")
-                for error in errors:
-                    print(f"   • {error}")
-                print()
-                print("🔄 正在回滾到上一個有效配置...")
-                self._rollback(backup_path)
-                return False
+            # 顯示變更摘要
+            self._print_config_changes(new_config)
             
             # 更新配置
             self.current_config = new_config
-            self.last_modified = current_modified
-            
-            # 顯示變更摘要
-            self._print_config_changes(new_config)
             
             # 調用回調函數
             if self.on_reload:
@@ -181,13 +186,6 @@ class ConfigMonitor:
             
             return True
             
-        except json.JSONDecodeError as e:
-            print()
-            print(f"❌ 配置檔案 JSON 格式錯誤: {e}")
-            print("🔄 保持使用當前配置")
-            print()
-            return False
-            
         except Exception as e:
             print()
             print(f"❌ 重載配置失敗: {e}")
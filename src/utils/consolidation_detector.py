@@ -8,11 +8,56 @@
 """
 
 import numpy as np
-import talib
+import pandas as pd
 from typing import Optional, Dict, Any
 from dataclasses import dataclass
 from datetime import datetime
 
+from ..core.clock import Clock, get_clock
+
+try:
+    import talib
+    HAS_TALIB = True
+except ImportError:
+    HAS_TALIB = False
+
+
+# ==================== 指標計算 (talib 相容) ====================
+
+def bollinger_bands(close: np.ndarray, period: int, nbdev: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """SMA 中軌 + 母體標準差 (ddof=0)，與 talib.BBANDS(matype=0) 相同；前 period-1 根為 NaN"""
+    close = np.asarray(close, dtype=float)
+    middle = np.full(len(close), np.nan)
+    std = np.full(len(close), np.nan)
+    if len(close) >= period:
+        windows = np.lib.stride_tricks.sliding_window_view(close, period)
+        middle[period - 1:] = windows.mean(axis=1)
+        std[period - 1:] = windows.std(axis=1)
+    return middle + nbdev * std, middle, middle - nbdev * std
+
+
+def wilder_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    """
+    Wilder 平滑 ATR，與 talib.ATR 相同:
+    TR 從第 2 根開始，第 period 根輸出 TR[1..period] 的平均，之後 ATR = (前值 * (n-1) + TR) / n
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    atr = np.full(len(close), np.nan)
+    if len(close) <= period:
+        return atr
+    prev_close = close[:-1]
+    tr = np.maximum.reduce([
+        high[1:] - low[1:],
+        np.abs(high[1:] - prev_close),
+        np.abs(low[1:] - prev_close),
+    ])
+    seeded = tr[period - 1:].copy()
+    seeded[0] = tr[:period].mean()
+    atr[period:] = pd.Series(seeded).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+    return atr
+
 
 @dataclass
 class ConsolidationState:
@@ -47,7 +92,8 @@ class ConsolidationDetector:
         atr_threshold: float = 0.005,  # ATR / Price < 0.5% 視為低波動
         percent_b_lower: float = 0.3,  # %B 下限
         percent_b_upper: float = 0.7,  # %B 上限
-        min_data_points: int = 50  # 最少需要的數據點
+        min_data_points: int = 50,  # 最少需要的數據點
+        clock: Optional[Clock] = None
     ):
         """
         初始化盤整偵測器
@@ -61,7 +107,9 @@ class ConsolidationDetector:
             percent_b_lower: %B 下限
             percent_b_upper: %B 上限
             min_data_points: 最少數據點數
+            clock: 時鐘 (預設系統時間；重放時注入 SimulatedClock)
         """
+        self.clock: Clock = clock or get_clock()
         self.bb_period = bb_period
         self.bb_std = bb_std
         self.atr_period = atr_period
@@ -85,6 +133,8 @@ class ConsolidationDetector:
         Returns:
             (upper_band, middle_band, lower_band)
         """
+        if not HAS_TALIB:
+            return bollinger_bands(close, self.bb_period, self.bb_std)
         upper, middle, lower = talib.BBANDS(
             close,
             timeperiod=self.bb_period,
@@ -128,6 +178,17 @@ class ConsolidationDetector:
             return 0
         return (upper - lower) / middle
     
+    def calculate_atr(
+        self,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray
+    ) -> np.ndarray:
+        """計算 ATR 序列（Wilder 平滑）"""
+        if not HAS_TALIB:
+            return wilder_atr(high, low, close, self.atr_period)
+        return talib.ATR(high, low, close, timeperiod=self.atr_period)
+    
     def calculate_atr_ratio(
         self,
         high: np.ndarray,
@@ -140,7 +201,7 @@ class ConsolidationDetector:
         Returns:
             ATR / Close 比率
         """
-        atr = talib.ATR(high, low, close, timeperiod=self.atr_period)
+        atr = self.calculate_atr(high, low, close)
         if len(atr) == 0 or np.isnan(atr[-1]):
             return 0
         
@@ -171,46 +232,52 @@ class ConsolidationDetector:
         """
         # 數據驗證
         if len(close) < self.min_data_points:
-            return ConsolidationState(
-                is_consolidating=False,
-                bb_width=0,
-                bb_percent_b=0.5,
-                atr_ratio=0,
-                confidence=0,
-                reason="數據不足",
-                timestamp=datetime.now()
-            )
+            return self.empty_state("數據不足")
         
         # 1. 計算 Bollinger Bands
         upper, middle, lower = self.calculate_bollinger_bands(close)
         
         # 檢查計算結果
         if np.isnan(upper[-1]) or np.isnan(lower[-1]) or np.isnan(middle[-1]):
-            return ConsolidationState(
-                is_consolidating=False,
-                bb_width=0,
-                bb_percent_b=0.5,
-                atr_ratio=0,
-                confidence=0,
-                reason="BB 計算失敗",
-                timestamp=datetime.now()
-            )
-        
-        # 2. 計算當前指標值
-        current_close = close[-1]
-        current_upper = upper[-1]
-        current_lower = lower[-1]
-        current_middle = middle[-1]
+            return self.empty_state("BB 計算失敗")
         
-        bb_width = self.calculate_bb_width(
-            current_upper, current_lower, current_middle
-        )
-        percent_b = self.calculate_percent_b(
-            current_close, current_upper, current_lower
+        # 2. 以最新值判斷
+        return self.evaluate(
+            close=close[-1],
+            upper=upper[-1],
+            middle=middle[-1],
+            lower=lower[-1],
+            atr_ratio=self.calculate_atr_ratio(high, low, close),
+            use_smoothing=use_smoothing
         )
-        atr_ratio = self.calculate_atr_ratio(high, low, close)
+    
+    def evaluate(
+        self,
+        close: float,
+        upper: float,
+        middle: float,
+        lower: float,
+        atr_ratio: float,
+        use_smoothing: bool = True
+    ) -> ConsolidationState:
+        """
+        由最新一根的 BB / ATR 比率判斷盤整
         
-        # 3. 判斷條件
+        is_consolidating() 與 RegimeEngine (串流更新) 共用這組規則。
+        
+        Args:
+            close: 最新收盤價
+            upper / middle / lower: 最新 Bollinger Band
+            atr_ratio: ATR / Close
+            use_smoothing: 是否使用平滑（多次判斷取平均）
+            
+        Returns:
+            ConsolidationState 對象
+        """
+        bb_width = self.calculate_bb_width(upper, lower, middle)
+        percent_b = self.calculate_percent_b(close, upper, lower)
+        
+        # 1. 判斷條件
         conditions = {
             'bb_narrow': bb_width < self.bb_width_threshold,
             'percent_b_center': (
@@ -219,13 +286,13 @@ class ConsolidationDetector:
             'low_volatility': atr_ratio < self.atr_threshold
         }
         
-        # 4. 計算信心度
+        # 2. 計算信心度
         confidence = sum(conditions.values()) / len(conditions)
         
-        # 5. 判斷是否盤整（至少滿足 2/3 條件）
+        # 3. 判斷是否盤整（至少滿足 2/3 條件）
         is_consolidating = sum(conditions.values()) >= 2
         
-        # 6. 生成判斷原因
+        # 4. 生成判斷原因
         reasons = []
         if conditions['bb_narrow']:
             reasons.append(f"BB收窄({bb_width:.4f})")
@@ -236,7 +303,7 @@ class ConsolidationDetector:
         
         reason = " + ".join(reasons) if reasons else "條件不足"
         
-        # 7. 創建狀態對象
+        # 5. 創建狀態對象
         state = ConsolidationState(
             is_consolidating=is_consolidating,
             bb_width=bb_width,
@@ -244,10 +311,10 @@ class ConsolidationDetector:
             atr_ratio=atr_ratio,
             confidence=confidence,
             reason=reason,
-            timestamp=datetime.now()
+            timestamp=self.clock.now()
         )
         
-        # 8. 平滑處理（避免頻繁切換）
+        # 6. 平滑處理（避免頻繁切換）
         if use_smoothing:
             self.recent_states.append(is_consolidating)
             if len(self.recent_states) > self.history_length:
@@ -260,6 +327,18 @@ class ConsolidationDetector:
         
         return state
     
+    def empty_state(self, reason: str) -> ConsolidationState:
+        """無法判斷時的預設狀態（不盤整、信心度 0）"""
+        return ConsolidationState(
+            is_consolidating=False,
+            bb_width=0,
+            bb_percent_b=0.5,
+            atr_ratio=0,
+            confidence=0,
+            reason=reason,
+            timestamp=self.clock.now()
+        )
+    
     def get_detailed_analysis(
         self,
         high: np.ndarray,
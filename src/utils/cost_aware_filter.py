@@ -7,11 +7,17 @@
 日期: 2025-11-14
 """
 
-from typing import Optional, Dict, Any
+import math
+from typing import Optional, Dict, Any, TYPE_CHECKING
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 
+from ..core.clock import Clock, get_clock
+
+if TYPE_CHECKING:
+    from ..exchange.book_impact import BookImpact
+
 
 class CostDecision(Enum):
     """成本判斷結果"""
@@ -30,6 +36,7 @@ class CostAnalysis:
     min_profit_required: float  # 最小所需利潤（USD）
     reason: str  # 判斷原因
     timestamp: datetime
+    estimated_slippage: float = 0.0  # 預估吃單滑點成本（USD，有訂單簿時）
 
 
 class CostAwareFilter:
@@ -54,6 +61,7 @@ class CostAwareFilter:
         max_fee_ratio: float = 0.30,  # 最大允許費率 30%
         warning_fee_ratio: float = 0.20,  # 警告費率 20%
         min_profit_usd: float = 5.0,  # 最小利潤要求（USD）
+        clock: Optional[Clock] = None,
     ):
         """
         初始化成本感知過濾器
@@ -64,7 +72,9 @@ class CostAwareFilter:
             max_fee_ratio: 最大允許手續費/利潤比率
             warning_fee_ratio: 警告手續費/利潤比率
             min_profit_usd: 最小利潤要求（美元）
+            clock: 時鐘 (預設系統時間；重放時注入 SimulatedClock)
         """
+        self.clock: Clock = clock or get_clock()
         self.maker_fee_rate = maker_fee_rate
         self.taker_fee_rate = taker_fee_rate
         self.max_fee_ratio = max_fee_ratio
@@ -138,6 +148,36 @@ class CostAwareFilter:
         
         return profit
     
+    def calculate_slippage_cost(
+        self,
+        book: 'BookImpact',
+        position_size: float,
+        leverage: int = 1,
+        direction: str = "LONG",
+        is_maker: bool = False
+    ) -> float:
+        """
+        以訂單簿累積深度估算滑點成本（進場吃單 + 平倉吃對手盤）
+        
+        Args:
+            book: 當前訂單簿的 BookImpact
+            position_size: 倉位大小（與 calculate_trading_fee 相同單位）
+            leverage: 槓桿倍數
+            direction: 方向（LONG/SHORT）
+            is_maker: 進場是否為 Maker 單（Maker 進場不計滑點）
+            
+        Returns:
+            滑點成本（USD）；訂單簿深度不足時為 inf
+        """
+        # 數量 = 名義交易額 / 進場價格
+        qty = position_size * leverage
+        entry_side = "BUY" if direction.upper() in ("LONG", "BUY") else "SELL"
+        exit_side = "SELL" if entry_side == "BUY" else "BUY"
+        
+        entry_cost = 0.0 if is_maker else book.impact_cost(entry_side, qty)
+        exit_cost = book.impact_cost(exit_side, qty)  # 平倉通常用 Taker
+        return entry_cost + exit_cost
+    
     def should_trade(
         self,
         entry_price: float,
@@ -147,7 +187,9 @@ class CostAwareFilter:
         leverage: int = 1,
         direction: str = "LONG",
         is_maker: bool = False,
-        account_balance: Optional[float] = None
+        account_balance: Optional[float] = None,
+        book: Optional['BookImpact'] = None,
+        order_qty: Optional[float] = None
     ) -> CostAnalysis:
         """
         判斷是否應該執行交易
@@ -161,6 +203,9 @@ class CostAwareFilter:
             direction: 方向
             is_maker: 是否使用 Maker 單
             account_balance: 帳戶餘額（用於絕對金額計算）
+            book: 當前訂單簿的 BookImpact（提供時滑點成本併入費用）
+            order_qty: 實際下單數量 (幣)；position_size 只是資金比例時提供，
+                       滑點以此數量在訂單簿上估算，再按比例換算到 position_size 的名義額
             
         Returns:
             CostAnalysis 對象
@@ -172,6 +217,21 @@ class CostAwareFilter:
             entry_price, position_size, leverage, is_maker
         )
         
+        # 1b. 滑點成本（有訂單簿時）
+        estimated_slippage = 0.0
+        if book is not None:
+            if order_qty and entry_price > 0:
+                slippage_rate = self.calculate_slippage_cost(
+                    book, order_qty, 1, direction, is_maker
+                ) / (order_qty * entry_price)
+                estimated_slippage = (slippage_rate if math.isinf(slippage_rate)
+                                      else slippage_rate * entry_price * position_size * leverage)
+            else:
+                estimated_slippage = self.calculate_slippage_cost(
+                    book, position_size, leverage, direction, is_maker
+                )
+        total_cost = estimated_fee + estimated_slippage
+        
         # 2. 計算預期利潤
         estimated_profit = self.calculate_expected_profit(
             entry_price, take_profit_percent, position_size, leverage, direction
@@ -181,17 +241,22 @@ class CostAwareFilter:
         if estimated_profit <= 0:
             fee_ratio = float('inf')
         else:
-            fee_ratio = estimated_fee / estimated_profit
+            fee_ratio = total_cost / estimated_profit
         
-        # 4. 計算最小所需利潤（覆蓋手續費 + 最小利潤）
-        min_profit_required = estimated_fee / (1 - self.max_fee_ratio)
+        # 4. 計算最小所需利潤（覆蓋手續費 + 滑點 + 最小利潤）
+        min_profit_required = total_cost / (1 - self.max_fee_ratio)
         
         # 5. 判斷決策
         decision = CostDecision.APPROVE
         reason_parts = []
         
+        # 檢查：訂單簿深度不足以成交 (滑點成本為 inf)
+        if math.isinf(estimated_slippage):
+            decision = CostDecision.REJECT
+            reason_parts.append("訂單簿深度不足")
+        
         # 檢查：預期利潤是否低於最小要求
-        if account_balance and estimated_profit < self.min_profit_usd:
+        elif account_balance and estimated_profit < self.min_profit_usd:
             decision = CostDecision.REJECT
             reason_parts.append(
                 f"預期利潤過低 (${estimated_profit:.2f} < ${self.min_profit_usd})"
@@ -241,7 +306,8 @@ class CostAwareFilter:
             estimated_profit=estimated_profit,
             min_profit_required=min_profit_required,
             reason=reason,
-            timestamp=datetime.now()
+            timestamp=self.clock.now(),
+            estimated_slippage=estimated_slippage
         )
     
     def get_statistics(self) -> Dict[str, Any]:
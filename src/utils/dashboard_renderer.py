@@ -0,0 +1,293 @@
+"""
+儀表板渲染器 (Dashboard Renderer)
+
+把終端機儀表板從交易循環中拆出來:
+- 交易循環每輪只 publish() 一份不可變快照 (DashboardSnapshot)，O(1)、不等待
+- 渲染執行緒以自己的幀率讀取最新快照產生畫面；畫面沒變就不重寫終端機
+- 幀時間預算: 單幀超過預算時自動降幀 (間隔 × 超出倍數)，渲染不會吃掉 CPU
+- PanelCache: 變動緩慢的區塊 (交易所統計、排行榜等) 以 key 快取，key 不變就直接重用
+- 無頭模式 (headless): 不輸出任何畫面；仍需定期跑 render (例如檢查渲染是否正常) 時可用 headless_interval 低頻執行
+
+原理:
+    過去 render_dashboard() 在交易循環內同步執行，每輪重建整個 ANSI 畫面並重算統計
+    (含 REST 查詢)，忙碌的終端機上每輪多出數十毫秒延遲。快照以整份物件替換的方式發布，
+    渲染端拿到的永遠是某一輪的完整狀態，不需要鎖。
+    REST 查詢與會改動狀態的計算要在交易循環內完成，結果放進快照的 extra；render 只讀快照，
+    不發請求也不寫回任何狀態。render 只負責顯示: 降幀與無頭模式會讓它延遲或不執行，
+    下單補救等交易動作必須放在交易循環本身。
+    無法開背景執行緒的環境可改用 pump() 在呼叫端執行緒上按幀率渲染，仍享有幀預算、降幀與畫面去重。
+
+用法:
+    renderer = DashboardRenderer(lambda snap: system.render_dashboard(snap), fps=1.0, frame_budget_ms=50)
+    renderer.start()
+    while running:
+        ...
+        renderer.publish(DashboardSnapshot(iteration=i, timestamp=clock.time(), price=price,
+                                           market_data=freeze(market_data),
+                                           extra=freeze(collect_rest_panels())))
+    renderer.stop()
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLEAR_SCREEN = "\033[2J\033[H"
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+def freeze(data: Optional[Mapping[str, Any]]) -> Mapping[str, Any]:
+    """淺複製成唯讀 mapping (發布後交易循環再改原 dict 也不影響快照)"""
+    return MappingProxyType(dict(data or {}))
+
+
+@dataclass(frozen=True)
+class DashboardSnapshot:
+    """交易循環發布給渲染端的狀態快照 (不可變)"""
+
+    iteration: int
+    timestamp: float
+    price: float = 0.0
+    market_data: Mapping[str, Any] = field(default_factory=lambda: _EMPTY)
+    extra: Mapping[str, Any] = field(default_factory=lambda: _EMPTY)
+
+
+class PanelCache:
+    """
+    區塊快取
+
+    get(name, key, build): key 與上次相同 (且未超過 max_age) 時回傳上次結果，否則重建。
+    """
+
+    def __init__(self, clock: Optional[Callable[[], float]] = None):
+        self._time = clock or time.monotonic
+        self._entries: Dict[str, Tuple[Hashable, float, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, key: Hashable, build: Callable[[], Any], max_age: Optional[float] = None) -> Any:
+        now = self._time()
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is not None and entry[0] == key and (max_age is None or now - entry[1] < max_age):
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        value = build()
+        with self._lock:
+            self._entries[name] = (key, now, value)
+        return value
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+
+@dataclass
+class RendererStats:
+    """渲染統計"""
+
+    published: int = 0
+    frames: int = 0
+    writes: int = 0
+    unchanged: int = 0
+    over_budget: int = 0
+    errors: int = 0
+    last_render_ms: float = 0.0
+    max_render_ms: float = 0.0
+    total_render_ms: float = 0.0
+    current_interval: float = 0.0
+
+    @property
+    def avg_render_ms(self) -> float:
+        return self.total_render_ms / self.frames if self.frames else 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data['avg_render_ms'] = round(self.avg_render_ms, 2)
+        return data
+
+
+class DashboardRenderer:
+    """背景渲染執行緒"""
+
+    def __init__(
+        self,
+        render: Callable[[DashboardSnapshot], Optional[str]],
+        fps: float = 1.0,
+        frame_budget_ms: float = 50.0,
+        output: Optional[TextIO] = None,
+        headless: bool = False,
+        headless_interval: Optional[float] = None,
+        clear_screen: bool = True,
+        max_interval: float = 10.0,
+        name: str = "dashboard-renderer",
+    ):
+        """
+        Args:
+            render: 渲染函式，接收快照回傳畫面字串 (回傳 None = 自行輸出或不輸出)
+            fps: 目標幀率
+            frame_budget_ms: 單幀時間預算 (毫秒)，超過則降幀
+            output: 輸出串流 (預設 sys.stdout)
+            headless: 無頭模式，不輸出畫面
+            headless_interval: 無頭模式下仍以此間隔 (秒) 執行 render 並丟棄輸出；None = 完全不渲染
+            clear_screen: 每幀前清除畫面
+            max_interval: 降幀後的最長間隔 (秒)
+        """
+        self.render = render
+        self.base_interval = 1.0 / fps if fps > 0 else 1.0
+        self.frame_budget_ms = frame_budget_ms
+        self.output = output
+        self.headless = headless
+        self.headless_interval = headless_interval
+        self.clear_screen = clear_screen
+        self.max_interval = max(max_interval, self.base_interval)
+        self.name = name
+        self.stats = RendererStats(current_interval=self.base_interval)
+
+        self._snapshot: Optional[DashboardSnapshot] = None
+        self._rendered: Optional[DashboardSnapshot] = None
+        self._last_frame: Optional[str] = None
+        self._next_frame = 0.0
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ==================== 交易循環端 ====================
+
+    def publish(self, snapshot: DashboardSnapshot) -> None:
+        """發布最新快照 (只替換參考，不等待渲染)"""
+        self._snapshot = snapshot
+        self.stats.published += 1
+        self._wakeup.set()
+
+    @property
+    def latest(self) -> Optional[DashboardSnapshot]:
+        return self._snapshot
+
+    @property
+    def rendered(self) -> Optional[DashboardSnapshot]:
+        """最近一次交給 render 的快照 (交易循環據此確認定時區塊已顯示，再推進自己的計時)"""
+        return self._rendered
+
+    @property
+    def enabled(self) -> bool:
+        return not self.headless or self.headless_interval is not None
+
+    # ==================== 渲染 ====================
+
+    def render_once(self, snapshot: Optional[DashboardSnapshot] = None) -> Optional[str]:
+        """渲染一幀並依需要輸出，回傳畫面字串"""
+        snapshot = snapshot or self._snapshot
+        if snapshot is None:
+            return None
+        # 失敗也標記為已渲染: 同一份快照不重試，等下一次 publish
+        self._rendered = snapshot
+        started = time.perf_counter()
+        try:
+            frame = self.render(snapshot)
+        except Exception as e:
+            # 交易循環同時在更新狀態，偶發的迭代衝突下一幀就會恢復；首次失敗附上 traceback
+            self.stats.errors += 1
+            logger.warning(f"dashboard render failed (#{self.stats.errors}): {e}",
+                           exc_info=self.stats.errors == 1)
+            return None
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._account(elapsed_ms)
+        if frame is None or self.headless:
+            return frame
+        if frame == self._last_frame:
+            self.stats.unchanged += 1
+            return frame
+        self._write(frame)
+        self._last_frame = frame
+        return frame
+
+    def pump(self) -> Optional[str]:
+        """
+        呼叫端執行緒上的幀率控制 (render 需與交易循環串行讀取狀態時使用)
+
+        到了下一幀時間且有新快照才渲染，否則立即返回 None。
+        """
+        if not self.enabled or self._thread is not None:
+            return None
+        now = time.monotonic()
+        if now < self._next_frame or self._snapshot is None or self._snapshot is self._rendered:
+            return None
+        frame = self.render_once()
+        self._next_frame = time.monotonic() + self._interval()
+        return frame
+
+    def _account(self, elapsed_ms: float) -> None:
+        stats = self.stats
+        stats.frames += 1
+        stats.last_render_ms = elapsed_ms
+        stats.total_render_ms += elapsed_ms
+        stats.max_render_ms = max(stats.max_render_ms, elapsed_ms)
+        if self.frame_budget_ms > 0 and elapsed_ms > self.frame_budget_ms:
+            stats.over_budget += 1
+            factor = math.ceil(elapsed_ms / self.frame_budget_ms)
+            stats.current_interval = min(self.max_interval, self.base_interval * factor)
+        else:
+            stats.current_interval = self.base_interval
+
+    def _write(self, frame: str) -> None:
+        out = self.output or sys.stdout
+        try:
+            if self.clear_screen:
+                out.write(CLEAR_SCREEN)
+            out.write(frame)
+            out.flush()
+            self.stats.writes += 1
+        except Exception as e:
+            logger.debug(f"dashboard write failed: {e}")
+
+    def _interval(self) -> float:
+        if self.headless:
+            return self.headless_interval or self.max_interval
+        return self.stats.current_interval
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            wait = self._next_frame - time.monotonic()
+            if wait > 0:
+                self._stop.wait(wait)
+                continue
+            # 沒有新快照就等到交易循環 publish (或停止)
+            if self._snapshot is None or self._snapshot is self._rendered:
+                self._wakeup.wait(self._interval())
+                self._wakeup.clear()
+                if self._snapshot is None or self._snapshot is self._rendered:
+                    continue
+            self.render_once()
+            self._next_frame = time.monotonic() + self._interval()
+
+    # ------------------------ 背景執行緒 ------------------------ #
+    def start(self) -> None:
+        if self._thread is not None or not self.enabled:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
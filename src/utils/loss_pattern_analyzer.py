@@ -7,14 +7,15 @@
 日期: 2025-11-14
 """
 
-import json
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from pathlib import Path
 from collections import defaultdict, Counter
 
+from .streaming_stats import JsonAppendLog, RunningStats
+
 
 @dataclass
 class LossTrade:
@@ -74,6 +75,79 @@ class LossPattern:
     trades: List[str]  # trade_id 列表
     confidence: float  # 信心度 (0-1)
     recommendation: str  # 優化建議
+    recent_occurrences: float = 0.0  # 近期加權次數 (半衰期衰減)
+    loss_std: float = 0.0  # 單筆虧損標準差
+
+
+@dataclass(frozen=True)
+class LossPatternRule:
+    """虧損模式判定規則"""
+    pattern_name: str
+    description: str
+    matches: Callable[[LossTrade], bool]
+    confidence_scale: float  # 出現幾次視為信心度 100%
+    recommendation: str
+
+
+# 依序判定；analyze_patterns 的結果再按累計虧損排序
+LOSS_PATTERN_RULES: Tuple[LossPatternRule, ...] = (
+    # 模式 1：快速止損（持倉時間 < 5分鐘）
+    LossPatternRule(
+        pattern_name="快速止損",
+        description="進場後短時間內被止損，可能是假突破或進場時機不佳",
+        matches=lambda t: t.holding_time_seconds < 300 and t.exit_reason == "SL_HIT",
+        confidence_scale=20,
+        recommendation="建議：1) 加入確認指標（如突破後回踩） 2) 放寬止損 3) 使用時間篩選器"
+    ),
+    # 模式 2：高波動期虧損（VPIN > 0.5 或 ATR 高）
+    LossPatternRule(
+        pattern_name="高波動期虧損",
+        description="在市場波動劇烈時進場，容易被掃止損",
+        matches=lambda t: bool(t.vpin_at_entry and t.vpin_at_entry > 0.5),
+        confidence_scale=15,
+        recommendation="建議：1) 啟用盤整偵測器 2) VPIN > 0.5 時禁止交易 3) 使用動態止損"
+    ),
+    # 模式 3：寬價差期虧損（Spread > 0.1%）
+    LossPatternRule(
+        pattern_name="寬價差期虧損",
+        description="價差過寬時進場，滑點成本高",
+        matches=lambda t: bool(t.spread_at_entry and t.spread_at_entry > 0.001),
+        confidence_scale=10,
+        recommendation="建議：1) Spread > 0.1% 時禁止交易 2) 使用限價單"
+    ),
+    # 模式 4：極端 RSI 進場虧損（RSI < 20 或 > 80）
+    LossPatternRule(
+        pattern_name="極端RSI進場虧損",
+        description="在 RSI 極端值進場（抄底/摸頂），但趨勢繼續",
+        matches=lambda t: bool(t.rsi_at_entry and (t.rsi_at_entry < 20 or t.rsi_at_entry > 80)),
+        confidence_scale=15,
+        recommendation="建議：1) 等待 RSI 背離確認 2) 結合趨勢指標（MA）3) 避免單純抄底"
+    ),
+    # 模式 5：長時間持倉虧損（> 1小時仍被止損）
+    LossPatternRule(
+        pattern_name="長時間持倉虧損",
+        description="持倉超過1小時仍被止損，可能方向判斷錯誤",
+        matches=lambda t: t.holding_time_seconds > 3600 and t.exit_reason == "SL_HIT",
+        confidence_scale=10,
+        recommendation="建議：1) 使用時間止損（如30分鐘未盈利則出場）2) 使用追蹤止損"
+    ),
+    # 模式 6：特定時段虧損（例如凌晨2-6點）
+    LossPatternRule(
+        pattern_name="深夜時段虧損",
+        description="在凌晨2-6點交易，流動性差",
+        matches=lambda t: 2 <= t.entry_time.hour <= 6,
+        confidence_scale=10,
+        recommendation="建議：1) 啟用時間區間分析器 2) 凌晨2-6點禁止交易"
+    ),
+    # 模式 7：高槓桿虧損（槓桿 >= 10x）
+    LossPatternRule(
+        pattern_name="高槓桿虧損",
+        description="使用高槓桿（≥10x），小波動即爆倉",
+        matches=lambda t: t.leverage >= 10,
+        confidence_scale=8,
+        recommendation="建議：1) 降低槓桿至 3-5x 2) 使用動態槓桿（根據波動率調整）"
+    ),
+)
 
 
 class LossPatternAnalyzer:
@@ -85,12 +159,18 @@ class LossPatternAnalyzer:
     2. 分析虧損模式（如「盤整期虧損」「快速止損」等）
     3. 提供優化建議
     4. 生成虧損報告
+    
+    每筆虧損進來時只對它跑一次 LOSS_PATTERN_RULES，更新各模式的計數 / 總和 / 平方和，
+    analyze_patterns 直接由計數器組出結果 (並快取到下一筆虧損進來)。
+    持久化同 TimeZoneAnalyzer：追加日誌 + 定期快照。
     """
     
     def __init__(
         self,
         data_file: str = "data/loss_trades.json",
-        min_pattern_count: int = 3  # 至少3筆交易才認定為模式
+        min_pattern_count: int = 3,  # 至少3筆交易才認定為模式
+        decay_half_life_hours: float = 168.0,  # 近期加權半衰期
+        snapshot_every: int = 100  # 每 N 筆寫一次完整快照
     ):
         """
         初始化錯單放大鏡
@@ -98,40 +178,50 @@ class LossPatternAnalyzer:
         Args:
             data_file: 數據存儲文件
             min_pattern_count: 最少模式識別次數
+            decay_half_life_hours: 近期加權次數的半衰期 (小時)
+            snapshot_every: 追加日誌累積幾筆後寫快照
         """
         self.data_file = Path(data_file)
         self.min_pattern_count = min_pattern_count
+        self.decay_half_life_seconds = decay_half_life_hours * 3600
+        self._log = JsonAppendLog(self.data_file, snapshot_every=snapshot_every)
         
         # 虧損交易記錄
         self.loss_trades: Dict[str, LossTrade] = {}
         
+        # 串流計數器
+        self._reset_counters()
+        
         # 載入歷史數據
         self.load_data()
     
     def load_data(self):
-        """載入歷史虧損數據"""
-        if not self.data_file.exists():
+        """從快照 + 追加日誌載入歷史虧損數據"""
+        if not self.data_file.exists() and not self._log.log_path.exists():
             print(f"虧損數據文件不存在，創建新文件: {self.data_file}")
             self.data_file.parent.mkdir(parents=True, exist_ok=True)
             self.save_data()
             return
         
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            snapshot, records = self._log.load()
             
             self.loss_trades = {}
-            for trade_id, trade_data in data.get('loss_trades', {}).items():
-                self.loss_trades[trade_id] = LossTrade.from_dict(trade_data)
+            self._reset_counters()
+            for trade_data in (snapshot or {}).get('loss_trades', {}).values():
+                self._apply_loss(LossTrade.from_dict(trade_data))
+            for trade_data in records:
+                self._apply_loss(LossTrade.from_dict(trade_data))
             
             print(f"載入虧損記錄: {len(self.loss_trades)} 筆")
         
         except Exception as e:
             print(f"載入虧損數據失敗: {e}")
             self.loss_trades = {}
+            self._reset_counters()
     
     def save_data(self):
-        """保存數據到文件"""
+        """寫出完整快照並清空追加日誌"""
         try:
             data = {
                 'loss_trades': {
@@ -142,8 +232,7 @@ class LossPatternAnalyzer:
                 'total_losses': len(self.loss_trades)
             }
             
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            self._log.snapshot(data)
         
         except Exception as e:
             print(f"保存虧損數據失敗: {e}")
@@ -155,15 +244,109 @@ class LossPatternAnalyzer:
         Args:
             trade: LossTrade 對象
         """
+        self._apply_loss(trade)
+        
+        try:
+            if self._log.append(trade.to_dict()):
+                self.save_data()
+        except OSError as e:
+            print(f"保存虧損數據失敗: {e}")
+    
+    # ==================== 串流計數器 ====================
+    
+    def _reset_counters(self):
+        self._loss_stats = RunningStats(self.decay_half_life_seconds)
+        self._holding_stats = RunningStats(self.decay_half_life_seconds)
+        self._exit_reasons: Counter = Counter()
+        self._strategy_stats: Dict[str, Dict] = defaultdict(lambda: {'count': 0, 'total_loss': 0})
+        self._pattern_stats: Dict[str, RunningStats] = {
+            rule.pattern_name: RunningStats(self.decay_half_life_seconds) for rule in LOSS_PATTERN_RULES
+        }
+        # trade_id 依加入順序 (dict 當有序集合用)
+        self._pattern_trades: Dict[str, Dict[str, None]] = {
+            rule.pattern_name: {} for rule in LOSS_PATTERN_RULES
+        }
+        self._patterns_cache: Optional[List[LossPattern]] = None
+    
+    def _count_loss(self, trade: LossTrade, sign: int):
+        ts = trade.entry_time.timestamp()
+        update = 'add' if sign > 0 else 'remove'
+        getattr(self._loss_stats, update)(trade.loss_amount, ts)
+        getattr(self._holding_stats, update)(trade.holding_time_seconds, ts)
+        self._exit_reasons[trade.exit_reason] += sign
+        if self._exit_reasons[trade.exit_reason] <= 0:
+            del self._exit_reasons[trade.exit_reason]
+        strategy = self._strategy_stats[trade.strategy]
+        strategy['count'] += sign
+        strategy['total_loss'] += sign * trade.loss_amount
+        if strategy['count'] <= 0:
+            del self._strategy_stats[trade.strategy]
+        
+        for rule in LOSS_PATTERN_RULES:
+            if rule.matches(trade):
+                getattr(self._pattern_stats[rule.pattern_name], update)(trade.loss_amount, ts)
+                if sign > 0:
+                    self._pattern_trades[rule.pattern_name][trade.trade_id] = None
+                else:
+                    self._pattern_trades[rule.pattern_name].pop(trade.trade_id, None)
+    
+    def _apply_loss(self, trade: LossTrade):
+        """把一筆虧損併入記錄與計數器 (同 trade_id 先扣掉舊的)"""
+        previous = self.loss_trades.get(trade.trade_id)
+        if previous is not None:
+            self._count_loss(previous, -1)
         self.loss_trades[trade.trade_id] = trade
+        self._count_loss(trade, +1)
+        self._patterns_cache = None
+    
+    def import_from_analytics(self, analytics=None, **query) -> int:
+        """
+        從交易分析表匯入虧損交易 (trade_id 已存在者覆蓋)
         
-        # 定期保存（每10筆）
-        if len(self.loss_trades) % 10 == 0:
-            self.save_data()
+        Args:
+            analytics: TradeAnalytics 實例；None 時用預設的 data/analytics
+            **query: 傳給 TradeAnalytics.trades() 的條件 (start / end / since / sources)
+            
+        Returns:
+            匯入的虧損交易數
+        """
+        from ..trading.trade_analytics import get_trade_analytics
+        
+        analytics = analytics or get_trade_analytics()
+        df = analytics.trades(**query)
+        df = df[~df['is_win'] & df['entry_time'].notna() & (df['trade_id'] != '')]
+        df = df.assign(exit_time=df['exit_time'].fillna(df['entry_time']))
+        
+        # 日誌的平倉原因 (CLOSED_SL / CLOSED_TP) → 本模組的代碼
+        exit_reasons = {'SL': 'SL_HIT', 'TP': 'TP_HIT'}
+        for t in df.itertuples(index=False):
+            self._apply_loss(LossTrade(
+                trade_id=t.trade_id,
+                entry_time=t.entry_time.to_pydatetime(),
+                exit_time=t.exit_time.to_pydatetime(),
+                entry_price=float(t.entry_price),
+                exit_price=float(t.exit_price),
+                position_size=float(t.position_size_usdt),
+                leverage=int(t.leverage),
+                direction=t.direction,
+                loss_amount=abs(float(t.net_pnl_usdt)),
+                loss_percent=abs(float(t.roe_pct) / 100),
+                holding_time_seconds=int(t.hold_seconds),
+                obi_at_entry=float(t.obi),
+                vpin_at_entry=float(t.vpin),
+                exit_reason=exit_reasons.get(t.exit_reason, t.exit_reason or "UNKNOWN"),
+                sl_percent=float(t.stop_loss_pct) or None,
+                tp_percent=float(t.target_pct) or None,
+                strategy=t.strategy,
+                metadata={'source': t.source, 'session': t.session},
+            ))
+        
+        self.save_data()
+        return len(df)
     
     def analyze_patterns(self) -> List[LossPattern]:
         """
-        分析虧損模式
+        分析虧損模式 (由計數器組出，與歷史虧損筆數無關)
         
         Returns:
             識別出的虧損模式列表
@@ -171,132 +354,31 @@ class LossPatternAnalyzer:
         if len(self.loss_trades) < self.min_pattern_count:
             return []
         
-        patterns = []
-        trades = list(self.loss_trades.values())
-        
-        # 模式 1：快速止損（持倉時間 < 5分鐘）
-        fast_sl_trades = [
-            t for t in trades 
-            if t.holding_time_seconds < 300 and t.exit_reason == "SL_HIT"
-        ]
-        if len(fast_sl_trades) >= self.min_pattern_count:
-            patterns.append(LossPattern(
-                pattern_name="快速止損",
-                description="進場後短時間內被止損，可能是假突破或進場時機不佳",
-                occurrence_count=len(fast_sl_trades),
-                total_loss=sum(t.loss_amount for t in fast_sl_trades),
-                avg_loss=np.mean([t.loss_amount for t in fast_sl_trades]),
-                trades=[t.trade_id for t in fast_sl_trades],
-                confidence=min(1.0, len(fast_sl_trades) / 20),
-                recommendation="建議：1) 加入確認指標（如突破後回踩） 2) 放寬止損 3) 使用時間篩選器"
-            ))
-        
-        # 模式 2：高波動期虧損（VPIN > 0.5 或 ATR 高）
-        high_vol_trades = [
-            t for t in trades 
-            if t.vpin_at_entry and t.vpin_at_entry > 0.5
-        ]
-        if len(high_vol_trades) >= self.min_pattern_count:
-            patterns.append(LossPattern(
-                pattern_name="高波動期虧損",
-                description="在市場波動劇烈時進場，容易被掃止損",
-                occurrence_count=len(high_vol_trades),
-                total_loss=sum(t.loss_amount for t in high_vol_trades),
-                avg_loss=np.mean([t.loss_amount for t in high_vol_trades]),
-                trades=[t.trade_id for t in high_vol_trades],
-                confidence=min(1.0, len(high_vol_trades) / 15),
-                recommendation="建議：1) 啟用盤整偵測器 2) VPIN > 0.5 時禁止交易 3) 使用動態止損"
-            ))
-        
-        # 模式 3：寬價差期虧損（Spread > 0.1%）
-        wide_spread_trades = [
-            t for t in trades 
-            if t.spread_at_entry and t.spread_at_entry > 0.001
-        ]
-        if len(wide_spread_trades) >= self.min_pattern_count:
-            patterns.append(LossPattern(
-                pattern_name="寬價差期虧損",
-                description="價差過寬時進場，滑點成本高",
-                occurrence_count=len(wide_spread_trades),
-                total_loss=sum(t.loss_amount for t in wide_spread_trades),
-                avg_loss=np.mean([t.loss_amount for t in wide_spread_trades]),
-                trades=[t.trade_id for t in wide_spread_trades],
-                confidence=min(1.0, len(wide_spread_trades) / 10),
-                recommendation="建議：1) Spread > 0.1% 時禁止交易 2) 使用限價單"
-            ))
-        
-        # 模式 4：極端 RSI 進場虧損（RSI < 20 或 > 80）
-        extreme_rsi_trades = [
-            t for t in trades 
-            if t.rsi_at_entry and (t.rsi_at_entry < 20 or t.rsi_at_entry > 80)
-        ]
-        if len(extreme_rsi_trades) >= self.min_pattern_count:
-            patterns.append(LossPattern(
-                pattern_name="極端RSI進場虧損",
-                description="在 RSI 極端值進場（抄底/摸頂），但趨勢繼續",
-                occurrence_count=len(extreme_rsi_trades),
-                total_loss=sum(t.loss_amount for t in extreme_rsi_trades),
-                avg_loss=np.mean([t.loss_amount for t in extreme_rsi_trades]),
-                trades=[t.trade_id for t in extreme_rsi_trades],
-                confidence=min(1.0, len(extreme_rsi_trades) / 15),
-                recommendation="建議：1) 等待 RSI 背離確認 2) 結合趨勢指標（MA）3) 避免單純抄底"
-            ))
-        
-        # 模式 5：長時間持倉虧損（> 1小時仍被止損）
-        long_hold_trades = [
-            t for t in trades 
-            if t.holding_time_seconds > 3600 and t.exit_reason == "SL_HIT"
-        ]
-        if len(long_hold_trades) >= self.min_pattern_count:
-            patterns.append(LossPattern(
-                pattern_name="長時間持倉虧損",
-                description="持倉超過1小時仍被止損，可能方向判斷錯誤",
-                occurrence_count=len(long_hold_trades),
-                total_loss=sum(t.loss_amount for t in long_hold_trades),
-                avg_loss=np.mean([t.loss_amount for t in long_hold_trades]),
-                trades=[t.trade_id for t in long_hold_trades],
-                confidence=min(1.0, len(long_hold_trades) / 10),
-                recommendation="建議：1) 使用時間止損（如30分鐘未盈利則出場）2) 使用追蹤止損"
-            ))
-        
-        # 模式 6：特定時段虧損（例如凌晨2-6點）
-        night_trades = [
-            t for t in trades 
-            if 2 <= t.entry_time.hour <= 6
-        ]
-        if len(night_trades) >= self.min_pattern_count:
-            patterns.append(LossPattern(
-                pattern_name="深夜時段虧損",
-                description="在凌晨2-6點交易，流動性差",
-                occurrence_count=len(night_trades),
-                total_loss=sum(t.loss_amount for t in night_trades),
-                avg_loss=np.mean([t.loss_amount for t in night_trades]),
-                trades=[t.trade_id for t in night_trades],
-                confidence=min(1.0, len(night_trades) / 10),
-                recommendation="建議：1) 啟用時間區間分析器 2) 凌晨2-6點禁止交易"
-            ))
-        
-        # 模式 7：高槓桿虧損（槓桿 >= 10x）
-        high_leverage_trades = [
-            t for t in trades 
-            if t.leverage >= 10
-        ]
-        if len(high_leverage_trades) >= self.min_pattern_count:
-            patterns.append(LossPattern(
-                pattern_name="高槓桿虧損",
-                description="使用高槓桿（≥10x），小波動即爆倉",
-                occurrence_count=len(high_leverage_trades),
-                total_loss=sum(t.loss_amount for t in high_leverage_trades),
-                avg_loss=np.mean([t.loss_amount for t in high_leverage_trades]),
-                trades=[t.trade_id for t in high_leverage_trades],
-                confidence=min(1.0, len(high_leverage_trades) / 8),
-                recommendation="建議：1) 降低槓桿至 3-5x 2) 使用動態槓桿（根據波動率調整）"
-            ))
-        
-        # 按虧損總額排序
-        patterns.sort(key=lambda p: p.total_loss, reverse=True)
+        if self._patterns_cache is None:
+            at = self._loss_stats.last_ts
+            patterns = []
+            for rule in LOSS_PATTERN_RULES:
+                stats = self._pattern_stats[rule.pattern_name]
+                if stats.count < self.min_pattern_count:
+                    continue
+                patterns.append(LossPattern(
+                    pattern_name=rule.pattern_name,
+                    description=rule.description,
+                    occurrence_count=stats.count,
+                    total_loss=stats.total,
+                    avg_loss=stats.mean,
+                    trades=list(self._pattern_trades[rule.pattern_name]),
+                    confidence=min(1.0, stats.count / rule.confidence_scale),
+                    recommendation=rule.recommendation,
+                    recent_occurrences=stats.decayed_count(at),
+                    loss_std=stats.std
+                ))
+            
+            # 按虧損總額排序
+            patterns.sort(key=lambda p: p.total_loss, reverse=True)
+            self._patterns_cache = patterns
         
-        return patterns
+        return list(self._patterns_cache)
     
     def get_worst_patterns(self, top_n: int = 3) -> List[LossPattern]:
         """
@@ -321,26 +403,23 @@ class LossPatternAnalyzer:
         if not self.loss_trades:
             return {'message': '尚無虧損記錄'}
         
-        trades = list(self.loss_trades.values())
         patterns = self.analyze_patterns()
         
-        # 計算統計
-        total_loss = sum(t.loss_amount for t in trades)
-        avg_loss = np.mean([t.loss_amount for t in trades])
-        median_loss = np.median([t.loss_amount for t in trades])
-        max_loss = max(t.loss_amount for t in trades)
+        # 計算統計 (中位數 / 最大值只在報表時需要，才掃一次)
+        amounts = np.fromiter((t.loss_amount for t in self.loss_trades.values()), dtype=float)
+        total_loss = self._loss_stats.total
+        avg_loss = self._loss_stats.mean
+        median_loss = float(np.median(amounts))
+        max_loss = float(amounts.max())
         
         # 出場原因統計
-        exit_reasons = Counter(t.exit_reason for t in trades)
+        exit_reasons = self._exit_reasons
         
         # 策略統計
-        strategy_stats = defaultdict(lambda: {'count': 0, 'total_loss': 0})
-        for t in trades:
-            strategy_stats[t.strategy]['count'] += 1
-            strategy_stats[t.strategy]['total_loss'] += t.loss_amount
+        strategy_stats = self._strategy_stats
         
         return {
-            'total_losses': len(trades),
+            'total_losses': len(self.loss_trades),
             'total_loss_amount': total_loss,
             'avg_loss': avg_loss,
             'median_loss': median_loss,
@@ -352,9 +431,7 @@ class LossPatternAnalyzer:
                 strategy_stats.items(), 
                 key=lambda x: x[1]['total_loss']
             )[0] if strategy_stats else None,
-            'avg_holding_time_minutes': np.mean([
-                t.holding_time_seconds / 60 for t in trades
-            ])
+            'avg_holding_time_minutes': self._holding_stats.mean / 60
         }
     
     def generate_detailed_report(self) -> str:
@@ -79,6 +79,7 @@ class MarketRegimeDetector:
         self.high_volatility_threshold = high_volatility_threshold
         self.range_ratio_consolidation = range_ratio_consolidation
         self.directional_vol_threshold = directional_vol_threshold
+        self.trend_volume_ratio = 0.8  # 強趨勢需要的成交量比率
         self.range_window = max(self.ma_long * 2, 60)
         
     def detect_regime(
@@ -103,6 +104,9 @@ class MarketRegimeDetector:
         2. BULL: MA7 > MA25 + 強趨勢 + 成交量支撐
         3. BEAR: MA7 < MA25 + 強趨勢 + 成交量支撐
         4. NEUTRAL: 其他情況（弱趨勢）
+        
+        逐根 K 線串流更新 / 整段歷史標註請用 src/utils/regime_engine.py 的 RegimeEngine，
+        指標定義與這裡相同，不必每次重算整個 DataFrame。
         """
         if df.empty or len(df) < max(self.ma_long, self.volume_ma_period):
             regime = MarketRegime.NEUTRAL
@@ -236,7 +240,7 @@ class MarketRegimeDetector:
         # 條件：MA 距離大 + 成交量支撐
         is_strong_trend = (
             ma_distance > self.strong_trend_threshold and
-            volume_ratio > 0.8 and
+            volume_ratio > self.trend_volume_ratio and
             abs(directional_volatility) > self.directional_vol_threshold
         )
         
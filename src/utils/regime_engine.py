@@ -0,0 +1,532 @@
+"""
+共享串流市場狀態引擎 (Streaming Regime Engine)
+==============================================
+
+MarketRegimeDetector.detect_regime 與 ConsolidationDetector.is_consolidating
+每次決策都從最近 N 根 K 線重算 MA7/MA25、ATR、成交量均線、Bollinger Bands 與 ATR 比率。
+RegimeEngine 在每根 K 線收盤時增量更新同一組滾動統計，
+regime / consolidation / details 都是 O(1) 讀取，多個使用者共用同一份狀態。
+
+原理:
+    - RollingWindow: 環形緩衝 + 滾動和 / 平方和，每繞一圈重新加總一次以抑制浮點誤差
+    - RollingExtreme: 單調佇列，攤銷 O(1) 取得視窗內最高 / 最低
+    - 市場狀態: 指標定義與 MarketRegimeDetector._calculate_metrics 相同 (SMA ATR、
+      range_window 高低點)，分類直接呼叫偵測器的 _classify_regime，閾值只有一份
+    - 盤整: BB (SMA + 母體標準差) 與 Wilder ATR (talib.ATR 定義)，
+      判斷規則由 ConsolidationDetector.evaluate 提供；平滑以「每根 K 線」為單位
+    - label_history(): 同一組定義的向量化版本，一次標註整段歷史 (回測 / 訓練標籤)
+
+    Wilder ATR 在串流模式下涵蓋全部歷史，舊做法只看最近 60 根並重新起算，
+    兩者在起算初期會有些微差異；市場狀態的所有指標視窗都 ≤ 60，結果一致。
+
+用法:
+    engine = get_regime_engine("BTCUSDT", regime_detector, consolidation_detector)
+    engine.update(high, low, close, volume, ts)     # K 線收盤時
+    engine.regime, engine.details, engine.consolidation
+
+    engine = RegimeEngine(regime_detector, consolidation_detector)
+    engine.sync(df_so_far)                          # 逐根回測: 只餵新增的 K 線
+
+    labels = label_history(df)                      # 回測 / 訓練
+"""
+
+import logging
+import math
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .consolidation_detector import ConsolidationDetector, ConsolidationState
+from .market_regime_detector import MarketRegime, MarketRegimeDetector
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== 滾動統計 ====================
+
+class RollingWindow:
+    """
+    固定長度滾動視窗的和 / 平方和 (O(1) 更新)
+
+    數值以第一個樣本為基準平移後再累加，避免價格量級 (5 萬) 下平方和相減的精度損失。
+    """
+
+    __slots__ = ('size', 'count', 'total', 'total_sq', '_buf', '_pos', '_shift')
+
+    def __init__(self, size: int):
+        self.size = max(1, int(size))
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self._buf = [0.0] * self.size
+        self._pos = 0
+        self._shift: Optional[float] = None
+
+    def push(self, value: float) -> None:
+        if self._shift is None:
+            self._shift = value
+        x = value - self._shift
+        if self.count == self.size:
+            old = self._buf[self._pos]
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.count += 1
+        self._buf[self._pos] = x
+        self.total += x
+        self.total_sq += x * x
+        self._pos += 1
+        if self._pos == self.size:
+            self._pos = 0
+            # 每繞一圈重新加總，避免長時間運行累積誤差
+            self.total = math.fsum(self._buf)
+            self.total_sq = math.fsum(v * v for v in self._buf)
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+    @property
+    def mean(self) -> float:
+        if not self.count:
+            return float('nan')
+        return self._shift + self.total / self.count
+
+    @property
+    def pstd(self) -> float:
+        """母體標準差 (ddof=0，與 talib.STDDEV 相同)"""
+        if not self.count:
+            return float('nan')
+        m = self.total / self.count
+        return math.sqrt(max(0.0, self.total_sq / self.count - m * m))
+
+
+class RollingExtreme:
+    """單調佇列: 最近 size 個樣本的最大值 (mode='max') 或最小值 (mode='min')"""
+
+    __slots__ = ('size', 'is_max', '_queue', '_index')
+
+    def __init__(self, size: int, mode: str = 'max'):
+        self.size = max(1, int(size))
+        self.is_max = mode == 'max'
+        self.reset()
+
+    def reset(self) -> None:
+        self._queue: Deque[Tuple[int, float]] = deque()
+        self._index = 0
+
+    def push(self, value: float) -> None:
+        queue = self._queue
+        if self.is_max:
+            while queue and queue[-1][1] <= value:
+                queue.pop()
+        else:
+            while queue and queue[-1][1] >= value:
+                queue.pop()
+        queue.append((self._index, value))
+        while queue[0][0] <= self._index - self.size:
+            queue.popleft()
+        self._index += 1
+
+    @property
+    def value(self) -> float:
+        return self._queue[0][1] if self._queue else float('nan')
+
+
+# ==================== 狀態快照 ====================
+
+@dataclass(frozen=True)
+class RegimeSnapshot:
+    """最新一根 K 線的市場狀態 (不可變，可直接交給其他執行緒讀取)"""
+    bar_index: int
+    timestamp: Optional[float]
+    regime: MarketRegime
+    details: Dict[str, Any]
+    consolidation: ConsolidationState
+
+    @property
+    def is_consolidating(self) -> bool:
+        return self.consolidation.is_consolidating
+
+    def to_dict(self) -> dict:
+        consolidation = asdict(self.consolidation)
+        consolidation['timestamp'] = self.consolidation.timestamp.isoformat()
+        return {
+            'bar_index': self.bar_index,
+            'timestamp': self.timestamp,
+            'regime': self.regime.value,
+            'details': dict(self.details),
+            'consolidation': consolidation,
+        }
+
+
+# ==================== 串流引擎 ====================
+
+class RegimeEngine:
+    """
+    增量維護市場狀態 / 盤整指標的共享引擎
+
+    update() 每根 K 線呼叫一次 (O(1))；regime / details / consolidation 直接讀最新快照。
+    """
+
+    def __init__(
+        self,
+        regime_detector: Optional[MarketRegimeDetector] = None,
+        consolidation_detector: Optional[ConsolidationDetector] = None
+    ):
+        """
+        Args:
+            regime_detector: 提供週期與分類閾值 (預設 MarketRegimeDetector())
+            consolidation_detector: 提供 BB / ATR 參數與盤整規則 (預設 ConsolidationDetector())
+        """
+        self.regime_detector = regime_detector or MarketRegimeDetector()
+        self.consolidation_detector = consolidation_detector or ConsolidationDetector()
+        self.reset()
+
+    def reset(self) -> None:
+        """清空所有滾動狀態 (重放 / 換資料源時使用)"""
+        rd = self.regime_detector
+        cd = self.consolidation_detector
+        self.warmup_bars = max(rd.ma_long, rd.volume_ma_period)
+        self._ma_short = RollingWindow(rd.ma_short)
+        self._ma_long = RollingWindow(rd.ma_long)
+        self._volume = RollingWindow(rd.volume_ma_period)
+        self._tr = RollingWindow(rd.atr_period)
+        self._returns = RollingWindow(rd.ma_long)
+        self._range_high = RollingExtreme(rd.range_window, 'max')
+        self._range_low = RollingExtreme(rd.range_window, 'min')
+        self._bb = RollingWindow(cd.bb_period)
+        self._wilder_atr: Optional[float] = None
+        self._wilder_seed = 0.0
+        self._prev_close: Optional[float] = None
+        self._synced_to: Any = None
+        self.bar_count = 0
+        cd.reset()
+        self._snapshot = RegimeSnapshot(
+            bar_index=-1,
+            timestamp=None,
+            regime=MarketRegime.NEUTRAL,
+            details={"error": "數據不足"},
+            consolidation=cd.empty_state("數據不足"),
+        )
+
+    # ---------- 更新 ----------
+
+    def update(
+        self,
+        high: float,
+        low: float,
+        close: float,
+        volume: float = 0.0,
+        timestamp: Optional[float] = None
+    ) -> RegimeSnapshot:
+        """
+        加入一根已收盤的 K 線並更新快照
+
+        Args:
+            high / low / close / volume: K 線 OHLCV
+            timestamp: K 線收盤時間 (epoch 秒，選填)
+
+        Returns:
+            最新的 RegimeSnapshot
+        """
+        high = float(high)
+        low = float(low)
+        close = float(close)
+        prev_close = self._prev_close
+
+        if prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            self._returns.push((close - prev_close) / prev_close if prev_close else float('nan'))
+            self._update_wilder(tr)
+
+        self._ma_short.push(close)
+        self._ma_long.push(close)
+        self._volume.push(float(volume))
+        self._tr.push(tr)
+        self._range_high.push(high)
+        self._range_low.push(low)
+        self._bb.push(close)
+        self._prev_close = close
+        self.bar_count += 1
+
+        regime, details = self._regime_state(close, float(volume))
+        self._snapshot = RegimeSnapshot(
+            bar_index=self.bar_count - 1,
+            timestamp=timestamp,
+            regime=regime,
+            details=details,
+            consolidation=self._consolidation_state(close),
+        )
+        return self._snapshot
+
+    def _update_wilder(self, tr: float) -> None:
+        """Wilder ATR: 前 atr_period 個 TR 取平均起算，之後遞迴平滑 (與 talib.ATR 相同)"""
+        period = self.consolidation_detector.atr_period
+        if self._wilder_atr is not None:
+            self._wilder_atr = (self._wilder_atr * (period - 1) + tr) / period
+            return
+        self._wilder_seed += tr
+        if self.bar_count == period:  # 本根是第 period 個 TR
+            self._wilder_atr = self._wilder_seed / period
+
+    def _regime_state(self, close: float, volume: float) -> Tuple[MarketRegime, Dict[str, Any]]:
+        if self.bar_count < self.warmup_bars:
+            return MarketRegime.NEUTRAL, {"error": "數據不足"}
+
+        ma7 = self._ma_short.mean
+        ma25 = self._ma_long.mean
+        atr = self._tr.mean if self._tr.full else float('nan')
+        volume_ma = self._volume.mean
+
+        metrics = {
+            'ma_distance': abs(ma7 - ma25) / ma25 if ma25 > 0 else 0,
+            'ma_trend': 1 if ma7 > ma25 else -1,
+            'volatility': atr / close if close > 0 else 0,
+            'volume_ratio': volume / volume_ma if volume_ma > 0 else 1.0,
+            'price_vs_ma25': (close - ma25) / ma25 if ma25 > 0 else 0,
+            'directional_volatility': self._returns.mean,
+            'range_ratio': (
+                (self._range_high.value - self._range_low.value) / close if close > 0 else 0
+            ),
+            'close': close,
+            'ma7': ma7,
+            'ma25': ma25,
+            'atr': atr,
+        }
+        return self.regime_detector._classify_regime(metrics), metrics
+
+    def _consolidation_state(self, close: float) -> ConsolidationState:
+        cd = self.consolidation_detector
+        if self.bar_count < cd.min_data_points:
+            return cd.empty_state("數據不足")
+        if not self._bb.full:
+            return cd.empty_state("BB 計算失敗")
+
+        middle = self._bb.mean
+        band = cd.bb_std * self._bb.pstd
+        atr = self._wilder_atr
+        atr_ratio = atr / close if atr is not None and close != 0 else 0
+        return cd.evaluate(
+            close=close,
+            upper=middle + band,
+            middle=middle,
+            lower=middle - band,
+            atr_ratio=atr_ratio,
+        )
+
+    # ---------- O(1) 讀取 ----------
+
+    @property
+    def snapshot(self) -> RegimeSnapshot:
+        return self._snapshot
+
+    @property
+    def ready(self) -> bool:
+        """市場狀態指標是否已暖機完成"""
+        return self.bar_count >= self.warmup_bars
+
+    @property
+    def regime(self) -> MarketRegime:
+        return self._snapshot.regime
+
+    @property
+    def details(self) -> Dict[str, Any]:
+        return self._snapshot.details
+
+    @property
+    def consolidation(self) -> ConsolidationState:
+        return self._snapshot.consolidation
+
+    @property
+    def is_consolidating(self) -> bool:
+        return self._snapshot.consolidation.is_consolidating
+
+    # ---------- 批次 ----------
+
+    def warm_up(self, df: pd.DataFrame) -> RegimeSnapshot:
+        """以歷史 K 線 (high / low / close / volume) 依序暖機"""
+        volume = df['volume'] if 'volume' in df.columns else pd.Series(0.0, index=df.index)
+        for high, low, close, vol in zip(df['high'], df['low'], df['close'], volume):
+            self.update(high, low, close, vol)
+        return self._snapshot
+
+    def sync(self, df: pd.DataFrame) -> RegimeSnapshot:
+        """
+        只餵入 df 中尚未看過的 K 線 (以遞增的 index 判斷)，回傳最新快照
+
+        逐根推進的回測 / 策略每次傳入「到目前為止」的 K 線即可，每次只更新新增的幾根，
+        不必每次從最近 N 根重算。index 倒退或與上次沒有重疊 (重跑 / 換資料) 時重設後整段暖機。
+        """
+        if df.empty:
+            return self._snapshot
+        index = df.index
+        last = self._synced_to
+        if last is not None and (index[-1] < last or index[0] > last):
+            self.reset()
+            last = None
+        start = 0 if last is None else int(index.searchsorted(last, side='right'))
+        if start < len(df):
+            self.warm_up(df.iloc[start:])
+            self._synced_to = index[-1]
+        return self._snapshot
+
+    def label_history(self, df: pd.DataFrame, smooth: bool = True) -> pd.DataFrame:
+        """以本引擎的參數向量化標註整段歷史 (不影響串流狀態)"""
+        return label_history(df, self.regime_detector, self.consolidation_detector, smooth=smooth)
+
+
+# ==================== 向量化標註 ====================
+
+def label_history(
+    df: pd.DataFrame,
+    regime_detector: Optional[MarketRegimeDetector] = None,
+    consolidation_detector: Optional[ConsolidationDetector] = None,
+    smooth: bool = True
+) -> pd.DataFrame:
+    """
+    一次標註整段 K 線歷史的市場狀態與盤整狀態
+
+    每一列的結果等同於把該列之前 (含) 的所有 K 線依序餵給 RegimeEngine.update()。
+
+    Args:
+        df: 含 high / low / close / volume 的 K 線 (依時間排序)
+        regime_detector: 週期與分類閾值 (預設 MarketRegimeDetector())
+        consolidation_detector: BB / ATR 參數與盤整閾值 (預設 ConsolidationDetector())
+        smooth: 是否套用盤整判斷的多數決平滑
+
+    Returns:
+        與 df 同索引的 DataFrame，欄位包含 detect_regime 的全部 details、
+        regime (字串)、bb_upper / bb_middle / bb_lower / bb_width / percent_b / atr_ratio、
+        consolidation_confidence、is_consolidating
+    """
+    rd = regime_detector or MarketRegimeDetector()
+    cd = consolidation_detector or ConsolidationDetector()
+
+    high = df['high'].astype(float)
+    low = df['low'].astype(float)
+    close = df['close'].astype(float)
+    volume = df['volume'].astype(float) if 'volume' in df.columns else pd.Series(0.0, index=df.index)
+    n = len(df)
+    bar = np.arange(n)
+
+    # === 市場狀態指標 (與 MarketRegimeDetector._calculate_metrics 相同) ===
+    ma7 = close.rolling(rd.ma_short).mean()
+    ma25 = close.rolling(rd.ma_long).mean()
+    prev_close = close.shift()
+    tr = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+    atr = tr.rolling(rd.atr_period).mean()
+    volume_ma = volume.rolling(rd.volume_ma_period).mean()
+    recent_high = high.rolling(rd.range_window, min_periods=1).max()
+    recent_low = low.rolling(rd.range_window, min_periods=1).min()
+
+    out = pd.DataFrame(index=df.index)
+    out['ma_distance'] = np.where(ma25 > 0, (ma7 - ma25).abs() / ma25, 0.0)
+    out['ma_trend'] = np.where(ma7 > ma25, 1, -1)
+    out['volatility'] = np.where(close > 0, atr / close, 0.0)
+    out['volume_ratio'] = np.where(volume_ma > 0, volume / volume_ma, 1.0)
+    out['price_vs_ma25'] = np.where(ma25 > 0, (close - ma25) / ma25, 0.0)
+    out['directional_volatility'] = close.pct_change().rolling(rd.ma_long, min_periods=1).mean()
+    out['range_ratio'] = np.where(close > 0, (recent_high - recent_low) / close, 0.0)
+    out['close'] = close
+    out['ma7'] = ma7
+    out['ma25'] = ma25
+    out['atr'] = atr
+
+    # 與 _classify_regime 相同的優先順序: 盤整 > 強趨勢 > 中性
+    is_consolidation = (
+        (out['ma_distance'] < rd.consolidation_threshold)
+        & (out['volatility'] < rd.low_volatility_threshold)
+        & (out['range_ratio'] < rd.range_ratio_consolidation)
+    )
+    is_strong_trend = (
+        (out['ma_distance'] > rd.strong_trend_threshold)
+        & (out['volume_ratio'] > rd.trend_volume_ratio)
+        & (out['directional_volatility'].abs() > rd.directional_vol_threshold)
+    )
+    regime = np.select(
+        [is_consolidation, is_strong_trend & (out['ma_trend'] > 0), is_strong_trend],
+        [MarketRegime.CONSOLIDATION.value, MarketRegime.BULL.value, MarketRegime.BEAR.value],
+        MarketRegime.NEUTRAL.value,
+    )
+    out['regime'] = np.where(bar >= max(rd.ma_long, rd.volume_ma_period) - 1, regime, MarketRegime.NEUTRAL.value)
+
+    # === 盤整指標 (與 ConsolidationDetector.evaluate 相同) ===
+    close_arr = close.to_numpy()
+    upper, middle, lower = cd.calculate_bollinger_bands(close_arr)
+    atr_cd = cd.calculate_atr(high.to_numpy(), low.to_numpy(), close_arr)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bb_width = np.where(middle == 0, 0.0, (upper - lower) / middle)
+        percent_b = np.where(upper == lower, 0.5, (close_arr - lower) / (upper - lower))
+        atr_ratio = np.where(np.isnan(atr_cd) | (close_arr == 0), 0.0, atr_cd / close_arr)
+
+    conditions = (
+        (bb_width < cd.bb_width_threshold).astype(int)
+        + ((cd.percent_b_lower < percent_b) & (percent_b < cd.percent_b_upper)).astype(int)
+        + (atr_ratio < cd.atr_threshold).astype(int)
+    )
+    evaluated = (bar >= cd.min_data_points - 1) & ~np.isnan(middle)
+    raw = pd.Series(np.where(evaluated, conditions >= 2, False), index=df.index)
+
+    if smooth and evaluated.any():
+        # 與 evaluate() 的平滑相同: 最近 history_length 次判斷 (≥3 次) 多數決
+        start = int(np.argmax(evaluated))
+        judged = raw.iloc[start:].astype(float)
+        window = judged.rolling(cd.history_length, min_periods=1)
+        total = window.sum()
+        count = window.count()
+        smoothed = np.where(count >= 3, total >= count / 2, judged.astype(bool))
+        raw.iloc[start:] = smoothed
+
+    out['bb_upper'] = upper
+    out['bb_middle'] = middle
+    out['bb_lower'] = lower
+    out['bb_width'] = np.where(evaluated, bb_width, 0.0)
+    out['percent_b'] = np.where(evaluated, percent_b, 0.5)
+    out['atr_ratio'] = np.where(evaluated, atr_ratio, 0.0)
+    out['consolidation_confidence'] = np.where(evaluated, conditions / 3.0, 0.0)
+    out['is_consolidating'] = raw.astype(bool)
+    return out
+
+
+# ==================== 共享實例 ====================
+
+_engines: Dict[Tuple[Any, ...], RegimeEngine] = {}
+
+
+def _detector_config(detector: Any) -> Tuple[Tuple[str, Any], ...]:
+    """偵測器的參數指紋 (只取純量屬性；clock / 歷史狀態不影響計算結果)"""
+    return tuple(sorted(
+        (name, value) for name, value in vars(detector).items()
+        if isinstance(value, (bool, int, float, str))
+    ))
+
+
+def get_regime_engine(
+    symbol: str = "BTCUSDT",
+    regime_detector: Optional[MarketRegimeDetector] = None,
+    consolidation_detector: Optional[ConsolidationDetector] = None
+) -> RegimeEngine:
+    """
+    取得交易對的共享 RegimeEngine
+
+    以 (交易對, 偵測器參數) 為鍵：參數相同的模式 / 過濾器共用一份滾動狀態，
+    K 線只需餵一次；參數不同的呼叫者取得各自的引擎，閾值不會被先建立者覆蓋。
+    """
+    regime_detector = regime_detector or MarketRegimeDetector()
+    consolidation_detector = consolidation_detector or ConsolidationDetector()
+    key = (symbol, _detector_config(regime_detector), _detector_config(consolidation_detector))
+    engine = _engines.get(key)
+    if engine is None:
+        engine = RegimeEngine(regime_detector, consolidation_detector)
+        _engines[key] = engine
+        logger.debug("RegimeEngine created for %s", symbol)
+    return engine
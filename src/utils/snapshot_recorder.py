@@ -0,0 +1,359 @@
+"""
+訓練快照記錄器 (Columnar Snapshot Recorder)
+
+把每次分析的市場快照以「欄位陣列」緩衝，背景執行緒批次寫成壓縮的 Arrow IPC 串流:
+- 型別固定、schema 版本化 (schema metadata: schema_version)
+- strategy_probs 展平成固定欄位 prob_<STRATEGY>，不認得的策略加總到 prob_other
+- 分區依日期輪替: {root}/date=YYYY-MM-DD/snapshots_{session}.arrows
+- record() 只把數值 append 到 array.array，不建 dict、不做 JSON 序列化
+- 讀取端 read_snapshots() 以 memory map 開檔回傳 pyarrow.Table (未壓縮時零拷貝)
+
+原理:
+    每秒一筆 JSON (含巢狀 strategy_probs) 一週數 GB，訓練前還要逐行 json.loads 再組 DataFrame。
+    欄位式批次 + zstd 壓縮後體積只剩數十分之一，讀取直接得到 Arrow 欄位 (to_pandas 也只轉換一次)。
+    採用 IPC 串流而不是 Parquet: 串流是追加寫入，每批寫完即可讀；程式崩潰時只遺失
+    尚未 flush 的緩衝，已寫入的批次仍可讀 (Parquet 的 footer 要到關檔才寫)。
+
+用法:
+    recorder = SnapshotRecorder("data/tensorflow_training/snapshots", session="20250101_120000")
+    recorder.start()
+    recorder.record(data, timestamp=clock.time())   # 每次分析
+    recorder.stop()                                  # 寫出剩餘緩衝並關檔
+
+    table = read_snapshots("data/tensorflow_training/snapshots", start="2025-01-01", end="2025-01-07")
+    df = table.to_pandas()
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from array import array
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    HAS_PYARROW = True
+except ImportError:
+    pa = None
+    pa_ipc = None
+    HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+FILE_SUFFIX = ".arrows"
+
+# 展平的策略機率欄位 (WhaleStrategyV4 名稱)；新增策略時追加在尾端並提升 SCHEMA_VERSION
+STRATEGY_COLUMNS: Tuple[str, ...] = (
+    "BULL_TRAP", "BEAR_TRAP", "FAKEOUT", "STOP_HUNT", "SPOOFING",
+    "WHIPSAW", "CONSOLIDATION_SHAKE", "FLASH_CRASH", "SLOW_BLEED",
+    "ACCUMULATION", "DISTRIBUTION", "RE_ACCUMULATION", "RE_DISTRIBUTION",
+    "LONG_SQUEEZE", "SHORT_SQUEEZE", "CASCADE_LIQUIDATION",
+    "MOMENTUM_PUSH", "TREND_CONTINUATION", "REVERSAL",
+    "PUMP_DUMP", "WASH_TRADING", "LAYERING", "NORMAL",
+)
+
+# (欄位, array typecode)；typecode: d=float64, f=float32, i=int32
+FLOAT_FIELDS: Tuple[str, ...] = (
+    "price", "obi", "trade_imbalance", "price_change_1m", "price_change_5m", "spread_pct",
+    "bid_depth", "ask_depth", "big_buy_volume", "big_sell_volume", "big_buy_value", "big_sell_value",
+)
+INT_FIELDS: Tuple[str, ...] = ("big_trade_count", "big_buy_count", "big_sell_count")
+PROB_FIELDS: Tuple[str, ...] = tuple(f"prob_{name}" for name in STRATEGY_COLUMNS) + ("prob_other",)
+
+_PROB_INDEX = {name: i for i, name in enumerate(STRATEGY_COLUMNS)}
+
+
+def snapshot_schema() -> 'pa.Schema':
+    """目前版本的 Arrow schema"""
+    fields = [pa.field("timestamp", pa.timestamp("ms", tz="UTC"))]
+    fields += [pa.field(name, pa.float64()) for name in FLOAT_FIELDS]
+    fields += [pa.field(name, pa.int32()) for name in INT_FIELDS]
+    fields += [pa.field(name, pa.float32()) for name in PROB_FIELDS]
+    fields += [
+        pa.field("has_signal", pa.bool_()),
+        pa.field("primary_strategy", pa.dictionary(pa.int16(), pa.string())),
+    ]
+    return pa.schema(fields, metadata={"schema_version": str(SCHEMA_VERSION)})
+
+
+def _num(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _ColumnBuffer:
+    """一個分區 (日期) 的欄位緩衝"""
+
+    def __init__(self, day: date):
+        self.day = day
+        self.created = time.monotonic()
+        self.ts_ms = array("q")
+        self.floats = {name: array("d") for name in FLOAT_FIELDS}
+        self.ints = {name: array("i") for name in INT_FIELDS}
+        self.probs = [array("f") for _ in PROB_FIELDS]
+        self.has_signal = array("b")
+        self.primary: List[Optional[str]] = []
+
+    def __len__(self) -> int:
+        return len(self.ts_ms)
+
+    def append(self, data: Mapping[str, Any], ts: float) -> None:
+        self.ts_ms.append(int(ts * 1000))
+        for name, col in self.floats.items():
+            col.append(_num(data.get(name)))
+        for name, col in self.ints.items():
+            col.append(int(_num(data.get(name))))
+        row = [0.0] * len(PROB_FIELDS)
+        for key, value in (data.get('strategy_probs') or {}).items():
+            idx = _PROB_INDEX.get(getattr(key, 'name', key))
+            row[-1 if idx is None else idx] += _num(value)
+        for col, value in zip(self.probs, row):
+            col.append(value)
+        self.has_signal.append(1 if data.get('entry_signal') is not None else 0)
+        primary = data.get('primary_strategy')
+        if primary is not None and not isinstance(primary, str):
+            primary = getattr(getattr(primary, 'strategy', None), 'name', None)
+        self.primary.append(primary)
+
+    def to_batch(self, schema: 'pa.Schema') -> 'pa.RecordBatch':
+        n = len(self)
+
+        def _wrap(arr: array, typ: 'pa.DataType') -> 'pa.Array':
+            # array.array 的緩衝直接包成 Arrow 陣列 (不逐元素轉換)
+            return pa.Array.from_buffers(typ, n, [None, pa.py_buffer(arr)])
+
+        columns = [_wrap(self.ts_ms, pa.timestamp("ms", tz="UTC"))]
+        columns += [_wrap(self.floats[name], pa.float64()) for name in FLOAT_FIELDS]
+        columns += [_wrap(self.ints[name], pa.int32()) for name in INT_FIELDS]
+        columns += [_wrap(col, pa.float32()) for col in self.probs]
+        columns.append(_wrap(self.has_signal, pa.int8()).cast(pa.bool_()))
+        columns.append(pa.array(self.primary, pa.string()).dictionary_encode().cast(
+            pa.dictionary(pa.int16(), pa.string())))
+        return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+class SnapshotRecorder:
+    """欄位式訓練快照記錄器 (背景寫入)"""
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        session: str,
+        batch_rows: int = 600,
+        flush_interval: float = 60.0,
+        compression: Optional[str] = "zstd",
+    ):
+        """
+        Args:
+            root: 輸出根目錄 (分區子目錄 date=YYYY-MM-DD)
+            session: 會話 ID (同一天多次啟動各自一個檔案)
+            batch_rows: 每批筆數 (寫成一個 record batch)
+            flush_interval: 未滿批時最長緩衝秒數
+            compression: IPC 緩衝區壓縮 ("zstd" / "lz4" / None=不壓縮，讀取可零拷貝)
+        """
+        if not HAS_PYARROW:
+            raise ImportError("pyarrow is required for SnapshotRecorder")
+        self.root = Path(root)
+        self.session = session
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.compression = compression
+        self.schema = snapshot_schema()
+
+        self.records = 0
+        self.batches_written = 0
+        self.write_errors = 0
+
+        self._buffer: Optional[_ColumnBuffer] = None
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[_ColumnBuffer]]" = queue.Queue()
+        self._writers: Dict[date, Tuple[Any, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    # ==================== 記錄端 ====================
+
+    def record(self, data: Mapping[str, Any], timestamp: Optional[float] = None) -> None:
+        """記錄一筆快照 (O(欄位數) 的 append，滿批或逾時才交給背景執行緒)"""
+        ts = timestamp if timestamp is not None else time.time()
+        day = datetime.fromtimestamp(ts, timezone.utc).date()
+        with self._lock:
+            buf = self._buffer
+            if buf is not None and buf.day != day:
+                # 跨日: 先送出前一天的緩衝，分區輪替
+                self._queue.put(buf)
+                buf = None
+            if buf is None:
+                buf = self._buffer = _ColumnBuffer(day)
+            buf.append(data, ts)
+            self.records += 1
+            if len(buf) >= self.batch_rows or time.monotonic() - buf.created >= self.flush_interval:
+                self._queue.put(buf)
+                self._buffer = None
+
+    def flush(self) -> None:
+        """把目前緩衝交給背景執行緒"""
+        with self._lock:
+            if self._buffer is not None and len(self._buffer):
+                self._queue.put(self._buffer)
+            self._buffer = None
+
+    # ==================== 寫入端 ====================
+
+    def partition_path(self, day: date) -> Path:
+        return self.root / f"date={day.isoformat()}" / f"snapshots_{self.session}{FILE_SUFFIX}"
+
+    def _writer_for(self, day: date):
+        entry = self._writers.get(day)
+        if entry is None:
+            # 前一天的檔案不會再寫入，關閉以寫出串流結尾
+            for old_day in list(self._writers):
+                self._close_writer(old_day)
+            path = self.partition_path(day)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            sink = pa.OSFile(str(path), "ab")
+            options = pa_ipc.IpcWriteOptions(compression=self.compression)
+            entry = self._writers[day] = (sink, pa_ipc.new_stream(sink, self.schema, options=options))
+        return entry[1]
+
+    def _close_writer(self, day: date) -> None:
+        sink, writer = self._writers.pop(day)
+        try:
+            writer.close()
+        finally:
+            sink.close()
+
+    def _write(self, buf: _ColumnBuffer) -> None:
+        try:
+            self._writer_for(buf.day).write_batch(buf.to_batch(self.schema))
+            self.batches_written += 1
+        except Exception as e:
+            self.write_errors += 1
+            logger.warning(f"訓練快照寫入失敗 ({len(buf)} 筆): {e}")
+
+    def _run(self) -> None:
+        while True:
+            buf = self._queue.get()
+            if buf is None:
+                break
+            self._write(buf)
+
+    # ------------------------ 背景執行緒 ------------------------ #
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="snapshot-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """寫出剩餘緩衝並關閉所有分區檔"""
+        self.flush()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+        else:
+            while not self._queue.empty():
+                buf = self._queue.get_nowait()
+                if buf is not None:
+                    self._write(buf)
+        for day in list(self._writers):
+            self._close_writer(day)
+
+
+# ==================== 讀取端 ====================
+
+def _partition_day(path: Path) -> Optional[date]:
+    name = path.name
+    if not name.startswith("date="):
+        return None
+    try:
+        return date.fromisoformat(name[len("date="):])
+    except ValueError:
+        return None
+
+
+def _as_day(value: Union[None, str, date, datetime]) -> Optional[date]:
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+def list_snapshot_files(
+    root: Union[str, Path],
+    start: Union[None, str, date, datetime] = None,
+    end: Union[None, str, date, datetime] = None,
+) -> List[Path]:
+    """列出日期區間 (含頭尾) 內的快照檔"""
+    root = Path(root)
+    if not root.exists():
+        return []
+    start_day, end_day = _as_day(start), _as_day(end)
+    files = []
+    for part in sorted(root.iterdir()):
+        day = _partition_day(part)
+        if day is None or (start_day and day < start_day) or (end_day and day > end_day):
+            continue
+        files.extend(sorted(part.glob(f"*{FILE_SUFFIX}")))
+    return files
+
+
+def _read_stream_file(path: Path, columns: Optional[Sequence[str]]) -> List['pa.RecordBatch']:
+    batches = []
+    source = pa.memory_map(str(path), "r")
+    try:
+        # 同一檔案可能由多次 start/stop 追加成多段串流
+        while source.tell() < source.size():
+            try:
+                reader = pa_ipc.open_stream(source)
+                for batch in reader:
+                    batches.append(batch.select(columns) if columns else batch)
+            except (pa.ArrowInvalid, OSError) as e:
+                # 崩潰留下的未完成尾端: 保留已讀到的批次
+                logger.debug(f"{path.name}: truncated stream ({e})")
+                break
+    finally:
+        source.close()
+    return batches
+
+
+def read_snapshots(
+    root: Union[str, Path],
+    start: Union[None, str, date, datetime] = None,
+    end: Union[None, str, date, datetime] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> 'pa.Table':
+    """
+    讀取日期區間內的快照為單一 pyarrow.Table
+
+    Args:
+        root: 記錄器根目錄
+        start / end: 日期區間 (含頭尾)；None = 不限
+        columns: 只取部分欄位
+
+    Returns:
+        pyarrow.Table (不同 schema 版本以欄位聯集合併，缺的欄位為 null)
+    """
+    if not HAS_PYARROW:
+        raise ImportError("pyarrow is required for read_snapshots")
+    tables = []
+    for path in list_snapshot_files(root, start, end):
+        batches = _read_stream_file(path, columns)
+        if batches:
+            tables.append(pa.Table.from_batches(batches))
+    if not tables:
+        schema = snapshot_schema()
+        if columns:
+            schema = pa.schema([schema.field(c) for c in columns], metadata=schema.metadata)
+        return schema.empty_table()
+    return pa.concat_tables(tables, promote_options="default")
@@ -0,0 +1,208 @@
+"""
+串流統計累加器 + 追加日誌 (Streaming Stats / Append Log)
+====================================================
+
+給「每筆交易更新一次、每次進場前查詢一次」的分析器用的兩個小工具:
+- RunningStats: 次數 / 總和 / 平方和，以及依半衰期衰減的同一組量 (近期權重較高)，
+                 新增與移除都是 O(1)，不需要保留原始樣本就能算平均、標準差
+- JsonAppendLog: 每筆更新追加一行 JSONL，累積一定筆數後寫一次完整快照並清空日誌
+
+原理:
+    衰減量以「最後一次更新時間」為基準保存: w, Σw·x, Σw·x²
+    新樣本時間 t ≥ last 時先把既有量乘 0.5^((t-last)/half_life) 再加 1；
+    亂序的舊樣本則以 0.5^((last-t)/half_life) 的權重加入，查詢時再衰減到指定時間。
+
+    快照記錄已包含的日誌序號 (log_seq)，重播時略過序號不大於它的行，
+    所以「快照寫完、日誌還沒清空」時當機也不會重複計入。
+
+用法:
+    stats = RunningStats(half_life_seconds=7 * 86400)
+    stats.add(12.5, ts=time.time())
+    stats.mean, stats.std, stats.decayed_mean(), stats.decayed_count(at=time.time())
+
+    log = JsonAppendLog(Path("data/time_zone_analysis.json"), snapshot_every=200)
+    snapshot, records = log.load()
+    if log.append({"hour": 9, "profit": 1.2}):
+        log.snapshot(build_state())
+"""
+
+import json
+import math
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config_service import write_json_atomic
+
+
+# ==================== 累加器 ====================
+
+@dataclass
+class RunningStats:
+    """O(1) 更新的次數 / 總和 / 平方和 (含時間衰減版本)"""
+
+    half_life_seconds: float = 7 * 86400.0
+    count: int = 0
+    total: float = 0.0
+    total_sq: float = 0.0
+    decayed_weight: float = 0.0
+    decayed_total: float = 0.0
+    decayed_total_sq: float = 0.0
+    last_ts: Optional[float] = None
+
+    def _age_factor(self, dt: float) -> float:
+        if self.half_life_seconds <= 0 or dt <= 0:
+            return 1.0
+        return 0.5 ** (dt / self.half_life_seconds)
+
+    def _decay_delta(self, value: float, ts: Optional[float], sign: float) -> None:
+        if ts is None:
+            ts = self.last_ts
+        if ts is None or self.last_ts is None:
+            weight = 1.0
+            if ts is not None:
+                self.last_ts = ts
+        elif ts >= self.last_ts:
+            factor = self._age_factor(ts - self.last_ts)
+            self.decayed_weight *= factor
+            self.decayed_total *= factor
+            self.decayed_total_sq *= factor
+            self.last_ts = ts
+            weight = 1.0
+        else:
+            weight = self._age_factor(self.last_ts - ts)
+        self.decayed_weight += sign * weight
+        self.decayed_total += sign * weight * value
+        self.decayed_total_sq += sign * weight * value * value
+
+    def add(self, value: float, ts: Optional[float] = None) -> None:
+        """加入一個樣本 (ts 為 epoch 秒；None 時視為發生在最後更新時間)"""
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+        self._decay_delta(value, ts, 1.0)
+
+    def remove(self, value: float, ts: Optional[float] = None) -> None:
+        """移除先前加入的樣本 (ts 需與加入時相同)"""
+        if self.count <= 0:
+            return
+        self.count -= 1
+        self.total -= value
+        self.total_sq -= value * value
+        self._decay_delta(value, ts, -1.0)
+        if self.count == 0:
+            self.total = self.total_sq = 0.0
+            self.decayed_weight = self.decayed_total = self.decayed_total_sq = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        if self.count < 2:
+            return 0.0
+        return max(0.0, (self.total_sq - self.total * self.total / self.count) / (self.count - 1))
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def decayed_count(self, at: Optional[float] = None) -> float:
+        """衰減後的有效樣本數 (at 為查詢時間；None 時以最後更新時間為準)"""
+        return self.decayed_weight * self._decay_to(at)
+
+    def decayed_sum(self, at: Optional[float] = None) -> float:
+        return self.decayed_total * self._decay_to(at)
+
+    def decayed_mean(self) -> float:
+        """衰減加權平均 (與查詢時間無關)"""
+        return self.decayed_total / self.decayed_weight if self.decayed_weight > 1e-12 else 0.0
+
+    def decayed_std(self) -> float:
+        w = self.decayed_weight
+        if w <= 1e-12:
+            return 0.0
+        mean = self.decayed_total / w
+        return math.sqrt(max(0.0, self.decayed_total_sq / w - mean * mean))
+
+    def _decay_to(self, at: Optional[float]) -> float:
+        if at is None or self.last_ts is None:
+            return 1.0
+        return self._age_factor(at - self.last_ts)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RunningStats':
+        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+
+
+# ==================== 持久化 ====================
+
+class JsonAppendLog:
+    """
+    JSONL 追加日誌 + 定期快照
+
+    日誌檔為 `<snapshot>.log` (例如 data/loss_trades.json.log)。
+    """
+
+    def __init__(self, snapshot_path: Path, snapshot_every: int = 200):
+        self.snapshot_path = Path(snapshot_path)
+        self.log_path = self.snapshot_path.with_name(self.snapshot_path.name + ".log")
+        self.snapshot_every = max(1, int(snapshot_every))
+        self.seq = 0
+        self.pending = 0
+
+    def load(self) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        讀取快照與快照之後的日誌記錄
+
+        Returns:
+            (快照內容或 None, 尚未併入快照的記錄)
+        """
+        snapshot = None
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        self.seq = int((snapshot or {}).get('log_seq', 0))
+
+        records: List[Dict[str, Any]] = []
+        if self.log_path.exists():
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 最後一行可能寫到一半
+                        continue
+                    if entry.get('seq', 0) > self.seq:
+                        records.append(entry['data'])
+                        self.seq = entry['seq']
+        self.pending = len(records)
+        return snapshot, records
+
+    def append(self, record: Dict[str, Any]) -> bool:
+        """
+        追加一筆記錄
+
+        Returns:
+            是否已累積到需要寫快照
+        """
+        self.seq += 1
+        line = json.dumps({'seq': self.seq, 'data': record}, ensure_ascii=False, default=str)
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+        self.pending += 1
+        return self.pending >= self.snapshot_every
+
+    def snapshot(self, data: Dict[str, Any]) -> None:
+        """寫出完整快照 (原子替換) 並清空日誌"""
+        write_json_atomic(self.snapshot_path, {**data, 'log_seq': self.seq})
+        try:
+            self.log_path.unlink()
+        except FileNotFoundError:
+            pass
+        self.pending = 0
@@ -7,7 +7,6 @@
 日期: 2025-11-14
 """
 
-import json
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass, asdict
 from datetime import datetime, time
@@ -15,6 +14,8 @@ from pathlib import Path
 from collections import defaultdict
 import numpy as np
 
+from .streaming_stats import JsonAppendLog, RunningStats
+
 
 @dataclass
 class TimeSlotStats:
@@ -31,6 +32,54 @@ class TimeSlotStats:
     avg_loss: float
     expected_value: float  # 期望值
     is_profitable: bool  # 是否盈利時段
+    profit_std: float = 0.0  # 單筆盈虧標準差
+    # 近期加權 (半衰期衰減)
+    decayed_trades: float = 0.0
+    decayed_win_rate: float = 0.0
+    decayed_profit_factor: float = 0.0
+    decayed_expected_value: float = 0.0
+
+
+@dataclass
+class HourSlotAccumulator:
+    """
+    單一時段的串流累加器
+    
+    wins 累加獲利交易的盈虧、losses 累加虧損交易的 |盈虧|，
+    另有全部交易盈虧的 pnl (算標準差用)；每筆交易 O(1) 更新。
+    """
+    half_life_seconds: float = 7 * 86400.0
+    wins: Optional[RunningStats] = None
+    losses: Optional[RunningStats] = None
+    pnl: Optional[RunningStats] = None
+    
+    def __post_init__(self):
+        for name in ('wins', 'losses', 'pnl'):
+            value = getattr(self, name)
+            if value is None:
+                setattr(self, name, RunningStats(self.half_life_seconds))
+            elif isinstance(value, dict):
+                setattr(self, name, RunningStats.from_dict(value))
+    
+    def add(self, profit: float, is_win: bool, ts: Optional[float] = None):
+        if is_win:
+            self.wins.add(profit, ts)
+        else:
+            self.losses.add(abs(profit), ts)
+        self.pnl.add(profit, ts)
+    
+    @property
+    def last_ts(self) -> Optional[float]:
+        stamps = [s.last_ts for s in (self.wins, self.losses) if s.last_ts is not None]
+        return max(stamps) if stamps else None
+    
+    def to_dict(self) -> Dict:
+        return {
+            'half_life_seconds': self.half_life_seconds,
+            'wins': self.wins.to_dict(),
+            'losses': self.losses.to_dict(),
+            'pnl': self.pnl.to_dict(),
+        }
 
 
 @dataclass
@@ -55,9 +104,9 @@ class TimeZoneAnalyzer:
     4. 提供實時交易建議
     
     數據存儲：
-    - 使用 JSON 文件持久化數據
-    - 每小時一個統計記錄
-    - 支持增量更新
+    - 每小時一組串流累加器 (次數 / 總和 / 平方和 + 衰減版本)，記錄一筆 O(1)
+    - 每筆交易追加到 <data_file>.log，累積 snapshot_every 筆後寫一次完整 JSON 快照
+    - 載入時讀快照再重播日誌
     """
     
     def __init__(
@@ -66,6 +115,9 @@ class TimeZoneAnalyzer:
         min_trades_required: int = 20,  # 最少交易次數
         min_win_rate: float = 0.55,  # 最低勝率要求
         min_profit_factor: float = 1.2,  # 最低盈虧比要求
+        decay_half_life_hours: float = 168.0,  # 近期加權半衰期
+        prefer_recent: bool = False,  # True: 以近期加權統計判斷高效/低效時段
+        snapshot_every: int = 200,  # 每 N 筆交易寫一次完整快照
     ):
         """
         初始化時間區間分析器
@@ -75,49 +127,70 @@ class TimeZoneAnalyzer:
             min_trades_required: 最少交易次數（用於判斷數據可靠性）
             min_win_rate: 最低勝率要求
             min_profit_factor: 最低盈虧比要求
+            decay_half_life_hours: 近期加權統計的半衰期 (小時)
+            prefer_recent: 以近期加權的勝率 / 盈虧比 / 期望值判斷時段
+            snapshot_every: 追加日誌累積幾筆後寫快照
         """
         self.data_file = Path(data_file)
         self.min_trades_required = min_trades_required
         self.min_win_rate = min_win_rate
         self.min_profit_factor = min_profit_factor
+        self.decay_half_life_seconds = decay_half_life_hours * 3600
+        self.prefer_recent = prefer_recent
+        self._log = JsonAppendLog(self.data_file, snapshot_every=snapshot_every)
         
         # 時段數據（key: hour (0-23), value: 交易記錄列表）
         self.hourly_trades: Dict[int, List[Dict]] = defaultdict(list)
         
-        # 時段統計（key: hour, value: TimeSlotStats）
+        # 時段累加器（key: hour）與統計（key: hour, value: TimeSlotStats）
+        self._slots: Dict[int, HourSlotAccumulator] = {}
         self.hourly_stats: Dict[int, TimeSlotStats] = {}
+        self._total_trades = 0
         
         # 載入歷史數據
         self.load_data()
     
     def load_data(self):
-        """從文件載入歷史數據"""
-        if not self.data_file.exists():
+        """從快照 + 追加日誌載入歷史數據"""
+        if not self.data_file.exists() and not self._log.log_path.exists():
             print(f"數據文件不存在，創建新文件: {self.data_file}")
             self.data_file.parent.mkdir(parents=True, exist_ok=True)
             self.save_data()
             return
         
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            snapshot, records = self._log.load()
+            snapshot = snapshot or {}
             
             # 載入交易記錄
             self.hourly_trades = defaultdict(list)
-            for hour_str, trades in data.get('hourly_trades', {}).items():
+            for hour_str, trades in snapshot.get('hourly_trades', {}).items():
                 self.hourly_trades[int(hour_str)] = trades
             
-            # 重新計算統計
-            self.recalculate_stats()
+            accumulators = snapshot.get('accumulators')
+            if accumulators is not None:
+                self._slots = {
+                    int(hour): HourSlotAccumulator(**acc) for hour, acc in accumulators.items()
+                }
+                self._total_trades = sum(len(trades) for trades in self.hourly_trades.values())
+                self.recalculate_stats()
+            else:
+                # 舊版快照沒有累加器，從交易記錄重建一次
+                self._rebuild_accumulators()
             
-            print(f"載入數據: {sum(len(trades) for trades in self.hourly_trades.values())} 筆交易")
+            # 重播快照之後的交易
+            for record in records:
+                self._apply_trade(record)
+            
+            print(f"載入數據: {self._total_trades} 筆交易")
         
         except Exception as e:
             print(f"載入數據失敗: {e}")
             self.hourly_trades = defaultdict(list)
+            self._rebuild_accumulators()
     
     def save_data(self):
-        """保存數據到文件"""
+        """寫出完整快照並清空追加日誌"""
         try:
             data = {
                 'hourly_trades': {
@@ -128,15 +201,82 @@ class TimeZoneAnalyzer:
                     str(hour): asdict(stats) 
                     for hour, stats in self.hourly_stats.items()
                 },
+                'accumulators': {
+                    str(hour): slot.to_dict()
+                    for hour, slot in self._slots.items()
+                },
                 'last_updated': datetime.now().isoformat()
             }
             
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            self._log.snapshot(data)
             
         except Exception as e:
             print(f"保存數據失敗: {e}")
     
+    def _slot(self, hour: int) -> HourSlotAccumulator:
+        slot = self._slots.get(hour)
+        if slot is None:
+            slot = self._slots[hour] = HourSlotAccumulator(self.decay_half_life_seconds)
+        return slot
+    
+    def _apply_trade(self, trade_record: Dict):
+        """把一筆交易記錄併入記憶體狀態 (不寫檔)"""
+        hour = int(trade_record['hour'])
+        self.hourly_trades[hour].append(trade_record)
+        try:
+            ts = datetime.fromisoformat(trade_record['entry_time']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            ts = None
+        self._slot(hour).add(float(trade_record['profit']), bool(trade_record['is_win']), ts)
+        self._total_trades += 1
+        self.recalculate_stats_for_hour(hour)
+    
+    def _rebuild_accumulators(self):
+        """由 hourly_trades 重建全部累加器"""
+        trades = [t for hour_trades in self.hourly_trades.values() for t in hour_trades]
+        trades.sort(key=lambda t: t.get('entry_time', ''))
+        self.hourly_trades = defaultdict(list)
+        self._slots = {}
+        self.hourly_stats = {}
+        self._total_trades = 0
+        for trade_record in trades:
+            self._apply_trade(trade_record)
+    
+    def load_from_analytics(self, analytics=None, replace: bool = True, **query) -> int:
+        """
+        從交易分析表載入交易 (取代逐檔讀 trades_*.json)
+        
+        Args:
+            analytics: TradeAnalytics 實例；None 時用預設的 data/analytics
+            replace: True 時清空現有記錄
+            **query: 傳給 TradeAnalytics.trades() 的條件 (start / end / since / sources)
+            
+        Returns:
+            載入的交易數
+        """
+        from ..trading.trade_analytics import get_trade_analytics
+        
+        analytics = analytics or get_trade_analytics()
+        df = analytics.trades(**query)
+        df = df[df['entry_hour'] >= 0].assign(exit_time=lambda d: d['exit_time'].fillna(d['entry_time']))
+        if replace:
+            self.hourly_trades = defaultdict(list)
+        
+        for t in df.itertuples(index=False):
+            self.hourly_trades[int(t.entry_hour)].append({
+                'entry_time': t.entry_time.isoformat(),
+                'exit_time': t.exit_time.isoformat(),
+                'hour': int(t.entry_hour),
+                'profit': float(t.net_pnl_usdt),
+                'is_win': bool(t.is_win),
+                'strategy': t.strategy,
+                'metadata': {'trade_id': t.trade_id, 'source': t.source},
+            })
+        
+        self._rebuild_accumulators()
+        self.save_data()
+        return len(df)
+    
     def record_trade(
         self,
         entry_time: datetime,
@@ -169,32 +309,27 @@ class TimeZoneAnalyzer:
             'metadata': metadata or {}
         }
         
-        self.hourly_trades[hour].append(trade_record)
-        
-        # 更新統計
-        self.recalculate_stats_for_hour(hour)
-        
-        # 定期保存（每 10 筆交易）
-        total_trades = sum(len(trades) for trades in self.hourly_trades.values())
-        if total_trades % 10 == 0:
-            self.save_data()
+        # O(1) 更新累加器與該時段統計，並追加到日誌
+        self._apply_trade(trade_record)
+        try:
+            if self._log.append(trade_record):
+                self.save_data()
+        except OSError as e:
+            print(f"保存數據失敗: {e}")
     
     def recalculate_stats_for_hour(self, hour: int):
-        """重新計算特定小時的統計"""
-        trades = self.hourly_trades[hour]
+        """由累加器計算特定小時的統計 (O(1)，與歷史交易數無關)"""
+        slot = self._slots.get(hour)
         
-        if not trades:
+        if slot is None or slot.pnl.count == 0:
             return
         
-        total_trades = len(trades)
-        winning_trades = sum(1 for t in trades if t['is_win'])
-        losing_trades = total_trades - winning_trades
+        winning_trades = slot.wins.count
+        losing_trades = slot.losses.count
+        total_trades = winning_trades + losing_trades
         
-        profits = [t['profit'] for t in trades if t['is_win']]
-        losses = [abs(t['profit']) for t in trades if not t['is_win']]
-        
-        total_profit = sum(profits) if profits else 0
-        total_loss = sum(losses) if losses else 0
+        total_profit = slot.wins.total
+        total_loss = slot.losses.total
         
         win_rate = winning_trades / total_trades if total_trades > 0 else 0
         profit_factor = total_profit / total_loss if total_loss > 0 else float('inf')
@@ -205,10 +340,24 @@ class TimeZoneAnalyzer:
         # 期望值 = (勝率 × 平均盈利) - (敗率 × 平均虧損)
         expected_value = (win_rate * avg_profit) - ((1 - win_rate) * avg_loss)
         
+        # 近期加權: 全部衰減到該時段最後一筆交易的時間
+        at = slot.last_ts
+        decayed_wins = slot.wins.decayed_count(at)
+        decayed_total = decayed_wins + slot.losses.decayed_count(at)
+        decayed_profit = slot.wins.decayed_sum(at)
+        decayed_loss = slot.losses.decayed_sum(at)
+        decayed_win_rate = decayed_wins / decayed_total if decayed_total > 1e-12 else 0
+        decayed_pf = decayed_profit / decayed_loss if decayed_loss > 1e-12 else float('inf')
+        decayed_ev = (decayed_profit - decayed_loss) / decayed_total if decayed_total > 1e-12 else 0
+        
+        if self.prefer_recent:
+            judged = (decayed_win_rate, decayed_pf, decayed_ev)
+        else:
+            judged = (win_rate, profit_factor, expected_value)
         is_profitable = (
-            win_rate >= self.min_win_rate and 
-            profit_factor >= self.min_profit_factor and
-            expected_value > 0
+            judged[0] >= self.min_win_rate and 
+            judged[1] >= self.min_profit_factor and
+            judged[2] > 0
         )
         
         self.hourly_stats[hour] = TimeSlotStats(
@@ -223,13 +372,18 @@ class TimeZoneAnalyzer:
             avg_profit=avg_profit,
             avg_loss=avg_loss,
             expected_value=expected_value,
-            is_profitable=is_profitable
+            is_profitable=is_profitable,
+            profit_std=slot.pnl.std,
+            decayed_trades=decayed_total,
+            decayed_win_rate=decayed_win_rate,
+            decayed_profit_factor=decayed_pf,
+            decayed_expected_value=decayed_ev
         )
     
     def recalculate_stats(self):
         """重新計算所有時段的統計"""
         for hour in range(24):
-            if hour in self.hourly_trades:
+            if hour in self._slots:
                 self.recalculate_stats_for_hour(hour)
     
     def should_trade_now(